@@ -8,6 +8,7 @@ from typing import List, Optional, Any, Dict
 import asyncio
 
 import io
+import base64
 import csv
 from fastapi.responses import StreamingResponse
 
@@ -17,6 +18,7 @@ from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import func
 
 from app.database import get_db
+from app.core.master_data_cache import master_data_cache
 from app.schemas.all_schemas import (
     CustomerEntityCreate, CustomerEntityUpdate, CustomerOut, CustomerEntityOut,
     UserCreateCorporateAdmin, UserUpdateCorporateAdmin, UserOut, 
@@ -28,6 +30,9 @@ from app.schemas.all_schemas import (
     CustomerEmailSettingCreate, CustomerEmailSettingUpdate, CustomerEmailSettingOut,
     Token,
     ApprovalRequestOut,
+    ApprovalInboxItemOut,
+    ApprovalInboxPageOut,
+    ApprovalInboxCountsOut,
     ApprovalRequestUpdate,
     InternalOwnerContactOut, AuditLogOut, LGRecordOut, LGInstructionOut,
     SystemNotificationOut, BankOut, CurrencyOut,
@@ -46,7 +51,6 @@ from app.crud.crud import (
     crud_internal_owner_contact, crud_lg_instruction,
     crud_system_notification,
     crud_system_notification_view_log,
-    crud_bank, crud_currency,
 )
 from app.crud.crud_org import crud_department, crud_approval_group
 import app.models as models
@@ -59,6 +63,7 @@ from app.models import (
 )
 from app.constants import UserRole, GlobalConfigKey, ApprovalRequestStatusEnum, SubscriptionStatus
 from app.core.ai_integration import generate_signed_gcs_url, _check_bucket_access
+from app.core.signed_urls import signed_url_service
 # FIX: Ensure get_global_email_settings is imported alongside the others.
 # Although you are currently only using get_global_email_settings, keeping 
 # get_customer_email_settings imported is generally safer for a complex file.
@@ -1399,6 +1404,86 @@ def list_approval_requests(
     
     return [ApprovalRequestOut.model_validate(req) for req in requests]
 
+def _encode_inbox_cursor(cursor) -> Optional[str]:
+    if cursor is None:
+        return None
+    created_at, last_id = cursor
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{last_id}".encode()).decode()
+
+
+def _decode_inbox_cursor(cursor: Optional[str]):
+    if not cursor:
+        return None
+    try:
+        created_at, last_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(last_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+
+
+@router.get(
+    "/approval-requests/inbox",
+    response_model=ApprovalInboxPageOut,
+    dependencies=[Depends(check_subscription_status)],
+    summary="Approval inbox page (lightweight rows, keyset pagination)"
+)
+def list_approval_inbox(
+    db: Session = Depends(get_db),
+    current_user: TokenData = Depends(get_current_approver_context),
+    status_filter: Optional[List[ApprovalRequestStatusEnum]] = Query(None, alias="status", description="Filter by one or more statuses"),
+    action_type: Optional[List[str]] = Query(None, description="Filter by one or more action types"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+):
+    """
+    Same requests as GET /approval-requests/ (every PENDING request plus the
+    approver's own history), newest first, as flat rows without nested
+    relations. Page through with next_cursor; use GET /approval-requests/{id}
+    for the full request.
+    """
+    rows, next_cursor = crud_approval_request.get_inbox_page(
+        db,
+        customer_id=current_user.customer_id,
+        approver_id=current_user.user_id,
+        status_filter=status_filter,
+        action_type_filter=action_type,
+        limit=limit,
+        cursor=_decode_inbox_cursor(cursor),
+    )
+    return ApprovalInboxPageOut(
+        items=[ApprovalInboxItemOut.model_validate(row) for row in rows],
+        next_cursor=_encode_inbox_cursor(next_cursor),
+    )
+
+
+@router.get(
+    "/approval-requests/counts",
+    response_model=ApprovalInboxCountsOut,
+    dependencies=[Depends(check_subscription_status)],
+    summary="Approval inbox counts by status and action type"
+)
+def get_approval_inbox_counts(
+    db: Session = Depends(get_db),
+    current_user: TokenData = Depends(get_current_approver_context),
+):
+    """Counts over the approver's inbox from one grouped query."""
+    by_status: Dict[str, int] = {}
+    pending_by_action_type: Dict[str, int] = {}
+    for request_status, request_action_type, count in crud_approval_request.get_inbox_counts(
+        db, customer_id=current_user.customer_id, approver_id=current_user.user_id
+    ):
+        status_key = request_status.value if hasattr(request_status, "value") else str(request_status)
+        by_status[status_key] = by_status.get(status_key, 0) + count
+        if request_status == ApprovalRequestStatusEnum.PENDING:
+            pending_by_action_type[request_action_type] = pending_by_action_type.get(request_action_type, 0) + count
+    return ApprovalInboxCountsOut(
+        total=sum(by_status.values()),
+        pending=by_status.get(ApprovalRequestStatusEnum.PENDING.value, 0),
+        by_status=by_status,
+        by_action_type=pending_by_action_type,
+    )
+
+
 @router.get(
     "/approval-requests/{request_id}",
     response_model=ApprovalRequestOut,
@@ -1867,24 +1952,18 @@ def get_approved_requests_pending_print(
         "LG_OWNER_CHANGE"
     ]
     
-    pending_print_requests = crud_approval_request.get_all_for_customer(
+    # Requests whose instruction is already printed are filtered out in SQL
+    return crud_approval_request.get_all_for_customer(
         db,
         customer_id=customer_id,
         status_filter=ApprovalRequestStatusEnum.APPROVED,
-        action_type_filter=INSTRUCTION_TYPES_REQUIRING_PRINTING
+        action_type_filter=INSTRUCTION_TYPES_REQUIRING_PRINTING,
+        unprinted_instruction_only=True,
+        skip=skip,
+        limit=limit,
     )
-    
-    # Filter out requests that are already marked as printed in the instruction
-    result = [
-        req for req in pending_print_requests
-        if req.related_instruction and not req.related_instruction.is_printed
-    ]
-    
-    return result[skip:skip + limit]
 # Assuming this code is in your end_user.py or corporate_admin.py file
 
-# NOTE: You MUST ensure the _safe_generate_signed_url helper (and import asyncio)
-# is defined at the top of this file, as provided in the previous step.
 
 # @router.post("/system-notifications/{notification_id}/view", ...)
 # This endpoint is already correct as it does not deal with image URLs.
@@ -1944,15 +2023,10 @@ async def get_active_system_notifications_corporate_admin( # Use your existing f
     for n in notifications:
         # CRITICAL FIX: Explicitly detach the ORM object from the session before mutation
         db.expunge(n)
-        
-        if n.image_url and n.image_url.startswith("gs://"):
-            # Use the safe async wrapper
-            signed_url = await _safe_generate_signed_url(n.image_url)
-            if signed_url:
-                n.image_url = signed_url
-        
         results.append(n)
 
+    # Cached signatures; any misses are signed together in one batch
+    await signed_url_service.sign_attribute(results, "image_url")
     return results
 
 # ==============================================================================
@@ -1966,17 +2040,17 @@ from app.core.email_service import send_email, get_global_email_settings
 from fastapi import BackgroundTasks
 import os
 from app.schemas.all_schemas import BankOut
-from app.crud.crud import crud_bank
 
 @router.get("/banks", response_model=List[BankOut])
 def get_system_banks(
+    request: Request,
     skip: int = 0,
     limit: int = 200,
     db: Session = Depends(get_db),
     corporate_admin_context: TokenData = Depends(get_current_corporate_admin_context)
 ):
     """Retrieves all standard system Banks."""
-    return crud_bank.get_all(db, skip=skip, limit=limit)
+    return master_data_cache.list_response(request, db, "banks", BankOut, skip=skip, limit=limit)
 
 @router.get("/quotations/pending-approvals", response_model=List[QuotationRequestOut])
 def get_pending_quotation_approvals(
@@ -2419,23 +2493,25 @@ def delete_approval_group(
 
 @router.get("/banks", response_model=List[BankOut])
 def list_banks_for_reconciliation(
+    request: Request,
     db: Session = Depends(get_db),
     corporate_admin_context: TokenData = Depends(get_current_corporate_admin_context)
 ):
     """
     Returns the list of all active banks for reconciliation purposes.
     """
-    return crud_bank.get_all(db)
+    return master_data_cache.list_response(request, db, "banks", BankOut, limit=100)
 
 @router.get("/currencies", response_model=List[CurrencyOut])
 def list_currencies_for_reconciliation(
+    request: Request,
     db: Session = Depends(get_db),
     corporate_admin_context: TokenData = Depends(get_current_corporate_admin_context)
 ):
     """
     Returns the list of all active currencies for reconciliation purposes.
     """
-    return crud_currency.get_all(db)
+    return master_data_cache.list_response(request, db, "currencies", CurrencyOut, limit=100)
 
 
 # ==============================================================================
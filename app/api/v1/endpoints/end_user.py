@@ -2,7 +2,6 @@
 
 import os
 import sys
-import io
 import base64
 from datetime import date, datetime, timedelta
 import logging
@@ -13,12 +12,15 @@ from fastapi.responses import StreamingResponse, HTMLResponse
 from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import func, and_
 from typing import List, Optional, Any, Dict, Tuple
-import asyncio
 
 from app.database import get_db
+from app.core.master_data_cache import master_data_cache
+from app.core.lg_detail_cache import lg_detail_cache
+from app.services.bulk_renewal_service import bulk_renewal_service
 
 from app.schemas.all_schemas import (
     LGRecordCreate, LGRecordOut, LGDocumentOut,
+    LGRecordListItemOut, LGRecordListPageOut,
     CustomerEntityOut, CurrencyOut, LgTypeOut, RuleOut, IssuingMethodOut,
     LgStatusOut, LgOperationalStatusOut, BankOut, LGCategoryOut, UserOut,
     InternalOwnerContactOut,
@@ -55,7 +57,6 @@ from app.crud.crud import (
     crud_customer,
     crud_customer_configuration,
     crud_lg_owner,
-    crud_template,
     crud_lg_record,
     crud_internal_owner_contact,
     crud_lg_instruction,
@@ -64,10 +65,6 @@ from app.crud.crud import (
     crud_currency,
     crud_bank,
     crud_lg_type,
-    crud_rule,
-    crud_issuing_method,
-    crud_lg_status,
-    crud_lg_operational_status,
     # MODIFIED: Removed crud_universal_category
     crud_user,
     crud_customer_entity, # Added missing import for crud_customer_entity
@@ -109,6 +106,7 @@ from app.constants import (
     AUDIT_ACTION_TYPE_LG_INSTRUCTION_CANCELLATION_FAILED,
 )
 from app.core.ai_integration import generate_signed_gcs_url
+from app.core.signed_urls import signed_url_service
 
 # Initialize logger at the module level
 logger = logging.getLogger(__name__)
@@ -125,7 +123,6 @@ try:
     )
     from app.core.ai_integration import process_lg_document_with_ai, generate_signed_gcs_url, process_amendment_with_ai
 
-    from app.core.document_generator import generate_pdf_from_html
     from app.core.email_service import EmailSettings, get_global_email_settings, send_email, get_customer_email_settings
 
 except Exception as e:
@@ -261,42 +258,48 @@ INSTRUCTION_TYPES_REQUIRING_PRINTING = [
 ]
 @router.post(
     "/lg-records/run-auto-renewal",
-    response_model=AutoRenewalRunSummaryOut, # Or StreamingResponse if sending PDF directly, or Dict[str, Any] with base64
+    response_model=AutoRenewalRunSummaryOut,
     dependencies=[Depends(HasPermission("lg_record:extend")), Depends(check_for_read_only_mode)], # ADDED dependency
     summary="Run automated and forced LG renewal for eligible records"
 )
 async def run_auto_renewal_endpoint(
+    request: Request,
+    batch_id: Optional[int] = Query(None, description="Resume this renewal batch: only its LGs not renewed yet are processed."),
     db: Session = Depends(get_db),
     end_user_context: TokenData = Depends(get_current_end_user_context),
-    request: Request = None # For client host logging
 ):
     """
-    Triggers the bulk auto-renewal and force-renewal process for eligible LG records.
-    Returns a summary of renewed LGs and the combined instruction PDF.
+    Triggers the bulk auto-renewal and force-renewal process for eligible LG records
+    as a resumable batch. Returns the batch summary and a streamed download URL of the
+    instruction letters as a ZIP (small batches also get them merged inline as base64).
     """
-    client_host = get_client_ip(request) if request else None
-
     try:
-        renewed_count, combined_pdf_bytes = await crud_lg_record.run_auto_renewal_process(
+        batch = await crud_lg_record.run_auto_renewal_process(
             db,
             user_id=end_user_context.user_id,
-            customer_id=end_user_context.customer_id
+            customer_id=end_user_context.customer_id,
+            batch_id=batch_id,
         )
+        summary = bulk_renewal_service.summary(db, batch)
+        if not batch.renewed_count:
+            return AutoRenewalRunSummaryOut(
+                **summary,
+                message="No eligible LGs found or renewed." if not batch.failed_count else f"No LGs renewed; {batch.failed_count} failed. Run the batch again to retry them.",
+            )
 
+        pdf_base64 = None
+        combined_pdf_bytes = await bulk_renewal_service.merged_letters_bytes(db, batch)
         if combined_pdf_bytes:
-            # Encode PDF to base64 for JSON response
             pdf_base64 = base64.b64encode(combined_pdf_bytes).decode('utf-8')
-            return AutoRenewalRunSummaryOut(
-                renewed_count=renewed_count,
-                message=f"Successfully renewed {renewed_count} eligible LGs. Consolidated instruction letter generated.",
-                combined_pdf_base64=pdf_base64
-            )
-        else:
-            return AutoRenewalRunSummaryOut(
-                renewed_count=renewed_count,
-                message="No eligible LGs found or renewed.",
-                combined_pdf_base64=None
-            )
+        message = f"Successfully renewed {batch.renewed_count} eligible LGs. Instruction letters generated."
+        if batch.failed_count:
+            message += f" {batch.failed_count} LGs failed; run batch {batch.id} again to retry them."
+        return AutoRenewalRunSummaryOut(
+            **summary,
+            message=message,
+            combined_pdf_base64=pdf_base64,
+            combined_pdf_url=str(request.url_for("download_auto_renewal_letters", batch_id=batch.id)),
+        )
     except HTTPException as e:
         logger.error(f"HTTPException during bulk renewal for customer {end_user_context.customer_id}: {e.detail}", exc_info=True)
         raise
@@ -308,6 +311,46 @@ async def run_auto_renewal_endpoint(
         )
 
 
+@router.get(
+    "/lg-records/auto-renewal-batches/{batch_id}",
+    response_model=AutoRenewalRunSummaryOut,
+    dependencies=[Depends(HasPermission("lg_record:extend"))],
+    summary="Status of a bulk renewal batch"
+)
+async def get_auto_renewal_batch(
+    batch_id: int,
+    db: Session = Depends(get_db),
+    end_user_context: TokenData = Depends(get_current_end_user_context),
+):
+    batch = bulk_renewal_service.get_batch(db, batch_id, end_user_context.customer_id)
+    if not batch:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Renewal batch not found.")
+    return AutoRenewalRunSummaryOut(**bulk_renewal_service.summary(db, batch), message=f"Renewal batch {batch.id} is {batch.status}.")
+
+
+@router.get(
+    "/lg-records/auto-renewal-batches/{batch_id}/letters",
+    name="download_auto_renewal_letters",
+    dependencies=[Depends(HasPermission("lg_record:extend"))],
+    summary="Download the instruction letters of a bulk renewal batch (ZIP, one PDF per LG)"
+)
+async def download_auto_renewal_letters(
+    batch_id: int,
+    db: Session = Depends(get_db),
+    end_user_context: TokenData = Depends(get_current_end_user_context),
+):
+    batch = bulk_renewal_service.get_batch(db, batch_id, end_user_context.customer_id)
+    if not batch:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Renewal batch not found.")
+    if not bulk_renewal_service.letter_count(db, batch):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No instruction letters in this renewal batch.")
+    return StreamingResponse(
+        bulk_renewal_service.iter_letters_zip(batch.id),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="bulk_lg_renewal_{batch.id}.zip"'},
+    )
+
+
 @router.get("/status", dependencies=[Depends(check_subscription_status)]) # ADDED dependency
 async def get_end_user_status(
     current_user: TokenData = Depends(get_current_end_user_context)
@@ -499,9 +542,9 @@ async def scan_lg_file(
 
         all_customer_entities = crud_customer_entity.get_all_for_customer(db, end_user_context.customer_id)
         valid_beneficiary_names_with_ids = [{"name": entity.entity_name, "id": entity.id} for entity in all_customer_entities]
-        all_banks = crud_bank.get_all(db)
+        all_banks = crud_bank.get_all_rows(db)
         valid_bank_names_with_ids = [{"name": bank.name, "id": bank.id} for bank in all_banks]
-        all_lg_types = crud_lg_type.get_all(db)
+        all_lg_types = crud_lg_type.get_all_rows(db)
         valid_lg_types_with_ids = [{"name": lg_type.name, "id": lg_type.id} for lg_type in all_lg_types]
 
         mapped_data = {}
@@ -800,6 +843,97 @@ async def list_lg_records(
     )
     return lg_records
 
+def _encode_lg_list_cursor(sort: str, cursor) -> Optional[str]:
+    if cursor is None:
+        return None
+    value, last_id = cursor
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([sort, value, last_id]).encode()).decode()
+
+
+def _decode_lg_list_cursor(sort: str, cursor: Optional[str]):
+    if not cursor:
+        return None
+    try:
+        cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if cursor_sort != sort:
+            raise ValueError("cursor belongs to another sort order")
+        if sort.lstrip("-") == "expiry_date":
+            value = datetime.fromisoformat(value)
+        return value, int(last_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+
+
+@router.get(
+    "/lg-records/list",
+    response_model=LGRecordListPageOut,
+    dependencies=[Depends(check_subscription_status)],
+    summary="LG records page (lightweight rows, keyset pagination)"
+)
+def list_lg_records_page(
+    sort: str = Query("expiry_date", pattern="^-?(expiry_date|lg_number|id)$", description="Sort column; prefix with '-' for descending"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    internal_owner_contact_id: Optional[int] = Query(None),
+    lg_status_id: Optional[List[int]] = Query(None, description="Filter by one or more LG statuses"),
+    beneficiary_corporate_id: Optional[int] = Query(None),
+    issuing_bank_id: Optional[int] = Query(None),
+    lg_currency_id: Optional[int] = Query(None),
+    expiry_from: Optional[date] = Query(None),
+    expiry_to: Optional[date] = Query(None),
+    lg_number: Optional[str] = Query(None, description="LG number prefix"),
+    db: Session = Depends(get_db),
+    current_user: TokenData = Depends(HasPermission("lg_record:view_own")),
+    end_user_context: TokenData = Depends(get_current_end_user_context),
+):
+    """
+    The same LGs as GET /lg-records/ as flat rows without nested relations,
+    filtered and sorted in SQL. Page through with next_cursor; the first page
+    also carries the total (an estimate for very large results). Use
+    GET /lg-records/{id} for the full record.
+    """
+    fresh_has_all_access, fresh_entity_ids = get_fresh_entity_permissions(db, end_user_context.user_id)
+    descending = sort.startswith("-")
+    sort_column = sort.lstrip("-")
+    filters = dict(
+        internal_owner_contact_id=internal_owner_contact_id,
+        lg_status_ids=lg_status_id,
+        beneficiary_corporate_id=beneficiary_corporate_id,
+        issuing_bank_id=issuing_bank_id,
+        lg_currency_id=lg_currency_id,
+        expiry_from=expiry_from,
+        expiry_to=expiry_to,
+        lg_number_prefix=lg_number,
+    )
+    rows, next_cursor = crud_lg_record.get_lg_list_page(
+        db,
+        customer_id=end_user_context.customer_id,
+        user_has_all_access=fresh_has_all_access,
+        user_allowed_entity_ids=fresh_entity_ids,
+        sort=sort_column,
+        descending=descending,
+        limit=limit,
+        cursor=_decode_lg_list_cursor(sort, cursor),
+        **filters,
+    )
+    total, total_is_estimate = None, False
+    if cursor is None:
+        total, total_is_estimate = crud_lg_record.count_lg_list(
+            db,
+            customer_id=end_user_context.customer_id,
+            user_has_all_access=fresh_has_all_access,
+            user_allowed_entity_ids=fresh_entity_ids,
+            **filters,
+        )
+    return LGRecordListPageOut(
+        items=[LGRecordListItemOut.model_validate(row) for row in rows],
+        next_cursor=_encode_lg_list_cursor(sort, next_cursor),
+        total=total,
+        total_is_estimate=total_is_estimate,
+    )
+
 @router.get(
     "/lg-records/{lg_record_id}",
     response_model=LGRecordOut,
@@ -808,26 +942,31 @@ async def list_lg_records(
 )
 async def get_lg_record_by_id(
     lg_record_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user_context: TokenData = Depends(get_current_end_user_context)
 ):
     """
     Fetches a single LG record by its ID, ensuring it belongs to the current user's customer.
+    Served from the versioned LG detail cache; supports If-None-Match.
     """
     # FIX: Get fresh permissions from DB instead of stale Token
     fresh_has_all_access, fresh_entity_ids = get_fresh_entity_permissions(db, current_user_context.user_id)
 
-    lg_record = crud_lg_record.get_lg_record_with_relations(
-        db, 
-        lg_record_id, 
+    response = lg_detail_cache.detail_response(
+        request,
+        db,
+        lg_record_id,
         current_user_context.customer_id,
         # NEW: Pass the FRESH security parameters
         user_has_all_access=fresh_has_all_access,
-        user_allowed_entity_ids=fresh_entity_ids
+        user_allowed_entity_ids=fresh_entity_ids,
+        schema=LGRecordOut,
+        loader=crud_lg_record._load_with_relations,
     )
-    if not lg_record:
+    if response is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="LG Record not found or not accessible.")
-    return lg_record
+    return response
 
 @router.post(
     "/lg-records/{lg_record_id}/extend",
@@ -989,8 +1128,6 @@ async def release_lg_record(
         if not customer.subscription_plan.can_image_storage:
              raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Your subscription plan does not support document storage.")
         
-        # NOTE: File content must be read *after* the mandatory check to ensure it's only read once.
-        file_bytes = await internal_supporting_document_file.read()
         
         document_metadata = LGDocumentCreate(
             document_type="INTERNAL_SUPPORTING",
@@ -1002,7 +1139,7 @@ async def release_lg_record(
             db_document = await crud_lg_document.create_document(
                 db,
                 obj_in=document_metadata,
-                file_content=file_bytes,
+                file_content=internal_supporting_document_file,
                 lg_record_id=db_lg_record.id,
                 uploaded_by_user_id=end_user_context.user_id
             )
@@ -1184,7 +1321,6 @@ async def liquidate_lg_record(
         if not customer.subscription_plan.can_image_storage:
              raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Your subscription plan does not support document storage.")
         
-        file_bytes = await internal_supporting_document_file.read()
         document_metadata = LGDocumentCreate(
             document_type="INTERNAL_SUPPORTING",
             file_name=internal_supporting_document_file.filename,
@@ -1195,7 +1331,7 @@ async def liquidate_lg_record(
             db_document = await crud_lg_document.create_document(
                 db,
                 obj_in=document_metadata,
-                file_content=file_bytes,
+                file_content=internal_supporting_document_file,
                 lg_record_id=db_lg_record.id,
                 uploaded_by_user_id=end_user_context.user_id
             )
@@ -1374,7 +1510,6 @@ async def decrease_lg_amount_record(
         if not customer.subscription_plan.can_image_storage:
              raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Your subscription plan does not support document storage.")
         
-        file_bytes = await internal_supporting_document_file.read()
         document_metadata = LGDocumentCreate(
             document_type="INTERNAL_SUPPORTING",
             file_name=internal_supporting_document_file.filename,
@@ -1385,7 +1520,7 @@ async def decrease_lg_amount_record(
             db_document = await crud_lg_document.create_document(
                 db,
                 obj_in=document_metadata,
-                file_content=file_bytes,
+                file_content=internal_supporting_document_file,
                 lg_record_id=db_lg_record.id,
                 uploaded_by_user_id=end_user_context.user_id
             )
@@ -1568,7 +1703,6 @@ async def activate_non_operative_lg_record(
         if not customer.subscription_plan.can_image_storage:
              raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Your subscription plan does not support document storage.")
         
-        file_bytes = await internal_supporting_document_file.read()
         document_metadata = LGDocumentCreate(
             document_type="INTERNAL_SUPPORTING",
             file_name=internal_supporting_document_file.filename,
@@ -1579,7 +1713,7 @@ async def activate_non_operative_lg_record(
             db_document = await crud_lg_document.create_document(
                 db,
                 obj_in=document_metadata,
-                file_content=file_bytes,
+                file_content=internal_supporting_document_file,
                 lg_record_id=db_lg_record.id,
                 uploaded_by_user_id=end_user_context.user_id
             )
@@ -1758,7 +1892,6 @@ async def amend_lg_record(
 
     if customer.subscription_plan.can_image_storage:
         try:
-            file_bytes = await amendment_letter_file.read()
             amendment_document_metadata = LGDocumentCreate(
                 document_type="AMENDMENT_LETTER",
                 file_name=amendment_letter_file.filename,
@@ -1768,7 +1901,7 @@ async def amend_lg_record(
             db_amendment_document = await crud_lg_document.create_document(
                 db,
                 obj_in=amendment_document_metadata,
-                file_content=file_bytes,
+                file_content=amendment_letter_file,
                 lg_record_id=db_lg_record.id,
                 uploaded_by_user_id=end_user_context.user_id
             )
@@ -2199,11 +2332,11 @@ async def record_instruction_delivery_api(
     # --- END NEW ENFORCEMENT LOGIC ---
 
     # Manually create the LGInstructionRecordDelivery object
-    file_bytes = None
+    file_content = None
     delivery_document_data = None
 
     if delivery_document_file:
-        file_bytes = await delivery_document_file.read()
+        file_content = delivery_document_file  # Streamed by object storage
 
         if delivery_document_metadata:
             try:
@@ -2241,7 +2374,7 @@ async def record_instruction_delivery_api(
             obj_in=delivery_in,
             user_id=end_user_context.user_id,
             customer_id=end_user_context.customer_id,
-            file_content=file_bytes
+            file_content=file_content
         )
         return updated_instruction
     except HTTPException as e:
@@ -2288,11 +2421,11 @@ async def record_bank_reply_api(
         )
     # --- END NEW ENFORCEMENT LOGIC ---
 
-    file_bytes = None
+    file_content = None
     bank_reply_document_data = None
 
     if bank_reply_document_file:
-        file_bytes = await bank_reply_document_file.read()
+        file_content = bank_reply_document_file  # Streamed by object storage
 
         if bank_reply_document_metadata:
             try:
@@ -2328,7 +2461,7 @@ async def record_bank_reply_api(
             obj_in=bank_reply_in,
             user_id=end_user_context.user_id,
             customer_id=end_user_context.customer_id,
-            file_content=file_bytes
+            file_content=file_content
         )
         return updated_instruction
     except HTTPException as e:
@@ -2414,6 +2547,7 @@ async def get_my_pending_approval_requests(
     dependencies=[Depends(HasPermission("lg_record:view_own")), Depends(check_subscription_status)],
 )
 async def view_lg_instruction_letter(
+    request: Request,
     instruction_id: int,
     db: Session = Depends(get_db),
     current_user: TokenData = Depends(HasPermission("lg_record:view_own")),
@@ -2421,91 +2555,33 @@ async def view_lg_instruction_letter(
     print_flag: bool = Query(False, alias="print", description="If true, attempts to trigger print dialog.")
 ):
     """
-    Generates and returns an LG Instruction letter as a PDF for viewing or printing.
+    Returns an LG Instruction letter as a PDF for viewing or printing.
     If 'print=true' query parameter is present, it attempts to trigger the browser's print dialog.
+    The PDF is rendered once per (instruction, template version, data) and then
+    served from the letter artifact store with a strong ETag.
     """
+    from app.core.letter_artifacts import pdf_response
+    from app.services.letter_artifact_service import letter_artifact_service
+
     logger.info(f"Attempting to view letter for instruction ID: {instruction_id}. Print flag: {print_flag}")
     
-    # CRITICAL FIX: Eager load the required relationships
-    db_instruction = db.query(models.LGInstruction).options(
-        selectinload(models.LGInstruction.lg_record).selectinload(models.LGRecord.lg_currency),
-        selectinload(models.LGInstruction.lg_record).selectinload(models.LGRecord.issuing_bank),
-        selectinload(models.LGInstruction.lg_record).selectinload(models.LGRecord.beneficiary_corporate),
-        selectinload(models.LGInstruction.lg_record).selectinload(models.LGRecord.internal_owner_contact),
-        selectinload(models.LGInstruction.lg_record).selectinload(models.LGRecord.customer),
-        selectinload(models.LGInstruction.lg_record).selectinload(models.LGRecord.communication_bank), # NEW: Eager load communication_bank
-    ).filter(
-        models.LGInstruction.id == instruction_id,
-        models.LGInstruction.lg_record.has(models.LGRecord.customer_id == end_user_context.customer_id),
-    ).first()
-
+    db_instruction = letter_artifact_service.load_instruction(db, instruction_id, customer_id=end_user_context.customer_id)
     if not db_instruction:
         logger.warning(f"Instruction ID {instruction_id} not found.")
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="LG Instruction not found.")
-    
-    template = crud_template.get(db, db_instruction.template_id)
-    if not template:
-        logger.error(f"Template ID {db_instruction.template_id} not found for instruction ID {instruction_id}.")
-        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Template not found.")
-
-    generated_html = template.content
-    logger.debug(f"Template content fetched for instruction ID {instruction_id}. Length: {len(generated_html)}.")
-
-    instruction_details = db_instruction.details if db_instruction.details is not None else {}
-    
-    # Use the already loaded lg_record from db_instruction to avoid another DB call.
-    lg_record_for_template = db_instruction.lg_record
-    if lg_record_for_template:
-        
-        # Determine the correct recipient details using the new helper
-        recipient_name, recipient_address = crud_lg_record._get_recipient_details(db, lg_record_for_template)
-        
-        instruction_details.update({
-            "lg_number": lg_record_for_template.lg_number,
-            "lg_amount": float(lg_record_for_template.lg_amount),
-            "lg_currency": lg_record_for_template.lg_currency.iso_code,
-            "issuing_bank_name": lg_record_for_template.issuing_bank.name,
-            "lg_beneficiary_name": lg_record_for_template.beneficiary_corporate.entity_name,
-            "customer_name": lg_record_for_template.customer.name,
-            "internal_owner_email": lg_record_for_template.internal_owner_contact.email,
-            "current_date": date.today().strftime("%Y-%m-%d"),
-            "platform_name": "Treasury Management Platform",
-            "recipient_name": recipient_name,
-            "recipient_address": recipient_address,
-        })
-        instruction_details["lg_amount_formatted"] = f"{lg_record_for_template.lg_currency.symbol} {float(lg_record_for_template.lg_amount):,.2f}"
-        if "original_lg_amount" in instruction_details:
-             instruction_details["original_lg_amount_formatted"] = f"{lg_record_for_template.lg_currency.symbol} {float(instruction_details['original_lg_amount']):,.2f}"
-        if "new_lg_amount" in instruction_details:
-             instruction_details["new_lg_amount_formatted"] = f"{lg_record_for_template.lg_currency.symbol} {float(instruction_details['new_lg_amount']):,.2f}"
-        if "decrease_amount" in instruction_details:
-             instruction_details["decrease_amount_formatted"] = f"{lg_record_for_template.lg_currency.symbol} {float(instruction_details['decrease_amount']):,.2f}"
-
-        if db_instruction.instruction_type == ACTION_TYPE_LG_ACTIVATE_NON_OPERATIVE and "payment_details" in instruction_details:
-            payment_details = instruction_details["payment_details"]
-            instruction_details["payment_method"] = payment_details.get("payment_method")
-            instruction_details["payment_amount"] = float(payment_details.get("amount"))
-            instruction_details["payment_currency_code"] = crud_currency.get(db, payment_details.get("currency_id")).iso_code if payment_details.get("currency_id") else ""
-            instruction_details["payment_reference"] = payment_details.get("payment_reference")
-            instruction_details["payment_issuing_bank_name"] = crud_bank.get(db, payment_details.get("issuing_bank_id")).name if payment_details.get("issuing_bank_id") else ""
-            instruction_details["payment_date"] = payment_details.get("payment_date")
-            instruction_details["payment_amount_formatted"] = f"{instruction_details['payment_currency_code']} {instruction_details['payment_amount']:,.2f}"
-
-
-    for key, value in instruction_details.items():
-        str_value = str(value) if value is not None else ""
-        generated_html = generated_html.replace(f"{{{{{key}}}}}", str_value)
-    logger.debug(f"Placeholders populated for instruction ID {instruction_id}.")
-
 
     try:
-        generated_pdf_bytes = await generate_pdf_from_html(generated_html, f"lg_instruction_{db_instruction.serial_number}")
-        if not generated_pdf_bytes:
-            logger.error(f"generate_pdf_from_html returned None for instruction ID {instruction_id}.")
-            raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to generate PDF document.")
+        artifact = await letter_artifact_service.instruction_letter(db, db_instruction)
+    except LookupError as e:
+        logger.error(f"{e} (instruction ID {instruction_id}).")
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Template not found.")
     except Exception as e:
         logger.error(f"Exception during PDF generation for instruction ID {instruction_id}: {e}", exc_info=True)
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to generate PDF document due to an internal error: {e}")
+    if not artifact:
+        logger.error(f"PDF rendering failed for instruction ID {instruction_id}.")
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to generate PDF document.")
+    generated_pdf_bytes = artifact.pdf_bytes
 
     if print_flag:
         import base64
@@ -2537,9 +2613,8 @@ async def view_lg_instruction_letter(
         logger.info(f"Returning HTML response to trigger print dialog for instruction ID {instruction_id}.")
         return HTMLResponse(content=html_content, status_code=status.HTTP_200_OK)
     else:
-        headers = {'Content-Disposition': f'inline; filename="{db_instruction.serial_number}.pdf"'}
-        logger.info(f"Successfully generated and streaming PDF for instruction ID {instruction_id}.")
-        return StreamingResponse(io.BytesIO(generated_pdf_bytes), media_type="application/pdf", headers=headers)
+        logger.info(f"Serving PDF for instruction ID {instruction_id}.")
+        return pdf_response(request, artifact, f"{db_instruction.serial_number}.pdf")
         
 @router.post(
     "/lg-records/instructions/{instruction_id}/mark-as-accessed-for-print",
@@ -2868,80 +2943,80 @@ async def get_customer_entities_for_end_user(
 
 @router.get("/currencies/", response_model=List[CurrencyOut], dependencies=[Depends(check_subscription_status)]) # ADDED dependency
 async def get_currencies_for_end_user(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: TokenData = Depends(HasPermission("lg_record:create")),
     skip: int = 0,
     limit: int = 100
 ):
     """Retrieves a list of all active currencies."""
-    currencies = crud_currency.get_all(db, skip=skip, limit=limit)
-    return currencies
+    return master_data_cache.list_response(request, db, "currencies", CurrencyOut, skip=skip, limit=limit)
 
 @router.get("/lg-types/", response_model=List[LgTypeOut], dependencies=[Depends(check_subscription_status)]) # ADDED dependency
 async def get_lg_types_for_end_user(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: TokenData = Depends(HasPermission("lg_record:create")),
     skip: int = 0,
     limit: int = 100
 ):
     """Retrieves a list of all active LG types."""
-    lg_types = crud_lg_type.get_all(db, skip=skip, limit=limit)
-    return lg_types
+    return master_data_cache.list_response(request, db, "lg_types", LgTypeOut, skip=skip, limit=limit)
 
 @router.get("/banks/", response_model=List[BankOut], dependencies=[Depends(check_subscription_status)]) # ADDED dependency
 async def get_banks_for_end_user(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: TokenData = Depends(HasPermission("lg_record:create")),
     skip: int = 0,
     limit: int = 100
 ):
     """Retrieves a list of all active banks."""
-    banks = crud_bank.get_all(db, skip=skip, limit=limit)
-    return banks
+    return master_data_cache.list_response(request, db, "banks", BankOut, skip=skip, limit=limit)
 
 @router.get("/issuing-methods/", response_model=List[IssuingMethodOut], dependencies=[Depends(check_subscription_status)]) # ADDED dependency
 async def get_issuing_methods_for_end_user(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: TokenData = Depends(HasPermission("lg_record:create")),
     skip: int = 0,
     limit: int = 100
 ):
     """Retrieves a list of all active issuing methods."""
-    issuing_methods = crud_issuing_method.get_all(db, skip=skip, limit=limit)
-    return issuing_methods
+    return master_data_cache.list_response(request, db, "issuing_methods", IssuingMethodOut, skip=skip, limit=limit)
 
 @router.get("/rules/", response_model=List[RuleOut], dependencies=[Depends(check_subscription_status)]) # ADDED dependency
 async def get_rules_for_end_user(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: TokenData = Depends(HasPermission("lg_record:create")),
     skip: int = 0,
     limit: int = 100
 ):
     """Retrieves a list of all active rules."""
-    rules = crud_rule.get_all(db, skip=skip, limit=limit)
-    return rules
+    return master_data_cache.list_response(request, db, "rules", RuleOut, skip=skip, limit=limit)
 
 @router.get("/lg-statuses/", response_model=List[LgStatusOut], dependencies=[Depends(check_subscription_status)]) # ADDED dependency
 async def get_lg_statuses_for_end_user(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: TokenData = Depends(HasPermission("lg_record:create")),
     skip: int = 0,
     limit: int = 100
 ):
     """Retrieves a list of all active LG statuses."""
-    lg_statuses = crud_lg_status.get_all(db, skip=skip, limit=limit)
-    return lg_statuses
+    return master_data_cache.list_response(request, db, "lg_statuses", LgStatusOut, skip=skip, limit=limit)
 
 @router.get("/lg-operational-statuses/", response_model=List[LgOperationalStatusOut], dependencies=[Depends(check_subscription_status)]) # ADDED dependency
 async def get_lg_operational_statuses_for_end_user(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: TokenData = Depends(HasPermission("lg_record:create")),
     skip: int = 0,
     limit: int = 100
 ):
     """Retrieves a list of all active LG operational statuses."""
-    lg_operational_statuses = crud_lg_operational_status.get_all(db, skip=skip, limit=limit)
-    return lg_operational_statuses
+    return master_data_cache.list_response(request, db, "lg_operational_statuses", LgOperationalStatusOut, skip=skip, limit=limit)
 
 @router.get("/lg-categories/", response_model=List[LGCategoryOut], dependencies=[Depends(check_subscription_status)])
 async def get_lg_categories_for_end_user(
@@ -3368,26 +3443,14 @@ async def get_current_user_dashboard_info(
     }
 
 # --- HELPER: Async Wrapper for URL Signing ---
-# Note: This definition needs to be placed somewhere globally in end_user.py
-# (outside of any route function) and requires 'import asyncio' and 
-# 'from app.core.ai_integration import generate_signed_gcs_url'
 async def _safe_generate_signed_url(gcs_uri: str) -> Optional[str]:
     """
-    Safely generates a signed URL. This is necessary because generate_signed_gcs_url
-    might return a coroutine that needs to be awaited.
+    Safely generates a signed URL through the shared signed-URL cache.
     """
     try:
         if not gcs_uri: return None
-        
-        # Assuming generate_signed_gcs_url is imported from app.core.ai_integration
-        result = generate_signed_gcs_url(gcs_uri)
-        
-        # This is the crucial logic to await if the result is a coroutine
-        if asyncio.iscoroutine(result):
-            return await result
-        return result
+        return await signed_url_service.get(gcs_uri)
     except Exception as e:
-        # Assuming logger is imported globally in end_user.py
         logger.error(f"Error signing URL for end-user: {e}")
         return None
 
@@ -3415,15 +3478,10 @@ async def get_active_system_notifications(
         # CRITICAL FIX: Explicitly detach the ORM object from the session
         # This prevents the subsequent mutation from being written to the DB.
         db.expunge(n) 
-        
-        if n.image_url and n.image_url.startswith("gs://"):
-            # Use the safe async wrapper defined previously
-            signed = await _safe_generate_signed_url(n.image_url) 
-            if signed:
-                n.image_url = signed
-        
         results.append(n)
 
+    # Cached signatures; any misses are signed together in one batch
+    await signed_url_service.sign_attribute(results, "image_url")
     return results
         
 @router.post(
@@ -1,8 +1,8 @@
 from typing import List, Any, Optional, Dict
 from pydantic import BaseModel
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Body, Request, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Body, Request, Response, UploadFile, File, Form
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy import func
 from datetime import date
 import io
 import json
@@ -17,7 +17,7 @@ from app.core.encryption import encrypt_data
 
 # Models
 from app.models.models import Bank, Currency 
-from app.models.models_issuance import IssuedLGRecord, IssuanceRequest, IssuanceFacilitySubLimit, IssuanceFacility, IssuanceWorkflowPolicy, CustomerFormConfiguration, IssuanceRequestSnapshot, IssuanceRequestVersion, AdminChangeRequest, BankFormIssueReport
+from app.models.models_issuance import IssuanceFacilitySubLimit, IssuanceFacility, IssuanceWorkflowPolicy, CustomerFormConfiguration, IssuanceRequestSnapshot, IssuanceRequestVersion, AdminChangeRequest, BankFormIssueReport
 # NOTE: Ensure you created app/models/models_reconciliation.py first!
 from app.models.models_reconciliation import BankPositionBatch, BankPositionRow 
 # Schemas
@@ -36,6 +36,11 @@ from app.schemas.schemas_issuance import (
     BankFormIssueReportCreate, BankFormIssueReportOut, BankFormIssueReportUpdate
 )
 from app.services.issuance_service import issuance_service
+from app.services.action_center_service import (
+    action_center_service, BUCKETS, DEFAULT_EXPIRY_DAYS, SOURCE_ISSUANCE, SOURCE_MAINTENANCE,
+    PENDING_DELIVERY, AWAITING_REPLY, APPROACHING_EXPIRY, APPROVED_REQUEST, APPROVED_MAINTENANCE,
+)
+from app.models.models_action_center import IssuanceWorkItem
 
 # CRUD
 from app.crud.crud_issuance import crud_issuance_request
@@ -48,45 +53,144 @@ router = APIRouter()
 from .base import *
 from .base import _read_bank_form_pdf_bytes, _send_edit_notifications, _detect_coverage_gaps, _make_doc_filename, _get_lg_copy_docs, _send_requestor_status_notification, _serialize_action, _serialize_recon_session, _serialize_recon_result, _apply_admin_change, _create_governed_change
 
-@router.get("/action-center/maintenance-pending-delivery")
-def issuance_action_center_pending_delivery(
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _page(db: Session, customer_id: int, bucket: str, response: Response, limit: Optional[int], cursor: Optional[str], **kwargs):
+    """One page of a work-queue bucket; the next page's cursor goes in X-Next-Cursor."""
+    try:
+        items, next_cursor = action_center_service.list_items(db, customer_id, bucket, limit=limit, cursor=cursor, **kwargs)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+
+def _serialize_work_item(item: IssuanceWorkItem) -> Dict[str, Any]:
+    """Unified pending-delivery row shape (issuance and maintenance)."""
+    row = {
+        "id": item.source_id,
+        "source": item.source,
+        "lg_number": item.lg_number,
+        "beneficiary": item.beneficiary,
+        "amount": str(item.amount) if item.amount else None,
+        "currency_id": item.currency_id,
+        "created_at": _iso(item.source_created_at),
+        "status": item.status,
+        "action_type": item.action_type,
+    }
+    if item.source == SOURCE_MAINTENANCE:
+        row["issued_lg_id"] = item.issued_lg_id
+        row["serial_number"] = item.serial_number
+    return row
+
+
+def _serialize_awaiting_reply(item: IssuanceWorkItem) -> Dict[str, Any]:
+    """Unified pending-bank-reply row shape; LG delivery dates are calendar dates."""
+    delivered = item.delivery_date or item.sort_at
+    delivery_date = delivered.date() if item.source == SOURCE_ISSUANCE else delivered
+    row = {
+        "id": item.source_id,
+        "source": item.source,
+        "lg_number": item.lg_number,
+        "beneficiary": item.beneficiary,
+        "delivery_date": _iso(delivery_date),
+        "days_waiting": (date.today() - delivered.date()).days,
+        "action_type": item.action_type,
+    }
+    if item.source == SOURCE_MAINTENANCE:
+        row["serial_number"] = item.serial_number
+    return row
+
+
+def _serialize_maintenance_letter(item: IssuanceWorkItem) -> Dict[str, Any]:
+    return {
+        "id": item.source_id,
+        "action_type": item.action_type,
+        "status": item.status,
+        "instruction_status": item.instruction_status,
+        "serial_number": item.serial_number,
+        "issued_lg_id": item.issued_lg_id,
+        "lg_number": item.lg_number,
+        "beneficiary": item.beneficiary,
+        "created_at": _iso(item.source_created_at),
+    }
+
+
+@router.get("/action-center/counts")
+def issuance_action_center_counts(
+    days_threshold: int = Query(DEFAULT_EXPIRY_DAYS, description="Number of days before expiry to flag"),
+    db: Session = Depends(get_db),
+    current_user: TokenData = Depends(get_issuance_read_context),
+):
+    """Open item count per action-center bucket (badge counts), in one query."""
+    return action_center_service.counts(db, current_user.customer_id, days_threshold)
+
+
+@router.get("/action-center/work-items")
+def issuance_action_center_work_items(
+    response: Response,
+    bucket: str = Query(..., description="One of: " + ", ".join(BUCKETS)),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    days_threshold: int = Query(DEFAULT_EXPIRY_DAYS, description="APPROACHING_EXPIRY window in days"),
     db: Session = Depends(get_db),
     current_user: TokenData = Depends(get_issuance_read_context),
 ):
     """
-    Maintenance letters that have been issued (PDF generated) but not yet
-    delivered to the bank — mirrors custody 'undelivered instructions'.
+    Generic keyset-paginated view of one action-center bucket, newest first
+    (soonest expiry first for APPROACHING_EXPIRY).
     """
-    from app.models.models_issuance import IssuanceMaintenanceAction, IssuedLGRecord
-
-    actions = db.query(IssuanceMaintenanceAction).join(
-        IssuedLGRecord, IssuedLGRecord.id == IssuanceMaintenanceAction.issued_lg_id
-    ).filter(
-        IssuedLGRecord.customer_id == current_user.customer_id,
-        IssuanceMaintenanceAction.is_deleted == False,
-        IssuanceMaintenanceAction.letter_generated_path.isnot(None),
-        IssuanceMaintenanceAction.delivery_date.is_(None),
-        IssuanceMaintenanceAction.status.in_(["APPROVED", "EXECUTED"]),
-    ).order_by(IssuanceMaintenanceAction.created_at.desc()).all()
-
+    if bucket not in BUCKETS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown bucket '{bucket}'.")
+    items = _page(db, current_user.customer_id, bucket, response, limit, cursor, days_threshold=days_threshold)
     return [
         {
-            "id": a.id,
-            "action_type": a.action_type,
-            "status": a.status,
-            "instruction_status": a.instruction_status,
-            "serial_number": a.letter_serial_number,
-            "issued_lg_id": a.issued_lg_id,
-            "lg_number": a.issued_lg.lg_number if a.issued_lg else None,
-            "beneficiary": a.issued_lg.beneficiary_name if a.issued_lg else None,
-            "created_at": a.created_at.isoformat() if a.created_at else None,
+            "id": item.source_id,
+            "source": item.source,
+            "issued_lg_id": item.issued_lg_id,
+            "lg_number": item.lg_number,
+            "beneficiary": item.beneficiary,
+            "amount": str(item.amount) if item.amount else None,
+            "currency_id": item.currency_id,
+            "lg_type_id": item.lg_type_id,
+            "department": item.department,
+            "status": item.status,
+            "action_type": item.action_type,
+            "serial_number": item.serial_number,
+            "instruction_status": item.instruction_status,
+            "sort_at": _iso(item.sort_at),
+            "due_date": _iso(item.due_date),
+            "delivery_date": _iso(item.delivery_date),
+            "created_at": _iso(item.source_created_at),
         }
-        for a in actions
+        for item in items
     ]
 
 
+@router.get("/action-center/maintenance-pending-delivery")
+def issuance_action_center_pending_delivery(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: TokenData = Depends(get_issuance_read_context),
+):
+    """
+    Maintenance letters that have been issued (PDF generated) but not yet
+    delivered to the bank — mirrors custody 'undelivered instructions'.
+    """
+    items = _page(db, current_user.customer_id, PENDING_DELIVERY, response, limit, cursor, sources=[SOURCE_MAINTENANCE])
+    return [_serialize_maintenance_letter(item) for item in items]
+
+
 @router.get("/action-center/maintenance-awaiting-reply")
 def issuance_action_center_awaiting_reply(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(get_db),
     current_user: TokenData = Depends(get_issuance_read_context),
 ):
@@ -94,38 +198,19 @@ def issuance_action_center_awaiting_reply(
     Maintenance letters that have been delivered to the bank but are still
     awaiting a bank reply — mirrors custody 'awaiting bank reply'.
     """
-    from app.models.models_issuance import IssuanceMaintenanceAction, IssuedLGRecord
-
-    actions = db.query(IssuanceMaintenanceAction).join(
-        IssuedLGRecord, IssuedLGRecord.id == IssuanceMaintenanceAction.issued_lg_id
-    ).filter(
-        IssuedLGRecord.customer_id == current_user.customer_id,
-        IssuanceMaintenanceAction.is_deleted == False,
-        IssuanceMaintenanceAction.delivery_date.isnot(None),
-        IssuanceMaintenanceAction.bank_reply_date.is_(None),
-        IssuanceMaintenanceAction.status.in_(["APPROVED", "EXECUTED"]),
-    ).order_by(IssuanceMaintenanceAction.delivery_date.desc()).all()
-
+    items = _page(db, current_user.customer_id, AWAITING_REPLY, response, limit, cursor, sources=[SOURCE_MAINTENANCE])
     return [
-        {
-            "id": a.id,
-            "action_type": a.action_type,
-            "status": a.status,
-            "instruction_status": a.instruction_status,
-            "serial_number": a.letter_serial_number,
-            "issued_lg_id": a.issued_lg_id,
-            "lg_number": a.issued_lg.lg_number if a.issued_lg else None,
-            "beneficiary": a.issued_lg.beneficiary_name if a.issued_lg else None,
-            "delivery_date": a.delivery_date.isoformat() if a.delivery_date else None,
-            "created_at": a.created_at.isoformat() if a.created_at else None,
-        }
-        for a in actions
+        {**_serialize_maintenance_letter(item), "delivery_date": _iso(item.delivery_date)}
+        for item in items
     ]
 
 
 @router.get("/action-center/approaching-expiry")
 def issuance_action_center_approaching_expiry(
+    response: Response,
     days_threshold: int = Query(30, description="Number of days before expiry to flag"),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(get_db),
     current_user: TokenData = Depends(get_issuance_read_context),
 ):
@@ -133,39 +218,30 @@ def issuance_action_center_approaching_expiry(
     Issued LGs that are approaching expiry within the given threshold —
     prompts the user to consider initiating a CLOSE action.
     """
-    from app.models.models_issuance import IssuedLGRecord
-    from datetime import date as date_cls, timedelta
-
-    today = date_cls.today()
-    horizon = today + timedelta(days=days_threshold)
-
-    lgs = db.query(IssuedLGRecord).filter(
-        IssuedLGRecord.customer_id == current_user.customer_id,
-        IssuedLGRecord.status.in_(["ACTIVE", "LG_ISSUED"]),
-        IssuedLGRecord.bank_lg_expiry_date.isnot(None),
-        IssuedLGRecord.bank_lg_expiry_date >= today,
-        IssuedLGRecord.bank_lg_expiry_date <= horizon,
-    ).order_by(IssuedLGRecord.bank_lg_expiry_date.asc()).all()
-
+    today = date.today()
+    items = _page(db, current_user.customer_id, APPROACHING_EXPIRY, response, limit, cursor, days_threshold=days_threshold)
     return [
         {
-            "id": lg.id,
-            "lg_number": lg.bank_lg_number or lg.lg_ref_number,
-            "beneficiary_name": lg.beneficiary_name,
-            "amount": str(lg.current_amount) if lg.current_amount else None,
-            "currency_id": lg.currency_id,
-            "bank_lg_expiry_date": str(lg.bank_lg_expiry_date) if lg.bank_lg_expiry_date else None,
-            "days_to_expiry": (lg.bank_lg_expiry_date - today).days if lg.bank_lg_expiry_date else None,
-            "lg_status": lg.status,
+            "id": item.source_id,
+            "lg_number": item.lg_number,
+            "beneficiary_name": item.beneficiary,
+            "amount": str(item.amount) if item.amount else None,
+            "currency_id": item.currency_id,
+            "bank_lg_expiry_date": str(item.due_date),
+            "days_to_expiry": (item.due_date - today).days,
+            "lg_status": item.status,
             "suggestion": "Consider initiating a CLOSE action for this LG",
         }
-        for lg in lgs
+        for item in items
     ]
 
 # ── NEW: Unified Issuance Action Center endpoints ──
 
 @router.get("/action-center/approved-requests")
 def issuance_action_center_approved_requests(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(get_db),
     current_user: TokenData = Depends(get_issuance_read_context),
 ):
@@ -173,30 +249,28 @@ def issuance_action_center_approved_requests(
     Issuance requests that have been approved internally but not yet processed
     (no IssuedLGRecord created yet). End-user needs to generate instruction & issue.
     """
-    requests = db.query(IssuanceRequest).filter(
-        IssuanceRequest.customer_id == current_user.customer_id,
-        IssuanceRequest.status == "APPROVED_INTERNAL",
-        IssuanceRequest.is_deleted == False,
-    ).order_by(IssuanceRequest.updated_at.desc()).all()
-
+    items = _page(db, current_user.customer_id, APPROVED_REQUEST, response, limit, cursor)
     return [
         {
-            "id": r.id,
-            "serial_number": r.serial_number,
-            "beneficiary_name": r.beneficiary_name,
-            "amount": str(r.amount) if r.amount else None,
-            "currency_id": r.currency_id,
-            "lg_type_id": r.lg_type_id,
-            "department": r.department,
-            "approved_at": r.updated_at.isoformat() if r.updated_at else None,
+            "id": item.source_id,
+            "serial_number": item.serial_number,
+            "beneficiary_name": item.beneficiary,
+            "amount": str(item.amount) if item.amount else None,
+            "currency_id": item.currency_id,
+            "lg_type_id": item.lg_type_id,
+            "department": item.department,
+            "approved_at": _iso(item.sort_at),
             "type": "issuance_request",
         }
-        for r in requests
+        for item in items
     ]
 
 
 @router.get("/action-center/approved-maintenance")
 def issuance_action_center_approved_maintenance(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(get_db),
     current_user: TokenData = Depends(get_issuance_read_context),
 ):
@@ -204,150 +278,51 @@ def issuance_action_center_approved_maintenance(
     Maintenance actions that have been approved but not yet executed.
     End-user needs to generate instruction letter & execute.
     """
-    from app.models.models_issuance import IssuanceMaintenanceAction
-
-    actions = db.query(IssuanceMaintenanceAction).join(
-        IssuedLGRecord, IssuedLGRecord.id == IssuanceMaintenanceAction.issued_lg_id
-    ).filter(
-        IssuedLGRecord.customer_id == current_user.customer_id,
-        IssuanceMaintenanceAction.status == "APPROVED",
-        IssuanceMaintenanceAction.is_deleted == False,
-    ).order_by(IssuanceMaintenanceAction.updated_at.desc()).all()
-
+    items = _page(db, current_user.customer_id, APPROVED_MAINTENANCE, response, limit, cursor)
     return [
         {
-            "id": a.id,
-            "action_type": a.action_type,
-            "serial_number": a.letter_serial_number,
-            "issued_lg_id": a.issued_lg_id,
-            "lg_number": (a.issued_lg.bank_lg_number or a.issued_lg.lg_ref_number) if a.issued_lg else None,
-            "beneficiary": a.issued_lg.beneficiary_name if a.issued_lg else None,
-            "approved_at": a.updated_at.isoformat() if a.updated_at else None,
+            "id": item.source_id,
+            "action_type": item.action_type,
+            "serial_number": item.serial_number,
+            "issued_lg_id": item.issued_lg_id,
+            "lg_number": item.lg_number,
+            "beneficiary": item.beneficiary,
+            "approved_at": _iso(item.sort_at),
             "type": "maintenance",
         }
-        for a in actions
+        for item in items
     ]
 
 
 @router.get("/action-center/unified-pending-delivery")
 def issuance_action_center_unified_pending_delivery(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(get_db),
     current_user: TokenData = Depends(get_issuance_read_context),
 ):
     """
     UNIFIED: Items with instructions generated but not yet delivered to bank.
     Combines IssuedLGRecords (INTERNAL_PROCESSING, no delivery_date)
-    + Maintenance actions (letter generated, no delivery_date).
+    + Maintenance actions (letter generated, no delivery_date), newest first.
     """
-    from app.models.models_issuance import IssuanceMaintenanceAction
-
-    # 1. Issuance LGs pending delivery
-    lgs = db.query(IssuedLGRecord).filter(
-        IssuedLGRecord.customer_id == current_user.customer_id,
-        IssuedLGRecord.status == "INTERNAL_PROCESSING",
-        IssuedLGRecord.delivery_date.is_(None),
-    ).order_by(IssuedLGRecord.created_at.desc()).all()
-
-    # 2. Maintenance actions pending delivery
-    maint = db.query(IssuanceMaintenanceAction).join(
-        IssuedLGRecord, IssuedLGRecord.id == IssuanceMaintenanceAction.issued_lg_id
-    ).filter(
-        IssuedLGRecord.customer_id == current_user.customer_id,
-        IssuanceMaintenanceAction.is_deleted == False,
-        or_(
-            IssuanceMaintenanceAction.letter_generated_path.isnot(None),
-            IssuanceMaintenanceAction.is_printed == True,
-            IssuanceMaintenanceAction.instruction_status.in_(["Instruction Issued", "Printed"]),
-        ),
-        IssuanceMaintenanceAction.delivery_date.is_(None),
-        IssuanceMaintenanceAction.status.in_(["APPROVED", "EXECUTED"]),
-    ).order_by(IssuanceMaintenanceAction.created_at.desc()).all()
-
-    results = []
-    for lg in lgs:
-        results.append({
-            "id": lg.id,
-            "source": "issuance",
-            "lg_number": lg.bank_lg_number or lg.lg_ref_number,
-            "beneficiary": lg.beneficiary_name,
-            "amount": str(lg.current_amount) if lg.current_amount else None,
-            "currency_id": lg.currency_id,
-            "created_at": lg.created_at.isoformat() if lg.created_at else None,
-            "status": lg.status,
-            "action_type": "NEW_ISSUANCE",
-        })
-    for a in maint:
-        results.append({
-            "id": a.id,
-            "source": "maintenance",
-            "issued_lg_id": a.issued_lg_id,
-            "lg_number": (a.issued_lg.bank_lg_number or a.issued_lg.lg_ref_number) if a.issued_lg else None,
-            "beneficiary": a.issued_lg.beneficiary_name if a.issued_lg else None,
-            "amount": None,
-            "currency_id": None,
-            "created_at": a.created_at.isoformat() if a.created_at else None,
-            "status": a.status,
-            "action_type": a.action_type,
-            "serial_number": a.letter_serial_number,
-        })
-    return results
+    items = _page(db, current_user.customer_id, PENDING_DELIVERY, response, limit, cursor)
+    return [_serialize_work_item(item) for item in items]
 
 
 @router.get("/action-center/unified-pending-bank-reply")
 def issuance_action_center_unified_pending_bank_reply(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(get_db),
     current_user: TokenData = Depends(get_issuance_read_context),
 ):
     """
     UNIFIED: Items delivered to bank but awaiting reply.
     Combines IssuedLGRecords (delivered, no bank_reply)
-    + Maintenance actions (delivered, no bank_reply).
+    + Maintenance actions (delivered, no bank_reply), most recently delivered first.
     """
-    from app.models.models_issuance import IssuanceMaintenanceAction
-
-    # 1. Issuance LGs awaiting bank reply
-    lgs = db.query(IssuedLGRecord).filter(
-        IssuedLGRecord.customer_id == current_user.customer_id,
-        IssuedLGRecord.delivery_date.isnot(None),
-        IssuedLGRecord.bank_reply_date.is_(None),
-        IssuedLGRecord.status.in_(["INTERNAL_PROCESSING", "DELIVERED_TO_BANK"]),
-    ).order_by(IssuedLGRecord.delivery_date.desc()).all()
-
-    # 2. Maintenance actions awaiting bank reply
-    maint = db.query(IssuanceMaintenanceAction).join(
-        IssuedLGRecord, IssuedLGRecord.id == IssuanceMaintenanceAction.issued_lg_id
-    ).filter(
-        IssuedLGRecord.customer_id == current_user.customer_id,
-        IssuanceMaintenanceAction.is_deleted == False,
-        IssuanceMaintenanceAction.delivery_date.isnot(None),
-        IssuanceMaintenanceAction.bank_reply_date.is_(None),
-        IssuanceMaintenanceAction.status.in_(["APPROVED", "EXECUTED"]),
-    ).order_by(IssuanceMaintenanceAction.delivery_date.desc()).all()
-
-    results = []
-    for lg in lgs:
-        days_waiting = (date.today() - lg.delivery_date).days if lg.delivery_date else 0
-        results.append({
-            "id": lg.id,
-            "source": "issuance",
-            "lg_number": lg.bank_lg_number or lg.lg_ref_number,
-            "beneficiary": lg.beneficiary_name,
-            "delivery_date": lg.delivery_date.isoformat() if lg.delivery_date else None,
-            "days_waiting": days_waiting,
-            "action_type": "NEW_ISSUANCE",
-        })
-    for a in maint:
-        days_waiting = (date.today() - a.delivery_date.date()).days if a.delivery_date else 0
-        results.append({
-            "id": a.id,
-            "source": "maintenance",
-            "lg_number": (a.issued_lg.bank_lg_number or a.issued_lg.lg_ref_number) if a.issued_lg else None,
-            "beneficiary": a.issued_lg.beneficiary_name if a.issued_lg else None,
-            "delivery_date": a.delivery_date.isoformat() if a.delivery_date else None,
-            "days_waiting": days_waiting,
-            "action_type": a.action_type,
-            "serial_number": a.letter_serial_number,
-        })
-    return results
-
-
+    items = _page(db, current_user.customer_id, AWAITING_REPLY, response, limit, cursor)
+    return [_serialize_awaiting_reply(item) for item in items]
@@ -81,6 +81,11 @@ def export_issued_lgs(
                    (r.lg_ref_number and s in r.lg_ref_number.lower()) or
                    (r.beneficiary_name and s in r.beneficiary_name.lower())]
 
+    history_by_lg = {}
+    if export_type == "full_audit":
+        from app.services.lg_history_service import lg_history_service
+        history_by_lg = lg_history_service.entries_by_lg(db, [r.id for r in records])
+
     wb = openpyxl.Workbook()
     ws = wb.active
     ws.title = "Issued LGs"
@@ -233,7 +238,7 @@ def export_issued_lgs(
             ]
         else:  # full_audit
             import json
-            history = json.dumps(r.action_history or r.custody_transfer_log or [], default=str)
+            history = json.dumps(history_by_lg.get(r.id) or r.custody_transfer_log or [], default=str)
             row_data = [
                 internal_serial, r.lg_ref_number, display_status,
                 float(r.current_amount), currency_code,
@@ -284,7 +289,9 @@ def get_dashboard_stats(
     expiring LGs, facility utilization, and recent activity.
     """
     from datetime import datetime, timedelta, date, timezone
-    from sqlalchemy import func as sqla_func
+    from sqlalchemy import func as sqla_func, case
+    from sqlalchemy.orm import selectinload, joinedload
+    from app.services.dashboard_summary_service import dashboard_summary_service
 
     cust_id = current_user.customer_id
     today = date.today()
@@ -298,14 +305,15 @@ def get_dashboard_stats(
     ).scalar() or 0
 
     # --- Pending Approvals (for this user) ---
-    pending_approvals_q = db.query(IssuanceRequest).filter(
+    # pending_approver_users holds ids as ints or strings depending on the writer
+    pending_approvals = db.query(sqla_func.count(IssuanceRequest.id)).filter(
         IssuanceRequest.customer_id == cust_id,
         IssuanceRequest.status == "PENDING_APPROVAL",
-    ).all()
-    pending_approvals = sum(
-        1 for r in pending_approvals_q
-        if r.pending_approver_users and str(current_user.user_id) in [str(u) for u in (r.pending_approver_users or [])]
-    )
+        or_(
+            IssuanceRequest.pending_approver_users.contains([current_user.user_id]),
+            IssuanceRequest.pending_approver_users.contains([str(current_user.user_id)]),
+        ),
+    ).scalar() or 0
 
     # --- Pending Bank Replies ---
     pending_bank = db.query(sqla_func.count(IssuedLGRecord.id)).filter(
@@ -314,48 +322,38 @@ def get_dashboard_stats(
     ).scalar() or 0
 
     # --- SLA Breaches (requests pending > sla_agreement_days on their facility) ---
-    sla_breaches = 0
-    pending_reqs = db.query(IssuanceRequest).filter(
+    # Older than 8 full days == more than 7 whole days of age (default SLA threshold)
+    sla_cutoff = datetime.now(timezone.utc) - timedelta(days=8)
+    sla_breaches = db.query(sqla_func.count(IssuanceRequest.id)).filter(
         IssuanceRequest.customer_id == cust_id,
-        IssuanceRequest.status.in_(["PENDING_APPROVAL", "SUBMITTED", "APPROVED_INTERNAL", "FACILITY_RESERVED"])
-    ).all()
-    for req in pending_reqs:
-        if req.created_at:
-            age_days = (datetime.now(timezone.utc) - req.created_at).days
-            if age_days > 7:  # Default SLA threshold
-                sla_breaches += 1
-
-    # --- Expiring LGs ---
-    expiring_7d = db.query(sqla_func.count(IssuedLGRecord.id)).filter(
-        IssuedLGRecord.customer_id == cust_id,
-        IssuedLGRecord.status == "ACTIVE",
-        IssuedLGRecord.expiry_date != None,
-        IssuedLGRecord.expiry_date <= d7,
-        IssuedLGRecord.expiry_date >= today,
+        IssuanceRequest.status.in_(["PENDING_APPROVAL", "SUBMITTED", "APPROVED_INTERNAL", "FACILITY_RESERVED"]),
+        IssuanceRequest.created_at <= sla_cutoff,
     ).scalar() or 0
 
-    expiring_30d = db.query(sqla_func.count(IssuedLGRecord.id)).filter(
+    # --- Expiring LGs (both windows in one pass) ---
+    expiring_7d, expiring_30d = db.query(
+        sqla_func.coalesce(sqla_func.sum(case((IssuedLGRecord.expiry_date <= d7, 1), else_=0)), 0),
+        sqla_func.count(IssuedLGRecord.id),
+    ).filter(
         IssuedLGRecord.customer_id == cust_id,
         IssuedLGRecord.status == "ACTIVE",
         IssuedLGRecord.expiry_date != None,
         IssuedLGRecord.expiry_date <= d30,
         IssuedLGRecord.expiry_date >= today,
-    ).scalar() or 0
+    ).one()
 
-    # --- Active LGs totals ---
-    active_stats = db.query(
-        sqla_func.count(IssuedLGRecord.id),
-        sqla_func.coalesce(sqla_func.sum(IssuedLGRecord.current_amount), 0)
-    ).filter(
-        IssuedLGRecord.customer_id == cust_id,
-        IssuedLGRecord.status == "ACTIVE",
-    ).first()
-
-    total_active_lgs = active_stats[0] or 0
-    total_active_amount = float(active_stats[1] or 0)
+    # --- Active LGs totals and facility usage (per-customer summary row) ---
+    summary = dashboard_summary_service.get(db, cust_id)
+    total_active_lgs = summary.issued_active_count or 0
+    total_active_amount = float(summary.issued_active_amount or 0)
+    sub_limit_usage = summary.sub_limit_utilization or {}
 
     # --- Facility Utilization per Bank ---
-    facilities = db.query(IssuanceFacility).filter(
+    facilities = db.query(IssuanceFacility).options(
+        selectinload(IssuanceFacility.sub_limits),
+        joinedload(IssuanceFacility.bank),
+        joinedload(IssuanceFacility.currency),
+    ).filter(
         IssuanceFacility.customer_id == cust_id,
         IssuanceFacility.status == "ACTIVE",
         IssuanceFacility.is_deleted == False,
@@ -367,18 +365,11 @@ def get_dashboard_stats(
         if total_limit <= 0:
             continue
         # Sum utilized amount from active LGs under this facility's sub-limits
-        sub_limit_ids = [sl.id for sl in (fac.sub_limits or [])]
         utilized = 0
-        if sub_limit_ids:
-            utilized = float(db.query(
-                sqla_func.coalesce(sqla_func.sum(IssuedLGRecord.current_amount), 0)
-            ).filter(
-                IssuedLGRecord.facility_sub_limit_id.in_(sub_limit_ids),
-                IssuedLGRecord.status.in_(["ACTIVE", "INTERNAL_PROCESSING"]),
-            ).scalar() or 0)
+        for sl in (fac.sub_limits or []):
+            utilized += sub_limit_usage.get(str(sl.id), 0)
             # Add initial utilization from sub-limits
-            for sl in fac.sub_limits:
-                utilized += float(sl.initial_utilization or 0)
+            utilized += float(sl.initial_utilization or 0)
 
         used_pct = round((utilized / total_limit) * 100, 1) if total_limit > 0 else 0
         bank_name = fac.bank.name if fac.bank else f"Bank #{fac.bank_id}"
@@ -394,7 +385,10 @@ def get_dashboard_stats(
         })
 
     # --- Expiring LGs list (for table) ---
-    expiring_lgs_list = db.query(IssuedLGRecord).filter(
+    expiring_lgs_list = db.query(IssuedLGRecord).options(
+        joinedload(IssuedLGRecord.currency),
+        joinedload(IssuedLGRecord.bank),
+    ).filter(
         IssuedLGRecord.customer_id == cust_id,
         IssuedLGRecord.status == "ACTIVE",
         IssuedLGRecord.expiry_date != None,
@@ -421,7 +415,9 @@ def get_dashboard_stats(
         IssuedLGRecord.customer_id == cust_id,
     ).order_by(IssuedLGRecord.created_at.desc()).limit(5).all()
 
-    recent_actions = db.query(IssuanceMaintenanceAction).join(
+    recent_actions = db.query(IssuanceMaintenanceAction).options(
+        joinedload(IssuanceMaintenanceAction.issued_lg),
+    ).join(
         IssuedLGRecord, IssuedLGRecord.id == IssuanceMaintenanceAction.issued_lg_id
     ).filter(
         IssuedLGRecord.customer_id == cust_id,
@@ -11,12 +11,12 @@ import logging
 logger = logging.getLogger(__name__)
 
 from app.database import get_db
+from app.core.master_data_cache import master_data_cache
 from app.core.security import get_current_corporate_admin_context, get_current_approver_context, get_current_treasury_context, get_issuance_read_context, check_subscription_status, TokenData
 from app.core.document_generator import generate_pdf_from_html
 from app.core.encryption import encrypt_data 
 
 # Models
-from app.models.models import Bank, Currency 
 from app.models.models_issuance import IssuedLGRecord, IssuanceRequest, IssuanceFacilitySubLimit, IssuanceFacility, IssuanceWorkflowPolicy, CustomerFormConfiguration, IssuanceRequestSnapshot, IssuanceRequestVersion, AdminChangeRequest, BankFormIssueReport
 # NOTE: Ensure you created app/models/models_reconciliation.py first!
 from app.models.models_reconciliation import BankPositionBatch, BankPositionRow 
@@ -54,14 +54,14 @@ from .base import _read_bank_form_pdf_bytes, _send_edit_notifications, _detect_c
 # ==============================================================================
 
 @router.get("/banks", response_model=List[BankOut])
-def get_issuance_banks(db: Session = Depends(get_db)):
+def get_issuance_banks(request: Request, db: Session = Depends(get_db)):
     """Fetch all banks for dropdowns."""
-    return db.query(Bank).all()
+    return master_data_cache.list_response(request, db, "banks", BankOut, include_deleted=True)
 
 @router.get("/currencies", response_model=List[CurrencyOut])
-def get_issuance_currencies(db: Session = Depends(get_db)):
+def get_issuance_currencies(request: Request, db: Session = Depends(get_db)):
     """Fetch all currencies for dropdowns."""
-    return db.query(Currency).all()
+    return master_data_cache.list_response(request, db, "currencies", CurrencyOut, include_deleted=True)
 
 # ==============================================================================
 # BANK ISSUANCE METHODS (LIBRARY)
@@ -115,8 +115,8 @@ def list_lg_types(
     current_user: TokenData = Depends(check_subscription_status),
 ):
     """Return all active LG types for dropdowns."""
-    from app.models import LgType
-    types = db.query(LgType).filter(LgType.is_deleted == False).order_by(LgType.name).all()
+    from app.crud.crud import crud_lg_type
+    types = sorted(crud_lg_type.get_all_rows(db), key=lambda t: t.name)
     return [{"id": t.id, "name": t.name} for t in types]
 
 # ==============================================================================
@@ -151,9 +151,6 @@ async def fill_bank_form(
     if not form_template.field_mapping:
         raise HTTPException(400, "Form has no field mapping. Run AI analysis first.")
     
-    # Read blank form (GCS or local)
-    template_pdf_bytes = _read_bank_form_pdf_bytes(form_template)
-    
     # Load the request with relationships
     request = db.query(IssuanceRequest).options(
         selectinload(IssuanceRequest.currency),
@@ -173,7 +170,9 @@ async def fill_bank_form(
     from app.core.pdf_form_filler import fill_pdf_form, build_request_data_dict
     request_data = build_request_data_dict(request, db, bank_id=form_template.bank_id)
     
-    # Fill the form
+    # Fill the form (blank template read once and cached, GCS or local)
+    from app.core.bank_form_cache import bank_form_store
+    template_pdf_bytes = bank_form_store.get(form_template).pdf_bytes
     filled_pdf = fill_pdf_form(
         template_pdf_bytes=template_pdf_bytes,
         field_mapping=form_template.field_mapping,
@@ -188,6 +187,76 @@ async def fill_bank_form(
         headers={'Content-Disposition': f'inline; filename="{filename}"'}
     )
 
+
+class BankFormBatchFillRequest(BaseModel):
+    request_ids: List[int]
+
+
+@router.post("/bank-forms/{form_id}/fill-batch")
+def fill_bank_form_batch(
+    form_id: int,
+    payload: BankFormBatchFillRequest,
+    db: Session = Depends(get_db),
+    current_user: TokenData = Depends(get_issuance_read_context),
+):
+    """
+    Fill one bank form for many issuance requests at once.
+    The template is fetched and parsed once (see app/core/bank_form_cache.py);
+    returns a ZIP with one filled PDF per request. Synchronous: the query,
+    request data and filling all run in the threadpool, off the event loop.
+    """
+    from sqlalchemy.orm import selectinload
+    from app.core.bank_form_cache import bank_form_store
+    from app.core.pdf_form_filler import build_request_data_dict
+    import zipfile
+
+    request_ids = list(dict.fromkeys(payload.request_ids))
+    if not request_ids:
+        raise HTTPException(400, "No request ids given.")
+    if len(request_ids) > 200:
+        raise HTTPException(400, "At most 200 requests can be filled in one batch.")
+
+    form_template = db.query(BankFormTemplate).filter(
+        BankFormTemplate.id == form_id,
+        BankFormTemplate.is_deleted == False,
+    ).first()
+    if not form_template:
+        raise HTTPException(404, "Bank form template not found.")
+    if not form_template.field_mapping:
+        raise HTTPException(400, "Form has no field mapping. Run AI analysis first.")
+
+    requests = db.query(IssuanceRequest).options(
+        selectinload(IssuanceRequest.currency),
+        selectinload(IssuanceRequest.lg_type),
+        selectinload(IssuanceRequest.issuing_entity),
+        selectinload(IssuanceRequest.customer),
+        selectinload(IssuanceRequest.project),
+    ).filter(
+        IssuanceRequest.id.in_(request_ids),
+        IssuanceRequest.customer_id == current_user.customer_id,
+    ).all()
+    by_id = {r.id: r for r in requests}
+    missing = [rid for rid in request_ids if rid not in by_id]
+    if missing:
+        raise HTTPException(404, f"Issuance request(s) not found: {missing}")
+
+    ordered = [by_id[rid] for rid in request_ids]
+    request_data_list = [build_request_data_dict(r, db, bank_id=form_template.bank_id) for r in ordered]
+    filled_pdfs = bank_form_store.fill_batch(form_template, request_data_list)
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for request, filled_pdf in zip(ordered, filled_pdfs):
+            zf.writestr(f"Filled_{form_template.name}_{request.serial_number}.pdf", filled_pdf)
+    buffer.seek(0)
+
+    filename = f"Filled_{form_template.name}_batch.zip".encode('ascii', 'replace').decode('ascii')
+    return StreamingResponse(
+        buffer,
+        media_type="application/zip",
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
 # ==============================================================================
 # CUSTOMER BANK ACCOUNTS
 # ==============================================================================
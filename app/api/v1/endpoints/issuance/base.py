@@ -36,6 +36,7 @@ from app.schemas.schemas_issuance import (
     BankFormIssueReportCreate, BankFormIssueReportOut, BankFormIssueReportUpdate
 )
 from app.services.issuance_service import issuance_service
+from app.services.workflow_policy_engine import workflow_policy_engine
 
 # CRUD
 from app.crud.crud_issuance import crud_issuance_request
@@ -45,31 +46,9 @@ from fastapi.responses import StreamingResponse
 
 router = APIRouter()
 def _read_bank_form_pdf_bytes(form_template) -> bytes:
-    """Read bank form template PDF bytes from GCS or local disk."""
-    import os
-    if not form_template.file_path:
-        raise HTTPException(400, "No PDF file associated with this form.")
-
-    if form_template.file_path.startswith("gs://"):
-        try:
-            from app.core.ai_integration import _get_gcs_client
-            path_parts = form_template.file_path[5:].split('/', 1)
-            bucket_name, blob_name = path_parts[0], path_parts[1]
-            client = _get_gcs_client()
-            if not client:
-                raise HTTPException(500, "GCS client not available.")
-            bucket = client.bucket(bucket_name)
-            blob = bucket.blob(blob_name)
-            return blob.download_as_bytes()
-        except HTTPException:
-            raise
-        except Exception as e:
-            raise HTTPException(500, f"Failed to download PDF from cloud storage: {e}")
-    elif os.path.exists(form_template.file_path):
-        with open(form_template.file_path, "rb") as f:
-            return f.read()
-    else:
-        raise HTTPException(404, "PDF file not found.")
+    """Read bank form template PDF bytes through the versioned template cache (GCS or local disk)."""
+    from app.core.bank_form_cache import bank_form_store
+    return bank_form_store.get(form_template).pdf_bytes
 
 def _send_edit_notifications(db, request, editor: TokenData, metadata: dict):
     """
@@ -1219,6 +1198,7 @@ def _apply_admin_change(db: Session, change_req: AdminChangeRequest):
         db.query(IssuanceWorkflowPolicy).filter(
             IssuanceWorkflowPolicy.customer_id == change_req.customer_id
         ).delete()
+        workflow_policy_engine.mark_policies_changed(db, change_req.customer_id)
         amount_types = {"AMOUNT_OVER", "AMOUNT_RANGE"}
         has_dept_match = False
         for idx, p in enumerate(payload.get("new_value", [])):
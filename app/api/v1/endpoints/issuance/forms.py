@@ -399,39 +399,8 @@ def preview_bank_form(
         "notes": "Preview mode — all fields populated for testing",
     }
     
-    pdf_bytes = _read_bank_form_pdf_bytes(form_template)
-    
-    # Choose fill mode
-    effective_form_type = form_template.form_type or "FILLABLE_PDF"
-    
-    # Auto-detect: if FILLABLE_PDF but no interactive fields, switch to SCANNED_FILL
-    if effective_form_type == "FILLABLE_PDF":
-        from app.core.pdf_form_filler import get_pdf_form_fields
-        pdf_fields_check = get_pdf_form_fields(pdf_bytes)
-        if len(pdf_fields_check) == 0:
-            effective_form_type = "SCANNED_FILL"
-    
-    if effective_form_type == "PHYSICAL_OVERLAY":
-        from app.core.pdf_form_filler import generate_overlay_pdf
-        filled_pdf = generate_overlay_pdf(
-            template_pdf_bytes=pdf_bytes,
-            field_mapping=form_template.field_mapping,
-            request_data=dummy_data,
-        )
-    elif effective_form_type == "SCANNED_FILL":
-        from app.core.pdf_form_filler import generate_scanned_fill_pdf
-        filled_pdf = generate_scanned_fill_pdf(
-            template_pdf_bytes=pdf_bytes,
-            field_mapping=form_template.field_mapping,
-            request_data=dummy_data,
-        )
-    else:
-        from app.core.pdf_form_filler import fill_pdf_form
-        filled_pdf = fill_pdf_form(
-            template_pdf_bytes=pdf_bytes,
-            field_mapping=form_template.field_mapping,
-            request_data=dummy_data,
-        )
+    from app.core.bank_form_cache import bank_form_store
+    filled_pdf = bank_form_store.fill(form_template, dummy_data)
     
     filename = f"PREVIEW_{form_template.name or 'form'}.pdf"
     # Sanitize filename for HTTP headers (latin-1 only)
@@ -454,9 +423,9 @@ def enhance_bank_form_endpoint(
     current_user: TokenData = Depends(check_subscription_status),
 ):
     """Visual feedback loop: generates preview, sends to Gemini for visual correction, applies fixes."""
+    from app.core.ai_gateway import ai_gateway
     from app.core.ai_integration import enhance_bank_form_mapping
     from app.constants import UserRole
-    import asyncio
     
     if current_user.role not in [UserRole.SYSTEM_OWNER, UserRole.CORPORATE_ADMIN]:
         raise HTTPException(403, "Not enough privileges.")
@@ -518,13 +487,11 @@ def enhance_bank_form_endpoint(
     
     # Run enhance
     try:
-        loop = asyncio.new_event_loop()
-        enhanced = loop.run_until_complete(enhance_bank_form_mapping(
+        enhanced = ai_gateway.run_sync(enhance_bank_form_mapping(
             template_pdf_bytes=pdf_bytes, filled_pdf_bytes=filled_pdf,
             current_mapping=form_template.field_mapping,
             form_type=effective_type, filename=form_template.name or "form.pdf",
         ))
-        loop.close()
     except Exception as e:
         logger.error(f"Enhancement failed: {e}", exc_info=True)
         raise HTTPException(500, f"Enhancement failed: {str(e)}")
@@ -786,10 +753,10 @@ def get_form_dictionary(
     ).all()
 
     # LG Types
-    lg_types = crud_lg_type.get_all(db, limit=1000)
+    lg_types = crud_lg_type.get_all_rows(db)
 
     # Currencies
-    currencies = crud_currency.get_all(db, limit=1000)
+    currencies = crud_currency.get_all_rows(db)
 
     return {
         "entities": [{"id": e.id, "name": e.entity_name, "code": e.code} for e in entities],
@@ -1080,7 +1047,7 @@ async def auto_fill_bank_form(
                         )
     
     # Build data dict (auto-fills from system data + bank account)
-    from app.core.pdf_form_filler import fill_pdf_form, build_request_data_dict
+    from app.core.pdf_form_filler import build_request_data_dict
     request_data = build_request_data_dict(request, db, bank_id=bank_id)
     _logger.info(f"Auto-fill: form_type={form_template.form_type}, field_mapping has {len(field_mapping)} entries, request_data has {len(request_data)} keys")
     _logger.info(f"Auto-fill: non-empty request_data keys: {[k for k,v in request_data.items() if v]}")
@@ -1197,43 +1164,10 @@ async def auto_fill_bank_form(
                 if sv:
                     request_data[pdf_field] = sv
             
-            template_pdf_bytes = _read_bank_form_pdf_bytes(form_template)
-            
-            # Auto-detect: if FILLABLE_PDF but no interactive fields, switch to SCANNED_FILL
-            effective_form_type = form_template.form_type or "FILLABLE_PDF"
-            if effective_form_type == "FILLABLE_PDF":
-                from app.core.pdf_form_filler import get_pdf_form_fields
-                pdf_fields = get_pdf_form_fields(template_pdf_bytes)
-                if len(pdf_fields) == 0:
-                    _logger.warning(f"Form '{form_template.name}' (id={form_template.id}) has no interactive PDF fields — auto-switching to SCANNED_FILL mode")
-                    effective_form_type = "SCANNED_FILL"
-            
-            if effective_form_type == "PHYSICAL_OVERLAY":
-                from app.core.pdf_form_filler import generate_overlay_pdf
-                fill_lang = req_lang if getattr(form_template, 'form_language', 'BILINGUAL') == 'BILINGUAL' else None
-                filled_pdf = generate_overlay_pdf(
-                    template_pdf_bytes=template_pdf_bytes,
-                    field_mapping=form_template.field_mapping,
-                    request_data=request_data,
-                    lg_language=fill_lang,
-                )
-            elif effective_form_type == "SCANNED_FILL":
-                from app.core.pdf_form_filler import generate_scanned_fill_pdf
-                fill_lang = req_lang if getattr(form_template, 'form_language', 'BILINGUAL') == 'BILINGUAL' else None
-                filled_pdf = generate_scanned_fill_pdf(
-                    template_pdf_bytes=template_pdf_bytes,
-                    field_mapping=form_template.field_mapping,
-                    request_data=request_data,
-                    lg_language=fill_lang,
-                )
-            else:
-                fill_lang = req_lang if getattr(form_template, 'form_language', 'BILINGUAL') == 'BILINGUAL' else None
-                filled_pdf = fill_pdf_form(
-                    template_pdf_bytes=template_pdf_bytes,
-                    field_mapping=form_template.field_mapping,
-                    request_data=request_data,
-                    lg_language=fill_lang,
-                )
+            # Cached template: bytes, field catalogue (FILLABLE_PDF → SCANNED_FILL auto-detect) and page geometry
+            from app.core.bank_form_cache import bank_form_store
+            fill_lang = req_lang if getattr(form_template, 'form_language', 'BILINGUAL') == 'BILINGUAL' else None
+            filled_pdf = bank_form_store.fill(form_template, request_data, lg_language=fill_lang)
             
             filename = f"Filled_{form_template.name}_{request.serial_number}.pdf"
             return StreamingResponse(
@@ -1302,43 +1236,9 @@ async def auto_fill_bank_form(
     db.commit()
 
     # Generate filled PDF
-    template_pdf_bytes = _read_bank_form_pdf_bytes(form_template)
-    
-    # Auto-detect: if FILLABLE_PDF but no interactive fields, switch to SCANNED_FILL
-    effective_form_type = form_template.form_type or "FILLABLE_PDF"
-    if effective_form_type == "FILLABLE_PDF":
-        from app.core.pdf_form_filler import get_pdf_form_fields
-        pdf_fields_check = get_pdf_form_fields(template_pdf_bytes)
-        if len(pdf_fields_check) == 0:
-            _logger.warning(f"Phase 2: Form '{form_template.name}' has no interactive PDF fields — auto-switching to SCANNED_FILL")
-            effective_form_type = "SCANNED_FILL"
-    
-    if effective_form_type == "PHYSICAL_OVERLAY":
-        from app.core.pdf_form_filler import generate_overlay_pdf
-        fill_lang = req_lang if getattr(form_template, 'form_language', 'BILINGUAL') == 'BILINGUAL' else None
-        filled_pdf = generate_overlay_pdf(
-            template_pdf_bytes=template_pdf_bytes,
-            field_mapping=form_template.field_mapping,
-            request_data=request_data,
-            lg_language=fill_lang,
-        )
-    elif effective_form_type == "SCANNED_FILL":
-        from app.core.pdf_form_filler import generate_scanned_fill_pdf
-        fill_lang = req_lang if getattr(form_template, 'form_language', 'BILINGUAL') == 'BILINGUAL' else None
-        filled_pdf = generate_scanned_fill_pdf(
-            template_pdf_bytes=template_pdf_bytes,
-            field_mapping=form_template.field_mapping,
-            request_data=request_data,
-            lg_language=fill_lang,
-        )
-    else:
-        fill_lang = req_lang if getattr(form_template, 'form_language', 'BILINGUAL') == 'BILINGUAL' else None
-        filled_pdf = fill_pdf_form(
-            template_pdf_bytes=template_pdf_bytes,
-            field_mapping=form_template.field_mapping,
-            request_data=request_data,
-            lg_language=fill_lang,
-        )
+    from app.core.bank_form_cache import bank_form_store
+    fill_lang = req_lang if getattr(form_template, 'form_language', 'BILINGUAL') == 'BILINGUAL' else None
+    filled_pdf = bank_form_store.fill(form_template, request_data, lg_language=fill_lang)
     
     filename = f"Filled_{form_template.name}_{request.serial_number}.pdf"
     
@@ -33,6 +33,7 @@ from app.models.models_issuance import (
     IssuanceMaintenanceAction, IssuanceExposureEntry,
 )
 from app.models import Bank, Currency, LgType
+from app.services.lg_history_service import lg_history_service
 from app.schemas.migration_schemas import (
     MigrationRecordStatusEnum, MigrationTypeEnum,
     LGMigrationStagingIn, LGMigrationStagingOut,
@@ -870,7 +871,7 @@ async def upload_scan_for_ai_extraction(
                 f.write(content)
 
             # Call AI extraction
-            extracted_data = await _extract_data_from_scan(content, fname)
+            extracted_data = await _extract_data_from_scan(content, fname, current_user.customer_id)
 
             if not extracted_data:
                 results["errors"].append({"file": fname, "error": "AI extraction returned no data"})
@@ -933,10 +934,10 @@ async def upload_scan_for_ai_extraction(
     }
 
 
-async def _extract_data_from_scan(content: bytes, filename: str) -> Optional[Any]:
+async def _extract_data_from_scan(content: bytes, filename: str, customer_id: Optional[int] = None) -> Optional[Any]:
     """Extract structured data from a scanned document using AI."""
     try:
-        from app.core.ai_integration import gemini_service
+        from app.core.ai_gateway import ai_gateway, AIPart
 
         extraction_prompt = """You are a data extraction specialist. Extract LG (Letter of Guarantee) information from this document.
 
@@ -992,10 +993,6 @@ OTHER:
 If a field is not found in the document, set it to null.
 Return ONLY the JSON, no markdown formatting or explanation."""
 
-        # Use the existing Gemini service to process the document
-        import base64
-        encoded = base64.b64encode(content).decode("utf-8")
-
         # Determine MIME type
         ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
         mime_types = {
@@ -1008,11 +1005,15 @@ Return ONLY the JSON, no markdown formatting or explanation."""
         }
         mime_type = mime_types.get(ext, "application/octet-stream")
 
-        result = await gemini_service.generate_with_image(
-            prompt=extraction_prompt,
-            image_data=encoded,
-            mime_type=mime_type,
+        if not ai_gateway.available():
+            logger.warning("Gemini service not available. Scan extraction requires AI integration.")
+            return None
+
+        response = await ai_gateway.generate(
+            [extraction_prompt, AIPart(content, mime_type)],
+            call_type="migration_scan_extraction", customer_id=customer_id,
         )
+        result = response.text
 
         if result:
             # Parse the JSON response
@@ -1026,9 +1027,6 @@ Return ONLY the JSON, no markdown formatting or explanation."""
 
             return json.loads(text)
 
-    except ImportError:
-        logger.warning("Gemini service not available. Scan extraction requires AI integration.")
-        return None
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse AI extraction result: {e}")
         return None
@@ -1424,15 +1422,6 @@ async def import_ready_issuance_records(
                 ).scalar() or 0
                 lg_ref = f"MIG-{current_user.customer_id}-{seq + 1:04d}"
 
-                # Build action history
-                action_history = [{
-                    "action_type": "MIGRATION",
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "source_file": data.get("_source_file"),
-                    "source_type": data.get("_source_type", "UNKNOWN"),
-                    "migrated_by": current_user.email,
-                }]
-
                 # Create the IssuedLGRecord
                 new_lg = IssuedLGRecord(
                     customer_id=current_user.customer_id,
@@ -1455,12 +1444,20 @@ async def import_ready_issuance_records(
                     beneficiary_address=data.get("beneficiary_address"),
                     beneficiary_country=data.get("beneficiary_country"),
                     notes=data.get("notes"),
-                    action_history=action_history,
                     soft_copy_path=data.get("_scan_file_path"),
                 )
                 db.add(new_lg)
                 db.flush()
 
+                lg_history_service.record(
+                    db, new_lg.id, "MIGRATION",
+                    extra={
+                        "source_file": data.get("_source_file"),
+                        "source_type": data.get("_source_type", "UNKNOWN"),
+                        "migrated_by": current_user.email,
+                    },
+                )
+
                 # Handle historical reconstruction (if multiple snapshots for same LG)
                 if len(sorted_group) > 1:
                     for i in range(1, len(sorted_group)):
@@ -1510,13 +1507,12 @@ async def import_ready_issuance_records(
                             db.add(maintenance)
 
                             # Append to action history
-                            new_lg.action_history.append({
-                                "action_type": action_type,
-                                "timestamp": curr_data.get("_history_timestamp") or curr_data.get("issue_date") or datetime.utcnow().isoformat(),
-                                "diff": diff,
-                                "source_file": curr_data.get("_source_file"),
-                            })
-                            flag_modified(new_lg, "action_history")
+                            lg_history_service.record(
+                                db, new_lg.id, action_type,
+                                changes={field: [v["old"], v["new"]] for field, v in diff.items()},
+                                extra={"source_file": curr_data.get("_source_file")},
+                                occurred_at=curr_data.get("_history_timestamp") or curr_data.get("issue_date"),
+                            )
 
                     db.add(new_lg)
                     db.flush()
@@ -1,6 +1,6 @@
 from typing import List, Any, Optional, Dict
 from pydantic import BaseModel
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Body, Request, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Body, Request, Response, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from sqlalchemy import func, or_
 from datetime import date
@@ -36,6 +36,7 @@ from app.schemas.schemas_issuance import (
     BankFormIssueReportCreate, BankFormIssueReportOut, BankFormIssueReportUpdate
 )
 from app.services.issuance_service import issuance_service
+from app.services.lg_history_service import lg_history_service
 
 # CRUD
 from app.crud.crud_issuance import crud_issuance_request
@@ -99,13 +100,18 @@ def list_issued_lgs(
     db: Session = Depends(get_db),
     current_user: TokenData = Depends(get_issuance_read_context),
 ):
-    """List all Issued LG records for the customer, with comprehensive details."""
+    """
+    List all Issued LG records for the customer, with comprehensive details.
+    Each record carries its history entry count and newest entry only; the
+    full history is paged by /issued-lgs/{id}/history.
+    """
     from app.models.models_issuance import IssuedLGRecord, IssuanceRequest
     from app.models import Bank, Currency, User
 
     records = db.query(IssuedLGRecord).filter(
         IssuedLGRecord.customer_id == current_user.customer_id
     ).order_by(IssuedLGRecord.created_at.desc()).all()
+    history_by_lg = lg_history_service.summaries_by_lg(db, [r.id for r in records])
 
     result = []
     for r in records:
@@ -230,7 +236,8 @@ def list_issued_lgs(
             "soft_copy_path": r.soft_copy_path,
             "custody_holder": r.custody_holder,
             "custody_transfer_log": r.custody_transfer_log or [],
-            "action_history": r.action_history or [],
+            "action_history_count": history_by_lg.get(r.id, (0, None))[0],
+            "last_action": history_by_lg.get(r.id, (0, None))[1],
             # Accountability
             "issued_by_user_id": r.issued_by_user_id,
             "issued_by_name": issued_by_name,
@@ -1239,6 +1246,32 @@ def get_issuance_lifecycle_history(
     ]
 
 
+@router.get("/issued-lgs/{lg_id}/history")
+def get_issued_lg_history(
+    lg_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: TokenData = Depends(get_issuance_read_context),
+    limit: int = Query(50, ge=1, le=200),
+    before_id: Optional[int] = Query(None, description="Return entries older than this id (X-Next-Before-Id of the previous page)"),
+):
+    """
+    Action history of an Issued LG, newest first, one keyset page at a time.
+    Each entry holds only the fields it changed ({field: [before, after]}).
+    """
+    lg_exists = db.query(IssuedLGRecord.id).filter(
+        IssuedLGRecord.id == lg_id,
+        IssuedLGRecord.customer_id == current_user.customer_id,
+    ).first()
+    if not lg_exists:
+        raise HTTPException(status_code=404, detail="LG record not found.")
+
+    events, next_before_id = lg_history_service.page(db, lg_id, limit=limit, before_id=before_id)
+    if next_before_id is not None:
+        response.headers["X-Next-Before-Id"] = str(next_before_id)
+    return [lg_history_service.serialize(e) for e in events]
+
+
 # ── Available Maintenance Actions ──────────────────────────────────────────────
 @router.get("/issued-lgs/{lg_id}/available-actions")
 def get_available_actions(
@@ -160,6 +160,7 @@ def run_bank_position_reconciliation(
 
 @router.get("/maintenance/{action_id}/document/{doc_type}")
 async def get_maintenance_document_url(
+    request: Request,
     action_id: int,
     doc_type: str,
     db: Session = Depends(get_db),
@@ -167,7 +168,8 @@ async def get_maintenance_document_url(
 ):
     """Generate a signed URL for maintenance action documents.
     doc_type: 'delivery', 'bank_reply', 'bank_initiated', or 'letter'
-    For 'letter': regenerates the instruction letter on-the-fly from template + action data.
+    For 'letter': serves the instruction letter rendered from template + action data,
+    through the letter artifact store (rendered once, strong ETag).
     """
     action = db.query(IssuanceMaintenanceAction).filter(
         IssuanceMaintenanceAction.id == action_id
@@ -175,7 +177,7 @@ async def get_maintenance_document_url(
     if not action:
         raise HTTPException(status_code=404, detail="Action not found")
 
-    # ── LETTER: Regenerate on-the-fly (matches LG custody pattern) ──
+    # ── LETTER: rendered once per template/data version (app/core/letter_artifacts.py) ──
     if doc_type == "letter":
         if not action.instruction_status:
             raise HTTPException(status_code=404, detail="No instruction letter for this action")
@@ -184,26 +186,18 @@ async def get_maintenance_document_url(
         if not lg:
             raise HTTPException(status_code=404, detail="LG record not found")
 
-        # Regenerate HTML from template + action_data
-        html_content = maintenance_service.regenerate_maintenance_letter_html(db, action, lg)
-        if not html_content:
-            raise HTTPException(status_code=404, detail="Could not generate instruction letter — template not found")
+        from app.core.letter_artifacts import pdf_response
+        from app.services.letter_artifact_service import letter_artifact_service
 
-        from app.core.document_generator import generate_pdf_from_html
-        pdf_bytes = await generate_pdf_from_html(
-            html_content,
-            filename_hint=f"maint_{action.letter_serial_number or action.id}"
-        )
-        if not pdf_bytes:
+        try:
+            artifact = await letter_artifact_service.maintenance_letter(db, action, lg)
+        except LookupError:
+            raise HTTPException(status_code=404, detail="Could not generate instruction letter — template not found")
+        if not artifact:
             raise HTTPException(status_code=500, detail="Failed to generate PDF")
 
-        from starlette.responses import Response
         filename = f"Maintenance_{action.action_type}_{action.letter_serial_number or action.id}.pdf"
-        return Response(
-            content=pdf_bytes,
-            media_type="application/pdf",
-            headers={"Content-Disposition": f'inline; filename="{filename}"'}
-        )
+        return pdf_response(request, artifact, filename)
 
     # ── Other doc types: serve from stored paths ──
     gcs_path = None
@@ -1181,6 +1181,9 @@ def request_lg_cancellation(
     })
     lg.custody_transfer_log = ctl
 
+    from app.core.deadline_scheduler import schedule_issuance_cancel_deadline
+    schedule_issuance_cancel_deadline(db, lg)
+
     log_action(db, current_user.user_id, "LG_CANCEL_REQUESTED",
                "IssuedLGRecord", lg.id,
                {"reason": reason, "previous_status": cancel_meta["previous_status"],
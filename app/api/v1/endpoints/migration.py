@@ -4,7 +4,7 @@ import io
 import json
 import pandas as pd
 from typing import Optional, List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, BackgroundTasks
 from sqlalchemy.orm import Session
 import numpy as np
 from sqlalchemy import func, or_, cast
@@ -754,12 +754,16 @@ async def re_validate_multiple_staged_records(
 @router.post("/preview-history", response_model=List[MigrationHistoryPreviewOut], status_code=status.HTTP_200_OK)
 async def preview_historical_reconstruction(
     lg_number: Optional[str] = None,
+    after_lg_number: Optional[str] = Query(None, description="Cursor: the last lg_number of the previous page."),
+    limit: int = Query(200, ge=1, le=1000, description="Maximum number of LG groups per page."),
     current_user: TokenData = Depends(get_current_corporate_admin_context),
     db: Session = Depends(get_db),
 ):
     logger.info(f"Historical preview requested for customer {current_user.customer_id} for LG: {lg_number or 'all eligible'}")
     try:
-        preview_data = await migration_history_service.preview_history(db, current_user.customer_id, lg_number)
+        preview_data = await migration_history_service.preview_history(
+            db, current_user.customer_id, lg_number, after_lg_number=after_lg_number, limit=limit
+        )
         return preview_data
     except Exception as e:
         logger.error(f"Failed to generate history preview: {e}", exc_info=True)
@@ -773,199 +777,198 @@ async def import_historical_records(
 ):
     logger.info(f"Historical import started for customer {current_user.customer_id} by user {current_user.email}.")
     
-    query = db.query(models.LGMigrationStaging).filter(models.LGMigrationStaging.customer_id == current_user.customer_id)
-    if import_in.lg_numbers:
-        query = query.filter(func.lower(models.LGMigrationStaging.source_data_json['lg_number'].astext).in_([ln.lower() for ln in import_in.lg_numbers]))
-    
-    all_snapshots = query.filter(models.LGMigrationStaging.record_status.in_([
+    statuses = [
         MigrationRecordStatusEnum.READY_FOR_IMPORT,
         MigrationRecordStatusEnum.PENDING,
         MigrationRecordStatusEnum.ERROR
-    ])).all()
-    
-    if not all_snapshots:
+    ]
+    if not migration_history_service.get_lg_keys(db, current_user.customer_id, statuses, import_in.lg_numbers, limit=1):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No eligible records found for historical import.")
 
-    lg_groups = {}
-    for snapshot in all_snapshots:
-        lg_num = snapshot.source_data_json.get('lg_number')
-        if lg_num not in lg_groups:
-            lg_groups[lg_num] = []
-        lg_groups[lg_num].append(snapshot)
-        
     batch = models.MigrationBatch(
         user_id=current_user.user_id,
         notes=import_in.batch_note,
-        source_files=[s.file_name for s in all_snapshots]
+        source_files=migration_history_service.get_source_files(db, current_user.customer_id, statuses, import_in.lg_numbers)
     )
     db.add(batch)
     db.flush()
+    batch_id = batch.id
     
     batch_results = {'imported': 0, 'updated': 0, 'failed': 0, 'skipped_exists': 0}
     
-    for lg_num, snapshots in lg_groups.items():
-        with db.begin_nested() as nested_session:
-            try:
-                sorted_snapshots = sorted(snapshots, key=lambda s: migration_history_service._get_snapshot_sort_key(s))
-                first_snapshot = sorted_snapshots[0]
+    # LG groups arrive grouped and timeline-ordered from SQL, a page at a time,
+    # with one production existence probe per page.
+    history_batches = migration_history_service.iter_history_batches(
+        db, current_user.customer_id, statuses, import_in.lg_numbers
+    )
+    for lg_groups, existing_keys in history_batches:
+        for lg_key, snapshots in lg_groups.items():
+            if not snapshots:
+                continue
+            lg_num = (snapshots[0].source_data_json or {}).get('lg_number')
+            with db.begin_nested() as nested_session:
+                try:
+                    sorted_snapshots = snapshots
+                    first_snapshot = sorted_snapshots[0]
                 
-                existing_lg_in_prod = crud_lg_record.get_by_lg_number(db, lg_num)
-                if existing_lg_in_prod:
-                    logger.warning(f"LG number '{lg_num}' already exists in production. Skipping import.")
-                    for snap in snapshots:
-                        snap.record_status = MigrationRecordStatusEnum.ERROR
-                        snap.validation_log = snap.validation_log or {}
-                        snap.validation_log['import_error'] = 'LG already exists in production table. Skipping.'
-                    batch_results['skipped_exists'] += 1
-                    continue
+                    if lg_key in existing_keys:
+                        logger.warning(f"LG number '{lg_num}' already exists in production. Skipping import.")
+                        for snap in snapshots:
+                            snap.record_status = MigrationRecordStatusEnum.ERROR
+                            snap.validation_log = {**(snap.validation_log or {}), 'import_error': 'LG already exists in production table. Skipping.'}
+                        batch_results['skipped_exists'] += 1
+                        continue
                 
-                # --- FIX START: Sanitize and Enrich Data ---
-                first_snapshot_data = first_snapshot.source_data_json.copy()
-                first_snapshot_data.pop('history_sequence', None)
-                first_snapshot_data.pop('history_timestamp', None)
+                    # --- FIX START: Sanitize and Enrich Data ---
+                    first_snapshot_data = first_snapshot.source_data_json.copy()
+                    first_snapshot_data.pop('history_sequence', None)
+                    first_snapshot_data.pop('history_timestamp', None)
                 
-                # 1. Enrich Owner Details (Phone & Manager Email)
-                owner_id = first_snapshot_data.get("internal_owner_contact_id")
-                if owner_id:
-                    owner_obj = None
-                    if isinstance(owner_id, int):
-                        owner_obj = crud_internal_owner_contact.get(db, id=owner_id)
-                    elif isinstance(owner_id, str):
-                        clean_email = owner_id.strip()
-                        if clean_email:
-                            owner = crud_internal_owner_contact.get_by_email_for_customer(db, current_user.customer_id, clean_email)
-                    if owner_obj:
-                        # We inject these ONLY so the Validator is happy.
-                        # The CRUD function will strip them out before saving to DB.
-                        if not first_snapshot_data.get("internal_owner_phone"):
-                            first_snapshot_data["internal_owner_phone"] = owner_obj.phone_number
-                        if not first_snapshot_data.get("manager_email"):
-                            first_snapshot_data["manager_email"] = owner_obj.manager_email
-                        if not first_snapshot_data.get("internal_owner_email"):
-                            first_snapshot_data["internal_owner_email"] = owner_obj.email
-
-                # 2. Sanitize "additional_field_values"
-                add_fields = first_snapshot_data.get("additional_field_values")
-                if isinstance(add_fields, str):
-                    clean_val = add_fields.strip().upper()
-                    if clean_val in ['N/A', '0', '', 'NULL']:
-                        first_snapshot_data["additional_field_values"] = None
-                    else:
-                        try:
-                            first_snapshot_data["additional_field_values"] = json.loads(add_fields)
-                        except Exception:
+                    # 1. Enrich Owner Details (Phone & Manager Email)
+                    owner_id = first_snapshot_data.get("internal_owner_contact_id")
+                    if owner_id:
+                        owner_obj = None
+                        if isinstance(owner_id, int):
+                            owner_obj = crud_internal_owner_contact.get(db, id=owner_id)
+                        elif isinstance(owner_id, str):
+                            clean_email = owner_id.strip()
+                            if clean_email:
+                                owner = crud_internal_owner_contact.get_by_email_for_customer(db, current_user.customer_id, clean_email)
+                        if owner_obj:
+                            # We inject these ONLY so the Validator is happy.
+                            # The CRUD function will strip them out before saving to DB.
+                            if not first_snapshot_data.get("internal_owner_phone"):
+                                first_snapshot_data["internal_owner_phone"] = owner_obj.phone_number
+                            if not first_snapshot_data.get("manager_email"):
+                                first_snapshot_data["manager_email"] = owner_obj.manager_email
+                            if not first_snapshot_data.get("internal_owner_email"):
+                                first_snapshot_data["internal_owner_email"] = owner_obj.email
+
+                    # 2. Sanitize "additional_field_values"
+                    add_fields = first_snapshot_data.get("additional_field_values")
+                    if isinstance(add_fields, str):
+                        clean_val = add_fields.strip().upper()
+                        if clean_val in ['N/A', '0', '', 'NULL']:
                             first_snapshot_data["additional_field_values"] = None
-                # --- FIX END ---
+                        else:
+                            try:
+                                first_snapshot_data["additional_field_values"] = json.loads(add_fields)
+                            except Exception:
+                                first_snapshot_data["additional_field_values"] = None
+                    # --- FIX END ---
                 
-                # 2. Validate Data
-                # PATCH: Populate required owner fields from the resolved object
-                if owner_obj:
-                    first_snapshot_data['internal_owner_contact_id'] = owner_obj.id
-                    first_snapshot_data['internal_owner_email'] = owner_obj.email
-                    first_snapshot_data['internal_owner_phone'] = owner_obj.phone_number
-                    first_snapshot_data['manager_email'] = owner_obj.manager_email
-
-                # PATCH: Resolve Operational Status string (e.g., 'Operative') to ID
-                if isinstance(first_snapshot_data.get('lg_operational_status_id'), str):
-                    status_name = first_snapshot_data['lg_operational_status_id']
-                    status_obj = db.query(models.LgOperationalStatus).filter(func.lower(models.LgOperationalStatus.name) == func.lower(status_name)).first()
-                    if status_obj:
-                        first_snapshot_data['lg_operational_status_id'] = status_obj.id
-                lg_record_create_payload = LGRecordCreate(**first_snapshot_data)
+                    # 2. Validate Data
+                    # PATCH: Populate required owner fields from the resolved object
+                    if owner_obj:
+                        first_snapshot_data['internal_owner_contact_id'] = owner_obj.id
+                        first_snapshot_data['internal_owner_email'] = owner_obj.email
+                        first_snapshot_data['internal_owner_phone'] = owner_obj.phone_number
+                        first_snapshot_data['manager_email'] = owner_obj.manager_email
+
+                    # PATCH: Resolve Operational Status string (e.g., 'Operative') to ID
+                    if isinstance(first_snapshot_data.get('lg_operational_status_id'), str):
+                        status_name = first_snapshot_data['lg_operational_status_id']
+                        status_obj = db.query(models.LgOperationalStatus).filter(func.lower(models.LgOperationalStatus.name) == func.lower(status_name)).first()
+                        if status_obj:
+                            first_snapshot_data['lg_operational_status_id'] = status_obj.id
+                    lg_record_create_payload = LGRecordCreate(**first_snapshot_data)
                 
-                # 3. Create Record (Pass owner_id explicitly!)
-                new_lg = await crud_lg_record.create_from_migration(
-                    db=db,
-                    obj_in=lg_record_create_payload,
-                    customer_id=current_user.customer_id,
-                    user_id=current_user.user_id,
-                    migration_source='LEGACY',
-                    migrated_from_staging_id=first_snapshot.id,
-                    internal_owner_contact_id=owner_id # <--- THIS IS THE KEY
-                )
+                    # 3. Create Record (Pass owner_id explicitly!)
+                    new_lg = await crud_lg_record.create_from_migration(
+                        db=db,
+                        obj_in=lg_record_create_payload,
+                        customer_id=current_user.customer_id,
+                        user_id=current_user.user_id,
+                        migration_source='LEGACY',
+                        migrated_from_staging_id=first_snapshot.id,
+                        internal_owner_contact_id=owner_id # <--- THIS IS THE KEY
+                    )
                 
-                # --- FIX: INSERT FILE UPLOAD LOGIC HERE ---
-                # We extract the URL from the FIRST snapshot's source data
-                if sorted_snapshots:
-                    first_snapshot_for_upload = sorted_snapshots[0]
-                    first_data = first_snapshot_for_upload.source_data_json or {}
-                    attachment_url = first_data.get("attachment_url")
+                    # --- FIX: INSERT FILE UPLOAD LOGIC HERE ---
+                    # We extract the URL from the FIRST snapshot's source data
+                    if sorted_snapshots:
+                        first_snapshot_for_upload = sorted_snapshots[0]
+                        first_data = first_snapshot_for_upload.source_data_json or {}
+                        attachment_url = first_data.get("attachment_url")
                     
-                    if attachment_url:
-                        # Clean the URL
-                        clean_url = str(attachment_url).strip().strip("'").strip('"')
-                        logger.info(f"Uploading initial document for LG {lg_num} from {clean_url}")
+                        if attachment_url:
+                            # Clean the URL
+                            clean_url = str(attachment_url).strip().strip("'").strip('"')
+                            logger.info(f"Uploading initial document for LG {lg_num} from {clean_url}")
                         
-                        try:
-                            from app.constants import DOCUMENT_TYPE_ORIGINAL_LG
+                            try:
+                                from app.constants import DOCUMENT_TYPE_ORIGINAL_LG
                             
-                            # We can reuse the service method since we have the service instance
-                            await migration_service._create_document_from_url(
-                                db=db,
-                                lg_record_id=new_lg.id,
-                                url=clean_url,
-                                document_type=DOCUMENT_TYPE_ORIGINAL_LG,
-                                uploaded_by_user_id=current_user.user_id
-                            )
-                        except Exception as e:
-                            logger.error(f"Failed to upload initial document for {lg_num}: {e}")
-                # ------------------------------------------------------------------
-
-                if len(sorted_snapshots) > 1:
-                    for i in range(1, len(sorted_snapshots)):
-                        prev_snapshot_data = sorted_snapshots[i-1].source_data_json
-                        current_snapshot = sorted_snapshots[i]
-                        current_snapshot_data = current_snapshot.source_data_json
+                                # We can reuse the service method since we have the service instance
+                                await migration_service._create_document_from_url(
+                                    db=db,
+                                    lg_record_id=new_lg.id,
+                                    url=clean_url,
+                                    document_type=DOCUMENT_TYPE_ORIGINAL_LG,
+                                    uploaded_by_user_id=current_user.user_id
+                                )
+                            except Exception as e:
+                                logger.error(f"Failed to upload initial document for {lg_num}: {e}")
+                    # ------------------------------------------------------------------
+
+                    if len(sorted_snapshots) > 1:
+                        for i in range(1, len(sorted_snapshots)):
+                            prev_snapshot_data = sorted_snapshots[i-1].source_data_json
+                            current_snapshot = sorted_snapshots[i]
+                            current_snapshot_data = current_snapshot.source_data_json
                         
-                        diff = migration_history_service._get_diff(prev_snapshot_data, current_snapshot_data)
+                            diff = migration_history_service._get_diff(prev_snapshot_data, current_snapshot_data)
                         
-                        if diff:
-                            await migration_service._apply_migration_amendment(
-                                db, new_lg.id, diff, current_user.user_id, current_snapshot.id
-                            )
+                            if diff:
+                                await migration_service._apply_migration_amendment(
+                                    db, new_lg.id, diff, current_user.user_id, current_snapshot.id
+                                )
 
-                # Reload the record from DB to get the latest expiry_date
+                    # Reload the record from DB to get the latest expiry_date
 
-                # --- FIX: Force Status, Date, AND AMOUNT Refresh ---
-                db.refresh(new_lg)
+                    # --- FIX: Force Status, Date, AND AMOUNT Refresh ---
+                    db.refresh(new_lg)
                 
-                # 1. Date Logic (Existing)
-                expiry_check = new_lg.expiry_date
-                if isinstance(expiry_check, datetime):
-                    expiry_check = expiry_check.date()
+                    # 1. Date Logic (Existing)
+                    expiry_check = new_lg.expiry_date
+                    if isinstance(expiry_check, datetime):
+                        expiry_check = expiry_check.date()
                     
-                if expiry_check and expiry_check >= date.today():
-                    new_lg.lg_status_id = 1 
+                    if expiry_check and expiry_check >= date.today():
+                        new_lg.lg_status_id = 1 
                     
-                # 2. NEW: Amount Logic
-                # We look at the LAST snapshot to see the final intended amount
-                if snapshots:
-                    last_snapshot = snapshots[-1]
-                    last_data = last_snapshot.source_data_json
-                    final_amount = last_data.get("lg_amount")
+                    # 2. NEW: Amount Logic
+                    # We look at the LAST snapshot to see the final intended amount
+                    if snapshots:
+                        last_snapshot = snapshots[-1]
+                        last_data = last_snapshot.source_data_json
+                        final_amount = last_data.get("lg_amount")
                     
-                    # If the last snapshot has an amount, force the master record to match it
-                    if final_amount is not None:
-                        new_lg.lg_amount = final_amount
-                        logger.info(f"Refreshed amount for LG {lg_num} to {final_amount}")
-
-                db.add(new_lg)
-                db.flush()
-                # ------------------------------------------------------
-                for snap in snapshots:
-                    snap.record_status = MigrationRecordStatusEnum.IMPORTED
-                    snap.production_lg_id = new_lg.id
+                        # If the last snapshot has an amount, force the master record to match it
+                        if final_amount is not None:
+                            new_lg.lg_amount = final_amount
+                            logger.info(f"Refreshed amount for LG {lg_num} to {final_amount}")
+
+                    db.add(new_lg)
+                    db.flush()
+                    # ------------------------------------------------------
+                    for snap in snapshots:
+                        snap.record_status = MigrationRecordStatusEnum.IMPORTED
+                        snap.production_lg_id = new_lg.id
                 
-                batch_results['imported'] += 1
+                    batch_results['imported'] += 1
             
-            except Exception as e:
-                nested_session.rollback()
-                logger.error(f"Failed to import LG '{lg_num}' during historical import: {e}", exc_info=True)
-                for snap in snapshots:
-                    snap.record_status = MigrationRecordStatusEnum.ERROR
-                    snap.validation_log = snap.validation_log or {}
-                    snap.validation_log['import_error'] = str(e)
-                batch_results['failed'] += 1
+                except Exception as e:
+                    nested_session.rollback()
+                    logger.error(f"Failed to import LG '{lg_num}' during historical import: {e}", exc_info=True)
+                    for snap in snapshots:
+                        snap.record_status = MigrationRecordStatusEnum.ERROR
+                        snap.validation_log = {**(snap.validation_log or {}), 'import_error': str(e)}
+                    batch_results['failed'] += 1
+
+        # Persist each page so the session's identity map stays bounded
+        batch.totals = dict(batch_results)
+        db.commit()
 
     batch.totals = batch_results
     batch.finished_at = func.now()
@@ -975,7 +978,7 @@ async def import_historical_records(
     return {
         "message": "Historical migration process completed.",
         "totals": batch_results,
-        "batch_id": batch.id
+        "batch_id": batch_id
     }
 
 @router.get("/report", response_model=MigrationReportOut, status_code=status.HTTP_200_OK)
@@ -1167,6 +1170,56 @@ async def import_ready_records(
     }
 
 
+@router.post("/import-ready/bulk", status_code=status.HTTP_202_ACCEPTED)
+def bulk_import_ready_records(
+    background_tasks: BackgroundTasks,
+    chunk_size: int = Query(500, ge=50, le=5000),
+    wait: bool = Query(False, description="Run in the request and return the final report (200) instead of a job handle (202)."),
+    job_id: Optional[int] = Query(None, description="Resume this bulk import job: only its records not processed yet are imported."),
+    current_user: TokenData = Depends(get_current_corporate_admin_context),
+    db: Session = Depends(get_db),
+):
+    """
+    Bulk variant of /import-ready for large legacy books: master data is preloaded
+    once, records are validated and inserted in chunks (see app/core/migration_bulk_import.py).
+    The job and its per-record outcomes are stored, so /import-ready/bulk/{job_id}
+    serves progress and throughput from any worker, and an interrupted job can be
+    resumed by passing its job_id. The import runs in a worker thread: the
+    threadpool with wait=true, asyncio.to_thread in the background otherwise.
+    """
+    from fastapi.responses import JSONResponse
+    from app.core.migration_bulk_import import bulk_migration_importer
+
+    if job_id is not None:
+        job = bulk_migration_importer.get_job(db, job_id, current_user.customer_id)
+        if not job:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bulk import job not found.")
+    else:
+        job = bulk_migration_importer.create_job(db, current_user.customer_id, current_user.user_id, chunk_size=chunk_size)
+    bulk_migration_importer.claim(db, job)
+    logger.info(f"Bulk import {job.id} started for customer {current_user.customer_id} by user {current_user.email}.")
+    if wait:
+        job = bulk_migration_importer.run(db, job)
+        return JSONResponse(status_code=status.HTTP_200_OK, content=bulk_migration_importer.progress(db, job))
+    background_tasks.add_task(bulk_migration_importer.run_in_new_session, job.id)
+    return bulk_migration_importer.progress(db, job)
+
+
+@router.get("/import-ready/bulk/{job_id}", status_code=status.HTTP_200_OK)
+def get_bulk_import_progress(
+    job_id: int,
+    current_user: TokenData = Depends(get_current_corporate_admin_context),
+    db: Session = Depends(get_db),
+):
+    """Progress of a bulk import: processed rows, imported/failed counts, rows per second and ETA."""
+    from app.core.migration_bulk_import import bulk_migration_importer
+
+    job = bulk_migration_importer.get_job(db, job_id, current_user.customer_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bulk import job not found.")
+    return bulk_migration_importer.progress(db, job)
+
+
 # NEW ENDPOINT: Delete multiple staged records
 class DeleteRecordsIn(BaseModel):
     ids: List[int]
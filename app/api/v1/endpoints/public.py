@@ -20,16 +20,15 @@ from app.core.email_service import get_global_email_settings, send_email, EmailA
 from app.core.document_generator import generate_pdf_from_html
 from app.constants import GlobalConfigKey, LegalArtifactType
 
-# *** FIXED: Use storage.Client() inside function (not at module level) ***
 import logging
-from google.cloud import storage as gcs_storage
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 async def upload_file_to_gcs(file: UploadFile, folder_name: str) -> str:
-    """Uploads file to GCS. Client is created per-call to avoid module-level crashes."""
+    """Uploads file to GCS using the shared, lazily created client."""
     import asyncio
+    from app.core.ai_integration import _get_gcs_client
 
     await file.seek(0)
     file_content = await file.read()
@@ -41,7 +40,9 @@ async def upload_file_to_gcs(file: UploadFile, folder_name: str) -> str:
         raise HTTPException(status_code=500, detail="GCS_BUCKET_NAME not configured.")
 
     try:
-        client = gcs_storage.Client()
+        client = _get_gcs_client()
+        if client is None:
+            raise RuntimeError("GCS client is not available.")
         bucket = client.bucket(bucket_name)
         blob = bucket.blob(blob_name)
         await asyncio.to_thread(blob.upload_from_string, file_content, content_type=file.content_type)
@@ -7,6 +7,7 @@ import os
 from app.database import get_db
 from app.models.models_quotation import QuotationBankAssignment, QuotationRequest, QuotationOffer, QuotationTBillOffer, QuotationBank
 from app.schemas.schemas_quotation import FXSpotOfferCreate, TBillOfferCreate
+from app.services.quotation_offer_book import quotation_offer_book
 
 router = APIRouter()
 
@@ -82,15 +83,16 @@ async def get_rfq_by_token(token: str, db: Session = Depends(get_db)):
             raw_paths = [p.strip() for p in rfq.document_path.split(',') if p.strip()]
             raw_docs = [{"name": os.path.basename(p), "path": p} for p in raw_paths]
 
-        from app.core.ai_integration import generate_signed_gcs_url
+        from app.core.ai_integration import generate_signed_gcs_urls
+        try:
+            signed_urls = await generate_signed_gcs_urls(
+                [d.get("path", "") for d in raw_docs if d.get("path", "").startswith("gs://")], expiration=604800
+            )
+        except Exception:
+            signed_urls = {}
         for d in raw_docs:
             p_str = d.get("path", "")
-            if p_str.startswith("gs://"):
-                try:
-                    signed_url = await generate_signed_gcs_url(p_str, expiration=604800)
-                    p_str = signed_url or p_str
-                except Exception:
-                    pass
+            p_str = signed_urls.get(p_str) or p_str
             parsed_docs.append({"name": d.get("name") or "Document", "path": p_str})
 
     return {
@@ -154,6 +156,7 @@ def submit_fx_offer(
     )
     db.add(offer)
     db.commit()
+    quotation_offer_book.record_fx_offer(rfq.id, offer)
 
     # Notify Creator
     from app.models.models_quotation import QuotationNotification
@@ -195,8 +198,9 @@ def submit_tbill_offer(
         pass
     
     # Delete existing lines for this exact assignment entirely before repopulating
-    db.query(QuotationTBillOffer).filter(QuotationTBillOffer.assignment_id == assignment.id).delete()
+    deleted_count = db.query(QuotationTBillOffer).filter(QuotationTBillOffer.assignment_id == assignment.id).delete()
     
+    new_lines = []
     for line in offer_in.lines:
         o = QuotationTBillOffer(
             assignment_id=assignment.id,
@@ -206,8 +210,10 @@ def submit_tbill_offer(
             max_amount=line.maxAmount
         )
         db.add(o)
+        new_lines.append(o)
     
     db.commit()
+    quotation_offer_book.record_tbill_offers(rfq.id, assignment.id, new_lines, deleted_count)
 
     # Notify Creator
     from app.models.models_quotation import QuotationNotification
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, UploadFile, File, Response
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, UploadFile, File, Response, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Any
 from datetime import datetime, timezone
+import asyncio
+import json
 import logging
 import csv
 import io
@@ -9,7 +12,7 @@ import os
 import uuid
 import shutil
 
-from app.database import get_db
+from app.database import get_db, SessionLocal
 from app.core.security import get_current_active_user, TokenData
 from app.crud.crud import log_action
 from app.core.email_service import send_email, get_global_email_settings
@@ -22,11 +25,14 @@ from app.schemas.schemas_quotation import (
     QuotationResultsOut, QuotationResultItem
 )
 from app.crud.crud_quotation import crud_quotation
-from app.models.models_quotation import QuotationRequest, QuotationBankAssignment, QuotationOffer, QuotationTBillOffer, QuotationBank
+from app.services.quotation_offer_book import quotation_offer_book
+from app.models.models_quotation import QuotationRequest, QuotationBankAssignment, QuotationBank
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+STANDINGS_STREAM_POLL_SECONDS = 3
+
 @router.post("/upload-documents")
 async def upload_quotation_documents(
     files: List[UploadFile] = File(...),
@@ -316,118 +322,11 @@ def get_quotation_stats(
     if trade_type:
         query = query.filter(QuotationRequest.type == trade_type)
     reqs = query.all()
-    
-    bank_stats = {}
-    
-    for r in reqs:
-        # For each RFQ, find all offers and determine ranks
-        assignments = db.query(QuotationBankAssignment).filter(QuotationBankAssignment.rfq_id == r.id).all()
-        
-        offers = []
-        if r.type == 'FX_SPOT':
-            for a in assignments:
-                best_offer = db.query(QuotationOffer).filter(QuotationOffer.assignment_id == a.id).order_by(QuotationOffer.price.asc()).first()
-                if best_offer:
-                    offers.append({'bank_id': a.quotation_bank_id, 'price': best_offer.price, 'name': a.quotation_bank.bank.name if a.quotation_bank.bank else 'Unknown'})
-            
-            is_sell = (r.direction and r.direction.lower() == 'sell')
-            sorted_offers = sorted(offers, key=lambda x: x['price'], reverse=is_sell)
-        else: # TBILL
-            # We must normalize all offers for this specific RFQ to determine the correct winner and ranks
-            rfq_offers = []
-            for a in assignments:
-                best_tb_offer = db.query(QuotationTBillOffer).filter(QuotationTBillOffer.assignment_id == a.id).order_by(QuotationTBillOffer.discount_rate.asc()).first()
-                if best_tb_offer:
-                    rfq_offers.append({
-                        'bank_id': a.quotation_bank_id, 
-                        'name': a.quotation_bank.bank.name if a.quotation_bank.bank else 'Unknown',
-                        'settlement_date': best_tb_offer.settlement_date,
-                        'maturity_date': best_tb_offer.maturity_date,
-                        'discount_rate': best_tb_offer.discount_rate
-                    })
-            
-            if not rfq_offers:
-                continue
 
-            is_buy = (r.direction and r.direction.lower() == 'buy')
-            eval_rate = (r.eval_rate or 0) / 100.0
-
-            s_min = None
-            m_max = None
-            
-            for o in rfq_offers:
-                try:
-                    o['s_dt'] = datetime.strptime(o['settlement_date'], "%Y-%m-%d")
-                    o['m_dt'] = datetime.strptime(o['maturity_date'], "%Y-%m-%d")
-                    if s_min is None or o['s_dt'] < s_min: s_min = o['s_dt']
-                    if m_max is None or o['m_dt'] > m_max: m_max = o['m_dt']
-                except Exception: continue
-
-            for o in rfq_offers:
-                days = (o['m_dt'] - o['s_dt']).days
-                price = 100.0 * (1.0 - (o['discount_rate'] / 100.0) * (days / 360.0))
-                if is_buy:
-                    delta_s = (o['s_dt'] - s_min).days
-                    delta_m = (m_max - o['m_dt']).days
-                    m_accrual = 1.0 + (eval_rate * (delta_m / 360.0))
-                    normalized_price = (price / m_accrual) * (1.0 - (eval_rate * (delta_s / 360.0)))
-                    o['final_price'] = normalized_price
-                else:
-                    o['final_price'] = o['discount_rate'] # Lowest DR wins for Sell
-
-            # Normalized "Price" (Score) determining the rank
-            sorted_offers = sorted(rfq_offers, key=lambda x: x['final_price'])
-            # Remap to the format expected by the stats loop
-            sorted_offers = [{'bank_id': o['bank_id'], 'price': o['final_price'], 'name': o['name']} for o in sorted_offers]
-        
-        for i, offer in enumerate(sorted_offers):
-            bid_id = offer['bank_id']
-            if bid_id not in bank_stats:
-                bank_stats[bid_id] = {
-                    'bank_id': bid_id,
-                    'bank_name': offer['name'],
-                    'total_participated': 0,
-                    'total_won': 0,
-                    'ranks': {1: 0, 2: 0, 3: 0},
-                    'total_spread': 0.0,
-                    'spread_count': 0
-                }
-            
-            stats = bank_stats[bid_id]
-            stats['total_participated'] += 1
-            rank = i + 1
-            if rank <= 3:
-                stats['ranks'][rank] += 1
-            if rank == 1:
-                stats['total_won'] += 1
-            
-            winner_price = sorted_offers[0]['price']
-            if winner_price > 0:
-                spread = abs(offer['price'] - winner_price) / winner_price * 100
-                stats['total_spread'] += spread
-                stats['spread_count'] += 1
-
-    results = []
-    for bid, s in bank_stats.items():
-        results.append({
-            'bank_id': s['bank_id'],
-            'bank_name': s['bank_name'],
-            'win_rate': (s['total_won'] / s['total_participated'] * 100) if s['total_participated'] > 0 else 0,
-            'total_won': s['total_won'],
-            'total_participated': s['total_participated'],
-            'ranks': s['ranks'],
-            'avg_spread': (s['total_spread'] / s['spread_count']) if s['spread_count'] > 0 else 0
-        })
-        
-    return sorted(results, key=lambda x: x['win_rate'], reverse=True)
+    # Rankings come from the offer books (bulk-probed / bulk-built, no per-RFQ queries)
+    return quotation_offer_book.get_bank_stats(db, reqs)
 
-@router.get("/{rfq_id}/results", response_model=QuotationResultsOut)
-def get_rfq_results(
-    rfq_id: str,
-    db: Session = Depends(get_db),
-    current_user: TokenData = Depends(get_current_active_user)
-):
-    """Calculates active Quotation standings/results for a given RFQ."""
+def _load_rfq_for_results(rfq_id: str, db: Session, current_user: TokenData):
     if current_user:
         rfq = crud_quotation.get_request(db, rfq_id=rfq_id, customer_id=current_user.customer_id)
     else:
@@ -435,255 +334,96 @@ def get_rfq_results(
 
     if not rfq:
         raise HTTPException(status_code=404, detail="RFQ not found")
-        
+
     now = datetime.now(timezone.utc)
     try:
         is_closed = now > rfq.window_end
     except TypeError:
         is_closed = datetime.now() > rfq.window_end
-        
+
     if is_closed and rfq.status == 'PENDING':
         rfq.status = 'COMPLETED'
         db.commit()
-        
-    assignments = db.query(QuotationBankAssignment).filter(QuotationBankAssignment.rfq_id == rfq_id).all()
-    
-    results = []
-    winner_bank_id = None
-    is_inconclusive = False
-    inconclusive_reason = None
-    best_indicative_rate = None
-    best_execution_rate = None
-    deviation_percent = None
-    has_execution_banks = False
-    
-    if rfq.type == 'TBILL':
-        all_tbill_offers = []
-        for a in assignments:
-            offers_db = db.query(QuotationTBillOffer).filter(QuotationTBillOffer.assignment_id == a.id).all()
-            q_bank = db.query(QuotationBank).filter(QuotationBank.id == a.quotation_bank_id).first()
-            for o in offers_db:
-                all_tbill_offers.append({
-                    "bank_id": q_bank.bank_id if q_bank else 0,
-                    "bank_name": q_bank.bank.name if q_bank and q_bank.bank else "Unknown Bank",
-                    "bank_emails": q_bank.emails if q_bank else "",
-                    "settlement_date": o.settlement_date,
-                    "maturity_date": o.maturity_date,
-                    "discount_rate": o.discount_rate,
-                    "max_amount": o.max_amount,
-                    "submitted_at": o.submitted_at
-                })
-
-        if not all_tbill_offers:
-            # Return empty structure if no offers
-            for a in assignments:
-                q_bank = db.query(QuotationBank).filter(QuotationBank.id == a.quotation_bank_id).first()
-                results.append({
-                    "bank_id": q_bank.bank_id if q_bank else 0,
-                    "bank_name": q_bank.bank.name if q_bank and q_bank.bank else "Unknown Bank",
-                    "bank_emails": q_bank.emails if q_bank else "",
-                    "offers": [],
-                    "best_score": None,
-                    "token": a.token
-                })
-            return {"rfq": rfq, "results": results}
-
-        # --- T-Bill Normalization Logic ---
-        is_buy = (rfq.direction and rfq.direction.lower() == 'buy')
-        eval_rate = (rfq.eval_rate or 0) / 100.0
-
-        s_min = None
-        m_max = None
-        
-        parsed_offers = []
-        for o in all_tbill_offers:
-            try:
-                s_dt = datetime.strptime(o['settlement_date'], "%Y-%m-%d")
-                m_dt = datetime.strptime(o['maturity_date'], "%Y-%m-%d")
-                o['s_dt'] = s_dt
-                o['m_dt'] = m_dt
-                parsed_offers.append(o)
-                
-                if s_min is None or s_dt < s_min: s_min = s_dt
-                if m_max is None or m_dt > m_max: m_max = m_dt
-            except Exception:
-                continue
-
-        # Calculate scores
-        for o in parsed_offers:
-            days = (o['m_dt'] - o['s_dt']).days
-            price = 100.0 * (1.0 - (o['discount_rate'] / 100.0) * (days / 360.0))
-            
-            if is_buy:
-                # Normalize to S_min and M_max
-                delta_s = (o['s_dt'] - s_min).days
-                delta_m = (m_max - o['m_dt']).days
-                
-                # Accrue maturity gap: reinvest the FV until m_max
-                # Scale the price so it represents a value of exactly 100 at m_max
-                m_accrual_factor = 1.0 + (eval_rate * (delta_m / 360.0))
-                scaled_price = price / m_accrual_factor
-                
-                # Discount back for settlement delay
-                s_discount_factor = 1.0 - (eval_rate * (delta_s / 360.0))
-                normalized_price = scaled_price * s_discount_factor
-                o['score'] = normalized_price
-            else:
-                # Sell: Lower Discount Rate wins (Higher proceeds)
-                o['score'] = o['discount_rate']
-
-        # Group by bank and take the best offer
-        bank_best = {}
-        for o in parsed_offers:
-            bid = o['bank_id']
-            if bid not in bank_best or o['score'] < bank_best[bid]['score']:
-                bank_best[bid] = o
-
-        # Format Final Results
-        for a in assignments:
-            q_bank = db.query(QuotationBank).filter(QuotationBank.id == a.quotation_bank_id).first()
-            bank_id = q_bank.bank_id if q_bank else 0
-            
-            # All offers from this specific bank
-            bank_offers = [o for o in parsed_offers if o['bank_id'] == bank_id]
-            best_offer = bank_best.get(bank_id)
-            
-            results.append({
-                "bank_id": bank_id,
-                "quotation_bank_id": a.quotation_bank_id,
-                "bank_name": q_bank.bank.name if q_bank and q_bank.bank else "Unknown Bank",
-                "bank_emails": q_bank.emails if q_bank else "",
-                "offers": bank_offers,
-                "best_score": best_offer['score'] if best_offer else None,
-                "token": a.token,
-                "quotation_base": a.quotation_base or rfq.quotation_base,
-                "is_document_visible": a.is_document_visible if a.is_document_visible is not None else True
-            })
-
-        # Sort results: Lowest score wins (Lowest price for buy, Lowest DR for sell)
-        results.sort(key=lambda x: (x['best_score'] is None, x['best_score']))
-        if results and results[0].get('best_score') is not None:
-            winner_bank_id = results[0]['bank_id']
+    return rfq
 
-    else:
-        # FX_SPOT
-        for a in assignments:
-            offer_db = db.query(QuotationOffer).filter(QuotationOffer.assignment_id == a.id).order_by(QuotationOffer.submitted_at.desc()).first()
-            q_bank = db.query(QuotationBank).filter(QuotationBank.id == a.quotation_bank_id).first()
-            
-            if not offer_db:
-                results.append({
-                    "bank_id": q_bank.bank_id if q_bank else 0,
-                    "quotation_bank_id": a.quotation_bank_id,
-                    "bank_name": q_bank.bank.name if q_bank and q_bank.bank else "Unknown Bank",
-                    "bank_emails": q_bank.emails if q_bank else "",
-                    "price": None,
-                    "finalPrice": None,
-                    "submitted_at": None,
-                    "token": a.token,
-                    "quotation_base": a.quotation_base or rfq.quotation_base,
-                    "is_document_visible": a.is_document_visible if a.is_document_visible is not None else True
-                })
-                continue
-            
-            price = offer_db.price
-            deal_amount = float(rfq.amount or 1.0)
-            base_deal_volume = deal_amount * price
-            raw_fee = (base_deal_volume * (float(a.cost_percent or 0) / 100.0)) + float(a.cost_flat or 0)
-            clamped_fee = raw_fee
-            if a.cost_min and a.cost_min > 0:
-                clamped_fee = max(clamped_fee, float(a.cost_min))
-            if a.cost_max and a.cost_max > 0:
-                clamped_fee = min(clamped_fee, float(a.cost_max))
-                
-            fee_per_unit = clamped_fee / deal_amount if deal_amount > 0 else 0.0
-            is_sell_dir = (rfq.direction and rfq.direction.lower() == 'sell')
-            final_all_in_price = (price - fee_per_unit) if is_sell_dir else (price + fee_per_unit)
-                
-            results.append({
-                "bank_id": q_bank.bank_id if q_bank else 0,
-                "quotation_bank_id": a.quotation_bank_id,
-                "bank_name": q_bank.bank.name if q_bank and q_bank.bank else "Unknown Bank",
-                "bank_emails": q_bank.emails if q_bank else "",
-                "price": price,
-                "finalPrice": final_all_in_price,
-                "bank_fee_total": clamped_fee,
-                "fee_per_unit": fee_per_unit,
-                "submitted_at": offer_db.submitted_at,
-                "token": a.token,
-                "quotation_base": a.quotation_base or rfq.quotation_base,
-                "is_document_visible": a.is_document_visible if a.is_document_visible is not None else True
-            })
-            
-        # Filter nulls and sort by direction
-        is_sell = (rfq.direction and rfq.direction.lower() == 'sell')
-        valid_results = [r for r in results if r.get('finalPrice') is not None]
-        valid_results.sort(key=lambda x: x['finalPrice'], reverse=is_sell)
-        results = valid_results + [r for r in results if r.get('finalPrice') is None]
-        
-        # --- Evaluation Logic: Execution vs Indicative & Max Tolerance Check ---
-        has_execution_banks = any((r.get('quotation_base') or rfq.quotation_base or 'Execution').lower() == 'execution' for r in results)
-        
-        winner_bank_id = None
-        is_inconclusive = False
-        inconclusive_reason = None
-        best_indicative_rate = None
-        best_execution_rate = None
-        deviation_percent = None
-
-        if not has_execution_banks:
-            # Scenario B: All banks are Indicative -> pure market sounding
-            is_inconclusive = True
-            inconclusive_reason = "All counterparties were requested on an Indicative basis. No binding winner is selected."
-        else:
-            # Separate valid bids into Indicative and Execution pools
-            indicative_bids = [r for r in valid_results if (r.get('quotation_base') or rfq.quotation_base or 'Execution').lower() == 'indicative']
-            execution_bids = [r for r in valid_results if (r.get('quotation_base') or rfq.quotation_base or 'Execution').lower() == 'execution']
-            
-            if indicative_bids:
-                best_indicative_rate = indicative_bids[0]['finalPrice'] # Already sorted by direction
-            if execution_bids:
-                best_execution_rate = execution_bids[0]['finalPrice'] # Already sorted by direction
-                
-            if execution_bids:
-                best_exec_item = execution_bids[0]
-                if best_indicative_rate is not None and best_execution_rate is not None:
-                    # Scenario C: Mixed -> Calculate one-directional deviation
-                    if is_sell:
-                        # Sell: Higher rate is better. Deviation is how much lower execution is vs indicative benchmark
-                        deviation_percent = ((best_indicative_rate - best_execution_rate) / best_indicative_rate) * 100.0
-                    else:
-                        # Buy: Lower rate is better. Deviation is how much higher execution is vs indicative benchmark
-                        deviation_percent = ((best_execution_rate - best_indicative_rate) / best_indicative_rate) * 100.0
-                    
-                    if deviation_percent <= 0:
-                        # Execution rate is equal to or better than Indicative benchmark
-                        winner_bank_id = best_exec_item['bank_id']
-                    else:
-                        max_tol = rfq.max_tolerance_percent if rfq.max_tolerance_percent is not None else 0.0
-                        if deviation_percent > max_tol:
-                            is_inconclusive = True
-                            inconclusive_reason = (
-                                f"The best Execution rate ({best_execution_rate:.4f}) exceeded the Indicative benchmark "
-                                f"({best_indicative_rate:.4f}) by {deviation_percent:.2f}%, which is higher than the allowed tolerance of {max_tol:.2f}%."
-                            )
-                        else:
-                            winner_bank_id = best_exec_item['bank_id']
-                else:
-                    # Scenario A: All Execution or no Indicative quotes submitted
-                    winner_bank_id = best_exec_item['bank_id']
-
-    return {
-        "rfq": rfq,
-        "results": results,
-        "winner_bank_id": winner_bank_id,
-        "is_inconclusive": is_inconclusive,
-        "inconclusive_reason": inconclusive_reason,
-        "best_indicative_rate": best_indicative_rate,
-        "best_execution_rate": best_execution_rate,
-        "deviation_percent": deviation_percent,
-        "has_execution_banks": has_execution_banks
-    }
+@router.get("/{rfq_id}/results", response_model=QuotationResultsOut)
+def get_rfq_results(
+    rfq_id: str,
+    db: Session = Depends(get_db),
+    current_user: TokenData = Depends(get_current_active_user)
+):
+    """Calculates active Quotation standings/results for a given RFQ."""
+    rfq = _load_rfq_for_results(rfq_id, db, current_user)
+    results = quotation_offer_book.get_results(db, rfq)
+    return {"rfq": rfq, **results}
+
+def _standings_snapshot(rfq_id: str):
+    """(summary, is_final) for the standings stream on a short-lived session, or None if the RFQ is gone."""
+    stream_db = SessionLocal()
+    try:
+        live_rfq = stream_db.query(QuotationRequest).filter(QuotationRequest.id == rfq_id).first()
+        if not live_rfq:
+            return None
+        summary = quotation_offer_book.get_summary(stream_db, live_rfq)
+        window_end = live_rfq.window_end
+        if window_end and window_end.tzinfo is None:
+            window_end = window_end.replace(tzinfo=timezone.utc)
+        is_final = live_rfq.status in ('COMPLETED', 'REJECTED') or (
+            window_end is not None and datetime.now(timezone.utc) > window_end
+        )
+        return summary, is_final
+    finally:
+        stream_db.close()
+
+@router.get("/{rfq_id}/standings/stream")
+async def stream_rfq_standings(
+    rfq_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: TokenData = Depends(get_current_active_user)
+):
+    """
+    Server-Sent Events stream of live standings (ranking, best rate, spreads,
+    response counts). An event is pushed whenever the ranking changes and the
+    stream ends once the RFQ is no longer open for bidding.
+    """
+    rfq = crud_quotation.get_request(db, rfq_id=rfq_id, customer_id=current_user.customer_id)
+    if not rfq:
+        raise HTTPException(status_code=404, detail="RFQ not found")
+    db.close()
+
+    async def event_source():
+        wake = quotation_offer_book.subscribe(rfq_id)
+        last_payload = None
+        try:
+            while not await request.is_disconnected():
+                # The RFQ query and the book probe run off the event loop
+                snapshot = await asyncio.to_thread(_standings_snapshot, rfq_id)
+                if snapshot is None:
+                    break
+                summary, is_final = snapshot
+
+                payload = json.dumps(summary, default=str)
+                if payload != last_payload:
+                    last_payload = payload
+                    yield f"event: standings\ndata: {payload}\n\n"
+                if is_final:
+                    yield "event: closed\ndata: {}\n\n"
+                    break
+
+                wake.clear()
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=STANDINGS_STREAM_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass  # Re-probe: offers may have landed on another worker
+        finally:
+            quotation_offer_book.unsubscribe(rfq_id, wake)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.post("/{rfq_id}/send-results")
 async def send_rfq_results(
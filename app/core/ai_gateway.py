@@ -0,0 +1,416 @@
+# app/core/ai_gateway.py
+"""
+Single execution path for generative-AI calls (Gemini and the offline fake).
+
+Every AI call in the app goes through ai_gateway, which runs them on one
+long-lived event loop in a background thread:
+
+- The async GenAI client is built once and only ever used on that loop, so
+  request threads no longer create (and tear down) an event loop per call.
+  Sync code calls generate_sync() / run_sync(); async code awaits generate().
+- Concurrency is capped globally (AI_MAX_CONCURRENCY) and per customer
+  (AI_MAX_CONCURRENCY_PER_CUSTOMER). A call that cannot get a slot within
+  AI_SLOT_TIMEOUT_SECONDS fails with AIBusy instead of piling up.
+- Each attempt is bounded by AI_REQUEST_TIMEOUT_SECONDS. Timeouts, connection
+  errors and 408/429/5xx responses are retried up to AI_MAX_ATTEMPTS with
+  exponential backoff and full jitter.
+- Identical in-flight calls (same model, contents and config) are coalesced:
+  the first runs, the others wait for its result. Followers get
+  usage_metadata=None, so token usage is logged once.
+- AI_BACKEND=fake swaps in FakeAIBackend: deterministic canned answers per
+  call type, optional fixed latency (AI_FAKE_LATENCY_MS), no network. Used
+  for offline development, tests and load runs.
+
+Latency, slot wait and outcomes are recorded per call type in telemetry
+(/metrics, system-health telemetry).
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+from app.core.telemetry import telemetry
+
+logger = logging.getLogger(__name__)
+
+AI_BACKEND = os.getenv("AI_BACKEND", "gemini").lower()
+MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "8"))
+MAX_CONCURRENCY_PER_CUSTOMER = int(os.getenv("AI_MAX_CONCURRENCY_PER_CUSTOMER", "3"))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("AI_REQUEST_TIMEOUT_SECONDS", "120"))
+SLOT_TIMEOUT_SECONDS = float(os.getenv("AI_SLOT_TIMEOUT_SECONDS", "30"))
+MAX_ATTEMPTS = int(os.getenv("AI_MAX_ATTEMPTS", "3"))
+RETRY_BASE_SECONDS = float(os.getenv("AI_RETRY_BASE_SECONDS", "1"))
+RETRY_MAX_SECONDS = float(os.getenv("AI_RETRY_MAX_SECONDS", "10"))
+FAKE_LATENCY_MS = float(os.getenv("AI_FAKE_LATENCY_MS", "0"))
+
+_RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class AIGatewayError(Exception):
+    """Base class of gateway failures."""
+
+
+class AIUnavailable(AIGatewayError):
+    """The configured backend cannot serve calls (SDK or project not configured)."""
+
+
+class AIBusy(AIGatewayError):
+    """No concurrency slot became free within AI_SLOT_TIMEOUT_SECONDS."""
+
+
+class AITimeout(AIGatewayError):
+    """Every attempt exceeded AI_REQUEST_TIMEOUT_SECONDS."""
+
+
+@dataclass(frozen=True)
+class AIPart:
+    """Binary input (PDF, page image) sent alongside the prompt."""
+    data: bytes
+    mime_type: str
+
+
+@dataclass(frozen=True)
+class AIUsage:
+    """Token counts, named like the GenAI SDK's usage_metadata."""
+    prompt_token_count: int = 0
+    candidates_token_count: int = 0
+    total_token_count: int = 0
+
+
+@dataclass(frozen=True)
+class AIResponse:
+    text: str
+    usage_metadata: Any = None   # None for coalesced followers
+    coalesced: bool = False
+    attempts: int = 1
+
+
+Contents = Union[str, AIPart, Sequence[Union[str, AIPart]]]
+
+
+def _fingerprint(model: str, contents: List[Union[str, AIPart]], config: Optional[Dict[str, Any]]) -> str:
+    digest = hashlib.sha256(model.encode())
+    for part in contents:
+        if isinstance(part, AIPart):
+            digest.update(b"\x00part:" + part.mime_type.encode() + b":")
+            digest.update(hashlib.sha256(part.data).digest())
+        else:
+            digest.update(b"\x00text:" + str(part).encode())
+    digest.update(b"\x00config:" + json.dumps(config or {}, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, AIGatewayError):
+        return False
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    return isinstance(status, int) and status in _RETRYABLE_STATUS
+
+
+# ==============================================================================
+# BACKENDS
+# ==============================================================================
+
+class GeminiBackend:
+    """Vertex AI Gemini through the shared google-genai client (async API)."""
+
+    name = "gemini"
+
+    def available(self) -> bool:
+        from app.core.ai_integration import _get_genai_client
+        return _get_genai_client() is not None
+
+    async def generate(self, model: str, contents: List[Union[str, AIPart]],
+                       config: Optional[Dict[str, Any]], call_type: str) -> AIResponse:
+        from app.core.ai_integration import _get_genai_client, genai_types
+
+        client = _get_genai_client()
+        if client is None:
+            raise AIUnavailable("GenAI client is not available or not configured.")
+        sdk_contents = [
+            genai_types.Part.from_bytes(data=part.data, mime_type=part.mime_type) if isinstance(part, AIPart) else part
+            for part in contents
+        ]
+        response = await client.aio.models.generate_content(
+            model=model,
+            contents=sdk_contents if len(sdk_contents) > 1 else sdk_contents[0],
+            config=genai_types.GenerateContentConfig(**config) if config else None,
+        )
+        return AIResponse(text=response.text or "", usage_metadata=response.usage_metadata)
+
+
+# Canned answers of the fake backend, per call type (shaped like what callers parse)
+_FAKE_RESPONSES: Dict[str, str] = {
+    "fx_rate": '{"rate": 1.0}',
+    "reconciliation_pdf_parsing": "[]",
+    "migration_scan_extraction": "[]",
+    "bank_form_enhancement": '{"corrections": [], "summary": "All fields correctly positioned"}',
+    "bank_form_analysis": '{"field_mapping": [], "form_title": null, "unmapped_fields": []}',
+    "document_verification": '{"comparison": [], "summary": null}',
+    "facility_agreement_analysis": "{}",
+    "lg_extraction": "{}",
+}
+
+
+class FakeAIBackend:
+    """
+    Deterministic offline model. A call type answers with its registered
+    response (a string, or a callable taking the prompt text); otherwise
+    JSON calls get "{}" and text calls a stable digest of the prompt.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency_ms: float = FAKE_LATENCY_MS):
+        self.latency_ms = latency_ms
+        self._responses: Dict[str, Union[str, Callable[[str], str]]] = dict(_FAKE_RESPONSES)
+        self.calls: Deque[Tuple[str, str]] = deque(maxlen=1000)   # (call_type, prompt digest)
+
+    def available(self) -> bool:
+        return True
+
+    def respond(self, call_type: str, response: Union[str, Callable[[str], str]]) -> None:
+        self._responses[call_type] = response
+
+    async def generate(self, model: str, contents: List[Union[str, AIPart]],
+                       config: Optional[Dict[str, Any]], call_type: str) -> AIResponse:
+        prompt = "\n".join(part for part in contents if isinstance(part, str))
+        digest = hashlib.sha256(prompt.encode()).hexdigest()[:16]
+        self.calls.append((call_type, digest))
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+        response = self._responses.get(call_type)
+        if callable(response):
+            text = response(prompt)
+        elif response is not None:
+            text = response
+        elif (config or {}).get("response_mime_type") == "application/json":
+            text = "{}"
+        else:
+            text = f"[offline model] {call_type} {digest}"
+        prompt_tokens, completion_tokens = len(prompt) // 4, len(text) // 4
+        return AIResponse(text=text, usage_metadata=AIUsage(prompt_tokens, completion_tokens, prompt_tokens + completion_tokens))
+
+
+def _backend_from_env():
+    if AI_BACKEND == "fake":
+        logger.info("AI gateway using the offline fake backend (AI_BACKEND=fake).")
+        return FakeAIBackend()
+    if AI_BACKEND != "gemini":
+        logger.warning(f"Unknown AI_BACKEND '{AI_BACKEND}'; using gemini.")
+    return GeminiBackend()
+
+
+# ==============================================================================
+# GATEWAY
+# ==============================================================================
+
+class AIGateway:
+
+    def __init__(self, backend=None,
+                 max_concurrency: int = MAX_CONCURRENCY,
+                 max_concurrency_per_customer: int = MAX_CONCURRENCY_PER_CUSTOMER,
+                 request_timeout: float = REQUEST_TIMEOUT_SECONDS,
+                 slot_timeout: float = SLOT_TIMEOUT_SECONDS,
+                 max_attempts: int = MAX_ATTEMPTS):
+        self._backend = backend
+        self.max_concurrency = max_concurrency
+        self.max_concurrency_per_customer = max_concurrency_per_customer
+        self.request_timeout = request_timeout
+        self.slot_timeout = slot_timeout
+        self.max_attempts = max(1, max_attempts)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        # Owned by the gateway loop
+        self._global_slots: Optional[asyncio.Semaphore] = None
+        self._customer_slots: Dict[int, asyncio.Semaphore] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.in_flight = 0
+
+    # ---------------- Backend ----------------
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = _backend_from_env()
+        return self._backend
+
+    def set_backend(self, backend) -> None:
+        """Replaces the backend (e.g. FakeAIBackend() in tests and load runs)."""
+        self._backend = backend
+
+    def available(self) -> bool:
+        return self.backend.available()
+
+    # ---------------- Event loop ----------------
+
+    def _gateway_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="ai-gateway", daemon=True).start()
+                self._loop = loop
+                self._global_slots = None
+                self._customer_slots = {}
+                self._inflight = {}
+            return self._loop
+
+    def run_sync(self, coro):
+        """Runs a coroutine on the gateway loop and waits for its result (for sync code)."""
+        loop = self._gateway_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            coro.close()
+            raise RuntimeError("run_sync() called on the AI gateway loop; await the coroutine instead.")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    # ---------------- Calls ----------------
+
+    async def generate(self, contents: Contents, *, call_type: str, config: Optional[Dict[str, Any]] = None,
+                       model: Optional[str] = None, customer_id: Optional[int] = None,
+                       timeout: Optional[float] = None) -> AIResponse:
+        """
+        One model call. `config` holds GenerateContentConfig fields
+        (response_mime_type, response_schema, temperature, ...); binary
+        inputs are passed as AIPart.
+        """
+        loop = self._gateway_loop()
+        coro = self._generate(contents, call_type, config, model, customer_id, timeout)
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def generate_sync(self, contents: Contents, *, call_type: str, config: Optional[Dict[str, Any]] = None,
+                      model: Optional[str] = None, customer_id: Optional[int] = None,
+                      timeout: Optional[float] = None) -> AIResponse:
+        """generate() for sync code; blocks the calling thread only."""
+        return self.run_sync(self._generate(contents, call_type, config, model, customer_id, timeout))
+
+    async def _generate(self, contents: Contents, call_type: str, config: Optional[Dict[str, Any]],
+                        model: Optional[str], customer_id: Optional[int], timeout: Optional[float]) -> AIResponse:
+        if model is None:
+            from app.core.ai_integration import GEMINI_MODEL_NAME
+            model = GEMINI_MODEL_NAME
+        parts = [contents] if isinstance(contents, (str, AIPart)) else list(contents)
+        key = _fingerprint(model, parts, config)
+
+        t0 = time.perf_counter()
+        task = self._inflight.get(key)
+        coalesced = task is not None
+        if task is None:
+            task = asyncio.get_running_loop().create_task(
+                self._call(model, parts, config, call_type, customer_id, timeout or self.request_timeout)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._call_done(k, t))
+        try:
+            # Shielded: a caller giving up does not cancel the call other callers share
+            result = await asyncio.shield(task)
+        except AIBusy:
+            telemetry.record_ai_call(call_type, "rejected", time.perf_counter() - t0)
+            raise
+        except (AITimeout, asyncio.TimeoutError):
+            telemetry.record_ai_call(call_type, "timeout", time.perf_counter() - t0)
+            raise
+        except Exception:
+            telemetry.record_ai_call(call_type, "error", time.perf_counter() - t0)
+            raise
+        telemetry.record_ai_call(call_type, "coalesced" if coalesced else "ok", time.perf_counter() - t0)
+        return replace(result, usage_metadata=None, coalesced=True) if coalesced else result
+
+    def _call_done(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved here in case every caller went away
+
+    async def _call(self, model: str, parts: List[Union[str, AIPart]], config: Optional[Dict[str, Any]],
+                    call_type: str, customer_id: Optional[int], timeout: float) -> AIResponse:
+        backend = self.backend
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                async with self._slot(customer_id, call_type):
+                    self.in_flight += 1
+                    try:
+                        result = await asyncio.wait_for(backend.generate(model, parts, config, call_type), timeout)
+                    finally:
+                        self.in_flight -= 1
+                return replace(result, attempts=attempt)
+            except Exception as e:
+                if not _is_retryable(e) or attempt >= self.max_attempts:
+                    if isinstance(e, asyncio.TimeoutError):
+                        raise AITimeout(f"AI call '{call_type}' timed out after {attempt} attempt(s) of {timeout:g}s.") from e
+                    raise
+                delay = random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempt - 1)))
+                telemetry.record_ai_retry()
+                logger.warning(f"AI call '{call_type}' failed ({e!r}); retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_attempts}).")
+                await asyncio.sleep(delay)
+
+    @contextlib.asynccontextmanager
+    async def _slot(self, customer_id: Optional[int], call_type: str):
+        if self._global_slots is None:
+            self._global_slots = asyncio.Semaphore(self.max_concurrency)
+        semaphores = []
+        if customer_id is not None and self.max_concurrency_per_customer > 0:
+            customer_slots = self._customer_slots.get(customer_id)
+            if customer_slots is None:
+                customer_slots = self._customer_slots[customer_id] = asyncio.Semaphore(self.max_concurrency_per_customer)
+            # Customer slot first: a customer at its cap does not hold global slots while waiting
+            semaphores.append(customer_slots)
+        semaphores.append(self._global_slots)
+
+        t0 = time.perf_counter()
+        acquired = []
+        try:
+            for semaphore in semaphores:
+                remaining = self.slot_timeout - (time.perf_counter() - t0)
+                await asyncio.wait_for(semaphore.acquire(), max(remaining, 0.001))
+                acquired.append(semaphore)
+        except asyncio.TimeoutError:
+            for semaphore in acquired:
+                semaphore.release()
+            raise AIBusy(f"No AI capacity for '{call_type}' within {self.slot_timeout:g}s (customer {customer_id}).")
+        except BaseException:
+            for semaphore in acquired:
+                semaphore.release()
+            raise
+        telemetry.record_ai_slot_wait(time.perf_counter() - t0)
+        try:
+            yield
+        finally:
+            for semaphore in acquired:
+                semaphore.release()
+
+    # ---------------- Introspection ----------------
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "in_flight": self.in_flight,
+            "coalescing_keys": len(self._inflight),
+            "max_concurrency": self.max_concurrency,
+            "max_concurrency_per_customer": self.max_concurrency_per_customer,
+            "request_timeout_seconds": self.request_timeout,
+            "slot_timeout_seconds": self.slot_timeout,
+            "max_attempts": self.max_attempts,
+        }
+
+
+ai_gateway = AIGateway()
@@ -1,19 +1,20 @@
 # app/core/ai_integration.py
 import os
 import io
+import importlib
+import importlib.util
 from typing import Dict, Any, Optional, List, Tuple, TYPE_CHECKING
 import json
-import fitz # PyMuPDF
 from dotenv import load_dotenv
 import re
 import asyncio
-from tenacity import retry, stop_after_attempt, wait_exponential
 import logging
 import uuid
 from functools import lru_cache
 from datetime import datetime, timedelta # Added timedelta for signed URL expiry
 import tempfile
 from sqlalchemy.orm import Session
+from app.core.ai_gateway import ai_gateway, AIPart
 if TYPE_CHECKING:
     from app.models import User
 # Configure logging
@@ -44,45 +45,70 @@ GCS_BUCKET_NAME = os.environ.get('GCS_BUCKET_NAME')
 if not GCS_BUCKET_NAME:
     logger.warning("Warning: GCS_BUCKET_NAME environment variable not set. GCS integration will be limited.")
 
-# Try to import Google Cloud Vision
-try:
-    from google.cloud import vision_v1p3beta1 as vision
-    from google.cloud import storage
-    from google.oauth2 import service_account
+# --- Google SDKs (imported on first use) ---
+# The SDK packages take seconds to import; workers only pay for that when a
+# request actually needs OCR, Gemini, Document AI or GCS.
+
+class _LazyModule:
+    """Stands in for a module and imports it on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+def _sdk_installed(*module_names: str) -> bool:
+    try:
+        return all(importlib.util.find_spec(name) is not None for name in module_names)
+    except (ImportError, ValueError):
+        return False
+
+
+GOOGLE_CLOUD_LIBRARIES_AVAILABLE = _sdk_installed(
+    "google.cloud.vision_v1p3beta1", "google.cloud.storage", "google.oauth2.service_account", "google.api_core.exceptions"
+)
+if GOOGLE_CLOUD_LIBRARIES_AVAILABLE:
+    vision = _LazyModule("google.cloud.vision_v1p3beta1")
+    storage = _LazyModule("google.cloud.storage")
+    service_account = _LazyModule("google.oauth2.service_account")
     from google.api_core.exceptions import GoogleAPIError # Import GoogleAPIError for specific exception handling
-    GOOGLE_CLOUD_LIBRARIES_AVAILABLE = True
-except ImportError:
+else:
     logger.warning("Warning: google-cloud-vision or google-cloud-storage library not found. AI OCR/GCS functionality will be limited.")
-    GOOGLE_CLOUD_LIBRARIES_AVAILABLE = False
     vision = None
     storage = None
     service_account = None
     GoogleAPIError = Exception # Define dummy for type hinting if not available
 
-# Try to import Google GenAI SDK (unified Vertex AI client)
-try:
-    from google import genai
-    from google.genai import types as genai_types
-    GEMINI_AVAILABLE = True
-except ImportError:
+# Google GenAI SDK (unified Vertex AI client)
+GEMINI_AVAILABLE = _sdk_installed("google.genai")
+if GEMINI_AVAILABLE:
+    genai = _LazyModule("google.genai")
+    genai_types = _LazyModule("google.genai.types")
+else:
     logger.warning("google-genai library not found. Gemini AI functionality will be limited.")
-    GEMINI_AVAILABLE = False
     genai = None
     genai_types = None
 
 # Model name constant — single source of truth
 GEMINI_MODEL_NAME = 'gemini-2.5-flash'
 
-# Try to import Google Document AI
-try:
-    from google.cloud import documentai_v1 as documentai
-    DOCUMENT_AI_AVAILABLE = True
-except ImportError:
+# PyMuPDF (PDF page rendering)
+fitz = _LazyModule("fitz")
+
+# Google Document AI
+DOCUMENT_AI_AVAILABLE = _sdk_installed("google.cloud.documentai_v1")
+if DOCUMENT_AI_AVAILABLE:
+    documentai = _LazyModule("google.cloud.documentai_v1")
+else:
     logger.warning("Warning: google-cloud-documentai library not found. Document AI form parsing will be disabled.")
-    DOCUMENT_AI_AVAILABLE = False
     documentai = None
 
-# --- Global Client/Credentials Instantiation ---
+# --- Global Client/Credentials (built lazily by the _get_* accessors on first use) ---
 _google_credentials = None
 _gcs_client = None
 _vision_client = None
@@ -193,12 +219,6 @@ def _get_genai_client():
             _genai_client_global = None
     return _genai_client_global
 
-# Initial client setup
-_get_google_credentials()
-_get_gcs_client()
-_get_vision_client()
-_get_genai_client()
-
 # --- Document AI Configuration ---
 DOCUMENT_AI_PROJECT_ID = os.environ.get('DOCUMENT_AI_PROJECT_ID', '')
 DOCUMENT_AI_PROCESSOR_ID = os.environ.get('DOCUMENT_AI_PROCESSOR_ID', '')
@@ -456,6 +476,9 @@ def delete_file_from_gcs(gcs_uri: str) -> bool:
         blob = bucket.blob(blob_name)
         
         blob.delete()
+
+        from app.core.signed_urls import signed_url_service
+        signed_url_service.invalidate(gcs_uri)
         return True
     except Exception as e:
         logger.error(f"Error deleting file {gcs_uri}: {e}")
@@ -465,50 +488,28 @@ def delete_file_from_gcs(gcs_uri: str) -> bool:
 async def generate_signed_gcs_url(gcs_uri: str, expiration: int = 3600) -> Optional[str]:
     """
     Generates a temporary signed URL for viewing a file using the full GCS URI.
+    Signatures are cached and reused until shortly before they expire
+    (see app.core.signed_urls).
     Args:
         gcs_uri: The full GCS URI (e.g., gs://bucket_name/path/to/blob).
         expiration: Time in seconds until the link expires.
     """
-    if not GOOGLE_CLOUD_LIBRARIES_AVAILABLE:
-        return None
+    from app.core.signed_urls import signed_url_service, parse_gcs_uri
+    from app.core.object_storage import object_storage
 
-    # --- CRITICAL FIX: Robust GCS URI Parsing ---
-    # We must extract bucket_name and blob_name from the full URI
-    if not gcs_uri.startswith("gs://"):
+    # Local storage backend: already served by the /uploads static mount
+    if gcs_uri and object_storage.is_local(gcs_uri):
+        return gcs_uri
+    if not gcs_uri or not parse_gcs_uri(gcs_uri):
         logger.error(f"Invalid GCS URI format: {gcs_uri}. Must start with 'gs://'.")
         return None
-        
-    path_parts = gcs_uri[5:].split('/', 1)
-    if len(path_parts) != 2:
-        logger.error(f"Failed to parse bucket and blob name from URI: {gcs_uri}")
-        return None
-        
-    bucket_name, blob_name = path_parts
-    # ---------------------------------------------
+    return await signed_url_service.get(gcs_uri, expiration)
 
-    try:
-        # We run this in a thread because GCS client operations are synchronous
-        def _generate():
-            client = _get_gcs_client()
-            if not client:
-                return None
-            
-            bucket = client.bucket(bucket_name)
-            blob = bucket.blob(blob_name)
-            
-            # Generate the signed URL
-            url = blob.generate_signed_url(
-                version="v4",
-                expiration=timedelta(seconds=expiration),
-                method="GET"
-            )
-            return url
 
-        return await asyncio.to_thread(_generate)
-        
-    except Exception as e:
-        logger.error(f"Error generating signed URL for {gcs_uri}: {e}")
-        return None
+async def generate_signed_gcs_urls(gcs_uris: List[str], expiration: int = 3600) -> Dict[str, Optional[str]]:
+    """Batch variant of generate_signed_gcs_url: {gcs_uri: signed_url or None}, one thread hop for all misses."""
+    from app.core.signed_urls import signed_url_service
+    return await signed_url_service.sign_many(gcs_uris, expiration)
 
 # --- Google Vision OCR Function ---
 async def perform_ocr_with_google_vision(file_uri: str, unique_file_id: str) -> Optional[str]:
@@ -650,10 +651,9 @@ def log_ai_usage_sync(
     except Exception as e:
         logger.error(f"Failed to save sync AI usage log: {e}")
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), reraise=True)
-async def extract_structured_data_with_gemini(text_content: str, unique_file_id: str, context: Optional[Dict[str, Any]] = None) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, int]]]:
-    client = _get_genai_client()
-    if not client:
+async def extract_structured_data_with_gemini(text_content: str, unique_file_id: str, context: Optional[Dict[str, Any]] = None,
+                                             customer_id: Optional[int] = None) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, int]]]:
+    if not ai_gateway.available():
         logger.error("GenAI client is not available or not configured.")
         return None, None
 
@@ -849,13 +849,10 @@ Document Text:
 """
 
     try:
-        config = genai_types.GenerateContentConfig(
-            response_mime_type="application/json",
-            response_schema=response_schema
-        )
-
-        response = await client.aio.models.generate_content(
-            model=GEMINI_MODEL_NAME, contents=prompt, config=config
+        # Retries (timeouts, 429 / 5xx) happen in the gateway
+        response = await ai_gateway.generate(
+            prompt, call_type="lg_extraction", customer_id=customer_id,
+            config={"response_mime_type": "application/json", "response_schema": response_schema},
         )
         extracted_data_str = response.text
         logger.debug(f"--- FULL GEMINI JSON RESPONSE START ---")
@@ -962,7 +959,9 @@ async def process_lg_document_with_ai(
             return structured_data, total_usage_metadata
 
         # --- Gemini Processing ---
-        structured_data, gemini_usage_metadata = await extract_structured_data_with_gemini(raw_text, unique_file_id)
+        structured_data, gemini_usage_metadata = await extract_structured_data_with_gemini(
+            raw_text, unique_file_id, customer_id=getattr(current_user, "customer_id", None)
+        )
         
         if gemini_usage_metadata:
             total_usage_metadata["gemini_prompt_tokens"] = gemini_usage_metadata.get("prompt_tokens", 0)
@@ -1045,7 +1044,9 @@ async def process_amendment_with_ai(
         total_usage_metadata["ocr_characters"] = len(raw_text)
 
         context = {"lg_record_details": lg_record_details}
-        structured_data, gemini_usage_metadata = await extract_structured_data_with_gemini(raw_text, unique_file_id, context=context)
+        structured_data, gemini_usage_metadata = await extract_structured_data_with_gemini(
+            raw_text, unique_file_id, context=context, customer_id=getattr(current_user, "customer_id", None)
+        )
         
         if gemini_usage_metadata:
             total_usage_metadata["gemini_prompt_tokens"] = gemini_usage_metadata.get("prompt_tokens", 0)
@@ -1112,8 +1113,7 @@ async def analyze_supporting_document(
             "summary": str | None,
         }
     """
-    client = _get_genai_client()
-    if not client:
+    if not ai_gateway.available():
         return {"status": "ERROR", "message": "AI model not available. Submission will proceed without verification."}
 
     target_bucket_name = GCS_BUCKET_NAME
@@ -1206,12 +1206,9 @@ Return a JSON object with exactly these fields:
 - "summary": 1-2 sentence summary of the document
 """
 
-        config = genai_types.GenerateContentConfig(
-            response_mime_type="application/json",
-        )
-
-        response = await client.aio.models.generate_content(
-            model=GEMINI_MODEL_NAME, contents=prompt, config=config
+        response = await ai_gateway.generate(
+            prompt, call_type="document_verification", customer_id=customer_id,
+            config={"response_mime_type": "application/json"},
         )
         result_str = response.text
         logger.info(f"AI document verification complete ({len(result_str)} chars)")
@@ -1299,8 +1296,7 @@ async def analyze_bank_form_pdf(
             "mapped_fields": N,
         }
     """
-    client = _get_genai_client()
-    if not client:
+    if not ai_gateway.available():
         raise Exception("GenAI client is not available. Cannot analyze bank form.")
 
     # Step 1: Build fields_info based on form type
@@ -1751,17 +1747,10 @@ Many bank forms in this region are **bilingual** — English on one side and Ara
     try:
         # Upload PDF to Gemini for analysis (it can read PDFs directly)
         # Use Gemini's ability to analyze PDF content
-        pdf_part = genai_types.Part.from_bytes(data=pdf_bytes, mime_type="application/pdf")
-        response = await client.aio.models.generate_content(
-            model=GEMINI_MODEL_NAME,
-            contents=[
-                prompt,
-                pdf_part,
-            ],
-            config=genai_types.GenerateContentConfig(
-                temperature=0.0,
-                response_mime_type="application/json",
-            )
+        response = await ai_gateway.generate(
+            [prompt, AIPart(pdf_bytes, "application/pdf")],
+            call_type="bank_form_analysis", customer_id=customer_id,
+            config={"temperature": 0.0, "response_mime_type": "application/json"},
         )
         
         result_str = response.text
@@ -2006,8 +1995,7 @@ async def enhance_bank_form_mapping(
     Returns: corrected field_mapping list (only positions are updated, 
              semantic mappings are preserved).
     """
-    client = _get_genai_client()
-    if not client:
+    if not ai_gateway.available():
         raise Exception("GenAI client not available for enhancement.")
     
     import fitz  # PyMuPDF for rendering PDF to image
@@ -2033,12 +2021,12 @@ async def enhance_bank_form_mapping(
         
         orig_pix = page.get_pixmap(dpi=150)
         orig_bytes = orig_pix.tobytes("png")
-        image_parts.append(genai_types.Part.from_bytes(data=orig_bytes, mime_type="image/png"))
+        image_parts.append(AIPart(orig_bytes, "image/png"))
         
         if pg_idx < filled_doc.page_count:
             fill_pix = filled_doc[pg_idx].get_pixmap(dpi=150)
             fill_bytes = fill_pix.tobytes("png")
-            image_parts.append(genai_types.Part.from_bytes(data=fill_bytes, mime_type="image/png"))
+            image_parts.append(AIPart(fill_bytes, "image/png"))
     
     original_doc.close()
     filled_doc.close()
@@ -2136,14 +2124,9 @@ If ALL fields are correctly placed: {{"corrections": [], "summary": "All fields
     
     logger.info(f"Enhance: sending {num_pages} page pairs to Gemini for visual correction...")
     
-    response = client.models.generate_content(
-        model=GEMINI_MODEL_NAME,
-        contents=content_parts,
-        config=genai_types.GenerateContentConfig(
-            temperature=0.1,
-            max_output_tokens=16384,
-            response_mime_type="application/json",
-        ),
+    response = await ai_gateway.generate(
+        content_parts, call_type="bank_form_enhancement",
+        config={"temperature": 0.1, "max_output_tokens": 16384, "response_mime_type": "application/json"},
     )
     
     response_text = response.text.strip()
@@ -2221,8 +2204,7 @@ async def analyze_facility_agreement(
             "extracted_terms": None,
         }
 
-    client = _get_genai_client()
-    if not client:
+    if not ai_gateway.available():
         return {"status": "AI_UNAVAILABLE", "message": "AI model is not available.", "extracted_terms": None}
 
     prompt = """You are a banking document analyst. This PDF is a **bank facility agreement** 
@@ -2251,12 +2233,10 @@ Rules:
 """
 
     try:
-        response = await client.aio.models.generate_content(
-            model=GEMINI_MODEL_NAME,
-            contents=[prompt, genai_types.Part.from_bytes(data=pdf_bytes, mime_type="application/pdf")],
-            config=genai_types.GenerateContentConfig(
-                response_mime_type="application/json",
-            )
+        response = await ai_gateway.generate(
+            [prompt, AIPart(pdf_bytes, "application/pdf")],
+            call_type="facility_agreement_analysis", customer_id=customer_id,
+            config={"response_mime_type": "application/json"},
         )
 
         result_str = response.text
@@ -1566,6 +1566,124 @@ async def run_daily_sla_breach_alerts(db: Session):
 # C6: RESERVATION TTL & AUTO-EXPIRY
 # ==============================================================================
 
+RESERVATION_DEFAULT_TTL_DAYS = 14
+
+
+def _get_reservation_ttl_days(db: Session, customer_id: int) -> int:
+    """Reservation TTL for a customer (CustomerFormConfiguration.reservation_ttl_days, default 14)."""
+    from app.models.models_issuance import CustomerFormConfiguration
+    config = db.query(CustomerFormConfiguration).filter(
+        CustomerFormConfiguration.customer_id == customer_id
+    ).first()
+    return getattr(config, 'reservation_ttl_days', None) or RESERVATION_DEFAULT_TTL_DAYS
+
+
+def _reservation_milestones(ttl_days: int) -> Dict[str, int]:
+    """Day offsets (from the reservation date) at which each TTL stage fires."""
+    return {"REMINDER_50": int(ttl_days * 0.5), "REMINDER_80": int(ttl_days * 0.8), "AUTO_RELEASED": ttl_days}
+
+
+def _next_reservation_milestone_day(ttl_days: int, notif_status: str) -> Optional[int]:
+    """Day offset of the next TTL stage still to fire, or None once auto-released."""
+    milestones = _reservation_milestones(ttl_days)
+    if notif_status == "NONE":
+        return milestones["REMINDER_50"]
+    if notif_status == "REMINDER_50":
+        return milestones["REMINDER_80"]
+    if notif_status == "REMINDER_80":
+        return milestones["AUTO_RELEASED"]
+    return None
+
+
+async def _process_reservation_ttl(db: Session, customer, request, ttl_days: int, today: date):
+    """
+    Applies the reservation TTL rules to one FACILITY_RESERVED request
+    (50% / 80% reminders, auto-release at 100%). Does not commit.
+    Returns the active reservation exposure entry (None when there is none).
+    """
+    from app.models.models_issuance import IssuanceExposureEntry
+
+    # Find the reservation exposure entry
+    reservation = db.query(IssuanceExposureEntry).filter(
+        IssuanceExposureEntry.request_id == request.id,
+        IssuanceExposureEntry.entry_type == "RESERVATION",
+        IssuanceExposureEntry.is_active == True,
+    ).first()
+
+    if not reservation or not reservation.effective_date:
+        return None
+
+    days_since = (today - reservation.effective_date).days
+    milestones = _reservation_milestones(ttl_days)
+    ttl_50 = milestones["REMINDER_50"]
+    ttl_80 = milestones["REMINDER_80"]
+
+    # Track notification status on the request
+    notif_status = (request.metadata_json or {}).get("reservation_ttl_status", "NONE")
+
+    if days_since >= ttl_days:
+        # AUTO-RELEASE
+        reservation.is_active = False
+        db.add(reservation)
+
+        request.status = "APPROVED_INTERNAL"
+        request.selected_sub_limit_id = None
+        meta = request.metadata_json or {}
+        meta["reservation_ttl_status"] = "AUTO_RELEASED"
+        meta["auto_released_at"] = str(datetime.utcnow())
+        meta["auto_released_days"] = days_since
+        request.metadata_json = meta
+        db.add(request)
+
+        # Notify via in-app notification
+        await _send_reservation_notification(
+            db, customer, request,
+            f"⏰ Reservation auto-released for request #{request.id} "
+            f"({request.lg_ref_number or 'N/A'}) after {days_since} days. "
+            f"Please re-select a facility to proceed.",
+            "RESERVATION_AUTO_RELEASE"
+        )
+
+        log_action(
+            db, None, "RESERVATION_AUTO_RELEASED",
+            "IssuanceRequest", request.id,
+            {"days_since": days_since, "ttl_days": ttl_days},
+            customer.id
+        )
+
+        logger.info(f"Auto-released reservation for request {request.id} (age: {days_since}d, TTL: {ttl_days}d)")
+
+    elif days_since >= ttl_80 and notif_status in ["NONE", "REMINDER_50"]:
+        # 80% TTL REMINDER
+        remaining = ttl_days - days_since
+        await _send_reservation_notification(
+            db, customer, request,
+            f"⚠️ Reservation for request #{request.id} ({request.lg_ref_number or 'N/A'}) "
+            f"will auto-expire in {remaining} day(s). Please issue or cancel.",
+            "RESERVATION_TTL_WARNING"
+        )
+        meta = request.metadata_json or {}
+        meta["reservation_ttl_status"] = "REMINDER_80"
+        request.metadata_json = meta
+        db.add(request)
+
+    elif days_since >= ttl_50 and notif_status == "NONE":
+        # 50% TTL REMINDER
+        remaining = ttl_days - days_since
+        await _send_reservation_notification(
+            db, customer, request,
+            f"ℹ️ Reservation for request #{request.id} ({request.lg_ref_number or 'N/A'}) "
+            f"has been held for {days_since} days. {remaining} day(s) until auto-release.",
+            "RESERVATION_TTL_REMINDER"
+        )
+        meta = request.metadata_json or {}
+        meta["reservation_ttl_status"] = "REMINDER_50"
+        request.metadata_json = meta
+        db.add(request)
+
+    return reservation
+
+
 async def run_daily_reservation_ttl_check(db_param: Session = None):
     """
     C6: Checks facility reservations against TTL configuration.
@@ -1574,15 +1692,15 @@ async def run_daily_reservation_ttl_check(db_param: Session = None):
     - Notifies requestor + corp admin via email and in-app notification
     
     Default TTL: 14 days (configurable per customer via CustomerFormConfiguration.reservation_ttl_days)
+
+    Full sweep kept as a manual / safety-net entry point; reservations are
+    processed individually when due by the deadline scheduler.
     """
-    from app.models.models_issuance import (
-        IssuanceRequest, IssuanceExposureEntry, CustomerFormConfiguration
-    )
+    from app.models.models_issuance import IssuanceRequest
 
     db = db_param or SessionLocal()
     logger.info("--- START: Reservation TTL Check ---")
 
-    DEFAULT_TTL_DAYS = 14
     today = date.today()
 
     try:
@@ -1591,10 +1709,7 @@ async def run_daily_reservation_ttl_check(db_param: Session = None):
         for customer in customers:
             try:
                 # Get customer TTL config
-                config = db.query(CustomerFormConfiguration).filter(
-                    CustomerFormConfiguration.customer_id == customer.id
-                ).first()
-                ttl_days = getattr(config, 'reservation_ttl_days', None) or DEFAULT_TTL_DAYS
+                ttl_days = _get_reservation_ttl_days(db, customer.id)
 
                 # Find all FACILITY_RESERVED requests for this customer
                 reserved_requests = db.query(IssuanceRequest).filter(
@@ -1604,83 +1719,7 @@ async def run_daily_reservation_ttl_check(db_param: Session = None):
 
                 for request in reserved_requests:
                     try:
-                        # Find the reservation exposure entry
-                        reservation = db.query(IssuanceExposureEntry).filter(
-                            IssuanceExposureEntry.request_id == request.id,
-                            IssuanceExposureEntry.entry_type == "RESERVATION",
-                            IssuanceExposureEntry.is_active == True,
-                        ).first()
-
-                        if not reservation or not reservation.effective_date:
-                            continue
-
-                        days_since = (today - reservation.effective_date).days
-                        ttl_50 = int(ttl_days * 0.5)
-                        ttl_80 = int(ttl_days * 0.8)
-
-                        # Track notification status on the request
-                        notif_status = (request.metadata_json or {}).get("reservation_ttl_status", "NONE")
-
-                        if days_since >= ttl_days:
-                            # AUTO-RELEASE
-                            reservation.is_active = False
-                            db.add(reservation)
-
-                            request.status = "APPROVED_INTERNAL"
-                            request.selected_sub_limit_id = None
-                            meta = request.metadata_json or {}
-                            meta["reservation_ttl_status"] = "AUTO_RELEASED"
-                            meta["auto_released_at"] = str(datetime.utcnow())
-                            meta["auto_released_days"] = days_since
-                            request.metadata_json = meta
-                            db.add(request)
-
-                            # Notify via in-app notification
-                            await _send_reservation_notification(
-                                db, customer, request,
-                                f"⏰ Reservation auto-released for request #{request.id} "
-                                f"({request.lg_ref_number or 'N/A'}) after {days_since} days. "
-                                f"Please re-select a facility to proceed.",
-                                "RESERVATION_AUTO_RELEASE"
-                            )
-
-                            log_action(
-                                db, None, "RESERVATION_AUTO_RELEASED",
-                                "IssuanceRequest", request.id,
-                                {"days_since": days_since, "ttl_days": ttl_days},
-                                customer.id
-                            )
-
-                            logger.info(f"Auto-released reservation for request {request.id} (age: {days_since}d, TTL: {ttl_days}d)")
-
-                        elif days_since >= ttl_80 and notif_status in ["NONE", "REMINDER_50"]:
-                            # 80% TTL REMINDER
-                            remaining = ttl_days - days_since
-                            await _send_reservation_notification(
-                                db, customer, request,
-                                f"⚠️ Reservation for request #{request.id} ({request.lg_ref_number or 'N/A'}) "
-                                f"will auto-expire in {remaining} day(s). Please issue or cancel.",
-                                "RESERVATION_TTL_WARNING"
-                            )
-                            meta = request.metadata_json or {}
-                            meta["reservation_ttl_status"] = "REMINDER_80"
-                            request.metadata_json = meta
-                            db.add(request)
-
-                        elif days_since >= ttl_50 and notif_status == "NONE":
-                            # 50% TTL REMINDER
-                            remaining = ttl_days - days_since
-                            await _send_reservation_notification(
-                                db, customer, request,
-                                f"ℹ️ Reservation for request #{request.id} ({request.lg_ref_number or 'N/A'}) "
-                                f"has been held for {days_since} days. {remaining} day(s) until auto-release.",
-                                "RESERVATION_TTL_REMINDER"
-                            )
-                            meta = request.metadata_json or {}
-                            meta["reservation_ttl_status"] = "REMINDER_50"
-                            request.metadata_json = meta
-                            db.add(request)
-
+                        await _process_reservation_ttl(db, customer, request, ttl_days, today)
                     except Exception as req_err:
                         logger.error(f"Error processing reservation TTL for request {request.id}: {req_err}")
 
@@ -2308,31 +2347,158 @@ async def run_daily_issuance_maintenance_reminders(db: Session):
 # AUTO-REJECT EXPIRED CANCEL & EDIT REQUESTS
 # ==============================================================================
 
+def _get_max_pending_days(db: Session) -> Optional[int]:
+    """APPROVAL_REQUEST_MAX_PENDING_DAYS as an int, or None when not configured / invalid."""
+    from app.crud.crud import crud_global_configuration
+    max_pending_config = crud_global_configuration.get_by_key(
+        db, GlobalConfigKey.APPROVAL_REQUEST_MAX_PENDING_DAYS
+    )
+    if not max_pending_config or not max_pending_config.value_default:
+        return None
+    try:
+        return int(max_pending_config.value_default)
+    except (ValueError, TypeError):
+        logger.warning("Invalid APPROVAL_REQUEST_MAX_PENDING_DAYS value.")
+        return None
+
+
+def _get_pending_cancellation(db: Session, lg):
+    """
+    Returns (cancel_meta, linked_request) for a CANCEL_REQUESTED LG.
+    Cancel metadata lives on the linked IssuanceRequest (IssuedLGRecord has no
+    metadata_json); falls back to the CANCEL_REQUESTED custody_transfer_log entry.
+    """
+    from app.models.models_issuance import IssuanceRequest
+
+    linked_request = db.query(IssuanceRequest).filter(IssuanceRequest.lg_record_id == lg.id).first()
+    meta = dict(linked_request.metadata_json or {}) if linked_request and linked_request.metadata_json else {}
+    cancel_meta = meta.get("pending_cancellation")
+    if not cancel_meta:
+        for entry in reversed(lg.custody_transfer_log or []):
+            if entry.get("action") == "CANCEL_REQUESTED":
+                cancel_meta = {
+                    "previous_status": entry.get("previous_status", "INTERNAL_PROCESSING"),
+                    "requested_by_user_id": entry.get("user_id"),
+                    "requested_at": entry.get("timestamp"),
+                }
+                break
+    return cancel_meta or {}, linked_request
+
+
+def _auto_reject_issuance_cancel(db: Session, lg, max_days: int, cutoff: datetime) -> bool:
+    """Auto-rejects one CANCEL_REQUESTED LG if it was requested before cutoff. Does not commit."""
+    cancel_meta, linked_request = _get_pending_cancellation(db, lg)
+    requested_at_str = cancel_meta.get("requested_at")
+    if not requested_at_str:
+        return False
+
+    requested_at = datetime.fromisoformat(requested_at_str)
+    if requested_at > cutoff:
+        return False  # Not yet expired
+
+    # Auto-reject: restore previous status
+    previous_status = cancel_meta.get("previous_status", "INTERNAL_PROCESSING")
+    lg.status = previous_status
+
+    # Clean up metadata
+    if linked_request and linked_request.metadata_json:
+        meta = dict(linked_request.metadata_json)
+        meta.pop("pending_cancellation", None)
+        linked_request.metadata_json = meta
+
+    # Audit trail
+    ctl = list(lg.custody_transfer_log or [])
+    ctl.append({
+        "action": "CANCEL_AUTO_REJECTED",
+        "reason": f"Auto-rejected: exceeded {max_days} day approval window.",
+        "restored_status": previous_status,
+        "timestamp": datetime.utcnow().isoformat(),
+    })
+    lg.custody_transfer_log = ctl
+
+    log_action(db, None, "LG_CANCEL_AUTO_REJECTED",
+               "IssuedLGRecord", lg.id,
+               {"max_days": max_days, "restored_status": previous_status},
+               lg.customer_id)
+
+    # Notify requestor
+    try:
+        requestor_id = cancel_meta.get("requested_by_user_id")
+        if requestor_id:
+            _now = datetime.utcnow()
+            notif = SystemNotificationCreate(
+                content=f"Your cancellation request for LG {lg.lg_ref_number} was automatically "
+                        f"rejected — no admin response within {max_days} days.",
+                notification_type="LG_CANCEL_AUTO_REJECTED",
+                start_date=_now,
+                end_date=_now + timedelta(days=30),
+                target_user_ids=[requestor_id],
+                target_customer_ids=[lg.customer_id],
+            )
+            crud_system_notification.create(db, obj_in=notif, user_id=1)
+    except Exception:
+        pass
+
+    logger.info(f"Auto-rejected cancel request for LG {lg.id} ({lg.lg_ref_number})")
+    return True
+
+
+def _auto_reject_issuance_edit(db: Session, req, max_days: int, cutoff: datetime) -> bool:
+    """Auto-rejects one EDIT_REQUESTED IssuanceRequest if it was requested before cutoff. Does not commit."""
+    meta = dict(req.metadata_json or {})
+    edit_meta = meta.get("pending_edit", {})
+    requested_at_str = edit_meta.get("requested_at")
+    if not requested_at_str:
+        return False
+
+    requested_at = datetime.fromisoformat(requested_at_str)
+    if requested_at > cutoff:
+        return False
+
+    previous_status = edit_meta.get("previous_status", "APPROVED_INTERNAL")
+    req.status = previous_status
+
+    if "pending_edit" in meta:
+        del meta["pending_edit"]
+    req.metadata_json = meta
+
+    audit = list(req.approval_chain_audit or [])
+    audit.append({
+        "action": "EDIT_AUTO_REJECTED",
+        "reason": f"Auto-rejected: exceeded {max_days} day approval window.",
+        "restored_status": previous_status,
+        "timestamp": datetime.utcnow().isoformat(),
+    })
+    req.approval_chain_audit = audit
+
+    log_action(db, None, "ISSUANCE_EDIT_AUTO_REJECTED",
+               "IssuanceRequest", req.id,
+               {"max_days": max_days, "restored_status": previous_status},
+               req.customer_id)
+
+    logger.info(f"Auto-rejected edit request for request {req.id} ({req.serial_number})")
+    return True
+
+
 async def run_daily_issuance_approval_timeout(db: Session):
     """
     Auto-rejects LGs stuck in CANCEL_REQUESTED and IssuanceRequests stuck
     in EDIT_REQUESTED beyond the configured APPROVAL_REQUEST_MAX_PENDING_DAYS.
     Mirrors the ApprovalRequest auto-reject pattern.
+
+    Full sweep kept as a manual / safety-net entry point; individual requests
+    are auto-rejected on time by the deadline scheduler.
     """
     logger.info("Running daily issuance approval timeout check...")
 
     from app.models.models_issuance import IssuedLGRecord, IssuanceRequest
 
     # Get max pending days config
-    from app.crud.crud import crud_global_configuration
-    max_pending_config = crud_global_configuration.get_by_key(
-        db, GlobalConfigKey.APPROVAL_REQUEST_MAX_PENDING_DAYS
-    )
-    if not max_pending_config or not max_pending_config.value_default:
+    max_days = _get_max_pending_days(db)
+    if max_days is None:
         logger.info("APPROVAL_REQUEST_MAX_PENDING_DAYS not configured. Skipping issuance timeout.")
         return
 
-    try:
-        max_days = int(max_pending_config.value_default)
-    except (ValueError, TypeError):
-        logger.warning("Invalid APPROVAL_REQUEST_MAX_PENDING_DAYS value. Skipping.")
-        return
-
     cutoff = datetime.utcnow() - timedelta(days=max_days)
     auto_rejected_count = 0
 
@@ -2343,61 +2509,8 @@ async def run_daily_issuance_approval_timeout(db: Session):
 
     for lg in pending_cancels:
         try:
-            meta = dict(lg.metadata_json or {})
-            cancel_meta = meta.get("pending_cancellation", {})
-            requested_at_str = cancel_meta.get("requested_at")
-            if not requested_at_str:
-                continue
-
-            requested_at = datetime.fromisoformat(requested_at_str)
-            if requested_at > cutoff:
-                continue  # Not yet expired
-
-            # Auto-reject: restore previous status
-            previous_status = cancel_meta.get("previous_status", "INTERNAL_PROCESSING")
-            lg.status = previous_status
-
-            # Clean up metadata
-            if "pending_cancellation" in meta:
-                del meta["pending_cancellation"]
-            lg.metadata_json = meta
-
-            # Audit trail
-            ctl = list(lg.custody_transfer_log or [])
-            ctl.append({
-                "action": "CANCEL_AUTO_REJECTED",
-                "reason": f"Auto-rejected: exceeded {max_days} day approval window.",
-                "restored_status": previous_status,
-                "timestamp": datetime.utcnow().isoformat(),
-            })
-            lg.custody_transfer_log = ctl
-
-            log_action(db, None, "LG_CANCEL_AUTO_REJECTED",
-                       "IssuedLGRecord", lg.id,
-                       {"max_days": max_days, "restored_status": previous_status},
-                       lg.customer_id)
-
-            # Notify requestor
-            try:
-                requestor_id = cancel_meta.get("requested_by_user_id")
-                if requestor_id:
-                    _now = datetime.utcnow()
-                    notif = SystemNotificationCreate(
-                        content=f"Your cancellation request for LG {lg.lg_ref_number} was automatically "
-                                f"rejected — no admin response within {max_days} days.",
-                        notification_type="LG_CANCEL_AUTO_REJECTED",
-                        start_date=_now,
-                        end_date=_now + timedelta(days=30),
-                        target_user_ids=[requestor_id],
-                        target_customer_ids=[lg.customer_id],
-                    )
-                    crud_system_notification.create(db, obj_in=notif, user_id=1)
-            except Exception:
-                pass
-
-            auto_rejected_count += 1
-            logger.info(f"Auto-rejected cancel request for LG {lg.id} ({lg.lg_ref_number})")
-
+            if _auto_reject_issuance_cancel(db, lg, max_days, cutoff):
+                auto_rejected_count += 1
         except Exception as e:
             logger.error(f"Error auto-rejecting cancel for LG {lg.id}: {e}", exc_info=True)
 
@@ -2408,40 +2521,8 @@ async def run_daily_issuance_approval_timeout(db: Session):
 
     for req in pending_edits:
         try:
-            meta = dict(req.metadata_json or {})
-            edit_meta = meta.get("pending_edit", {})
-            requested_at_str = edit_meta.get("requested_at")
-            if not requested_at_str:
-                continue
-
-            requested_at = datetime.fromisoformat(requested_at_str)
-            if requested_at > cutoff:
-                continue
-
-            previous_status = edit_meta.get("previous_status", "APPROVED_INTERNAL")
-            req.status = previous_status
-
-            if "pending_edit" in meta:
-                del meta["pending_edit"]
-            req.metadata_json = meta
-
-            audit = list(req.approval_chain_audit or [])
-            audit.append({
-                "action": "EDIT_AUTO_REJECTED",
-                "reason": f"Auto-rejected: exceeded {max_days} day approval window.",
-                "restored_status": previous_status,
-                "timestamp": datetime.utcnow().isoformat(),
-            })
-            req.approval_chain_audit = audit
-
-            log_action(db, None, "ISSUANCE_EDIT_AUTO_REJECTED",
-                       "IssuanceRequest", req.id,
-                       {"max_days": max_days, "restored_status": previous_status},
-                       req.customer_id)
-
-            auto_rejected_count += 1
-            logger.info(f"Auto-rejected edit request for request {req.id} ({req.serial_number})")
-
+            if _auto_reject_issuance_edit(db, req, max_days, cutoff):
+                auto_rejected_count += 1
         except Exception as e:
             logger.error(f"Error auto-rejecting edit for request {req.id}: {e}", exc_info=True)
 
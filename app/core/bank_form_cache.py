@@ -0,0 +1,209 @@
+# app/core/bank_form_cache.py
+"""
+Versioned local cache of BankFormTemplate PDFs.
+
+Every fill used to download the bank's blank form from GCS and re-parse it
+(field extraction for the FILLABLE_PDF → SCANNED_FILL auto-detect, page
+geometry for overlays). Templates are immutable per (id, version, file_path,
+updated_at), so this store keeps, per template:
+
+  * the PDF bytes, in a bounded in-process LRU and on local disk
+    (BANK_FORM_CACHE_DIR) so other workers skip the download too;
+  * the parsed field catalogue and page geometry.
+
+A template re-upload or edit changes its version key and naturally misses.
+fill() / fill_batch() dispatch on the effective form type using the cached
+data; fill_batch() parses the template once for any number of requests.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv("BANK_FORM_CACHE_DIR", os.path.join(tempfile.gettempdir(), "bank_form_cache"))
+MAX_MEMORY_TEMPLATES = 64
+
+
+@dataclass
+class CachedFormTemplate:
+    template_id: int
+    version_key: str
+    pdf_bytes: bytes
+    field_catalogue: List[Dict[str, Any]] = field(default_factory=list)
+    page_sizes: List[Tuple[float, float]] = field(default_factory=list)
+
+    @property
+    def has_interactive_fields(self) -> bool:
+        return bool(self.field_catalogue)
+
+
+def template_version_key(form_template) -> str:
+    stamp = getattr(form_template, "updated_at", None) or getattr(form_template, "created_at", None)
+    raw = f"{form_template.id}|{getattr(form_template, 'version', 1)}|{form_template.file_path}|{stamp.isoformat() if stamp else ''}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def effective_form_type(form_template, cached: CachedFormTemplate) -> str:
+    """FILLABLE_PDF templates without interactive fields are filled as SCANNED_FILL."""
+    form_type = (form_template.form_type or "FILLABLE_PDF").upper()
+    if form_type == "FILLABLE_PDF" and not cached.has_interactive_fields:
+        logger.warning(f"Form '{form_template.name}' (id={form_template.id}) has no interactive PDF fields — auto-switching to SCANNED_FILL mode")
+        return "SCANNED_FILL"
+    return form_type
+
+
+def _download_template_bytes(file_path: str) -> bytes:
+    """Reads a bank form template PDF from GCS or local disk."""
+    if file_path.startswith("gs://"):
+        try:
+            from app.core.ai_integration import _get_gcs_client
+            bucket_name, blob_name = file_path[5:].split('/', 1)
+            client = _get_gcs_client()
+            if not client:
+                raise HTTPException(500, "GCS client not available.")
+            return client.bucket(bucket_name).blob(blob_name).download_as_bytes()
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(500, f"Failed to download PDF from cloud storage: {e}")
+    if os.path.exists(file_path):
+        with open(file_path, "rb") as f:
+            return f.read()
+    raise HTTPException(404, "PDF file not found.")
+
+
+class BankFormTemplateStore:
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_templates: int = MAX_MEMORY_TEMPLATES):
+        self.cache_dir = cache_dir
+        self.max_templates = max_templates
+        self._entries: "OrderedDict[int, CachedFormTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.downloads = 0
+
+    # ---------------- Disk layer ----------------
+
+    def _disk_path(self, template_id: int, version_key: str) -> str:
+        return os.path.join(self.cache_dir, f"{template_id}-{version_key}.pdf")
+
+    def _read_disk(self, template_id: int, version_key: str) -> Optional[bytes]:
+        try:
+            with open(self._disk_path(template_id, version_key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, template_id: int, version_key: str, data: bytes) -> None:
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Drop superseded versions of this template
+            prefix = f"{template_id}-"
+            for name in os.listdir(self.cache_dir):
+                if name.startswith(prefix) and name.endswith(".pdf") and name != f"{template_id}-{version_key}.pdf":
+                    try:
+                        os.remove(os.path.join(self.cache_dir, name))
+                    except OSError:
+                        pass
+            path = self._disk_path(template_id, version_key)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write bank form cache for template {template_id}: {e}")
+
+    # ---------------- Lookup ----------------
+
+    def get(self, form_template) -> CachedFormTemplate:
+        if not form_template.file_path:
+            raise HTTPException(400, "No PDF file associated with this form.")
+
+        version_key = template_version_key(form_template)
+        with self._lock:
+            cached = self._entries.get(form_template.id)
+            if cached is not None and cached.version_key == version_key:
+                self._entries.move_to_end(form_template.id)
+                self.hits += 1
+                return cached
+
+        pdf_bytes = self._read_disk(form_template.id, version_key)
+        if pdf_bytes is not None:
+            self.disk_hits += 1
+        else:
+            pdf_bytes = _download_template_bytes(form_template.file_path)
+            self.downloads += 1
+            self._write_disk(form_template.id, version_key, pdf_bytes)
+
+        cached = self._parse(form_template.id, version_key, pdf_bytes)
+        with self._lock:
+            self._entries[form_template.id] = cached
+            self._entries.move_to_end(form_template.id)
+            while len(self._entries) > self.max_templates:
+                self._entries.popitem(last=False)
+        return cached
+
+    @staticmethod
+    def _parse(template_id: int, version_key: str, pdf_bytes: bytes) -> CachedFormTemplate:
+        from app.core.pdf_form_filler import get_pdf_form_fields, get_pdf_page_sizes
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            from PyPDF2 import PdfReader
+        import io
+
+        try:
+            reader = PdfReader(io.BytesIO(pdf_bytes))
+            fields = get_pdf_form_fields(pdf_bytes, reader=reader)
+            page_sizes = get_pdf_page_sizes(pdf_bytes, reader=reader)
+        except Exception as e:
+            logger.warning(f"Could not parse bank form template {template_id}: {e}")
+            fields, page_sizes = [], None
+        return CachedFormTemplate(
+            template_id=template_id, version_key=version_key, pdf_bytes=pdf_bytes,
+            field_catalogue=fields, page_sizes=page_sizes,
+        )
+
+    def invalidate(self, template_id: int) -> None:
+        with self._lock:
+            self._entries.pop(template_id, None)
+
+    # ---------------- Fill ----------------
+
+    def fill(self, form_template, request_data: Dict[str, Any], lg_language: Optional[str] = None,
+             field_mapping: Optional[List[Dict[str, Any]]] = None) -> bytes:
+        """Fills one request using the cached template, bytes and geometry."""
+        return self.fill_batch(form_template, [request_data], [lg_language], field_mapping=field_mapping)[0]
+
+    def fill_batch(self, form_template, request_data_list: List[Dict[str, Any]],
+                   lg_languages: Optional[List[Optional[str]]] = None,
+                   field_mapping: Optional[List[Dict[str, Any]]] = None) -> List[bytes]:
+        """Fills many requests against the same template in one pass."""
+        from app.core.pdf_form_filler import fill_forms_batch
+
+        cached = self.get(form_template)
+        return fill_forms_batch(
+            cached.pdf_bytes,
+            field_mapping if field_mapping is not None else (form_template.field_mapping or []),
+            request_data_list,
+            form_type=effective_form_type(form_template, cached),
+            lg_languages=lg_languages,
+            page_sizes=cached.page_sizes,
+        )
+
+    def stats(self) -> Dict[str, int]:
+        return {"templates": len(self._entries), "hits": self.hits, "disk_hits": self.disk_hits, "downloads": self.downloads}
+
+
+bank_form_store = BankFormTemplateStore()
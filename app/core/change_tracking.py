@@ -0,0 +1,192 @@
+# app/core/change_tracking.py
+"""
+Commit-time side effects of ORM writes, from one set of session hooks.
+
+Caches and derived data (master data, LG detail graphs, approver
+directories, assistant answers, action-center work items, dashboard
+summaries, letter pre-renders, scheduler wake-ups, approval e-mails) react
+to writes the same way: look at what a flush wrote, remember what to do,
+do it once the transaction commits and forget it on rollback.
+
+Each of them registers a consumer here instead of its own after_flush /
+after_commit / after_rollback listeners:
+
+- collect(session, changes) runs after a flush that wrote one of the
+  consumer's models. The flush's new / dirty / deleted objects are grouped
+  by class once (FlushChanges) and shared by every consumer.
+- change_tracker.pending(session, name) is the consumer's per-transaction
+  state (created by its factory). collect() and any code outside the flush
+  add to it.
+- apply(session, pending) runs after commit with that state. The session is
+  no longer in a transaction there, so consumers that write use their own
+  connection. Pending state is dropped on rollback.
+- Savepoints (begin_nested) fire the same commit / rollback events; they
+  neither apply nor drop anything. State collected inside a savepoint that
+  rolls back is kept, so the outer commit may invalidate a little more than
+  it wrote, never less.
+- A session whose "commits" are themselves savepoints of a transaction it
+  does not own (join_transaction_mode="create_savepoint", as in the
+  benchmark harness) sees them as top-level commits. Such sessions set
+  session.info[SUPPRESS_COMMIT_HOOKS]; their commits drop the pending state
+  like a rollback instead of applying it.
+
+The modules in CONSUMER_MODULES are imported before the first dispatch, so
+every process (API workers, CLI commands, schedulers) runs the same side
+effects whatever it imported.
+"""
+
+import importlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+CONSUMER_MODULES = (
+    "app.core.master_data_cache",
+    "app.core.lg_detail_cache",
+    "app.core.deadline_scheduler",
+    "app.services.workflow_policy_engine",
+    "app.services.action_center_service",
+    "app.services.dashboard_summary_service",
+    "app.services.ai_query_context",
+    "app.services.letter_artifact_service",
+    "app.services.approval_notifications",
+)
+
+_PENDING_KEY = "_change_tracking_pending"
+SUPPRESS_COMMIT_HOOKS = "change_tracking_suppress_commit_hooks"
+
+
+class FlushChanges:
+    """The objects written by one flush, grouped by class."""
+
+    def __init__(self, session: Session):
+        self._buckets: Dict[str, Dict[type, List[Any]]] = {}
+        for name, objects in (("new", session.new), ("dirty", session.dirty), ("deleted", session.deleted)):
+            by_class: Dict[type, List[Any]] = {}
+            for obj in objects:
+                by_class.setdefault(type(obj), []).append(obj)
+            self._buckets[name] = by_class
+        self.classes = frozenset(cls for by_class in self._buckets.values() for cls in by_class)
+
+    def touches(self, models: Tuple[type, ...]) -> bool:
+        return any(issubclass(cls, models) for cls in self.classes)
+
+    def _objects(self, buckets: Tuple[str, ...], models: Tuple[type, ...]) -> Iterator[Any]:
+        for name in buckets:
+            for cls, objects in self._buckets[name].items():
+                if issubclass(cls, models):
+                    yield from objects
+
+    def new(self, *models: type) -> Iterator[Any]:
+        return self._objects(("new",), models)
+
+    def dirty(self, *models: type) -> Iterator[Any]:
+        return self._objects(("dirty",), models)
+
+    def deleted(self, *models: type) -> Iterator[Any]:
+        return self._objects(("deleted",), models)
+
+    def all(self, *models: type) -> Iterator[Any]:
+        return self._objects(("new", "dirty", "deleted"), models)
+
+
+class ChangeConsumer(NamedTuple):
+    name: str
+    models: Tuple[type, ...]
+    collect: Optional[Callable[[Session, FlushChanges], None]]
+    apply: Optional[Callable[[Session, Any], None]]
+    factory: Callable[[], Any]
+
+
+class ChangeTracker:
+
+    def __init__(self):
+        self._consumers: Dict[str, ChangeConsumer] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def register(self, name: str, models: Tuple[type, ...] = (),
+                 collect: Optional[Callable[[Session, FlushChanges], None]] = None,
+                 apply: Optional[Callable[[Session, Any], None]] = None,
+                 factory: Callable[[], Any] = set) -> ChangeConsumer:
+        """Registers a consumer; collect only runs for flushes that wrote one of `models`."""
+        consumer = ChangeConsumer(name, tuple(models), collect, apply, factory)
+        self._consumers[name] = consumer
+        return consumer
+
+    def pending(self, session: Session, name: str) -> Any:
+        """The consumer's state for the session's current transaction."""
+        pending = session.info.setdefault(_PENDING_KEY, {})
+        state = pending.get(name)
+        if state is None:
+            state = pending[name] = self._consumers[name].factory()
+        return state
+
+    def peek(self, session: Session, name: str) -> Any:
+        """The consumer's state for the current transaction, or None if it has none."""
+        pending = session.info.get(_PENDING_KEY)
+        return pending.get(name) if pending else None
+
+    def _load_consumers(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                for module in CONSUMER_MODULES:
+                    importlib.import_module(module)
+                self._loaded = True
+
+    # ---------------- Session events ----------------
+
+    def after_flush(self, session: Session) -> None:
+        self._load_consumers()
+        changes = FlushChanges(session)
+        if not changes.classes:
+            return
+        for consumer in list(self._consumers.values()):
+            if consumer.collect is not None and changes.touches(consumer.models):
+                consumer.collect(session, changes)
+
+    def after_commit(self, session: Session) -> None:
+        if session.in_nested_transaction():
+            return  # RELEASE SAVEPOINT: the outer transaction is still open
+        pending = session.info.pop(_PENDING_KEY, None)
+        if not pending or session.info.get(SUPPRESS_COMMIT_HOOKS):
+            return
+        for name, state in pending.items():
+            consumer = self._consumers[name]
+            if not state or consumer.apply is None:
+                continue
+            try:
+                consumer.apply(session, state)
+            except Exception as e:
+                logger.error(f"Commit hook '{name}' failed: {e}", exc_info=True)
+
+    @staticmethod
+    def after_rollback(session: Session) -> None:
+        if session.in_nested_transaction():
+            return
+        session.info.pop(_PENDING_KEY, None)
+
+
+change_tracker = ChangeTracker()
+
+
+@event.listens_for(Session, "after_flush")
+def _dispatch_flush(session: Session, flush_context):
+    change_tracker.after_flush(session)
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_commit(session: Session):
+    change_tracker.after_commit(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _dispatch_rollback(session: Session):
+    change_tracker.after_rollback(session)
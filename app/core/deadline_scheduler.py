@@ -0,0 +1,605 @@
+# app/core/deadline_scheduler.py
+"""
+Deadline Scheduler.
+
+Replaces the periodic full-table timeout sweeps (quotation approval windows,
+facility reservation TTLs, issuance cancel/edit approval windows and
+maker-checker approval windows) with a persistent queue of due times
+(ScheduledDeadline) and a single timer loop per worker:
+
+- Deadlines are upserted by the code paths that create or change the owning
+  entity (schedule_* helpers below), in the same transaction.
+- A deadline is cancelled by the flush that moves its entity out of the
+  status it waits for (RFQ approved, reservation released, approval request
+  decided, ...) or deletes it, so resolved entities do not fire later.
+- The loop sleeps until the earliest due item (or until woken by a commit that
+  scheduled something sooner), claims due rows with FOR UPDATE SKIP LOCKED so
+  that several gunicorn workers never process the same deadline, and runs the
+  registered handler for each. Claims, handlers and their commits run in a
+  worker thread (asyncio.to_thread), never on the API event loop; async
+  handlers run on a loop of their own in that thread.
+- Handlers re-validate the entity state, so stale deadlines (entity already
+  approved / released) are simply marked DONE. A handler may return a new due
+  time to reschedule (e.g. the next reservation TTL milestone).
+
+The cost of each tick therefore depends on the number of due items, not on
+the number of open RFQs, reservations or approval requests.
+"""
+
+import asyncio
+import inspect
+import logging
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from sqlalchemy import and_, cast, exists, func, or_, update, String
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.change_tracking import FlushChanges, change_tracker
+from app.database import SessionLocal
+from app.models.models_deadline import ScheduledDeadline
+
+logger = logging.getLogger(__name__)
+
+# --- Deadline types ---
+DEADLINE_RFQ_APPROVAL_WINDOW = "RFQ_APPROVAL_WINDOW"
+DEADLINE_RESERVATION_TTL = "RESERVATION_TTL"
+DEADLINE_ISSUANCE_CANCEL_TIMEOUT = "ISSUANCE_CANCEL_TIMEOUT"
+DEADLINE_ISSUANCE_EDIT_TIMEOUT = "ISSUANCE_EDIT_TIMEOUT"
+DEADLINE_APPROVAL_REQUEST_TIMEOUT = "APPROVAL_REQUEST_TIMEOUT"
+
+# --- Tuning ---
+MAX_IDLE_SECONDS = 15          # Upper bound on sleep, so other workers' new deadlines are seen quickly
+CLAIM_BATCH_SIZE = 50
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF_SECONDS = 60
+STALE_CLAIM_SECONDS = 600      # PROCESSING rows older than this are reclaimed (worker died mid-run)
+
+_CHANGE_CONSUMER = "deadline_scheduler"
+_RESOLUTION_CONSUMER = "deadline_resolution"
+
+HandlerResult = Optional[datetime]
+DeadlineHandler = Callable[[Session, ScheduledDeadline], Union[HandlerResult, Awaitable[HandlerResult]]]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_aware(value: datetime) -> datetime:
+    """Naive datetimes in this codebase are UTC (datetime.utcnow())."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _local_midnight(day: date) -> datetime:
+    """Start of a server-local calendar day (reservation TTLs count date.today() days)."""
+    return datetime.combine(day, dt_time.min).astimezone(timezone.utc)
+
+
+# ==============================================================================
+# 1. ENROLMENT
+# ==============================================================================
+
+def schedule_deadline(
+    db: Session,
+    deadline_type: str,
+    entity_type: str,
+    entity_id: Any,
+    due_at: datetime,
+    customer_id: Optional[int] = None,
+) -> None:
+    """
+    Upserts the pending deadline for (deadline_type, entity_id) in the current
+    transaction. Re-scheduling an entity replaces its due time and re-arms a
+    DONE / CANCELLED / FAILED row. The timer loop is woken after commit if the
+    new deadline is earlier than its next planned wake-up.
+    """
+    due_at = _as_aware(due_at)
+    entity_id = str(entity_id)
+    deadline = _locked_deadline(db, deadline_type, entity_id)
+    if deadline is None:
+        try:
+            with db.begin_nested():
+                db.add(ScheduledDeadline(
+                    deadline_type=deadline_type, entity_type=entity_type, entity_id=entity_id,
+                    customer_id=customer_id, due_at=due_at, status="PENDING", attempts=0,
+                ))
+        except IntegrityError:
+            # Enrolled concurrently by another transaction; re-arm that row
+            deadline = _locked_deadline(db, deadline_type, entity_id)
+    if deadline is not None:
+        deadline.due_at = due_at
+        deadline.status = "PENDING"
+        deadline.attempts = 0
+        deadline.claimed_at = None
+        deadline.processed_at = None
+        deadline.last_error = None
+        deadline.customer_id = customer_id
+        db.flush()
+
+    change_tracker.pending(db, _CHANGE_CONSUMER).append(due_at)
+
+
+def _locked_deadline(db: Session, deadline_type: str, entity_id: str) -> Optional[ScheduledDeadline]:
+    return db.query(ScheduledDeadline).filter(
+        ScheduledDeadline.deadline_type == deadline_type,
+        ScheduledDeadline.entity_id == entity_id,
+    ).with_for_update().first()
+
+
+def _cancel_pending(connection, deadline_type: str, entity_ids) -> None:
+    table = ScheduledDeadline.__table__
+    connection.execute(
+        update(table)
+        .where(table.c.deadline_type == deadline_type, table.c.entity_id.in_([str(i) for i in entity_ids]),
+               table.c.status == "PENDING")
+        .values(status="CANCELLED", processed_at=func.now(), updated_at=func.now())
+    )
+
+
+def cancel_deadline(db: Session, deadline_type: str, entity_id: Any) -> None:
+    """Cancels a pending deadline (entity resolved before its timeout)."""
+    _cancel_pending(db.connection(), deadline_type, [entity_id])
+
+
+def schedule_rfq_approval_deadline(db: Session, rfq) -> None:
+    """PENDING_APPROVAL RFQs are auto-rejected once window_end passes."""
+    if rfq.window_end:
+        schedule_deadline(db, DEADLINE_RFQ_APPROVAL_WINDOW, "QuotationRequest", rfq.id, rfq.window_end, rfq.customer_id)
+
+
+def schedule_reservation_deadline(db: Session, request, reserved_on: Optional[date] = None, notif_status: str = "NONE") -> None:
+    """Arms the next reservation TTL milestone (50% / 80% reminder, auto-release)."""
+    from app.core.background_tasks import _get_reservation_ttl_days, _next_reservation_milestone_day
+
+    ttl_days = _get_reservation_ttl_days(db, request.customer_id)
+    day_offset = _next_reservation_milestone_day(ttl_days, notif_status)
+    if day_offset is None:
+        return
+    reserved_on = reserved_on or date.today()
+    schedule_deadline(
+        db, DEADLINE_RESERVATION_TTL, "IssuanceRequest", request.id,
+        _local_midnight(reserved_on + timedelta(days=day_offset)), request.customer_id
+    )
+
+
+def _approval_window_due(db: Session, started_at: Optional[datetime]) -> Optional[datetime]:
+    from app.core.background_tasks import _get_max_pending_days
+
+    max_days = _get_max_pending_days(db)
+    if max_days is None:
+        return None
+    return _as_aware(started_at or _utcnow()) + timedelta(days=max_days)
+
+
+def schedule_issuance_cancel_deadline(db: Session, lg, requested_at: Optional[datetime] = None) -> None:
+    due_at = _approval_window_due(db, requested_at)
+    if due_at:
+        schedule_deadline(db, DEADLINE_ISSUANCE_CANCEL_TIMEOUT, "IssuedLGRecord", lg.id, due_at, lg.customer_id)
+
+
+def schedule_issuance_edit_deadline(db: Session, request, requested_at: Optional[datetime] = None) -> None:
+    due_at = _approval_window_due(db, requested_at)
+    if due_at:
+        schedule_deadline(db, DEADLINE_ISSUANCE_EDIT_TIMEOUT, "IssuanceRequest", request.id, due_at, request.customer_id)
+
+
+def schedule_approval_request_deadline(db: Session, approval_request, created_at: Optional[datetime] = None) -> None:
+    due_at = _approval_window_due(db, created_at)
+    if due_at:
+        schedule_deadline(
+            db, DEADLINE_APPROVAL_REQUEST_TIMEOUT, "ApprovalRequest", approval_request.id,
+            due_at, approval_request.customer_id
+        )
+
+
+# ==============================================================================
+# 2. TIMER LOOP
+# ==============================================================================
+
+class DeadlineScheduler:
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+        self._handlers: Dict[str, DeadlineHandler] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake_event: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._next_wake_at: Optional[datetime] = None
+        self._stopping = False
+
+    def register(self, deadline_type: str):
+        """Decorator registering the handler for a deadline type."""
+        def decorator(func: DeadlineHandler) -> DeadlineHandler:
+            self._handlers[deadline_type] = func
+            return func
+        return decorator
+
+    # ---------------- Lifecycle ----------------
+
+    def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake_event = asyncio.Event()
+        self._stopping = False
+        self._task = self._loop.create_task(self.run_forever())
+        logger.info("Deadline scheduler started.")
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._task:
+            self.wake()
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        logger.info("Deadline scheduler stopped.")
+
+    def wake(self, due_at: Optional[datetime] = None) -> None:
+        """Thread-safe: wakes the loop if due_at is earlier than its next planned wake-up."""
+        if not self._loop or not self._wake_event:
+            return
+        if due_at is not None and self._next_wake_at is not None and due_at >= self._next_wake_at:
+            return
+        self._loop.call_soon_threadsafe(self._wake_event.set)
+
+    async def run_forever(self) -> None:
+        while not self._stopping:
+            processed = 0
+            try:
+                processed = await self.process_due()
+            except Exception as e:
+                logger.error(f"Deadline scheduler tick failed: {e}", exc_info=True)
+
+            if processed >= CLAIM_BATCH_SIZE:
+                continue  # More due items waiting
+
+            sleep_for = MAX_IDLE_SECONDS
+            try:
+                next_due = await asyncio.to_thread(self._next_due_at)
+                if next_due is not None:
+                    sleep_for = max(0.0, min(MAX_IDLE_SECONDS, (next_due - _utcnow()).total_seconds()))
+            except Exception as e:
+                logger.error(f"Deadline scheduler could not read next due time: {e}")
+
+            self._next_wake_at = _utcnow() + timedelta(seconds=sleep_for)
+            self._wake_event.clear()
+            try:
+                await asyncio.wait_for(self._wake_event.wait(), timeout=sleep_for)
+            except asyncio.TimeoutError:
+                pass
+
+    def _next_due_at(self) -> Optional[datetime]:
+        db = self.session_factory()
+        try:
+            value = db.query(func.min(ScheduledDeadline.due_at)).filter(
+                ScheduledDeadline.status == "PENDING"
+            ).scalar()
+            return _as_aware(value) if value else None
+        finally:
+            db.close()
+
+    # ---------------- Processing ----------------
+
+    def _claim_due(self, now: datetime) -> List[int]:
+        stale_before = now - timedelta(seconds=STALE_CLAIM_SECONDS)
+        db = self.session_factory()
+        try:
+            rows = db.query(ScheduledDeadline).filter(
+                or_(
+                    and_(ScheduledDeadline.status == "PENDING", ScheduledDeadline.due_at <= now),
+                    and_(ScheduledDeadline.status == "PROCESSING", ScheduledDeadline.claimed_at < stale_before),
+                )
+            ).order_by(ScheduledDeadline.due_at.asc()).limit(CLAIM_BATCH_SIZE).with_for_update(skip_locked=True).all()
+
+            for row in rows:
+                row.status = "PROCESSING"
+                row.claimed_at = now
+                row.attempts = (row.attempts or 0) + 1
+            db.commit()
+            return [row.id for row in rows]
+        finally:
+            db.close()
+
+    async def process_due(self) -> int:
+        """Claims and processes every deadline due now. Returns the number claimed.
+        The database work runs in worker threads; the event loop only waits."""
+        deadline_ids = await asyncio.to_thread(self._claim_due, _utcnow())
+        for deadline_id in deadline_ids:
+            await asyncio.to_thread(self._process_one, deadline_id)
+        return len(deadline_ids)
+
+    def _process_one(self, deadline_id: int) -> None:
+        """Runs one claimed deadline's handler and records the outcome (worker thread, own session)."""
+        db = self.session_factory()
+        try:
+            self._run_handler(db, deadline_id)
+        finally:
+            db.close()
+
+    def _run_handler(self, db: Session, deadline_id: int) -> None:
+        deadline = db.get(ScheduledDeadline, deadline_id)
+        if not deadline:
+            return
+        handler = self._handlers.get(deadline.deadline_type)
+        if not handler:
+            deadline.status = "FAILED"
+            deadline.last_error = f"No handler registered for {deadline.deadline_type}"
+            db.commit()
+            return
+
+        try:
+            result = handler(db, deadline)
+            if inspect.isawaitable(result):
+                # Async handlers (e-mail notifications) get a loop of their own in this thread
+                result = asyncio.run(_awaited(result))
+            if result is not None:
+                deadline.status = "PENDING"
+                deadline.due_at = _as_aware(result)
+                deadline.attempts = 0
+                deadline.claimed_at = None
+            else:
+                deadline.status = "DONE"
+                deadline.processed_at = _utcnow()
+            deadline.last_error = None
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Deadline {deadline_id} ({deadline.deadline_type}) failed: {e}", exc_info=True)
+            deadline = db.get(ScheduledDeadline, deadline_id)
+            if deadline:
+                if (deadline.attempts or 0) >= MAX_ATTEMPTS:
+                    deadline.status = "FAILED"
+                else:
+                    deadline.status = "PENDING"
+                    deadline.due_at = _utcnow() + timedelta(seconds=RETRY_BACKOFF_SECONDS * deadline.attempts)
+                deadline.claimed_at = None
+                deadline.last_error = str(e)[:1000]
+                db.commit()
+
+
+async def _awaited(awaitable: Awaitable[HandlerResult]) -> HandlerResult:
+    return await awaitable
+
+
+deadline_scheduler = DeadlineScheduler()
+
+
+def _wake_scheduler_after_commit(session: Session, due_times: List[datetime]):
+    deadline_scheduler.wake(min(due_times))
+
+
+change_tracker.register(_CHANGE_CONSUMER, apply=_wake_scheduler_after_commit, factory=list)
+
+
+def _resolution_rules():
+    """(model, deadline type, status the deadline waits for) per deadline type."""
+    import app.models as models
+    from app.constants import ApprovalRequestStatusEnum
+    from app.models.models_issuance import IssuanceRequest, IssuedLGRecord
+    from app.models.models_quotation import QuotationRequest
+
+    return (
+        (QuotationRequest, DEADLINE_RFQ_APPROVAL_WINDOW, "PENDING_APPROVAL"),
+        (IssuanceRequest, DEADLINE_RESERVATION_TTL, "FACILITY_RESERVED"),
+        (IssuanceRequest, DEADLINE_ISSUANCE_EDIT_TIMEOUT, "EDIT_REQUESTED"),
+        (IssuedLGRecord, DEADLINE_ISSUANCE_CANCEL_TIMEOUT, "CANCEL_REQUESTED"),
+        (models.ApprovalRequest, DEADLINE_APPROVAL_REQUEST_TIMEOUT, ApprovalRequestStatusEnum.PENDING),
+    )
+
+
+def _cancel_resolved_deadlines(session: Session, changes: FlushChanges):
+    """
+    Cancels, in the flushing transaction, the pending deadlines of entities
+    this flush moved out of the awaited status or deleted. The handlers would
+    mark these DONE without acting once due; cancelling here keeps the queue
+    to live deadlines. A handler's own status change leaves its PROCESSING row alone.
+    """
+    from sqlalchemy import inspect as sa_inspect
+
+    for model, deadline_type, awaited in _resolution_rules():
+        resolved = [obj.id for obj in changes.deleted(model)]
+        for obj in changes.dirty(model):
+            status = sa_inspect(obj).attrs.status
+            if status.history.has_changes() and obj.status != awaited:
+                resolved.append(obj.id)
+            elif getattr(obj, "is_deleted", False) and sa_inspect(obj).attrs.is_deleted.history.has_changes():
+                resolved.append(obj.id)
+        if resolved:
+            _cancel_pending(session.connection(), deadline_type, resolved)
+
+
+def _resolution_models():
+    return tuple({model for model, _, _ in _resolution_rules()})
+
+
+change_tracker.register(_RESOLUTION_CONSUMER, models=_resolution_models(), collect=_cancel_resolved_deadlines)
+
+
+# ==============================================================================
+# 3. HANDLERS
+# ==============================================================================
+
+@deadline_scheduler.register(DEADLINE_RFQ_APPROVAL_WINDOW)
+def _handle_rfq_approval_window(db: Session, deadline: ScheduledDeadline) -> HandlerResult:
+    from app.models.models_quotation import QuotationRequest
+    from app.crud.crud_quotation import crud_quotation
+
+    rfq = db.query(QuotationRequest).filter(QuotationRequest.id == deadline.entity_id).first()
+    if not rfq or rfq.status != "PENDING_APPROVAL":
+        return None
+    if not crud_quotation.expire_if_window_passed(db, rfq):
+        return _as_aware(rfq.window_end)  # Window was extended
+    return None
+
+
+@deadline_scheduler.register(DEADLINE_RESERVATION_TTL)
+async def _handle_reservation_ttl(db: Session, deadline: ScheduledDeadline) -> HandlerResult:
+    import app.models as models
+    from app.models.models_issuance import IssuanceRequest
+    from app.core.background_tasks import (
+        _get_reservation_ttl_days, _next_reservation_milestone_day, _process_reservation_ttl
+    )
+
+    request = db.query(IssuanceRequest).filter(IssuanceRequest.id == int(deadline.entity_id)).first()
+    if not request or request.status != "FACILITY_RESERVED":
+        return None
+    customer = db.query(models.Customer).filter(models.Customer.id == request.customer_id).first()
+    if not customer or customer.is_deleted:
+        return None
+
+    ttl_days = _get_reservation_ttl_days(db, customer.id)
+    reservation = await _process_reservation_ttl(db, customer, request, ttl_days, date.today())
+    if not reservation or not reservation.effective_date:
+        return None
+
+    notif_status = (request.metadata_json or {}).get("reservation_ttl_status", "NONE")
+    day_offset = _next_reservation_milestone_day(ttl_days, notif_status)
+    if day_offset is None:
+        return None
+    return _local_midnight(reservation.effective_date + timedelta(days=day_offset))
+
+
+@deadline_scheduler.register(DEADLINE_ISSUANCE_CANCEL_TIMEOUT)
+def _handle_issuance_cancel_timeout(db: Session, deadline: ScheduledDeadline) -> HandlerResult:
+    from app.models.models_issuance import IssuedLGRecord
+    from app.core.background_tasks import _get_max_pending_days, _get_pending_cancellation, _auto_reject_issuance_cancel
+
+    lg = db.query(IssuedLGRecord).filter(IssuedLGRecord.id == int(deadline.entity_id)).first()
+    if not lg or lg.status != "CANCEL_REQUESTED":
+        return None
+    max_days = _get_max_pending_days(db)
+    if max_days is None:
+        return None
+
+    cutoff = datetime.utcnow() - timedelta(days=max_days)
+    if _auto_reject_issuance_cancel(db, lg, max_days, cutoff):
+        return None
+    # Not yet expired under the current configuration
+    requested_at_str = _get_pending_cancellation(db, lg)[0].get("requested_at")
+    if not requested_at_str:
+        return None
+    return _as_aware(datetime.fromisoformat(requested_at_str)) + timedelta(days=max_days)
+
+
+@deadline_scheduler.register(DEADLINE_ISSUANCE_EDIT_TIMEOUT)
+def _handle_issuance_edit_timeout(db: Session, deadline: ScheduledDeadline) -> HandlerResult:
+    from app.models.models_issuance import IssuanceRequest
+    from app.core.background_tasks import _get_max_pending_days, _auto_reject_issuance_edit
+
+    req = db.query(IssuanceRequest).filter(IssuanceRequest.id == int(deadline.entity_id)).first()
+    if not req or req.status != "EDIT_REQUESTED":
+        return None
+    max_days = _get_max_pending_days(db)
+    if max_days is None:
+        return None
+
+    cutoff = datetime.utcnow() - timedelta(days=max_days)
+    if _auto_reject_issuance_edit(db, req, max_days, cutoff):
+        return None
+    requested_at_str = (req.metadata_json or {}).get("pending_edit", {}).get("requested_at")
+    if not requested_at_str:
+        return None
+    return _as_aware(datetime.fromisoformat(requested_at_str)) + timedelta(days=max_days)
+
+
+@deadline_scheduler.register(DEADLINE_APPROVAL_REQUEST_TIMEOUT)
+def _handle_approval_request_timeout(db: Session, deadline: ScheduledDeadline) -> HandlerResult:
+    import app.models as models
+    from app.constants import ApprovalRequestStatusEnum
+    from app.core.background_tasks import _get_max_pending_days
+    from app.crud.crud_approval_request import crud_approval_request
+
+    req = db.query(models.ApprovalRequest).filter(models.ApprovalRequest.id == int(deadline.entity_id)).first()
+    if not req or req.status != ApprovalRequestStatusEnum.PENDING:
+        return None
+    max_days = _get_max_pending_days(db)
+    if max_days is None:
+        return None
+
+    due_at = _as_aware(req.created_at) + timedelta(days=max_days)
+    if due_at > _utcnow():
+        return due_at
+    crud_approval_request.auto_reject_request(db, req, max_days)
+    return None
+
+
+# ==============================================================================
+# 4. BACKFILL (daily safety net)
+# ==============================================================================
+
+def _missing_deadline(model_id_column, deadline_type: str):
+    """Filter clause: no PENDING / PROCESSING deadline of this type exists for the row."""
+    return ~exists().where(and_(
+        ScheduledDeadline.deadline_type == deadline_type,
+        ScheduledDeadline.entity_id == cast(model_id_column, String),
+        ScheduledDeadline.status.in_(("PENDING", "PROCESSING")),
+    ))
+
+
+async def run_daily_deadline_backfill(db: Session):
+    """
+    Enrols open rows that have no pending deadline (rows created before the
+    scheduler existed, or by a path that bypassed enrolment). Only rows
+    missing a deadline are loaded.
+    """
+    import app.models as models
+    from app.constants import ApprovalRequestStatusEnum
+    from app.models.models_quotation import QuotationRequest
+    from app.models.models_issuance import IssuanceRequest, IssuedLGRecord, IssuanceExposureEntry
+    from app.core.background_tasks import _get_pending_cancellation
+
+    logger.info("--- START: Deadline Backfill ---")
+    enrolled = 0
+
+    for rfq in db.query(QuotationRequest).filter(
+        QuotationRequest.status == "PENDING_APPROVAL",
+        _missing_deadline(QuotationRequest.id, DEADLINE_RFQ_APPROVAL_WINDOW),
+    ).all():
+        schedule_rfq_approval_deadline(db, rfq)
+        enrolled += 1
+
+    for request in db.query(IssuanceRequest).filter(
+        IssuanceRequest.status == "FACILITY_RESERVED",
+        _missing_deadline(IssuanceRequest.id, DEADLINE_RESERVATION_TTL),
+    ).all():
+        reservation = db.query(IssuanceExposureEntry).filter(
+            IssuanceExposureEntry.request_id == request.id,
+            IssuanceExposureEntry.entry_type == "RESERVATION",
+            IssuanceExposureEntry.is_active == True,
+        ).first()
+        if reservation and reservation.effective_date:
+            notif_status = (request.metadata_json or {}).get("reservation_ttl_status", "NONE")
+            schedule_reservation_deadline(db, request, reservation.effective_date, notif_status)
+            enrolled += 1
+
+    for lg in db.query(IssuedLGRecord).filter(
+        IssuedLGRecord.status == "CANCEL_REQUESTED",
+        _missing_deadline(IssuedLGRecord.id, DEADLINE_ISSUANCE_CANCEL_TIMEOUT),
+    ).all():
+        requested_at_str = _get_pending_cancellation(db, lg)[0].get("requested_at")
+        if requested_at_str:
+            schedule_issuance_cancel_deadline(db, lg, datetime.fromisoformat(requested_at_str))
+            enrolled += 1
+
+    for req in db.query(IssuanceRequest).filter(
+        IssuanceRequest.status == "EDIT_REQUESTED",
+        _missing_deadline(IssuanceRequest.id, DEADLINE_ISSUANCE_EDIT_TIMEOUT),
+    ).all():
+        requested_at_str = (req.metadata_json or {}).get("pending_edit", {}).get("requested_at")
+        if requested_at_str:
+            schedule_issuance_edit_deadline(db, req, datetime.fromisoformat(requested_at_str))
+            enrolled += 1
+
+    for ar in db.query(models.ApprovalRequest).filter(
+        models.ApprovalRequest.status == ApprovalRequestStatusEnum.PENDING,
+        _missing_deadline(models.ApprovalRequest.id, DEADLINE_APPROVAL_REQUEST_TIMEOUT),
+    ).all():
+        schedule_approval_request_deadline(db, ar, ar.created_at)
+        enrolled += 1
+
+    db.commit()
+    logger.info(f"--- FINISHED: Deadline Backfill ({enrolled} deadline(s) enrolled) ---")
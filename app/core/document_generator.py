@@ -6,16 +6,16 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-async def generate_pdf_from_html(html_content: str, filename_hint: str = "document") -> Optional[bytes]:
+def render_pdf_from_html(html_content: str, filename_hint: str = "document") -> Optional[bytes]:
     """
-    Generates a PDF from HTML content using WeasyPrint.
-    Returns the PDF as bytes.
+    Generates a PDF from HTML content using WeasyPrint (blocking; call it from a
+    worker thread in async code). Returns the PDF as bytes, or None on failure.
     """
     from weasyprint import HTML, CSS
-    logger.debug(f"generate_pdf_from_html: Attempting to generate PDF for '{filename_hint}'.")
-    logger.debug(f"generate_pdf_from_html: HTML content length: {len(html_content)} characters.")
+    logger.debug(f"render_pdf_from_html: Attempting to generate PDF for '{filename_hint}'.")
+    logger.debug(f"render_pdf_from_html: HTML content length: {len(html_content)} characters.")
     # You might want to log a snippet of html_content, but be careful with very large content
-    # logger.debug(f"generate_pdf_from_html: HTML content snippet: {html_content[:500]}...")
+    # logger.debug(f"render_pdf_from_html: HTML content snippet: {html_content[:500]}...")
 
     try:
         # Create an HTML object from the string content
@@ -23,8 +23,16 @@ async def generate_pdf_from_html(html_content: str, filename_hint: str = "docume
         
         pdf_bytes = html.write_pdf()
 
-        logger.info(f"generate_pdf_from_html: Successfully generated PDF bytes for '{filename_hint}' (size: {len(pdf_bytes)} bytes).")
+        logger.info(f"render_pdf_from_html: Successfully generated PDF bytes for '{filename_hint}' (size: {len(pdf_bytes)} bytes).")
         return pdf_bytes
     except Exception as e:
-        logger.error(f"generate_pdf_from_html: Error generating PDF from HTML for '{filename_hint}': {e}", exc_info=True)
+        logger.error(f"render_pdf_from_html: Error generating PDF from HTML for '{filename_hint}': {e}", exc_info=True)
         return None
+
+
+async def generate_pdf_from_html(html_content: str, filename_hint: str = "document") -> Optional[bytes]:
+    """
+    Generates a PDF from HTML content using WeasyPrint.
+    Returns the PDF as bytes.
+    """
+    return render_pdf_from_html(html_content, filename_hint)
@@ -0,0 +1,191 @@
+# app/core/letter_artifacts.py
+"""
+Immutable store of rendered instruction-letter PDFs.
+
+A letter is fully determined by its template and its placeholder values, so
+each render is kept as an artifact keyed by
+
+    (kind, source id, template version, data hash)
+
+kind is "lg_instruction" (custody LGInstruction) or "maintenance_letter"
+(IssuanceMaintenanceAction). The template version is a hash of the
+template's id, timestamp and content. The data hash covers every
+placeholder value. Editing the template or anything shown on the letter
+changes the key, and the next view renders a new artifact; a key is never
+overwritten.
+
+Artifacts live in a bounded in-process LRU and on disk (LETTER_ARTIFACT_DIR)
+so other workers on the host skip the render too. Their ETag is the SHA-256
+of the PDF bytes (a strong validator). pdf_response() answers If-None-Match
+with 304.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+from app.core.master_data_cache import etag_matches
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_DIR = os.getenv("LETTER_ARTIFACT_DIR", os.path.join(tempfile.gettempdir(), "letter_artifacts"))
+MAX_MEMORY_ARTIFACTS = int(os.getenv("LETTER_ARTIFACT_MEMORY_ITEMS", "256"))
+LETTER_CACHE_CONTROL = "private, no-cache"
+
+
+@dataclass(frozen=True)
+class LetterArtifact:
+    kind: str
+    source_id: int
+    template_key: str
+    data_hash: str
+    pdf_bytes: bytes
+    etag: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.kind}/{self.source_id}/{self.template_key}-{self.data_hash}"
+
+
+def template_version_key(template) -> str:
+    stamp = getattr(template, "updated_at", None) or getattr(template, "created_at", None)
+    raw = f"{template.id}|{stamp.isoformat() if stamp else ''}|{template.content or ''}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def data_hash(data: Dict[str, Any]) -> str:
+    raw = json.dumps(data, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def fill_template(content: str, data: Dict[str, Any]) -> str:
+    """Replaces every {{key}} placeholder with its value (None -> empty)."""
+    for key, value in data.items():
+        content = content.replace(f"{{{{{key}}}}}", str(value) if value is not None else "")
+    return content
+
+
+def _etag_for(pdf_bytes: bytes) -> str:
+    return f'"{hashlib.sha256(pdf_bytes).hexdigest()[:32]}"'
+
+
+class LetterArtifactStore:
+
+    def __init__(self, artifact_dir: str = ARTIFACT_DIR, max_items: int = MAX_MEMORY_ARTIFACTS):
+        self.artifact_dir = artifact_dir
+        self.max_items = max_items
+        self._entries: "OrderedDict[str, LetterArtifact]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.renders = 0
+
+    # ---------------- Disk layer ----------------
+
+    def _source_dir(self, kind: str, source_id: int) -> str:
+        return os.path.join(self.artifact_dir, kind, str(source_id))
+
+    def _read_disk(self, kind: str, source_id: int, name: str) -> Optional[bytes]:
+        try:
+            with open(os.path.join(self._source_dir(kind, source_id), name), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, kind: str, source_id: int, name: str, data: bytes) -> None:
+        try:
+            directory = self._source_dir(kind, source_id)
+            os.makedirs(directory, exist_ok=True)
+            # Drop superseded renders of this letter
+            for existing in os.listdir(directory):
+                if existing != name and existing.endswith(".pdf"):
+                    try:
+                        os.remove(os.path.join(directory, existing))
+                    except OSError:
+                        pass
+            path = os.path.join(directory, name)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write letter artifact {kind}/{source_id}: {e}")
+
+    # ---------------- Lookup ----------------
+
+    def _remember(self, artifact: LetterArtifact) -> None:
+        with self._lock:
+            self._entries[artifact.key] = artifact
+            self._entries.move_to_end(artifact.key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def get_or_render(self, kind: str, source_id: int, template, data: Dict[str, Any],
+                      filename_hint: Optional[str] = None) -> Optional[LetterArtifact]:
+        """
+        The artifact for this template and data, rendering it on first use.
+        Blocking (WeasyPrint); async callers use aget_or_render(). Returns None
+        when rendering fails.
+        """
+        template_key = template_version_key(template)
+        digest = data_hash(data)
+        key = f"{kind}/{source_id}/{template_key}-{digest}"
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+
+        name = f"{template_key}-{digest}.pdf"
+        pdf_bytes = self._read_disk(kind, source_id, name)
+        if pdf_bytes is not None:
+            self.disk_hits += 1
+        else:
+            from app.core.document_generator import render_pdf_from_html
+
+            pdf_bytes = render_pdf_from_html(fill_template(template.content, data), filename_hint or f"{kind}_{source_id}")
+            if not pdf_bytes:
+                return None
+            self.renders += 1
+            self._write_disk(kind, source_id, name, pdf_bytes)
+
+        artifact = LetterArtifact(
+            kind=kind, source_id=source_id, template_key=template_key, data_hash=digest,
+            pdf_bytes=pdf_bytes, etag=_etag_for(pdf_bytes),
+        )
+        self._remember(artifact)
+        return artifact
+
+    async def aget_or_render(self, kind: str, source_id: int, template, data: Dict[str, Any],
+                             filename_hint: Optional[str] = None) -> Optional[LetterArtifact]:
+        """get_or_render() off the event loop."""
+        return await asyncio.to_thread(self.get_or_render, kind, source_id, template, data, filename_hint)
+
+    def stats(self) -> Dict[str, int]:
+        return {"artifacts": len(self._entries), "hits": self.hits, "disk_hits": self.disk_hits, "renders": self.renders}
+
+
+def pdf_response(request: Request, artifact: LetterArtifact, filename: str) -> Response:
+    """Inline PDF response with the artifact's strong ETag; 304 on If-None-Match."""
+    headers = {
+        "ETag": artifact.etag,
+        "Cache-Control": LETTER_CACHE_CONTROL,
+        "Content-Disposition": f'inline; filename="{filename}"',
+    }
+    if etag_matches(request.headers.get("if-none-match"), artifact.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=artifact.pdf_bytes, media_type="application/pdf", headers=headers)
+
+
+letter_artifact_store = LetterArtifactStore()
@@ -0,0 +1,304 @@
+# app/core/lg_detail_cache.py
+"""
+Versioned read-through cache of custody LG detail graphs
+(crud_lg_record.get_lg_record_with_relations).
+
+The detail page, every action endpoint (extend, release, liquidate, decrease,
+amend, activate, owner change) and the approval flow load the same LGRecord
+with its lookups, documents and instructions, often several times per request.
+
+Two layers:
+- Request identity map (session.info): a second lookup of the same LG in one
+  transaction returns the already loaded object without a query. Dropped on
+  commit / rollback.
+- Shared graph cache (this process): the loaded graph, detached, stored per LG
+  id with its version key: lg_records.version plus the updated_at of the LG's
+  internal owner contact and beneficiary entity. A lookup is one primary-key
+  query for the key; on a match the graph is merged into the session with
+  merge(load=False), which emits no SQL. The detail route also keeps the
+  serialized response per key, with an ETag.
+
+lg_records.version is bumped in SQL by the flush that changes the LG or one of
+its instructions / documents, so other workers' writes miss too. An owner
+contact or entity change moves its updated_at, which only misses the LGs that
+are looked up afterwards; nothing is written to lg_records for it. Lookup
+tables (banks, currencies, statuses, ...) are not versioned; an entry lives at
+most LG_DETAIL_CACHE_TTL_SECONDS.
+
+The shared cache is bypassed while the session has pending changes, already
+holds the LG, or has written LG rows in this transaction, and whenever the
+committed graph does not match the key the session sees (read-your-writes);
+the graph is then loaded in the session as before.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type
+
+from fastapi import Request, Response
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from app.core.change_tracking import FlushChanges, change_tracker
+from app.core.master_data_cache import etag_matches
+from app.models import CustomerEntity, InternalOwnerContact, LGDocument, LGInstruction, LGRecord
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL_SECONDS = int(os.getenv("LG_DETAIL_CACHE_TTL_SECONDS", "300"))
+MAX_CACHED_LGS = int(os.getenv("LG_DETAIL_CACHE_MAX_ITEMS", "2000"))
+DETAIL_CACHE_CONTROL = "private, no-cache"
+
+_CHANGE_CONSUMER = "lg_detail_cache"
+_REQUEST_MAP_CONSUMER = "lg_detail_request_map"
+
+# (lg_records.version, owner contact updated_at, beneficiary entity updated_at)
+VersionKey = Tuple[Any, ...]
+
+# loader(db, lg_record_id, customer_id, user_has_all_access, user_allowed_entity_ids) -> LGRecord | None
+Loader = Callable[[Session, int, Optional[int], bool, List[int]], Optional[LGRecord]]
+
+
+class LGDetailEntry:
+    """A detached LG graph at one version key, and its serialized responses."""
+
+    __slots__ = ("key", "loaded_at", "record", "payloads")
+
+    def __init__(self, key: VersionKey, record: LGRecord):
+        self.key = key
+        self.loaded_at = time.monotonic()
+        self.record = record
+        self.payloads: Dict[Type, Tuple[bytes, str]] = {}
+
+
+class LGDetailCache:
+
+    def __init__(self, ttl_seconds: int = CACHE_TTL_SECONDS, max_items: int = MAX_CACHED_LGS):
+        self.ttl_seconds = ttl_seconds
+        self.max_items = max_items
+        self._entries: "OrderedDict[int, LGDetailEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.request_hits = 0
+        self.loads = 0
+        self.bypasses = 0
+
+    # ---------------- Access checks ----------------
+
+    @staticmethod
+    def _visible(lg: LGRecord, customer_id: Optional[int], user_has_all_access: bool,
+                 user_allowed_entity_ids: List[int]) -> bool:
+        """The filters of get_lg_record_with_relations, applied to a loaded LG."""
+        if lg.is_deleted:
+            return False
+        if customer_id is not None and lg.customer_id != customer_id:
+            return False
+        if not user_has_all_access and lg.beneficiary_corporate_id not in (user_allowed_entity_ids or ()):
+            return False
+        return True
+
+    @staticmethod
+    def _key_query(lg_record_id: int):
+        return (
+            select(LGRecord.version, InternalOwnerContact.updated_at, CustomerEntity.updated_at)
+            .outerjoin(InternalOwnerContact, InternalOwnerContact.id == LGRecord.internal_owner_contact_id)
+            .outerjoin(CustomerEntity, CustomerEntity.id == LGRecord.beneficiary_corporate_id)
+            .where(LGRecord.id == lg_record_id, LGRecord.is_deleted == False)
+        )
+
+    def _version_key(self, db: Session, lg_record_id: int, customer_id: Optional[int], user_has_all_access: bool,
+                     user_allowed_entity_ids: List[int]) -> Optional[VersionKey]:
+        """The LG's current version key if it is visible with these filters (one primary-key lookup)."""
+        if not user_has_all_access and not user_allowed_entity_ids:
+            return None
+        query = self._key_query(lg_record_id)
+        if customer_id is not None:
+            query = query.where(LGRecord.customer_id == customer_id)
+        if not user_has_all_access:
+            query = query.where(LGRecord.beneficiary_corporate_id.in_(user_allowed_entity_ids))
+        row = db.execute(query).first()
+        return tuple(row) if row is not None else None
+
+    def _shared_usable(self, db: Session, lg_record_id: int) -> bool:
+        written = change_tracker.peek(db, _CHANGE_CONSUMER)
+        if written and lg_record_id in written:
+            return False
+        if db.new or db.dirty or db.deleted:
+            return False
+        # merge() would overwrite the session's own copy
+        return identity_key(LGRecord, lg_record_id) not in db.identity_map
+
+    # ---------------- Shared graphs ----------------
+
+    def _fresh_entry(self, lg_record_id: int, key: VersionKey) -> Optional[LGDetailEntry]:
+        with self._lock:
+            entry = self._entries.get(lg_record_id)
+            if entry is None or entry.key != key or time.monotonic() - entry.loaded_at >= self.ttl_seconds:
+                return None
+            self._entries.move_to_end(lg_record_id)
+            self.hits += 1
+            return entry
+
+    def _load_entry(self, db: Session, lg_record_id: int, loader: Loader) -> Optional[LGDetailEntry]:
+        """
+        Loads the graph in a private session on its own connection, so the
+        cached objects are detached, clean and hold committed data only. The
+        key is read first: a commit landing in between leaves an entry newer
+        than its key, which the next lookup just reloads.
+        """
+        private = Session(bind=db.get_bind().engine)
+        try:
+            row = private.execute(self._key_query(lg_record_id)).first()
+            record = loader(private, lg_record_id, None, True, []) if row is not None else None
+            if record is None:
+                return None
+            entry = LGDetailEntry(tuple(row), record)
+        finally:
+            private.close()
+        with self._lock:
+            self.loads += 1
+            self._entries[lg_record_id] = entry
+            self._entries.move_to_end(lg_record_id)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _shared_entry(self, db: Session, lg_record_id: int, customer_id: Optional[int], user_has_all_access: bool,
+                      user_allowed_entity_ids: List[int], loader: Loader) -> Tuple[bool, Optional[LGDetailEntry]]:
+        """
+        (visible, entry). entry is None for a visible LG whose committed graph
+        does not match the key this session sees (its own uncommitted writes
+        to the owner or entity, or a concurrent commit); load it in the session.
+        """
+        key = self._version_key(db, lg_record_id, customer_id, user_has_all_access, user_allowed_entity_ids)
+        if key is None:
+            return False, None
+        entry = self._fresh_entry(lg_record_id, key) or self._load_entry(db, lg_record_id, loader)
+        if entry is None or entry.key != key:
+            return True, None
+        return True, entry
+
+    # ---------------- Read ----------------
+
+    def get(self, db: Session, lg_record_id: int, customer_id: Optional[int], user_has_all_access: bool,
+            user_allowed_entity_ids: List[int], loader: Loader) -> Optional[LGRecord]:
+        """The LG with its relations, attached to db, or None if missing / not accessible."""
+        request_map: Dict[int, LGRecord] = change_tracker.pending(db, _REQUEST_MAP_CONSUMER)
+        lg = request_map.get(lg_record_id)
+        if lg is not None and lg in db:
+            self.request_hits += 1
+            return lg if self._visible(lg, customer_id, user_has_all_access, user_allowed_entity_ids) else None
+
+        entry = None
+        if self._shared_usable(db, lg_record_id):
+            visible, entry = self._shared_entry(db, lg_record_id, customer_id, user_has_all_access, user_allowed_entity_ids, loader)
+            if not visible:
+                return None
+        if entry is None:
+            return self._load_in_session(db, lg_record_id, customer_id, user_has_all_access, user_allowed_entity_ids, loader)
+        lg = request_map[lg_record_id] = db.merge(entry.record, load=False)
+        return lg
+
+    def _load_in_session(self, db: Session, lg_record_id: int, customer_id: Optional[int], user_has_all_access: bool,
+                         user_allowed_entity_ids: List[int], loader: Loader) -> Optional[LGRecord]:
+        self.bypasses += 1
+        lg = loader(db, lg_record_id, customer_id, user_has_all_access, user_allowed_entity_ids)
+        if lg is not None:
+            change_tracker.pending(db, _REQUEST_MAP_CONSUMER)[lg_record_id] = lg
+        return lg
+
+    def detail_response(self, request: Request, db: Session, lg_record_id: int, customer_id: Optional[int],
+                        user_has_all_access: bool, user_allowed_entity_ids: List[int], schema: Type,
+                        loader: Loader) -> Optional[Response]:
+        """
+        The LG serialized with `schema` as a JSON response (ETag / If-None-Match
+        supported), or None if missing / not accessible. Serialized once per version key.
+        """
+        entry = None
+        if self._shared_usable(db, lg_record_id):
+            visible, entry = self._shared_entry(db, lg_record_id, customer_id, user_has_all_access, user_allowed_entity_ids, loader)
+            if not visible:
+                return None
+            if entry is None:
+                lg = self._load_in_session(db, lg_record_id, customer_id, user_has_all_access, user_allowed_entity_ids, loader)
+        else:
+            lg = self.get(db, lg_record_id, customer_id, user_has_all_access, user_allowed_entity_ids, loader)
+
+        if entry is not None:
+            cached = entry.payloads.get(schema)
+            if cached is None:
+                lg = db.merge(entry.record, load=False)
+                change_tracker.pending(db, _REQUEST_MAP_CONSUMER)[lg_record_id] = lg
+                cached = entry.payloads[schema] = _payload(schema, lg)
+        elif lg is None:
+            return None
+        else:
+            cached = _payload(schema, lg)
+
+        body, etag = cached
+        headers = {"ETag": etag, "Cache-Control": DETAIL_CACHE_CONTROL}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    # ---------------- Invalidation ----------------
+
+    def invalidate(self, lg_record_ids: Optional[Set[int]] = None) -> None:
+        """Drops cached graphs of these LGs (every LG's when None)."""
+        with self._lock:
+            if lg_record_ids is None:
+                self._entries.clear()
+                return
+            for lg_record_id in lg_record_ids:
+                self._entries.pop(lg_record_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "request_hits": self.request_hits,
+                "loads": self.loads, "bypasses": self.bypasses}
+
+
+def _payload(schema: Type, lg: LGRecord) -> Tuple[bytes, str]:
+    body = schema.model_validate(lg).model_dump_json(by_alias=True).encode()
+    return body, f'"{hashlib.sha1(body).hexdigest()[:24]}"'
+
+
+lg_detail_cache = LGDetailCache()
+
+
+# ==============================================================================
+# CHANGE TRACKING: version bumps for changed LGs, request-map lifetime
+# ==============================================================================
+
+def _bump_lg_versions(session: Session, changes: FlushChanges):
+    lg_ids: Set[int] = set()
+    for obj in changes.dirty(LGRecord):
+        if session.is_modified(obj, include_collections=False):
+            lg_ids.add(obj.id)
+    lg_ids.update(obj.lg_record_id for obj in changes.all(LGInstruction, LGDocument))
+    lg_ids.update(obj.id for obj in changes.deleted(LGRecord))
+    lg_ids.discard(None)
+    if not lg_ids:
+        return
+
+    table = LGRecord.__table__
+    session.connection().execute(update(table).where(table.c.id.in_(lg_ids)).values(version=table.c.version + 1))
+    change_tracker.pending(session, _CHANGE_CONSUMER).update(lg_ids)
+
+
+def _apply_lg_detail_invalidations(session: Session, written: Set[int]):
+    lg_detail_cache.invalidate(written)
+
+
+change_tracker.register(
+    _CHANGE_CONSUMER,
+    models=(LGRecord, LGInstruction, LGDocument),
+    collect=_bump_lg_versions,
+    apply=_apply_lg_detail_invalidations,
+)
+# Per-transaction identity map of loaded LG graphs; dropped on commit / rollback
+change_tracker.register(_REQUEST_MAP_CONSUMER, factory=dict)
@@ -259,6 +259,91 @@ class LGValidationService:
         
         return {} # Return empty dict for no errors
         
+    def validate_lg_data_chunk(self, records: List[Dict[str, Any]], master_data: Any) -> List[Dict[str, Any]]:
+        """
+        Same rules as validate_lg_data(context='migration') for a whole chunk of
+        records, checked against preloaded MigrationMasterData maps instead of
+        a query per lookup. Returns one error dict per record, in order.
+        """
+        mandatory_fields = [
+            "lg_number", "lg_amount", "lg_currency_id", "issuance_date", "expiry_date",
+            "lg_type_id", "description_purpose", "issuer_name", "beneficiary_corporate_id",
+            "issuing_bank_id", "issuing_bank_address", "issuing_bank_phone",
+            "issuing_method_id", "applicable_rule_id", "internal_owner_contact_id",
+            "lg_category_id"
+        ]
+        id_sets = {
+            "lg_currency_id": master_data.currency_ids,
+            "lg_payable_currency_id": master_data.currency_ids,
+            "issuing_method_id": master_data.issuing_method_ids,
+            "applicable_rule_id": master_data.rule_names,
+            "lg_type_id": master_data.lg_type_names,
+            "lg_operational_status_id": master_data.operational_status_ids,
+            "beneficiary_corporate_id": master_data.entity_codes,
+            "issuing_bank_id": master_data.banks,
+        }
+        model_names = {
+            "lg_currency_id": "Currency", "lg_payable_currency_id": "Currency", "issuing_method_id": "IssuingMethod",
+            "applicable_rule_id": "Rule", "lg_type_id": "LgType", "lg_operational_status_id": "LgOperationalStatus",
+            "beneficiary_corporate_id": "CustomerEntity", "issuing_bank_id": "Bank",
+        }
+
+        results = []
+        for record_data in records:
+            raw_errors = {field: "Missing or empty field." for field in mandatory_fields if not record_data.get(field)}
+
+            if record_data.get("lg_amount"):
+                try:
+                    if float(record_data["lg_amount"]) <= 0:
+                        raw_errors["lg_amount"] = "Invalid number format."
+                except (ValueError, TypeError):
+                    raw_errors["lg_amount"] = "Invalid number format."
+
+            dates = {}
+            for field in ("issuance_date", "expiry_date"):
+                if record_data.get(field):
+                    try:
+                        dates[field] = datetime.strptime(str(record_data[field]), "%Y-%m-%d").date()
+                    except (ValueError, TypeError):
+                        raw_errors.setdefault(field, "Invalid date format.")
+            if len(dates) == 2 and dates["expiry_date"] <= dates["issuance_date"]:
+                raw_errors["expiry_date"] = "Must be after issuance date."
+
+            lg_type_id = record_data.get("lg_type_id")
+            if isinstance(lg_type_id, int) and master_data.lg_type_names.get(lg_type_id) == "Advance Payment LG":
+                if not record_data.get("lg_operational_status_id"):
+                    raw_errors["lg_operational_status_id"] = "Missing or empty field."
+
+            rule_id = record_data.get("applicable_rule_id")
+            if isinstance(rule_id, int) and master_data.rule_names.get(rule_id) == "Other" and not record_data.get("applicable_rules_text"):
+                raw_errors["applicable_rules_text"] = "Missing or empty field."
+
+            category_input = record_data.get("lg_category_id")
+            if category_input:
+                if isinstance(category_input, int):
+                    category = master_data.categories.get(category_input)
+                elif isinstance(category_input, str):
+                    category = master_data.categories.get(master_data.category_id(category_input))
+                else:
+                    category = None
+                if category and category["is_mandatory"]:
+                    if not record_data.get("additional_field_values"):
+                        raw_errors["additional_field_values"] = "Missing or empty field."
+                elif not category:
+                    raw_errors["lg_category_id"] = "Category not found."
+
+            for field, known_ids in id_sets.items():
+                field_value = record_data.get(field)
+                if field_value and isinstance(field_value, int) and field_value not in known_ids:
+                    raw_errors[field] = f"{model_names[field]} not found."
+
+            owner_id = record_data.get("internal_owner_contact_id")
+            if owner_id and isinstance(owner_id, int) and owner_id not in master_data.owner_ids:
+                raw_errors["internal_owner_contact_id"] = "Invalid internal owner ID: must exist and belong to this customer."
+
+            results.append({field: self._get_enhanced_error(field, msg) for field, msg in raw_errors.items()})
+        return results
+
     def validate_lg_instruction_data(self, record_data: Dict[str, Any], context: str = 'migration', db: Optional[Any] = None, customer_id: Optional[int] = None) -> Dict[str, Any]:
         """
         Performs focused validation on LG instruction data.
@@ -0,0 +1,236 @@
+# app/core/master_data_cache.py
+"""
+Versioned in-process cache of the global master-data tables (banks,
+currencies, LG types, rules, issuing methods, LG statuses, operational
+statuses).
+
+These tables change a few times a year but are read by every form load, FX
+lookup, migration row and validation pass. Each table is loaded once into
+immutable row snapshots (namedtuples with the model's column attributes) and
+indexed by id, name, ISO code and SWIFT code, so lookups are dict hits.
+
+Freshness:
+- Every flush that writes a master-data row (the crud create / update /
+  soft_delete / restore methods, or any direct ORM change) marks the table on
+  the session; the commit bumps the table's version and drops the snapshot.
+  A rollback discards the mark.
+- While a session holds uncommitted master-data writes, its lookups bypass
+  the cache and read the database (read-your-writes).
+- Writes made by other workers are picked up when the snapshot's TTL expires.
+
+Reference list endpoints are served through list_response(), which
+serializes a table once per version and answers If-None-Match with 304. The
+ETag is a hash of the response body, so every worker issues the same one.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Type
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.change_tracking import FlushChanges, change_tracker
+from app.models import (
+    Bank,
+    Currency,
+    IssuingMethod,
+    LgOperationalStatus,
+    LgStatus,
+    LgType,
+    Rule,
+)
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL_SECONDS = int(os.getenv("MASTER_DATA_CACHE_TTL_SECONDS", "300"))
+REFERENCE_CACHE_CONTROL = "private, no-cache"
+
+_CHANGE_CONSUMER = "master_data_cache"
+
+
+def _lower(value: Any) -> Optional[str]:
+    return value.strip().lower() if isinstance(value, str) and value.strip() else None
+
+
+def _bank_name_keys(row) -> Iterable[Optional[str]]:
+    yield _lower(row.name)
+    yield _lower(row.short_name)
+    for former in row.former_names or []:
+        yield _lower(former)
+
+
+class IndexSpec(NamedTuple):
+    keys: Callable[[Any], Iterable[Optional[str]]]     # row -> index keys
+    include_deleted: bool = False
+    normalize: Optional[Callable[[Any], Optional[str]]] = None  # applied to lookup keys
+
+
+def _exact(column: str) -> IndexSpec:
+    return IndexSpec(lambda row: (getattr(row, column),))
+
+
+# Per table: model and its lookup indexes (mirroring the crud get_by_* filters)
+_TABLES: Dict[str, Tuple[Type, Dict[str, IndexSpec]]] = {
+    "banks": (Bank, {
+        # Name, short name or former name, case-insensitive, soft-deleted banks included
+        "name": IndexSpec(_bank_name_keys, include_deleted=True, normalize=_lower),
+        "swift_code": _exact("swift_code"),
+    }),
+    "currencies": (Currency, {"iso_code": _exact("iso_code")}),
+    "lg_types": (LgType, {"name": _exact("name")}),
+    "rules": (Rule, {"name": _exact("name")}),
+    "issuing_methods": (IssuingMethod, {"name": _exact("name")}),
+    "lg_statuses": (LgStatus, {"name": _exact("name")}),
+    "lg_operational_statuses": (LgOperationalStatus, {"name": _exact("name")}),
+}
+
+_TABLE_BY_MODEL = {model: name for name, (model, _) in _TABLES.items()}
+
+
+class MasterDataTable:
+    """Immutable snapshot of one master-data table."""
+
+    def __init__(self, name: str, version: int, rows: List[Any], index_specs: Dict[str, IndexSpec]):
+        self.name = name
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.rows: Tuple[Any, ...] = tuple(rows)
+        self.by_id: Dict[int, Any] = {row.id: row for row in rows}
+        self.active: Tuple[Any, ...] = tuple(row for row in rows if not row.is_deleted)
+        self.index_specs = index_specs
+        self.indexes: Dict[str, Dict[str, Any]] = {}
+        # Active rows win over soft-deleted ones sharing a key
+        by_deleted = sorted(rows, key=lambda r: bool(r.is_deleted))
+        for index, spec in index_specs.items():
+            index_map: Dict[str, Any] = {}
+            for row in by_deleted:
+                if row.is_deleted and not spec.include_deleted:
+                    continue
+                for key in spec.keys(row):
+                    if key is not None:
+                        index_map.setdefault(key, row)
+            self.indexes[index] = index_map
+        self._payloads: Dict[Tuple[Any, ...], Tuple[bytes, str]] = {}
+
+    def find(self, index: str, key: Any) -> Optional[Any]:
+        """Row for an index key, or None."""
+        normalize = self.index_specs[index].normalize
+        if normalize is not None:
+            key = normalize(key)
+        return self.indexes[index].get(key) if key is not None else None
+
+    def payload(self, schema: Type, skip: int, limit: Optional[int], include_deleted: bool = False) -> Tuple[bytes, str]:
+        """JSON body and ETag for rows [skip:skip+limit], built once per snapshot."""
+        cache_key = (schema, skip, limit, include_deleted)
+        cached = self._payloads.get(cache_key)
+        if cached is None:
+            source = self.rows if include_deleted else self.active
+            rows = source[skip:skip + limit] if limit is not None else source[skip:]
+            adapter = TypeAdapter(List[schema])
+            body = adapter.dump_json(adapter.validate_python(list(rows), from_attributes=True))
+            cached = (body, f'"{hashlib.sha1(body).hexdigest()[:24]}"')
+            self._payloads[cache_key] = cached
+        return cached
+
+
+class MasterDataCache:
+
+    def __init__(self, ttl_seconds: int = CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._tables: Dict[str, MasterDataTable] = {}
+        self._versions: Dict[str, int] = {name: 0 for name in _TABLES}
+        self._row_types = {
+            name: namedtuple(f"{model.__name__}Row", [c.key for c in model.__table__.columns])
+            for name, (model, _) in _TABLES.items()
+        }
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    # ---------------- Read ----------------
+
+    def snapshot(self, db: Session, table: str) -> Optional[MasterDataTable]:
+        """The table's current snapshot, loading it if needed; None when this
+        session has uncommitted writes to it (callers then query the database)."""
+        pending = change_tracker.peek(db, _CHANGE_CONSUMER)
+        if pending and table in pending:
+            return None
+        with self._lock:
+            snap = self._tables.get(table)
+            version = self._versions[table]
+        if snap is not None and snap.version == version and time.monotonic() - snap.loaded_at < self.ttl_seconds:
+            return snap
+        snap = self._read(db, table, version)
+        with self._lock:
+            # A commit that landed while loading bumped the version; keep serving the DB then
+            if self._versions[table] == version:
+                self._tables[table] = snap
+        logger.debug(f"Master data '{table}' loaded: {len(snap.by_id)} rows (version {version}).")
+        return snap
+
+    def _read(self, db: Session, table: str, version: int) -> MasterDataTable:
+        model, index_specs = _TABLES[table]
+        row_type = self._row_types[table]
+        result = db.execute(select(*model.__table__.columns).order_by(model.__table__.c.id))
+        self.loads += 1
+        return MasterDataTable(table, version, [row_type(*r) for r in result], index_specs)
+
+    # ---------------- Invalidation ----------------
+
+    def invalidate(self, table: Optional[str] = None) -> None:
+        """Drops one table's snapshot (every table's when None)."""
+        with self._lock:
+            for name in ([table] if table else list(_TABLES)):
+                self._versions[name] += 1
+                self._tables.pop(name, None)
+
+    # ---------------- HTTP ----------------
+
+    def list_response(self, request: Request, db: Session, table: str, schema: Type,
+                      skip: int = 0, limit: Optional[int] = None, include_deleted: bool = False) -> Response:
+        """Rows of a table (active only by default) as a JSON response with ETag / If-None-Match support."""
+        snap = self.snapshot(db, table) or self._read(db, table, version=-1)
+        body, etag = snap.payload(schema, skip, limit, include_deleted)
+        headers = {"ETag": etag, "Cache-Control": REFERENCE_CACHE_CONTROL}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+master_data_cache = MasterDataCache()
+
+
+# ==============================================================================
+# CHANGE TRACKING: commit-time invalidation for master-data writes in this worker
+# ==============================================================================
+
+def _collect_master_data_changes(session: Session, changes: FlushChanges):
+    pending = change_tracker.pending(session, _CHANGE_CONSUMER)
+    for obj in changes.all(*_TABLE_BY_MODEL):
+        pending.add(_TABLE_BY_MODEL[type(obj)])
+
+
+def _apply_master_data_invalidations(session: Session, tables: Set[str]):
+    for table in tables:
+        master_data_cache.invalidate(table)
+
+
+change_tracker.register(
+    _CHANGE_CONSUMER,
+    models=tuple(_TABLE_BY_MODEL),
+    collect=_collect_master_data_changes,
+    apply=_apply_master_data_invalidations,
+)
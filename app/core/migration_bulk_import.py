@@ -0,0 +1,753 @@
+# app/core/migration_bulk_import.py
+"""
+Bulk import of READY_FOR_IMPORT staged migration records.
+
+The row-by-row /migration/import-ready path resolves master data with a query
+per lookup, validates one record at a time and wraps every row in its own
+savepoint, so a 20k-row legacy book takes hours. This importer:
+
+  * loads MigrationMasterData (every name→id map) once per batch;
+  * validates each chunk with lg_validation_service.validate_lg_data_chunk;
+  * checks LG-number duplicates for a whole chunk in one query;
+  * assigns lg_sequence_number / instruction serials from in-memory counters
+    seeded by one grouped query;
+  * inserts a chunk with a single flush and commits it. Only when that flush
+    fails is the chunk replayed row by row, each row in its own savepoint,
+    to isolate the offending records.
+
+A run is a MigrationImportJob with one MigrationImportJobItem per staged row,
+fixed when the job is created. Each chunk commits the imported rows together
+with their items' outcomes and the job's counters, so progress (processed
+rows, throughput, ETA, failed records) can be read from any worker, and a job
+interrupted by a restart is resumed (POST /import-ready/bulk?job_id=) from
+its PENDING items without importing a row twice.
+
+The import itself is synchronous and runs in a worker thread (background
+runs through asyncio.to_thread), so progress reads and other requests are not
+held up by its queries. Only attachment fetches / uploads are async; they run
+on a loop private to that thread.
+
+Like create_from_migration(), bulk-imported records do not send the per-LG
+"LG recorded" notification email.
+"""
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException, status as http_status
+from pydantic import ValidationError
+from sqlalchemy import func, insert, or_, update
+from sqlalchemy.orm import Session
+
+from app.core.migration_service import MigrationMasterData, migration_service
+from app.core.lg_validation_service import lg_validation_service
+from app.models.models_migration_import import MigrationImportJob, MigrationImportJobItem
+from app.schemas.migration_schemas import MigrationRecordStatusEnum, MigrationTypeEnum
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+STALE_RUN_SECONDS = 900         # RUNNING jobs without a committed chunk for this long may be resumed
+FAILED_RECORDS_LIMIT = 200
+
+JOB_PENDING = "PENDING"
+JOB_RUNNING = "RUNNING"
+JOB_COMPLETED = "COMPLETED"
+JOB_FAILED = "FAILED"
+
+ITEM_PENDING = "PENDING"
+ITEM_IMPORTED = "IMPORTED"
+ITEM_FAILED = "FAILED"
+ITEM_DUPLICATE = "DUPLICATE"
+
+NOT_READY_ERROR = "Staged record is no longer ready for import."
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_aware(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class RowRejected(Exception):
+    """A staged row that cannot be imported; the message goes to validation_log['import_error']."""
+
+    def __init__(self, message: Any, status: MigrationRecordStatusEnum = MigrationRecordStatusEnum.ERROR):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+@dataclass
+class _BatchState:
+    """In-memory counters for one import batch; snapshotted around each chunk."""
+    master: MigrationMasterData
+    seen_lg_numbers: set = field(default_factory=set)
+    lg_sequences: Dict[int, int] = field(default_factory=dict)
+    instruction_seqs: Dict[int, int] = field(default_factory=dict)
+    instruction_type_seqs: Dict[Tuple[int, str], int] = field(default_factory=dict)
+    capacity: Optional[int] = None
+
+    def snapshot(self):
+        return (set(self.seen_lg_numbers), dict(self.lg_sequences), dict(self.instruction_seqs),
+                dict(self.instruction_type_seqs), self.capacity, dict(self.master.owners_by_email),
+                set(self.master.owner_ids))
+
+    def restore(self, snap) -> None:
+        (self.seen_lg_numbers, self.lg_sequences, self.instruction_seqs, self.instruction_type_seqs,
+         self.capacity, self.master.owners_by_email, self.master.owner_ids) = snap
+
+
+def _parse_additional_fields(add_fields: Any) -> Any:
+    if isinstance(add_fields, str):
+        if add_fields.strip().upper() in ['N/A', '0', '']:
+            return None
+        try:
+            return json.loads(add_fields)
+        except Exception:
+            return None
+    return add_fields
+
+
+class BulkMigrationImporter:
+
+    # ---------------- Jobs ----------------
+
+    def create_job(self, db: Session, customer_id: int, user_id: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> MigrationImportJob:
+        """Records a job with one item per READY_FOR_IMPORT staged row (records before instructions). Committed."""
+        from app.models import LGMigrationStaging
+
+        active = db.query(MigrationImportJob).filter(
+            MigrationImportJob.customer_id == customer_id,
+            MigrationImportJob.status.in_((JOB_PENDING, JOB_RUNNING)),
+            MigrationImportJob.is_deleted == False,
+        ).order_by(MigrationImportJob.id).first()
+        if active is not None:
+            if self._is_stale(active):
+                detail = f"Bulk import job {active.id} was interrupted; resume it with job_id={active.id}."
+            else:
+                detail = f"A bulk import is already running for this customer (job {active.id})."
+            raise HTTPException(status_code=http_status.HTTP_409_CONFLICT, detail=detail)
+
+        staged = db.query(
+            LGMigrationStaging.id, LGMigrationStaging.migration_type, LGMigrationStaging.source_data_json
+        ).filter(
+            LGMigrationStaging.customer_id == customer_id,
+            LGMigrationStaging.record_status == MigrationRecordStatusEnum.READY_FOR_IMPORT,
+            LGMigrationStaging.is_deleted == False,
+        ).all()
+        # Records before instructions, so instructions can target LGs imported in the same run
+        staged.sort(key=lambda r: (r.migration_type != MigrationTypeEnum.RECORD, r.id))
+
+        job = MigrationImportJob(customer_id=customer_id, user_id=user_id, status=JOB_PENDING if staged else JOB_COMPLETED,
+                                 chunk_size=chunk_size, total_count=len(staged), finished_at=None if staged else _utcnow())
+        db.add(job)
+        db.flush()
+        if staged:
+            db.execute(insert(MigrationImportJobItem), [
+                {
+                    "job_id": job.id,
+                    "staging_id": row.id,
+                    "status": ITEM_PENDING,
+                    "lg_number": str((row.source_data_json or {}).get("lg_number") or "") or None,
+                }
+                for row in staged
+            ])
+        db.commit()
+        return job
+
+    def get_job(self, db: Session, job_id: int, customer_id: int) -> Optional[MigrationImportJob]:
+        return db.query(MigrationImportJob).filter(
+            MigrationImportJob.id == job_id,
+            MigrationImportJob.customer_id == customer_id,
+            MigrationImportJob.is_deleted == False,
+        ).first()
+
+    @staticmethod
+    def _is_stale(job: MigrationImportJob) -> bool:
+        if job.status != JOB_RUNNING:
+            return True
+        heartbeat = _as_aware(job.heartbeat_at)
+        return heartbeat is None or heartbeat < _utcnow() - timedelta(seconds=STALE_RUN_SECONDS)
+
+    def claim(self, db: Session, job: MigrationImportJob) -> None:
+        """Marks the job RUNNING (committed); 409 if another run holds it."""
+        now = _utcnow()
+        table = MigrationImportJob.__table__
+        result = db.execute(
+            update(table).where(
+                table.c.id == job.id,
+                or_(table.c.status != JOB_RUNNING, table.c.heartbeat_at.is_(None),
+                    table.c.heartbeat_at < now - timedelta(seconds=STALE_RUN_SECONDS)),
+            ).values(status=JOB_RUNNING, started_at=now, heartbeat_at=now, finished_at=None, error=None,
+                     phase="loading master data", run_start_count=table.c.processed_count)
+        )
+        db.commit()
+        if result.rowcount != 1:
+            raise HTTPException(status_code=http_status.HTTP_409_CONFLICT, detail=f"Bulk import job {job.id} is already running.")
+        db.refresh(job)
+
+    def progress(self, db: Session, job: MigrationImportJob) -> Dict[str, Any]:
+        """The job's committed progress, as served by the job endpoint."""
+        started_at, finished_at = _as_aware(job.started_at), _as_aware(job.finished_at)
+        elapsed = ((finished_at or _utcnow()) - started_at).total_seconds() if started_at else 0.0
+        rate = (job.processed_count - job.run_start_count) / elapsed if elapsed > 0 else 0.0
+        remaining = max(0, job.total_count - job.processed_count)
+        failed_records = db.query(MigrationImportJobItem).filter(
+            MigrationImportJobItem.job_id == job.id,
+            MigrationImportJobItem.status.in_((ITEM_FAILED, ITEM_DUPLICATE)),
+        ).order_by(MigrationImportJobItem.id).limit(FAILED_RECORDS_LIMIT).all()
+        return {
+            "job_id": job.id,
+            "status": job.status,
+            "phase": job.phase or "",
+            "total": job.total_count,
+            "processed": job.processed_count,
+            "imported": job.imported_count,
+            "failed": job.failed_count,
+            "duplicates": job.duplicate_count,
+            "percent": round(100.0 * job.processed_count / job.total_count, 1) if job.total_count else 100.0,
+            "chunks_done": job.chunks_done,
+            "chunks_replayed": job.chunks_replayed,
+            "elapsed_seconds": round(elapsed, 2),
+            "rows_per_second": round(rate, 1),
+            "eta_seconds": round(remaining / rate, 1) if rate and job.status == JOB_RUNNING else None,
+            "error": job.error,
+            "failed_records": [
+                {"record_id": item.staging_id, "lg_number": item.lg_number, "error": item.error}
+                for item in failed_records
+            ],
+        }
+
+    async def run_in_new_session(self, job_id: int) -> None:
+        """Background entry point for a claimed job: the request session is closed by then."""
+        await asyncio.to_thread(self._run_in_new_session, job_id)
+
+    def _run_in_new_session(self, job_id: int) -> None:
+        from app.database import SessionLocal
+        db = SessionLocal()
+        try:
+            job = db.get(MigrationImportJob, job_id)
+            if job is not None:
+                self.run(db, job)
+        finally:
+            db.close()
+
+    # ---------------- Driver ----------------
+
+    def run(self, db: Session, job: MigrationImportJob) -> MigrationImportJob:
+        """
+        Imports the PENDING items of a claimed job chunk by chunk; returns the
+        job with its outcome. Blocking: call it from a worker thread.
+        """
+        from app.models import LGMigrationStaging
+        from app.crud.crud import log_action
+
+        job_id, customer_id = job.id, job.customer_id
+        try:
+            state = _BatchState(master=MigrationMasterData.load(db, customer_id))
+            state.lg_sequences = self._load_lg_sequences(db, customer_id)
+            state.capacity = self._remaining_capacity(db, customer_id)
+            logger.info(f"Bulk import {job_id}: {job.total_count - job.processed_count} of {job.total_count} staged rows "
+                        f"left for customer {customer_id}, chunk size {job.chunk_size}.")
+
+            last_item_id = 0
+            while True:
+                items = db.query(MigrationImportJobItem).filter(
+                    MigrationImportJobItem.job_id == job_id,
+                    MigrationImportJobItem.status == ITEM_PENDING,
+                    MigrationImportJobItem.id > last_item_id,
+                ).order_by(MigrationImportJobItem.id).limit(job.chunk_size).all()
+                if not items:
+                    break
+                last_item_id = items[-1].id
+
+                staged_by_id = {row.id: row for row in db.query(LGMigrationStaging).filter(
+                    LGMigrationStaging.id.in_([item.staging_id for item in items])
+                )}
+                rows, not_ready = [], set()
+                for item in items:
+                    row = staged_by_id.get(item.staging_id)
+                    if row is None or row.is_deleted or row.record_status != MigrationRecordStatusEnum.READY_FOR_IMPORT:
+                        not_ready.add(item.staging_id)
+                    else:
+                        rows.append(row)
+                rows.sort(key=lambda r: (r.migration_type != MigrationTypeEnum.RECORD, r.id))
+
+                self._import_chunk(db, job, items, rows, staged_by_id, not_ready, state)
+                db.expunge_all()
+                job = db.get(MigrationImportJob, job_id)
+                logger.info(
+                    f"Bulk import {job_id}: {job.processed_count}/{job.total_count} rows "
+                    f"({job.imported_count} imported, {job.failed_count} failed)"
+                )
+
+            job.phase = "finalizing"
+            log_action(
+                db,
+                user_id=job.user_id,
+                action_type="MIGRATION_FINALIZED",
+                entity_type="Customer",
+                entity_id=customer_id,
+                details={
+                    "mode": "bulk",
+                    "job_id": job_id,
+                    "imported_count": job.imported_count,
+                    "failed_count": job.failed_count,
+                    "failed_records": self.progress(db, job)["failed_records"],
+                },
+                customer_id=customer_id,
+            )
+            self._finish(db, job, JOB_COMPLETED)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Bulk import {job_id} aborted: {e}", exc_info=True)
+            job = db.get(MigrationImportJob, job_id)
+            job.error = str(getattr(e, "detail", e))
+            self._finish(db, job, JOB_FAILED)
+        return job
+
+    @staticmethod
+    def _finish(db: Session, job: MigrationImportJob, outcome: str) -> None:
+        job.status = outcome
+        job.phase = None
+        job.heartbeat_at = None
+        job.finished_at = _utcnow()
+        db.commit()
+
+    # ---------------- Chunk processing ----------------
+
+    def _import_chunk(self, db: Session, job: MigrationImportJob, items: List[MigrationImportJobItem], rows: List[Any],
+                            staged_by_id: Dict[int, Any], not_ready: Set[int], state: _BatchState) -> None:
+        """
+        Imports one chunk and commits it with its items' outcomes and the job's
+        counters. A rollback reverts those too, so the replay starts clean.
+        """
+        snapshot = state.snapshot()
+        try:
+            self._process_rows(db, rows, job, state, savepoint_per_row=False)
+            self._settle_items(job, items, staged_by_id, not_ready)
+            db.commit()
+            return
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Bulk import {job.id}: chunk insert failed ({getattr(e, 'orig', e)}); replaying {len(rows)} rows individually.")
+
+        state.restore(snapshot)
+        job.chunks_replayed += 1
+        self._process_rows(db, rows, job, state, savepoint_per_row=True)
+        self._settle_items(job, items, staged_by_id, not_ready)
+        db.commit()
+
+    @staticmethod
+    def _settle_items(job: MigrationImportJob, items: List[MigrationImportJobItem], staged_by_id: Dict[int, Any],
+                      not_ready: Set[int]) -> None:
+        """Copies each staged row's outcome to its job item and adds the chunk to the job's counters."""
+        now = _utcnow()
+        for item in items:
+            staged = staged_by_id.get(item.staging_id)
+            if item.staging_id in not_ready:
+                item.status, item.error = ITEM_FAILED, NOT_READY_ERROR
+            elif staged.record_status == MigrationRecordStatusEnum.IMPORTED:
+                item.status, item.error = ITEM_IMPORTED, None
+            else:
+                duplicate = staged.record_status == MigrationRecordStatusEnum.DUPLICATE
+                item.status = ITEM_DUPLICATE if duplicate else ITEM_FAILED
+                item.error = (staged.validation_log or {}).get("import_error")
+            item.processed_at = now
+
+        outcomes = [item.status for item in items]
+        job.processed_count += len(items)
+        job.imported_count += outcomes.count(ITEM_IMPORTED)
+        job.failed_count += len(items) - outcomes.count(ITEM_IMPORTED)
+        job.duplicate_count += outcomes.count(ITEM_DUPLICATE)
+        job.chunks_done += 1
+        job.phase = f"chunk {job.chunks_done + 1}"
+        job.heartbeat_at = now
+
+    def _process_rows(self, db: Session, rows: List[Any], job: MigrationImportJob, state: _BatchState,
+                            savepoint_per_row: bool) -> None:
+        records = [r for r in rows if r.migration_type == MigrationTypeEnum.RECORD]
+        instructions = [r for r in rows if r.migration_type == MigrationTypeEnum.INSTRUCTION]
+
+        if records:
+            resolved = [state.master.resolve(r.source_data_json or {}) for r in records]
+            errors = lg_validation_service.validate_lg_data_chunk(resolved, state.master)
+            existing = self._existing_lg_numbers(db, [d.get("lg_number") for d in resolved])
+            created = []
+            for staged, data, validation_errors in zip(records, resolved, errors):
+                lg = self._run_row(db, staged, job, state, savepoint_per_row, lambda s=staged, d=data, v=validation_errors:
+                                         self._build_lg_record(db, s, d, v, existing, job, state))
+                if lg is not None:
+                    created.append((staged, lg))
+            if created and not savepoint_per_row:
+                db.flush()
+            self._finish_records(db, created, job, state)
+            self._attach(db, created, job.user_id, original_lg=True)
+
+        if instructions:
+            targets = self._load_instruction_targets(db, job.customer_id, instructions, state)
+            created = []
+            for staged in instructions:
+                instruction = self._run_row(db, staged, job, state, savepoint_per_row, lambda s=staged:
+                                                  self._build_instruction(db, s, targets, job, state))
+                if instruction is not None:
+                    created.append((staged, instruction))
+            if created and not savepoint_per_row:
+                db.flush()
+            for staged, instruction in created:
+                staged.record_status = MigrationRecordStatusEnum.IMPORTED
+                staged.production_lg_id = instruction.lg_record_id
+            self._attach(db, created, job.user_id, original_lg=False)
+
+    def _run_row(self, db: Session, staged: Any, job: MigrationImportJob, state: _BatchState, savepoint: bool, build):
+        """Builds one row; with savepoint=True it is flushed inside its own savepoint."""
+        snapshot = state.snapshot() if savepoint else None
+        try:
+            if not savepoint:
+                return build()
+            with db.begin_nested():
+                obj = build()
+                db.flush()
+            return obj
+        except RowRejected as e:
+            self._reject(staged, e.message, e.status)
+        except (HTTPException, ValidationError) as e:
+            self._reject(staged, getattr(e, "detail", None) or str(e))
+        except Exception as e:
+            if not savepoint:
+                raise
+            logger.warning(f"Bulk import {job.id}: staged record {staged.id} failed: {getattr(e, 'orig', e)}")
+            self._reject(staged, str(getattr(e, "orig", e)))
+        if snapshot is not None:
+            state.restore(snapshot)
+        return None
+
+    @staticmethod
+    def _reject(staged: Any, message: Any, status: MigrationRecordStatusEnum = MigrationRecordStatusEnum.ERROR) -> None:
+        staged.record_status = status
+        staged.validation_log = dict(staged.validation_log or {}, import_error=message)
+
+    # ---------------- LG records ----------------
+
+    @staticmethod
+    def _load_lg_sequences(db: Session, customer_id: int) -> Dict[int, int]:
+        from app.models import LGRecord, CustomerEntity
+        rows = db.query(LGRecord.beneficiary_corporate_id, func.max(LGRecord.lg_sequence_number)).join(
+            CustomerEntity, CustomerEntity.id == LGRecord.beneficiary_corporate_id
+        ).filter(CustomerEntity.customer_id == customer_id, LGRecord.is_deleted == False).group_by(
+            LGRecord.beneficiary_corporate_id
+        ).all()
+        return {entity_id: seq or 0 for entity_id, seq in rows}
+
+    @staticmethod
+    def _remaining_capacity(db: Session, customer_id: int) -> Optional[int]:
+        from app.models import Customer, SubscriptionPlan
+        row = db.query(Customer.active_lg_count, SubscriptionPlan.max_records).join(
+            SubscriptionPlan, SubscriptionPlan.id == Customer.subscription_plan_id
+        ).filter(Customer.id == customer_id).first()
+        if not row or row.max_records is None:
+            return None
+        return max(0, row.max_records - (row.active_lg_count or 0))
+
+    @staticmethod
+    def _existing_lg_numbers(db: Session, lg_numbers: List[Any]) -> set:
+        from app.models import LGRecord
+        keys = list({str(n).lower() for n in lg_numbers if n})
+        if not keys:
+            return set()
+        return {n for (n,) in db.query(func.lower(LGRecord.lg_number)).filter(
+            func.lower(LGRecord.lg_number).in_(keys), LGRecord.is_deleted == False
+        ).all()}
+
+    def _owner_id(self, db: Session, payload: Dict[str, Any], job: MigrationImportJob, state: _BatchState) -> int:
+        """create_or_get for the internal owner contact, against the preloaded map."""
+        from app.crud.crud import crud_internal_owner_contact
+        from app.schemas.all_schemas import InternalOwnerContactCreate
+
+        owner = state.master.owners_by_email.get(str(payload["internal_owner_email"]).strip().lower())
+        if owner:
+            return owner["id"]
+        contact = crud_internal_owner_contact.create_or_get(
+            db,
+            obj_in=InternalOwnerContactCreate(
+                email=payload["internal_owner_email"], phone_number=payload["internal_owner_phone"],
+                internal_id=None, manager_email=payload["manager_email"],
+            ),
+            customer_id=job.customer_id,
+            user_id=job.user_id,
+        )
+        state.master.add_owner(contact.id, contact.email, contact.phone_number, contact.manager_email)
+        return contact.id
+
+    def _build_lg_record(self, db: Session, staged: Any, data: Dict[str, Any], validation_errors: Dict[str, str],
+                         existing: set, job: MigrationImportJob, state: _BatchState):
+        from app.models import LGRecord, LgTypeEnum, LgOperationalStatusEnum
+        from app.schemas.all_schemas import LGRecordCreate
+
+        lg_number = data.get("lg_number")
+        key = str(lg_number).lower() if lg_number else None
+        if key and key in state.seen_lg_numbers:
+            raise RowRejected("Duplicate found within the same import batch.", MigrationRecordStatusEnum.DUPLICATE)
+        if key and key in existing:
+            raise RowRejected(f"LG number '{lg_number}' already exists in production.")
+        if validation_errors:
+            raise RowRejected(validation_errors)
+        if state.capacity is not None and state.capacity <= 0:
+            raise RowRejected("Record limit of the customer's subscription plan reached. Cannot create new LG record.")
+
+        master = state.master
+        owner = master.owner_by_id(data["internal_owner_contact_id"]) or {}
+        payload = {
+            "beneficiary_corporate_id": data.get("beneficiary_corporate_id"),
+            "issuer_name": data.get("issuer_name"),
+            "lg_number": lg_number,
+            "lg_amount": data.get("lg_amount"),
+            "lg_currency_id": data.get("lg_currency_id"),
+            "lg_payable_currency_id": data.get("lg_payable_currency_id"),
+            "issuance_date": data.get("issuance_date"),
+            "expiry_date": data.get("expiry_date"),
+            "auto_renewal": data.get("auto_renewal", True),
+            "lg_type_id": data.get("lg_type_id"),
+            "lg_operational_status_id": data.get("lg_operational_status_id"),
+            "payment_conditions": data.get("payment_conditions"),
+            "description_purpose": data.get("description_purpose"),
+            "issuing_bank_id": data.get("issuing_bank_id"),
+            "issuing_bank_address": data.get("issuing_bank_address"),
+            "issuing_bank_phone": data.get("issuing_bank_phone"),
+            "issuing_bank_fax": data.get("issuing_bank_fax"),
+            "issuing_method_id": data.get("issuing_method_id"),
+            "applicable_rule_id": data.get("applicable_rule_id"),
+            "applicable_rules_text": data.get("applicable_rules_text"),
+            "other_conditions": data.get("other_conditions"),
+            "internal_owner_contact_id": data.get("internal_owner_contact_id"),
+            "internal_owner_phone": data.get("internal_owner_phone") or owner.get("phone"),
+            "internal_owner_email": data.get("internal_owner_email") or owner.get("email"),
+            "manager_email": data.get("manager_email") or owner.get("manager_email"),
+            "additional_field_values": _parse_additional_fields(data.get("additional_field_values")),
+            "lg_category_id": data.get("lg_category_id"),
+            "internal_contract_project_id": data.get("internal_contract_project_id"),
+            "notes": data.get("notes"),
+            "ai_scan_file": None,
+            "internal_supporting_document_file": None,
+        }
+        obj_in = LGRecordCreate(**payload)
+
+        # Same business rules as crud_lg_record.create(), checked against the maps
+        category = master.categories.get(obj_in.lg_category_id)
+        if not category or (category["customer_id"] is not None and category["customer_id"] != job.customer_id):
+            raise RowRejected("Invalid LG Category ID provided or category not accessible for your customer.")
+        operational_status_id, payment_conditions = None, None
+        if obj_in.lg_type_id == LgTypeEnum.ADVANCE_PAYMENT_GUARANTEE.value:
+            if obj_in.lg_operational_status_id is None:
+                raise RowRejected("Operational Status is mandatory for 'Advance Payment Guarantee' type.")
+            operational_status_id = obj_in.lg_operational_status_id
+            if operational_status_id == LgOperationalStatusEnum.NON_OPERATIVE.value:
+                if not obj_in.payment_conditions or not obj_in.payment_conditions.strip():
+                    raise RowRejected("Payment Conditions are mandatory when LG Type is 'Advance Payment Guarantee' and Operational Status is 'Non-Operative'.")
+                payment_conditions = obj_in.payment_conditions
+        rules_text = None
+        if master.rule_names.get(obj_in.applicable_rule_id) == "Other":
+            if not obj_in.applicable_rules_text or not obj_in.applicable_rules_text.strip():
+                raise RowRejected("Applicable Rules Text is mandatory when Applicable Rule is 'Other'.")
+            rules_text = obj_in.applicable_rules_text
+        additional_values = None
+        if category["extra_field_name"]:
+            if category["is_mandatory"] and not (obj_in.additional_field_values or {}).get(category["extra_field_name"]):
+                raise RowRejected(f"Custom field '{category['extra_field_name']}' is mandatory for the selected LG Category.")
+            additional_values = obj_in.additional_field_values
+        if master.valid_status_id is None:
+            raise HTTPException(status_code=500, detail="'Valid' LG Status not found in master data. Please configure.")
+
+        record_data = obj_in.model_dump(exclude_unset=True, exclude={
+            "ai_scan_file", "internal_supporting_document_file", "internal_owner_email",
+            "internal_owner_phone", "internal_owner_id", "manager_email",
+        })
+        record_data.update(
+            customer_id=job.customer_id,
+            internal_owner_contact_id=self._owner_id(db, payload, job, state),
+            lg_status_id=master.valid_status_id,
+            lg_period_months=max(3, min(12, round((obj_in.expiry_date - obj_in.issuance_date).days / 30.44 / 3) * 3)),
+            lg_operational_status_id=operational_status_id,
+            payment_conditions=payment_conditions,
+            applicable_rules_text=rules_text,
+            additional_field_values=additional_values,
+            lg_payable_currency_id=record_data.get("lg_payable_currency_id") or record_data.get("lg_currency_id"),
+            migration_source='LEGACY',
+            migrated_from_staging_id=staged.id,
+        )
+        if master.foreign_bank_id and obj_in.issuing_bank_id == master.foreign_bank_id:
+            record_data.update(
+                issuing_bank_address="Foreign Bank - See foreign_bank_address field",
+                issuing_bank_phone="N/A - Foreign Bank",
+                issuing_bank_fax="N/A - Foreign Bank",
+            )
+        else:
+            record_data.update(foreign_bank_name=None, foreign_bank_country=None, foreign_bank_address=None,
+                               foreign_bank_swift_code=None, advising_status=None, communication_bank_id=None)
+
+        entity_id = obj_in.beneficiary_corporate_id
+        state.lg_sequences[entity_id] = state.lg_sequences.get(entity_id, 0) + 1
+        record_data["lg_sequence_number"] = state.lg_sequences[entity_id]
+
+        lg = LGRecord(**record_data)
+        db.add(lg)
+        if key:
+            state.seen_lg_numbers.add(key)
+        if state.capacity is not None:
+            state.capacity -= 1
+        return lg
+
+    def _finish_records(self, db: Session, created: List[Tuple[Any, Any]], job: MigrationImportJob, state: _BatchState) -> None:
+        from app.models import AuditLog, Customer
+
+        if not created:
+            return
+        for staged, lg in created:
+            staged.record_status = MigrationRecordStatusEnum.IMPORTED
+            staged.production_lg_id = lg.id
+        # One audit row per LG, added in bulk rather than flushed one by one through log_action()
+        db.add_all([AuditLog(
+            user_id=job.user_id, action_type="MIGRATION_IMPORT_RECORD", entity_type="LGRecord", entity_id=lg.id,
+            details={"lg_number": lg.lg_number, "customer_id": job.customer_id, "staged_record_id": staged.id,
+                     "internal_owner_id": lg.internal_owner_contact_id, "mode": "bulk"},
+            customer_id=job.customer_id, lg_record_id=lg.id, timestamp=func.now(),
+        ) for staged, lg in created])
+        db.query(Customer).filter(Customer.id == job.customer_id).update(
+            {Customer.active_lg_count: Customer.active_lg_count + len(created)}, synchronize_session=False
+        )
+        db.flush()
+
+    # ---------------- Instructions ----------------
+
+    def _load_instruction_targets(self, db: Session, customer_id: int, instructions: List[Any], state: _BatchState) -> Dict[str, Dict[str, Any]]:
+        from app.models import LGRecord, LGInstruction, LGCategory
+
+        lg_numbers = list({str((s.source_data_json or {}).get("lg_number")).lower()
+                           for s in instructions if (s.source_data_json or {}).get("lg_number")})
+        if not lg_numbers:
+            return {}
+        rows = db.query(LGRecord.id, LGRecord.lg_number, LGRecord.customer_id, LGRecord.beneficiary_corporate_id,
+                        LGRecord.lg_sequence_number, LGCategory.code).join(
+            LGCategory, LGCategory.id == LGRecord.lg_category_id
+        ).filter(func.lower(LGRecord.lg_number).in_(lg_numbers), LGRecord.is_deleted == False).all()
+        targets = {r.lg_number.lower(): {
+            "id": r.id, "customer_id": r.customer_id, "lg_sequence_number": r.lg_sequence_number,
+            "entity_code": state.master.entity_codes.get(r.beneficiary_corporate_id), "category_code": r.code,
+        } for r in rows}
+
+        lg_ids = [t["id"] for t in targets.values() if t["id"] not in state.instruction_seqs]
+        if lg_ids:
+            for lg_id, seq in db.query(LGInstruction.lg_record_id, func.max(LGInstruction.global_seq_per_lg)).filter(
+                LGInstruction.lg_record_id.in_(lg_ids)
+            ).group_by(LGInstruction.lg_record_id).all():
+                state.instruction_seqs[lg_id] = seq or 0
+            for lg_id, itype, seq in db.query(LGInstruction.lg_record_id, LGInstruction.instruction_type,
+                                              func.max(LGInstruction.type_seq_per_lg)).filter(
+                LGInstruction.lg_record_id.in_(lg_ids)
+            ).group_by(LGInstruction.lg_record_id, LGInstruction.instruction_type).all():
+                state.instruction_type_seqs[(lg_id, itype)] = seq or 0
+            for lg_id in lg_ids:
+                state.instruction_seqs.setdefault(lg_id, 0)
+        return targets
+
+    def _build_instruction(self, db: Session, staged: Any, targets: Dict[str, Dict[str, Any]], job: MigrationImportJob, state: _BatchState):
+        from app.models import LGInstruction, User
+        from app.schemas.all_schemas import LGInstructionCreate
+        from app.constants import InstructionTypeCode, SubInstructionCode, INSTRUCTION_TYPE_CODE_TO_FULL_ACTION_MAP
+
+        source_data = staged.source_data_json or {}
+        lg_number = source_data.get("lg_number")
+        if not lg_number:
+            raise RowRejected("LG Number missing for instruction record.")
+        target = targets.get(str(lg_number).lower())
+        if not target or target["customer_id"] != job.customer_id:
+            raise RowRejected(f"LG Record '{lg_number}' not found in production for instruction import.")
+        if not target["entity_code"] or not target["category_code"]:
+            raise RowRejected(f"LG Record '{lg_number}' has no entity or category code for instruction serials.")
+
+        # Accept either a short code ("AM") or a full action type ("LG_AMEND"); default to amendment
+        requested = str(source_data.get("instruction_type") or "").strip().upper()
+        type_code = next((code for code, action in INSTRUCTION_TYPE_CODE_TO_FULL_ACTION_MAP.items()
+                          if requested in (code.value, str(action).upper())), InstructionTypeCode.AMD)
+        action_type = INSTRUCTION_TYPE_CODE_TO_FULL_ACTION_MAP[type_code]
+
+        maker_email = source_data.get("maker_user_email")
+        maker_id = db.query(User.id).filter(
+            func.lower(User.email) == str(maker_email).strip().lower(), User.customer_id == job.customer_id
+        ).scalar() if maker_email else None
+
+        obj_in = LGInstructionCreate(
+            lg_record_id=target["id"],
+            instruction_type=action_type,
+            template_id=source_data.get("template_id"),
+            status=source_data.get("status", "Instruction Issued"),
+            details=source_data.get("details"),
+            maker_user_id=maker_id or job.user_id,
+        )
+        if not obj_in.template_id:
+            raise RowRejected("Template is required for instruction import.")
+
+        lg_id = target["id"]
+        state.instruction_seqs[lg_id] = state.instruction_seqs.get(lg_id, 0) + 1
+        type_key = (lg_id, action_type)
+        state.instruction_type_seqs[type_key] = state.instruction_type_seqs.get(type_key, 0) + 1
+        global_seq, type_seq = state.instruction_seqs[lg_id], state.instruction_type_seqs[type_key]
+        serial_number = (
+            f"{target['entity_code'].upper()}"
+            f"{target['category_code'].upper().ljust(2, '_')}"
+            f"{str(target['lg_sequence_number']).zfill(4)}"
+            f"{type_code.value.upper()}"
+            f"{str(global_seq).zfill(4)}"
+            f"{str(type_seq).zfill(3)}"
+            f"{SubInstructionCode.ORIGINAL.value.upper()}"
+        )
+        instruction = LGInstruction(
+            lg_record_id=lg_id,
+            instruction_type=action_type,
+            serial_number=serial_number,
+            global_seq_per_lg=global_seq,
+            type_seq_per_lg=type_seq,
+            template_id=obj_in.template_id,
+            status=obj_in.status,
+            instruction_date=obj_in.instruction_date if obj_in.instruction_date else func.now(),
+            details=obj_in.details,
+            maker_user_id=obj_in.maker_user_id,
+        )
+        db.add(instruction)
+        return instruction
+
+    # ---------------- Attachments ----------------
+
+    def _attach(self, db: Session, created: List[Tuple[Any, Any]], user_id: int, original_lg: bool) -> None:
+        """Fetches and stores the chunk's attachments on a loop private to this worker thread."""
+        if any((staged.source_data_json or {}).get("attachment_url") for staged, _ in created):
+            asyncio.run(self._attach_documents(db, created, user_id, original_lg))
+
+    async def _attach_documents(self, db: Session, created: List[Tuple[Any, Any]], user_id: int, original_lg: bool) -> None:
+        from app.constants import DOCUMENT_TYPE_ORIGINAL_LG, DOCUMENT_TYPE_INTERNAL_SUPPORTING
+
+        for staged, obj in created:
+            raw_url = (staged.source_data_json or {}).get("attachment_url")
+            if not raw_url:
+                continue
+            clean_url = str(raw_url).strip().strip("'").strip('"')
+            await migration_service._create_document_from_url(
+                db=db,
+                lg_record_id=obj.id if original_lg else obj.lg_record_id,
+                url=clean_url,
+                document_type=DOCUMENT_TYPE_ORIGINAL_LG if original_lg else DOCUMENT_TYPE_INTERNAL_SUPPORTING,
+                uploaded_by_user_id=user_id,
+                original_instruction_serial=None if original_lg else obj.serial_number,
+            )
+
+
+bulk_migration_importer = BulkMigrationImporter()
@@ -2,7 +2,7 @@
 
 import json
 from datetime import datetime, date
-from typing import Any, Dict, List, Optional, Tuple, Type
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Type
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
@@ -21,6 +21,9 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# LG groups handled per round-trip in preview pages and import batches
+DEFAULT_GROUP_BATCH_SIZE = 200
+
 class MigrationHistoryService:
     def __init__(self):
         pass
@@ -62,78 +65,167 @@ class MigrationHistoryService:
                 diff[key] = {'old': old_val, 'new': new_val}
         return diff
 
-    async def preview_history(self, db: Session, customer_id: int, lg_number: Optional[str] = None, only_ready: bool = True) -> List[MigrationHistoryPreviewOut]:
+    # ---------------- Set-based loading ----------------
+
+    @staticmethod
+    def _lg_key():
+        """lower(source_data_json->>'lg_number'); matches ix_lg_migration_staging_lg_number_lower."""
+        return func.lower(LGMigrationStaging.source_data_json['lg_number'].astext)
+
+    def _timeline_order(self) -> List[Any]:
+        """SQL equivalent of _get_snapshot_sort_key, applied within each LG group."""
+        return [
+            self._lg_key(),
+            LGMigrationStaging.history_sequence.asc().nulls_last(),
+            LGMigrationStaging.history_timestamp.asc().nulls_first(),
+            LGMigrationStaging.source_data_json['issuance_date'].astext.asc().nulls_first(),
+            LGMigrationStaging.created_at.asc(),
+            LGMigrationStaging.id.asc(),
+        ]
+
+    def _eligible_query(self, db: Session, customer_id: int, statuses: List[MigrationRecordStatusEnum], lg_numbers: Optional[List[str]] = None):
+        query = db.query(LGMigrationStaging).filter(
+            LGMigrationStaging.customer_id == customer_id,
+            LGMigrationStaging.record_status.in_(statuses),
+        )
+        if lg_numbers:
+            query = query.filter(self._lg_key().in_([ln.lower() for ln in lg_numbers]))
+        return query
+
+    def get_lg_keys(self, db: Session, customer_id: int, statuses: List[MigrationRecordStatusEnum],
+                    lg_numbers: Optional[List[str]] = None, after_key: Optional[str] = None, limit: int = DEFAULT_GROUP_BATCH_SIZE) -> List[str]:
+        """One page of distinct lower-cased LG numbers, keyset-paginated on the expression index."""
+        lg_key = self._lg_key()
+        query = self._eligible_query(db, customer_id, statuses, lg_numbers).with_entities(lg_key).filter(lg_key.isnot(None))
+        if after_key is not None:
+            query = query.filter(lg_key > after_key.lower())
+        return [row[0] for row in query.distinct().order_by(lg_key).limit(limit).all()]
+
+    def get_source_files(self, db: Session, customer_id: int, statuses: List[MigrationRecordStatusEnum],
+                         lg_numbers: Optional[List[str]] = None) -> List[str]:
+        query = (
+            self._eligible_query(db, customer_id, statuses, lg_numbers)
+            .with_entities(LGMigrationStaging.file_name)
+            .filter(LGMigrationStaging.file_name.isnot(None))
+            .distinct()
+        )
+        return [row[0] for row in query.all()]
+
+    def load_groups(self, db: Session, customer_id: int, lg_keys: List[str], statuses: List[MigrationRecordStatusEnum]) -> Dict[str, List[LGMigrationStaging]]:
+        """Snapshots for the given LG keys, grouped and timeline-ordered by the database."""
+        groups: Dict[str, List[LGMigrationStaging]] = {key: [] for key in lg_keys}
+        if not lg_keys:
+            return groups
+        rows = (
+            self._eligible_query(db, customer_id, statuses)
+            .filter(self._lg_key().in_(lg_keys))
+            .order_by(*self._timeline_order())
+            .add_columns(self._lg_key())
+            .all()
+        )
+        for snapshot, key in rows:
+            groups[key].append(snapshot)
+        return groups
+
+    def existing_lg_keys(self, db: Session, lg_keys: List[str]) -> Set[str]:
+        """Single probe against lg_records for a whole batch of LG numbers."""
+        if not lg_keys:
+            return set()
+        lg_key = func.lower(LGRecord.lg_number)
+        rows = db.query(lg_key).filter(lg_key.in_(lg_keys), LGRecord.is_deleted == False).distinct().all()
+        return {row[0] for row in rows}
+
+    def iter_history_batches(self, db: Session, customer_id: int, statuses: List[MigrationRecordStatusEnum],
+                             lg_numbers: Optional[List[str]] = None, batch_size: int = DEFAULT_GROUP_BATCH_SIZE
+                             ) -> Iterator[Tuple[Dict[str, List[LGMigrationStaging]], Set[str]]]:
         """
-        Generates a preview of the historical import for a given LG number or all staged LGs.
+        Yields (groups, existing_keys) one batch of LG groups at a time. Pagination is
+        keyset on the LG key, so status changes made by the caller between batches
+        do not shift the pages.
         """
-        # LATE IMPORT to break circular dependency
-        from app.crud.crud import crud_lg_migration
-        
-        query = db.query(LGMigrationStaging).filter(
-            LGMigrationStaging.customer_id == customer_id
+        after_key = None
+        while True:
+            keys = self.get_lg_keys(db, customer_id, statuses, lg_numbers, after_key=after_key, limit=batch_size)
+            if not keys:
+                return
+            yield self.load_groups(db, customer_id, keys, statuses), self.existing_lg_keys(db, keys)
+            if len(keys) < batch_size:
+                return
+            after_key = keys[-1]
+
+    def _pair_diffs(self, snapshots: List[LGMigrationStaging]) -> List[Dict[str, Any]]:
+        """diffs[i] is the diff between snapshot i-1 and i (empty for the first); computed once per pair."""
+        diffs: List[Dict[str, Any]] = [{}]
+        for i in range(1, len(snapshots)):
+            diffs.append(self._get_diff(snapshots[i - 1].source_data_json or {}, snapshots[i].source_data_json or {}))
+        return diffs
+
+    def _has_conflict(self, snapshots: List[LGMigrationStaging], diffs: List[Dict[str, Any]]) -> bool:
+        return any(
+            diffs[i] and self._get_snapshot_sort_key(snapshots[i]) == self._get_snapshot_sort_key(snapshots[i - 1])
+            for i in range(1, len(snapshots))
         )
 
-        if lg_number:
-            query = query.filter(func.lower(LGMigrationStaging.source_data_json['lg_number'].astext) == func.lower(lg_number))
-        
-        if only_ready:
-            query = query.filter(LGMigrationStaging.record_status == MigrationRecordStatusEnum.READY_FOR_IMPORT)
+    @staticmethod
+    def _mark_error(snapshots: List[LGMigrationStaging], message: str) -> None:
+        for snap in snapshots:
+            snap.record_status = MigrationRecordStatusEnum.ERROR
+            # validation_log is a plain JSON column; reassign so the change is tracked
+            snap.validation_log = {**(snap.validation_log or {}), 'import_error': message}
 
-        all_snapshots = query.all()
-        
-        if not all_snapshots:
-            return []
-        
-        lg_groups = {}
-        for snapshot in all_snapshots:
-            lg_num = snapshot.source_data_json.get('lg_number')
-            if lg_num not in lg_groups:
-                lg_groups[lg_num] = []
-            lg_groups[lg_num].append(snapshot)
-        
+    def preview_groups(self, groups: Dict[str, List[LGMigrationStaging]]) -> List[MigrationHistoryPreviewOut]:
         results = []
-        for lg_num, snapshots in lg_groups.items():
-            # Sort snapshots according to the defined timeline ordering logic
-            sorted_snapshots = sorted(snapshots, key=self._get_snapshot_sort_key)
-            
+        for snapshots in groups.values():
+            if not snapshots:
+                continue
+            lg_num = (snapshots[0].source_data_json or {}).get('lg_number')
+            diffs = self._pair_diffs(snapshots)
             preview_snapshots = []
             conflict_flag = False
-            
-            for i, snapshot in enumerate(sorted_snapshots):
-                snapshot_data = snapshot.source_data_json
-                
-                # Check for conflicts
-                conflicts = {}
-                if i > 0:
-                    prev_snapshot = sorted_snapshots[i-1]
-                    prev_snapshot_data = prev_snapshot.source_data_json
-                    if self._get_snapshot_sort_key(snapshot) == self._get_snapshot_sort_key(prev_snapshot):
-                        for key, new_val in snapshot_data.items():
-                            old_val = prev_snapshot_data.get(key)
-                            if old_val != new_val:
-                                conflicts[key] = {'old': old_val, 'new': new_val}
 
+            for i, snapshot in enumerate(snapshots):
+                snapshot_data = snapshot.source_data_json or {}
+                conflicts = {}
+                if i > 0 and diffs[i] and self._get_snapshot_sort_key(snapshot) == self._get_snapshot_sort_key(snapshots[i - 1]):
+                    conflicts = {key: change for key, change in diffs[i].items() if key in snapshot_data}
                 if conflicts:
                     conflict_flag = True
-                
-                diff = self._get_diff(sorted_snapshots[i-1].source_data_json, snapshot_data) if i > 0 else {}
-                
+
                 preview_snapshots.append(StagingSnapshotOut(
                     id=snapshot.id,
                     lg_number=lg_num,
                     issuance_date=snapshot_data.get('issuance_date', ''),
                     expiry_date=snapshot_data.get('expiry_date', ''),
-                    diff=diff,
+                    diff=diffs[i],
                     conflicts=conflicts,
                     migration_timestamp=snapshot.created_at
                 ))
-            
+
             results.append(MigrationHistoryPreviewOut(
                 lg_number=lg_num,
                 snapshots=preview_snapshots,
                 conflict_flag=conflict_flag
             ))
-            
+        return results
+
+    # ---------------- Preview ----------------
+
+    async def preview_history(self, db: Session, customer_id: int, lg_number: Optional[str] = None, only_ready: bool = True,
+                              after_lg_number: Optional[str] = None, limit: int = DEFAULT_GROUP_BATCH_SIZE) -> List[MigrationHistoryPreviewOut]:
+        """
+        Generates a preview of the historical import for a given LG number or one page
+        of staged LGs. Pass the last returned lg_number as after_lg_number for the next page.
+        """
+        statuses = [MigrationRecordStatusEnum.READY_FOR_IMPORT] if only_ready else list(MigrationRecordStatusEnum)
+        lg_numbers = [lg_number] if lg_number else None
+
+        keys = self.get_lg_keys(db, customer_id, statuses, lg_numbers, after_key=after_lg_number, limit=limit)
+        groups = self.load_groups(db, customer_id, keys, statuses)
+        results = self.preview_groups(groups)
+        # Preview is read-only; don't keep the page in the identity map
+        for snapshots in groups.values():
+            for snap in snapshots:
+                db.expunge(snap)
         return results
 
     async def import_history(self, db: Session, customer_id: int, user_id: int, lg_numbers: Optional[List[str]] = None, batch_note: Optional[str] = None):
@@ -147,71 +239,48 @@ class MigrationHistoryService:
         from app.core.lg_validation_service import lg_validation_service
         
         logger.info(f"Historical import process started for customer {customer_id}.")
-        
-        query = db.query(LGMigrationStaging).filter(LGMigrationStaging.customer_id == customer_id)
-        if lg_numbers:
-            query = query.filter(func.lower(LGMigrationStaging.source_data_json['lg_number'].astext).in_([ln.lower() for ln in lg_numbers]))
-        
-        query = query.filter(LGMigrationStaging.record_status.in_([MigrationRecordStatusEnum.READY_FOR_IMPORT, MigrationRecordStatusEnum.PENDING, MigrationRecordStatusEnum.ERROR]))
-        
-        all_snapshots = query.all()
-        if not all_snapshots:
+
+        statuses = [MigrationRecordStatusEnum.READY_FOR_IMPORT, MigrationRecordStatusEnum.PENDING, MigrationRecordStatusEnum.ERROR]
+        if not self.get_lg_keys(db, customer_id, statuses, lg_numbers, limit=1):
             return {"message": "No eligible records found for historical import.", "imported_count": 0, "failed_count": 0}
 
-        lg_groups = {}
-        for snapshot in all_snapshots:
-            lg_num = snapshot.source_data_json.get('lg_number')
-            if lg_num not in lg_groups:
-                lg_groups[lg_num] = []
-            lg_groups[lg_num].append(snapshot)
-            
         batch = MigrationBatch(
             user_id=user_id,
             notes=batch_note,
-            source_files=[snap.file_name for snap in all_snapshots]
+            source_files=self.get_source_files(db, customer_id, statuses, lg_numbers)
         )
         db.add(batch)
         db.flush()
-        
+        batch_id = batch.id
+
         batch_results = {'imported': 0, 'updated': 0, 'failed': 0, 'skipped_exists': 0, 'ambiguous_history': 0}
-        
-        for lg_num, snapshots in lg_groups.items():
-            # A single transaction for each LG group to ensure all snapshots are applied or none are
-            with db.begin_nested() as nested_session:
-                try:
-                    sorted_snapshots = sorted(snapshots, key=self._get_snapshot_sort_key)
-                    first_snapshot = sorted_snapshots[0]
-                    
-                    # Proactive check against production table
-                    existing_lg_in_prod = crud_lg_record.get_by_lg_number(db, lg_num)
-                    if existing_lg_in_prod:
-                        logger.warning(f"LG number '{lg_num}' already exists in production. Skipping import.")
-                        for snap in snapshots:
-                            snap.record_status = MigrationRecordStatusEnum.ERROR
-                            snap.validation_log['import_error'] = 'LG already exists in production table. Skipping.'
-                        batch_results['skipped_exists'] += 1
-                        continue # Skip to the next LG group
-                        
-                    # Check for conflicts
-                    conflict_found = False
-                    for i in range(1, len(sorted_snapshots)):
-                        if self._get_snapshot_sort_key(sorted_snapshots[i]) == self._get_snapshot_sort_key(sorted_snapshots[i-1]):
-                            conflict_diff = self._get_diff(sorted_snapshots[i-1].source_data_json, sorted_snapshots[i].source_data_json)
-                            if conflict_diff:
-                                conflict_found = True
-                                break
-
-                    if conflict_found:
-                        logger.warning(f"Ambiguous history detected for LG '{lg_num}'. Flagging for review.")
-                        for snap in snapshots:
-                            snap.record_status = MigrationRecordStatusEnum.ERROR
-                            snap.validation_log['import_error'] = 'Ambiguous history detected. Two snapshots share the same timeline key but have different values.'
-                        batch_results['ambiguous_history'] += 1
-                        continue # Skip to the next LG group
 
+        for groups, existing_keys in self.iter_history_batches(db, customer_id, statuses, lg_numbers):
+            for lg_key, sorted_snapshots in groups.items():
+                if not sorted_snapshots:
+                    continue
+                first_snapshot = sorted_snapshots[0]
+                lg_num = (first_snapshot.source_data_json or {}).get('lg_number')
+
+                if lg_key in existing_keys:
+                    logger.warning(f"LG number '{lg_num}' already exists in production. Skipping import.")
+                    self._mark_error(sorted_snapshots, 'LG already exists in production table. Skipping.')
+                    batch_results['skipped_exists'] += 1
+                    continue
+
+                diffs = self._pair_diffs(sorted_snapshots)
+                if self._has_conflict(sorted_snapshots, diffs):
+                    logger.warning(f"Ambiguous history detected for LG '{lg_num}'. Flagging for review.")
+                    self._mark_error(sorted_snapshots, 'Ambiguous history detected. Two snapshots share the same timeline key but have different values.')
+                    batch_results['ambiguous_history'] += 1
+                    continue
+
+                # A single savepoint for each LG group to ensure all snapshots are applied or none are
+                nested_session = db.begin_nested()
+                try:
                     # Step 1: Create base LGRecord from the first snapshot
                     lg_record_data = first_snapshot.source_data_json
-                    
+
                     # Apply final validation and autofill again just in case
                     enhanced_data = _apply_defaults_and_autofill(db, lg_record_data, customer_id)
                     final_validation_errors = lg_validation_service.validate_lg_data(enhanced_data, context='migration', db=db, customer_id=customer_id)
@@ -225,7 +294,7 @@ class MigrationHistoryService:
                     final_status_id = LgStatusEnum.VALID.value
                     if datetime.strptime(final_snapshot_data.get('expiry_date'), "%Y-%m-%d").date() < date.today():
                         final_status_id = LgStatusEnum.EXPIRED.value
-                    
+
                     new_lg = await crud_lg_record.create_from_migration(
                         db=db,
                         obj_in=lg_record_create_payload,
@@ -237,46 +306,44 @@ class MigrationHistoryService:
                     )
 
                     # Step 2: Apply subsequent snapshots as amendments
-                    if len(sorted_snapshots) > 1:
-                        for i in range(1, len(sorted_snapshots)):
-                            prev_snapshot_data = sorted_snapshots[i-1].source_data_json
-                            current_snapshot = sorted_snapshots[i]
-                            current_snapshot_data = current_snapshot.source_data_json
-                            
-                            diff = self._get_diff(prev_snapshot_data, current_snapshot_data)
-                            if diff:
-                                # This requires a new method on crud_lg_record to apply amendments
-                                updated_lg = await crud_lg_record.apply_migration_amendment(
-                                    db, new_lg.id, diff, user_id
-                                )
-                                log_action(
-                                    db, user_id=user_id, action_type=AUDIT_ACTION_TYPE_LG_AMENDED,
-                                    entity_type="LGRecord", entity_id=new_lg.id,
-                                    details={"diff": diff, "snapshot_id": current_snapshot.id, "batch_id": batch.id},
-                                    customer_id=customer_id, lg_record_id=new_lg.id
-                                )
+                    for i in range(1, len(sorted_snapshots)):
+                        diff = diffs[i]
+                        if diff:
+                            await crud_lg_record.apply_migration_amendment(
+                                db, new_lg.id, diff, user_id
+                            )
+                            log_action(
+                                db, user_id=user_id, action_type=AUDIT_ACTION_TYPE_LG_AMENDED,
+                                entity_type="LGRecord", entity_id=new_lg.id,
+                                details={"diff": diff, "snapshot_id": sorted_snapshots[i].id, "batch_id": batch_id},
+                                customer_id=customer_id, lg_record_id=new_lg.id
+                            )
 
+                    nested_session.commit()
                     # All snapshots for this LG are processed, update staging status
-                    for snap in snapshots:
+                    for snap in sorted_snapshots:
                         snap.record_status = MigrationRecordStatusEnum.IMPORTED
                         snap.production_lg_id = new_lg.id
                     batch_results['imported'] += 1
-                
+
                 except Exception as e:
                     nested_session.rollback()
                     logger.error(f"Failed to import LG '{lg_num}' during historical import: {e}", exc_info=True)
-                    for snap in snapshots:
-                        snap.record_status = MigrationRecordStatusEnum.ERROR
-                        snap.validation_log['import_error'] = str(e)
+                    self._mark_error(sorted_snapshots, str(e))
                     batch_results['failed'] += 1
 
+            # Persist each batch so the session's identity map stays bounded
+            batch.totals = dict(batch_results)
+            db.commit()
+            logger.info(f"Historical import for customer {customer_id}: {sum(batch_results.values())} LG groups processed so far.")
+
         batch.totals = batch_results
         batch.finished_at = func.now()
         db.add(batch)
         db.commit()
-        
+
         return {
             "message": "Historical migration process completed.",
             "totals": batch_results,
-            "batch_id": batch.id
+            "batch_id": batch_id
         }
\ No newline at end of file
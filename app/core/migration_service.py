@@ -46,7 +46,202 @@ def _get_id_by_name(db: Session, model: Any, name: str) -> Optional[int]:
         
     obj = db.query(model).filter(func.lower(model.name) == func.lower(name)).first()
     return obj.id if obj else None
-    
+
+
+# =====================================================================================
+# PRELOADED MASTER DATA (bulk import: one load per batch instead of a query per lookup)
+# =====================================================================================
+def _lower(val: Any) -> str:
+    return str(val).strip().lower() if val is not None else ""
+
+
+class MigrationMasterData:
+    """
+    Name→id maps for every master-data lookup the migration touches, loaded
+    once per import batch. Values are plain snapshots (ids, strings), so they
+    survive the per-chunk commits of the bulk importer without reloading.
+
+    resolve() is the map-based counterpart of _apply_defaults_and_autofill().
+    """
+
+    def __init__(self, customer_id: int):
+        self.customer_id = customer_id
+        self.bank_ids_by_name: Dict[str, int] = {}
+        self.banks: Dict[int, Dict[str, Any]] = {}
+        self.foreign_bank_id: Optional[int] = None
+        self.currency_ids_by_code: Dict[str, int] = {}
+        self.currency_ids: set = set()
+        self.lg_type_ids_by_name: Dict[str, int] = {}
+        self.lg_type_names: Dict[int, str] = {}
+        self.issuing_method_ids_by_name: Dict[str, int] = {}
+        self.issuing_method_ids: set = set()
+        self.rule_ids_by_name: Dict[str, int] = {}
+        self.rule_names: Dict[int, str] = {}
+        self.operational_status_ids: set = set()
+        self.entity_ids_by_name: Dict[str, int] = {}
+        self.entity_codes: Dict[int, str] = {}
+        self.categories: Dict[int, Dict[str, Any]] = {}
+        self.customer_category_ids: Dict[str, int] = {}
+        self.universal_category_ids: Dict[str, int] = {}
+        self.default_category_id: Optional[int] = None
+        self.owners_by_email: Dict[str, Dict[str, Any]] = {}
+        self.owner_ids: set = set()
+        self.valid_status_id: Optional[int] = None
+
+    @classmethod
+    def load(cls, db: Session, customer_id: int) -> "MigrationMasterData":
+        from app.models import LgStatus, LgStatusEnum
+
+        m = cls(customer_id)
+
+        for b in db.query(Bank.id, Bank.name, Bank.short_name, Bank.former_names, Bank.address,
+                          Bank.phone_number, Bank.fax, Bank.is_deleted).all():
+            m.banks[b.id] = {"name": b.name, "address": b.address, "phone": b.phone_number, "fax": b.fax}
+            names = [b.name, b.short_name] + [n for n in (b.former_names or []) if isinstance(n, str)]
+            for n in names:
+                if n:
+                    m.bank_ids_by_name.setdefault(_lower(n), b.id)
+            if b.name == "Foreign Bank" and not b.is_deleted:
+                m.foreign_bank_id = b.id
+
+        for c in db.query(Currency.id, Currency.iso_code, Currency.is_deleted).all():
+            m.currency_ids.add(c.id)
+            if c.iso_code and not c.is_deleted:
+                m.currency_ids_by_code[c.iso_code.upper()] = c.id
+
+        for t in db.query(LgType.id, LgType.name, LgType.is_deleted).all():
+            m.lg_type_names[t.id] = t.name
+            if not t.is_deleted:
+                m.lg_type_ids_by_name.setdefault(t.name.strip(), t.id)
+
+        for im in db.query(IssuingMethod.id, IssuingMethod.name, IssuingMethod.is_deleted).all():
+            m.issuing_method_ids.add(im.id)
+            if not im.is_deleted:
+                m.issuing_method_ids_by_name.setdefault(im.name.strip(), im.id)
+
+        for r in db.query(Rule.id, Rule.name, Rule.is_deleted).all():
+            m.rule_names[r.id] = r.name
+            if not r.is_deleted:
+                m.rule_ids_by_name.setdefault(r.name.strip(), r.id)
+
+        m.operational_status_ids = {s.id for s in db.query(LgOperationalStatus.id).all()}
+
+        for e in db.query(CustomerEntity.id, CustomerEntity.entity_name, CustomerEntity.code).filter(
+            CustomerEntity.customer_id == customer_id, CustomerEntity.is_deleted == False
+        ).all():
+            m.entity_codes[e.id] = e.code
+            m.entity_ids_by_name.setdefault(_lower(e.entity_name), e.id)
+
+        for cat in db.query(LGCategory).filter(
+            or_(LGCategory.customer_id == customer_id, LGCategory.customer_id.is_(None)),
+            LGCategory.is_deleted == False,
+        ).order_by(LGCategory.id).all():
+            m.categories[cat.id] = {
+                "customer_id": cat.customer_id, "name": cat.name, "code": cat.code,
+                "is_mandatory": cat.is_mandatory, "extra_field_name": cat.extra_field_name,
+            }
+            scope = m.customer_category_ids if cat.customer_id is not None else m.universal_category_ids
+            for key in (cat.name, cat.code):
+                if key:
+                    scope.setdefault(_lower(key), cat.id)
+            if cat.is_default and cat.customer_id is None and m.default_category_id is None:
+                m.default_category_id = cat.id
+
+        for o in db.query(InternalOwnerContact.id, InternalOwnerContact.email, InternalOwnerContact.phone_number,
+                          InternalOwnerContact.manager_email).filter(
+            InternalOwnerContact.customer_id == customer_id, InternalOwnerContact.is_deleted == False
+        ).all():
+            m.add_owner(o.id, o.email, o.phone_number, o.manager_email)
+
+        m.valid_status_id = db.query(LgStatus.id).filter(LgStatus.id == LgStatusEnum.VALID.value).scalar()
+        return m
+
+    def add_owner(self, owner_id: int, email: str, phone: Optional[str], manager_email: Optional[str]) -> None:
+        self.owner_ids.add(owner_id)
+        self.owners_by_email[_lower(email)] = {"id": owner_id, "email": email, "phone": phone, "manager_email": manager_email}
+
+    def owner_by_id(self, owner_id: int) -> Optional[Dict[str, Any]]:
+        for owner in self.owners_by_email.values():
+            if owner["id"] == owner_id:
+                return owner
+        return None
+
+    def category_id(self, value: str) -> Optional[int]:
+        key = _lower(value)
+        return self.customer_category_ids.get(key) or self.universal_category_ids.get(key)
+
+    def resolve(self, record_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Map-based equivalent of _apply_defaults_and_autofill(); returns a new dict."""
+        data = dict(record_data)
+
+        owner_id = data.get("internal_owner_contact_id")
+        email_input = data.get("internal_owner_email")
+        if isinstance(owner_id, str) and owner_id.isdigit():
+            owner_id = data["internal_owner_contact_id"] = int(owner_id)
+        elif isinstance(owner_id, str) and "@" in owner_id:
+            email_input = owner_id
+            data["internal_owner_contact_id"] = None
+        if not isinstance(owner_id, int) and email_input:
+            owner = self.owners_by_email.get(_lower(email_input))
+            if owner:
+                data["internal_owner_contact_id"] = owner["id"]
+                data["internal_owner_email"] = owner["email"]
+
+        op_status_val = data.get("lg_operational_status_id")
+        if isinstance(op_status_val, str):
+            data["lg_operational_status_id"] = {"OPERATIVE": 1, "NON-OPERATIVE": 2}.get(op_status_val.strip().upper(), 1)
+
+        for id_field, name_field, by_name in (
+            ("lg_type_id", "lg_type", self.lg_type_ids_by_name),
+            ("issuing_method_id", "issuing_method", self.issuing_method_ids_by_name),
+            ("applicable_rule_id", "applicable_rule", self.rule_ids_by_name),
+        ):
+            val = data.get(id_field)
+            if not isinstance(val, int):
+                lookup_val = val if val else data.get(name_field)
+                if lookup_val and isinstance(lookup_val, str) and lookup_val.strip() in by_name:
+                    data[id_field] = by_name[lookup_val.strip()]
+
+        bank_val = data.get("issuing_bank_id")
+        if isinstance(bank_val, str):
+            bank_id = self.bank_ids_by_name.get(_lower(bank_val))
+            data["issuing_bank_id"] = bank_id
+            if bank_id:
+                bank = self.banks[bank_id]
+                data["issuing_bank_address"] = data.get("issuing_bank_address") or bank["address"]
+                data["issuing_bank_phone"] = data.get("issuing_bank_phone") or bank["phone"]
+                data["issuing_bank_fax"] = data.get("issuing_bank_fax") or bank["fax"]
+
+        beneficiary_val = data.get("beneficiary_corporate_id")
+        if isinstance(beneficiary_val, str):
+            entity_id = self.entity_ids_by_name.get(_lower(beneficiary_val))
+            if entity_id:
+                data["beneficiary_corporate_id"] = entity_id
+            elif len(self.entity_codes) == 1:
+                data["beneficiary_corporate_id"] = next(iter(self.entity_codes))
+
+        cat_val = data.get("lg_category_id")
+        if isinstance(cat_val, str):
+            data["lg_category_id"] = self.category_id(cat_val) or self.default_category_id
+
+        for cur_field in ("lg_currency_id", "lg_payable_currency_id"):
+            cur_val = data.get(cur_field)
+            if isinstance(cur_val, str) and cur_val.strip().upper() in self.currency_ids_by_code:
+                data[cur_field] = self.currency_ids_by_code[cur_val.strip().upper()]
+
+        if data.get("issuance_date") and data.get("expiry_date"):
+            try:
+                i_date = datetime.strptime(str(data["issuance_date"]).split(' ')[0], "%Y-%m-%d").date()
+                e_date = datetime.strptime(str(data["expiry_date"]).split(' ')[0], "%Y-%m-%d").date()
+                data["lg_period_months"] = calculate_lg_period_months(i_date, e_date)
+            except Exception as e:
+                logger.warning(f"Period calculation failed: {e}")
+
+        data["auto_renewal"] = data.get("auto_renewal", True)
+        if not data.get("lg_payable_currency_id"):
+            data["lg_payable_currency_id"] = data.get("lg_currency_id")
+        return data
+
 def calculate_lg_period_months(issuance_date: date, expiry_date: date) -> Optional[int]:
     """
     Calculates the LG period in months based on business rules.
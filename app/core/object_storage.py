@@ -0,0 +1,347 @@
+# app/core/object_storage.py
+"""
+Object storage layer for LG documents.
+
+Uploads are streamed in chunks while a SHA-256 is computed, so memory stays
+flat for large scans: Starlette UploadFiles are already spooled to disk and
+are read straight from their file handle, and other async sources are
+spooled through a SpooledTemporaryFile.
+
+Identical content is stored once per (customer, bucket). A StoredObject row
+indexes every physical object by hash. A repeat upload only bumps its
+reference count and the new LGDocument row points at the existing URI. The
+index row goes with the last reference (see release()); the object itself is
+deleted once that transaction commits, so a rollback never leaves documents
+pointing at a missing file.
+
+Backends:
+  gcs    google-cloud-storage, resumable chunked upload (default)
+  local  files under LOCAL_STORAGE_ROOT, served by the /uploads static mount
+
+Select one with STORAGE_BACKEND=gcs|local.
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.change_tracking import change_tracker
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 1024 * 1024               # Hashing / spooling granularity
+GCS_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024     # Must be a multiple of 256 KiB
+SPOOL_MAX_MEMORY = 1024 * 1024              # Spool to disk beyond this
+LOCAL_STORAGE_ROOT = os.getenv("LOCAL_STORAGE_ROOT", os.path.join("uploads", "objects"))
+
+_CONTEXT_CACHE_KEY = "object_storage_ctx"
+_RELEASE_CONSUMER = "object_storage_release"
+
+
+@dataclass
+class StagedContent:
+    fileobj: Any
+    sha256: str
+    size: int
+    owned: bool = False     # True when we created the spool file and must close it
+
+    def close(self) -> None:
+        if self.owned:
+            try:
+                self.fileobj.close()
+            except Exception:
+                pass
+
+
+@dataclass
+class StoredObjectResult:
+    uri: str
+    sha256: str
+    size: int
+    deduplicated: bool
+
+
+@dataclass
+class StorageContext:
+    customer_id: int
+    can_store: bool
+    bucket_name: Optional[str]
+
+
+# =====================================================================
+# Staging (hash while reading, never hold the whole file in memory)
+# =====================================================================
+
+def _hash_seekable(fileobj) -> StagedContent:
+    fileobj.seek(0)
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = fileobj.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+        size += len(chunk)
+    fileobj.seek(0)
+    return StagedContent(fileobj=fileobj, sha256=digest.hexdigest(), size=size)
+
+
+async def stage_content(source: Any) -> StagedContent:
+    """
+    Accepts bytes, a Starlette UploadFile, a seekable file object or any
+    object with an async read(n), and returns a rewound file object plus its
+    SHA-256 and size.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        data = bytes(source)
+        return StagedContent(fileobj=io.BytesIO(data), sha256=hashlib.sha256(data).hexdigest(), size=len(data))
+
+    # UploadFile: hash its (already spooled) underlying file off the event loop
+    underlying = getattr(source, "file", None)
+    if underlying is not None and hasattr(underlying, "seek"):
+        return await asyncio.to_thread(_hash_seekable, underlying)
+
+    if hasattr(source, "seek") and not asyncio.iscoroutinefunction(getattr(source, "read", None)):
+        return await asyncio.to_thread(_hash_seekable, source)
+
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = await source.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+        size += len(chunk)
+        spool.write(chunk)
+    spool.seek(0)
+    return StagedContent(fileobj=spool, sha256=digest.hexdigest(), size=size, owned=True)
+
+
+# =====================================================================
+# Backends (synchronous; called through asyncio.to_thread)
+# =====================================================================
+
+class GcsStorageBackend:
+    name = "gcs"
+
+    def owns(self, uri: str) -> bool:
+        return bool(uri) and uri.startswith("gs://")
+
+    def upload(self, bucket_name: str, key: str, fileobj, size: int, content_type: Optional[str]) -> str:
+        from app.core.ai_integration import _get_gcs_client, GOOGLE_CLOUD_LIBRARIES_AVAILABLE
+
+        client = _get_gcs_client() if GOOGLE_CLOUD_LIBRARIES_AVAILABLE else None
+        if not client:
+            raise RuntimeError("GCS client not initialized. Cannot upload to GCS.")
+        blob = client.bucket(bucket_name).blob(key, chunk_size=GCS_UPLOAD_CHUNK_SIZE)
+        blob.upload_from_file(fileobj, size=size, content_type=content_type, rewind=True)
+        logger.info(f"File uploaded to GCS: {key} ({size} bytes)")
+        return f"gs://{bucket_name}/{key}"
+
+    def delete(self, uri: str) -> bool:
+        from app.core.ai_integration import delete_file_from_gcs
+        return delete_file_from_gcs(uri)
+
+
+class LocalStorageBackend:
+    name = "local"
+
+    def __init__(self, root: str = LOCAL_STORAGE_ROOT):
+        self.root = os.path.abspath(root)
+        self.uri_prefix = "/" + os.path.relpath(self.root).replace(os.sep, "/").strip("/") + "/"
+
+    def owns(self, uri: str) -> bool:
+        return bool(uri) and uri.startswith(self.uri_prefix)
+
+    def _path_for(self, bucket_name: str, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, bucket_name, *key.split("/")))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Refusing to store outside the storage root: {bucket_name}/{key}")
+        return path
+
+    def upload(self, bucket_name: str, key: str, fileobj, size: int, content_type: Optional[str]) -> str:
+        path = self._path_for(bucket_name, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+        fileobj.seek(0)
+        with open(tmp_path, "wb") as out:
+            shutil.copyfileobj(fileobj, out, READ_CHUNK_SIZE)
+        os.replace(tmp_path, path)
+        logger.info(f"File stored locally: {path} ({size} bytes)")
+        return f"{self.uri_prefix}{bucket_name}/{key}"
+
+    def delete(self, uri: str) -> bool:
+        if not self.owns(uri):
+            return False
+        path = os.path.abspath(os.path.join(self.root, *uri[len(self.uri_prefix):].split("/")))
+        if not path.startswith(self.root + os.sep):
+            return False
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.error(f"Error deleting local file {path}: {e}")
+            return False
+
+
+# =====================================================================
+# Service
+# =====================================================================
+
+class ObjectStorage:
+
+    def __init__(self):
+        self._backends = {"gcs": GcsStorageBackend(), "local": LocalStorageBackend()}
+
+    @property
+    def backend(self):
+        return self._backends.get(os.getenv("STORAGE_BACKEND", "gcs").lower(), self._backends["gcs"])
+
+    def is_local(self, uri: str) -> bool:
+        return self._backends["local"].owns(uri)
+
+    def backend_for_uri(self, uri: str):
+        for backend in self._backends.values():
+            if backend.owns(uri):
+                return backend
+        return None
+
+    # ---------------- Per-request context ----------------
+
+    def resolve_context(self, db: Session, customer_id: int) -> StorageContext:
+        """
+        Plan permission and effective bucket for a customer, resolved once per
+        session (i.e. once per request / migration batch) and memoized in db.info.
+        """
+        cache = db.info.setdefault(_CONTEXT_CACHE_KEY, {})
+        ctx = cache.get(customer_id)
+        if ctx is not None:
+            return ctx
+
+        import app.models as models
+        from app.crud.crud import crud_customer_configuration
+        from app.core.ai_integration import GCS_BUCKET_NAME
+
+        can_store = db.query(models.SubscriptionPlan.can_image_storage).join(
+            models.Customer, models.Customer.subscription_plan_id == models.SubscriptionPlan.id
+        ).filter(models.Customer.id == customer_id).scalar()
+
+        bucket_name = GCS_BUCKET_NAME
+        bucket_config = crud_customer_configuration.get_customer_config_or_global_fallback(
+            db, customer_id, models.GlobalConfigKey.STORAGE_BUCKET_NAME
+        )
+        if bucket_config and bucket_config.get('effective_value'):
+            bucket_name = bucket_config['effective_value']
+        if not bucket_name and self.backend.name == "local":
+            bucket_name = "default"
+
+        ctx = StorageContext(customer_id=customer_id, can_store=bool(can_store), bucket_name=bucket_name)
+        cache[customer_id] = ctx
+        return ctx
+
+    # ---------------- Store / release ----------------
+
+    async def store(
+        self, db: Session, customer_id: int, bucket_name: str, key: str, source: Any, content_type: Optional[str],
+    ) -> StoredObjectResult:
+        """
+        Streams `source` to the backend unless this customer already stored the
+        same content in this bucket, in which case only the reference count moves.
+        """
+        from app.models.models_storage import StoredObject
+
+        staged = await stage_content(source)
+        try:
+            existing = self._add_reference(db, customer_id, bucket_name, staged.sha256)
+            if existing:
+                logger.info(f"Deduplicated upload for customer {customer_id}: {existing.uri} ({staged.size} bytes)")
+                return StoredObjectResult(uri=existing.uri, sha256=staged.sha256, size=staged.size, deduplicated=True)
+
+            backend = self.backend
+            uri = await asyncio.to_thread(backend.upload, bucket_name, key, staged.fileobj, staged.size, content_type)
+        finally:
+            staged.close()
+
+        try:
+            with db.begin_nested():
+                db.add(StoredObject(
+                    customer_id=customer_id, bucket_name=bucket_name, content_sha256=staged.sha256, uri=uri,
+                    size_bytes=staged.size, content_type=content_type, backend=backend.name, reference_count=1,
+                ))
+        except IntegrityError:
+            # A concurrent upload of the same content won the race; keep theirs
+            existing = self._add_reference(db, customer_id, bucket_name, staged.sha256)
+            if existing is None:
+                raise
+            await asyncio.to_thread(backend.delete, uri)
+            return StoredObjectResult(uri=existing.uri, sha256=staged.sha256, size=staged.size, deduplicated=True)
+        return StoredObjectResult(uri=uri, sha256=staged.sha256, size=staged.size, deduplicated=False)
+
+    @staticmethod
+    def _add_reference(db: Session, customer_id: int, bucket_name: str, sha256: str):
+        """Locks the index row for this content and adds a reference to it; None if there is none."""
+        from app.models.models_storage import StoredObject
+
+        row = db.query(StoredObject).filter(
+            StoredObject.customer_id == customer_id,
+            StoredObject.bucket_name == bucket_name,
+            StoredObject.content_sha256 == sha256,
+        ).with_for_update().first()
+        if row is not None:
+            row.reference_count = StoredObject.reference_count + 1
+            db.flush()
+        return row
+
+    def release(self, db: Session, uri: str) -> bool:
+        """
+        Drops one reference to `uri`. With the last one the index row is
+        removed and the physical object is deleted after the transaction
+        commits. Objects stored before deduplication (no index row) are
+        deleted after commit as well. Returns True if the object is due for
+        deletion.
+        """
+        from app.models.models_storage import StoredObject
+
+        if not uri:
+            return False
+        row = db.query(StoredObject).filter(StoredObject.uri == uri).with_for_update().first()
+        if row is not None:
+            row.reference_count = StoredObject.reference_count - 1
+            db.flush()
+            if row.reference_count > 0:  # Reloaded: the decrement ran in SQL under the row lock
+                return False
+            db.delete(row)
+            db.flush()
+
+        if self.backend_for_uri(uri) is None:
+            return False
+        change_tracker.pending(db, _RELEASE_CONSUMER).append(uri)
+        return True
+
+    def _delete_released(self, session: Session, uris) -> None:
+        for uri in uris:
+            backend = self.backend_for_uri(uri)
+            if backend is None:
+                continue
+            try:
+                backend.delete(uri)
+            except Exception as e:
+                logger.error(f"Failed to delete released object {uri}: {e}")
+
+
+object_storage = ObjectStorage()
+
+change_tracker.register(_RELEASE_CONSUMER, apply=object_storage._delete_released, factory=list)
@@ -11,7 +11,7 @@ Uses pypdf for reading/writing PDF forms.
 
 import io
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import date
 from decimal import Decimal
 
@@ -124,6 +124,7 @@ def fill_pdf_form(
     field_mapping: List[Dict[str, Any]],
     request_data: Dict[str, Any],
     lg_language: str = None,
+    reader=None,
 ) -> bytes:
     """
     Fills a PDF form by writing values into interactive form fields.
@@ -137,6 +138,7 @@ def fill_pdf_form(
         template_pdf_bytes: The blank bank PDF form as bytes
         field_mapping: List of mappings with optional date_format, field_type, fill_strategy
         request_data: Dict of issuance request data (keys match mapped_to values)
+        reader: Optional already-parsed template (batch fills); it is cloned, never modified
     
     Returns:
         Filled PDF as bytes
@@ -150,7 +152,8 @@ def fill_pdf_form(
             logger.error("Neither pypdf nor PyPDF2 is installed. Cannot fill PDF forms.")
             raise ImportError("PDF library required. Install: pip install pypdf")
 
-    reader = PdfReader(io.BytesIO(template_pdf_bytes))
+    if reader is None:
+        reader = PdfReader(io.BytesIO(template_pdf_bytes))
     writer = PdfWriter()
 
     # CRITICAL: clone_reader_document_root preserves the /AcroForm dictionary
@@ -226,11 +229,12 @@ def fill_pdf_form(
         logger.debug(f"PDF Fill: {pdf_field} ({mapped_to}) → '{str(value)[:60]}' [text]")
 
     # Debug dump all field values before writing
-    logger.info(f"=== PDF FILL: {len(field_values)} text fields, {len(checkbox_values)} checkboxes ===")
-    for fn, fv in field_values.items():
-        logger.info(f"  FIELD '{fn}' → '{str(fv)[:80]}'")
-    for fn, fv in checkbox_values.items():
-        logger.info(f"  CHECKBOX '{fn}' → {fv}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"=== PDF FILL: {len(field_values)} text fields, {len(checkbox_values)} checkboxes ===")
+        for fn, fv in field_values.items():
+            logger.debug(f"  FIELD '{fn}' → '{str(fv)[:80]}'")
+        for fn, fv in checkbox_values.items():
+            logger.debug(f"  CHECKBOX '{fn}' → {fv}")
 
     # Fill text form fields across all pages
     if field_values:
@@ -309,7 +313,7 @@ def _fill_checkboxes(writer, checkbox_values: Dict[str, bool]):
 # ---------------------------------------------------------------------------
 # Extract PDF form field names
 # ---------------------------------------------------------------------------
-def get_pdf_form_fields(pdf_bytes: bytes) -> List[Dict[str, Any]]:
+def get_pdf_form_fields(pdf_bytes: bytes, reader=None) -> List[Dict[str, Any]]:
     """
     Extracts all interactive form field names from a PDF.
     Used during AI analysis to identify available fields.
@@ -321,7 +325,8 @@ def get_pdf_form_fields(pdf_bytes: bytes) -> List[Dict[str, Any]]:
     except ImportError:
         from PyPDF2 import PdfReader
 
-    reader = PdfReader(io.BytesIO(pdf_bytes))
+    if reader is None:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
     fields = []
     
     for page_num, page in enumerate(reader.pages):
@@ -603,11 +608,24 @@ def build_request_data_dict(request, db=None, bank_id=None) -> Dict[str, Any]:
 # Physical Overlay PDF Generator
 # ---------------------------------------------------------------------------
 
+def get_pdf_page_sizes(pdf_bytes: bytes, reader=None) -> List[Tuple[float, float]]:
+    """Returns [(width, height)] in PDF points for every page of the template."""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        from PyPDF2 import PdfReader
+
+    if reader is None:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+    return [(float(p.mediabox.width), float(p.mediabox.height)) for p in reader.pages]
+
+
 def generate_overlay_pdf(
     template_pdf_bytes: bytes,
     field_mapping: List[Dict[str, Any]],
     request_data: Dict[str, Any],
     lg_language: str = None,
+    page_sizes: Optional[List[Tuple[float, float]]] = None,
 ) -> bytes:
     """
     Generates a text-only overlay PDF for pre-printed physical bank forms.
@@ -622,6 +640,7 @@ def generate_overlay_pdf(
         template_pdf_bytes: Original bank form PDF (used only to get page size)
         field_mapping: List of mappings with x, y, font_size, width fields
         request_data: Dict of issuance request data
+        page_sizes: Optional precomputed template page geometry (skips re-parsing the template)
     
     Returns:
         Overlay PDF as bytes
@@ -630,23 +649,17 @@ def generate_overlay_pdf(
     from reportlab.pdfgen import canvas
     from reportlab.lib.units import mm
     
-    try:
-        from pypdf import PdfReader
-    except ImportError:
-        from PyPDF2 import PdfReader
-    
     # Get page dimensions from the template PDF
-    reader = PdfReader(io.BytesIO(template_pdf_bytes))
-    if reader.pages:
-        page = reader.pages[0]
-        media_box = page.mediabox
-        page_width = float(media_box.width)
-        page_height = float(media_box.height)
+    if page_sizes is None:
+        page_sizes = get_pdf_page_sizes(template_pdf_bytes)
+    if page_sizes:
+        page_width, page_height = page_sizes[0]
     else:
         # Fallback to A4
         page_width, page_height = A4
+    pw, ph = page_width, page_height
     
-    num_template_pages = len(reader.pages)
+    num_template_pages = len(page_sizes)
     
     # Create overlay PDF in memory
     output = io.BytesIO()
@@ -664,10 +677,8 @@ def generate_overlay_pdf(
     
     for page_num in range(max(num_template_pages, max(fields_by_page.keys(), default=0) + 1)):
         # Set page size (may vary per page in some PDFs)
-        if page_num < len(reader.pages):
-            pg = reader.pages[page_num]
-            mb = pg.mediabox
-            pw, ph = float(mb.width), float(mb.height)
+        if page_num < num_template_pages:
+            pw, ph = page_sizes[page_num]
             c.setPageSize((pw, ph))
         
         page_fields = fields_by_page.get(page_num, [])
@@ -773,6 +784,8 @@ def generate_scanned_fill_pdf(
     field_mapping: List[Dict[str, Any]],
     request_data: Dict[str, Any],
     lg_language: str = None,
+    reader=None,
+    page_sizes: Optional[List[Tuple[float, float]]] = None,
 ) -> bytes:
     """
     Generates a filled PDF by merging a text overlay onto the original scanned form.
@@ -789,22 +802,26 @@ def generate_scanned_fill_pdf(
     except ImportError:
         from PyPDF2 import PdfReader, PdfWriter
     
+    original_reader = reader if reader is not None else PdfReader(io.BytesIO(template_pdf_bytes))
+    if page_sizes is None:
+        page_sizes = get_pdf_page_sizes(template_pdf_bytes, reader=original_reader)
+
     # Step 1: Generate the text-only overlay
-    overlay_bytes = generate_overlay_pdf(template_pdf_bytes, field_mapping, request_data, lg_language=lg_language)
+    overlay_bytes = generate_overlay_pdf(
+        template_pdf_bytes, field_mapping, request_data, lg_language=lg_language, page_sizes=page_sizes
+    )
     
-    # Step 2: Merge overlay onto original scanned pages
-    original_reader = PdfReader(io.BytesIO(template_pdf_bytes))
+    # Step 2: Merge overlay onto the writer's copy of each scanned page
+    # (the template reader stays pristine, so it can be reused across fills)
     overlay_reader = PdfReader(io.BytesIO(overlay_bytes))
     writer = PdfWriter()
     
     for page_num in range(len(original_reader.pages)):
-        base_page = original_reader.pages[page_num]
+        out_page = writer.add_page(original_reader.pages[page_num])
         
         # Merge overlay page if it exists
         if page_num < len(overlay_reader.pages):
-            base_page.merge_page(overlay_reader.pages[page_num])
-        
-        writer.add_page(base_page)
+            out_page.merge_page(overlay_reader.pages[page_num])
     
     # Write merged result
     output = io.BytesIO()
@@ -814,3 +831,53 @@ def generate_scanned_fill_pdf(
     
     logger.info(f"Generated scanned-fill PDF: merged overlay onto {len(original_reader.pages)} pages ({len(merged_bytes)} bytes)")
     return merged_bytes
+
+
+# ---------------------------------------------------------------------------
+# Batch fill: many requests against one template, parsed once
+# ---------------------------------------------------------------------------
+
+def fill_forms_batch(
+    template_pdf_bytes: bytes,
+    field_mapping: List[Dict[str, Any]],
+    request_data_list: List[Dict[str, Any]],
+    form_type: str = "FILLABLE_PDF",
+    lg_languages: Optional[List[Optional[str]]] = None,
+    page_sizes: Optional[List[Tuple[float, float]]] = None,
+) -> List[bytes]:
+    """
+    Fills the same template for many requests in one pass. The template is
+    parsed once and its page geometry computed once; each output clones the
+    shared reader, which is never modified.
+
+    Returns filled PDFs in the order of request_data_list.
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        from PyPDF2 import PdfReader
+
+    reader = PdfReader(io.BytesIO(template_pdf_bytes))
+    if page_sizes is None:
+        page_sizes = get_pdf_page_sizes(template_pdf_bytes, reader=reader)
+    form_type = (form_type or "FILLABLE_PDF").upper()
+    lg_languages = lg_languages or [None] * len(request_data_list)
+
+    results = []
+    for request_data, lg_language in zip(request_data_list, lg_languages):
+        if form_type == "PHYSICAL_OVERLAY":
+            results.append(generate_overlay_pdf(
+                template_pdf_bytes, field_mapping, request_data, lg_language=lg_language, page_sizes=page_sizes
+            ))
+        elif form_type == "SCANNED_FILL":
+            results.append(generate_scanned_fill_pdf(
+                template_pdf_bytes, field_mapping, request_data, lg_language=lg_language,
+                reader=reader, page_sizes=page_sizes,
+            ))
+        else:
+            results.append(fill_pdf_form(
+                template_pdf_bytes, field_mapping, request_data, lg_language=lg_language, reader=reader
+            ))
+
+    logger.info(f"Batch-filled {len(results)} {form_type} forms from one template parse")
+    return results
@@ -0,0 +1,210 @@
+# app/core/schema_migrations.py
+"""
+Schema setup, run once per deploy instead of by every worker at boot.
+
+    python -m app.core.schema_migrations
+
+Creates missing tables, applies the additive ALTER / CREATE INDEX statements
+below and seeds required global configuration rows. Every step is idempotent,
+so re-running it against an up-to-date database is a no-op.
+
+The Procfile runs it as the release command. For single-process setups
+(local development) set RUN_SCHEMA_MIGRATIONS_ON_STARTUP=true to have
+app.main run it during startup as before.
+"""
+
+import logging
+import re
+import sys
+from typing import List
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Additive changes for databases created before the column / index existed.
+# Postgres syntax. ADD COLUMN statements are only run when the column is
+# missing, so backends without ADD COLUMN IF NOT EXISTS (SQLite) work too.
+# An "already exists" error is treated as applied; any other failure makes
+# run_migrations raise (and the release command exit non-zero).
+SCHEMA_STATEMENTS = [
+    # subscription_plans columns
+    "ALTER TABLE subscription_plans ADD COLUMN IF NOT EXISTS has_custody_module BOOLEAN DEFAULT TRUE",
+    "ALTER TABLE subscription_plans ADD COLUMN IF NOT EXISTS has_issuance_module BOOLEAN DEFAULT FALSE",
+    "ALTER TABLE subscription_plans ADD COLUMN IF NOT EXISTS has_quotation_module BOOLEAN DEFAULT FALSE",
+    "ALTER TABLE subscription_plans ADD COLUMN IF NOT EXISTS has_reconciliation_module BOOLEAN DEFAULT FALSE",
+    "ALTER TABLE subscription_plans ADD COLUMN IF NOT EXISTS max_issuance_records INTEGER DEFAULT 0",
+    "ALTER TABLE subscription_plans ADD COLUMN IF NOT EXISTS grace_period_days INTEGER DEFAULT 30",
+
+    # users columns for MFA and legal version
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS mfa_code_hashed VARCHAR",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS mfa_code_expires_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS mfa_attempts INTEGER DEFAULT 0",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS last_accepted_legal_version DOUBLE PRECISION",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS failed_login_attempts INTEGER DEFAULT 0",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS locked_until TIMESTAMP WITH TIME ZONE",
+
+    # quotation offer book lookups (assignments per RFQ, offers per assignment)
+    "CREATE INDEX IF NOT EXISTS ix_quotation_bank_assignments_rfq_id ON quotation_bank_assignments (rfq_id)",
+    "CREATE INDEX IF NOT EXISTS ix_quotation_offers_assignment_id ON quotation_offers (assignment_id)",
+    "CREATE INDEX IF NOT EXISTS ix_quotation_tbill_offers_assignment_id ON quotation_tbill_offers (assignment_id)",
+
+    # approval inbox keyset pages and grouped counts
+    "CREATE INDEX IF NOT EXISTS ix_approval_requests_customer_status_created ON approval_requests (customer_id, status, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_approval_requests_customer_checker_created ON approval_requests (customer_id, checker_user_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_approval_requests_customer_status_action ON approval_requests (customer_id, status, action_type)",
+
+    # custody LG detail cache version
+    "ALTER TABLE lg_records ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+
+    # custody LG list keyset pages
+    "CREATE INDEX IF NOT EXISTS ix_lg_records_customer_list_expiry ON lg_records (customer_id, is_deleted, expiry_date, id)",
+    "CREATE INDEX IF NOT EXISTS ix_lg_records_customer_list_number ON lg_records (customer_id, is_deleted, lg_number, id)",
+    "CREATE INDEX IF NOT EXISTS ix_lg_records_customer_list_id ON lg_records (customer_id, is_deleted, id)",
+]
+
+
+def register_models() -> None:
+    """Imports every model module so Base.metadata knows all tables."""
+    import app.models.models  # noqa: F401
+    import app.models.models_quotation  # noqa: F401
+    import app.models.models_reconciliation_v2  # noqa: F401
+    import app.models.models_notification  # noqa: F401
+    import app.models.models_deadline  # noqa: F401
+    import app.models.models_storage  # noqa: F401
+    import app.models.models_dashboard  # noqa: F401
+    import app.models.models_action_center  # noqa: F401
+    import app.models.models_renewal  # noqa: F401
+    import app.models.models_migration_import  # noqa: F401
+
+
+_ADD_COLUMN_PATTERN = re.compile(r"ALTER TABLE (\w+) ADD COLUMN IF NOT EXISTS (\w+) ", re.IGNORECASE)
+
+
+class SchemaMigrationError(RuntimeError):
+    """One or more migration steps failed; each one is logged at ERROR."""
+
+
+def _already_exists(err: Exception) -> bool:
+    message = str(getattr(err, "orig", err)).lower()
+    return "already exists" in message or "duplicate column" in message
+
+
+def _apply_schema_statements(engine, failures: List[str]) -> int:
+    applied = 0
+    with engine.connect() as conn:
+        inspector = inspect(conn)
+        columns = {}
+        for stmt in SCHEMA_STATEMENTS:
+            add_column = _ADD_COLUMN_PATTERN.match(stmt)
+            if add_column:
+                table, column = add_column.groups()
+                if table not in columns:
+                    columns[table] = {c["name"] for c in inspector.get_columns(table)}
+                if column in columns[table]:
+                    applied += 1
+                    continue
+                if conn.dialect.name != "postgresql":
+                    stmt = stmt.replace(" IF NOT EXISTS", "", 1)
+            try:
+                with conn.begin_nested():
+                    conn.execute(text(stmt))
+                applied += 1
+            except Exception as m_err:
+                if _already_exists(m_err):
+                    applied += 1
+                    continue
+                logger.error(f"Migration statement failed: {stmt}: {m_err}")
+                failures.append(stmt)
+        conn.commit()
+    return applied
+
+
+def _seed_global_configuration(engine) -> None:
+    from app.models.models import GlobalConfiguration
+    from app.constants import GlobalConfigKey
+
+    with Session(engine) as seed_db:
+        existing = seed_db.query(GlobalConfiguration.id).filter(
+            GlobalConfiguration.key == GlobalConfigKey.QUOTATION_APPROVAL_REQUIRED
+        ).first()
+        if not existing:
+            seed_db.add(GlobalConfiguration(
+                key=GlobalConfigKey.QUOTATION_APPROVAL_REQUIRED,
+                value_default="false",
+                unit="boolean",
+                description="Require Corporate Admin approval before releasing quotation requests to banks",
+                module_tags=["quotations"]
+            ))
+            seed_db.commit()
+            logger.info("Seeded QUOTATION_APPROVAL_REQUIRED into global_configurations.")
+
+
+def _backfill_action_center(engine) -> None:
+    from app.models.models_action_center import IssuanceWorkItem
+    from app.services.action_center_service import action_center_service
+
+    with Session(engine) as backfill_db:
+        if backfill_db.query(IssuanceWorkItem.id).first() is not None:
+            return
+        total = action_center_service.rebuild(backfill_db)
+        backfill_db.commit()
+        logger.info(f"Backfilled issuance_work_items ({total} items).")
+
+
+def _backfill_lg_history(engine) -> None:
+    from app.services.lg_history_service import lg_history_service
+
+    with Session(engine) as backfill_db:
+        total = lg_history_service.backfill(backfill_db)
+        if total:
+            logger.info(f"Moved {total} legacy action_history entries to issued_lg_history_events.")
+
+
+def run_migrations(engine=None) -> None:
+    """Brings the database schema up to date. Safe to run repeatedly."""
+    from app.database import Base
+
+    if engine is None:
+        from app.database import engine
+
+    register_models()
+    if not Base.metadata.tables:
+        raise RuntimeError("No SQLAlchemy models registered. Tables cannot be created.")
+
+    Base.metadata.create_all(bind=engine)
+    logger.info("Database tables verified/created.")
+
+    failures: List[str] = []
+    applied = _apply_schema_statements(engine, failures)
+    logger.info(f"Schema statements verified ({applied}/{len(SCHEMA_STATEMENTS)} applied).")
+
+    for step, description in (
+        (_seed_global_configuration, "Global configuration seed"),
+        (_backfill_action_center, "Action-center work queue backfill"),
+        (_backfill_lg_history, "Issued-LG history backfill"),
+    ):
+        try:
+            step(engine)
+        except Exception as step_err:
+            logger.error(f"{description} failed: {step_err}", exc_info=True)
+            failures.append(description)
+
+    if failures:
+        raise SchemaMigrationError(f"{len(failures)} migration step(s) failed: {'; '.join(failures)}")
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    try:
+        run_migrations()
+    except Exception as e:
+        logger.critical(f"Schema migration failed: {e}", exc_info=True)
+        return 1
+    logger.info("Schema migrations complete.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+# app/core/signed_urls.py
+"""
+Signed-URL service for GCS-backed images and documents.
+
+V4 signing is a synchronous, CPU-bound operation on the GCS client, so every
+call used to cost a thread hop plus a signature — once per notification per
+request for banner images. This service:
+
+  * caches signatures per (gs:// URI, lifetime) and keeps serving a URL until
+    a refresh margin before it expires, so callers always receive a link with
+    at least (1 - REFRESH_FRACTION) of the lifetime they asked for;
+  * signs every cache miss of a request in ONE asyncio.to_thread hop;
+  * coalesces concurrent misses for the same key onto one in-flight signature.
+
+The signer is pluggable. SIGNED_URL_SIGNER=fake installs FakeUrlSigner, a
+deterministic local signer with configurable latency, so hit rate and latency
+can be measured offline (see benchmarks/cases.py).
+"""
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXPIRATION_SECONDS = 3600
+REFRESH_FRACTION = 0.25          # Re-sign once less than 75% of the lifetime remains
+MIN_REFRESH_MARGIN_SECONDS = 60
+MAX_CACHE_ENTRIES = 20_000
+
+CacheKey = Tuple[str, int]
+
+
+def parse_gcs_uri(gcs_uri: str) -> Optional[Tuple[str, str]]:
+    """Splits gs://bucket/path/to/blob into (bucket, blob); None when malformed."""
+    if not gcs_uri or not gcs_uri.startswith("gs://"):
+        return None
+    parts = gcs_uri[5:].split("/", 1)
+    if len(parts) != 2 or not parts[0] or not parts[1]:
+        return None
+    return parts[0], parts[1]
+
+
+# =====================================================================
+# Signers (synchronous; always called from a worker thread)
+# =====================================================================
+
+class GcsUrlSigner:
+    """Signs with the shared google-cloud-storage client (V4, GET)."""
+
+    name = "gcs"
+
+    def sign_many(self, uris: List[str], expiration: int) -> Dict[str, Optional[str]]:
+        from app.core.ai_integration import _get_gcs_client, GOOGLE_CLOUD_LIBRARIES_AVAILABLE
+
+        results: Dict[str, Optional[str]] = {uri: None for uri in uris}
+        if not GOOGLE_CLOUD_LIBRARIES_AVAILABLE:
+            return results
+        client = _get_gcs_client()
+        if not client:
+            return results
+
+        buckets = {}
+        for uri in uris:
+            parsed = parse_gcs_uri(uri)
+            if not parsed:
+                logger.error(f"Invalid GCS URI format: {uri}. Must start with 'gs://'.")
+                continue
+            bucket_name, blob_name = parsed
+            try:
+                bucket = buckets.get(bucket_name) or buckets.setdefault(bucket_name, client.bucket(bucket_name))
+                results[uri] = bucket.blob(blob_name).generate_signed_url(
+                    version="v4", expiration=timedelta(seconds=expiration), method="GET"
+                )
+            except Exception as e:
+                logger.error(f"Error generating signed URL for {uri}: {e}")
+        return results
+
+
+class FakeUrlSigner:
+    """
+    Offline signer: deterministic HMAC "signatures" on a fake host, with an
+    optional per-signature delay to model the cost of real V4 signing.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency_ms: float = 0.0, secret: str = "fake-signing-key"):
+        self.latency_ms = latency_ms
+        self._secret = secret.encode()
+        self.signatures = 0
+        self.batches = 0
+
+    def sign_many(self, uris: List[str], expiration: int) -> Dict[str, Optional[str]]:
+        self.batches += 1
+        results: Dict[str, Optional[str]] = {}
+        signed_at = int(time.time())
+        for uri in uris:
+            parsed = parse_gcs_uri(uri)
+            if not parsed:
+                results[uri] = None
+                continue
+            if self.latency_ms:
+                time.sleep(self.latency_ms / 1000.0)
+            self.signatures += 1
+            bucket_name, blob_name = parsed
+            payload = f"{uri}|{expiration}|{signed_at}".encode()
+            signature = hmac.new(self._secret, payload, hashlib.sha256).hexdigest()
+            results[uri] = (
+                f"https://storage.fake.local/{bucket_name}/{blob_name}"
+                f"?X-Goog-Date={signed_at}&X-Goog-Expires={expiration}&X-Goog-Signature={signature}"
+            )
+        return results
+
+
+# =====================================================================
+# Service
+# =====================================================================
+
+class SignedUrlService:
+
+    def __init__(self, signer=None, max_entries: int = MAX_CACHE_ENTRIES):
+        self._signer = signer
+        self._max_entries = max_entries
+        self._cache: "OrderedDict[CacheKey, Tuple[str, float]]" = OrderedDict()   # key -> (url, refresh_at)
+        self._lock = threading.Lock()
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.sign_batches = 0
+        self.sign_seconds_total = 0.0
+
+    # ---------------- Configuration ----------------
+
+    @property
+    def signer(self):
+        if self._signer is None:
+            if os.getenv("SIGNED_URL_SIGNER", "gcs").lower() == "fake":
+                self._signer = FakeUrlSigner(latency_ms=float(os.getenv("SIGNED_URL_FAKE_LATENCY_MS", "0") or 0))
+            else:
+                self._signer = GcsUrlSigner()
+        return self._signer
+
+    def set_signer(self, signer) -> None:
+        """Swaps the signer (benchmarks, offline runs) and drops cached URLs."""
+        self._signer = signer
+        self.clear()
+
+    # ---------------- Cache ----------------
+
+    @staticmethod
+    def _refresh_at(expiration: int, signed_at: float) -> float:
+        margin = max(MIN_REFRESH_MARGIN_SECONDS, expiration * REFRESH_FRACTION)
+        return signed_at + max(0.0, expiration - margin)
+
+    def _lookup(self, key: CacheKey, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            url, refresh_at = entry
+            if now >= refresh_at:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return url
+
+    def _store(self, key: CacheKey, url: str, refresh_at: float) -> None:
+        with self._lock:
+            self._cache[key] = (url, refresh_at)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._max_entries:
+                self._cache.popitem(last=False)
+
+    def invalidate(self, gcs_uri: str) -> None:
+        """Drops every cached signature for a URI (file deleted or replaced)."""
+        with self._lock:
+            for key in [k for k in self._cache if k[0] == gcs_uri]:
+                del self._cache[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+        self.hits = self.misses = self.sign_batches = 0
+        self.sign_seconds_total = 0.0
+
+    # ---------------- Signing ----------------
+
+    async def sign_many(self, gcs_uris: Iterable[str], expiration: int = DEFAULT_EXPIRATION_SECONDS) -> Dict[str, Optional[str]]:
+        """
+        Returns {uri: signed_url or None} for every distinct gs:// URI given.
+        Cache misses are signed together in a single worker-thread hop.
+        """
+        expiration = int(expiration)
+        now = time.time()
+        results: Dict[str, Optional[str]] = {}
+        to_sign: List[str] = []
+        waiting: Dict[str, asyncio.Future] = {}
+
+        for uri in dict.fromkeys(u for u in gcs_uris if u):
+            key = (uri, expiration)
+            url = self._lookup(key, now)
+            if url is not None:
+                self.hits += 1
+                results[uri] = url
+            elif key in self._inflight:
+                self.hits += 1
+                waiting[uri] = self._inflight[key]
+            else:
+                self.misses += 1
+                to_sign.append(uri)
+
+        if to_sign:
+            loop = asyncio.get_running_loop()
+            futures = {uri: loop.create_future() for uri in to_sign}
+            for uri, future in futures.items():
+                self._inflight[(uri, expiration)] = future
+            signed = None
+            try:
+                started = time.perf_counter()
+                signed = await asyncio.to_thread(self.signer.sign_many, to_sign, expiration)
+                self.sign_batches += 1
+                self.sign_seconds_total += time.perf_counter() - started
+            except Exception as e:
+                logger.error(f"Batch URL signing failed for {len(to_sign)} URIs: {e}")
+                signed = {}
+            finally:
+                for uri in to_sign:
+                    self._inflight.pop((uri, expiration), None)
+                    if not futures[uri].done() and signed is None:
+                        futures[uri].set_result(None)   # Cancelled: release waiters
+
+            refresh_at = self._refresh_at(expiration, now)
+            for uri in to_sign:
+                url = signed.get(uri)
+                if url:
+                    self._store((uri, expiration), url, refresh_at)
+                results[uri] = url
+                futures[uri].set_result(url)
+
+        for uri, future in waiting.items():
+            results[uri] = await future
+        return results
+
+    async def get(self, gcs_uri: str, expiration: int = DEFAULT_EXPIRATION_SECONDS) -> Optional[str]:
+        if not gcs_uri:
+            return None
+        return (await self.sign_many([gcs_uri], expiration)).get(gcs_uri)
+
+    async def sign_attribute(self, objects: Iterable, attr: str = "image_url",
+                             expiration: int = DEFAULT_EXPIRATION_SECONDS) -> None:
+        """
+        Replaces gs:// values of `attr` on (detached) objects with signed URLs,
+        signing all of them in one batch. Unsignable values are left unchanged.
+        """
+        objects = list(objects)
+        uris = [getattr(o, attr, None) for o in objects]
+        signed = await self.sign_many([u for u in uris if u and u.startswith("gs://")], expiration)
+        for obj, uri in zip(objects, uris):
+            if uri and signed.get(uri):
+                setattr(obj, attr, signed[uri])
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "signer": getattr(self.signer, "name", type(self.signer).__name__),
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "sign_batches": self.sign_batches,
+            "sign_seconds_total": round(self.sign_seconds_total, 4),
+        }
+
+
+signed_url_service = SignedUrlService()
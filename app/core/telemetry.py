@@ -0,0 +1,509 @@
+# app/core/telemetry.py
+"""
+In-process runtime telemetry (per worker).
+
+- TelemetryMiddleware: per-route latency histograms and status counts, keyed by
+  the route template (e.g. /api/v1/quotations/{rfq_id}/results) so cardinality
+  stays bounded.
+- SQLAlchemy engine hooks: query count and DB time per request, slow statements
+  with normalized SQL, and N+1 detection (the same normalized statement
+  repeated many times within one request).
+- TimedQueuePool: connection pool that records checkout wait; utilization is
+  read from the pool at scrape time.
+- Boot report: duration of each worker startup phase (recorded by app.main),
+  time until the worker was ready and how long its first request took.
+- AI gateway calls (app/core/ai_gateway.py): latency and slot wait per call
+  type, and outcome counts (ok, coalesced, timeout, error, rejected).
+
+Aggregates live in this process only; with several gunicorn workers each
+scrape reflects the worker that served it (the pid is exported as a label).
+Exposed through system_owner's /system-health-telemetry and the Prometheus
+text endpoint /metrics (only served when METRICS_AUTH_TOKEN is set).
+"""
+
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+SLOW_QUERY_MS = float(os.getenv("TELEMETRY_SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("TELEMETRY_N_PLUS_ONE_THRESHOLD", "10"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500)
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+AI_LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+AI_WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+MAX_SLOW_QUERIES = 50
+MAX_N_PLUS_ONE_EVENTS = 50
+MAX_STATEMENT_LENGTH = 500
+
+_PROCESS_STARTED_AT = time.time()
+
+
+# ==============================================================================
+# 1. PRIMITIVES
+# ==============================================================================
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics). Not thread-safe on its own."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        out, running = [], 0
+        for bound, c in zip(self.buckets, self.counts):
+            running += c
+            out.append((_fmt(bound), running))
+        out.append(("+Inf", running + self.counts[-1]))
+        return out
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper-bound estimate from bucket boundaries."""
+        if not self.count:
+            return None
+        target, running = q * self.count, 0
+        for bound, c in zip(self.buckets, self.counts):
+            running += c
+            if running >= target:
+                return bound
+        return float("inf")
+
+
+_LITERAL_PATTERNS = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),                  # string literals
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),               # numeric literals
+    (re.compile(r"%\(\w+\)s|(?<!:):\w+|\$\d+"), "?"),      # bind placeholders (not ::casts)
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?)"),    # IN (?, ?, ?) -> IN (?)
+    (re.compile(r"__\[POSTCOMPILE_\w+\]"), "?"),
+    (re.compile(r"\s+"), " "),
+)
+
+
+def normalize_sql(statement: str) -> str:
+    """Collapses literals, placeholders and IN-lists so equivalent statements group together."""
+    for pattern, replacement in _LITERAL_PATTERNS:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()[:MAX_STATEMENT_LENGTH]
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if value != int(value) else f"{int(value)}.0"
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+# ==============================================================================
+# 2. REGISTRY
+# ==============================================================================
+
+class RequestQueryStats:
+    __slots__ = ("route", "count", "duration", "statements")
+
+    def __init__(self, route: str = "unknown"):
+        self.route = route
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Counter = Counter()
+
+
+_current_request: ContextVar[Optional[RequestQueryStats]] = ContextVar("telemetry_request", default=None)
+
+
+class TelemetryRegistry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_latency: Dict[Tuple[str, str], Histogram] = {}
+        self.request_status: Counter = Counter()             # (method, route, status) -> count
+        self.request_queries: Dict[Tuple[str, str], Histogram] = {}
+        self.query_total = 0
+        self.query_seconds_total = 0.0
+        self.background_queries = 0                          # Outside any HTTP request (cron, scheduler)
+        self.slow_queries: Deque[Dict[str, Any]] = deque(maxlen=MAX_SLOW_QUERIES)
+        self.slow_query_total = 0
+        self.n_plus_one: Deque[Dict[str, Any]] = deque(maxlen=MAX_N_PLUS_ONE_EVENTS)
+        self.n_plus_one_total: Counter = Counter()           # route -> count
+        self.pool_wait = Histogram(POOL_WAIT_BUCKETS)
+        self.pool_timeouts = 0
+        self._pool: Optional[QueuePool] = None
+        self.boot_phases: Dict[str, float] = {}              # phase -> seconds, in boot order
+        self.ready_at: Optional[float] = None
+        self.first_request: Optional[Dict[str, Any]] = None
+        self.ai_latency: Dict[str, Histogram] = {}           # call_type -> end-to-end seconds
+        self.ai_slot_wait = Histogram(AI_WAIT_BUCKETS)
+        self.ai_calls: Counter = Counter()                   # (call_type, outcome) -> count
+        self.ai_retries = 0
+
+    # ---------------- Recording ----------------
+
+    def record_request(self, method: str, route: str, status: int, seconds: float, queries: RequestQueryStats) -> None:
+        repeated = [(stmt, n) for stmt, n in queries.statements.items() if n >= N_PLUS_ONE_THRESHOLD]
+        with self._lock:
+            key = (method, route)
+            hist = self.request_latency.get(key)
+            if hist is None:
+                hist = self.request_latency[key] = Histogram(LATENCY_BUCKETS)
+            hist.observe(seconds)
+            self.request_status[(method, route, status)] += 1
+
+            q_hist = self.request_queries.get(key)
+            if q_hist is None:
+                q_hist = self.request_queries[key] = Histogram(QUERY_COUNT_BUCKETS)
+            q_hist.observe(queries.count)
+
+            for stmt, n in repeated:
+                self.n_plus_one_total[route] += 1
+                self.n_plus_one.append({
+                    "route": f"{method} {route}", "statement": stmt, "repetitions": n, "at": time.time()
+                })
+
+    def record_query(self, statement: str, seconds: float) -> None:
+        current = _current_request.get()
+        normalized = None
+        if current is not None:
+            normalized = normalize_sql(statement)
+            current.count += 1
+            current.duration += seconds
+            current.statements[normalized] += 1
+
+        slow = seconds * 1000 >= SLOW_QUERY_MS
+        if slow and normalized is None:
+            normalized = normalize_sql(statement)
+        with self._lock:
+            self.query_total += 1
+            self.query_seconds_total += seconds
+            if current is None:
+                self.background_queries += 1
+            if slow:
+                self.slow_query_total += 1
+                self.slow_queries.append({
+                    "route": current.route if current else "background",
+                    "statement": normalized,
+                    "duration_ms": round(seconds * 1000, 2),
+                    "at": time.time(),
+                })
+
+    def record_boot_phase(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.boot_phases[phase] = self.boot_phases.get(phase, 0.0) + seconds
+
+    def mark_ready(self) -> None:
+        """Called once the worker's startup events have run."""
+        with self._lock:
+            if self.ready_at is None:
+                self.ready_at = time.time()
+
+    def record_first_request(self, method: str, path: str, seconds: float) -> None:
+        with self._lock:
+            if self.first_request is None:
+                self.first_request = {
+                    "route": f"{method} {path}",
+                    "duration_ms": round(seconds * 1000, 2),
+                    "completed_at": time.time(),
+                }
+
+    def boot_report(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = dict(self.boot_phases)
+            first_request = dict(self.first_request) if self.first_request else None
+            ready_at = self.ready_at
+        report: Dict[str, Any] = {
+            "phases_ms": {phase: round(seconds * 1000, 1) for phase, seconds in phases.items()},
+            "boot_ms": round(sum(phases.values()) * 1000, 1),
+            "ready_after_ms": round((ready_at - _PROCESS_STARTED_AT) * 1000, 1) if ready_at else None,
+            "first_request": None,
+        }
+        if first_request:
+            completed_at = first_request.pop("completed_at")
+            first_request["completed_after_ms"] = round((completed_at - _PROCESS_STARTED_AT) * 1000, 1)
+            report["first_request"] = first_request
+        return report
+
+    def record_pool_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.pool_wait.observe(seconds)
+            if timed_out:
+                self.pool_timeouts += 1
+
+    def record_ai_call(self, call_type: str, outcome: str, seconds: float) -> None:
+        with self._lock:
+            self.ai_calls[(call_type, outcome)] += 1
+            if outcome in ("ok", "coalesced"):
+                hist = self.ai_latency.get(call_type)
+                if hist is None:
+                    hist = self.ai_latency[call_type] = Histogram(AI_LATENCY_BUCKETS)
+                hist.observe(seconds)
+
+    def record_ai_slot_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.ai_slot_wait.observe(seconds)
+
+    def record_ai_retry(self) -> None:
+        with self._lock:
+            self.ai_retries += 1
+
+    # ---------------- Engine wiring ----------------
+
+    def instrument_engine(self, engine) -> None:
+        """Attaches cursor timing hooks to an engine (idempotent)."""
+        if getattr(engine, "_telemetry_instrumented", False):
+            return
+        engine._telemetry_instrumented = True
+        if isinstance(engine.pool, QueuePool):
+            self._pool = engine.pool
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("_telemetry_t0", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            stack = conn.info.get("_telemetry_t0")
+            if stack:
+                self.record_query(statement, time.perf_counter() - stack.pop())
+
+        @event.listens_for(engine, "handle_error")
+        def _handle_error(exception_context):
+            conn = exception_context.connection
+            if conn is not None:
+                stack = conn.info.get("_telemetry_t0")
+                if stack:
+                    stack.pop()
+
+    # ---------------- Views ----------------
+
+    def pool_status(self) -> Dict[str, Any]:
+        pool = self._pool
+        if pool is None:
+            return {}
+        size = pool.size()
+        checked_out = pool.checkedout()
+        capacity = size + max(pool._max_overflow, 0)
+        return {
+            "size": size,
+            "checked_out": checked_out,
+            "overflow": max(pool.overflow(), 0),
+            "idle": pool.checkedin(),
+            "capacity": capacity,
+            "utilization_percent": round(checked_out / capacity * 100, 1) if capacity else None,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON view for the system owner telemetry endpoint."""
+        with self._lock:
+            routes = []
+            total_requests = 0
+            total_5xx = 0
+            overall = Histogram(LATENCY_BUCKETS)
+            for (method, route), hist in self.request_latency.items():
+                statuses = {s: n for (m, r, s), n in self.request_status.items() if m == method and r == route}
+                errors = sum(n for s, n in statuses.items() if s >= 500)
+                total_requests += hist.count
+                total_5xx += errors
+                overall.counts = [a + b for a, b in zip(overall.counts, hist.counts)]
+                overall.count += hist.count
+                overall.sum += hist.sum
+                q_hist = self.request_queries.get((method, route))
+                routes.append({
+                    "route": f"{method} {route}",
+                    "requests": hist.count,
+                    "avg_ms": round(hist.sum / hist.count * 1000, 2) if hist.count else None,
+                    "p50_ms": _ms(hist.quantile(0.5)),
+                    "p95_ms": _ms(hist.quantile(0.95)),
+                    "p99_ms": _ms(hist.quantile(0.99)),
+                    "errors_5xx": errors,
+                    "status_counts": statuses,
+                    "avg_queries": round(q_hist.sum / q_hist.count, 1) if q_hist and q_hist.count else 0,
+                    "n_plus_one_events": self.n_plus_one_total.get(route, 0),
+                })
+            routes.sort(key=lambda r: r["p95_ms"] or 0, reverse=True)
+
+            ai_calls = []
+            for call_type, hist in sorted(self.ai_latency.items()):
+                ai_calls.append({
+                    "call_type": call_type,
+                    "completed": hist.count,
+                    "p50_ms": _ms(hist.quantile(0.5)),
+                    "p95_ms": _ms(hist.quantile(0.95)),
+                    "p99_ms": _ms(hist.quantile(0.99)),
+                    "outcomes": {o: n for (c, o), n in self.ai_calls.items() if c == call_type},
+                })
+
+            snapshot = {
+                "pid": os.getpid(),
+                "uptime_seconds": int(time.time() - _PROCESS_STARTED_AT),
+                "requests_total": total_requests,
+                "errors_5xx_total": total_5xx,
+                "availability_percent": round((1 - total_5xx / total_requests) * 100, 3) if total_requests else None,
+                "latency_p50_ms": _ms(overall.quantile(0.5)),
+                "latency_p95_ms": _ms(overall.quantile(0.95)),
+                "queries_total": self.query_total,
+                "query_seconds_total": round(self.query_seconds_total, 3),
+                "background_queries_total": self.background_queries,
+                "slow_query_threshold_ms": SLOW_QUERY_MS,
+                "slow_queries_total": self.slow_query_total,
+                "slow_queries": sorted(self.slow_queries, key=lambda q: q["duration_ms"], reverse=True)[:20],
+                "n_plus_one": list(self.n_plus_one)[-20:],
+                "pool": self.pool_status(),
+                "pool_wait_p95_ms": _ms(self.pool_wait.quantile(0.95)),
+                "pool_timeouts_total": self.pool_timeouts,
+                "routes": routes[:50],
+                "ai": {
+                    "calls": ai_calls,
+                    "failures": {f"{c}:{o}": n for (c, o), n in self.ai_calls.items() if o not in ("ok", "coalesced")},
+                    "retries_total": self.ai_retries,
+                    "slot_wait_p95_ms": _ms(self.ai_slot_wait.quantile(0.95)),
+                },
+            }
+        snapshot["boot"] = self.boot_report()
+        from app.core.ai_gateway import ai_gateway
+        snapshot["ai"]["gateway"] = ai_gateway.stats()
+        return snapshot
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        pid = os.getpid()
+        lines: List[str] = []
+
+        def histogram(name: str, help_text: str, items: List[Tuple[Dict[str, Any], Histogram]]):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, hist in items:
+                base = ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels.items())
+                sep = "," if base else ""
+                for le, count in hist.cumulative():
+                    lines.append(f'{name}_bucket{{{base}{sep}le="{le}"}} {count}')
+                lines.append(f"{name}_sum{{{base}}} {hist.sum}")
+                lines.append(f"{name}_count{{{base}}} {hist.count}")
+
+        def scalar(name: str, kind: str, help_text: str, value: Any, labels: Optional[Dict[str, Any]] = None):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            label_str = ",".join(f'{k}="{_escape_label(v)}"' for k, v in (labels or {}).items())
+            lines.append(f"{name}{{{label_str}}} {value}" if label_str else f"{name} {value}")
+
+        with self._lock:
+            histogram(
+                "http_request_duration_seconds", "HTTP request latency by route template.",
+                [({"pid": pid, "method": m, "route": r}, h) for (m, r), h in sorted(self.request_latency.items())]
+            )
+            lines.append("# HELP http_requests_total HTTP responses by route template and status.")
+            lines.append("# TYPE http_requests_total counter")
+            for (m, r, s), n in sorted(self.request_status.items()):
+                lines.append(f'http_requests_total{{pid="{pid}",method="{m}",route="{_escape_label(r)}",status="{s}"}} {n}')
+            histogram(
+                "http_request_db_queries", "Database statements executed per HTTP request.",
+                [({"pid": pid, "method": m, "route": r}, h) for (m, r), h in sorted(self.request_queries.items())]
+            )
+            lines.append("# HELP db_n_plus_one_total Requests that repeated one normalized statement at least the N+1 threshold.")
+            lines.append("# TYPE db_n_plus_one_total counter")
+            for r, n in sorted(self.n_plus_one_total.items()):
+                lines.append(f'db_n_plus_one_total{{pid="{pid}",route="{_escape_label(r)}"}} {n}')
+            scalar("db_queries_total", "counter", "Database statements executed.", self.query_total, {"pid": pid})
+            scalar("db_query_seconds_total", "counter", "Time spent executing database statements.", self.query_seconds_total, {"pid": pid})
+            scalar("db_slow_queries_total", "counter", f"Statements slower than {SLOW_QUERY_MS} ms.", self.slow_query_total, {"pid": pid})
+            histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", [({"pid": pid}, self.pool_wait)])
+            scalar("db_pool_checkout_timeouts_total", "counter", "Pool checkouts that timed out.", self.pool_timeouts, {"pid": pid})
+            histogram(
+                "ai_call_duration_seconds", "AI gateway call latency (including slot wait and retries) by call type.",
+                [({"pid": pid, "call_type": c}, h) for c, h in sorted(self.ai_latency.items())]
+            )
+            lines.append("# HELP ai_calls_total AI gateway calls by call type and outcome.")
+            lines.append("# TYPE ai_calls_total counter")
+            for (c, o), n in sorted(self.ai_calls.items()):
+                lines.append(f'ai_calls_total{{pid="{pid}",call_type="{_escape_label(c)}",outcome="{o}"}} {n}')
+            histogram("ai_slot_wait_seconds", "Time AI calls waited for a concurrency slot.", [({"pid": pid}, self.ai_slot_wait)])
+            scalar("ai_retries_total", "counter", "AI gateway retry attempts.", self.ai_retries, {"pid": pid})
+            pool = self.pool_status()
+            boot_phases = sorted(self.boot_phases.items())
+            first_request = self.first_request
+        lines.append("# HELP process_boot_phase_seconds Worker startup time by phase.")
+        lines.append("# TYPE process_boot_phase_seconds gauge")
+        for phase, seconds in boot_phases:
+            lines.append(f'process_boot_phase_seconds{{pid="{pid}",phase="{_escape_label(phase)}"}} {seconds}')
+        if first_request:
+            scalar("process_first_request_seconds", "gauge", "Duration of the first request served by the worker.", first_request["duration_ms"] / 1000, {"pid": pid})
+        if pool:
+            scalar("db_pool_size", "gauge", "Configured pool size.", pool["size"], {"pid": pid})
+            scalar("db_pool_checked_out", "gauge", "Connections currently checked out.", pool["checked_out"], {"pid": pid})
+            scalar("db_pool_overflow", "gauge", "Overflow connections currently open.", pool["overflow"], {"pid": pid})
+            scalar("db_pool_capacity", "gauge", "Pool size plus max overflow.", pool["capacity"], {"pid": pid})
+        scalar("process_start_time_seconds", "gauge", "Start time of the worker process.", _PROCESS_STARTED_AT, {"pid": pid})
+        return "\n".join(lines) + "\n"
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    if seconds is None:
+        return None
+    return round(seconds * 1000, 2) if seconds != float("inf") else None
+
+
+telemetry = TelemetryRegistry()
+
+
+# ==============================================================================
+# 3. POOL & MIDDLEWARE
+# ==============================================================================
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            telemetry.record_pool_wait(time.perf_counter() - t0, timed_out=True)
+            raise
+        telemetry.record_pool_wait(time.perf_counter() - t0)
+        return conn
+
+
+class TelemetryMiddleware(BaseHTTPMiddleware):
+    """
+    Records latency, status and DB statement statistics for every request,
+    keyed by the matched route template (unmatched paths are grouped).
+    """
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        stats = RequestQueryStats(request.url.path)
+        first = telemetry.first_request is None
+        token = _current_request.set(stats)
+        t0 = time.perf_counter()
+        status_code = 500
+        try:
+            response: Response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            stats.route = route_path
+            elapsed = time.perf_counter() - t0
+            telemetry.record_request(request.method, route_path, status_code, elapsed, stats)
+            if first:
+                telemetry.record_first_request(request.method, route_path, elapsed)
+            _current_request.reset(token)
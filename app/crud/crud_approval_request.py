@@ -1,14 +1,13 @@
 # c:\Grow\app\crud\crud_approval_request.py
 
-from typing import List, Optional, Type, Dict, Any, Union # <-- ADD Union
+from typing import List, Optional, Type, Dict, Any, Tuple, Union # <-- ADD Union
 from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.sql import func, desc
 from sqlalchemy import and_, or_
 from fastapi import HTTPException, status
 from datetime import datetime, date, timedelta
-import json
 import decimal
-from app.core.ai_integration import delete_file_from_gcs
+from app.core.object_storage import object_storage
 from app.crud.crud import CRUDBase, log_action
 import app.models as models
 
@@ -43,7 +42,6 @@ from app.constants import (
     ACTION_TYPE_APPROVAL_REQUEST_PENDING,
 )
 
-from app.core.email_service import EmailSettings, get_global_email_settings, send_email, get_customer_email_settings
 
 import logging
 logger = logging.getLogger(__name__)
@@ -98,9 +96,9 @@ def _nuke_document(db: Session, request_details: dict):
             # 1. Find the document directly
             doc = db.query(models.LGDocument).get(int(doc_id))
             if doc:
-                # 2. Delete from GCS
+                # 2. Release the stored object (deleted with its last reference)
                 if doc.file_path:
-                    delete_file_from_gcs(doc.file_path)
+                    object_storage.release(db, doc.file_path)
                 
                 # 3. Delete from DB
                 db.delete(doc)
@@ -215,6 +213,9 @@ class CRUDApprovalRequest(CRUDBase):
         # No more HTTPExceptions, no more mandatory role checks.
         db.flush()
 
+        from app.core.deadline_scheduler import schedule_approval_request_deadline
+        schedule_approval_request_deadline(db, db_obj)
+
         # 4. Log and Notify (Remaining identical to your original code)
         log_action(
             db,
@@ -235,7 +236,7 @@ class CRUDApprovalRequest(CRUDBase):
         )
 
         try:
-            await self._send_pending_approval_notification(db, db_obj) 
+            self._send_pending_approval_notification(db, db_obj)
         except Exception as e:
             logger.error(f"Failed to send pending approval notification for request ID {db_obj.id}: {e}", exc_info=True)
             log_action(
@@ -254,123 +255,14 @@ class CRUDApprovalRequest(CRUDBase):
 
         return db_obj
 
-    # The _send_pending_approval_notification helper function remains ASYNC:
-    async def _send_pending_approval_notification(self, db: Session, approval_request: models.ApprovalRequest):
+    def _send_pending_approval_notification(self, db: Session, approval_request: models.ApprovalRequest):
         """
-        Sends an email notification to all Checkers and Corporate Admins of the customer
-        about a newly submitted approval request.
+        Queues the 'pending approval' e-mail to the customer's Checkers and Corporate
+        Admins; it is sent after commit, coalesced with other alerts
+        (app/services/approval_notifications.py).
         """
-        logger.info(f"Attempting to send 'Pending Approval' notification for Approval Request ID: {approval_request.id}.")
-
-        # 1. Identify all Checkers and Corporate Admins for the customer
-        checker_and_admin_emails = db.query(models.User.email).filter(
-            models.User.customer_id == approval_request.customer_id,
-            models.User.is_deleted == False,  # <--- CORRECTED: Using is_deleted == False for active users
-            models.User.email.isnot(None),
-            models.User.email != "",
-            models.User.role.in_(['corporate_admin', 'checker']) 
-        ).distinct().all()
-        
-        # Filter out the maker user to prevent self-notification
-        # Note: We must ensure maker_user relationship is eagerly loaded or fetched, 
-        # but for simplicity and safety, we'll rely on the DB object refresh done prior to this call.
-        maker_email = approval_request.maker_user.email if approval_request.maker_user else None
-        
-        to_emails = [email[0] for email in checker_and_admin_emails if email[0] != maker_email]
-        cc_emails = [] # No CC list needed for the primary checker alert
-
-        if not to_emails:
-            logger.warning(f"No valid recipients found for pending approval request ID {approval_request.id}. Skipping email.")
-            return
-
-        # 2. Fetch template
-        import app.crud.crud as crud_instances # Import crud instance helper inside the function scope if needed
-        notification_template = db.query(models.Template).filter(
-            models.Template.action_type == ACTION_TYPE_APPROVAL_REQUEST_PENDING,
-            models.Template.is_notification_template == True,
-            models.Template.is_deleted == False,
-            models.Template.is_global == True
-        ).first()
-
-        if not notification_template:
-            logger.error(f"Email notification template for '{ACTION_TYPE_APPROVAL_REQUEST_PENDING}' not found. Cannot send checker alert.")
-            return
-
-        # 3. Prepare template data and email settings
-        email_settings_to_use, email_method_for_log = get_customer_email_settings(db, approval_request.customer_id)
-        
-        lg_record = approval_request.lg_record if approval_request.lg_record else None
-        
-        lg_number = lg_record.lg_number if lg_record else f"Owner Contact ID: {approval_request.entity_id}"
-        lg_currency = lg_record.lg_currency.iso_code if lg_record and lg_record.lg_currency else "N/A"
-        lg_amount = float(lg_record.lg_amount) if lg_record and lg_record.lg_amount is not None else "N/A"
-        
-        template_data = {
-            "maker_email": maker_email if maker_email else "N/A",
-            "maker_name": approval_request.maker_user.email.split('@')[0] if approval_request.maker_user and approval_request.maker_user.email else "N/A",
-            "approval_request_id": approval_request.id,
-            "action_type": approval_request.action_type.replace('_', ' ').title(),
-            "entity_type": approval_request.entity_type,
-            "lg_number": lg_number,
-            "lg_amount": lg_amount,
-            "lg_currency_code": lg_currency,
-            "current_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "platform_name": "Treasury Management Platform",
-            "action_center_link": "/checker/action-center"
-        }
-
-        template_data["lg_amount_formatted"] = f"{lg_currency} {lg_amount:,.2f}" if isinstance(lg_amount, (float, int, decimal.Decimal)) else lg_amount
-
-
-        email_subject = notification_template.subject if notification_template.subject else f"ACTION REQUIRED: Approval Pending for {{action_type}} on {{lg_number}}"
-        email_body_html = notification_template.content
-        for key, value in template_data.items():
-            str_value = str(value) if value is not None else ""
-            email_body_html = email_body_html.replace(f"{{{{{key}}}}}", str_value)
-            email_subject = email_subject.replace(f"{{{{{key}}}}}", str_value)
-
-        # 4. Send the email
-        email_sent_successfully = await send_email(
-            db=db,
-            to_emails=to_emails,
-            cc_emails=cc_emails,
-            subject_template=email_subject,
-            body_template=email_body_html,
-            template_data=template_data,
-            email_settings=email_settings_to_use,
-        )
-
-        # 5. Log the notification attempt/success
-        if email_sent_successfully:
-            log_action(
-                db,
-                user_id=approval_request.maker_user_id,
-                action_type="NOTIFICATION_SENT",
-                entity_type="ApprovalRequest",
-                entity_id=approval_request.id,
-                details={
-                    "recipient": to_emails,
-                    "subject": email_subject,
-                    "method": email_method_for_log,
-                    "notification_type": "Pending Approval Alert"
-                },
-                customer_id=approval_request.customer_id,
-                lg_record_id=lg_record.id if lg_record else None,
-            )
-            logger.info(f"Pending approval alert sent successfully for AR {approval_request.id} to {len(to_emails)} checker(s).")
-        else:
-            log_action(
-                db,
-                user_id=approval_request.maker_user_id,
-                action_type="NOTIFICATION_FAILED",
-                entity_type="ApprovalRequest",
-                entity_id=approval_request.id,
-                details={"reason": "Email service failed to send pending approval alert", "recipient": to_emails, "subject": email_subject, "method": email_method_for_log},
-                customer_id=approval_request.customer_id,
-                lg_record_id=lg_record.id if lg_record else None,
-            )
-            logger.error(f"Failed to send pending approval alert for Approval Request ID: {approval_request.id}.")
-    # --- UPDATED METHOD END: _send_pending_approval_notification ---
+        from app.services.approval_notifications import KIND_PENDING_APPROVAL, queue_approval_notification
+        queue_approval_notification(db, KIND_PENDING_APPROVAL, approval_request.id)
     
     
     def get_pending_requests_for_customer(
@@ -441,11 +333,13 @@ class CRUDApprovalRequest(CRUDBase):
         limit: int = 100,
         pending_only: bool = False, # <-- ADD this parameter to handle the special case of pending-only requests
         approver_id: Optional[int] = None, # <-- NEW parameter to filter history by approver
+        unprinted_instruction_only: bool = False,
     ) -> List[models.ApprovalRequest]:
         """
         Retrieves approval requests for a given customer, with optional status and action_type filters.
         If approver_id is provided, returns all PENDING requests for the customer, but filters historical
         (non-PENDING) requests to only those where the user acted as the checker.
+        unprinted_instruction_only keeps requests whose generated instruction has not been printed.
         """
         from sqlalchemy import or_
         # FIX: The `is_deleted` filter is removed from this method, as the ApprovalRequest model does not have this column.
@@ -480,6 +374,11 @@ class CRUDApprovalRequest(CRUDBase):
             else:
                 query = query.filter(self.model.action_type == action_type_filter)
 
+        if unprinted_instruction_only:
+            query = query.join(
+                models.LGInstruction, models.LGInstruction.id == self.model.related_instruction_id
+            ).filter(models.LGInstruction.is_printed == False)
+
         query = query.options(
             selectinload(self.model.maker_user),
             selectinload(self.model.checker_user),
@@ -491,6 +390,117 @@ class CRUDApprovalRequest(CRUDBase):
         ).order_by(desc(self.model.created_at)).offset(skip).limit(limit)
         return query.all()
 
+    # ---------------- Approval inbox (list projections) ----------------
+
+    def _inbox_branches(
+        self,
+        customer_id: int,
+        approver_id: Optional[int],
+        status_filter: Optional[List[ApprovalRequestStatusEnum]],
+    ) -> List[list]:
+        """
+        Filters of the inbox's index-friendly branches: PENDING requests of the
+        customer, plus (for an approver) the non-pending requests they checked.
+        Each branch is served by one of the inbox indexes in created_at order.
+        """
+        AR = self.model
+        pending = ApprovalRequestStatusEnum.PENDING
+        wants_pending = not status_filter or pending in status_filter
+        history_statuses = [s for s in status_filter if s != pending] if status_filter else None
+
+        branches = []
+        if wants_pending:
+            branches.append([AR.customer_id == customer_id, AR.status == pending])
+        if approver_id is not None:
+            if history_statuses is None:
+                branches.append([AR.customer_id == customer_id, AR.checker_user_id == approver_id, AR.status != pending])
+            elif history_statuses:
+                branches.append([AR.customer_id == customer_id, AR.checker_user_id == approver_id, AR.status.in_(history_statuses)])
+        elif history_statuses is None:
+            branches.append([AR.customer_id == customer_id, AR.status != pending])
+        elif history_statuses:
+            branches.append([AR.customer_id == customer_id, AR.status.in_(history_statuses)])
+        return branches
+
+    def get_inbox_page(
+        self,
+        db: Session,
+        customer_id: int,
+        approver_id: Optional[int] = None,
+        status_filter: Optional[List[ApprovalRequestStatusEnum]] = None,
+        action_type_filter: Optional[List[str]] = None,
+        limit: int = 50,
+        cursor: Optional[Tuple[datetime, int]] = None,
+    ) -> Tuple[List[Any], Optional[Tuple[datetime, int]]]:
+        """
+        One page of the approval inbox, newest first, as flat projection rows
+        (no ORM objects or relationship loading). Visibility matches
+        get_all_for_customer(approver_id=...): every PENDING request plus the
+        approver's own history.
+
+        Keyset-paginated on (created_at, id): each branch reads at most limit+1
+        index entries past the cursor, so page cost does not grow with history.
+        Returns the rows and the (created_at, id) cursor of the next page, if any.
+        """
+        from sqlalchemy import select, union_all
+        from sqlalchemy.orm import aliased
+
+        AR = self.model
+        branch_queries = []
+        for conditions in self._inbox_branches(customer_id, approver_id, status_filter):
+            if action_type_filter:
+                conditions.append(AR.action_type.in_(action_type_filter))
+            if cursor is not None:
+                created_at, last_id = cursor
+                conditions.append(or_(AR.created_at < created_at, and_(AR.created_at == created_at, AR.id < last_id)))
+            branch_queries.append(
+                select(AR.id, AR.created_at).where(*conditions)
+                .order_by(AR.created_at.desc(), AR.id.desc()).limit(limit + 1)
+            )
+        if not branch_queries:
+            return [], None
+
+        page_keys = (
+            union_all(*[q.subquery().select() for q in branch_queries]) if len(branch_queries) > 1
+            else branch_queries[0]
+        ).subquery()
+
+        Maker = aliased(models.User)
+        Checker = aliased(models.User)
+        rows = db.execute(
+            select(
+                AR.id, AR.created_at, AR.updated_at, AR.entity_type, AR.entity_id, AR.action_type, AR.status,
+                AR.maker_user_id, Maker.email.label("maker_email"),
+                AR.checker_user_id, Checker.email.label("checker_email"),
+                models.LGRecord.lg_number.label("lg_number"),
+                AR.related_instruction_id, AR.reason, AR.withdrawn_at,
+            )
+            .join(page_keys, page_keys.c.id == AR.id)
+            .outerjoin(Maker, Maker.id == AR.maker_user_id)
+            .outerjoin(Checker, Checker.id == AR.checker_user_id)
+            .outerjoin(models.LGRecord, and_(AR.entity_type == "LGRecord", models.LGRecord.id == AR.entity_id))
+            .order_by(AR.created_at.desc(), AR.id.desc())
+            .limit(limit + 1)
+        ).all()
+
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, (rows[-1].created_at, rows[-1].id)
+
+    def get_inbox_counts(
+        self, db: Session, customer_id: int, approver_id: Optional[int] = None
+    ) -> List[Any]:
+        """
+        (status, action_type, count) over the inbox's visible requests, in one
+        grouped query (served by the customer/status/action_type index).
+        """
+        AR = self.model
+        query = db.query(AR.status, AR.action_type, func.count(AR.id)).filter(AR.customer_id == customer_id)
+        if approver_id is not None:
+            query = query.filter(or_(AR.status == ApprovalRequestStatusEnum.PENDING, AR.checker_user_id == approver_id))
+        return query.group_by(AR.status, AR.action_type).all()
+
 
     async def approve_request(
         self, db: Session, request_id: int, checker_user_id: int, customer_id: int
@@ -842,7 +852,7 @@ class CRUDApprovalRequest(CRUDBase):
                 "LG_RELEASE", "LG_LIQUIDATE", "LG_DECREASE_AMOUNT", "LG_ACTIVATE_NON_OPERATIVE"
             ]
             if generated_instruction_id is not None and db_request.entity_type == "LGRecord" and db_request.action_type in INSTRUCTION_TYPES_REQUIRING_PRINTING:
-                await self._send_approval_for_processing_notification(db, db_request)
+                self._send_approval_for_processing_notification(db, db_request)
 
         except HTTPException as e:
             db.rollback()
@@ -1030,30 +1040,8 @@ class CRUDApprovalRequest(CRUDBase):
         ).all()
 
         for req in expired_requests:
-            req.status = ApprovalRequestStatusEnum.AUTO_REJECTED_EXPIRED
-            req.updated_at = func.now()
-            req.reason = f"Request automatically rejected as it exceeded the maximum pending duration of {max_pending_days} days."
-            db.add(req)
+            self.auto_reject_request(db, req, max_pending_days)
             auto_rejected_requests.append(req)
-
-            log_action(
-                db,
-                user_id=None,
-                action_type=AUDIT_ACTION_TYPE_APPROVAL_REQUEST_AUTO_REJECTED,
-                entity_type="ApprovalRequest",
-                entity_id=req.id,
-                details={
-                    "entity_type_auto_rejected": req.entity_type,
-                    "entity_id_auto_rejected": req.entity_id,
-                    "action_type_auto_rejected": req.action_type,
-                    "maker_user_id": req.maker_user_id,
-                    "reason": req.reason,
-                    "max_pending_days_configured": max_pending_days
-                },
-                customer_id=req.customer_id,
-                lg_record_id=req.entity_id if req.entity_type == "LGRecord" else None,
-            )
-            _nuke_document(db, req.request_details or {})
         if auto_rejected_requests:
             db.commit()
             for req in auto_rejected_requests:
@@ -1062,163 +1050,36 @@ class CRUDApprovalRequest(CRUDBase):
 
         return auto_rejected_requests
 
-    async def _send_approval_for_processing_notification(self, db: Session, approval_request: models.ApprovalRequest):
-        logger.info(f"Attempting to send 'Approval for Processing' notification for Approval Request ID: {approval_request.id}.")
-
-        if not approval_request.maker_user:
-            logger.error(f"Cannot send 'Approval for Processing' notification for AR {approval_request.id}: Maker user is missing or not loaded.")
-            log_action(
-                db,
-                user_id=approval_request.checker_user_id,
-                action_type="NOTIFICATION_FAILED",
-                entity_type="ApprovalRequest",
-                entity_id=approval_request.id,
-                details={"reason": "Maker user missing for approval for processing notification", "recipient": "N/A"},
-                customer_id=approval_request.customer_id,
-                lg_record_id=approval_request.entity_id if approval_request.entity_type == "LGRecord" else None,
-            )
-            return
-        
-        if not approval_request.related_instruction or not approval_request.lg_record:
-            logger.error(f"Cannot send 'Approval for Processing' notification for AR {approval_request.id}: Related instruction or LG Record missing/not loaded. Instruction ID: {approval_request.related_instruction_id}.")
-            log_action(
-                db,
-                user_id=approval_request.checker_user_id,
-                action_type="NOTIFICATION_FAILED",
-                entity_type="ApprovalRequest",
-                entity_id=approval_request.id,
-                details={"reason": "Related instruction or LG Record missing for approval for processing notification", "recipient": approval_request.maker_user.email},
-                customer_id=approval_request.customer_id,
-                lg_record_id=approval_request.entity_id if approval_request.entity_type == "LGRecord" else None,
-            )
-            return
-
-        maker_email = approval_request.maker_user.email
-        to_emails = [maker_email]
-        cc_emails = []
+    def auto_reject_request(self, db: Session, req: models.ApprovalRequest, max_pending_days: int) -> models.ApprovalRequest:
+        """Marks a single PENDING request as AUTO_REJECTED_EXPIRED and audits it. Does not commit."""
+        req.status = ApprovalRequestStatusEnum.AUTO_REJECTED_EXPIRED
+        req.updated_at = func.now()
+        req.reason = f"Request automatically rejected as it exceeded the maximum pending duration of {max_pending_days} days."
+        db.add(req)
 
-        email_settings_to_use: EmailSettings
-        email_method_for_log: str
-        try:
-            email_settings_to_use, email_method_for_log = get_customer_email_settings(db, approval_request.customer_id)
-        except Exception as e:
-            email_settings_to_use = get_global_email_settings()
-            email_method_for_log = "global_fallback_due_to_error"
-            logger.warning(f"Failed to retrieve customer-specific email settings for customer ID {approval_request.customer_id}: {e}. Falling back to global settings for 'Approval for Processing' notification.")
-
-        import app.crud.crud as crud_instances
-        common_comm_list_config = crud_instances.crud_customer_configuration.get_customer_config_or_global_fallback(
-            db, approval_request.customer_id, GlobalConfigKey.COMMON_COMMUNICATION_LIST
+        log_action(
+            db,
+            user_id=None,
+            action_type=AUDIT_ACTION_TYPE_APPROVAL_REQUEST_AUTO_REJECTED,
+            entity_type="ApprovalRequest",
+            entity_id=req.id,
+            details={
+                "entity_type_auto_rejected": req.entity_type,
+                "entity_id_auto_rejected": req.entity_id,
+                "action_type_auto_rejected": req.action_type,
+                "maker_user_id": req.maker_user_id,
+                "reason": req.reason,
+                "max_pending_days_configured": max_pending_days
+            },
+            customer_id=req.customer_id,
+            lg_record_id=req.entity_id if req.entity_type == "LGRecord" else None,
         )
-        if common_comm_list_config and common_comm_list_config.get('effective_value'):
-            try:
-                parsed_common_list = json.loads(common_comm_list_config['effective_value'])
-                if isinstance(parsed_common_list, list) and all(isinstance(e, str) and "@" in e for e in parsed_common_list):
-                    cc_emails.extend(parsed_common_list)
-            except json.JSONDecodeError:
-                logger.warning(f"COMMON_COMMUNICATION_LIST for customer {approval_request.customer_id} is not a valid JSON list of emails. Skipping for 'Approval for Processing' notification.")
-        cc_emails = list(set(cc_emails))
-
-        notification_template = db.query(models.Template).filter(
-            models.Template.action_type == "APPROVAL_READY_FOR_PRINT",
-            models.Template.is_global == True,
-            models.Template.is_notification_template == True,
-            models.Template.is_deleted == False
-        ).first()
-
-        if not notification_template:
-            logger.error(f"Email notification template with name 'Approval Ready for Print' not found. Cannot send 'Approval for Processing' notification for Approval Request {approval_request.id}.")
-            log_action(
-                db,
-                user_id=approval_request.checker_user_id,
-                action_type="NOTIFICATION_FAILED",
-                entity_type="ApprovalRequest",
-                entity_id=approval_request.id,
-                details={"reason": "'APPROVAL_READY_FOR_PRINT' template missing for approval for processing notification", "recipient": to_emails},
-                customer_id=approval_request.customer_id,
-                lg_record_id=approval_request.entity_id if approval_request.entity_type == "LGRecord" else None,
-            )
-            return
-
-        lg_record = approval_request.lg_record
-        instruction = approval_request.related_instruction
-
-        template_data = {
-            "maker_email": maker_email,
-            "maker_name": approval_request.maker_user.email.split('@')[0],
-            "checker_email": approval_request.checker_user.email if approval_request.checker_user else "N/A",
-            "approval_request_id": approval_request.id,
-            "action_type": approval_request.action_type.replace('_', ' ').title(),
-            "lg_number": lg_record.lg_number,
-            "lg_amount": float(lg_record.lg_amount),
-            "lg_currency_code": lg_record.lg_currency.iso_code,
-            "instruction_serial_number": instruction.serial_number,
-            "current_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "platform_name": "Treasury Management Platform",
-            "print_link": f"/api/v1/end-user/lg-records/instructions/{instruction.id}/view-letter?print=true",
-            "action_center_link": "/end-user/action-center"
-        }
-
-        template_data["lg_amount_formatted"] = f"{template_data['lg_currency_code']} {template_data['lg_amount']:,.2f}" if isinstance(template_data['lg_amount'], (float, int, decimal.Decimal)) else template_data['lg_amount']
+        _nuke_document(db, req.request_details or {})
+        return req
 
-        email_subject = notification_template.subject if notification_template.subject else f"Approved: Action on LG #{{lg_number}} - Ready for Processing"
-        email_body_html = notification_template.content
-        for key, value in template_data.items():
-            str_value = str(value) if value is not None else ""
-            email_body_html = email_body_html.replace(f"{{{{{key}}}}}", str_value)
-            email_subject = email_subject.replace(f"{{{{{key}}}}}", str_value)
+    def _send_approval_for_processing_notification(self, db: Session, approval_request: models.ApprovalRequest):
+        """Queues the 'approved, ready for processing' e-mail to the maker; sent after commit."""
+        from app.services.approval_notifications import KIND_READY_FOR_PRINT, queue_approval_notification
+        queue_approval_notification(db, KIND_READY_FOR_PRINT, approval_request.id)
 
-        try:
-            email_sent_successfully = await send_email(
-                db=db,
-                to_emails=to_emails,
-                cc_emails=cc_emails,
-                subject_template=email_subject,
-                body_template=email_body_html,
-                template_data=template_data,
-                email_settings=email_settings_to_use,
-            )
-
-            if email_sent_successfully:
-                log_action(
-                    db,
-                    user_id=approval_request.checker_user_id,
-                    action_type="NOTIFICATION_SENT",
-                    entity_type="ApprovalRequest",
-                    entity_id=approval_request.id,
-                    details={
-                        "recipient": to_emails,
-                        "cc_recipients": cc_emails,
-                        "subject": email_subject,
-                        "method": email_method_for_log,
-                        "notification_type": "Approval For Processing"
-                    },
-                    customer_id=approval_request.customer_id,
-                    lg_record_id=approval_request.entity_id if approval_request.entity_type == "LGRecord" else None,
-                )
-                logger.info(f"'Approval for Processing' notification sent successfully for Approval Request ID: {approval_request.id} to maker {maker_email}.")
-            else:
-                logger.error(f"send_email returned False for 'Approval for Processing' notification for Approval Request ID: {approval_request.id}.")
-                log_action(
-                    db,
-                    user_id=approval_request.checker_user_id,
-                    action_type="NOTIFICATION_FAILED",
-                    entity_type="ApprovalRequest",
-                    entity_id=approval_request.id,
-                    details={"reason": "Email service failed to send print-ready notification (send_email returned False)", "recipient": to_emails, "subject": email_subject, "method": email_method_for_log},
-                    customer_id=approval_request.customer_id,
-                    lg_record_id=approval_request.entity_id if approval_request.entity_type == "LGRecord" else None,
-                )
-        except Exception as e:
-            logger.exception(f"Exception occurred while sending 'Approval for Processing' notification for Approval Request ID: {approval_request.id}: {e}")
-            log_action(
-                db,
-                user_id=approval_request.checker_user_id,
-                action_type="NOTIFICATION_FAILED",
-                entity_type="ApprovalRequest",
-                entity_id=approval_request.id,
-                details={"reason": f"Exception during email send: {e}", "recipient": to_emails, "subject": email_subject, "method": email_method_for_log},
-                customer_id=approval_request.customer_id,
-                lg_record_id=approval_request.entity_id if approval_request.entity_type == "LGRecord" else None,
-            )
 crud_approval_request = CRUDApprovalRequest(models.ApprovalRequest)
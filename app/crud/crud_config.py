@@ -1,7 +1,7 @@
 # app/crud/crud_config.py
 
 import json
-from typing import Any, Dict, List, Optional, Type, TypeVar
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.sql import func
@@ -162,6 +162,33 @@ class CRUDCustomerConfiguration(CRUDBase):
             "source": source, # Not part of schema, but useful for debugging
         }
 
+    def get_effective_value_map(
+        self, db: Session, config_key: GlobalConfigKey
+    ) -> Tuple[Optional[str], Dict[int, str]]:
+        """
+        Global default for config_key plus every customer's active override, in one
+        joined query. Customers absent from the map use the default.
+        Returns (None, {}) if the global key itself doesn't exist.
+        """
+        rows = (
+            db.query(GlobalConfiguration.value_default, CustomerConfiguration.customer_id, CustomerConfiguration.configured_value)
+            .outerjoin(
+                CustomerConfiguration,
+                (CustomerConfiguration.global_config_id == GlobalConfiguration.id)
+                & (CustomerConfiguration.is_deleted == False),
+            )
+            .filter(GlobalConfiguration.key == config_key, GlobalConfiguration.is_deleted == False)
+            .all()
+        )
+        if not rows:
+            return None, {}
+        overrides = {
+            customer_id: configured_value
+            for _, customer_id, configured_value in rows
+            if customer_id is not None and configured_value is not None
+        }
+        return rows[0][0], overrides
+
     def get_all_customer_configs_for_customer(self, db: Session, customer_id: int) -> List[CustomerConfigurationOut]:
         all_global_configs = self.global_config_crud.get_all(db)
         customer_configs_map = {
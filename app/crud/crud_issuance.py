@@ -338,6 +338,9 @@ class CRUDIssuanceRequest(CRUDBase):
                     customer_id
                 )
 
+                from app.core.deadline_scheduler import schedule_issuance_edit_deadline
+                schedule_issuance_edit_deadline(db, req)
+
                 logger.info(f"[EDIT] Edit request stored as pending for admin approval. Status → EDIT_REQUESTED")
 
         # 3. Apply Updates to Record (only for drafts, revisions, or blacklist re-approval edits)
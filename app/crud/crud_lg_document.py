@@ -3,17 +3,18 @@ import json
 import os
 import uuid
 from datetime import date, datetime
-from typing import Any, Dict, List, Optional, Type, Tuple
+from typing import Any, Dict, List, Optional, Type, Tuple, Union
 from fastapi import HTTPException, status, UploadFile
 from sqlalchemy import func, desc, exists, and_
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm import Session
 import decimal
 
 from app.crud.crud import CRUDBase, log_action
 import app.models as models
-from app.models import LGDocument, Customer, SubscriptionPlan
+from app.models import LGDocument, SubscriptionPlan
 from app.schemas.all_schemas import LGDocumentCreate
-from app.core.ai_integration import _upload_to_gcs, GCS_BUCKET_NAME 
+from app.core.ai_integration import GCS_BUCKET_NAME
+from app.core.object_storage import object_storage
 
 import logging
 logger = logging.getLogger(__name__)
@@ -79,22 +80,29 @@ class CRUDLGDocument(CRUDBase):
         self,
         db: Session,
         obj_in: LGDocumentCreate, 
-        file_content: bytes,
+        file_content: Union[bytes, UploadFile, Any],
         lg_record_id: int,
         uploaded_by_user_id: int,
         original_instruction_serial: Optional[str] = None,
         lg_record_details: Optional[Dict[str, Any]] = None, 
         bucket_name: str = GCS_BUCKET_NAME      
     ) -> LGDocument:
+        """
+        Stores a document file and its metadata. `file_content` may be bytes or
+        an UploadFile / file object, which is streamed rather than read into memory.
+        Identical content already stored for the customer is reused by reference.
+        """
         logger.debug(f"[CRUDLGDocument.create_document] START. lg_record_id={lg_record_id}, doc_type={obj_in.document_type}, orig_filename={obj_in.file_name}") 
 
-        # 1. Validate Customer and Subscription
-        customer_id = db.query(models.LGRecord.customer_id).filter(models.LGRecord.id == lg_record_id).scalar()
+        # 1. Validate Customer and Subscription (LG usually already in the identity map;
+        #    plan + bucket are resolved once per session)
+        lg_record = db.get(models.LGRecord, lg_record_id)
+        customer_id = lg_record.customer_id if lg_record else None
         if not customer_id:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Associated LG Record not found for document storage.")
 
-        customer_obj = db.query(Customer).options(selectinload(Customer.subscription_plan)).filter(Customer.id == customer_id).first()
-        if not customer_obj or not customer_obj.subscription_plan or not customer_obj.subscription_plan.can_image_storage:
+        storage_ctx = object_storage.resolve_context(db, customer_id)
+        if not storage_ctx.can_store:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Customer's subscription plan does not support image/document storage."
@@ -132,15 +140,9 @@ class CRUDLGDocument(CRUDBase):
         blob_path = f"customer_{customer_id}/lg_{lg_record_id}/{doc_type_slug}/{unique_filename}"
 
         # --- CENTRALIZED BUCKET LOOKUP ---
-        # If no bucket_name was passed, try to find the customer-specific one
+        # If no bucket_name was passed, use the customer-specific one
         if not bucket_name or bucket_name == GCS_BUCKET_NAME:
-            bucket_config = self.crud_customer_configuration_instance.get_customer_config_or_global_fallback(
-                db, customer_id, models.GlobalConfigKey.STORAGE_BUCKET_NAME
-            )
-            if bucket_config and bucket_config.get('effective_value'):
-                bucket_name = bucket_config['effective_value']
-            else:
-                bucket_name = GCS_BUCKET_NAME # Fallback to .env default
+            bucket_name = storage_ctx.bucket_name
 
         if not bucket_name:
             logger.error(f"No storage bucket found for customer {customer_id} and GCS_BUCKET_NAME is not set.")
@@ -151,11 +153,10 @@ class CRUDLGDocument(CRUDBase):
         # ---------------------------------
             
         try:
-            # 4. Upload to GCS using the new hierarchical blob path
-            stored_gcs_uri = await _upload_to_gcs(bucket_name, blob_path, file_content, obj_in.mime_type)
-            if not stored_gcs_uri:
-                raise Exception("GCS upload returned no URI.")
-            logger.info(f"Document uploaded to GCS: {stored_gcs_uri}")
+            # 4. Stream to storage (or reuse identical content already stored for this customer)
+            stored = await object_storage.store(db, customer_id, bucket_name, blob_path, file_content, obj_in.mime_type)
+            stored_gcs_uri = stored.uri
+            logger.info(f"Document stored: {stored_gcs_uri} (deduplicated={stored.deduplicated})")
         except HTTPException:
             raise
         except Exception as e:
@@ -189,7 +190,9 @@ class CRUDLGDocument(CRUDBase):
                 "lg_instruction_id": obj_in.lg_instruction_id, 
                 "document_type": obj_in.document_type,
                 "file_name": unique_filename, 
-                "stored_path": stored_gcs_uri 
+                "stored_path": stored_gcs_uri,
+                "content_sha256": stored.sha256,
+                "deduplicated": stored.deduplicated,
             },
             customer_id=customer_id,
             lg_record_id=lg_record_id,
@@ -168,7 +168,7 @@ class CRUDLGInstruction(CRUDBase):
         return db_obj
 
     async def record_instruction_delivery(
-        self, db: Session, instruction_id: int, obj_in: LGInstructionRecordDelivery, user_id: int, customer_id: int, file_content: Optional[bytes] = None
+        self, db: Session, instruction_id: int, obj_in: LGInstructionRecordDelivery, user_id: int, customer_id: int, file_content: Optional[Any] = None
     ) -> models.LGInstruction:
         logger.debug(f"[CRUDLGInstruction.record_instruction_delivery] Starting record delivery for instruction ID: {instruction_id}")
         db_instruction = db.query(self.model).options(
@@ -249,7 +249,7 @@ class CRUDLGInstruction(CRUDBase):
 
 
     async def record_bank_reply(
-        self, db: Session, instruction_id: int, obj_in: LGInstructionRecordBankReply, user_id: int, customer_id: int, file_content: Optional[bytes] = None
+        self, db: Session, instruction_id: int, obj_in: LGInstructionRecordBankReply, user_id: int, customer_id: int, file_content: Optional[Any] = None
     ) -> models.LGInstruction:
         logger.debug(f"[CRUDLGInstruction.record_bank_reply] Starting record bank reply for instruction ID: {instruction_id}")
         db_instruction = db.query(self.model).options(
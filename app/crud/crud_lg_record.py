@@ -36,7 +36,6 @@ from app.constants import (
     ACTION_TYPE_LG_ACTIVATE_NON_OPERATIVE, ACTION_TYPE_LG_AMEND,
     ACTION_TYPE_LG_CANCEL_LAST_INSTRUCTION,
     ACTION_TYPE_LG_CHANGE_OWNER_DETAILS, ACTION_TYPE_LG_CHANGE_SINGLE_LG_OWNER, ACTION_TYPE_LG_CHANGE_BULK_LG_OWNER,
-    AUDIT_ACTION_TYPE_LG_BULK_REMINDER_INITIATED,
     AUDIT_ACTION_TYPE_LG_AMENDED, AUDIT_ACTION_TYPE_LG_ACTIVATED,
     LgStatusEnum, LgTypeEnum, LgOperationalStatusEnum, # Corrected to models.LgOperationalStatusEnum
     ACTION_TYPE_LG_TOGGLE_AUTO_RENEWAL, AUDIT_ACTION_TYPE_LG_AUTO_RENEWAL_TOGGLED, # Added toggle constants
@@ -61,6 +60,10 @@ from app.services.unified_email_builder import build_transaction_email_html, bui
 from app.core.email_service import EmailSettings, get_global_email_settings, send_email, get_customer_email_settings
 from app.core.document_generator import generate_pdf_from_html
 from app.core.ai_integration import process_lg_document_with_ai, GCS_BUCKET_NAME
+from app.core.object_storage import object_storage
+from app.core.lg_detail_cache import lg_detail_cache
+# Registers the pre-render hook for newly issued instruction letters
+import app.services.letter_artifact_service  # noqa: F401
 
 # --- REMOVED tenacity imports from here as retry logic is moved to crud_lg_instruction.create ---
 # from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type
@@ -338,8 +341,7 @@ class CRUDLGRecord(CRUDBase):
         # Handle AI Scan File as the ORIGINAL_LG_DOCUMENT if provided
         if obj_in.ai_scan_file and ai_scan_file_content:
             # Check subscription plan here, as the actual storage happens now
-            customer_obj = db.query(models.Customer).options(selectinload(models.Customer.subscription_plan)).filter(models.Customer.id == customer_id).first()
-            if not customer_obj or not customer_obj.subscription_plan or not customer_obj.subscription_plan.can_image_storage:
+            if not object_storage.resolve_context(db, customer_id).can_store:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="Your subscription plan does not support document storage for original LG documents."
@@ -362,8 +364,7 @@ class CRUDLGRecord(CRUDBase):
 
         # Handle Internal Supporting Document if provided
         if obj_in.internal_supporting_document_file and internal_supporting_document_file_content:
-            customer_obj = db.query(models.Customer).options(selectinload(models.Customer.subscription_plan)).filter(models.Customer.id == customer_id).first()
-            if not customer_obj or not customer_obj.subscription_plan or not customer_obj.subscription_plan.can_image_storage:
+            if not object_storage.resolve_context(db, customer_id).can_store:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="Your subscription plan does not support document storage for internal supporting documents."
@@ -575,7 +576,7 @@ class CRUDLGRecord(CRUDBase):
         )
         return db_lg_record
         
-    async def extend_lg(self, db: Session, lg_record_id: int, new_expiry_date: date, user_id: int, notes: Optional[str] = None, background_tasks: Optional[BackgroundTasks] = None) -> Tuple[models.LGRecord, int, str]:
+    async def extend_lg(self, db: Session, lg_record_id: int, new_expiry_date: date, user_id: int, notes: Optional[str] = None, background_tasks: Optional[BackgroundTasks] = None, render_letter: bool = True) -> Tuple[models.LGRecord, int, str]:
         db_lg_record = self.get_lg_record_with_relations(db, lg_record_id, None)
         recipient_name = db_lg_record.issuing_bank.name if db_lg_record.issuing_bank else "To Whom It May Concern"
         recipient_address = db_lg_record.issuing_bank.address if db_lg_record.issuing_bank and db_lg_record.issuing_bank.address else "N/A"
@@ -718,7 +719,9 @@ class CRUDLGRecord(CRUDBase):
                 raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve newly created instruction after creation.")
 
             filename_for_pdf = f"lg_extension_{db_lg_record.lg_number}_instruction_{db_lg_instruction.serial_number}"
-            generated_pdf_bytes = await generate_pdf_from_html(generated_instruction_html, filename_for_pdf)
+            if render_letter:
+                # Bulk renewal renders its letters itself, in parallel (bulk_renewal_service)
+                generated_pdf_bytes = await generate_pdf_from_html(generated_instruction_html, filename_for_pdf)
             
             generated_content_path = f"gs://your-gcs-bucket/generated_instructions/{filename_for_pdf}.pdf"
             
@@ -2003,16 +2006,14 @@ class CRUDLGRecord(CRUDBase):
             document_id_for_log = existing_document_id
             logger.debug(f"[CRUDLGRecord.amend_lg] Using existing amendment document ID from approval request: {document_id_for_log}")
         elif amendment_letter_file and amendment_document_metadata:
-            customer_obj = db.query(models.Customer).options(selectinload(models.Customer.subscription_plan)).filter(models.Customer.id == customer_id).first()
-            if not customer_obj or not customer_obj.subscription_plan or not customer_obj.subscription_plan.can_image_storage:
-                logger.warning(f"[CRUDLGRecord.amend_lg] Customer's plan '{customer_obj.subscription_plan.name}' does not support image storage. Amendment document will not be stored for direct call.")
+            if not object_storage.resolve_context(db, customer_id).can_store:
+                logger.warning(f"[CRUDLGRecord.amend_lg] Customer {customer_id}'s plan does not support image storage. Amendment document will not be stored for direct call.")
             else:
                 try:
-                    file_bytes = await amendment_letter_file.read()
                     db_amendment_document = await self.crud_lg_document_instance.create_document(
                         db,
                         obj_in=amendment_document_metadata,
-                        file_content=file_bytes,
+                        file_content=amendment_letter_file,
                         lg_record_id=db_lg_record.id,
                         uploaded_by_user_id=user_id
                     )
@@ -2198,6 +2199,23 @@ class CRUDLGRecord(CRUDBase):
         customer_id: Optional[int],
         user_has_all_access: bool = True, 
         user_allowed_entity_ids: List[int] = []
+    ) -> Optional[models.LGRecord]:
+        """
+        The LG with its lookups, documents and instructions. Served from the
+        request identity map or the versioned detail cache (app.core.lg_detail_cache)
+        when possible; _load_with_relations() is the database read.
+        """
+        return lg_detail_cache.get(
+            db, lg_record_id, customer_id, user_has_all_access, user_allowed_entity_ids, self._load_with_relations
+        )
+
+    def _load_with_relations(
+        self,
+        db: Session,
+        lg_record_id: int,
+        customer_id: Optional[int],
+        user_has_all_access: bool = True,
+        user_allowed_entity_ids: List[int] = []
     ) -> Optional[models.LGRecord]:
         query = db.query(self.model).filter(self.model.id == lg_record_id, self.model.is_deleted == False)
         
@@ -2231,6 +2249,149 @@ class CRUDLGRecord(CRUDBase):
             .first()
         )
 
+    # ---------------- List projection (keyset pages) ----------------
+
+    # Sortable list columns; each is served by an (customer_id, is_deleted, column, id) index
+    LIST_SORT_COLUMNS = ("expiry_date", "lg_number", "id")
+    LIST_COUNT_EXACT_LIMIT = 10_000
+
+    def _list_filters(
+        self,
+        customer_id: int,
+        user_has_all_access: bool,
+        user_allowed_entity_ids: List[int],
+        internal_owner_contact_id: Optional[int] = None,
+        lg_status_ids: Optional[List[int]] = None,
+        beneficiary_corporate_id: Optional[int] = None,
+        issuing_bank_id: Optional[int] = None,
+        lg_currency_id: Optional[int] = None,
+        expiry_from: Optional[date] = None,
+        expiry_to: Optional[date] = None,
+        lg_number_prefix: Optional[str] = None,
+    ) -> Optional[list]:
+        """WHERE conditions of the LG list, or None when the user can see no entity."""
+        LG = self.model
+        conditions = [LG.customer_id == customer_id, LG.is_deleted == False]
+        if not user_has_all_access:
+            if not user_allowed_entity_ids:
+                return None
+            conditions.append(LG.beneficiary_corporate_id.in_(user_allowed_entity_ids))
+        if internal_owner_contact_id is not None:
+            conditions.append(LG.internal_owner_contact_id == internal_owner_contact_id)
+        if lg_status_ids:
+            conditions.append(LG.lg_status_id.in_(lg_status_ids))
+        if beneficiary_corporate_id is not None:
+            conditions.append(LG.beneficiary_corporate_id == beneficiary_corporate_id)
+        if issuing_bank_id is not None:
+            conditions.append(LG.issuing_bank_id == issuing_bank_id)
+        if lg_currency_id is not None:
+            conditions.append(LG.lg_currency_id == lg_currency_id)
+        if expiry_from is not None:
+            conditions.append(LG.expiry_date >= datetime.combine(expiry_from, datetime.min.time()))
+        if expiry_to is not None:
+            conditions.append(LG.expiry_date < datetime.combine(expiry_to + timedelta(days=1), datetime.min.time()))
+        if lg_number_prefix:
+            conditions.append(LG.lg_number.startswith(lg_number_prefix.strip(), autoescape=True))
+        return conditions
+
+    def get_lg_list_page(
+        self,
+        db: Session,
+        customer_id: int,
+        user_has_all_access: bool = True,
+        user_allowed_entity_ids: List[int] = [],
+        sort: str = "expiry_date",
+        descending: bool = False,
+        limit: int = 50,
+        cursor: Optional[Tuple[Any, int]] = None,
+        **filters: Any,
+    ) -> Tuple[List[Any], Optional[Tuple[Any, int]]]:
+        """
+        One page of a customer's LG list as flat projection rows (number,
+        beneficiary, amount, currency, bank, status, expiry, owner); no ORM
+        objects or relationship loading. Filters are those of _list_filters().
+
+        Keyset-paginated on (sort column, id): the page is read from the
+        sort column's index past the cursor, so page N costs what page 1 does.
+        Returns the rows and the (sort value, id) cursor of the next page, if any.
+        The full relation graph is get_lg_record_with_relations() (detail route).
+        """
+        from sqlalchemy import literal, select, tuple_
+
+        if sort not in self.LIST_SORT_COLUMNS:
+            raise ValueError(f"Unsupported sort column: {sort}")
+        conditions = self._list_filters(customer_id, user_has_all_access, user_allowed_entity_ids, **filters)
+        if conditions is None:
+            return [], None
+
+        LG = self.model
+        sort_column = getattr(LG, sort)
+        if cursor is not None:
+            key = tuple_(sort_column, LG.id) if sort != "id" else LG.id
+            bound = tuple_(literal(cursor[0], sort_column.type), cursor[1]) if sort != "id" else cursor[1]
+            conditions.append(key < bound if descending else key > bound)
+        order_by = [sort_column.desc(), LG.id.desc()] if descending else [sort_column.asc(), LG.id.asc()]
+        if sort == "id":
+            order_by = order_by[1:]
+
+        rows = db.execute(
+            select(
+                LG.id, LG.lg_number, LG.lg_amount, LG.issuance_date, LG.expiry_date, LG.auto_renewal,
+                LG.beneficiary_corporate_id, models.CustomerEntity.entity_name.label("beneficiary_name"),
+                models.Currency.iso_code.label("currency_code"),
+                LG.issuing_bank_id, func.coalesce(LG.foreign_bank_name, models.Bank.name).label("issuing_bank_name"),
+                models.LgStatus.name.label("lg_status"),
+                models.LgOperationalStatus.name.label("lg_operational_status"),
+                LG.internal_owner_contact_id, models.InternalOwnerContact.email.label("internal_owner_email"),
+            )
+            .where(*conditions)
+            .join(models.CustomerEntity, models.CustomerEntity.id == LG.beneficiary_corporate_id)
+            .join(models.Currency, models.Currency.id == LG.lg_currency_id)
+            .join(models.Bank, models.Bank.id == LG.issuing_bank_id)
+            .join(models.LgStatus, models.LgStatus.id == LG.lg_status_id)
+            .outerjoin(models.LgOperationalStatus, models.LgOperationalStatus.id == LG.lg_operational_status_id)
+            .join(models.InternalOwnerContact, models.InternalOwnerContact.id == LG.internal_owner_contact_id)
+            .order_by(*order_by)
+            .limit(limit + 1)
+        ).all()
+
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, (getattr(rows[-1], sort), rows[-1].id)
+
+    def count_lg_list(
+        self,
+        db: Session,
+        customer_id: int,
+        user_has_all_access: bool = True,
+        user_allowed_entity_ids: List[int] = [],
+        **filters: Any,
+    ) -> Tuple[int, bool]:
+        """
+        (total, is_estimate) for the LG list. Counts exactly up to
+        LIST_COUNT_EXACT_LIMIT rows; beyond that Postgres returns the
+        planner's row estimate instead of walking the whole index.
+        """
+        from sqlalchemy import select
+
+        conditions = self._list_filters(customer_id, user_has_all_access, user_allowed_entity_ids, **filters)
+        if conditions is None:
+            return 0, False
+        capped = select(self.model.id).where(*conditions).limit(self.LIST_COUNT_EXACT_LIMIT + 1).subquery()
+        total = db.scalar(select(func.count()).select_from(capped))
+        if total <= self.LIST_COUNT_EXACT_LIMIT:
+            return total, False
+        connection = db.connection()
+        if connection.dialect.name != "postgresql":
+            return total, True
+        query = select(self.model.id).where(*conditions).compile(
+            dialect=connection.dialect, compile_kwargs={"render_postcompile": True}
+        )
+        plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {query}", query.params).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return max(int(plan[0]["Plan"]["Plan Rows"]), total), True
+
     def get_all_lg_records_for_customer(
         self,
         db: Session,
@@ -2245,9 +2406,6 @@ class CRUDLGRecord(CRUDBase):
         Retrieves all LG records for a given customer, with optional filtering
         by internal owner contact ID AND mandatory filtering by User Entity Access.
         """
-        # Debug print to confirm execution
-        print(f"DEBUG: Filtering LGs. Has All Access: {user_has_all_access}, Allowed Entities: {user_allowed_entity_ids}")
-
         query = (
             db.query(self.model)
             .filter(self.model.customer_id == customer_id, self.model.is_deleted == False)
@@ -2355,195 +2513,29 @@ class CRUDLGRecord(CRUDBase):
         return lg_records
 
     # NEW METHOD: Run Auto Renewal / Bulk Renewal
-    async def run_auto_renewal_process(self, db: Session, user_id: int, customer_id: int) -> Tuple[int, Optional[bytes]]:
+    async def run_auto_renewal_process(self, db: Session, user_id: int, customer_id: int, batch_id: Optional[int] = None):
         """
-        Identifies eligible LGs for auto-renewal and force-renewal,
-        executes the extension process for each, generates individual instruction letters,
-        sends individual email notifications, and finally produces a single consolidated PDF
-        of all generated instruction letters for physical printing by the user.
-        Bypasses Maker-Checker for individual extensions as it's a bulk operation.
+        Runs the auto-renewal and force-renewal of eligible LGs as a resumable
+        batch (app.services.bulk_renewal_service): a new batch of the LGs
+        eligible now, or, with batch_id, the items of that batch not renewed yet.
+        Each LG is extended (instruction, logs, email) in its own transaction,
+        bypassing Maker-Checker as it's a bulk operation. Returns the batch.
         """
-        logger.info(f"[CRUDLGRecord.run_auto_renewal_process] Initiating auto/bulk renewal process for customer {customer_id} by user {user_id}.")
-
-        try:
-            # Retrieve configurable thresholds for renewal eligibility 
-            auto_renewal_days_config = self.crud_customer_configuration_instance.get_customer_config_or_global_fallback(
-                db, customer_id, GlobalConfigKey.AUTO_RENEWAL_DAYS_BEFORE_EXPIRY
-            )
-            force_renewal_days_config = self.crud_customer_configuration_instance.get_customer_config_or_global_fallback(
-                db, customer_id, GlobalConfigKey.FORCED_RENEW_DAYS_BEFORE_EXPIRY
-            )
-
-            auto_renewal_days = int(auto_renewal_days_config.get('effective_value', 30)) if auto_renewal_days_config else 30
-            force_renewal_days = int(force_renewal_days_config.get('effective_value', 60)) if force_renewal_days_config else 60
-
-            if auto_renewal_days <= 0 or force_renewal_days <= 0:
-                logger.error(f"Invalid auto/force renewal days configuration for customer {customer_id}.")
-                raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Renewal configuration invalid. Please contact support.")
-
-        except (ValueError, AttributeError, TypeError) as e:
-            logger.error(f"Error retrieving or parsing renewal configuration for customer {customer_id}: {e}", exc_info=True)
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve renewal configurations.")
-
-        current_date = date.today()
-        auto_renewal_cutoff_date = current_date + timedelta(days=auto_renewal_days)
-        force_renewal_cutoff_date = current_date + timedelta(days=force_renewal_days)
-
-        logger.info(f"DEBUG: Auto-renewal run for customer {customer_id}.")
-        logger.info(f"DEBUG: Current Server Date (today): {current_date}")
-        logger.info(f"DEBUG: Auto Renewal Days Before Expiry: {auto_renewal_days}")
-        logger.info(f"DEBUG: Auto Renewal Cutoff Date (inclusive): {auto_renewal_cutoff_date}")
-        logger.info(f"DEBUG: Force Renewal Days Before Expiry: {force_renewal_days}")
-        logger.info(f"DEBUG: Force Renewal Cutoff Date (inclusive): {force_renewal_cutoff_date}")
-
-
-        eligible_lgs: List[models.LGRecord] = []
+        from app.services.bulk_renewal_service import bulk_renewal_service
 
-        # 1. Identify Auto-Renewal LGs
-        auto_renewal_lgs = db.query(self.model).filter(
-            self.model.customer_id == customer_id,
-            self.model.is_deleted == False,
-            self.model.lg_status.has(models.LgStatus.id == models.LgStatusEnum.VALID.value), # Corrected to models.LgStatusEnum
-            self.model.auto_renewal == True,
-            # LGs for auto-renewal that are nearing their expiry
-            models.LGRecord.expiry_date >= current_date,
-            models.LGRecord.expiry_date <= auto_renewal_cutoff_date
-        ).options(
-            selectinload(models.LGRecord.beneficiary_corporate),
-            selectinload(models.LGRecord.lg_currency),
-            selectinload(models.LGRecord.issuing_bank),
-            selectinload(models.LGRecord.internal_owner_contact),
-            selectinload(models.LGRecord.lg_category),
-            selectinload(models.LGRecord.customer),
-            selectinload(models.LGRecord.lg_status)
-        ).all()
-        
-        eligible_lgs.extend(auto_renewal_lgs)
-        logger.debug(f"Found {len(auto_renewal_lgs)} auto-renewal eligible LGs for customer {customer_id}.")
-
-        # 2. Identify Force-Renewal LGs (not auto-renewal, but nearing expiry for forced action)
-        force_renewal_lgs = db.query(self.model).filter(
-            self.model.customer_id == customer_id,
-            self.model.is_deleted == False,
-            self.model.lg_status.has(models.LgStatus.id == models.LgStatusEnum.VALID.value), # Corrected to models.LgStatusEnum
-            self.model.auto_renewal == False, # Explicitly not auto-renewal
-            # LGs for force-renewal that are nearing their expiry
-            models.LGRecord.expiry_date >= current_date,
-            models.LGRecord.expiry_date <= force_renewal_cutoff_date
-        ).options(
-            selectinload(models.LGRecord.beneficiary_corporate),
-            selectinload(models.LGRecord.lg_currency),
-            selectinload(models.LGRecord.issuing_bank),
-            selectinload(models.LGRecord.internal_owner_contact),
-            selectinload(models.LGRecord.lg_category),
-            selectinload(models.LGRecord.customer),
-            selectinload(models.LGRecord.lg_status)
-        ).all()
-
-        # Filter out any duplicates if an LG somehow meets both (though criteria should prevent this)
-        # Or more likely, an LG could be in auto_renewal_lgs and also picked up here due to broad cutoff.
-        # Ensure distinct LGs. Using a set for IDs is efficient.
-        processed_lg_ids = {lg.id for lg in eligible_lgs}
-        for lg in force_renewal_lgs:
-            if lg.id not in processed_lg_ids:
-                eligible_lgs.append(lg)
-                processed_lg_ids.add(lg.id)
-
-        logger.debug(f"Found {len(force_renewal_lgs)} force-renewal eligible LGs. Total distinct eligible LGs: {len(eligible_lgs)}.")
-
-
-        if not eligible_lgs:
-            logger.info(f"[CRUDLGRecord.run_auto_renewal_process] No eligible LGs found for auto/bulk renewal for customer {customer_id}.")
-            return 0, None
-
-        renewed_lg_count = 0
-        all_generated_instruction_htmls = []
-        renewed_lg_numbers = []
-
-        for lg_record_to_renew in eligible_lgs:
-            try:
-                # Calculate new expiry date based on lg_period_months using relativedelta
-                current_expiry_dt = lg_record_to_renew.expiry_date # This is already a datetime object from DB
-
-                # Use relativedelta for accurate month addition, handling year rollovers and end-of-month correctly.
-                # Convert the resulting datetime object back to a date object, as required by extend_lg.
-                new_expiry_date_as_date = (current_expiry_dt + relativedelta(months=lg_record_to_renew.lg_period_months)).date()
-
-                # Call extend_lg, which handles LG update, instruction creation, and email
-                # CRITICAL: Pass None for approval_request_id to bypass Maker-Checker
-                updated_lg, instruction_id, generated_html = await self.extend_lg( # MODIFIED TO CAPTURE HTML
-                    db,
-                    lg_record_to_renew.id,
-                    new_expiry_date_as_date,
-                    user_id # The user initiating the bulk process is the 'maker' for this automated extension
-                )
-                all_generated_instruction_htmls.append(generated_html)
-                renewed_lg_count += 1
-                renewed_lg_numbers.append(updated_lg.lg_number)
-                logger.info(f"Successfully renewed LG {updated_lg.lg_number} (ID: {updated_lg.id}) to new expiry date {updated_lg.expiry_date.date()}. Instruction ID: {instruction_id}.")
-
-            except HTTPException as e:
-                logger.error(f"Skipping LG {lg_record_to_renew.lg_number} (ID: {lg_record_to_renew.id}) due to specific error during extension: {e.detail}", exc_info=True)
-                # Do not re-raise, continue to process other LGs
-            except Exception as e:
-                # Ensure the traceback is properly logged for all unexpected errors
-                logger.error(f"Skipping LG {lg_record_to_renew.lg_number} (ID: {lg_record_to_renew.id}) due to unexpected error during extension: {e}", exc_info=True)
-                # Do not re-raise, continue to process other LGs
-
-
-        if not all_generated_instruction_htmls:
-            logger.info(f"[CRUDLGRecord.run_auto_renewal_process] No LGs were successfully renewed to generate a combined PDF for customer {customer_id}.")
-            return 0, None
-
-        # Combine all generated instruction HTMLs into a single document with page breaks
-        consolidated_html_content = []
-        for html_segment in all_generated_instruction_htmls:
-            consolidated_html_content.append(html_segment)
-            consolidated_html_content.append('<div style="page-break-after: always;"></div>')
-        
-        # Remove the last page break to avoid an empty page at the end
-        if consolidated_html_content and consolidated_html_content[-1].startswith('<div style="page-break-after:'):
-            consolidated_html_content.pop()
-
-        final_consolidated_html = "".join(consolidated_html_content)
-
-        # Generate the combined PDF
-        combined_pdf_bytes: Optional[bytes] = None
-        try:
-            combined_pdf_bytes = await generate_pdf_from_html(
-                final_consolidated_html,
-                f"bulk_lg_renewal_customer_{customer_id}_{date.today().isoformat()}"
-            )
-            if not combined_pdf_bytes:
-                raise Exception("generate_pdf_from_html returned None for combined PDF.")
-            logger.info(f"Successfully generated combined PDF for {renewed_lg_count} renewed LGs.")
-        except Exception as e:
-            logger.error(f"Failed to generate consolidated PDF for bulk renewal for customer {customer_id}: {e}", exc_info=True)
-            # Do not re-raise, proceed with logging the overall action
+        if batch_id is not None:
+            batch = bulk_renewal_service.get_batch(db, batch_id, customer_id)
+            if not batch:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Renewal batch not found.")
+        else:
+            batch = bulk_renewal_service.create_batch(db, customer_id, user_id)
+            if not batch.total_count:
+                logger.info(f"[CRUDLGRecord.run_auto_renewal_process] No eligible LGs found for auto/bulk renewal for customer {customer_id}.")
+                return batch
 
-        # Log the overall bulk action 
-        log_action(
-            db,
-            user_id=user_id,
-            action_type=AUDIT_ACTION_TYPE_LG_BULK_REMINDER_INITIATED, # Reusing for bulk renewal as a placeholder, ideally a new constant for auto renewal
-            entity_type="Customer",
-            entity_id=customer_id,
-            details={
-                "action": "Bulk LG Renewal (Auto & Forced)",
-                "renewed_lg_count": renewed_lg_count,
-                "renewed_lg_numbers": renewed_lg_numbers,
-                "auto_renewal_threshold_days": auto_renewal_days,
-                "force_renewal_threshold_days": force_renewal_days,
-                "combined_pdf_generated": combined_pdf_bytes is not None,
-                "triggered_by_user": user_id
-            },
-            customer_id=customer_id,
-            lg_record_id=None,
-        )
-        logger.info(f"Bulk LG Renewal process completed for customer {customer_id}. {renewed_lg_count} LGs renewed.")
+        logger.info(f"[CRUDLGRecord.run_auto_renewal_process] Running renewal batch {batch.id} for customer {customer_id} by user {user_id}.")
+        return await bulk_renewal_service.run(db, batch, user_id)
 
-        return renewed_lg_count, combined_pdf_bytes
-        
     def get_active_lg_records_count_for_customer(self, db: Session, customer_id: int) -> int:
         """
         Retrieves the count of active LG records for a given customer.
@@ -9,6 +9,7 @@ from sqlalchemy import cast
 import app.models as models # NEW: Add this line to import the models module
 
 from app.crud.crud import CRUDBase, log_action
+from app.core.master_data_cache import master_data_cache
 from app.models import (
     Bank,
     Currency,
@@ -52,28 +53,63 @@ from app.schemas.all_schemas import (
 # =====================================================================================
 # Master Data Management (Global Scope)
 # =====================================================================================
-class CRUDBank(CRUDBase):
+class CRUDMasterData(CRUDBase):
+    """
+    Base for the global master-data tables served from the in-process cache
+    (app/core/master_data_cache.py). Lookups resolve the row id from the cached
+    indexes and return the session's ORM instance (identity map, else a
+    primary-key fetch); a miss costs no query. Writes go through the normal
+    CRUDBase methods and invalidate the table when the session commits.
+    """
+    cache_table: str = ""
+
+    def _find(self, db: Session, index: str, key: Any, query_fallback):
+        snap = master_data_cache.snapshot(db, self.cache_table)
+        if snap is None:
+            return query_fallback()
+        row = snap.find(index, key)
+        return db.get(self.model, row.id) if row is not None else None
+
+    def get(self, db: Session, id: Any) -> Optional[BaseModel]:
+        snap = master_data_cache.snapshot(db, self.cache_table)
+        row = snap.by_id.get(id) if snap is not None else None
+        if row is None:
+            # Unknown here (or a row created by another worker since the load)
+            return super().get(db, id)
+        return db.get(self.model, row.id) if not row.is_deleted else None
+
+    def get_all_rows(self, db: Session) -> List[Any]:
+        """Active rows as read-only snapshots (column attributes only), ordered by id."""
+        snap = master_data_cache.snapshot(db, self.cache_table)
+        if snap is None:
+            return db.query(self.model).filter(self.model.is_deleted == False).order_by(self.model.id).all()
+        return list(snap.active)
+
+
+class CRUDBank(CRUDMasterData):
+    cache_table = "banks"
+
     def get_by_name(self, db: Session, name: str) -> Optional[models.Bank]:
         """
         Retrieves a Bank object by its name, short name, or former names.
         This provides robust lookup for the migration process.
         """
-        return db.query(self.model).filter(
+        return self._find(db, "name", name, lambda: db.query(self.model).filter(
             or_(
                 func.lower(self.model.name) == func.lower(name),
                 func.lower(self.model.short_name) == func.lower(name),
                 cast(self.model.former_names, JSONB).op('?')(name)
             )
-        ).first()
+        ).first())
 
     def get_by_swift_code(self, db: Session, swift_code: str) -> Optional[Bank]:
-        return (
+        return self._find(db, "swift_code", swift_code, lambda: (
             db.query(self.model)
             .filter(
                 self.model.swift_code == swift_code, self.model.is_deleted == False
             )
             .first()
-        )
+        ))
 
     def create(self, db: Session, obj_in: BaseModel, **kwargs: Any) -> BaseModel:
         db_obj = super().create(db, obj_in, **kwargs)
@@ -305,13 +341,15 @@ class CRUDTemplate(CRUDBase):
         return restored_obj
 
 
-class CRUDCurrency(CRUDBase):
+class CRUDCurrency(CRUDMasterData):
+    cache_table = "currencies"
+
     def get_by_iso_code(self, db: Session, iso_code: str) -> Optional[Currency]:
-        return (
+        return self._find(db, "iso_code", iso_code, lambda: (
             db.query(self.model)
             .filter(self.model.iso_code == iso_code, self.model.is_deleted == False)
             .first()
-        )
+        ))
 
     def create(self, db: Session, obj_in: BaseModel, **kwargs: Any) -> BaseModel:
         db_obj = super().create(db, obj_in, **kwargs)
@@ -366,13 +404,15 @@ class CRUDCurrency(CRUDBase):
         return restored_obj
 
 
-class CRUDLgType(CRUDBase):
+class CRUDLgType(CRUDMasterData):
+    cache_table = "lg_types"
+
     def get_by_name(self, db: Session, name: str) -> Optional[LgType]:
-        return (
+        return self._find(db, "name", name, lambda: (
             db.query(self.model)
             .filter(self.model.name == name, self.model.is_deleted == False)
             .first()
-        )
+        ))
 
     def create(self, db: Session, obj_in: BaseModel, **kwargs: Any) -> BaseModel:
         db_obj = super().create(db, obj_in, **kwargs)
@@ -427,13 +467,15 @@ class CRUDLgType(CRUDBase):
         return restored_obj
 
 
-class CRUDRule(CRUDBase):
+class CRUDRule(CRUDMasterData):
+    cache_table = "rules"
+
     def get_by_name(self, db: Session, name: str) -> Optional[Rule]:
-        return (
+        return self._find(db, "name", name, lambda: (
             db.query(self.model)
             .filter(self.model.name == name, self.model.is_deleted == False)
             .first()
-        )
+        ))
 
     def create(self, db: Session, obj_in: BaseModel, **kwargs: Any) -> BaseModel:
         db_obj = super().create(db, obj_in, **kwargs)
@@ -488,13 +530,15 @@ class CRUDRule(CRUDBase):
         return restored_obj
 
 
-class CRUDIssuingMethod(CRUDBase):
+class CRUDIssuingMethod(CRUDMasterData):
+    cache_table = "issuing_methods"
+
     def get_by_name(self, db: Session, name: str) -> Optional[IssuingMethod]:
-        return (
+        return self._find(db, "name", name, lambda: (
             db.query(self.model)
             .filter(self.model.name == name, self.model.is_deleted == False)
             .first()
-        )
+        ))
 
     def create(self, db: Session, obj_in: BaseModel, **kwargs: Any) -> BaseModel:
         db_obj = super().create(db, obj_in, **kwargs)
@@ -549,13 +593,15 @@ class CRUDIssuingMethod(CRUDBase):
         return restored_obj
 
 
-class CRUDLgStatus(CRUDBase):
+class CRUDLgStatus(CRUDMasterData):
+    cache_table = "lg_statuses"
+
     def get_by_name(self, db: Session, name: str) -> Optional[LgStatus]:
-        return (
+        return self._find(db, "name", name, lambda: (
             db.query(self.model)
             .filter(self.model.name == name, self.model.is_deleted == False)
             .first()
-        )
+        ))
 
     def create(self, db: Session, obj_in: BaseModel, **kwargs: Any) -> BaseModel:
         db_obj = super().create(db, obj_in, **kwargs)
@@ -610,13 +656,15 @@ class CRUDLgStatus(CRUDBase):
         return restored_obj
 
 
-class CRUDLgOperationalStatus(CRUDBase):
+class CRUDLgOperationalStatus(CRUDMasterData):
+    cache_table = "lg_operational_statuses"
+
     def get_by_name(self, db: Session, name: str) -> Optional[LgOperationalStatus]:
-        return (
+        return self._find(db, "name", name, lambda: (
             db.query(self.model)
             .filter(self.model.name == name, self.model.is_deleted == False)
             .first()
-        )
+        ))
 
     def create(self, db: Session, obj_in: BaseModel, **kwargs: Any) -> BaseModel:
         db_obj = super().create(db, obj_in, **kwargs)
@@ -136,6 +136,10 @@ class CRUDQuotation:
             # Re-raise or handle JSON parsing failure
             raise ValueError(f"Failed to parse selected banks: {e}")
 
+        if initial_status == "PENDING_APPROVAL":
+            from app.core.deadline_scheduler import schedule_rfq_approval_deadline
+            schedule_rfq_approval_deadline(db, db_rfq)
+
         db.commit()
         db.refresh(db_rfq)
         return db_rfq, assignments
@@ -164,51 +168,57 @@ class CRUDQuotation:
         return r
 
     # --- Background Processing ---
+    def expire_if_window_passed(self, db: Session, rfq: QuotationRequest, now: datetime = None) -> bool:
+        """
+        Auto-rejects a single PENDING_APPROVAL RFQ whose window_end has passed.
+        Returns True if the RFQ was rejected. Does not commit.
+        """
+        from app.crud.crud import log_action
+
+        if rfq.status != 'PENDING_APPROVAL' or not rfq.window_end:
+            return False
+
+        now = now or datetime.now(timezone.utc)
+        target_datetime = rfq.window_end
+        # Ensure awareness
+        if target_datetime.tzinfo is None:
+            target_datetime = target_datetime.replace(tzinfo=timezone.utc)
+
+        if now <= target_datetime:
+            return False
+
+        # Expired!
+        rfq.status = 'REJECTED'
+        log_action(
+            db,
+            user_id=rfq.created_by_user_id,
+            action_type="QUOTATION_AUTO_REJECTED",
+            entity_type="QuotationRequest",
+            entity_id=None,
+            details={"rfq_id": rfq.id, "ref_no": rfq.ref_no, "reason": "Time window expired before Corporate Admin approval"},
+            customer_id=rfq.customer_id
+        )
+        return True
+
     async def process_quotation_timeouts(self, db: Session):
         """
         Background job to process RFQs that have expired before being approved.
+
+        Safety-net sweep only: individual RFQs are expired on time by the
+        deadline scheduler (app/core/deadline_scheduler.py).
         """
         now = datetime.now(timezone.utc)
         
-        # We need to find PENDING_APPROVAL RFQs where the current time is past their window_end
-        # Note: window_end is currently stored as a string (e.g. "15:30"). 
-        # A proper implementation would convert window_end to a UTC datetime for reliable comparison.
-        # For this prototype, we'll do a basic check if window_end is parseable into today's date.
-        
         expired_rfqs = db.query(QuotationRequest).filter(
-            QuotationRequest.status == 'PENDING_APPROVAL'
+            QuotationRequest.status == 'PENDING_APPROVAL',
+            QuotationRequest.window_end < now
         ).all()
         
-        # Simple evaluation loop
         expired_count = 0
-        from app.crud.crud import log_action
-        
         for rfq in expired_rfqs:
-            # Safely try to parse window_end as HH:MM against today's date
             try:
-                # Assuming window_end is HH:MM in local time
-                # In a robust system, window_end would be a proper TIMESTAMP WITH TIMEZONE
-                if rfq.window_end:
-                     target_datetime = rfq.window_end
-                     
-                     # Ensure awareness
-                     if target_datetime.tzinfo is None:
-                         target_datetime = target_datetime.replace(tzinfo=timezone.utc)
-                         
-                     if now > target_datetime:
-                         # Expired!
-                         rfq.status = 'REJECTED'
-                         expired_count += 1
-                         
-                         log_action(
-                             db,
-                             user_id=rfq.created_by_user_id,
-                             action_type="QUOTATION_AUTO_REJECTED",
-                             entity_type="QuotationRequest",
-                             entity_id=None,
-                             details={"rfq_id": rfq.id, "ref_no": rfq.ref_no, "reason": "Time window expired before Corporate Admin approval"},
-                             customer_id=rfq.customer_id
-                         )
+                if self.expire_if_window_passed(db, rfq, now):
+                    expired_count += 1
             except Exception as e:
                 print(f"Error evaluating timeout for RFQ {rfq.id}: {e}")
                 
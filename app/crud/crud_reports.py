@@ -28,6 +28,7 @@ from app.constants import (
     ACTION_TYPE_LG_DECREASE_AMOUNT, ACTION_TYPE_LG_ACTIVATE_NON_OPERATIVE,
     AUDIT_ACTION_TYPE_LG_INSTRUCTION_DELIVERED, AUDIT_ACTION_TYPE_LG_BANK_REPLY_RECORDED, ACTION_TYPE_LG_RECORD_DELIVERY, ACTION_TYPE_LG_RECORD_BANK_REPLY
 )
+from app.services.dashboard_summary_service import dashboard_summary_service, SUMMARY_CHARTS
 from dateutil.relativedelta import relativedelta
 import logging
 logger = logging.getLogger(__name__)
@@ -239,16 +240,11 @@ class CRUDReports(CRUDBase):
         if not user_has_all_entity_access:
             lg_filter_conditions.append(LGRecord.beneficiary_corporate_id.in_(user_entity_ids))
         
-        # --- 1. ORIGINAL LOGIC: My LGs List ---
-        my_lg_records = db.query(LGRecord).join(InternalOwnerContact).filter(
+        # --- 1. ORIGINAL LOGIC: My LGs count ---
+        my_lgs_count = db.query(func.count(LGRecord.id)).join(InternalOwnerContact).filter(
             InternalOwnerContact.email == user_context['email'],
             *lg_filter_conditions
-        ).options(
-            selectinload(LGRecord.lg_status),
-            selectinload(LGRecord.lg_currency),
-            selectinload(LGRecord.beneficiary_corporate)
-        ).all()
-        my_lgs_count = len(my_lg_records)
+        ).scalar() or 0
         
 
         # --- 2. ORIGINAL LOGIC: LGs Nearing Expiry ---
@@ -259,12 +255,15 @@ class CRUDReports(CRUDBase):
         configurable_days = int(days_config.get('effective_value', 60)) if days_config else 60
         expiry_cutoff_date = date.today() + timedelta(days=configurable_days)
         
-        lgs_near_expiry_query = db.query(LGRecord).filter(
+        # Only the columns the tile shows, bank name joined in SQL, soonest first
+        lgs_near_expiry_rows = db.query(
+            LGRecord.lg_number, LGRecord.expiry_date, Bank.name
+        ).outerjoin(Bank, LGRecord.issuing_bank_id == Bank.id).filter(
             LGRecord.expiry_date >= date.today(),
             LGRecord.expiry_date <= expiry_cutoff_date,
             *lg_filter_conditions
-        ).all()
-        lgs_near_expiry_count = len(lgs_near_expiry_query)
+        ).order_by(LGRecord.expiry_date.asc()).all()
+        lgs_near_expiry_count = len(lgs_near_expiry_rows)
 
 
         # --- 3. ORIGINAL LOGIC: Instructions Not Delivered ---
@@ -273,14 +272,13 @@ class CRUDReports(CRUDBase):
         )
         report_start_days = int(report_start_days_config.get('effective_value', 3)) if report_start_days_config else 3
 
-        undelivered_instructions_query = db.query(LGInstruction).join(LGRecord).filter(
+        undelivered_instructions_count = db.query(func.count(LGInstruction.id)).join(LGRecord).filter(
             LGInstruction.is_deleted == False,
             LGInstruction.delivery_date.is_(None),
             LGInstruction.maker_user_id == user_id,
             func.date(LGInstruction.instruction_date) <= (date.today() - timedelta(days=report_start_days)),
             *lg_filter_conditions
-        ).all()
-        undelivered_instructions_count = len(undelivered_instructions_query)
+        ).scalar() or 0
         
 
         # --- 4. ORIGINAL LOGIC: Recent Actions ---
@@ -301,17 +299,15 @@ class CRUDReports(CRUDBase):
         # --- NEW LOGIC: UPCOMING EXPIRIES LIST & SAFETY SCORE ---
         # =================================================================================
         
-        # A. Fetch the actual list of expiring LGs (Reuse the query from step 2 but sort it)
-        # We sort by date to show the most urgent ones first
+        # A. The list of expiring LGs (rows from step 2, already sorted by date so the
+        # most urgent ones come first)
         upcoming_expiries_list = []
-        lgs_sorted = sorted(lgs_near_expiry_query, key=lambda x: x.expiry_date)
-        
-        for lg in lgs_sorted:
-            days_left = (lg.expiry_date.date() - date.today()).days
+        for lg_number, expiry_date, bank_name in lgs_near_expiry_rows:
+            days_left = (expiry_date.date() - date.today()).days
             upcoming_expiries_list.append({
-                "lg_number": lg.lg_number,
-                "bank_name": lg.issuing_bank.name if lg.issuing_bank else "Unknown Bank",
-                "expiry_date": lg.expiry_date,
+                "lg_number": lg_number,
+                "bank_name": bank_name or "Unknown Bank",
+                "expiry_date": expiry_date,
                 "days_remaining": days_left
             })
 
@@ -320,11 +316,11 @@ class CRUDReports(CRUDBase):
         # (You can adjust this formula later)
         score = 100
         # Check for *actual* expired items (past today) which are risky
-        actually_expired_count = db.query(LGRecord).filter(
+        actually_expired_count = db.query(func.count(LGRecord.id)).filter(
              LGRecord.expiry_date < date.today(), 
              LGRecord.lg_status_id == LgStatusEnum.VALID.value, # Correct field and enum
              *lg_filter_conditions
-        ).count()
+        ).scalar() or 0
         
         score -= (actually_expired_count * 10)
         score -= (lgs_near_expiry_count * 2) 
@@ -371,13 +367,13 @@ class CRUDReports(CRUDBase):
         
         # Internal helper to keep code clean
         def get_counts(sd, ed):
-            query_new = db.query(models.LGRecord).filter(
+            query_new = db.query(func.count(models.LGRecord.id)).filter(
                 models.LGRecord.is_deleted == False, 
                 func.date(models.LGRecord.created_at).between(sd, ed)
             )
             if customer_id:
                 query_new = query_new.filter(models.LGRecord.customer_id == customer_id)
-            new_c = query_new.count()
+            new_c = query_new.scalar() or 0
             
             query_ops = db.query(models.LGInstruction.instruction_type, func.count(models.LGInstruction.id)).join(models.LGRecord).filter(
                 models.LGInstruction.is_deleted == False, 
@@ -389,13 +385,13 @@ class CRUDReports(CRUDBase):
             
             stats = {row[0]: row[1] for row in ops}
             
-            query_amend = db.query(models.AuditLog).filter(
+            query_amend = db.query(func.count(models.AuditLog.id)).filter(
                 models.AuditLog.action_type == 'LG_AMENDED', 
                 func.date(models.AuditLog.timestamp).between(sd, ed)
             )
             if customer_id:
                 query_amend = query_amend.filter(models.AuditLog.customer_id == customer_id)
-            amend = query_amend.count()
+            amend = query_amend.scalar() or 0
 
             data = {
                 "new_issuances_count": new_c,
@@ -451,14 +447,20 @@ class CRUDReports(CRUDBase):
             history.append(monthly_stats)
 
         # 2. RISK & ATTENTION
-        critical_expiry_query = db.query(models.LGRecord).filter(
+        critical_expiry_query = db.query(
+            models.LGRecord.id, models.LGRecord.lg_number, models.LGRecord.expiry_date
+        ).filter(
             models.LGRecord.is_deleted == False,
             models.LGRecord.lg_status_id == models.LgStatusEnum.VALID.value,
             models.LGRecord.expiry_date.between(today, today + timedelta(days=7))
         )
         if customer_id:
             critical_expiry_query = critical_expiry_query.filter(models.LGRecord.customer_id == customer_id)
-        critical_expiry = critical_expiry_query.all()
+        # The lists are only rendered for a customer; system-wide views just count
+        critical_expiry = critical_expiry_query.all() if customer_id else []
+        critical_expiry_count = len(critical_expiry) if customer_id else (
+            critical_expiry_query.with_entities(func.count(models.LGRecord.id)).scalar() or 0
+        )
         
         def get_eff_val(key):
             res = crud_customer_configuration.get_customer_config_or_global_fallback(db, customer_id, key)
@@ -469,7 +471,11 @@ class CRUDReports(CRUDBase):
         min_days_ghost = get_eff_val(GlobalConfigKey.REMINDER_TO_BANKS_DAYS_SINCE_DELIVERY)
         max_days_ghost = get_eff_val(GlobalConfigKey.REMINDER_TO_BANKS_MAX_DAYS_SINCE_ISSUANCE)
 
-        stalled_internal_base = db.query(models.LGInstruction).join(models.LGRecord).filter(
+        # Backlog tiles: totals are COUNTs; the recommended lists fetch only the
+        # columns they render, with the bank name joined in SQL
+        stalled_internal_base = db.query(
+            models.LGInstruction.instruction_date, models.LGRecord.lg_number
+        ).join(models.LGRecord, models.LGInstruction.lg_record_id == models.LGRecord.id).filter(
             models.LGRecord.lg_status_id == models.LgStatusEnum.VALID.value,
             models.LGInstruction.is_deleted == False,
             models.LGInstruction.delivery_date == None,
@@ -482,7 +488,11 @@ class CRUDReports(CRUDBase):
             models.LGInstruction.instruction_date >= (today - timedelta(days=max_days_internal))
         ).all()
 
-        bank_ghosting_base = db.query(models.LGInstruction).join(models.LGRecord).filter(
+        bank_ghosting_base = db.query(
+            models.LGInstruction.delivery_date, models.LGRecord.lg_number, models.Bank.name
+        ).join(models.LGRecord, models.LGInstruction.lg_record_id == models.LGRecord.id).outerjoin(
+            models.Bank, models.LGRecord.issuing_bank_id == models.Bank.id
+        ).filter(
             models.LGRecord.lg_status_id == models.LgStatusEnum.VALID.value,
             models.LGInstruction.is_deleted == False,
             models.LGInstruction.delivery_date != None,
@@ -506,20 +516,20 @@ class CRUDReports(CRUDBase):
                     "days_remaining": (item.expiry_date.date() - today).days if item.expiry_date else 0
                 } for item in critical_expiry
             ] if customer_id else [],
-            "expiry_warning_count": len(critical_expiry), 
+            "expiry_warning_count": critical_expiry_count, 
             "bank_ghosting_list": [
                 {
                     "id": i,
-                    "reference_number": item.lg_record.lg_number, 
+                    "reference_number": item.lg_number, 
                     "date_trigger": item.delivery_date.date() if item.delivery_date else None,
-                    "details": f"Waiting for {item.lg_record.issuing_bank.name if item.lg_record.issuing_bank else 'Bank'}",
+                    "details": f"Waiting for {item.name or 'Bank'}",
                     "days_remaining": (today - item.delivery_date.date()).days if item.delivery_date else 0
                 } for i, item in enumerate(ghosting_recommended)
             ] if customer_id else [],
             "stalled_internal_list": [
                 {
                     "id": i,
-                    "reference_number": item.lg_record.lg_number, 
+                    "reference_number": item.lg_number, 
                     "date_trigger": item.instruction_date.date() if item.instruction_date else None,
                     "details": "Instruction pending delivery",
                     "days_remaining": (today - item.instruction_date.date()).days if item.instruction_date else 0
@@ -571,21 +581,22 @@ class CRUDReports(CRUDBase):
             "internal_change_pct": round(((format_days(period_internal) - format_days(lifetime_internal)) / format_days(lifetime_internal) * 100), 1) if format_days(lifetime_internal) > 0 else 0
         }
 
-        status_query_base = db.query(models.LGRecord.lg_status_id, func.count(models.LGRecord.id)).filter(models.LGRecord.is_deleted == False)
         if customer_id:
-            status_query_base = status_query_base.filter(models.LGRecord.customer_id == customer_id)
-        status_query = status_query_base.group_by(models.LGRecord.lg_status_id).all()
+            status_counts = dashboard_summary_service.get(db, customer_id).lg_status_counts or {}
+            status_query = [(int(status_id), count) for status_id, count in status_counts.items()]
+        else:
+            status_query = db.query(models.LGRecord.lg_status_id, func.count(models.LGRecord.id)).filter(
+                models.LGRecord.is_deleted == False
+            ).group_by(models.LGRecord.lg_status_id).all()
         
         status_map = {v.value: k.replace('_', ' ').title() for k, v in models.LgStatusEnum.__members__.items()}
         status_dist = {status_map.get(row[0], f"Status {row[0]}"): row[1] for row in status_query}
 
-        internal_total_items = stalled_internal_base.all()
-        bank_total_items = bank_ghosting_base.all()
         pipeline = {
             "internal_backlog_count": len(stalled_recommended),
             "bank_backlog_count": len(ghosting_recommended),
-            "internal_backlog_total": len(internal_total_items), 
-            "bank_backlog_total": len(bank_total_items),
+            "internal_backlog_total": stalled_internal_base.with_entities(func.count(models.LGInstruction.id)).scalar() or 0, 
+            "bank_backlog_total": bank_ghosting_base.with_entities(func.count(models.LGInstruction.id)).scalar() or 0,
             "completed_recently_count": flow_data.get("extensions_delivered_count", 0)
         }
         ai_usage = self.get_ai_usage_summary(db, start_date, end_date, customer_id)
@@ -605,9 +616,16 @@ class CRUDReports(CRUDBase):
     def get_chart_data(self, db: Session, report_type: str, user_context: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Retrieves data for the dashboard charts based on report type and user context.
+        Customer-scoped charts are served from the customer's dashboard summary row.
         """
-        query = None
         customer_id = user_context.get('customer_id')
+        if customer_id and report_type in SUMMARY_CHARTS:
+            return dashboard_summary_service.get_chart(db, customer_id, report_type)
+        return self.compute_chart_data(db, report_type, customer_id)
+
+    def compute_chart_data(self, db: Session, report_type: str, customer_id: Optional[int]) -> Any:
+        """Runs the aggregate query behind one dashboard chart."""
+        query = None
 
         # LG Type Mix
         if report_type == "lg_type_mix":
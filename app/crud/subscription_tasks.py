@@ -1,9 +1,11 @@
 import os
+import asyncio
 import logging
-from datetime import date, datetime, timedelta
-from typing import List, Dict, Any, TYPE_CHECKING
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
 from sqlalchemy.orm import Session, selectinload
-from sqlalchemy import exc
+from sqlalchemy import exc, update, and_, or_, true
 
 import app.models as models
 from app.constants import (
@@ -20,131 +22,305 @@ import pytz
 EEST_TIMEZONE = pytz.timezone('Africa/Cairo')
 logger = logging.getLogger(__name__)
 
+DEFAULT_GRACE_PERIOD_DAYS = 30
+# Days before end_date on which a renewal reminder goes out
+REMINDER_WINDOWS = {
+    30: SubscriptionNotificationType.RENEWAL_REMINDER_30_DAYS,
+    7: SubscriptionNotificationType.RENEWAL_REMINDER_7_DAYS,
+}
+# Upper bound on SMTP sends in flight for one notification batch
+NOTIFICATION_CONCURRENCY = 5
+
 # To assist with type hinting without causing a circular import, we can use TYPE_CHECKING
 if TYPE_CHECKING:
     from app.crud.crud import CRUDBase, log_action, CRUDCustomer, CRUDCustomerConfiguration
 
-async def _send_subscription_notification(
+# ==============================================================================
+# STATUS TRANSITIONS (set-based)
+# ==============================================================================
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def _parse_grace_days(value: Any, source: Any) -> int:
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        logger.error(f"Invalid grace period days config for {source}. Defaulting to {DEFAULT_GRACE_PERIOD_DAYS}.")
+        return DEFAULT_GRACE_PERIOD_DAYS
+
+
+def _load_grace_period_groups(
+    db: Session, crud_customer_configuration: "CRUDCustomerConfiguration"
+) -> Tuple[int, Dict[int, List[int]]]:
+    """Returns (default grace days, {grace days: [customer ids overriding to it]})."""
+    default_value, overrides = crud_customer_configuration.get_effective_value_map(db, GlobalConfigKey.GRACE_PERIOD_DAYS)
+    default_days = _parse_grace_days(default_value, "global default") if default_value is not None else DEFAULT_GRACE_PERIOD_DAYS
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for customer_id, value in overrides.items():
+        groups[_parse_grace_days(value, f"customer {customer_id}")].append(customer_id)
+    return default_days, groups
+
+
+def _transition(db: Session, condition, new_status: SubscriptionStatus) -> List[int]:
+    """Moves every customer matching condition (and not already there) to new_status; returns their ids."""
+    stmt = (
+        update(models.Customer)
+        .where(models.Customer.is_deleted == False, models.Customer.status != new_status, condition)
+        .values(status=new_status)
+        .returning(models.Customer.id)
+        .execution_options(synchronize_session=False)
+    )
+    return list(db.execute(stmt).scalars().all())
+
+
+def _apply_status_transitions(
+    db: Session, current_date: date, default_grace_days: int, grace_groups: Dict[int, List[int]]
+) -> Tuple[List[int], Dict[int, int], List[int]]:
+    """
+    ACTIVE while end_date is today or later, GRACE for grace-period days after it,
+    EXPIRED afterwards. One UPDATE for ACTIVE plus one GRACE and one EXPIRED UPDATE
+    per distinct grace period. Returns (activated ids, {grace id: grace days}, expired ids).
+    """
+    today_start = _day_start(current_date)
+    activated = _transition(db, models.Customer.end_date >= today_start, SubscriptionStatus.ACTIVE)
+
+    overridden_ids = [cid for ids in grace_groups.values() for cid in ids]
+    segments = [(models.Customer.id.in_(ids), days) for days, ids in grace_groups.items()]
+    segments.append((models.Customer.id.notin_(overridden_ids) if overridden_ids else true(), default_grace_days))
+
+    grace: Dict[int, int] = {}
+    expired: List[int] = []
+    for scope, grace_days in segments:
+        grace_start = _day_start(current_date - timedelta(days=grace_days))
+        for customer_id in _transition(
+            db,
+            and_(scope, models.Customer.end_date < today_start, models.Customer.end_date >= grace_start),
+            SubscriptionStatus.GRACE,
+        ):
+            grace[customer_id] = grace_days
+        expired.extend(_transition(db, and_(scope, models.Customer.end_date < grace_start), SubscriptionStatus.EXPIRED))
+    return activated, grace, expired
+
+
+def _due_renewal_reminders(db: Session, current_date: date) -> List[Tuple[int, SubscriptionNotificationType]]:
+    """Customers whose end_date is exactly 30 or 7 days out and who weren't reminded today."""
+    windows = [
+        and_(
+            models.Customer.end_date >= _day_start(current_date + timedelta(days=days)),
+            models.Customer.end_date < _day_start(current_date + timedelta(days=days + 1)),
+        )
+        for days in REMINDER_WINDOWS
+    ]
+    rows = db.query(models.Customer.id, models.Customer.end_date).filter(
+        models.Customer.is_deleted == False,
+        or_(*windows),
+    ).all()
+    if not rows:
+        return []
+
+    sent_action_types = {f"NOTIFICATION_SENT_{t.value}": t for t in REMINDER_WINDOWS.values()}
+    already_sent = set(
+        db.query(models.AuditLog.entity_id, models.AuditLog.action_type).filter(
+            models.AuditLog.entity_type == "Customer",
+            models.AuditLog.entity_id.in_([customer_id for customer_id, _ in rows]),
+            models.AuditLog.action_type.in_(list(sent_action_types)),
+            models.AuditLog.timestamp >= EEST_TIMEZONE.localize(datetime.combine(current_date, time.min)).astimezone(timezone.utc),
+        ).all()
+    )
+
+    due = []
+    for customer_id, end_date in rows:
+        email_type = REMINDER_WINDOWS.get((end_date.date() - current_date).days)
+        if email_type and (customer_id, f"NOTIFICATION_SENT_{email_type.value}") not in already_sent:
+            due.append((customer_id, email_type))
+    return due
+
+
+# ==============================================================================
+# NOTIFICATIONS (one batch after the status UPDATEs commit)
+# ==============================================================================
+
+def _notification_text(
+    customer: models.Customer, email_type: SubscriptionNotificationType, grace_period_days: Optional[int]
+) -> Tuple[str, str]:
+    if email_type == SubscriptionNotificationType.RENEWAL_REMINDER_30_DAYS:
+        subject = f"Subscription Renewal Reminder: {customer.name}"
+        body = f"""Your subscription for {customer.name} is set to expire in 30 days on {customer.end_date.date()}.
+                Please renew to ensure uninterrupted service."""
+    elif email_type == SubscriptionNotificationType.RENEWAL_REMINDER_7_DAYS:
+        subject = f"Urgent: Subscription Expiring Soon for {customer.name}"
+        body = f"""Your subscription for {customer.name} will expire in 7 days on {customer.end_date.date()}.
+                Please renew immediately to avoid service interruption."""
+    elif email_type == SubscriptionNotificationType.GRACE_PERIOD_START:
+        subject = f"Subscription Expired: Grace Period Started for {customer.name}"
+        body = f"""Your subscription for {customer.name} has now expired. You are in a read-only grace period
+                    of {grace_period_days} days. Please renew your subscription to restore full access."""
+    else:
+        subject = f"Subscription Fully Expired for {customer.name}"
+        body = f"""Your subscription for {customer.name} has ended, and the grace period has passed. Your account is now
+                    locked. Please contact the system owner to renew your subscription and regain access."""
+    return subject, body
+
+
+def _build_notification_html(customer: models.Customer, subject: str, body: str) -> str:
+    # Determine status badge HTML
+    status_str = customer.status.value.upper() if hasattr(customer.status, 'value') else str(customer.status).upper()
+    if status_str == "ACTIVE":
+        status_html = "<span style='color: #16a34a; font-weight: 700;'>ACTIVE</span>"
+    elif status_str == "GRACE":
+        status_html = "<span style='color: #d97706; font-weight: 700;'>GRACE PERIOD</span>"
+    else:
+        status_html = "<span style='color: #dc2626; font-weight: 700;'>EXPIRED</span>"
+
+    plan_name = customer.subscription_plan.name if customer.subscription_plan else "Enterprise Subscription"
+    expiry_str = customer.end_date.strftime("%Y-%m-%d") if customer.end_date else "N/A"
+
+    return build_transaction_email_html(
+        customer_name=customer.name,
+        title=subject,
+        transaction_ref=plan_name,
+        transaction_type="Subscription Plan",
+        key_value_dict={
+            "Customer Name": customer.name,
+            "Subscription Plan": plan_name,
+            "Expiration Date": expiry_str,
+            "Current Status": status_html
+        },
+        summary_text=body,
+        cta_text="Manage Subscription",
+        cta_url=f"{os.getenv('FRONTEND_URL', 'http://localhost:3000')}/corporate-admin/subscription",
+        recipient_name="Corporate Administrator"
+    )
+
+
+async def _send_subscription_notifications(
     db: Session,
     log_action: "log_action",
-    customer: models.Customer,
-    email_type: SubscriptionNotificationType,
-    subject: str,
-    body: str,
-    details: Dict[str, Any]
+    notices: List[Tuple[int, SubscriptionNotificationType, Optional[int]]]
 ):
-    """Helper function to send a subscription-related notification email using modern SaaS design."""
-    try:
-        # Fetch all Corporate Admins for the customer
-        corporate_admins = db.query(models.User).filter(
-            models.User.customer_id == customer.id,
-            models.User.role == UserRole.CORPORATE_ADMIN,
-            models.User.is_deleted == False
-        ).all()
-        to_emails = [admin.email for admin in corporate_admins if admin.email]
+    """
+    Sends (customer_id, notification type, grace days) notices as one batch: customers,
+    Corporate Admin recipients and email settings are loaded up front, the SMTP sends
+    run concurrently, and the audit entries are written afterwards.
+    """
+    if not notices:
+        return
 
+    customer_ids = {customer_id for customer_id, _, _ in notices}
+    customers = {
+        c.id: c for c in db.query(models.Customer).options(
+            selectinload(models.Customer.subscription_plan)
+        ).filter(models.Customer.id.in_(customer_ids)).all()
+    }
+    admin_emails: Dict[int, List[str]] = defaultdict(list)
+    for customer_id, email in db.query(models.User.customer_id, models.User.email).filter(
+        models.User.customer_id.in_(customer_ids),
+        models.User.role == UserRole.CORPORATE_ADMIN,
+        models.User.is_deleted == False
+    ).all():
+        if email:
+            admin_emails[customer_id].append(email)
+
+    email_settings_by_customer: Dict[int, Tuple[EmailSettings, str]] = {}
+    prepared = []
+    for customer_id, email_type, grace_period_days in notices:
+        customer = customers.get(customer_id)
+        if customer is None:
+            continue
+        to_emails = admin_emails.get(customer_id)
         if not to_emails:
-            logger.warning(f"No Corporate Admins found for customer {customer.id}. Cannot send '{email_type.value}' notification.")
+            logger.warning(f"No Corporate Admins found for customer {customer_id}. Cannot send '{email_type.value}' notification.")
             log_action(
                 db,
                 user_id=None,
                 action_type="NOTIFICATION_FAILED",
                 entity_type="Customer",
-                entity_id=customer.id,
+                entity_id=customer_id,
                 details={
                     "reason": f"No recipients for {email_type.value}",
                     "notification_type": email_type.value
                 },
-                customer_id=customer.id
-            )
-            return
-
-        email_settings, email_method_for_log = get_customer_email_settings(db, customer.id)
-        
-        # Determine status badge HTML
-        status_str = customer.status.value.upper() if hasattr(customer.status, 'value') else str(customer.status).upper()
-        if status_str == "ACTIVE":
-            status_html = "<span style='color: #16a34a; font-weight: 700;'>ACTIVE</span>"
-        elif status_str == "GRACE":
-            status_html = "<span style='color: #d97706; font-weight: 700;'>GRACE PERIOD</span>"
-        else:
-            status_html = "<span style='color: #dc2626; font-weight: 700;'>EXPIRED</span>"
-
-        plan_name = customer.subscription_plan.name if customer.subscription_plan else "Enterprise Subscription"
-        expiry_str = customer.end_date.strftime("%Y-%m-%d") if customer.end_date else "N/A"
-
-        body_html = build_transaction_email_html(
-            customer_name=customer.name,
-            title=subject,
-            transaction_ref=plan_name,
-            transaction_type="Subscription Plan",
-            key_value_dict={
-                "Customer Name": customer.name,
-                "Subscription Plan": plan_name,
-                "Expiration Date": expiry_str,
-                "Current Status": status_html
-            },
-            summary_text=body,
-            cta_text="Manage Subscription",
-            cta_url=f"{os.getenv('FRONTEND_URL', 'http://localhost:3000')}/corporate-admin/subscription",
-            recipient_name="Corporate Administrator"
-        )
-
-        email_sent = await send_email(
-            db=db,
-            to_emails=to_emails,
-            subject_template=subject,
-            body_template=body_html,
-            template_data={},
-            email_settings=email_settings,
-            sender_name=customer.name
-        )
-
-        if email_sent:
-            log_action(
-                db,
-                user_id=None,
-                action_type=f"NOTIFICATION_SENT_{email_type.value}",
-                entity_type="Customer",
-                entity_id=customer.id,
-                details={
-                    "notification_type": email_type.value,
-                    "recipients": to_emails,
-                    "subject": subject,
-                    "email_method": email_method_for_log
-                },
-                customer_id=customer.id
+                customer_id=customer_id
             )
-        else:
+            continue
+        try:
+            if customer_id not in email_settings_by_customer:
+                email_settings_by_customer[customer_id] = get_customer_email_settings(db, customer_id)
+            subject, body = _notification_text(customer, email_type, grace_period_days)
+            body_html = _build_notification_html(customer, subject, body)
+        except Exception as e:
+            logger.error(f"Error preparing subscription notification for customer {customer_id}: {e}", exc_info=True)
             log_action(
                 db,
                 user_id=None,
                 action_type="NOTIFICATION_FAILED",
                 entity_type="Customer",
-                entity_id=customer.id,
-                details={
-                    "reason": "Email service failed",
-                    "notification_type": email_type.value,
-                    "recipients": to_emails
-                },
-                customer_id=customer.id
+                entity_id=customer_id,
+                details={"reason": str(e), "notification_type": email_type.value},
+                customer_id=customer_id
             )
+            continue
+        prepared.append((customer, email_type, to_emails, subject, body_html))
 
-    except Exception as e:
-        db.rollback()
-        logger.error(f"Error sending subscription notification for customer {customer.id}: {e}", exc_info=True)
+    semaphore = asyncio.Semaphore(NOTIFICATION_CONCURRENCY)
+
+    async def _send(customer: models.Customer, to_emails: List[str], subject: str, body_html: str):
+        async with semaphore:
+            return await send_email(
+                db=db,
+                to_emails=to_emails,
+                subject_template=subject,
+                body_template=body_html,
+                template_data={},
+                email_settings=email_settings_by_customer[customer.id][0],
+                sender_name=customer.name
+            )
+
+    results = await asyncio.gather(
+        *(_send(customer, to_emails, subject, body_html) for customer, _, to_emails, subject, body_html in prepared),
+        return_exceptions=True
+    )
+
+    for (customer, email_type, to_emails, subject, _), result in zip(prepared, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error sending subscription notification for customer {customer.id}: {result}", exc_info=result)
+            reason = str(result)
+        else:
+            email_sent, error_reason = result
+            if email_sent:
+                log_action(
+                    db,
+                    user_id=None,
+                    action_type=f"NOTIFICATION_SENT_{email_type.value}",
+                    entity_type="Customer",
+                    entity_id=customer.id,
+                    details={
+                        "notification_type": email_type.value,
+                        "recipients": to_emails,
+                        "subject": subject,
+                        "email_method": email_settings_by_customer[customer.id][1]
+                    },
+                    customer_id=customer.id
+                )
+                continue
+            reason = error_reason or "Email service failed"
         log_action(
             db,
             user_id=None,
             action_type="NOTIFICATION_FAILED",
             entity_type="Customer",
             entity_id=customer.id,
-            details={"reason": str(e), "notification_type": email_type.value},
+            details={
+                "reason": reason,
+                "notification_type": email_type.value,
+                "recipients": to_emails
+            },
             customer_id=customer.id
         )
 
 
-
 async def run_daily_subscription_status_update(
     db: Session,
     log_action: "log_action",
@@ -153,84 +329,37 @@ async def run_daily_subscription_status_update(
 ):
     """
     Daily background task to check and update the subscription status of all customers.
-    Sends automated email notifications based on the subscription lifecycle.
+    Status transitions are applied with set-based UPDATEs and committed first; renewal
+    reminders and transition emails are then sent as one batch. Only customers whose
+    status changes or who enter a reminder window are touched.
     """
     logger.info("Starting daily subscription status update task.")
 
-    customers = crud_customer.get_all_with_relations(db)
     current_date = datetime.now(EEST_TIMEZONE).date()
 
-    if not customers:
-        logger.info("No customers found. Task finished.")
-        return
-
     try:
-        for customer in customers:
-            if not customer.subscription_plan:
-                logger.warning(f"Customer {customer.id} has no assigned subscription plan. Skipping.")
-                continue
-
-            # Check for renewal reminders first
-            days_until_expiry = (customer.end_date.date() - current_date).days
+        # Reminders are picked before the transitions so a same-day change can't hide one
+        reminders = _due_renewal_reminders(db, current_date)
 
-            if days_until_expiry == 30:
-                subject = f"Subscription Renewal Reminder: {customer.name}"
-                body = f"""Your subscription for {customer.name} is set to expire in 30 days on {customer.end_date.date()}.
-                Please renew to ensure uninterrupted service."""
-                await _send_subscription_notification(
-                    db, log_action, customer, SubscriptionNotificationType.RENEWAL_REMINDER_30_DAYS, subject, body, {}
-                )
-            elif days_until_expiry == 7:
-                subject = f"Urgent: Subscription Expiring Soon for {customer.name}"
-                body = f"""Your subscription for {customer.name} will expire in 7 days on {customer.end_date.date()}.
-                Please renew immediately to avoid service interruption."""
-                await _send_subscription_notification(
-                    db, log_action, customer, SubscriptionNotificationType.RENEWAL_REMINDER_7_DAYS, subject, body, {}
-                )
+        default_grace_days, grace_groups = _load_grace_period_groups(db, crud_customer_configuration)
+        activated, grace, expired = _apply_status_transitions(db, current_date, default_grace_days, grace_groups)
+        db.commit()
+        logger.info(
+            f"Subscription statuses updated: {len(activated)} -> ACTIVE, {len(grace)} -> GRACE, "
+            f"{len(expired)} -> EXPIRED; {len(reminders)} renewal reminder(s) due."
+        )
 
-            # Update status based on current date
-            old_status = customer.status
-            new_status = old_status
-
-            if current_date > customer.end_date.date():
-                grace_period_days = crud_customer_configuration.get_customer_config_or_global_fallback(
-                    db, customer.id, GlobalConfigKey.GRACE_PERIOD_DAYS
-                )['effective_value']
-                
-                try:
-                    grace_period_days = int(grace_period_days)
-                except (ValueError, TypeError):
-                    logger.error(f"Invalid grace period days config for customer {customer.id}. Defaulting to 30.")
-                    grace_period_days = 30
-
-                if (current_date - customer.end_date.date()).days <= grace_period_days:
-                    new_status = SubscriptionStatus.GRACE
-                else:
-                    new_status = SubscriptionStatus.EXPIRED
-            else:
-                new_status = SubscriptionStatus.ACTIVE
-
-            if new_status != old_status:
-                customer.status = new_status
-                db.add(customer)
-                db.flush()
-
-                if new_status == SubscriptionStatus.GRACE:
-                    subject = f"Subscription Expired: Grace Period Started for {customer.name}"
-                    body = f"""Your subscription for {customer.name} has now expired. You are in a read-only grace period
-                    of {grace_period_days} days. Please renew your subscription to restore full access."""
-                    await _send_subscription_notification(
-                        db, log_action, customer, SubscriptionNotificationType.GRACE_PERIOD_START, subject, body, {}
-                    )
-                elif new_status == SubscriptionStatus.EXPIRED:
-                    subject = f"Subscription Fully Expired for {customer.name}"
-                    body = f"""Your subscription for {customer.name} has ended, and the grace period has passed. Your account is now
-                    locked. Please contact the system owner to renew your subscription and regain access."""
-                    await _send_subscription_notification(
-                        db, log_action, customer, SubscriptionNotificationType.EXPIRED, subject, body, {}
-                    )
+        notices: List[Tuple[int, SubscriptionNotificationType, Optional[int]]] = [
+            (customer_id, email_type, None) for customer_id, email_type in reminders
+        ]
+        notices.extend(
+            (customer_id, SubscriptionNotificationType.GRACE_PERIOD_START, grace_days)
+            for customer_id, grace_days in grace.items()
+        )
+        notices.extend((customer_id, SubscriptionNotificationType.EXPIRED, None) for customer_id in expired)
 
-            db.commit()
+        await _send_subscription_notifications(db, log_action, notices)
+        db.commit()
 
     except exc.SQLAlchemyError as e:
         db.rollback()
@@ -241,4 +370,4 @@ async def run_daily_subscription_status_update(
     finally:
         db.close()
 
-    logger.info("Finished daily subscription status update task.")
\ No newline at end of file
+    logger.info("Finished daily subscription status update task.")
@@ -8,6 +8,8 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 
+from app.core.telemetry import telemetry, TimedQueuePool
+
 logger = logging.getLogger(__name__)
 
 # Load environment variables from .env file
@@ -33,9 +35,13 @@ def sqlalchemy_json_serializer(obj):
 engine = create_engine(
     DATABASE_URL, 
     pool_pre_ping=True,
+    # Same behaviour as the default QueuePool, plus checkout-wait telemetry
+    poolclass=TimedQueuePool,
     # This now handles Decimals AND Dates for the audit log JSONB column
     json_serializer=lambda obj: json.dumps(obj, default=sqlalchemy_json_serializer)
 )
+# Query counts, slow statements and N+1 detection (app/core/telemetry.py)
+telemetry.instrument_engine(engine)
 
 # Create a SessionLocal class to get database sessions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
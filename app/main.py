@@ -1,14 +1,19 @@
 # c:\Grow\app\main.py
 import sys
 import os
+import hmac
 import re
 import logging
+import time
 import pytz
 from datetime import datetime, timedelta
 
+_boot_last_mark = time.perf_counter()
+
 # FastAPI imports
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, status, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 # SQLAlchemy imports
 from sqlalchemy.exc import SQLAlchemyError
@@ -19,6 +24,10 @@ from apscheduler.triggers.cron import CronTrigger
 
 # Database imports
 from app.database import get_db, Base, engine
+from app.core.telemetry import telemetry
+
+# Local development convenience: run the schema migrations in-process at boot
+RUN_SCHEMA_MIGRATIONS_ON_STARTUP = os.getenv("RUN_SCHEMA_MIGRATIONS_ON_STARTUP", "false").lower() in ("1", "true", "yes")
 
 # ==============================================================================
 # Production-Ready Log Filter: masks sensitive metadata from all log output
@@ -99,7 +108,17 @@ app = FastAPI(
     version="1.0.0",
 )
 
+def boot_checkpoint(phase: str) -> None:
+    """Records the time since the previous checkpoint as one worker boot phase (see telemetry.boot_report)."""
+    global _boot_last_mark
+    now = time.perf_counter()
+    telemetry.record_boot_phase(phase, now - _boot_last_mark)
+    _boot_last_mark = now
+
+
 def configure_app_instance(fastapi_app: FastAPI):
+    boot_checkpoint("core_imports")
+
     # --- Middleware Configuration ---
     origins = [
         "https://www.growbusinessdevelopment.com/",
@@ -125,6 +144,12 @@ def configure_app_instance(fastapi_app: FastAPI):
     from app.core.security_headers import SecurityHeadersMiddleware
     fastapi_app.add_middleware(SecurityHeadersMiddleware)
 
+    # Outermost: per-route latency / status / DB statement telemetry
+    from app.core.telemetry import TelemetryMiddleware
+    fastapi_app.add_middleware(TelemetryMiddleware)
+
+    boot_checkpoint("middleware")
+
     # --- Module Imports ---
     # Imports are placed here to ensure app structure is ready or to avoid circular deps.
     # If these fail, the app will naturally crash with ImportError.
@@ -147,80 +172,26 @@ def configure_app_instance(fastapi_app: FastAPI):
     from app.auth_v2.routers import router as auth_v2_router
     from app.crud.crud import crud_customer, crud_customer_configuration, log_action
     
+    boot_checkpoint("module_imports")
+
     # --- Database Initialization ---
+    # Schema changes run once per deploy (python -m app.core.schema_migrations,
+    # the Procfile release command); workers only register the models.
     try:
-        # Import models to register them with Base.metadata
-        import app.models.models
-        import app.models.models_quotation
-        import app.models.models_reconciliation_v2
-        import app.models.models_notification
-        
-        if Base.metadata.tables:
-            Base.metadata.create_all(bind=engine)
-            logger.info("Database tables verified/created.")
-
-            # --- Safe Schema Auto-Migration for Cloud Databases (Render / Postgres) ---
-            try:
-                from sqlalchemy import text
-                startup_migrations = [
-                    # subscription_plans columns
-                    "ALTER TABLE subscription_plans ADD COLUMN IF NOT EXISTS has_custody_module BOOLEAN DEFAULT TRUE",
-                    "ALTER TABLE subscription_plans ADD COLUMN IF NOT EXISTS has_issuance_module BOOLEAN DEFAULT FALSE",
-                    "ALTER TABLE subscription_plans ADD COLUMN IF NOT EXISTS has_quotation_module BOOLEAN DEFAULT FALSE",
-                    "ALTER TABLE subscription_plans ADD COLUMN IF NOT EXISTS has_reconciliation_module BOOLEAN DEFAULT FALSE",
-                    "ALTER TABLE subscription_plans ADD COLUMN IF NOT EXISTS max_issuance_records INTEGER DEFAULT 0",
-                    "ALTER TABLE subscription_plans ADD COLUMN IF NOT EXISTS grace_period_days INTEGER DEFAULT 30",
-                    
-                    # users columns for MFA and legal version
-                    "ALTER TABLE users ADD COLUMN IF NOT EXISTS mfa_code_hashed VARCHAR",
-                    "ALTER TABLE users ADD COLUMN IF NOT EXISTS mfa_code_expires_at TIMESTAMP WITH TIME ZONE",
-                    "ALTER TABLE users ADD COLUMN IF NOT EXISTS mfa_attempts INTEGER DEFAULT 0",
-                    "ALTER TABLE users ADD COLUMN IF NOT EXISTS last_accepted_legal_version DOUBLE PRECISION",
-                    "ALTER TABLE users ADD COLUMN IF NOT EXISTS failed_login_attempts INTEGER DEFAULT 0",
-                    "ALTER TABLE users ADD COLUMN IF NOT EXISTS locked_until TIMESTAMP WITH TIME ZONE",
-                ]
-                with engine.connect() as conn:
-                    for stmt in startup_migrations:
-                        try:
-                            conn.execute(text(stmt))
-                        except Exception as m_err:
-                            logger.debug(f"Migration statement skipped: {m_err}")
-                    conn.commit()
-                logger.info("Startup database schema migrations verified.")
-            except Exception as mig_err:
-                logger.warning(f"Startup schema migration check: {mig_err}")
-
-            try:
-                from sqlalchemy.orm import Session as DBSession
-                from app.models.models import GlobalConfiguration
-                from app.constants import GlobalConfigKey
-                with DBSession(engine) as seed_db:
-                    existing = seed_db.query(GlobalConfiguration).filter(
-                        GlobalConfiguration.key == GlobalConfigKey.QUOTATION_APPROVAL_REQUIRED
-                    ).first()
-                    if not existing:
-                        new_cfg = GlobalConfiguration(
-                            key=GlobalConfigKey.QUOTATION_APPROVAL_REQUIRED,
-                            value_default="false",
-                            unit="boolean",
-                            description="Require Corporate Admin approval before releasing quotation requests to banks",
-                            module_tags=["quotations"]
-                        )
-                        seed_db.add(new_cfg)
-                        seed_db.commit()
-                        logger.info("Seeded QUOTATION_APPROVAL_REQUIRED into global_configurations.")
-            except Exception as seed_err:
-                logger.warning(f"Global configuration seed check skipped: {seed_err}")
-        else:
+        from app.core.schema_migrations import register_models, run_migrations
+        register_models()
+        if not Base.metadata.tables:
             logger.critical("FATAL: No SQLAlchemy models registered. Tables cannot be created.")
             sys.exit(1)
-            
+        if RUN_SCHEMA_MIGRATIONS_ON_STARTUP:
+            run_migrations(engine)
     except SQLAlchemyError as e:
         logger.critical(f"FATAL: Database error during table creation: {e}", exc_info=True)
         sys.exit(1)
     except Exception as e:
         logger.critical(f"FATAL: Unexpected error during startup: {e}", exc_info=True)
         sys.exit(1)
+    boot_checkpoint("models")
 
     # --- Router Registration ---
     fastapi_app.include_router(system_owner.router, prefix="/api/v1/system-owner")
@@ -261,6 +232,8 @@ def configure_app_instance(fastapi_app: FastAPI):
         dependencies=[Depends(require_reconciliation_module)]
     )
 
+    boot_checkpoint("router_registration")
+
     # --- Static Files Mounting for Supporting Uploads ---
     from fastapi.staticfiles import StaticFiles
     os.makedirs("uploads/quotations", exist_ok=True)
@@ -287,7 +260,7 @@ def configure_app_instance(fastapi_app: FastAPI):
     @fastapi_app.on_event("startup")
     async def start_scheduler():
         """Define and start cron jobs."""
-        from app.crud.crud_quotation import crud_quotation
+        from app.core.deadline_scheduler import deadline_scheduler, run_daily_deadline_backfill
         
         # Mapping of jobs to their configuration for cleaner setup
         jobs = [
@@ -342,14 +315,6 @@ def configure_app_instance(fastapi_app: FastAPI):
                 "minute": 0,
                 "args": []
             },
-            {
-                "func": crud_quotation.process_quotation_timeouts,
-                "id": "quotation_timeouts_minute_job",
-                "name": "Quotation Processing (5-hourly)",
-                "hours": [0, 5, 10, 15, 20],
-                "minute": 0,
-                "args": []
-            },
             {
                 "func": app_background_tasks.run_daily_issuance_lg_expiry_reminders,
                 "id": "issuance_lg_expiry_reminders_daily_job",
@@ -400,18 +365,12 @@ def configure_app_instance(fastapi_app: FastAPI):
                 "args": []
             },
             {
-                "func": app_background_tasks.run_daily_issuance_approval_timeout,
-                "id": "issuance_approval_timeout_daily_job",
-                "name": "Daily Issuance Approval Timeout",
+                # Timeouts themselves fire from the deadline scheduler; this only enrols rows missing a deadline
+                "func": run_daily_deadline_backfill,
+                "id": "deadline_backfill_daily_job",
+                "name": "Daily Deadline Backfill",
                 "minute": 56,
                 "args": []
-            },
-            {
-                "func": app_background_tasks.run_daily_auto_reject_expired_requests,
-                "id": "auto_reject_expired_requests_daily_job",
-                "name": "Daily Core Approval Requests Auto-Rejection",
-                "minute": 58,
-                "args": []
             }
         ]
 
@@ -446,14 +405,49 @@ def configure_app_instance(fastapi_app: FastAPI):
         scheduler.start()
         logger.info("APScheduler started.")
 
+        # Event-driven timeouts (RFQ windows, reservation TTLs, approval windows)
+        deadline_scheduler.start()
+
+        # Coalesced maker-checker e-mails, sent after the request's commit
+        from app.services.approval_notifications import approval_notification_dispatcher
+        approval_notification_dispatcher.start()
+
+        boot_checkpoint("server_startup")
+        telemetry.mark_ready()
+        report = telemetry.boot_report()
+        logger.info(
+            f"Worker ready in {report['boot_ms']:.0f} ms: "
+            + ", ".join(f"{phase}={ms:.0f}ms" for phase, ms in report["phases_ms"].items())
+        )
+
     @fastapi_app.on_event("shutdown")
     async def shutdown_scheduler():
+        from app.core.deadline_scheduler import deadline_scheduler
+        from app.services.approval_notifications import approval_notification_dispatcher
+
         scheduler.shutdown()
         logger.info("APScheduler shut down.")
+        await deadline_scheduler.stop()
+        await approval_notification_dispatcher.stop()
 
     @fastapi_app.get("/")
     async def root():
         return {"message": "Treasury Management Platform API is running!"}
 
+    @fastapi_app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics(request: Request):
+        """
+        Prometheus scrape endpoint (this worker's aggregates). Disabled (404)
+        unless METRICS_AUTH_TOKEN is set; scrapers send it as a Bearer token.
+        """
+        expected_token = os.getenv("METRICS_AUTH_TOKEN")
+        if not expected_token:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {expected_token}"):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+        return PlainTextResponse(telemetry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    boot_checkpoint("app_setup")
+
 # Call the configuration
 configure_app_instance(app)
\ No newline at end of file
@@ -485,6 +485,7 @@ class LGRecord(BaseModel):
     notes = Column(Text, nullable=True, comment="Free-form notes related to the LG")
     migration_source = Column(String, nullable=True, comment="Indicates the source of the LG (e.g., 'LEGACY' for migrated records).")
     migrated_from_staging_id = Column(Integer, ForeignKey('lg_migration_staging.id'), nullable=True, comment="Foreign key to the last staged record used for this LG.")
+    version = Column(Integer, nullable=False, default=1, server_default="1", comment="Bumped on every change to the LG, its instructions or documents (detail cache key)")
     customer = relationship("Customer")
     beneficiary_corporate = relationship("CustomerEntity", foreign_keys=[beneficiary_corporate_id])
     lg_currency = relationship("Currency", foreign_keys=[lg_currency_id])
@@ -516,7 +517,10 @@ class LGRecord(BaseModel):
         Index('idx_lg_record_lg_number', 'lg_number'),
         Index('idx_lg_record_expiry_date', 'expiry_date'),
         Index('ix_lg_records_migrated_from_staging_id', 'migrated_from_staging_id'),
-
+        # LG list keyset pages per sort column
+        Index('ix_lg_records_customer_list_expiry', 'customer_id', 'is_deleted', 'expiry_date', 'id'),
+        Index('ix_lg_records_customer_list_number', 'customer_id', 'is_deleted', 'lg_number', 'id'),
+        Index('ix_lg_records_customer_list_id', 'customer_id', 'is_deleted', 'id'),
     )
     def __repr__(self: LGRecord):
         return f"<LGRecord(id={self.id}, lg_number='{self.lg_number}', customer_id={self.customer_id})>"
@@ -640,6 +644,15 @@ class ApprovalRequest(Base):
         overlaps="approval_request"
     )
     steps = relationship("ApprovalRequestStep", back_populates="approval_request", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Approval inbox: pending / status lists and the approver's history, newest first
+        Index("ix_approval_requests_customer_status_created", "customer_id", "status", "created_at", "id"),
+        Index("ix_approval_requests_customer_checker_created", "customer_id", "checker_user_id", "created_at", "id"),
+        # Inbox counts by status and action type
+        Index("ix_approval_requests_customer_status_action", "customer_id", "status", "action_type"),
+    )
+
     def __repr__(self: ApprovalRequest):
         return f"<ApprovalRequest(id={self.id}, entity_type='{self.entity_type}', action_type='{self.action_type}', status='{self.status}')>"
 
@@ -0,0 +1,50 @@
+# app/models/models_action_center.py
+# Issuance action-center work queue (app/services/action_center_service.py)
+
+from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class IssuanceWorkItem(Base):
+    """One open action-center item: an issued LG, maintenance action or issuance
+    request sitting in one bucket, with the fields the queue displays.
+
+    Rows are rewritten from their source records in the same transaction as
+    every flush that touches them, and removed once the item leaves the bucket."""
+    __tablename__ = "issuance_work_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
+    bucket = Column(String, nullable=False, comment="PENDING_DELIVERY, AWAITING_REPLY, APPROACHING_EXPIRY, APPROVED_REQUEST, APPROVED_MAINTENANCE")
+    source = Column(String, nullable=False, comment="issuance (IssuedLGRecord), maintenance (IssuanceMaintenanceAction), issuance_request")
+    source_id = Column(Integer, nullable=False)
+    issued_lg_id = Column(Integer, nullable=True, index=True, comment="Owning issued LG for issuance / maintenance items")
+
+    sort_at = Column(DateTime(timezone=True), nullable=False, comment="Queue order (newest first): created, delivered or approved time")
+    due_date = Column(Date, nullable=True, comment="Bank expiry date (APPROACHING_EXPIRY)")
+
+    # Display fields
+    lg_number = Column(String, nullable=True)
+    beneficiary = Column(String, nullable=True)
+    amount = Column(Numeric(precision=20, scale=2), nullable=True)
+    currency_id = Column(Integer, nullable=True)
+    lg_type_id = Column(Integer, nullable=True)
+    department = Column(String, nullable=True)
+    status = Column(String, nullable=True)
+    action_type = Column(String, nullable=True)
+    serial_number = Column(String, nullable=True)
+    instruction_status = Column(String, nullable=True)
+    delivery_date = Column(DateTime(timezone=True), nullable=True)
+    source_created_at = Column(DateTime(timezone=True), nullable=True)
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("bucket", "source", "source_id", name="uq_issuance_work_items_bucket_source"),
+        Index("ix_issuance_work_items_queue", "customer_id", "bucket", "sort_at", "id"),
+        Index("ix_issuance_work_items_due", "customer_id", "bucket", "due_date", "id"),
+        Index("ix_issuance_work_items_source", "source", "source_id"),
+    )
+
+    def __repr__(self):
+        return f"<IssuanceWorkItem(bucket={self.bucket}, source={self.source}, source_id={self.source_id})>"
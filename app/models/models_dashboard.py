@@ -0,0 +1,35 @@
+# app/models/models_dashboard.py
+# Per-customer dashboard aggregates (app/services/dashboard_summary_service.py)
+
+from sqlalchemy import Column, Integer, Numeric, DateTime, ForeignKey, JSON
+from app.models import BaseModel
+
+
+class CustomerDashboardSummary(BaseModel):
+    """Portfolio-wide KPI tiles for one customer, recomputed from SQL aggregates.
+
+    Committed writes to LG records, instructions and issued LGs bump change_seq
+    (right after their commit); the row is fresh while computed_seq == change_seq
+    and is recomputed on the next dashboard read otherwise."""
+    __tablename__ = "customer_dashboard_summaries"
+
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False, unique=True, index=True)
+    change_seq = Column(Integer, nullable=False, default=1, comment="Bumped by every committed change to the customer's portfolio")
+    computed_seq = Column(Integer, nullable=False, default=0, comment="change_seq the aggregates below were computed from")
+    refreshed_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Custody (LGRecord / LGInstruction)
+    lg_status_counts = Column(JSON, nullable=True, comment="{lg_status_id: count}")
+    lg_type_counts = Column(JSON, nullable=True, comment="[{name, value}] as served by the lg_type_mix chart")
+    bank_counts = Column(JSON, nullable=True, comment="[{name, value}] as served by the bank_market_share chart")
+    bank_processing_days = Column(JSON, nullable=True, comment="[{name, value}] as served by the bank_processing_times chart")
+    avg_delivery_days = Column(JSON, nullable=True, comment="{average_days} or null")
+    avg_days_to_action = Column(JSON, nullable=True, comment="{average_days} or null")
+
+    # Issuance (IssuedLGRecord)
+    issued_active_count = Column(Integer, nullable=False, default=0)
+    issued_active_amount = Column(Numeric(precision=20, scale=2), nullable=False, default=0)
+    sub_limit_utilization = Column(JSON, nullable=True, comment="{facility_sub_limit_id: sum(current_amount)} over ACTIVE / INTERNAL_PROCESSING")
+
+    def __repr__(self):
+        return f"<CustomerDashboardSummary(customer_id={self.customer_id}, seq={self.computed_seq}/{self.change_seq})>"
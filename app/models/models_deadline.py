@@ -0,0 +1,32 @@
+# app/models/models_deadline.py
+# Persistent deadline queue driving the timeout engine (app/core/deadline_scheduler.py)
+
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index, UniqueConstraint
+from app.models import BaseModel
+
+
+class ScheduledDeadline(BaseModel):
+    """One pending timeout (RFQ approval window, facility reservation TTL,
+    issuance cancel/edit approval window, maker-checker approval window).
+
+    Rows are upserted whenever the owning entity is created or changes state,
+    and the timer loop only ever reads rows whose due_at has passed."""
+    __tablename__ = "scheduled_deadlines"
+
+    deadline_type = Column(String, nullable=False,
+                           comment="RFQ_APPROVAL_WINDOW, RESERVATION_TTL, ISSUANCE_CANCEL_TIMEOUT, ISSUANCE_EDIT_TIMEOUT, APPROVAL_REQUEST_TIMEOUT")
+    entity_type = Column(String, nullable=False, comment="QuotationRequest, IssuanceRequest, IssuedLGRecord, ApprovalRequest")
+    entity_id = Column(String, nullable=False, comment="Stringified PK (RFQ ids are UUID strings)")
+    customer_id = Column(Integer, nullable=True, index=True)
+
+    due_at = Column(DateTime(timezone=True), nullable=False)
+    status = Column(String, nullable=False, default="PENDING", comment="PENDING, PROCESSING, DONE, CANCELLED, FAILED")
+    attempts = Column(Integer, nullable=False, default=0)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint('deadline_type', 'entity_id', name='_deadline_type_entity_uc'),
+        Index('ix_scheduled_deadlines_status_due_at', 'status', 'due_at'),
+    )
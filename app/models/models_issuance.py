@@ -5,7 +5,7 @@ from sqlalchemy import (
     ForeignKey, Text, Numeric, Date, UniqueConstraint, Index, Table
 )
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from app.database import Base
 from app.models.models import BaseModel # Inherit from your base model
@@ -324,9 +324,11 @@ class IssuedLGRecord(Base):
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
     
-    # Maintenance history — full audit trail of all changes
-    action_history = Column(JSONB, nullable=True, default=list,
-                           comment="[{action_type, before, after, user_id, timestamp, notes}]")
+    # Legacy maintenance history. New entries go to issued_lg_history_events
+    # (IssuedLGHistoryEvent); existing arrays are moved there by the schema
+    # migration, which then clears this column. Deferred so record loads skip it.
+    action_history = deferred(Column(JSONB, nullable=True,
+                                     comment="Legacy [{action_type, before, after, user_id, timestamp, notes}] — see issued_lg_history_events"))
     
     # A4: Ownership tracking (mirrors custody internal_owner concept)
     current_owner_user_id = Column(Integer, ForeignKey("users.id"), nullable=True,
@@ -407,6 +409,33 @@ class IssuedLGRecord(Base):
     requests = relationship("IssuanceRequest", back_populates="lg_record", foreign_keys="IssuanceRequest.lg_record_id")
     maintenance_actions = relationship("IssuanceMaintenanceAction", back_populates="issued_lg", cascade="all, delete-orphan")
 
+
+class IssuedLGHistoryEvent(Base):
+    """One entry of an issued LG's action history (app/services/lg_history_service.py).
+
+    Append-only: a maintenance action, bank confirmation, reconciliation
+    adjustment or migration step inserts one row holding only the fields it
+    changed, so recording history never rewrites earlier entries."""
+    __tablename__ = 'issued_lg_history_events'
+
+    id = Column(Integer, primary_key=True)
+    issued_lg_id = Column(Integer, ForeignKey("issued_lg_records.id", ondelete="CASCADE"), nullable=False)
+    action_type = Column(String, nullable=False)
+    changes = Column(JSONB, nullable=True, comment="{field: [before, after]} for changed fields only")
+    extra = Column(JSONB, nullable=True, comment="Entry-specific keys: field, source_file, source_type, migrated_by, ...")
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    notes = Column(Text, nullable=True)
+    occurred_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    legacy_seq = Column(Integer, nullable=True, comment="Position in the legacy action_history array (backfilled rows)")
+
+    __table_args__ = (
+        Index("ix_issued_lg_history_events_lg", "issued_lg_id", "id"),
+        UniqueConstraint("issued_lg_id", "legacy_seq", name="uq_issued_lg_history_events_legacy_seq"),
+    )
+
+    def __repr__(self):
+        return f"<IssuedLGHistoryEvent(issued_lg_id={self.issued_lg_id}, action_type={self.action_type})>"
+
 class BankIssuanceOption(Base):
     __tablename__ = 'bank_issuance_options'
 
@@ -0,0 +1,69 @@
+# app/models/models_migration_import.py
+# Resumable bulk imports of staged migration records (app/core/migration_bulk_import.py)
+
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.database import Base
+from app.models import BaseModel
+
+
+class MigrationImportJob(BaseModel):
+    """One bulk import run of a customer's READY_FOR_IMPORT staged records.
+
+    The staged rows are fixed when the job is created (one MigrationImportJobItem
+    each). Counters and item outcomes are committed with each chunk, so any worker
+    can report progress and running the job again only imports PENDING items."""
+    __tablename__ = "migration_import_jobs"
+
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String, nullable=False, default="PENDING", comment="PENDING, RUNNING, COMPLETED, FAILED")
+    phase = Column(String, nullable=True)
+    chunk_size = Column(Integer, nullable=False)
+    total_count = Column(Integer, nullable=False, default=0)
+    processed_count = Column(Integer, nullable=False, default=0)
+    imported_count = Column(Integer, nullable=False, default=0)
+    failed_count = Column(Integer, nullable=False, default=0)
+    duplicate_count = Column(Integer, nullable=False, default=0)
+    chunks_done = Column(Integer, nullable=False, default=0)
+    chunks_replayed = Column(Integer, nullable=False, default=0)
+    run_start_count = Column(Integer, nullable=False, default=0, comment="processed_count when the current run started")
+    started_at = Column(DateTime(timezone=True), nullable=True, comment="Start of the current run")
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True, comment="Last committed chunk of the current run (RUNNING)")
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    error = Column(Text, nullable=True)
+
+    items = relationship("MigrationImportJobItem", back_populates="job", order_by="MigrationImportJobItem.id")
+
+    __table_args__ = (
+        Index("ix_migration_import_jobs_customer_status", "customer_id", "status"),
+    )
+
+    def __repr__(self):
+        return f"<MigrationImportJob(id={self.id}, customer_id={self.customer_id}, status='{self.status}')>"
+
+
+class MigrationImportJobItem(Base):
+    """One staged record of an import job and its outcome; set in the same
+    transaction that imports (or rejects) the record."""
+    __tablename__ = "migration_import_job_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("migration_import_jobs.id"), nullable=False)
+    staging_id = Column(Integer, ForeignKey("lg_migration_staging.id"), nullable=False)
+    status = Column(String, nullable=False, default="PENDING", comment="PENDING, IMPORTED, FAILED, DUPLICATE")
+    lg_number = Column(String, nullable=True)
+    error = Column(JSON, nullable=True, comment="Import error (message or per-field validation errors)")
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    job = relationship("MigrationImportJob", back_populates="items")
+
+    __table_args__ = (
+        UniqueConstraint("job_id", "staging_id", name="uq_migration_import_job_items_staging"),
+        Index("ix_migration_import_job_items_status", "job_id", "status", "id"),
+    )
+
+    def __repr__(self):
+        return f"<MigrationImportJobItem(job_id={self.job_id}, staging_id={self.staging_id}, status='{self.status}')>"
@@ -1,7 +1,7 @@
 # app/models/models_notification.py
-# General-purpose user notification model (cross-module)
+# General-purpose user notification model (cross-module) and the approval e-mail outbox
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.models import BaseModel
@@ -32,3 +32,24 @@ class UserNotification(BaseModel):
     # Relationships
     user = relationship("User", foreign_keys=[user_id])
     actor = relationship("User", foreign_keys=[actor_user_id])
+
+
+class ApprovalNotificationOutbox(BaseModel):
+    """One maker-checker e-mail to send (app/services/approval_notifications.py).
+
+    Written in the transaction that creates or approves the approval request, so
+    a committed request keeps its e-mail across restarts and a rolled-back one
+    never sends; the dispatcher claims PENDING rows and marks them SENT / FAILED."""
+    __tablename__ = "approval_notification_outbox"
+
+    kind = Column(String, nullable=False, comment="pending_approval, ready_for_print")
+    approval_request_id = Column(Integer, ForeignKey("approval_requests.id"), nullable=False)
+    status = Column(String, nullable=False, default="PENDING", comment="PENDING, PROCESSING, SENT, FAILED")
+    attempts = Column(Integer, nullable=False, default=0)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_approval_notification_outbox_status", "status", "id"),
+    )
@@ -54,7 +54,7 @@ class QuotationBankAssignment(BaseModel):
     """Junction table connecting an RFQ strictly to a QuotationBank."""
     __tablename__ = "quotation_bank_assignments"
     id = Column(String, primary_key=True)
-    rfq_id = Column(String, ForeignKey("quotation_rfqs.id", ondelete="CASCADE"), nullable=False)
+    rfq_id = Column(String, ForeignKey("quotation_rfqs.id", ondelete="CASCADE"), nullable=False, index=True)
     quotation_bank_id = Column(Integer, ForeignKey("quotation_banks.id", ondelete="CASCADE"), nullable=False)
     token = Column(String, unique=True, index=True, nullable=False)
     
@@ -73,7 +73,7 @@ class QuotationBankAssignment(BaseModel):
 class QuotationOffer(BaseModel):
     """FX Spot Offers from banks."""
     __tablename__ = "quotation_offers"
-    assignment_id = Column(String, ForeignKey("quotation_bank_assignments.id", ondelete="CASCADE"), nullable=False)
+    assignment_id = Column(String, ForeignKey("quotation_bank_assignments.id", ondelete="CASCADE"), nullable=False, index=True)
     price = Column(Float, nullable=False)
     submitted_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -82,7 +82,7 @@ class QuotationOffer(BaseModel):
 class QuotationTBillOffer(BaseModel):
     """T-Bill specific quotation lines."""
     __tablename__ = "quotation_tbill_offers"
-    assignment_id = Column(String, ForeignKey("quotation_bank_assignments.id", ondelete="CASCADE"), nullable=False)
+    assignment_id = Column(String, ForeignKey("quotation_bank_assignments.id", ondelete="CASCADE"), nullable=False, index=True)
     settlement_date = Column(String, nullable=False)
     maturity_date = Column(String, nullable=False)
     discount_rate = Column(Float, nullable=False)
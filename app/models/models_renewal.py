@@ -0,0 +1,66 @@
+# app/models/models_renewal.py
+# Resumable bulk LG renewal runs (app/services/bulk_renewal_service.py)
+
+from sqlalchemy import Column, Integer, String, Date, DateTime, Text, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.database import Base
+from app.models import BaseModel
+
+
+class BulkRenewalBatch(BaseModel):
+    """One auto/forced renewal run of a customer.
+
+    The eligible LGs are fixed when the batch is created (one BulkRenewalBatchItem
+    each); running the batch again only processes items that are not RENEWED yet."""
+    __tablename__ = "bulk_renewal_batches"
+
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String, nullable=False, default="PENDING", comment="PENDING, RUNNING, COMPLETED, PARTIAL")
+    auto_renewal_days = Column(Integer, nullable=False)
+    force_renewal_days = Column(Integer, nullable=False)
+    total_count = Column(Integer, nullable=False, default=0)
+    renewed_count = Column(Integer, nullable=False, default=0)
+    failed_count = Column(Integer, nullable=False, default=0)
+    claimed_at = Column(DateTime(timezone=True), nullable=True, comment="Start of the current run (RUNNING)")
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    items = relationship("BulkRenewalBatchItem", back_populates="batch", order_by="BulkRenewalBatchItem.id")
+
+    __table_args__ = (
+        Index("ix_bulk_renewal_batches_customer", "customer_id", "id"),
+    )
+
+    def __repr__(self):
+        return f"<BulkRenewalBatch(id={self.id}, customer_id={self.customer_id}, status='{self.status}')>"
+
+
+class BulkRenewalBatchItem(Base):
+    """One LG of a renewal batch and its outcome; instruction_id is set in the
+    same transaction that extends the LG."""
+    __tablename__ = "bulk_renewal_batch_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    batch_id = Column(Integer, ForeignKey("bulk_renewal_batches.id"), nullable=False)
+    lg_record_id = Column(Integer, ForeignKey("lg_records.id"), nullable=False)
+    lg_number = Column(String, nullable=False)
+    renewal_type = Column(String, nullable=False, comment="AUTO, FORCED")
+    old_expiry_date = Column(Date, nullable=False)
+    new_expiry_date = Column(Date, nullable=False)
+    status = Column(String, nullable=False, default="PENDING", comment="PENDING, RENEWED, FAILED")
+    instruction_id = Column(Integer, ForeignKey("lg_instructions.id"), nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    batch = relationship("BulkRenewalBatch", back_populates="items")
+
+    __table_args__ = (
+        UniqueConstraint("batch_id", "lg_record_id", name="uq_bulk_renewal_batch_items_lg"),
+        Index("ix_bulk_renewal_batch_items_status", "batch_id", "status", "id"),
+    )
+
+    def __repr__(self):
+        return f"<BulkRenewalBatchItem(batch_id={self.batch_id}, lg_record_id={self.lg_record_id}, status='{self.status}')>"
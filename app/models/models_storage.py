@@ -0,0 +1,30 @@
+# app/models/models_storage.py
+# Content-addressed index over stored files (app/core/object_storage.py)
+
+from sqlalchemy import Column, Integer, String, BigInteger, Index, UniqueConstraint
+from app.models import BaseModel
+
+
+class StoredObject(BaseModel):
+    """One physical object in a storage backend, keyed by its SHA-256 per customer and bucket.
+
+    Documents with identical content point at the same object URI; reference_count
+    tracks how many LGDocument rows do, so the object is only deleted with the last one."""
+    __tablename__ = "stored_objects"
+
+    customer_id = Column(Integer, nullable=False)
+    bucket_name = Column(String, nullable=False)
+    content_sha256 = Column(String(64), nullable=False)
+    uri = Column(String, nullable=False, comment="gs://bucket/key or /uploads/objects/bucket/key (local backend)")
+    size_bytes = Column(BigInteger, nullable=False)
+    content_type = Column(String, nullable=True)
+    backend = Column(String(20), nullable=False, default="gcs")
+    reference_count = Column(Integer, nullable=False, default=1)
+
+    __table_args__ = (
+        UniqueConstraint('customer_id', 'bucket_name', 'content_sha256', name='_stored_object_customer_hash_uc'),
+        Index('ix_stored_objects_uri', 'uri'),
+    )
+
+    def __repr__(self):
+        return f"<StoredObject(id={self.id}, uri='{self.uri}', refs={self.reference_count})>"
@@ -1112,6 +1112,33 @@ class LGRecordOut(LGRecordBase, BaseSchema):
     documents: List['LGDocumentOut'] = []
     instructions: List['LGInstructionOut'] = []
 
+class LGRecordListItemOut(BaseModel):
+    """Flat LG list row; the full record with relations is GET /lg-records/{id}."""
+    id: int
+    lg_number: str
+    lg_amount: Decimal
+    currency_code: str
+    issuance_date: datetime
+    expiry_date: datetime
+    auto_renewal: bool
+    beneficiary_corporate_id: int
+    beneficiary_name: str
+    issuing_bank_id: int
+    issuing_bank_name: Optional[str] = None
+    lg_status: str
+    lg_operational_status: Optional[str] = None
+    internal_owner_contact_id: int
+    internal_owner_email: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class LGRecordListPageOut(BaseModel):
+    items: List[LGRecordListItemOut]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = Field(None, description="Matching LGs; returned with the first page only")
+    total_is_estimate: bool = False
+
 class LGRecordToggleAutoRenewalRequest(BaseModel):
     auto_renewal: bool = Field(..., description="The new auto_renewal status (True/False).")
     reason: Optional[str] = Field(None, description="Reason for toggling auto-renewal.")
@@ -1144,6 +1171,37 @@ class ApprovalRequestOut(BaseModel): # Inherits from BaseModel for base fields
     class Config:
         from_attributes = True
 
+class ApprovalInboxItemOut(BaseModel):
+    """Flat approval inbox row; full relations are on GET /approval-requests/{id}."""
+    id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    entity_type: str
+    entity_id: Optional[int] = None
+    action_type: str
+    status: ApprovalRequestStatusEnum
+    maker_user_id: int
+    maker_email: Optional[str] = None
+    checker_user_id: Optional[int] = None
+    checker_email: Optional[str] = None
+    lg_number: Optional[str] = None
+    related_instruction_id: Optional[int] = None
+    reason: Optional[str] = None
+    withdrawn_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ApprovalInboxPageOut(BaseModel):
+    items: List[ApprovalInboxItemOut]
+    next_cursor: Optional[str] = None
+
+class ApprovalInboxCountsOut(BaseModel):
+    total: int
+    pending: int
+    by_status: Dict[str, int]
+    by_action_type: Dict[str, int] = Field(..., description="Pending requests per action type")
+
 class LGLifecycleEventOut(BaseModel):
     id: int
     timestamp: datetime
@@ -1250,6 +1308,12 @@ class AutoRenewalRunSummaryOut(BaseModel):
     renewed_count: int
     message: str
     combined_pdf_base64: Optional[str] = None
+    batch_id: Optional[int] = None
+    status: Optional[str] = None
+    total_count: int = 0
+    failed_count: int = 0
+    pending_count: int = 0
+    combined_pdf_url: Optional[str] = Field(None, description="Streamed ZIP download of the batch's instruction letters, one PDF per LG.")
 
 # New Schemas for Reporting Module
 class ReportFilterBase(BaseModel):
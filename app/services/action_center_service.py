@@ -0,0 +1,310 @@
+# app/services/action_center_service.py
+"""
+Materialized issuance action-center work queue.
+
+Every open item lives as one IssuanceWorkItem row per bucket:
+
+- PENDING_DELIVERY: issued LGs in INTERNAL_PROCESSING and maintenance letters
+  (generated / printed / issued) not yet delivered to the bank.
+- AWAITING_REPLY: issued LGs and maintenance actions delivered to the bank
+  with no bank reply yet.
+- APPROACHING_EXPIRY: ACTIVE / LG_ISSUED LGs with a bank expiry date; the
+  expiry window is applied when reading, so rows never go stale with time.
+- APPROVED_REQUEST: issuance requests approved internally, not yet issued.
+- APPROVED_MAINTENANCE: maintenance actions approved, not yet executed.
+
+Freshness: every flush that touches an IssuedLGRecord, IssuanceMaintenanceAction
+or IssuanceRequest rewrites that record's items (and, for an LG, its
+maintenance actions' items) in the same transaction, so a rollback leaves
+the queue untouched. rebuild() recomputes a customer's (or every) queue from
+scratch; the schema migration command runs it to backfill an empty table.
+
+Reads are keyset-paginated on the (customer, bucket, sort key, id) indexes,
+and badge counts come from one GROUP BY, so load time tracks the page size
+rather than the portfolio size.
+"""
+
+import base64
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.change_tracking import FlushChanges, change_tracker
+from app.models.models_action_center import IssuanceWorkItem
+from app.models.models_issuance import IssuedLGRecord, IssuanceMaintenanceAction, IssuanceRequest
+
+logger = logging.getLogger(__name__)
+
+PENDING_DELIVERY = "PENDING_DELIVERY"
+AWAITING_REPLY = "AWAITING_REPLY"
+APPROACHING_EXPIRY = "APPROACHING_EXPIRY"
+APPROVED_REQUEST = "APPROVED_REQUEST"
+APPROVED_MAINTENANCE = "APPROVED_MAINTENANCE"
+BUCKETS = (PENDING_DELIVERY, AWAITING_REPLY, APPROACHING_EXPIRY, APPROVED_REQUEST, APPROVED_MAINTENANCE)
+
+SOURCE_ISSUANCE = "issuance"
+SOURCE_MAINTENANCE = "maintenance"
+SOURCE_REQUEST = "issuance_request"
+
+DEFAULT_EXPIRY_DAYS = 30
+REFRESH_CHUNK_SIZE = 500
+REBUILD_BATCH_SIZE = 2000
+
+# Source-state rules (previously the filters of the action-center endpoints)
+LG_AWAITING_REPLY_STATUSES = ("INTERNAL_PROCESSING", "DELIVERED_TO_BANK")
+LG_EXPIRY_STATUSES = ("ACTIVE", "LG_ISSUED")
+MAINTENANCE_OPEN_STATUSES = ("APPROVED", "EXECUTED")
+MAINTENANCE_ISSUED_INSTRUCTION_STATUSES = ("Instruction Issued", "Printed")
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ITEM_KEYS = tuple(c.key for c in IssuanceWorkItem.__table__.columns if c.key not in ("id", "refreshed_at"))
+
+_LG_COLUMNS = (
+    IssuedLGRecord.id, IssuedLGRecord.customer_id, IssuedLGRecord.status, IssuedLGRecord.delivery_date,
+    IssuedLGRecord.bank_reply_date, IssuedLGRecord.bank_lg_expiry_date, IssuedLGRecord.bank_lg_number,
+    IssuedLGRecord.lg_ref_number, IssuedLGRecord.beneficiary_name, IssuedLGRecord.current_amount,
+    IssuedLGRecord.currency_id, IssuedLGRecord.created_at,
+)
+_MAINTENANCE_COLUMNS = (
+    IssuanceMaintenanceAction.id, IssuanceMaintenanceAction.issued_lg_id, IssuanceMaintenanceAction.status,
+    IssuanceMaintenanceAction.action_type, IssuanceMaintenanceAction.letter_serial_number,
+    IssuanceMaintenanceAction.letter_generated_path, IssuanceMaintenanceAction.is_printed,
+    IssuanceMaintenanceAction.instruction_status, IssuanceMaintenanceAction.delivery_date,
+    IssuanceMaintenanceAction.bank_reply_date, IssuanceMaintenanceAction.created_at,
+    IssuanceMaintenanceAction.updated_at,
+)
+_REQUEST_COLUMNS = (
+    IssuanceRequest.id, IssuanceRequest.customer_id, IssuanceRequest.status, IssuanceRequest.is_deleted,
+    IssuanceRequest.serial_number, IssuanceRequest.beneficiary_name, IssuanceRequest.amount,
+    IssuanceRequest.currency_id, IssuanceRequest.lg_type_id, IssuanceRequest.department,
+    IssuanceRequest.created_at, IssuanceRequest.updated_at,
+)
+
+
+def _as_datetime(value: Any) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.combine(value, time.min)
+
+
+def _chunks(ids: Iterable[int], size: int = REFRESH_CHUNK_SIZE) -> Iterable[List[int]]:
+    ordered = sorted(i for i in ids if i is not None)
+    for start in range(0, len(ordered), size):
+        yield ordered[start:start + size]
+
+
+# ---------------- Bucket membership ----------------
+
+def _lg_items(lg) -> List[Dict[str, Any]]:
+    base = {
+        "customer_id": lg.customer_id, "source": SOURCE_ISSUANCE, "source_id": lg.id, "issued_lg_id": lg.id,
+        "lg_number": lg.bank_lg_number or lg.lg_ref_number, "beneficiary": lg.beneficiary_name,
+        "amount": lg.current_amount, "currency_id": lg.currency_id, "status": lg.status,
+        "action_type": "NEW_ISSUANCE", "delivery_date": _as_datetime(lg.delivery_date),
+        "source_created_at": lg.created_at,
+    }
+    created = lg.created_at or _EPOCH
+    items = []
+    if lg.status == "INTERNAL_PROCESSING" and lg.delivery_date is None:
+        items.append({**base, "bucket": PENDING_DELIVERY, "sort_at": created})
+    if lg.delivery_date is not None and lg.bank_reply_date is None and lg.status in LG_AWAITING_REPLY_STATUSES:
+        items.append({**base, "bucket": AWAITING_REPLY, "sort_at": _as_datetime(lg.delivery_date)})
+    if lg.status in LG_EXPIRY_STATUSES and lg.bank_lg_expiry_date is not None:
+        items.append({**base, "bucket": APPROACHING_EXPIRY, "sort_at": created, "due_date": lg.bank_lg_expiry_date})
+    return items
+
+
+def _maintenance_items(action, lg) -> List[Dict[str, Any]]:
+    base = {
+        "customer_id": lg.customer_id, "source": SOURCE_MAINTENANCE, "source_id": action.id,
+        "issued_lg_id": action.issued_lg_id, "lg_number": lg.bank_lg_number or lg.lg_ref_number,
+        "beneficiary": lg.beneficiary_name, "status": action.status, "action_type": action.action_type,
+        "serial_number": action.letter_serial_number, "instruction_status": action.instruction_status,
+        "delivery_date": action.delivery_date, "source_created_at": action.created_at,
+    }
+    created = action.created_at or _EPOCH
+    items = []
+    letter_issued = (
+        action.letter_generated_path is not None
+        or action.is_printed
+        or action.instruction_status in MAINTENANCE_ISSUED_INSTRUCTION_STATUSES
+    )
+    if action.status in MAINTENANCE_OPEN_STATUSES:
+        if letter_issued and action.delivery_date is None:
+            items.append({**base, "bucket": PENDING_DELIVERY, "sort_at": created})
+        if action.delivery_date is not None and action.bank_reply_date is None:
+            items.append({**base, "bucket": AWAITING_REPLY, "sort_at": action.delivery_date})
+    if action.status == "APPROVED":
+        items.append({**base, "bucket": APPROVED_MAINTENANCE, "sort_at": action.updated_at or created})
+    return items
+
+
+def _request_items(request) -> List[Dict[str, Any]]:
+    if request.status != "APPROVED_INTERNAL" or request.is_deleted:
+        return []
+    return [{
+        "customer_id": request.customer_id, "bucket": APPROVED_REQUEST, "source": SOURCE_REQUEST,
+        "source_id": request.id, "serial_number": request.serial_number, "beneficiary": request.beneficiary_name,
+        "amount": request.amount, "currency_id": request.currency_id, "lg_type_id": request.lg_type_id,
+        "department": request.department, "status": request.status, "action_type": "NEW_ISSUANCE",
+        "sort_at": request.updated_at or request.created_at or _EPOCH, "source_created_at": request.created_at,
+    }]
+
+
+# ---------------- Cursors ----------------
+
+def encode_cursor(bucket: str, item: IssuanceWorkItem) -> str:
+    key = item.due_date if bucket == APPROACHING_EXPIRY else item.sort_at
+    return base64.urlsafe_b64encode(f"{key.isoformat()}|{item.id}".encode()).decode()
+
+
+def decode_cursor(bucket: str, cursor: str) -> Tuple[Any, int]:
+    try:
+        key, item_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        parsed = date.fromisoformat(key) if bucket == APPROACHING_EXPIRY else datetime.fromisoformat(key)
+        return parsed, int(item_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}") from e
+
+
+class ActionCenterService:
+
+    # ---------------- Maintenance ----------------
+
+    def refresh(self, conn, issued_lg_ids: Set[int] = frozenset(), request_ids: Set[int] = frozenset()) -> None:
+        """Rewrites the work items of the given LGs (with their maintenance actions) and requests."""
+        table = IssuanceWorkItem.__table__
+        rows: List[Dict[str, Any]] = []
+
+        for chunk in _chunks(issued_lg_ids):
+            # Row locks serialize concurrent refreshes of the same LG (no-op on SQLite)
+            lgs = {lg.id: lg for lg in conn.execute(select(*_LG_COLUMNS).where(IssuedLGRecord.id.in_(chunk)).with_for_update())}
+            conn.execute(delete(table).where(or_(
+                and_(table.c.source == SOURCE_ISSUANCE, table.c.source_id.in_(chunk)),
+                and_(table.c.source == SOURCE_MAINTENANCE, table.c.issued_lg_id.in_(chunk)),
+            )))
+            for lg in lgs.values():
+                rows.extend(_lg_items(lg))
+            for action in conn.execute(select(*_MAINTENANCE_COLUMNS).where(
+                IssuanceMaintenanceAction.issued_lg_id.in_(chunk),
+                IssuanceMaintenanceAction.is_deleted == False,
+            )):
+                lg = lgs.get(action.issued_lg_id)
+                if lg is not None:
+                    rows.extend(_maintenance_items(action, lg))
+
+        for chunk in _chunks(request_ids):
+            conn.execute(delete(table).where(table.c.source == SOURCE_REQUEST, table.c.source_id.in_(chunk)))
+            for request in conn.execute(select(*_REQUEST_COLUMNS).where(IssuanceRequest.id.in_(chunk))):
+                rows.extend(_request_items(request))
+
+        if rows:
+            # executemany needs the same keys in every row
+            conn.execute(insert(table), [{key: row.get(key) for key in _ITEM_KEYS} for row in rows])
+
+    def rebuild(self, db: Session, customer_id: Optional[int] = None) -> int:
+        """Recomputes the queue of one customer (or all customers) from the source tables."""
+        conn = db.connection()
+        table = IssuanceWorkItem.__table__
+        conn.execute(delete(table).where(table.c.customer_id == customer_id) if customer_id is not None else delete(table))
+
+        lg_query = select(IssuedLGRecord.id)
+        request_query = select(IssuanceRequest.id)
+        if customer_id is not None:
+            lg_query = lg_query.where(IssuedLGRecord.customer_id == customer_id)
+            request_query = request_query.where(IssuanceRequest.customer_id == customer_id)
+
+        lg_ids = conn.execute(lg_query).scalars().all()
+        request_ids = conn.execute(request_query).scalars().all()
+        for start in range(0, len(lg_ids), REBUILD_BATCH_SIZE):
+            self.refresh(conn, issued_lg_ids=set(lg_ids[start:start + REBUILD_BATCH_SIZE]))
+        for start in range(0, len(request_ids), REBUILD_BATCH_SIZE):
+            self.refresh(conn, request_ids=set(request_ids[start:start + REBUILD_BATCH_SIZE]))
+
+        count_query = select(func.count()).select_from(table)
+        if customer_id is not None:
+            count_query = count_query.where(table.c.customer_id == customer_id)
+        total = conn.execute(count_query).scalar() or 0
+        logger.info(f"Action-center work queue rebuilt for {'customer ' + str(customer_id) if customer_id is not None else 'all customers'}: {total} items.")
+        return total
+
+    # ---------------- Read ----------------
+
+    def _expiry_window(self, days_threshold: int) -> Tuple[date, date]:
+        today = date.today()
+        return today, today + timedelta(days=days_threshold)
+
+    def list_items(
+        self,
+        db: Session,
+        customer_id: int,
+        bucket: str,
+        *,
+        sources: Optional[Iterable[str]] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        days_threshold: int = DEFAULT_EXPIRY_DAYS,
+    ) -> Tuple[List[IssuanceWorkItem], Optional[str]]:
+        """One page of a bucket, newest first (soonest expiry first for
+        APPROACHING_EXPIRY), and the cursor of the next page if there is one."""
+        W = IssuanceWorkItem
+        query = db.query(W).filter(W.customer_id == customer_id, W.bucket == bucket)
+        if sources:
+            query = query.filter(W.source.in_(list(sources)))
+
+        if bucket == APPROACHING_EXPIRY:
+            start, horizon = self._expiry_window(days_threshold)
+            query = query.filter(W.due_date >= start, W.due_date <= horizon)
+            if cursor:
+                key, item_id = decode_cursor(bucket, cursor)
+                query = query.filter(or_(W.due_date > key, and_(W.due_date == key, W.id > item_id)))
+            query = query.order_by(W.due_date.asc(), W.id.asc())
+        else:
+            if cursor:
+                key, item_id = decode_cursor(bucket, cursor)
+                query = query.filter(or_(W.sort_at < key, and_(W.sort_at == key, W.id < item_id)))
+            query = query.order_by(W.sort_at.desc(), W.id.desc())
+
+        if limit is None:
+            return query.all(), None
+        items = query.limit(limit + 1).all()
+        if len(items) <= limit:
+            return items, None
+        items = items[:limit]
+        return items, encode_cursor(bucket, items[-1])
+
+    def counts(self, db: Session, customer_id: int, days_threshold: int = DEFAULT_EXPIRY_DAYS) -> Dict[str, int]:
+        """Open items per bucket in one GROUP BY."""
+        W = IssuanceWorkItem
+        start, horizon = self._expiry_window(days_threshold)
+        rows = db.query(W.bucket, func.count(W.id)).filter(
+            W.customer_id == customer_id,
+            or_(W.bucket != APPROACHING_EXPIRY, and_(W.due_date >= start, W.due_date <= horizon)),
+        ).group_by(W.bucket).all()
+        counts = {bucket: 0 for bucket in BUCKETS}
+        counts.update({bucket: count for bucket, count in rows})
+        return counts
+
+
+action_center_service = ActionCenterService()
+
+
+# ==============================================================================
+# CHANGE TRACKING: rewrite work items of records touched by the flush
+# ==============================================================================
+
+def _refresh_action_center_items(session: Session, changes: FlushChanges):
+    issued_lg_ids: Set[int] = {obj.id for obj in changes.all(IssuedLGRecord)}
+    issued_lg_ids.update(obj.issued_lg_id for obj in changes.all(IssuanceMaintenanceAction))
+    request_ids: Set[int] = {obj.id for obj in changes.all(IssuanceRequest)}
+    action_center_service.refresh(session.connection(), issued_lg_ids, request_ids)
+
+
+change_tracker.register(
+    "action_center",
+    models=(IssuedLGRecord, IssuanceMaintenanceAction, IssuanceRequest),
+    collect=_refresh_action_center_items,
+)
@@ -7,17 +7,122 @@ Responsibilities:
 2. Minimizes & tokenizes internal DB records for Level 2 multi-step LLM synthesis (e.g. LG_TOKEN_001, BENEFICIARY_TOKEN_001).
 3. Validates AI Output: Detects all tokens in LLM response and REJECTS any token not generated by the application.
 4. Detokenizes valid tokens back to customer values post-validation.
+
+Tokens are issued by a TokenVocabulary (value <-> token per kind, numbered
+001, 002, ... with no upper bound). Every token matches TOKEN_PATTERN, so one
+precompiled pattern finds all of them: validation and detokenization are a
+single scan of the response with a dict lookup per hit, whatever the size of
+the mapping (previously one full str.replace pass per token, which also
+rewrote LG_TOKEN_100 inside LG_TOKEN_1000).
+
+Datasets are tokenized column-wise: each sensitive column's distinct values
+get their tokens once and the column is mapped in one pass.
+
+privacy_tokenizer.vocabulary(customer_id) returns the customer's vocabulary
+for the assistant session (kept TOKEN_VOCABULARY_TTL_SECONDS since last use),
+so the same LG, beneficiary or bank keeps its token across questions and
+payloads of one conversation.
 """
 
 import re
 import logging
-from typing import Dict, Any, List, Tuple, Set
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 
 logger = logging.getLogger(__name__)
 
 # Sensitive identifier patterns
 LG_NUMBER_PATTERN = re.compile(r'\b(?:LG|ACME|NBE|HSBC|BM|CIB|ADIB|QNB|SCB|CITI|DB)[-/A-Z0-9]{3,20}\b', re.IGNORECASE)
 
+TOKEN_KIND_LG = "LG_TOKEN"
+TOKEN_KIND_BENEFICIARY = "BENEFICIARY_TOKEN"
+TOKEN_KIND_BANK = "BANK_TOKEN"
+TOKEN_KINDS = (TOKEN_KIND_LG, TOKEN_KIND_BENEFICIARY, TOKEN_KIND_BANK)
+
+# Any application token; digits are matched greedily so LG_TOKEN_1000 is never read as LG_TOKEN_100
+TOKEN_PATTERN = re.compile(r'\b(?:LG_TOKEN|BENEFICIARY_TOKEN|BANK_TOKEN)_\d{3,}')
+
+# Sensitive record columns and the value used when a record lacks one
+DATASET_COLUMNS = (
+    ("lg_number", TOKEN_KIND_LG, "LG-000"),
+    ("beneficiary", TOKEN_KIND_BENEFICIARY, "Corporate"),
+    ("issuing_bank", TOKEN_KIND_BANK, "Bank"),
+)
+
+TOKEN_VOCABULARY_TTL_SECONDS = 30 * 60
+MAX_TOKEN_VOCABULARIES = 1000
+MAX_TOKENS_PER_VOCABULARY = 100_000
+
+
+class TokenVocabulary:
+    """
+    Token <-> value mapping. Tokens are stable once issued; a value gets the
+    same token every time it is tokenized through this vocabulary.
+    """
+
+    def __init__(self):
+        self.token_to_value: Dict[str, str] = {}
+        self._value_to_token: Dict[str, Dict[Any, str]] = {kind: {} for kind in TOKEN_KINDS}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.token_to_value)
+
+    def tokens_for(self, kind: str, values: Sequence[Any]) -> List[str]:
+        """The tokens of a column of values, issuing tokens for values not seen before."""
+        known = self._value_to_token[kind]
+        with self._lock:
+            new_values = [v for v in dict.fromkeys(values) if v not in known]
+            if new_values:
+                start = len(known) + 1
+                tokens = [f"{kind}_{n:03d}" for n in range(start, start + len(new_values))]
+                known.update(zip(new_values, tokens))
+                self.token_to_value.update(zip(tokens, new_values))
+        return list(map(known.__getitem__, values))
+
+    def token_for(self, kind: str, value: Any) -> str:
+        token = self._value_to_token[kind].get(value)
+        return token if token is not None else self.tokens_for(kind, (value,))[0]
+
+    def find_token(self, kind: str, value: Any) -> Optional[str]:
+        """The token already issued for a value, without issuing one."""
+        return self._value_to_token[kind].get(value)
+
+
+class TokenVocabularyStore:
+    """Per-customer vocabularies for the assistant session, dropped after TTL of disuse."""
+
+    def __init__(self, ttl_seconds: int = TOKEN_VOCABULARY_TTL_SECONDS, max_entries: int = MAX_TOKEN_VOCABULARIES,
+                 max_tokens: int = MAX_TOKENS_PER_VOCABULARY):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_tokens = max_tokens
+        self._entries: "OrderedDict[int, Tuple[float, TokenVocabulary]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, customer_id: int) -> TokenVocabulary:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(customer_id)
+            if entry is None or entry[0] < now or len(entry[1]) > self.max_tokens:
+                vocabulary = TokenVocabulary()
+            else:
+                vocabulary = entry[1]
+            self._entries[customer_id] = (now + self.ttl_seconds, vocabulary)
+            self._entries.move_to_end(customer_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return vocabulary
+
+    def clear(self, customer_id: Optional[int] = None) -> None:
+        with self._lock:
+            if customer_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(customer_id, None)
+
 
 class PrivacyTokenizer:
     """
@@ -25,122 +130,101 @@ class PrivacyTokenizer:
     Keeps token mapping internal. Never exposes mapping to external AI.
     """
 
-    def sanitize_user_question(self, question: str) -> Tuple[str, Dict[str, str]]:
+    def __init__(self):
+        self.vocabularies = TokenVocabularyStore()
+
+    def vocabulary(self, customer_id: int) -> TokenVocabulary:
+        """The customer's token vocabulary for the current assistant session."""
+        return self.vocabularies.get(customer_id)
+
+    def sanitize_user_question(self, question: str, vocabulary: Optional[TokenVocabulary] = None) -> Tuple[str, Dict[str, str]]:
         """
         Tokenizes sensitive LG numbers and company identifiers in the user's question.
-        Returns: (sanitized_question, token_mapping)
+        Returns: (sanitized_question, token_mapping) with the tokens used in the question.
         """
-        token_map = {}
+        vocabulary = vocabulary if vocabulary is not None else TokenVocabulary()
         reverse_map = {}
 
         def replace_lg(match):
             original = match.group(0)
-            if original not in token_map:
-                token = f"LG_TOKEN_{len(token_map) + 1:03d}"
-                token_map[original] = token
-                reverse_map[token] = original
-            return token_map[original]
+            token = vocabulary.token_for(TOKEN_KIND_LG, original)
+            reverse_map[token] = original
+            return token
 
         sanitized = LG_NUMBER_PATTERN.sub(replace_lg, question)
         return sanitized, reverse_map
 
-    def tokenize_dataset(self, records: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    def tokenize_columns(self, columns: Dict[str, Sequence[Any]],
+                         vocabulary: Optional[TokenVocabulary] = None) -> Tuple[Dict[str, List[str]], Dict[str, str]]:
         """
-        Tokenizes database records for Level 2 LLM synthesis.
+        Tokenizes column-oriented records ({"lg_number": [...], "beneficiary": [...],
+        "issuing_bank": [...]}); other columns are not touched or returned.
+        Returns: (tokenized_columns, token_to_value)
         """
-        tokenized_list = []
-        token_to_value = {}
-        lg_counter = 1
-        ben_counter = 1
-        bank_counter = 1
-
-        beneficiary_map = {}
-        bank_map = {}
-
-        for rec in records:
-            orig_lg = rec.get("lg_number", "LG-000")
-            orig_ben = rec.get("beneficiary", "Corporate")
-            orig_bank = rec.get("issuing_bank", "Bank")
-
-            lg_token = f"LG_TOKEN_{lg_counter:03d}"
-            lg_counter += 1
-            token_to_value[lg_token] = orig_lg
-
-            if orig_ben not in beneficiary_map:
-                ben_token = f"BENEFICIARY_TOKEN_{ben_counter:03d}"
-                ben_counter += 1
-                beneficiary_map[orig_ben] = ben_token
-                token_to_value[ben_token] = orig_ben
-            else:
-                ben_token = beneficiary_map[orig_ben]
-
-            if orig_bank not in bank_map:
-                bank_token = f"BANK_TOKEN_{bank_counter:03d}"
-                bank_counter += 1
-                bank_map[orig_bank] = bank_token
-                token_to_value[bank_token] = orig_bank
-            else:
-                bank_token = bank_map[orig_bank]
-
-            tokenized_rec = dict(rec)
-            tokenized_rec["lg_number"] = lg_token
-            tokenized_rec["beneficiary"] = ben_token
-            tokenized_rec["issuing_bank"] = bank_token
-            tokenized_list.append(tokenized_rec)
+        vocabulary = vocabulary if vocabulary is not None else TokenVocabulary()
+        tokenized = {
+            column: vocabulary.tokens_for(kind, columns[column])
+            for column, kind, _ in DATASET_COLUMNS if column in columns
+        }
+        return tokenized, vocabulary.token_to_value
 
+    def tokenize_dataset(self, records: List[Dict[str, Any]],
+                         vocabulary: Optional[TokenVocabulary] = None) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        """
+        Tokenizes database records for Level 2 LLM synthesis.
+        """
+        columns = {column: [rec.get(column, default) for rec in records] for column, _, default in DATASET_COLUMNS}
+        tokenized, token_to_value = self.tokenize_columns(columns, vocabulary)
+        tokenized_list = [
+            dict(rec, lg_number=lg_token, beneficiary=ben_token, issuing_bank=bank_token)
+            for rec, lg_token, ben_token, bank_token in zip(
+                records, tokenized["lg_number"], tokenized["beneficiary"], tokenized["issuing_bank"]
+            )
+        ]
         return tokenized_list, token_to_value
 
     def tokenize_complex_payload(
         self,
         records: List[Dict[str, Any]],
         beneficiary_summary: Dict[str, Any],
-        facility_summary: List[Dict[str, Any]]
+        facility_summary: List[Dict[str, Any]],
+        vocabulary: Optional[TokenVocabulary] = None,
     ) -> Tuple[List[Dict[str, Any]], Dict[str, Any], List[Dict[str, Any]], Dict[str, str]]:
         """
         Tokenizes raw records, pre-calculated beneficiary aggregates, and facility headroom
         using a unified token registry for Level 2 analysis.
         """
-        tokenized_records, valid_tokens = self.tokenize_dataset(records)
-
-        # Reverse map for quick lookup: original_name -> token
-        val_to_token = {v: k for k, v in valid_tokens.items()}
+        vocabulary = vocabulary if vocabulary is not None else TokenVocabulary()
+        tokenized_records, valid_tokens = self.tokenize_dataset(records, vocabulary)
 
         # Tokenize pre-calculated beneficiary summary
+        ben_tokens = vocabulary.tokens_for(TOKEN_KIND_BENEFICIARY, list(beneficiary_summary))
         tokenized_bens = {}
-        for ben_name, data in beneficiary_summary.items():
-            ben_token = val_to_token.get(ben_name)
-            if not ben_token:
-                ben_token = f"BENEFICIARY_TOKEN_{len(valid_tokens) + 1:03d}"
-                valid_tokens[ben_token] = ben_name
-                val_to_token[ben_name] = ben_token
-
+        for ben_token, data in zip(ben_tokens, beneficiary_summary.values()):
             tok_data = dict(data)
-            # Tokenize any LGs inside expiring_in_90_days
+            # Tokenize any LGs inside expiring_in_90_days (only LGs already in the payload)
             if "expiring_in_90_days" in tok_data:
                 tok_exp = []
                 for exp_item in tok_data["expiring_in_90_days"]:
                     tok_item = dict(exp_item)
-                    orig_lg = exp_item.get("lg_number")
-                    if orig_lg in val_to_token:
-                        tok_item["lg_number"] = val_to_token[orig_lg]
+                    lg_token = vocabulary.find_token(TOKEN_KIND_LG, exp_item.get("lg_number"))
+                    if lg_token:
+                        tok_item["lg_number"] = lg_token
                     tok_exp.append(tok_item)
                 tok_data["expiring_in_90_days"] = tok_exp
-
             tokenized_bens[ben_token] = tok_data
 
         # Tokenize pre-calculated facility summary
+        banks = [fac.get("bank") for fac in facility_summary]
+        bank_tokens = dict(zip(
+            (b for b in banks if b),
+            vocabulary.tokens_for(TOKEN_KIND_BANK, [b for b in banks if b]),
+        ))
         tokenized_facs = []
-        for fac in facility_summary:
+        for fac, orig_b in zip(facility_summary, banks):
             tok_fac = dict(fac)
-            orig_b = fac.get("bank")
             if orig_b:
-                if orig_b not in val_to_token:
-                    bank_tok = f"BANK_TOKEN_{len(valid_tokens) + 1:03d}"
-                    valid_tokens[bank_tok] = orig_b
-                    val_to_token[orig_b] = bank_tok
-                else:
-                    bank_tok = val_to_token[orig_b]
-                tok_fac["bank"] = bank_tok
+                tok_fac["bank"] = bank_tokens[orig_b]
             tokenized_facs.append(tok_fac)
 
         return tokenized_records, tokenized_bens, tokenized_facs, valid_tokens
@@ -150,9 +234,8 @@ class PrivacyTokenizer:
         Inspects LLM output for tokens.
         REJECTS response if AI returns any token NOT present in valid_tokens mapping.
         """
-        found_tokens = re.findall(r'\b(?:LG_TOKEN|BENEFICIARY_TOKEN|BANK_TOKEN)_\d{3}\b', response_text)
-        
-        for token in found_tokens:
+        for match in TOKEN_PATTERN.finditer(response_text):
+            token = match.group(0)
             if token not in valid_tokens:
                 logger.error(f"Security Alert: AI returned unrecognized/hallucinated token: {token}")
                 return False, f"Output validation failed: AI returned unrecognized token '{token}'."
@@ -161,12 +244,15 @@ class PrivacyTokenizer:
 
     def detokenize_response(self, response_text: str, valid_tokens: Dict[str, str]) -> str:
         """
-        Replaces tokens with original customer values post-validation.
+        Replaces tokens with original customer values post-validation (one scan;
+        unknown tokens are left as they are).
         """
-        detokenized = response_text
-        for token, original in valid_tokens.items():
-            detokenized = detokenized.replace(token, str(original))
-        return detokenized
+        def original(match):
+            token = match.group(0)
+            value = valid_tokens.get(token)
+            return str(value) if value is not None else token
+
+        return TOKEN_PATTERN.sub(original, response_text)
 
 
 privacy_tokenizer = PrivacyTokenizer()
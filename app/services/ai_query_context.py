@@ -0,0 +1,163 @@
+# app/services/ai_query_context.py
+"""
+Conversation state and answer cache for the AI Query Assistant.
+
+- AssistantQueryContext carries everything one request needs (question, params,
+  the LG a follow-up question refers to) instead of instance attributes on the
+  process-wide service singleton.
+- ConversationStore remembers the last referenced LG per (customer, user) for a
+  limited time, so "when does it expire?" resolves against the asking user's
+  own previous answer.
+- AssistantResultCache keeps query results per (customer, intent, params,
+  entity scope) for a few seconds. Writes to LGs, instructions, issuance
+  requests or facilities made in this worker drop the customer's entries when
+  the session commits; other workers' writes are bounded by the TTL.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from app.core.change_tracking import FlushChanges, change_tracker
+from app.models import LGRecord, LGInstruction
+from app.models.models_issuance import IssuanceRequest, IssuanceFacility
+
+CONVERSATION_TTL_SECONDS = 30 * 60
+MAX_CONVERSATIONS = 5000
+RESULT_CACHE_TTL_SECONDS = 30
+MAX_CACHED_RESULTS = 1000
+
+_CHANGE_CONSUMER = "assistant_result_cache"
+_ALL_CUSTOMERS = "*"
+
+
+@dataclass
+class AssistantQueryContext:
+    customer_id: int
+    user_id: int
+    user_question: str = ""
+    params: Dict[str, Any] = field(default_factory=dict)
+    last_referenced_lg: Optional[Dict[str, Any]] = None
+
+
+class ConversationStore:
+
+    def __init__(self, ttl_seconds: int = CONVERSATION_TTL_SECONDS, max_entries: int = MAX_CONVERSATIONS):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, int], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_last_lg(self, customer_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+        key = (customer_id, user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            return dict(entry[1])
+
+    def remember_lg(self, customer_id: int, user_id: int, lg: Dict[str, Any]) -> None:
+        key = (customer_id, user_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, dict(lg))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class AssistantResultCache:
+
+    def __init__(self, ttl_seconds: int = RESULT_CACHE_TTL_SECONDS, max_entries: int = MAX_CACHED_RESULTS):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _params_key(params: Dict[str, Any]) -> Tuple:
+        return tuple(sorted((k, repr(v)) for k, v in (params or {}).items()))
+
+    def make_key(self, customer_id: int, intent: str, params: Dict[str, Any],
+                 has_all_entity_access: bool, entity_ids: Optional[List[int]]) -> Hashable:
+        scope = "*" if has_all_entity_access else tuple(sorted(entity_ids or ()))
+        with self._lock:
+            generation = self._generations.get(customer_id, 0)
+        return (customer_id, generation, intent, self._params_key(params), scope)
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, customer_id: Optional[int] = None) -> None:
+        """Drops a customer's cached answers (or every customer's when None)."""
+        with self._lock:
+            if customer_id is None:
+                self._entries.clear()
+                self._generations.clear()
+                return
+            # Old keys carry the previous generation and can never be hit again
+            self._generations[customer_id] = self._generations.get(customer_id, 0) + 1
+            for key in [k for k in self._entries if k[0] == customer_id]:
+                del self._entries[key]
+
+
+conversation_store = ConversationStore()
+assistant_result_cache = AssistantResultCache()
+
+
+# ==============================================================================
+# CHANGE TRACKING: commit-time invalidation for writes made in this worker
+# ==============================================================================
+
+def _instruction_customer_id(session: Session, obj: LGInstruction) -> Any:
+    lg = obj.__dict__.get("lg_record")
+    if lg is None and obj.lg_record_id is not None:
+        lg = session.identity_map.get(identity_key(LGRecord, obj.lg_record_id))
+    return lg.customer_id if lg is not None else _ALL_CUSTOMERS
+
+
+def _collect_assistant_changes(session: Session, changes: FlushChanges):
+    pending = change_tracker.pending(session, _CHANGE_CONSUMER)
+    for obj in changes.all(LGRecord, IssuanceRequest, IssuanceFacility):
+        pending.add(obj.customer_id if obj.customer_id is not None else _ALL_CUSTOMERS)
+    for obj in changes.all(LGInstruction):
+        pending.add(_instruction_customer_id(session, obj))
+
+
+def _apply_assistant_invalidations(session: Session, customers: Set[Any]):
+    if _ALL_CUSTOMERS in customers:
+        assistant_result_cache.invalidate(None)
+        return
+    for customer_id in customers:
+        assistant_result_cache.invalidate(customer_id)
+
+
+change_tracker.register(
+    _CHANGE_CONSUMER,
+    models=(LGRecord, LGInstruction, IssuanceRequest, IssuanceFacility),
+    collect=_collect_assistant_changes,
+    apply=_apply_assistant_invalidations,
+)
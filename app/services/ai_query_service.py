@@ -19,7 +19,7 @@ import logging
 from datetime import datetime, timezone, timedelta
 from typing import Optional, Dict, Any, List, Tuple
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, or_, and_, desc
+from sqlalchemy import func, or_, and_, desc, case
 
 from app.models import (
     LGRecord, LgStatus, Customer, User, Bank, CustomerEntity,
@@ -28,11 +28,24 @@ from app.models import (
 from app.models.models_issuance import IssuanceRequest, IssuanceFacility
 from app.models.models import AuditLog
 from app.services.ai_policy_guardrail import policy_guardrail
+from app.services.ai_query_context import AssistantQueryContext, conversation_store, assistant_result_cache
 from app.services.ai_privacy_tokenizer import privacy_tokenizer
 from app.services.system_knowledge_base import get_system_knowledge
 
 logger = logging.getLogger(__name__)
 
+# Rows returned for list answers; aggregate answers are capped at AGGREGATE_ROW_LIMIT groups
+LIST_ROW_LIMIT = 15
+AGGREGATE_ROW_LIMIT = 200
+
+# Intents whose results depend only on (customer, params, entity scope) and may be served from cache
+CACHEABLE_INTENTS = frozenset({
+    "find_expiring_lgs", "get_lg_analytics_summary", "get_issuance_summary",
+    "get_facility_analytics", "get_daily_pulse", "get_action_center_summary",
+    "get_top_beneficiaries", "get_top_issuers", "get_entity_distribution",
+    "get_bank_exposure", "search_lgs", "get_pending_approvals",
+})
+
 OFFLINE_TREASURY_GLOSSARY = {
     "cash pooling": "Cash pooling is a corporate treasury technique used to centralize and optimize cash balances across multiple bank accounts to minimize borrowing costs and maximize interest income.",
     "pooling": "Cash pooling is a corporate treasury technique used to centralize and optimize cash balances across multiple bank accounts to minimize borrowing costs and maximize interest income.",
@@ -69,11 +82,7 @@ class AIQueryAssistantService:
     Fully Autonomous, 100% Offline-Capable, Sub-25ms ORM Execution.
     """
 
-    def __init__(self):
-        self._last_referenced_lg: Optional[Dict[str, Any]] = None
-        self._current_query_params: Dict[str, Any] = {}
-
-    def classify_and_interpret(self, user_question: str) -> Dict[str, Any]:
+    def classify_and_interpret(self, user_question: str, context: Optional[AssistantQueryContext] = None) -> Dict[str, Any]:
         q_raw = user_question.strip()
         q_lower = q_raw.lower()
 
@@ -163,7 +172,8 @@ class AIQueryAssistantService:
             }
 
         # 1. Pronoun / Context continuation
-        if self._last_referenced_lg and any(kw in q_lower for kw in [
+        last_referenced_lg = context.last_referenced_lg if context else None
+        if last_referenced_lg and any(kw in q_lower for kw in [
             "this lg", "this guarantee", "it", "about it", "who is the beneficiary",
             "which bank issued it", "what is its amount", "when does it expire",
             "show me details", "more details", "what is the currency"
@@ -173,8 +183,8 @@ class AIQueryAssistantService:
                 "topic": "treasury",
                 "intent": "get_lg_details",
                 "parameters": {
-                    "lg_id": self._last_referenced_lg.get("lg_id"),
-                    "lg_number": self._last_referenced_lg.get("lg_number")
+                    "lg_id": last_referenced_lg.get("lg_id"),
+                    "lg_number": last_referenced_lg.get("lg_number")
                 }
             }
 
@@ -422,7 +432,74 @@ class AIQueryAssistantService:
             "parameters": {"query": q_raw}
         }
 
-    def execute_orm_query(
+    # ---------------- Compiled intent queries ----------------
+
+    @staticmethod
+    def _custody_rows(db: Session, scope: List[Any]):
+        """LG rows reduced to the columns answers render, lookups joined in SQL."""
+        return db.query(
+            LGRecord.id,
+            LGRecord.lg_number,
+            LGRecord.lg_amount,
+            LGRecord.expiry_date,
+            Currency.iso_code.label("currency_code"),
+            Bank.name.label("bank_name"),
+            LgStatus.name.label("status_name"),
+            CustomerEntity.entity_name.label("beneficiary_name"),
+        ).outerjoin(Currency, LGRecord.lg_currency_id == Currency.id
+        ).outerjoin(Bank, LGRecord.issuing_bank_id == Bank.id
+        ).outerjoin(LgStatus, LGRecord.lg_status_id == LgStatus.id
+        ).outerjoin(CustomerEntity, LGRecord.beneficiary_corporate_id == CustomerEntity.id
+        ).filter(*scope)
+
+    @staticmethod
+    def _count(q, column) -> int:
+        return q.with_entities(func.count(column)).order_by(None).scalar() or 0
+
+    @staticmethod
+    def _valid_sum_by(db: Session, scope: List[Any], name_column, *outer_joins):
+        """SUM(lg_amount) of VALID LGs grouped by (name_column, currency), largest first."""
+        amount = func.sum(LGRecord.lg_amount)
+        q = db.query(name_column, Currency.iso_code, amount).select_from(LGRecord)
+        for target, onclause in outer_joins:
+            q = q.outerjoin(target, onclause)
+        return q.outerjoin(Currency, LGRecord.lg_currency_id == Currency.id).join(
+            LgStatus, LGRecord.lg_status_id == LgStatus.id
+        ).filter(
+            *scope, func.upper(LgStatus.name) == "VALID"
+        ).group_by(name_column, Currency.iso_code).order_by(desc(amount)).limit(AGGREGATE_ROW_LIMIT).all()
+
+    @staticmethod
+    def _issuance_status_counts(issuance_base) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        rows = issuance_base.with_entities(IssuanceRequest.status, func.count(IssuanceRequest.id)).group_by(IssuanceRequest.status).all()
+        for st, n in rows:
+            key = str(st or "DRAFT").upper()
+            counts[key] = counts.get(key, 0) + n
+        return counts
+
+    def _instruction_counts(self, db: Session, customer_id: int) -> Dict[str, int]:
+        undelivered, awaiting_reply = db.query(
+            func.coalesce(func.sum(case((and_(LGInstruction.delivery_date == None, LGInstruction.bank_reply_date == None), 1), else_=0)), 0),
+            func.coalesce(func.sum(case((and_(LGInstruction.delivery_date != None, LGInstruction.bank_reply_date == None), 1), else_=0)), 0),
+        ).join(LGRecord, LGInstruction.lg_record_id == LGRecord.id).filter(
+            LGRecord.customer_id == customer_id,
+            LGInstruction.is_deleted == False
+        ).one()
+        return {"undelivered": int(undelivered or 0), "awaiting_reply": int(awaiting_reply or 0)}
+
+    def _facility_rows(self, facility_base, limit: int):
+        return facility_base.with_entities(
+            IssuanceFacility.id,
+            IssuanceFacility.total_limit_amount,
+            IssuanceFacility.status,
+            Bank.name.label("bank_name"),
+            Currency.iso_code.label("currency_code"),
+        ).outerjoin(Bank, IssuanceFacility.bank_id == Bank.id
+        ).outerjoin(Currency, IssuanceFacility.currency_id == Currency.id
+        ).order_by(IssuanceFacility.id).limit(limit).all()
+
+    def run_intent(
         self,
         db: Session,
         customer_id: int,
@@ -432,12 +509,32 @@ class AIQueryAssistantService:
         has_all_entity_access: bool = True,
         entity_ids: Optional[List[int]] = None
     ) -> Any:
-        self._current_query_params = params
+        """execute_orm_query behind the short-lived (customer, intent, params) cache."""
+        if intent not in CACHEABLE_INTENTS:
+            return self.execute_orm_query(db, customer_id, user_id, intent, params, has_all_entity_access, entity_ids)
+        key = assistant_result_cache.make_key(customer_id, intent, params, has_all_entity_access, entity_ids)
+        hit, result = assistant_result_cache.get(key)
+        if hit:
+            return result
+        result = self.execute_orm_query(db, customer_id, user_id, intent, params, has_all_entity_access, entity_ids)
+        assistant_result_cache.put(key, result)
+        return result
 
-        custody_base = db.query(LGRecord).filter(
+    def execute_orm_query(
+        self,
+        db: Session,
+        customer_id: int,
+        user_id: int,
+        intent: str,
+        params: Dict[str, Any],
+        has_all_entity_access: bool = True,
+        entity_ids: Optional[List[int]] = None
+    ) -> Any:
+        custody_scope = [
             LGRecord.customer_id == customer_id,
             LGRecord.is_deleted == False
-        )
+        ]
+        custody_base = db.query(LGRecord).filter(*custody_scope)
         issuance_base = db.query(IssuanceRequest).filter(
             IssuanceRequest.customer_id == customer_id,
             IssuanceRequest.is_deleted == False
@@ -448,9 +545,12 @@ class AIQueryAssistantService:
         )
 
         if not has_all_entity_access and entity_ids:
-            custody_base = custody_base.filter(LGRecord.entity_id.in_(entity_ids))
+            custody_scope.append(LGRecord.beneficiary_corporate_id.in_(entity_ids))
+            custody_base = custody_base.filter(LGRecord.beneficiary_corporate_id.in_(entity_ids))
             issuance_base = issuance_base.filter(IssuanceRequest.issuing_entity_id.in_(entity_ids))
 
+        valid_rows = lambda: self._custody_rows(db, custody_scope).filter(func.upper(LgStatus.name) == "VALID")
+
         if intent == "get_user_profile":
             user = db.query(User).filter(User.id == user_id).first()
             customer = db.query(Customer).filter(Customer.id == customer_id).first()
@@ -477,68 +577,75 @@ class AIQueryAssistantService:
             today = datetime.now(timezone.utc).date()
             target_date = today + timedelta(days=days)
 
-            q = custody_base.join(LGRecord.lg_status).filter(
-                func.upper(LgStatus.name) == "VALID",
+            q = valid_rows().filter(
                 LGRecord.expiry_date >= today,
                 LGRecord.expiry_date <= target_date
-            ).order_by(LGRecord.expiry_date.asc())
-            return q.options(joinedload(LGRecord.lg_currency), joinedload(LGRecord.issuing_bank)).all()
+            )
+            return {
+                "count": self._count(q, LGRecord.id),
+                "records": q.order_by(LGRecord.expiry_date.asc()).limit(LIST_ROW_LIMIT).all(),
+            }
 
         if intent == "get_lg_analytics_summary":
             currency_filter = params.get("currency")
             scope = params.get("scope", "unified")
 
-            valid_custody = custody_base.join(LGRecord.lg_status).filter(func.upper(LgStatus.name) == "VALID")
             if currency_filter:
-                valid_custody = valid_custody.join(LGRecord.lg_currency).filter(
-                    func.upper(Currency.iso_code) == currency_filter.upper()
-                )
-            custody_records = valid_custody.options(joinedload(LGRecord.lg_currency)).all()
-            issuance_requests = issuance_base.all()
-            facilities = facility_base.options(joinedload(IssuanceFacility.bank), joinedload(IssuanceFacility.currency)).all()
+                q = valid_rows().filter(func.upper(Currency.iso_code) == currency_filter.upper())
+                count, total = q.with_entities(
+                    func.count(LGRecord.id), func.coalesce(func.sum(LGRecord.lg_amount), 0)
+                ).order_by(None).one()
+                return {
+                    "currency_filter": currency_filter,
+                    "scope": scope,
+                    "custody_count": count or 0,
+                    "custody_total": float(total or 0),
+                    "records": q.order_by(LGRecord.id).limit(LIST_ROW_LIMIT).all(),
+                }
+
+            currency_totals: Dict[str, Tuple[int, float]] = {}
+            for code, n, amount in valid_rows().with_entities(
+                Currency.iso_code, func.count(LGRecord.id), func.coalesce(func.sum(LGRecord.lg_amount), 0)
+            ).group_by(Currency.iso_code).all():
+                code = code or "EGP"
+                prev_n, prev_amount = currency_totals.get(code, (0, 0.0))
+                currency_totals[code] = (prev_n + n, prev_amount + float(amount or 0))
 
             return {
-                "custody_records": custody_records,
-                "issuance_requests": issuance_requests,
-                "facilities": facilities,
-                "currency_filter": currency_filter,
-                "scope": scope
+                "currency_filter": None,
+                "scope": scope,
+                "custody_count": sum(n for n, _ in currency_totals.values()),
+                "currency_totals": {code: amount for code, (_, amount) in currency_totals.items()},
+                "issuance_status_counts": self._issuance_status_counts(issuance_base),
+                "facility_count": self._count(facility_base, IssuanceFacility.id),
             }
 
         if intent == "get_issuance_summary":
-            return issuance_base.order_by(desc(IssuanceRequest.created_at)).all()
+            return self._issuance_status_counts(issuance_base)
 
         if intent == "get_facility_analytics":
-            return facility_base.options(
-                joinedload(IssuanceFacility.bank),
-                joinedload(IssuanceFacility.currency)
-            ).all()
+            return {
+                "count": self._count(facility_base, IssuanceFacility.id),
+                "records": self._facility_rows(facility_base, 10),
+            }
 
         if intent == "get_daily_pulse":
             now_dt = datetime.utcnow()
             d14 = (now_dt + timedelta(days=14)).date()
-            expiring_14 = custody_base.join(LGRecord.lg_status).filter(
-                func.upper(LgStatus.name) == "VALID",
+            expiring_q = valid_rows().filter(
                 LGRecord.expiry_date != None,
                 func.date(LGRecord.expiry_date) <= d14,
                 func.date(LGRecord.expiry_date) >= now_dt.date()
-            ).options(joinedload(LGRecord.lg_currency), joinedload(LGRecord.issuing_bank)).all()
-
-            instructions = db.query(LGInstruction).filter(LGInstruction.is_deleted == False).all()
+            )
             pending_issuance = issuance_base.filter(
                 IssuanceRequest.status.in_(["PENDING_APPROVAL", "SUBMITTED", "PENDING"])
-            ).all()
-
-            facilities = facility_base.options(
-                joinedload(IssuanceFacility.bank),
-                joinedload(IssuanceFacility.currency)
-            ).all()
-
+            )
             return {
-                "expiring_14": expiring_14,
-                "instructions": instructions,
-                "pending_issuance": pending_issuance,
-                "facilities": facilities
+                "expiring_14_count": self._count(expiring_q, LGRecord.id),
+                "expiring_14": expiring_q.order_by(LGRecord.expiry_date.asc()).limit(3).all(),
+                "instruction_counts": self._instruction_counts(db, customer_id),
+                "pending_issuance_count": self._count(pending_issuance, IssuanceRequest.id),
+                "facility_count": self._count(facility_base, IssuanceFacility.id),
             }
 
         if intent == "report_feedback":
@@ -585,27 +692,30 @@ class AIQueryAssistantService:
             }
 
         if intent == "get_action_center_summary":
-            instructions = db.query(LGInstruction).join(LGRecord).filter(
-                LGRecord.customer_id == customer_id,
-                LGInstruction.is_deleted == False
-            ).all()
             pending_issuance = issuance_base.filter(
                 IssuanceRequest.status.in_(["PENDING_APPROVAL", "SUBMITTED", "PENDING"])
-            ).all()
+            )
             return {
-                "instructions": instructions,
-                "pending_issuance": pending_issuance
+                "instruction_counts": self._instruction_counts(db, customer_id),
+                "pending_issuance_count": self._count(pending_issuance, IssuanceRequest.id),
             }
 
-        if intent == "get_top_beneficiaries":
-            # Return both Inbound Custody entities + Outbound Issuance beneficiaries for unified intelligence
-            custody_records = custody_base.join(LGRecord.lg_status).filter(
-                func.upper(LgStatus.name) == "VALID"
-            ).options(
-                joinedload(LGRecord.beneficiary_corporate),
-                joinedload(LGRecord.lg_currency)
-            ).all()
+        if intent in ("get_top_beneficiaries", "get_top_issuers"):
+            inbound_issuers = db.query(
+                LGRecord.issuer_name,
+                Currency.iso_code,
+                func.sum(LGRecord.lg_amount)
+            ).join(Currency, LGRecord.lg_currency_id == Currency.id).join(LGRecord.lg_status).filter(
+                *custody_scope,
+                func.upper(LgStatus.name) == "VALID",
+                LGRecord.issuer_name != None
+            ).group_by(LGRecord.issuer_name, Currency.iso_code).order_by(
+                desc(func.sum(LGRecord.lg_amount))
+            ).limit(AGGREGATE_ROW_LIMIT).all()
+            if intent == "get_top_issuers":
+                return inbound_issuers
 
+            # Return both Inbound Custody entities + Outbound Issuance beneficiaries for unified intelligence
             outbound_records = db.query(
                 IssuanceRequest.beneficiary_name,
                 Currency.iso_code,
@@ -614,52 +724,30 @@ class AIQueryAssistantService:
                 IssuanceRequest.customer_id == customer_id,
                 IssuanceRequest.is_deleted == False,
                 IssuanceRequest.beneficiary_name != None
-            ).group_by(IssuanceRequest.beneficiary_name, Currency.iso_code).all()
-
-            inbound_issuers = db.query(
-                LGRecord.issuer_name,
-                Currency.iso_code,
-                func.sum(LGRecord.lg_amount)
-            ).join(Currency, LGRecord.lg_currency_id == Currency.id).join(LGRecord.lg_status).filter(
-                LGRecord.customer_id == customer_id,
-                LGRecord.is_deleted == False,
-                func.upper(LgStatus.name) == "VALID",
-                LGRecord.issuer_name != None
-            ).group_by(LGRecord.issuer_name, Currency.iso_code).all()
+            ).group_by(IssuanceRequest.beneficiary_name, Currency.iso_code).order_by(
+                desc(func.sum(IssuanceRequest.amount))
+            ).limit(AGGREGATE_ROW_LIMIT).all()
 
             return {
-                "custody_records": custody_records,
+                "custody_totals": self._valid_sum_by(
+                    db, custody_scope, CustomerEntity.entity_name,
+                    (CustomerEntity, LGRecord.beneficiary_corporate_id == CustomerEntity.id)
+                ),
                 "outbound_records": outbound_records,
                 "inbound_issuers": inbound_issuers
             }
 
-        if intent == "get_top_issuers":
-            return db.query(
-                LGRecord.issuer_name,
-                Currency.iso_code,
-                func.sum(LGRecord.lg_amount)
-            ).join(Currency, LGRecord.lg_currency_id == Currency.id).join(LGRecord.lg_status).filter(
-                LGRecord.customer_id == customer_id,
-                LGRecord.is_deleted == False,
-                func.upper(LgStatus.name) == "VALID",
-                LGRecord.issuer_name != None
-            ).group_by(LGRecord.issuer_name, Currency.iso_code).all()
-
         if intent == "get_entity_distribution":
-            return custody_base.join(LGRecord.lg_status).filter(
-                func.upper(LgStatus.name) == "VALID"
-            ).options(
-                joinedload(LGRecord.beneficiary_corporate),
-                joinedload(LGRecord.lg_currency)
-            ).all()
+            return self._valid_sum_by(
+                db, custody_scope, CustomerEntity.entity_name,
+                (CustomerEntity, LGRecord.beneficiary_corporate_id == CustomerEntity.id)
+            )
 
         if intent == "get_bank_exposure":
-            return custody_base.join(LGRecord.lg_status).filter(
-                func.upper(LgStatus.name) == "VALID"
-            ).options(
-                joinedload(LGRecord.issuing_bank),
-                joinedload(LGRecord.lg_currency)
-            ).all()
+            return self._valid_sum_by(
+                db, custody_scope, Bank.name,
+                (Bank, LGRecord.issuing_bank_id == Bank.id)
+            )
 
         if intent == "search_lgs":
             status_filter = params.get("status")
@@ -670,18 +758,17 @@ class AIQueryAssistantService:
             sort_by = params.get("sort_by")
             limit = params.get("limit")
 
-            q = custody_base
+            q = self._custody_rows(db, custody_scope)
             if status_filter:
-                st_upper = status_filter.upper()
-                q = q.join(LGRecord.lg_status).filter(func.upper(LgStatus.name) == st_upper)
+                q = q.filter(func.upper(LgStatus.name) == status_filter.upper())
             if currency_filter:
-                q = q.join(LGRecord.lg_currency).filter(func.upper(Currency.iso_code) == currency_filter.upper())
+                q = q.filter(func.upper(Currency.iso_code) == currency_filter.upper())
             if bank_filter:
-                q = q.join(LGRecord.issuing_bank).filter(Bank.name.ilike(f"%{bank_filter}%"))
+                q = q.filter(Bank.name.ilike(f"%{bank_filter}%"))
             if min_amount:
                 q = q.filter(LGRecord.lg_amount >= float(min_amount))
             if query_val:
-                q = q.outerjoin(LGRecord.beneficiary_corporate).filter(
+                q = q.filter(
                     or_(
                         CustomerEntity.entity_name.ilike(f"%{query_val}%"),
                         LGRecord.lg_number.ilike(f"%{query_val}%"),
@@ -694,15 +781,10 @@ class AIQueryAssistantService:
             elif sort_by == "date_desc":
                 q = q.order_by(desc(LGRecord.issuance_date), desc(LGRecord.id))
 
-            q = q.options(
-                joinedload(LGRecord.lg_currency),
-                joinedload(LGRecord.issuing_bank),
-                joinedload(LGRecord.lg_status),
-                joinedload(LGRecord.beneficiary_corporate)
-            )
-            if limit:
-                return q.limit(limit).all()
-            return q.all()
+            row_limit = min(int(limit), LIST_ROW_LIMIT) if limit else LIST_ROW_LIMIT
+            records = q.limit(row_limit).all()
+            count = len(records) if limit else self._count(q, LGRecord.id)
+            return {"count": count, "records": records}
 
         if intent == "get_lg_details":
             lg_id = params.get("lg_id")
@@ -720,9 +802,16 @@ class AIQueryAssistantService:
             ).first()
 
         if intent == "get_pending_approvals":
-            return issuance_base.filter(
+            pending = issuance_base.filter(
                 IssuanceRequest.status.in_(["PENDING_APPROVAL", "SUBMITTED", "PENDING"])
-            ).all()
+            )
+            return {
+                "count": self._count(pending, IssuanceRequest.id),
+                "records": pending.with_entities(
+                    IssuanceRequest.serial_number, IssuanceRequest.amount,
+                    IssuanceRequest.beneficiary_name, IssuanceRequest.status
+                ).order_by(desc(IssuanceRequest.created_at)).limit(10).all(),
+            }
 
         return []
 
@@ -733,8 +822,10 @@ class AIQueryAssistantService:
         user_id: int,
         intent: str,
         query_result: Any,
-        user_question: str
+        user_question: str,
+        context: Optional[AssistantQueryContext] = None
     ) -> Tuple[str, List[Dict[str, Any]], List[Dict[str, str]]]:
+        query_params = context.params if context else {}
         user = db.query(User).filter(User.id == user_id).first()
         role_code = str(user.role.value if hasattr(user.role, "value") else (user.role.name if hasattr(user.role, "name") else str(user.role))).upper() if (user and user.role) else "END_USER"
         nav_base = "/corporate-admin" if role_code == "CORPORATE_ADMIN" else ("/system-owner" if role_code == "SYSTEM_OWNER" else "/end-user")
@@ -783,17 +874,18 @@ class AIQueryAssistantService:
             return "\n".join(lines), references, suggested_chips
 
         if intent == "find_expiring_lgs":
-            records = query_result or []
+            data = query_result or {}
+            records = data.get("records") or []
             if not records:
                 return "No active guarantees found matching that expiry timeframe.", [], [
                     {"label": "📅 Expiring in 120 Days", "query": "lgs expiring within 120 days"},
                     {"label": "📊 All Active LGs", "query": "show active LGs"}
                 ]
 
-            lines = [f"Found **{len(records)} guarantee(s)** expiring in the specified timeframe:\n"]
+            lines = [f"Found **{data.get('count', len(records))} guarantee(s)** expiring in the specified timeframe:\n"]
             for r in records[:15]:
-                curr_code = r.lg_currency.iso_code if r.lg_currency else "EGP"
-                bank_name = r.issuing_bank.name if r.issuing_bank else "N/A"
+                curr_code = r.currency_code or "EGP"
+                bank_name = r.bank_name or "N/A"
                 exp_str = r.expiry_date.strftime("%Y-%m-%d") if r.expiry_date else "N/A"
                 amt_str = f"{float(r.lg_amount):,.2f}" if r.lg_amount else "0.00"
                 lines.append(f"- **{r.lg_number}**: {amt_str} {curr_code} (Bank: *{bank_name}*, Expiry: *{exp_str}*)")
@@ -814,20 +906,19 @@ class AIQueryAssistantService:
             return "\n".join(lines), references, suggested_chips
 
         if intent == "get_lg_analytics_summary":
-            custody_records = query_result.get("custody_records", [])
-            issuance_requests = query_result.get("issuance_requests", [])
-            facilities = query_result.get("facilities", [])
+            custody_count = query_result.get("custody_count", 0)
             curr_filter = query_result.get("currency_filter")
 
             if curr_filter:
-                total_amt = sum(float(r.lg_amount or 0.0) for r in custody_records)
-                avg_amt = total_amt / len(custody_records) if custody_records else 0.0
+                custody_records = query_result.get("records", [])
+                total_amt = query_result.get("custody_total", 0.0)
+                avg_amt = total_amt / custody_count if custody_count else 0.0
                 answer = (
                     f"**{curr_filter.upper()} Portfolio Exposure**:\n\n"
                     f"- **Total Amount**: **{total_amt:,.2f} {curr_filter.upper()}**\n"
-                    f"- **Active Guarantees**: **{len(custody_records)} LG(s)**\n"
+                    f"- **Active Guarantees**: **{custody_count} LG(s)**\n"
                     f"- **Average Value**: **{avg_amt:,.2f} {curr_filter.upper()}**\n"
-                    f"- **Portfolio Share**: **{round(len(custody_records)/max(len(custody_records), 1)*100, 1)}%** of active portfolio\n\n"
+                    f"- **Portfolio Share**: **{round(custody_count/max(custody_count, 1)*100, 1)}%** of active portfolio\n\n"
                     f"👉 [View {curr_filter.upper()} Guarantees in Custody]({nav_base}/lg-records)"
                 )
                 for r in custody_records[:15]:
@@ -845,27 +936,26 @@ class AIQueryAssistantService:
                 ]
                 return answer, references, suggested_chips
 
-            currency_totals: Dict[str, float] = {}
-            for r in custody_records:
-                c_code = r.lg_currency.iso_code if r.lg_currency else "EGP"
-                currency_totals[c_code] = currency_totals.get(c_code, 0.0) + float(r.lg_amount or 0.0)
+            currency_totals: Dict[str, float] = query_result.get("currency_totals", {})
+            issuance_counts: Dict[str, int] = query_result.get("issuance_status_counts", {})
+            facility_count = query_result.get("facility_count", 0)
 
             curr_lines = [f"- **{c}**: {amt:,.2f}" for c, amt in currency_totals.items()]
-            pending_issuance_cnt = sum(1 for req in issuance_requests if str(req.status).upper() in ["PENDING_APPROVAL", "SUBMITTED", "PENDING"])
-            issued_cnt = sum(1 for req in issuance_requests if str(req.status).upper() in ["ISSUED", "COMPLETED"])
+            pending_issuance_cnt = sum(issuance_counts.get(st, 0) for st in ["PENDING_APPROVAL", "SUBMITTED", "PENDING"])
+            issued_cnt = sum(issuance_counts.get(st, 0) for st in ["ISSUED", "COMPLETED"])
 
-            is_position_query = self._current_query_params.get("scope") == "position_overview" or "position" in getattr(self, "_current_user_question", "").lower()
+            is_position_query = query_params.get("scope") == "position_overview" or "position" in (context.user_question if context else "").lower()
             header_title = "📊 **Consolidated Letter of Guarantee Position**:" if is_position_query else "📊 **Corporate Guarantee Portfolio Overview**:"
 
             answer = (
                 f"{header_title}\n\n"
                 f"🛡️ **LG Custody (Inbound Guarantees Held)**:\n"
-                f"- **{len(custody_records)} Active Guarantees** in custody\n"
+                f"- **{custody_count} Active Guarantees** in custody\n"
                 f"- **Total Exposure by Currency**:\n" + "\n".join(curr_lines) + "\n"
                 f"👉 [Open LG Custody Vault]({nav_base}/lg-records)\n\n"
                 f"📤 **LG Issuance (Outbound Guarantees Issued)**:\n"
-                f"- **{len(issuance_requests)} Total Outbound Requests** ({issued_cnt} Issued, {pending_issuance_cnt} Pending Approval)\n"
-                f"- **{len(facilities)} Active Bank Facilities** connected\n"
+                f"- **{sum(issuance_counts.values())} Total Outbound Requests** ({issued_cnt} Issued, {pending_issuance_cnt} Pending Approval)\n"
+                f"- **{facility_count} Active Bank Facilities** connected\n"
                 f"👉 [Open LG Issuance Dashboard]({nav_base}/issuance/requests)"
             )
 
@@ -878,20 +968,16 @@ class AIQueryAssistantService:
             return answer, references, suggested_chips
 
         if intent == "get_issuance_summary":
-            requests = query_result or []
-            if not requests:
+            status_counts: Dict[str, int] = query_result or {}
+            total_requests = sum(status_counts.values())
+            if not total_requests:
                 return "No issuance requests found for your organization.", [], [
                     {"label": "✍️ Record New Issuance Request", "query": "how do i request an lg"},
                     {"label": "🛡️ View Custody LGs", "query": "show custody LGs"}
                 ]
 
-            status_counts: Dict[str, int] = {}
-            for req in requests:
-                st = str(req.status or "DRAFT").upper()
-                status_counts[st] = status_counts.get(st, 0) + 1
-
             lines = [
-                f"📤 **LG Issuance Pipeline ({len(requests)} Total Requests)**:\n",
+                f"📤 **LG Issuance Pipeline ({total_requests} Total Requests)**:\n",
                 f"- **Draft**: {status_counts.get('DRAFT', 0)} requests",
                 f"- **Pending Approval**: {status_counts.get('PENDING_APPROVAL', 0) + status_counts.get('PENDING', 0) + status_counts.get('SUBMITTED', 0)} requests",
                 f"- **Approved / Ready for Issuance**: {status_counts.get('APPROVED', 0)} requests",
@@ -907,14 +993,15 @@ class AIQueryAssistantService:
             return "\n".join(lines), references, suggested_chips
 
         if intent == "get_facility_analytics":
-            facilities = query_result or []
+            data = query_result or {}
+            facilities = data.get("records") or []
             if not facilities:
                 return "No active bank credit facilities found.", [], []
 
-            lines = [f"🏛️ **Bank Credit Facilities & Available Headroom ({len(facilities)} Facilities)**:\n"]
+            lines = [f"🏛️ **Bank Credit Facilities & Available Headroom ({data.get('count', len(facilities))} Facilities)**:\n"]
             for f in facilities[:10]:
-                b_name = f.bank.name if f.bank else "Bank"
-                c_code = f.currency.iso_code if f.currency else "EGP"
+                b_name = f.bank_name or "Bank"
+                c_code = f.currency_code or "EGP"
                 limit_val = float(f.total_limit_amount or 0.0)
                 lines.append(f"- **{b_name}**: Limit: **{limit_val:,.2f} {c_code}** (Status: *{f.status or 'Active'}*)")
 
@@ -929,44 +1016,45 @@ class AIQueryAssistantService:
         if intent == "get_daily_pulse":
             data = query_result or {}
             expiring_14 = data.get("expiring_14") or []
-            instructions = data.get("instructions") or []
-            pending_issuance = data.get("pending_issuance") or []
-            facilities = data.get("facilities") or []
+            expiring_14_count = data.get("expiring_14_count", len(expiring_14))
+            instruction_counts = data.get("instruction_counts") or {}
+            pending_issuance_count = data.get("pending_issuance_count", 0)
+            facility_count = data.get("facility_count", 0)
 
-            undelivered = sum(1 for i in instructions if i.delivery_date is None and i.bank_reply_date is None)
-            awaiting_reply = sum(1 for i in instructions if i.delivery_date is not None and i.bank_reply_date is None)
+            undelivered = instruction_counts.get("undelivered", 0)
+            awaiting_reply = instruction_counts.get("awaiting_reply", 0)
 
-            has_urgent = (len(expiring_14) > 0 or awaiting_reply > 0 or undelivered > 0 or len(pending_issuance) > 0)
+            has_urgent = (expiring_14_count > 0 or awaiting_reply > 0 or undelivered > 0 or pending_issuance_count > 0)
 
             lines = ["☀️ **Daily Treasury Pulse & Morning Briefing**:\n"]
             if has_urgent:
                 if expiring_14:
-                    lines.append(f"⚠️ **{len(expiring_14)} Guarantee(s) Expiring within 14 Days**")
+                    lines.append(f"⚠️ **{expiring_14_count} Guarantee(s) Expiring within 14 Days**")
                     for lg in expiring_14[:3]:
-                        curr = lg.lg_currency.iso_code if lg.lg_currency else "EGP"
+                        curr = lg.currency_code or "EGP"
                         exp_str = lg.expiry_date.strftime("%Y-%m-%d") if lg.expiry_date else "N/A"
                         lines.append(f"  - `{lg.lg_number}`: **{lg.lg_amount:,.2f} {curr}** (Expires: *{exp_str}*)")
                     lines.append("")
 
-                if awaiting_reply > 0 or undelivered > 0 or len(pending_issuance) > 0:
+                if awaiting_reply > 0 or undelivered > 0 or pending_issuance_count > 0:
                     lines.append("⚡ **Action Items Requiring Attention**:")
                     if awaiting_reply > 0:
                         lines.append(f"  - **{awaiting_reply}** instruction(s) awaiting bank reply")
                     if undelivered > 0:
                         lines.append(f"  - **{undelivered}** physical letter(s) pending bank delivery")
-                    if len(pending_issuance) > 0:
-                        lines.append(f"  - **{len(pending_issuance)}** issuance request(s) awaiting approval")
+                    if pending_issuance_count > 0:
+                        lines.append(f"  - **{pending_issuance_count}** issuance request(s) awaiting approval")
                     lines.append("")
 
-                if facilities:
-                    lines.append(f"🏛️ **{len(facilities)} Active Bank Credit Facilities Available**")
+                if facility_count:
+                    lines.append(f"🏛️ **{facility_count} Active Bank Credit Facilities Available**")
             else:
                 lines.append("🟢 **All Systems Operational & Healthy**:")
                 lines.append("- ✅ **0** Guarantees expiring in the next 14 days")
                 lines.append("- ✅ **All** bank instructions delivered and replies up to date")
                 lines.append("- ✅ **0** Pending approvals blocking the issuance pipeline")
-                if facilities:
-                    lines.append(f"- 🏛️ **{len(facilities)}** Active bank facilities ready with ample headroom")
+                if facility_count:
+                    lines.append(f"- 🏛️ **{facility_count}** Active bank facilities ready with ample headroom")
 
             lines.append(f"\n👉 [Open Action Center]({nav_base}/action-center) | [View Portfolio]({nav_base}/lg-records)")
 
@@ -1019,17 +1107,17 @@ class AIQueryAssistantService:
             return answer, references, suggested_chips
 
         if intent == "get_action_center_summary":
-            instructions = query_result.get("instructions", [])
-            pending_issuance = query_result.get("pending_issuance", [])
+            instruction_counts = query_result.get("instruction_counts", {})
+            pending_issuance_count = query_result.get("pending_issuance_count", 0)
 
-            undelivered = sum(1 for i in instructions if i.delivery_date is None and i.bank_reply_date is None)
-            awaiting_reply = sum(1 for i in instructions if i.delivery_date is not None and i.bank_reply_date is None)
+            undelivered = instruction_counts.get("undelivered", 0)
+            awaiting_reply = instruction_counts.get("awaiting_reply", 0)
 
             lines = [
                 f"⚡ **Operational Action Center Summary**:\n",
                 f"- **Instructions Awaiting Bank Reply**: **{awaiting_reply}** item(s)",
                 f"- **Undelivered Physical Instructions**: **{undelivered}** item(s)",
-                f"- **Issuance Requests Awaiting Approval**: **{len(pending_issuance)}** item(s)\n",
+                f"- **Issuance Requests Awaiting Approval**: **{pending_issuance_count}** item(s)\n",
                 f"👉 [Open Action Center]({nav_base}/action-center)"
             ]
             suggested_chips = [
@@ -1040,7 +1128,7 @@ class AIQueryAssistantService:
             return "\n".join(lines), references, suggested_chips
 
         if intent == "get_top_beneficiaries":
-            data = query_result if isinstance(query_result, dict) else {"custody_records": query_result or [], "outbound_records": [], "inbound_issuers": []}
+            data = query_result if isinstance(query_result, dict) else {"custody_totals": query_result or [], "outbound_records": [], "inbound_issuers": []}
             lines = ["🏢 **Beneficiary & Counterparty Intelligence (Bi-Module Analysis)**:\n"]
 
             # 1. Outbound Issuance (External Beneficiaries)
@@ -1063,12 +1151,12 @@ class AIQueryAssistantService:
                 lines.append("")
 
             # 2. Inbound Custody (Internal Subsidiaries)
-            custody_recs = data.get("custody_records") or []
+            custody_totals = data.get("custody_totals") or []
             custody_map: Dict[str, Dict[str, float]] = {}
-            for r in custody_recs:
-                b_name = r.beneficiary_corporate.entity_name if (r.beneficiary_corporate and hasattr(r.beneficiary_corporate, "entity_name") and r.beneficiary_corporate.entity_name) else "Unassigned Entity"
-                curr = r.lg_currency.iso_code if (r.lg_currency and r.lg_currency.iso_code) else "EGP"
-                amt = float(r.lg_amount or 0.0)
+            for name, curr, amt in custody_totals:
+                b_name = name or "Unassigned Entity"
+                curr = curr or "EGP"
+                amt = float(amt or 0.0)
                 if b_name not in custody_map:
                     custody_map[b_name] = {}
                 custody_map[b_name][curr] = custody_map[b_name].get(curr, 0.0) + amt
@@ -1144,10 +1232,10 @@ class AIQueryAssistantService:
                 return "No active guarantee records found across subsidiaries.", [], []
 
             entity_map: Dict[str, Dict[str, float]] = {}
-            for r in records:
-                b_name = r.beneficiary_corporate.entity_name if (r.beneficiary_corporate and hasattr(r.beneficiary_corporate, "entity_name") and r.beneficiary_corporate.entity_name) else "Unassigned Entity"
-                curr = r.lg_currency.iso_code if (r.lg_currency and r.lg_currency.iso_code) else "EGP"
-                amt = float(r.lg_amount or 0.0)
+            for name, curr, amt in records:
+                b_name = name or "Unassigned Entity"
+                curr = curr or "EGP"
+                amt = float(amt or 0.0)
                 if b_name not in entity_map:
                     entity_map[b_name] = {}
                 entity_map[b_name][curr] = entity_map[b_name].get(curr, 0.0) + amt
@@ -1171,12 +1259,12 @@ class AIQueryAssistantService:
                 return "No active guarantee records found to compute bank exposure.", [], []
 
             bank_map: Dict[str, Dict[str, float]] = {}
-            for r in records:
-                b_name = r.issuing_bank.name if r.issuing_bank else "Unknown Bank"
-                c_code = r.lg_currency.iso_code if r.lg_currency else "EGP"
+            for name, curr, amt in records:
+                b_name = name or "Unknown Bank"
+                c_code = curr or "EGP"
                 if b_name not in bank_map:
                     bank_map[b_name] = {}
-                bank_map[b_name][c_code] = bank_map[b_name].get(c_code, 0.0) + float(r.lg_amount or 0.0)
+                bank_map[b_name][c_code] = bank_map[b_name].get(c_code, 0.0) + float(amt or 0.0)
 
             sorted_banks = sorted(bank_map.items(), key=lambda item: sum(item[1].values()), reverse=True)[:5]
 
@@ -1194,19 +1282,20 @@ class AIQueryAssistantService:
             return "\n".join(lines), references, suggested_chips
 
         if intent == "search_lgs":
-            records = query_result or []
+            data = query_result or {}
+            records = data.get("records") or []
             if not records:
                 return "No records matching your search criteria.", [], [
                     {"label": "📊 View All Active LGs", "query": "show active LGs"},
                     {"label": "📤 View Issuance Pipeline", "query": "show issuance pipeline"}
                 ]
 
-            if self._current_query_params.get("sort_by") == "amount_desc":
+            if query_params.get("sort_by") == "amount_desc":
                 lines = [f"🏆 **Highest Value Guarantees in Portfolio (Ranked by Amount)**:\n"]
                 for idx, r in enumerate(records[:10], 1):
-                    curr_code = r.lg_currency.iso_code if r.lg_currency else "EGP"
-                    bank_name = r.issuing_bank.name if r.issuing_bank else "N/A"
-                    st_name = r.lg_status.name if (r.lg_status and hasattr(r.lg_status, 'name')) else "Valid"
+                    curr_code = r.currency_code or "EGP"
+                    bank_name = r.bank_name or "N/A"
+                    st_name = r.status_name or "Valid"
                     amt_str = f"{float(r.lg_amount):,.2f}" if r.lg_amount else "0.00"
                     lines.append(f"{idx}. **{r.lg_number}**: **{amt_str} {curr_code}** (Bank: *{bank_name}*, Status: *{st_name}*)")
                     references.append({
@@ -1224,10 +1313,10 @@ class AIQueryAssistantService:
                 ]
                 return "\n".join(lines), references, suggested_chips
 
-            lines = [f"Found **{len(records)} record(s)** matching your query:\n"]
+            lines = [f"Found **{data.get('count', len(records))} record(s)** matching your query:\n"]
             for r in records[:15]:
-                curr_code = r.lg_currency.iso_code if r.lg_currency else "EGP"
-                st_name = r.lg_status.name if r.lg_status else "Valid"
+                curr_code = r.currency_code or "EGP"
+                st_name = r.status_name or "Valid"
                 exp_str = r.expiry_date.strftime("%Y-%m-%d") if r.expiry_date else "N/A"
                 amt_str = f"{float(r.lg_amount):,.2f}" if r.lg_amount else "0.00"
                 lines.append(f"- **{r.lg_number}**: {amt_str} {curr_code} (Status: *{st_name}*, Expiry: *{exp_str}*)")
@@ -1249,7 +1338,8 @@ class AIQueryAssistantService:
             r = query_result
             if not r:
                 return "Guarantee record not found.", [], []
-            self._last_referenced_lg = {"lg_id": r.id, "lg_number": r.lg_number}
+            if context is not None:
+                context.last_referenced_lg = {"lg_id": r.id, "lg_number": r.lg_number}
 
             curr_code = r.lg_currency.iso_code if r.lg_currency else "EGP"
             b_name = r.issuing_bank.name if r.issuing_bank else "N/A"
@@ -1282,13 +1372,14 @@ class AIQueryAssistantService:
             return answer, references, suggested_chips
 
         if intent == "get_pending_approvals":
-            requests = query_result or []
+            data = query_result or {}
+            requests = data.get("records") or []
             if not requests:
                 return "You have **0 pending approvals** in your queue.", [], [
                     {"label": "📤 View Issuance Pipeline", "query": "show issuance pipeline"},
                     {"label": "🛡️ View Custody LGs", "query": "show custody LGs"}
                 ]
-            lines = [f"⏳ **Pending Approvals ({len(requests)} Request(s))**:\n"]
+            lines = [f"⏳ **Pending Approvals ({data.get('count', len(requests))} Request(s))**:\n"]
             for req in requests[:10]:
                 lines.append(f"- **{req.serial_number or 'REQ'}**: {float(req.amount or 0.0):,.2f} (Beneficiary: *{req.beneficiary_name or 'N/A'}*, Status: *{req.status}*)")
             lines.append(f"\n👉 [Review Approvals in Action Center]({nav_base}/action-center)")
@@ -1300,6 +1391,11 @@ class AIQueryAssistantService:
 
         return str(query_result), references, []
 
+    @staticmethod
+    def _remember_context(context: AssistantQueryContext) -> None:
+        if context.last_referenced_lg:
+            conversation_store.remember_lg(context.customer_id, context.user_id, context.last_referenced_lg)
+
     def handle_system_help(self, user_question: str, user_role: str, user_email: str) -> str:
         q_lower = user_question.lower()
         role_label = user_role.replace("_", " ").title()
@@ -1390,6 +1486,12 @@ class AIQueryAssistantService:
             user = db.query(User).filter(User.id == user_id).first()
             user_role = str(user.role.value if hasattr(user.role, "value") else (user.role.name if hasattr(user.role, "name") else str(user.role))).upper() if (user and user.role) else "END_USER"
             user_email = user.email if user else "user@example.com"
+            context = AssistantQueryContext(
+                customer_id=customer_id,
+                user_id=user_id,
+                user_question=user_question,
+                last_referenced_lg=conversation_store.get_last_lg(customer_id, user_id)
+            )
 
             # LEVEL 0: Card ID Resolution
             if card_id:
@@ -1421,12 +1523,14 @@ class AIQueryAssistantService:
                         "intent": "system_help"
                     }
 
-                query_result = self.execute_orm_query(
+                context.params = params
+                query_result = self.run_intent(
                     db, customer_id, user_id, intent, params, has_all_entity_access, entity_ids
                 )
                 answer, references, suggested_chips = self.format_application_response(
-                    db, customer_id, user_id, intent, query_result, user_question
+                    db, customer_id, user_id, intent, query_result, user_question, context
                 )
+                self._remember_context(context)
                 return {
                     "success": True,
                     "answer": answer,
@@ -1439,12 +1543,13 @@ class AIQueryAssistantService:
 
             # LEVEL 4 / 3 / 1 / 2: Natural Language Query Pipeline
             logger.info(f"AI Assistant NL query: user_id={user_id}, customer_id={customer_id}, q='{user_question[:60]}'")
-            classification = self.classify_and_interpret(user_question)
+            classification = self.classify_and_interpret(user_question, context)
             suggested_level = classification.get("suggested_level", 1)
             intent = classification.get("intent", "search_lgs")
             params = classification.get("parameters", {})
 
             is_valid_op, valid_params = policy_guardrail.validate_intent(intent, params)
+            context.params = valid_params
             if intent == "capability_gap":
                 return {
                     "success": True,
@@ -1509,12 +1614,13 @@ class AIQueryAssistantService:
                 }
 
             if suggested_level in (0, 1):
-                query_result = self.execute_orm_query(
+                query_result = self.run_intent(
                     db, customer_id, user_id, intent, valid_params, has_all_entity_access, entity_ids
                 )
                 answer, references, suggested_chips = self.format_application_response(
-                    db, customer_id, user_id, intent, query_result, user_question
+                    db, customer_id, user_id, intent, query_result, user_question, context
                 )
+                self._remember_context(context)
                 return {
                     "success": True,
                     "answer": answer,
@@ -1527,14 +1633,14 @@ class AIQueryAssistantService:
                 }
 
             try:
-                from app.core.ai_integration import _get_genai_client
-                client = _get_genai_client()
-                if client:
-                    tok_recs, tok_ben, tok_fac, token_map = privacy_tokenizer.tokenize_complex_payload([], {}, [])
-                    sanitized_q = privacy_tokenizer.sanitize_user_question(user_question)
-                    response = client.models.generate_content(
-                        model="gemini-2.5-flash",
-                        contents=f"You are Grow Treasury Assistant. Answer concisely in corporate treasury context: {sanitized_q}"
+                from app.core.ai_gateway import ai_gateway
+                if ai_gateway.available():
+                    vocabulary = privacy_tokenizer.vocabulary(customer_id)
+                    tok_recs, tok_ben, tok_fac, token_map = privacy_tokenizer.tokenize_complex_payload([], {}, [], vocabulary=vocabulary)
+                    sanitized_q, _question_tokens = privacy_tokenizer.sanitize_user_question(user_question, vocabulary=vocabulary)
+                    response = ai_gateway.generate_sync(
+                        f"You are Grow Treasury Assistant. Answer concisely in corporate treasury context: {sanitized_q}",
+                        call_type="treasury_assistant", customer_id=customer_id,
                     )
                     raw_text = response.text or ""
                     final_answer = privacy_tokenizer.detokenize_response(raw_text, token_map)
@@ -1553,12 +1659,13 @@ class AIQueryAssistantService:
             except Exception as genai_err:
                 logger.warning(f"GenAI call failed, falling back to Level 1 ORM: {genai_err}")
 
-            query_result = self.execute_orm_query(
+            query_result = self.run_intent(
                 db, customer_id, user_id, intent, valid_params, has_all_entity_access, entity_ids
             )
             answer, references, suggested_chips = self.format_application_response(
-                db, customer_id, user_id, intent, query_result, user_question
+                db, customer_id, user_id, intent, query_result, user_question, context
             )
+            self._remember_context(context)
             return {
                 "success": True,
                 "answer": answer,
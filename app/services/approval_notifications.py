@@ -0,0 +1,605 @@
+# app/services/approval_notifications.py
+"""
+Maker-checker approval e-mails, assembled and sent off the request path.
+
+Creating or approving an approval request used to look up the checkers and
+admins, load the e-mail settings and template, build the message and wait
+for SMTP inside the request, once per request, so bulk actions sent bursts
+of near-identical e-mails and the API call paid for every one of them.
+
+Now the CRUD code only adds an ApprovalNotificationOutbox row (kind, approval
+request id) in its own transaction: a committed request keeps its e-mail even
+if the process dies before sending, and rolled-back work sends nothing. The
+commit wakes the dispatcher, which waits WINDOW_SECONDS so that a burst is
+handled together (and otherwise polls every POLL_SECONDS, which also picks up
+rows left by other or crashed workers). Then it:
+- claims the PENDING rows with FOR UPDATE SKIP LOCKED (one worker per row;
+  PROCESSING rows older than STALE_CLAIM_SECONDS are claimed again);
+- loads the queued requests in one query;
+- resolves recipients from the cached approver directory
+  (workflow_policy_engine: active users by role, per customer);
+- loads settings and templates once per customer;
+- coalesces per recipient. A recipient with one request gets the usual
+  template e-mail; one with several gets a single digest. Recipients with
+  the same set of requests share one message;
+- sends concurrently, writes the NOTIFICATION_SENT / NOTIFICATION_FAILED
+  audit rows and marks the outbox rows SENT. A failed dispatch puts its rows
+  back to PENDING (FAILED after MAX_ATTEMPTS).
+
+The dispatcher runs on the app's event loop (started with the other
+schedulers in app.main); the database work (claiming, assembly, audit) runs
+in worker threads so it never blocks the loop. Processes that never start it
+get a daemon thread on first commit.
+"""
+
+import asyncio
+import decimal
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, selectinload
+
+import app.models as models
+from app.constants import ACTION_TYPE_APPROVAL_REQUEST_PENDING, GlobalConfigKey
+from app.core.change_tracking import change_tracker
+from app.core.email_service import get_customer_email_settings, get_global_email_settings, send_email
+from app.database import SessionLocal
+from app.models.models_notification import ApprovalNotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+KIND_PENDING_APPROVAL = "pending_approval"
+KIND_READY_FOR_PRINT = "ready_for_print"
+
+TEMPLATE_ACTION_TYPES = {
+    KIND_PENDING_APPROVAL: ACTION_TYPE_APPROVAL_REQUEST_PENDING,
+    KIND_READY_FOR_PRINT: "APPROVAL_READY_FOR_PRINT",
+}
+PENDING_APPROVAL_ROLES = ("corporate_admin", "checker")
+
+WINDOW_SECONDS = float(os.getenv("APPROVAL_NOTIFICATION_WINDOW_SECONDS", "10"))
+SEND_CONCURRENCY = int(os.getenv("APPROVAL_NOTIFICATION_SEND_CONCURRENCY", "5"))
+POLL_SECONDS = float(os.getenv("APPROVAL_NOTIFICATION_POLL_SECONDS", "30"))
+CLAIM_BATCH_SIZE = 200
+MAX_ATTEMPTS = 5
+STALE_CLAIM_SECONDS = 600      # PROCESSING rows older than this are reclaimed (worker died mid-dispatch)
+
+_CHANGE_CONSUMER = "approval_notifications"
+
+Notification = Tuple[str, int]
+
+
+def queue_approval_notification(db: Session, kind: str, approval_request_id: int) -> None:
+    """Adds the notification to the outbox in db's transaction; sent after it commits."""
+    db.add(ApprovalNotificationOutbox(kind=kind, approval_request_id=approval_request_id))
+    change_tracker.pending(db, _CHANGE_CONSUMER).append((kind, approval_request_id))
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _fill(text: str, data: Dict[str, Any]) -> str:
+    for key, value in data.items():
+        text = text.replace(f"{{{{{key}}}}}", str(value) if value is not None else "")
+    return text
+
+
+def _amount_formatted(currency: str, amount: Any) -> Any:
+    return f"{currency} {amount:,.2f}" if isinstance(amount, (float, int, decimal.Decimal)) else amount
+
+
+def _lg_record_id(approval_request: models.ApprovalRequest) -> Optional[int]:
+    return approval_request.entity_id if approval_request.entity_type == "LGRecord" else None
+
+
+# ==============================================================================
+# 1. MESSAGE CONTENT
+# ==============================================================================
+
+def pending_approval_data(approval_request: models.ApprovalRequest) -> Dict[str, Any]:
+    """Template values of a 'pending approval' alert (checkers and admins)."""
+    maker = approval_request.maker_user
+    maker_email = maker.email if maker else None
+    lg_record = approval_request.lg_record
+    lg_currency = lg_record.lg_currency.iso_code if lg_record and lg_record.lg_currency else "N/A"
+    lg_amount = float(lg_record.lg_amount) if lg_record and lg_record.lg_amount is not None else "N/A"
+    data = {
+        "maker_email": maker_email if maker_email else "N/A",
+        "maker_name": maker_email.split('@')[0] if maker_email else "N/A",
+        "approval_request_id": approval_request.id,
+        "action_type": approval_request.action_type.replace('_', ' ').title(),
+        "entity_type": approval_request.entity_type,
+        "lg_number": lg_record.lg_number if lg_record else f"Owner Contact ID: {approval_request.entity_id}",
+        "lg_amount": lg_amount,
+        "lg_currency_code": lg_currency,
+        "current_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "platform_name": "Treasury Management Platform",
+        "action_center_link": "/checker/action-center",
+    }
+    data["lg_amount_formatted"] = _amount_formatted(lg_currency, lg_amount)
+    return data
+
+
+def ready_for_print_data(approval_request: models.ApprovalRequest) -> Dict[str, Any]:
+    """Template values of an 'approved, ready for processing' notice (the maker)."""
+    lg_record = approval_request.lg_record
+    instruction = approval_request.related_instruction
+    maker_email = approval_request.maker_user.email
+    data = {
+        "maker_email": maker_email,
+        "maker_name": maker_email.split('@')[0],
+        "checker_email": approval_request.checker_user.email if approval_request.checker_user else "N/A",
+        "approval_request_id": approval_request.id,
+        "action_type": approval_request.action_type.replace('_', ' ').title(),
+        "lg_number": lg_record.lg_number,
+        "lg_amount": float(lg_record.lg_amount),
+        "lg_currency_code": lg_record.lg_currency.iso_code,
+        "instruction_serial_number": instruction.serial_number,
+        "current_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "platform_name": "Treasury Management Platform",
+        "print_link": f"/api/v1/end-user/lg-records/instructions/{instruction.id}/view-letter?print=true",
+        "action_center_link": "/end-user/action-center",
+    }
+    data["lg_amount_formatted"] = _amount_formatted(data["lg_currency_code"], data["lg_amount"])
+    return data
+
+
+DEFAULT_SUBJECTS = {
+    KIND_PENDING_APPROVAL: "ACTION REQUIRED: Approval Pending for {{action_type}} on {{lg_number}}",
+    KIND_READY_FOR_PRINT: "Approved: Action on LG #{{lg_number}} - Ready for Processing",
+}
+DIGEST_TITLES = {
+    KIND_PENDING_APPROVAL: "ACTION REQUIRED: {count} approval requests pending",
+    KIND_READY_FOR_PRINT: "Approved: {count} LG actions ready for processing",
+}
+DIGEST_INTROS = {
+    KIND_PENDING_APPROVAL: "The following requests were submitted and are waiting for your approval.",
+    KIND_READY_FOR_PRINT: "The following requests were approved; their instructions are ready to be printed and processed.",
+}
+
+
+def build_digest_html(kind: str, customer_name: str, items: Sequence[Dict[str, Any]]) -> str:
+    """One e-mail listing several requests of the same kind (rows: template values)."""
+    from app.services.unified_email_builder import build_standard_email_html
+
+    rows = []
+    for idx, data in enumerate(items):
+        bg_color = "#ffffff" if idx % 2 == 0 else "#f8fafc"
+        reference = data.get("instruction_serial_number") or data.get("maker_email", "")
+        rows.append(f"""
+        <tr style="background-color: {bg_color}; border-bottom: 1px solid #e2e8f0;">
+            <td style="padding: 10px 12px; font-size: 13px; font-weight: 600; color: #0f172a;">#{data['approval_request_id']}</td>
+            <td style="padding: 10px 12px; font-size: 13px; color: #334155;">{data['action_type']}</td>
+            <td style="padding: 10px 12px; font-size: 13px; color: #334155;">{data['lg_number']}</td>
+            <td style="padding: 10px 12px; font-size: 13px; color: #0f172a; text-align: right;">{data['lg_amount_formatted']}</td>
+            <td style="padding: 10px 12px; font-size: 13px; color: #334155;">{reference}</td>
+        </tr>""")
+    reference_header = "Instruction" if kind == KIND_READY_FOR_PRINT else "Maker"
+    content_html = f"""
+    <p style="margin: 0 0 16px 0; font-size: 14px; color: #334155;">{DIGEST_INTROS[kind]}</p>
+    <table style="width: 100%; border-collapse: collapse; border: 1px solid #e2e8f0;">
+        <tr style="background-color: #f1f5f9;">
+            <th style="padding: 10px 12px; font-size: 12px; text-align: left; color: #475569;">Request</th>
+            <th style="padding: 10px 12px; font-size: 12px; text-align: left; color: #475569;">Action</th>
+            <th style="padding: 10px 12px; font-size: 12px; text-align: left; color: #475569;">LG</th>
+            <th style="padding: 10px 12px; font-size: 12px; text-align: right; color: #475569;">Amount</th>
+            <th style="padding: 10px 12px; font-size: 12px; text-align: left; color: #475569;">{reference_header}</th>
+        </tr>
+        {''.join(rows)}
+    </table>"""
+    return build_standard_email_html(
+        customer_name=customer_name,
+        title=DIGEST_TITLES[kind].format(count=len(items)),
+        content_html=content_html,
+        cta_text="Open Action Center",
+        cta_url=f"{os.getenv('FRONTEND_URL', 'http://localhost:3000')}{items[0]['action_center_link']}",
+    )
+
+
+# ==============================================================================
+# 2. DISPATCHER
+# ==============================================================================
+
+class _Message:
+    """One e-mail to send: its recipients and the approval requests it covers."""
+
+    __slots__ = ("kind", "customer_id", "to_emails", "cc_emails", "requests", "subject", "body")
+
+    def __init__(self, kind: str, customer_id: int, to_emails: List[str], cc_emails: List[str],
+                 requests: List[models.ApprovalRequest]):
+        self.kind = kind
+        self.customer_id = customer_id
+        self.to_emails = to_emails
+        self.cc_emails = cc_emails
+        self.requests = requests
+        self.subject = ""
+        self.body = ""
+
+
+class ApprovalNotificationDispatcher:
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal, window_seconds: float = WINDOW_SECONDS,
+                 poll_seconds: float = POLL_SECONDS):
+        self.session_factory = session_factory
+        self.window_seconds = window_seconds
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake_event: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.failed = 0
+
+    # ---------------- Lifecycle ----------------
+
+    def start(self) -> None:
+        """Starts the dispatch loop on the running event loop."""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake_event = asyncio.Event()
+        self._task = self._loop.create_task(self.run_forever())
+        logger.info("Approval notification dispatcher started.")
+
+    async def stop(self) -> None:
+        """Stops the loop and sends what is still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._loop = None
+        await self.flush()
+
+    def _start_in_thread(self) -> None:
+        started = threading.Event()
+
+        async def main():
+            self.start()
+            started.set()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        threading.Thread(target=asyncio.run, args=(main(),), daemon=True, name="approval-notifications").start()
+        started.wait(timeout=5)
+
+    # ---------------- Queue ----------------
+
+    def wake(self) -> None:
+        """Thread-safe: new outbox rows were committed; dispatch after the coalescing window."""
+        with self._lock:
+            if self._loop is None:
+                self._start_in_thread()
+        if self._loop is not None and self._wake_event is not None:
+            self._loop.call_soon_threadsafe(self._wake_event.set)
+
+    async def run_forever(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake_event.wait(), timeout=self.poll_seconds)
+                # Coalescing window: everything committed until it ends goes out together
+                await asyncio.sleep(self.window_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake_event.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Approval notification dispatch failed: {e}", exc_info=True)
+
+    async def flush(self) -> int:
+        """Sends every PENDING outbox row now; returns the number of e-mails sent."""
+        sent = 0
+        while True:
+            outbox_ids, notifications = await asyncio.to_thread(self._claim)
+            if not outbox_ids:
+                return sent
+            db = self.session_factory()
+            try:
+                messages = await asyncio.to_thread(self._assemble, db, notifications)
+                results = await self._deliver(messages)
+                sent += await asyncio.to_thread(self._record, db, outbox_ids, notifications, messages, results)
+            except Exception as e:
+                await asyncio.to_thread(db.rollback)
+                await asyncio.to_thread(self._release, outbox_ids, e)
+                raise
+            finally:
+                db.close()
+            if len(outbox_ids) < CLAIM_BATCH_SIZE:
+                return sent
+
+    # ---------------- Outbox ----------------
+
+    def _claim(self) -> Tuple[List[int], List[Notification]]:
+        """Marks a batch of due outbox rows PROCESSING (own transaction); returns their ids and contents."""
+        now = _utcnow()
+        stale_before = now - timedelta(seconds=STALE_CLAIM_SECONDS)
+        db = self.session_factory()
+        try:
+            rows = db.query(ApprovalNotificationOutbox).filter(
+                or_(
+                    ApprovalNotificationOutbox.status == "PENDING",
+                    and_(ApprovalNotificationOutbox.status == "PROCESSING", ApprovalNotificationOutbox.claimed_at < stale_before),
+                )
+            ).order_by(ApprovalNotificationOutbox.id).limit(CLAIM_BATCH_SIZE).with_for_update(skip_locked=True).all()
+            for row in rows:
+                row.status = "PROCESSING"
+                row.claimed_at = now
+                row.attempts = (row.attempts or 0) + 1
+            claimed = [row.id for row in rows], [(row.kind, row.approval_request_id) for row in rows]
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def _release(self, outbox_ids: List[int], error: Exception) -> None:
+        """After a failed dispatch: the rows go back to PENDING, or FAILED once out of attempts."""
+        db = self.session_factory()
+        try:
+            for row in db.query(ApprovalNotificationOutbox).filter(ApprovalNotificationOutbox.id.in_(outbox_ids)):
+                row.status = "FAILED" if (row.attempts or 0) >= MAX_ATTEMPTS else "PENDING"
+                row.claimed_at = None
+                row.last_error = str(error)[:1000]
+            db.commit()
+        finally:
+            db.close()
+
+    # ---------------- Assembly ----------------
+
+    def _assemble(self, db: Session, notifications: List[Notification]) -> List[Tuple[_Message, Tuple[Any, str]]]:
+        """The e-mails to send for these notifications, rendered, with each customer's e-mail settings."""
+        kinds_by_id: Dict[int, List[str]] = {}
+        for kind, request_id in notifications:
+            if kind not in kinds_by_id.setdefault(request_id, []):
+                kinds_by_id[request_id].append(kind)
+
+        requests = db.query(models.ApprovalRequest).options(
+            selectinload(models.ApprovalRequest.maker_user),
+            selectinload(models.ApprovalRequest.checker_user),
+            selectinload(models.ApprovalRequest.customer),
+            selectinload(models.ApprovalRequest.lg_record).selectinload(models.LGRecord.lg_currency),
+            selectinload(models.ApprovalRequest.related_instruction),
+        ).filter(models.ApprovalRequest.id.in_(list(kinds_by_id))).order_by(models.ApprovalRequest.id).all()
+
+        by_customer: Dict[int, Dict[str, List[models.ApprovalRequest]]] = {}
+        for approval_request in requests:
+            for kind in kinds_by_id[approval_request.id]:
+                by_customer.setdefault(approval_request.customer_id, {}).setdefault(kind, []).append(approval_request)
+
+        templates: Dict[str, Optional[models.Template]] = {}
+        messages: List[Tuple[_Message, Tuple[Any, str]]] = []
+        for customer_id, kinds in by_customer.items():
+            settings = self._email_settings(db, customer_id)
+            for kind, kind_requests in kinds.items():
+                if kind not in templates:
+                    templates[kind] = db.query(models.Template).filter(
+                        models.Template.action_type == TEMPLATE_ACTION_TYPES[kind],
+                        models.Template.is_notification_template == True,
+                        models.Template.is_deleted == False,
+                        models.Template.is_global == True,
+                    ).first()
+                if kind == KIND_PENDING_APPROVAL:
+                    kind_messages = self._pending_messages(db, customer_id, kind_requests)
+                else:
+                    kind_messages = self._ready_for_print_messages(db, customer_id, kind_requests)
+                if not kind_messages:
+                    continue
+                if templates[kind] is None:
+                    self._template_missing(db, kind, kind_messages)
+                    continue
+                for message in kind_messages:
+                    self._render(message, templates[kind])
+                    messages.append((message, settings))
+        return messages
+
+    async def _deliver(self, messages: List[Tuple[_Message, Tuple[Any, str]]]) -> List[Tuple[bool, Optional[str]]]:
+        semaphore = asyncio.Semaphore(SEND_CONCURRENCY)
+
+        async def deliver(message: _Message, settings: Tuple[Any, str]):
+            async with semaphore:
+                try:
+                    ok, error = await send_email(
+                        db=None,
+                        to_emails=message.to_emails,
+                        cc_emails=message.cc_emails,
+                        subject_template=message.subject,
+                        body_template=message.body,
+                        template_data={},
+                        email_settings=settings[0],
+                    )
+                except Exception as e:
+                    ok, error = False, str(e)
+                return ok, error
+
+        return list(await asyncio.gather(*(deliver(message, settings) for message, settings in messages)))
+
+    def _record(self, db: Session, outbox_ids: List[int], notifications: List[Notification],
+                messages: List[Tuple[_Message, Tuple[Any, str]]], results: List[Tuple[bool, Optional[str]]]) -> int:
+        """Writes the audit rows and marks the outbox rows SENT, in one transaction."""
+        sent = 0
+        for (message, settings), (ok, error) in zip(messages, results):
+            self._log_outcome(db, message, settings[1], ok, error)
+            sent += 1 if ok else 0
+        db.query(ApprovalNotificationOutbox).filter(ApprovalNotificationOutbox.id.in_(outbox_ids)).update(
+            {"status": "SENT", "processed_at": _utcnow(), "last_error": None}, synchronize_session=False
+        )
+        db.commit()
+        self.sent += sent
+        self.failed += len(messages) - sent
+        logger.info(f"Approval notifications: {len(notifications)} queued -> {len(messages)} e-mails ({sent} sent).")
+        return sent
+
+    def _email_settings(self, db: Session, customer_id: int) -> Tuple[Any, str]:
+        try:
+            return get_customer_email_settings(db, customer_id)
+        except Exception as e:
+            logger.warning(f"Failed to retrieve customer-specific email settings for customer ID {customer_id}: {e}. Falling back to global settings.")
+            return get_global_email_settings(), "global_fallback_due_to_error"
+
+    def _pending_messages(self, db: Session, customer_id: int,
+                          requests: List[models.ApprovalRequest]) -> List[_Message]:
+        """Checkers and admins of the customer (except each request's maker), grouped by identical request sets."""
+        from app.services.workflow_policy_engine import workflow_policy_engine
+
+        directory = workflow_policy_engine.get_directory(db, customer_id)
+        recipient_ids = set()
+        for role in PENDING_APPROVAL_ROLES:
+            recipient_ids.update(directory.role_members.get(role, ()))
+        recipients = sorted({directory.email(uid) for uid in recipient_ids if directory.email(uid)})
+
+        per_recipient: Dict[str, List[models.ApprovalRequest]] = {}
+        for approval_request in requests:
+            maker_email = approval_request.maker_user.email if approval_request.maker_user else None
+            to_emails = [email for email in recipients if email != maker_email]
+            if not to_emails:
+                logger.warning(f"No valid recipients found for pending approval request ID {approval_request.id}. Skipping email.")
+                continue
+            for email in to_emails:
+                per_recipient.setdefault(email, []).append(approval_request)
+        return self._group_by_request_set(KIND_PENDING_APPROVAL, customer_id, per_recipient, [])
+
+    def _ready_for_print_messages(self, db: Session, customer_id: int,
+                                  requests: List[models.ApprovalRequest]) -> List[_Message]:
+        """One message per maker, copying the customer's common communication list."""
+        per_recipient: Dict[str, List[models.ApprovalRequest]] = {}
+        for approval_request in requests:
+            if not approval_request.maker_user:
+                reason, recipient = "Maker user missing for approval for processing notification", "N/A"
+            elif not approval_request.related_instruction or not approval_request.lg_record:
+                reason, recipient = "Related instruction or LG Record missing for approval for processing notification", approval_request.maker_user.email
+            else:
+                per_recipient.setdefault(approval_request.maker_user.email, []).append(approval_request)
+                continue
+            logger.error(f"Cannot send 'Approval for Processing' notification for AR {approval_request.id}: {reason}.")
+            self._log_failure(db, approval_request, {"reason": reason, "recipient": recipient})
+        if not per_recipient:
+            return []
+        return self._group_by_request_set(KIND_READY_FOR_PRINT, customer_id, per_recipient,
+                                          self._common_communication_list(db, customer_id))
+
+    @staticmethod
+    def _group_by_request_set(kind: str, customer_id: int, per_recipient: Dict[str, List[models.ApprovalRequest]],
+                              cc_emails: List[str]) -> List[_Message]:
+        groups: Dict[Tuple[int, ...], _Message] = {}
+        for email, recipient_requests in per_recipient.items():
+            key = tuple(r.id for r in recipient_requests)
+            message = groups.get(key)
+            if message is None:
+                groups[key] = _Message(kind, customer_id, [email], cc_emails, recipient_requests)
+            else:
+                message.to_emails.append(email)
+        return list(groups.values())
+
+    @staticmethod
+    def _common_communication_list(db: Session, customer_id: int) -> List[str]:
+        from app.crud.crud import crud_customer_configuration
+
+        config = crud_customer_configuration.get_customer_config_or_global_fallback(
+            db, customer_id, GlobalConfigKey.COMMON_COMMUNICATION_LIST
+        )
+        if not config or not config.get('effective_value'):
+            return []
+        try:
+            parsed = json.loads(config['effective_value'])
+        except json.JSONDecodeError:
+            logger.warning(f"COMMON_COMMUNICATION_LIST for customer {customer_id} is not a valid JSON list of emails. Skipping.")
+            return []
+        if isinstance(parsed, list) and all(isinstance(e, str) and "@" in e for e in parsed):
+            return sorted(set(parsed))
+        return []
+
+    @staticmethod
+    def _render(message: _Message, template: models.Template) -> None:
+        data_for = pending_approval_data if message.kind == KIND_PENDING_APPROVAL else ready_for_print_data
+        items = [data_for(approval_request) for approval_request in message.requests]
+        if len(items) == 1:
+            message.subject = _fill(template.subject or DEFAULT_SUBJECTS[message.kind], items[0])
+            message.body = _fill(template.content, items[0])
+            return
+        customer = message.requests[0].customer
+        message.subject = DIGEST_TITLES[message.kind].format(count=len(items))
+        message.body = build_digest_html(message.kind, customer.name if customer else "Grow Treasury", items)
+
+    # ---------------- Audit ----------------
+
+    @staticmethod
+    def _notifying_user(approval_request: models.ApprovalRequest, kind: str) -> Optional[int]:
+        return approval_request.maker_user_id if kind == KIND_PENDING_APPROVAL else approval_request.checker_user_id
+
+    def _log_failure(self, db: Session, approval_request: models.ApprovalRequest, details: Dict[str, Any],
+                     kind: str = KIND_READY_FOR_PRINT) -> None:
+        from app.crud.crud import log_action
+
+        log_action(
+            db,
+            user_id=self._notifying_user(approval_request, kind),
+            action_type="NOTIFICATION_FAILED",
+            entity_type="ApprovalRequest",
+            entity_id=approval_request.id,
+            details=details,
+            customer_id=approval_request.customer_id,
+            lg_record_id=_lg_record_id(approval_request),
+        )
+
+    def _template_missing(self, db: Session, kind: str, messages: List[_Message]) -> None:
+        action_type = TEMPLATE_ACTION_TYPES[kind]
+        logger.error(f"Email notification template for '{action_type}' not found. Cannot send {kind} notifications.")
+        if kind != KIND_READY_FOR_PRINT:
+            return
+        for message in messages:
+            for approval_request in message.requests:
+                self._log_failure(db, approval_request, {
+                    "reason": f"'{action_type}' template missing for approval for processing notification",
+                    "recipient": message.to_emails,
+                })
+
+    def _log_outcome(self, db: Session, message: _Message, method: str, ok: bool, error: Optional[str]) -> None:
+        from app.crud.crud import log_action
+
+        notification_type = "Pending Approval Alert" if message.kind == KIND_PENDING_APPROVAL else "Approval For Processing"
+        for approval_request in message.requests:
+            details = {
+                "recipient": message.to_emails,
+                "subject": message.subject,
+                "method": method,
+                "notification_type": notification_type,
+                "digest_size": len(message.requests),
+            }
+            if message.cc_emails:
+                details["cc_recipients"] = message.cc_emails
+            if not ok:
+                details["reason"] = f"Email service failed to send notification: {error}" if error else "Email service failed to send notification"
+            log_action(
+                db,
+                user_id=self._notifying_user(approval_request, message.kind),
+                action_type="NOTIFICATION_SENT" if ok else "NOTIFICATION_FAILED",
+                entity_type="ApprovalRequest",
+                entity_id=approval_request.id,
+                details=details,
+                customer_id=approval_request.customer_id,
+                lg_record_id=_lg_record_id(approval_request),
+            )
+
+
+approval_notification_dispatcher = ApprovalNotificationDispatcher()
+
+
+# ==============================================================================
+# 3. CHANGE TRACKING: wake the dispatcher once queued notifications are committed
+# ==============================================================================
+
+def _wake_dispatcher_after_commit(session: Session, notifications: List[Notification]):
+    approval_notification_dispatcher.wake()
+
+
+change_tracker.register(_CHANGE_CONSUMER, apply=_wake_dispatcher_after_commit, factory=list)
@@ -0,0 +1,478 @@
+# app/services/bulk_renewal_service.py
+"""
+Bulk auto / forced LG renewal in resumable batches.
+
+The run used to call extend_lg for every eligible LG in one transaction
+(each call also rendering a PDF that was thrown away), then concatenate all
+letters into one HTML document and render it as a single WeasyPrint PDF,
+returned base64 in the JSON response. Hundreds of LGs meant minutes of
+rendering and the whole document's layout in memory, and one failed LG
+rolled back the ones extended before it while they were still reported.
+
+Now:
+- create_batch() selects the eligible LGs in one query and stores them as
+  BulkRenewalBatchItem rows with their target expiry dates.
+- run() extends the pending items chunk by chunk, one transaction and one
+  commit per chunk. Each LG is extended in a savepoint together with marking
+  its item RENEWED (with the instruction id), so a failed LG only rolls back
+  its own savepoint and running the batch again never extends a RENEWED item
+  twice. extend_lg itself still runs per LG (instruction serials, audit
+  logs and e-mails are per LG); what is batched is the transaction.
+  Notification e-mails of a chunk go out concurrently after its commit.
+- Each chunk's letters render on a bounded thread pool into the letter
+  artifact store (app/core/letter_artifacts.py) while the next chunk is
+  extended; those artifacts are the same ones the instruction view serves.
+- iter_letters_zip() streams the letters as a ZIP with one PDF per LG,
+  loading (or rendering) them chunk by chunk, so only one chunk of letters
+  is in memory at a time. Only small batches (INLINE_PDF_MAX_LETTERS) get
+  one merged PDF, inline in the run response.
+"""
+
+import asyncio
+import io
+import logging
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from dateutil.relativedelta import relativedelta
+from fastapi import BackgroundTasks, HTTPException, status
+from sqlalchemy import and_, func, insert, or_, update
+from sqlalchemy.orm import Session
+
+import app.models as models
+from app.constants import AUDIT_ACTION_TYPE_LG_BULK_REMINDER_INITIATED, GlobalConfigKey
+from app.core.letter_artifacts import LetterArtifact, letter_artifact_store
+from app.models.models_renewal import BulkRenewalBatch, BulkRenewalBatchItem
+from app.services.letter_artifact_service import KIND_LG_INSTRUCTION, letter_artifact_service
+
+logger = logging.getLogger(__name__)
+
+BATCH_PENDING = "PENDING"
+BATCH_RUNNING = "RUNNING"
+BATCH_COMPLETED = "COMPLETED"
+BATCH_PARTIAL = "PARTIAL"
+
+ITEM_PENDING = "PENDING"
+ITEM_RENEWED = "RENEWED"
+ITEM_FAILED = "FAILED"
+
+RENEWAL_TYPE_AUTO = "AUTO"
+RENEWAL_TYPE_FORCED = "FORCED"
+
+CHUNK_SIZE = int(os.getenv("BULK_RENEWAL_CHUNK_SIZE", "25"))
+RENDER_WORKERS = int(os.getenv("BULK_RENEWAL_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+EMAIL_CONCURRENCY = int(os.getenv("BULK_RENEWAL_EMAIL_CONCURRENCY", "5"))
+STALE_RUN_SECONDS = int(os.getenv("BULK_RENEWAL_STALE_RUN_SECONDS", "900"))  # RUNNING batches older than this may be resumed
+INLINE_PDF_MAX_LETTERS = int(os.getenv("BULK_RENEWAL_INLINE_PDF_MAX_LETTERS", "20"))
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _detached_template(template) -> SimpleNamespace:
+    """The template fields a render needs, safe to read from a worker thread."""
+    return SimpleNamespace(id=template.id, content=template.content,
+                           created_at=template.created_at, updated_at=template.updated_at)
+
+
+def _letter_filename(position: int, lg_number: str) -> str:
+    return f"{position:04d}_{re.sub(r'[^A-Za-z0-9._-]+', '_', lg_number or 'lg')}.pdf"
+
+
+class _ZipStream(io.RawIOBase):
+    """Unseekable ZipFile target whose written bytes are drained chunk by chunk."""
+
+    def __init__(self):
+        super().__init__()
+        self._parts: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class BulkRenewalService:
+
+    # ---------------- Batch preparation ----------------
+
+    def renewal_thresholds(self, db: Session, customer_id: int) -> Tuple[int, int]:
+        """(auto renewal days, forced renewal days) before expiry for the customer."""
+        from app.crud.crud import crud_customer_configuration
+
+        try:
+            auto_config = crud_customer_configuration.get_customer_config_or_global_fallback(
+                db, customer_id, GlobalConfigKey.AUTO_RENEWAL_DAYS_BEFORE_EXPIRY
+            )
+            force_config = crud_customer_configuration.get_customer_config_or_global_fallback(
+                db, customer_id, GlobalConfigKey.FORCED_RENEW_DAYS_BEFORE_EXPIRY
+            )
+            auto_days = int(auto_config.get('effective_value', 30)) if auto_config else 30
+            force_days = int(force_config.get('effective_value', 60)) if force_config else 60
+        except (ValueError, AttributeError, TypeError) as e:
+            logger.error(f"Error retrieving or parsing renewal configuration for customer {customer_id}: {e}", exc_info=True)
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve renewal configurations.")
+
+        if auto_days <= 0 or force_days <= 0:
+            logger.error(f"Invalid auto/force renewal days configuration for customer {customer_id}.")
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Renewal configuration invalid. Please contact support.")
+        return auto_days, force_days
+
+    def create_batch(self, db: Session, customer_id: int, user_id: int) -> BulkRenewalBatch:
+        """
+        Records a batch with one item per eligible LG: valid auto-renewal LGs
+        expiring within the auto renewal window, and the other valid LGs
+        expiring within the forced renewal window. Committed.
+        """
+        auto_days, force_days = self.renewal_thresholds(db, customer_id)
+        today = date.today()
+        lg = models.LGRecord
+        rows = db.query(
+            lg.id, lg.lg_number, lg.expiry_date, lg.lg_period_months, lg.auto_renewal
+        ).filter(
+            lg.customer_id == customer_id,
+            lg.is_deleted == False,
+            lg.lg_status_id == models.LgStatusEnum.VALID.value,
+            lg.expiry_date >= today,
+            or_(
+                and_(lg.auto_renewal == True, lg.expiry_date <= today + timedelta(days=auto_days)),
+                and_(lg.auto_renewal == False, lg.expiry_date <= today + timedelta(days=force_days)),
+            ),
+        ).order_by(lg.auto_renewal.desc(), lg.expiry_date, lg.id).all()
+
+        batch = BulkRenewalBatch(
+            customer_id=customer_id, user_id=user_id, status=BATCH_PENDING if rows else BATCH_COMPLETED,
+            auto_renewal_days=auto_days, force_renewal_days=force_days, total_count=len(rows),
+            finished_at=None if rows else _utcnow(),
+        )
+        db.add(batch)
+        db.flush()
+        if rows:
+            db.execute(insert(BulkRenewalBatchItem), [
+                {
+                    "batch_id": batch.id,
+                    "lg_record_id": lg_id,
+                    "lg_number": lg_number,
+                    "renewal_type": RENEWAL_TYPE_AUTO if auto_renewal else RENEWAL_TYPE_FORCED,
+                    "old_expiry_date": expiry.date(),
+                    "new_expiry_date": (expiry + relativedelta(months=period_months)).date(),
+                    "status": ITEM_PENDING,
+                    "attempts": 0,
+                }
+                for lg_id, lg_number, expiry, period_months, auto_renewal in rows
+            ])
+        db.commit()
+        logger.info(f"Bulk renewal batch {batch.id} created for customer {customer_id}: {len(rows)} eligible LGs "
+                    f"(auto {auto_days} days, forced {force_days} days).")
+        return batch
+
+    def get_batch(self, db: Session, batch_id: int, customer_id: int) -> Optional[BulkRenewalBatch]:
+        return db.query(BulkRenewalBatch).filter(
+            BulkRenewalBatch.id == batch_id,
+            BulkRenewalBatch.customer_id == customer_id,
+            BulkRenewalBatch.is_deleted == False,
+        ).first()
+
+    def pending_count(self, db: Session, batch: BulkRenewalBatch) -> int:
+        return db.query(func.count(BulkRenewalBatchItem.id)).filter(
+            BulkRenewalBatchItem.batch_id == batch.id, BulkRenewalBatchItem.status == ITEM_PENDING
+        ).scalar() or 0
+
+    # ---------------- Run ----------------
+
+    def _claim(self, db: Session, batch: BulkRenewalBatch) -> bool:
+        """Marks the batch RUNNING unless another run holds it (committed)."""
+        now = _utcnow()
+        table = BulkRenewalBatch.__table__
+        result = db.execute(
+            update(table).where(
+                table.c.id == batch.id,
+                or_(table.c.status != BATCH_RUNNING, table.c.claimed_at.is_(None),
+                    table.c.claimed_at < now - timedelta(seconds=STALE_RUN_SECONDS)),
+            ).values(status=BATCH_RUNNING, claimed_at=now, finished_at=None)
+        )
+        db.commit()
+        return result.rowcount == 1
+
+    async def run(self, db: Session, batch: BulkRenewalBatch, user_id: int) -> BulkRenewalBatch:
+        """
+        Extends every item of the batch that is not RENEWED yet and renders the
+        letters. Items that fail are marked FAILED and retried by the next run.
+        """
+        if not self._claim(db, batch):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Renewal batch {batch.id} is already running.")
+
+        batch_id = batch.id
+        rendering: List[asyncio.Future] = []
+        try:
+            with letter_artifact_service.prerender_suppressed(db):
+                last_item_id = 0
+                while True:
+                    items = db.query(BulkRenewalBatchItem).filter(
+                        BulkRenewalBatchItem.batch_id == batch_id,
+                        BulkRenewalBatchItem.status != ITEM_RENEWED,
+                        BulkRenewalBatchItem.id > last_item_id,
+                    ).order_by(BulkRenewalBatchItem.id).limit(CHUNK_SIZE).all()
+                    if not items:
+                        break
+                    last_item_id = items[-1].id
+
+                    instruction_ids, notifications = await self._renew_chunk(db, [item.id for item in items], user_id)
+
+                    # This chunk's letters render on the pool while the next chunk is extended
+                    previous, rendering = rendering, self._start_renders(db, instruction_ids)
+                    await self._send_notifications(notifications)
+                    await asyncio.gather(*previous)
+                await asyncio.gather(*rendering)
+        finally:
+            self._finish(db, batch_id, user_id)
+        db.refresh(batch)
+        return batch
+
+    async def _renew_chunk(self, db: Session, item_ids: List[int], user_id: int) -> Tuple[List[int], List[Any]]:
+        """
+        Extends the LGs of these items in one transaction, each in a savepoint,
+        and commits once. Returns the new instruction ids and the queued
+        notification e-mails. A failure that rolled back the whole transaction
+        (extend_lg rolls the session back on some errors) marks that item
+        FAILED on its own and extends the rest of the chunk again.
+        """
+        from app.crud.crud import crud_lg_record
+
+        pending = list(item_ids)
+        while True:
+            instruction_ids: List[int] = []
+            notifications: List[Any] = []
+            for item_id in pending:
+                item = db.get(BulkRenewalBatchItem, item_id)
+                lg_record_id, lg_number = item.lg_record_id, item.lg_number
+                attempts = (item.attempts or 0) + 1
+                tasks = BackgroundTasks()
+                savepoint = db.begin_nested()
+                try:
+                    updated_lg, instruction_id, _ = await crud_lg_record.extend_lg(
+                        db, lg_record_id, item.new_expiry_date, user_id,
+                        background_tasks=tasks, render_letter=False,
+                    )
+                    savepoint.commit()
+                except Exception as e:
+                    detail = e.detail if isinstance(e, HTTPException) else str(e)
+                    logger.error(f"Skipping LG {lg_number} (ID: {lg_record_id}) in bulk renewal: {detail}", exc_info=not isinstance(e, HTTPException))
+                    if db.in_nested_transaction():
+                        savepoint.rollback()
+                        self._mark_item(db.get(BulkRenewalBatchItem, item_id), ITEM_FAILED, attempts, error=detail)
+                        continue
+                    # The chunk's earlier extensions were rolled back with it
+                    self._mark_item(db.get(BulkRenewalBatchItem, item_id), ITEM_FAILED, attempts, error=detail)
+                    db.commit()
+                    pending.remove(item_id)
+                    break
+
+                self._mark_item(item, ITEM_RENEWED, attempts, instruction_id=instruction_id)
+                instruction_ids.append(instruction_id)
+                notifications.extend(tasks.tasks)
+                logger.info(f"Renewed LG {lg_number} (ID: {lg_record_id}) to {updated_lg.expiry_date.date()}. Instruction ID: {instruction_id}.")
+            else:
+                db.commit()
+                return instruction_ids, notifications
+
+    @staticmethod
+    def _mark_item(item: BulkRenewalBatchItem, item_status: str, attempts: int,
+                   instruction_id: Optional[int] = None, error: Any = None) -> None:
+        item.status = item_status
+        item.instruction_id = instruction_id
+        item.error = str(error)[:2000] if error is not None else None
+        item.attempts = attempts
+        item.processed_at = _utcnow()
+
+    async def _send_notifications(self, tasks: List[Any]) -> None:
+        """Runs the chunk's queued notification e-mails, EMAIL_CONCURRENCY at a time."""
+        if not tasks:
+            return
+        semaphore = asyncio.Semaphore(EMAIL_CONCURRENCY)
+
+        async def send(task):
+            async with semaphore:
+                try:
+                    await task()
+                except Exception as e:
+                    logger.warning(f"Bulk renewal notification failed: {e}", exc_info=True)
+
+        await asyncio.gather(*(send(task) for task in tasks))
+
+    def _finish(self, db: Session, batch_id: int, user_id: int) -> None:
+        """Stores the batch outcome counts and status and logs the run (committed)."""
+        try:
+            db.rollback()
+            counts = dict(db.query(BulkRenewalBatchItem.status, func.count(BulkRenewalBatchItem.id)).filter(
+                BulkRenewalBatchItem.batch_id == batch_id
+            ).group_by(BulkRenewalBatchItem.status).all())
+            batch = db.query(BulkRenewalBatch).filter(BulkRenewalBatch.id == batch_id).one()
+            batch.renewed_count = counts.get(ITEM_RENEWED, 0)
+            batch.failed_count = counts.get(ITEM_FAILED, 0)
+            batch.status = BATCH_COMPLETED if batch.renewed_count == batch.total_count else BATCH_PARTIAL
+            batch.claimed_at = None
+            batch.finished_at = _utcnow()
+
+            from app.crud.crud import log_action
+
+            log_action(
+                db,
+                user_id=user_id,
+                action_type=AUDIT_ACTION_TYPE_LG_BULK_REMINDER_INITIATED,  # Reused for bulk renewal
+                entity_type="Customer",
+                entity_id=batch.customer_id,
+                details={
+                    "action": "Bulk LG Renewal (Auto & Forced)",
+                    "batch_id": batch.id,
+                    "batch_status": batch.status,
+                    "renewed_lg_count": batch.renewed_count,
+                    "failed_lg_count": batch.failed_count,
+                    "pending_lg_count": counts.get(ITEM_PENDING, 0),
+                    "auto_renewal_threshold_days": batch.auto_renewal_days,
+                    "force_renewal_threshold_days": batch.force_renewal_days,
+                    "triggered_by_user": user_id,
+                },
+                customer_id=batch.customer_id,
+                lg_record_id=None,
+            )
+            db.commit()
+            logger.info(f"Bulk renewal batch {batch.id} {batch.status}: {batch.renewed_count}/{batch.total_count} renewed, "
+                        f"{batch.failed_count} failed.")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Could not record the outcome of bulk renewal batch {batch_id}: {e}", exc_info=True)
+
+    # ---------------- Letters ----------------
+
+    def _start_renders(self, db: Session, instruction_ids: List[int]) -> List[asyncio.Future]:
+        """
+        Queues the letters of these instructions on the render pool, in order
+        (artifact store hits return without rendering). Letter contexts are
+        resolved here, on the caller's session.
+        """
+        if not instruction_ids:
+            return []
+        loop = asyncio.get_running_loop()
+        executor = _render_executor()
+        instructions = letter_artifact_service.load_instructions(db, instruction_ids)
+        futures = []
+        for instruction_id in instruction_ids:
+            db_instruction = instructions.get(instruction_id)
+            context = letter_artifact_service.instruction_letter_context(db, db_instruction) if db_instruction else None
+            if context is None:
+                logger.warning(f"No letter context for instruction {instruction_id}; left out of the bulk renewal letters.")
+                continue
+            template, data = context
+            futures.append(loop.run_in_executor(
+                executor, letter_artifact_store.get_or_render, KIND_LG_INSTRUCTION, instruction_id,
+                _detached_template(template), data, f"lg_instruction_{db_instruction.serial_number}",
+            ))
+        return futures
+
+    def letter_count(self, db: Session, batch: BulkRenewalBatch) -> int:
+        return db.query(func.count(BulkRenewalBatchItem.id)).filter(
+            BulkRenewalBatchItem.batch_id == batch.id,
+            BulkRenewalBatchItem.status == ITEM_RENEWED,
+            BulkRenewalBatchItem.instruction_id.isnot(None),
+        ).scalar() or 0
+
+    async def _letter_chunks(self, db: Session, batch_id: int) -> AsyncIterator[List[Tuple[str, LetterArtifact]]]:
+        """(LG number, letter) of the batch's renewed LGs in batch order, one chunk at a time."""
+        last_item_id = 0
+        while True:
+            rows = db.query(BulkRenewalBatchItem.id, BulkRenewalBatchItem.lg_number, BulkRenewalBatchItem.instruction_id).filter(
+                BulkRenewalBatchItem.batch_id == batch_id,
+                BulkRenewalBatchItem.status == ITEM_RENEWED,
+                BulkRenewalBatchItem.instruction_id.isnot(None),
+                BulkRenewalBatchItem.id > last_item_id,
+            ).order_by(BulkRenewalBatchItem.id).limit(CHUNK_SIZE).all()
+            if not rows:
+                return
+            last_item_id = rows[-1].id
+            numbers = {instruction_id: lg_number for _, lg_number, instruction_id in rows}
+            artifacts: List[Optional[LetterArtifact]] = await asyncio.gather(
+                *self._start_renders(db, [instruction_id for _, _, instruction_id in rows])
+            )
+            yield [(numbers[artifact.source_id], artifact) for artifact in artifacts if artifact is not None]
+
+    async def iter_letters_zip(self, batch_id: int) -> AsyncIterator[bytes]:
+        """
+        The batch's letters as a ZIP of one PDF per LG, in batch order
+        (StreamingResponse body). Uses its own session; each chunk of letters
+        is compressed and yielded before the next one is loaded.
+        """
+        from app.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            stream = _ZipStream()
+            with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as archive:
+                position = 0
+                async for letters in self._letter_chunks(db, batch_id):
+                    for lg_number, artifact in letters:
+                        position += 1
+                        archive.writestr(_letter_filename(position, lg_number), artifact.pdf_bytes)
+                    yield stream.drain()
+            yield stream.drain()  # central directory
+        finally:
+            db.close()
+
+    async def merged_letters_bytes(self, db: Session, batch: BulkRenewalBatch) -> Optional[bytes]:
+        """
+        The letters merged into one PDF, for batches of at most
+        INLINE_PDF_MAX_LETTERS letters (None above that or if there are none).
+        """
+        from pypdf import PdfReader, PdfWriter
+
+        if not 0 < self.letter_count(db, batch) <= INLINE_PDF_MAX_LETTERS:
+            return None
+        writer = PdfWriter()
+        merged = 0
+        async for letters in self._letter_chunks(db, batch.id):
+            for _, artifact in letters:
+                writer.append(PdfReader(io.BytesIO(artifact.pdf_bytes)))
+                merged += 1
+        if not merged:
+            return None
+        out = io.BytesIO()
+        await asyncio.to_thread(writer.write, out)
+        return out.getvalue()
+
+    def summary(self, db: Session, batch: BulkRenewalBatch) -> Dict[str, Any]:
+        return {
+            "batch_id": batch.id,
+            "status": batch.status,
+            "total_count": batch.total_count,
+            "renewed_count": batch.renewed_count,
+            "failed_count": batch.failed_count,
+            "pending_count": self.pending_count(db, batch),
+        }
+
+
+bulk_renewal_service = BulkRenewalService()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _render_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, RENDER_WORKERS), thread_name_prefix="bulk-renewal-render")
+        return _executor
@@ -0,0 +1,199 @@
+# app/services/dashboard_summary_service.py
+"""
+Per-customer dashboard summary tables.
+
+The heaviest dashboard tiles (status distribution, type / bank mix, bank and
+delivery turnaround, issued-LG totals and facility utilisation) aggregate the
+customer's whole portfolio. They are computed with GROUP BY queries into one
+CustomerDashboardSummary row per customer and served from there.
+
+Freshness:
+- A flush that writes an LGRecord, LGInstruction or IssuedLGRecord bumps the
+  owning customer's change_seq in the writer's own transaction (on
+  session.connection()), so the bump commits or rolls back with the write.
+  No second connection is opened, which on SQLite would wait on the writer's
+  own lock. Concurrent writers of one customer queue on the summary row
+  until they commit.
+- A read finds the row stale when computed_seq != change_seq (or it is older
+  than SUMMARY_MAX_AGE_SECONDS) and recomputes it on the caller's session.
+  The result is stored with a conditional UPDATE (only if no newer
+  computation was stored meanwhile) and committed with the request. The
+  recompute records the change_seq it started from, so a write committed
+  while it runs leaves the row stale for the next reader.
+- Bulk statements (query.update()) bypass the flush; call mark_changed().
+"""
+
+import logging
+import os
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.change_tracking import FlushChanges, change_tracker
+from app.models.models import LGRecord, LGInstruction
+from app.models.models_dashboard import CustomerDashboardSummary
+from app.models.models_issuance import IssuedLGRecord
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_MAX_AGE_SECONDS = int(os.getenv("DASHBOARD_SUMMARY_MAX_AGE_SECONDS", "900"))
+
+_CHANGE_CONSUMER = "dashboard_summary"
+
+# Issued LG statuses that consume facility limits (mirrors the dashboard-stats tile)
+UTILIZING_STATUSES = ("ACTIVE", "INTERNAL_PROCESSING")
+
+# Chart tiles served from the summary row, keyed by get_chart_data report_type
+SUMMARY_CHARTS = {
+    "lg_type_mix": "lg_type_counts",
+    "bank_market_share": "bank_counts",
+    "bank_processing_times": "bank_processing_days",
+    "avg_delivery_days": "avg_delivery_days",
+    "avg_days_to_action": "avg_days_to_action",
+}
+
+
+class DashboardSummaryService:
+
+    # ---------------- Read ----------------
+
+    def get(self, db: Session, customer_id: int) -> CustomerDashboardSummary:
+        """Returns the customer's summary row, recomputing it first if stale."""
+        row = db.query(CustomerDashboardSummary).filter(CustomerDashboardSummary.customer_id == customer_id).first()
+        if row is not None and row.computed_seq == row.change_seq and not self._expired(row):
+            return row
+        return self.refresh(db, customer_id, row)
+
+    def get_chart(self, db: Session, customer_id: int, report_type: str) -> Any:
+        return getattr(self.get(db, customer_id), SUMMARY_CHARTS[report_type])
+
+    @staticmethod
+    def _expired(row: CustomerDashboardSummary) -> bool:
+        refreshed_at = row.refreshed_at
+        if refreshed_at is None:
+            return True
+        if refreshed_at.tzinfo is None:
+            refreshed_at = refreshed_at.replace(tzinfo=timezone.utc)
+        return (datetime.now(timezone.utc) - refreshed_at).total_seconds() >= SUMMARY_MAX_AGE_SECONDS
+
+    # ---------------- Recompute ----------------
+
+    def refresh(self, db: Session, customer_id: int, row: Optional[CustomerDashboardSummary] = None) -> CustomerDashboardSummary:
+        """
+        Recomputes the customer's aggregates and stores them on the caller's
+        session (committed with it). `row`, if given, is updated in place
+        without being marked dirty. Returns the summary.
+        """
+        if row is None:
+            row = self._create(db, customer_id)
+        seq = row.change_seq
+        values = self.compute(db, customer_id)
+        values["computed_seq"] = seq
+        values["refreshed_at"] = datetime.now(timezone.utc)
+
+        table = CustomerDashboardSummary.__table__
+        stored = db.execute(
+            update(table)
+            .where(table.c.customer_id == customer_id, table.c.computed_seq <= seq)
+            .values(**values)
+        ).rowcount
+        logger.debug(f"Dashboard summary refreshed for customer {customer_id} at seq {seq} (stored: {bool(stored)}).")
+
+        for column, value in values.items():
+            set_committed_value(row, column, value)
+        return row
+
+    def compute(self, db: Session, customer_id: int) -> Dict[str, Any]:
+        """The summary columns, from SQL aggregates over the customer's portfolio."""
+        from app.crud.crud import crud_reports
+
+        values: Dict[str, Any] = {}
+        status_rows = db.query(LGRecord.lg_status_id, func.count(LGRecord.id)).filter(
+            LGRecord.customer_id == customer_id,
+            LGRecord.is_deleted == False,
+        ).group_by(LGRecord.lg_status_id).all()
+        values["lg_status_counts"] = {str(status_id): count for status_id, count in status_rows}
+
+        for report_type, column in SUMMARY_CHARTS.items():
+            values[column] = crud_reports.compute_chart_data(db, report_type, customer_id)
+
+        active_count, active_amount = db.query(
+            func.count(IssuedLGRecord.id),
+            func.coalesce(func.sum(IssuedLGRecord.current_amount), 0),
+        ).filter(
+            IssuedLGRecord.customer_id == customer_id,
+            IssuedLGRecord.status == "ACTIVE",
+        ).one()
+        values["issued_active_count"] = active_count or 0
+        values["issued_active_amount"] = Decimal(active_amount or 0)
+
+        utilization_rows = db.query(
+            IssuedLGRecord.facility_sub_limit_id,
+            func.coalesce(func.sum(IssuedLGRecord.current_amount), 0),
+        ).filter(
+            IssuedLGRecord.customer_id == customer_id,
+            IssuedLGRecord.facility_sub_limit_id.isnot(None),
+            IssuedLGRecord.status.in_(UTILIZING_STATUSES),
+        ).group_by(IssuedLGRecord.facility_sub_limit_id).all()
+        values["sub_limit_utilization"] = {str(sub_limit_id): float(total or 0) for sub_limit_id, total in utilization_rows}
+        return values
+
+    @staticmethod
+    def _create(db: Session, customer_id: int) -> CustomerDashboardSummary:
+        """Creates the customer's (stale) summary row if missing; returns it."""
+        try:
+            with db.begin_nested():
+                db.execute(insert(CustomerDashboardSummary.__table__).values(
+                    customer_id=customer_id, change_seq=1, computed_seq=0,
+                ))
+        except IntegrityError:
+            pass  # Another worker created it first
+        return db.query(CustomerDashboardSummary).filter(CustomerDashboardSummary.customer_id == customer_id).one()
+
+    # ---------------- Invalidation ----------------
+
+    def mark_changed(self, db: Session, customer_id: int) -> None:
+        """Marks the customer's summary stale, in db's transaction."""
+        _bump_change_seq(db, {customer_id}, set())
+
+
+dashboard_summary_service = DashboardSummaryService()
+
+
+# ==============================================================================
+# CHANGE TRACKING: bump change_seq for customers whose portfolio changed
+# ==============================================================================
+
+def _collect_dashboard_changes(session: Session, changes: FlushChanges):
+    customer_ids = {obj.customer_id for obj in changes.all(LGRecord, IssuedLGRecord)}
+    lg_record_ids = {obj.lg_record_id for obj in changes.all(LGInstruction)}
+    customer_ids.discard(None)
+    lg_record_ids.discard(None)
+    _bump_change_seq(session, customer_ids, lg_record_ids)
+
+
+def _bump_change_seq(session: Session, customer_ids: Set[int], lg_record_ids: Set[int]) -> None:
+    """Bumps change_seq of the customers owning these rows, on the session's own connection."""
+    if not customer_ids and not lg_record_ids:
+        return
+    table = CustomerDashboardSummary.__table__
+    conditions = []
+    if customer_ids:
+        conditions.append(table.c.customer_id.in_(customer_ids))
+    if lg_record_ids:
+        conditions.append(table.c.customer_id.in_(
+            select(LGRecord.customer_id).where(LGRecord.id.in_(lg_record_ids))
+        ))
+    session.connection().execute(update(table).where(or_(*conditions)).values(change_seq=table.c.change_seq + 1))
+
+
+change_tracker.register(
+    _CHANGE_CONSUMER,
+    models=(LGRecord, IssuedLGRecord, LGInstruction),
+    collect=_collect_dashboard_changes,
+)
@@ -51,9 +51,15 @@ class FxService:
         if from_currency_id == to_currency_id:
             return Decimal("1.0")
 
+        from app.core.master_data_cache import master_data_cache
         from app.models.models import Currency
-        from_currency = db.query(Currency).filter(Currency.id == from_currency_id).first()
-        to_currency = db.query(Currency).filter(Currency.id == to_currency_id).first()
+        currencies = master_data_cache.snapshot(db, "currencies")
+        if currencies is not None:
+            from_currency = currencies.by_id.get(from_currency_id)
+            to_currency = currencies.by_id.get(to_currency_id)
+        else:
+            from_currency = db.query(Currency).filter(Currency.id == from_currency_id).first()
+            to_currency = db.query(Currency).filter(Currency.id == to_currency_id).first()
 
         if not from_currency or not to_currency:
             logger.warning(f"FX: Currency not found — from_id={from_currency_id}, to_id={to_currency_id}")
@@ -102,6 +108,30 @@ class FxService:
             return None, None
         return amount * rate, rate
 
+    def get_cbe_rate(self, db: Session, from_code: str, to_code: str) -> Optional[Decimal]:
+        """
+        Tier 1 only: the CBE rate for 1 unit of from_code in to_code (ISO
+        codes), triangulated via EGP. None if either currency or rate is
+        missing; never falls back to AI.
+        """
+        from_code, to_code = from_code.upper(), to_code.upper()
+        if from_code == to_code:
+            return Decimal("1.0")
+
+        from app.core.master_data_cache import master_data_cache
+        from app.models.models import Currency
+        currencies = master_data_cache.snapshot(db, "currencies")
+        if currencies is not None:
+            from_currency = currencies.find("iso_code", from_code)
+            to_currency = currencies.find("iso_code", to_code)
+        else:
+            from_currency = db.query(Currency).filter(Currency.iso_code == from_code).first()
+            to_currency = db.query(Currency).filter(Currency.iso_code == to_code).first()
+
+        if not from_currency or not to_currency:
+            return None
+        return self._tier1_cbe(db, from_currency.id, to_currency.id, from_code, to_code)
+
     # ──────────────────────────────────────────────────────────────────────
     # TIER 1: CBE DAILY RATES
     # ──────────────────────────────────────────────────────────────────────
@@ -180,7 +210,7 @@ class FxService:
 
         # Call AI
         try:
-            rate, tokens_used = self._ask_ai_for_rate(from_code, to_code)
+            rate, tokens_used = self._ask_ai_for_rate(from_code, to_code, customer_id)
             if rate is not None:
                 self._save_ai_cache(db, from_code, to_code, rate)
                 self._log_ai_usage(db, customer_id, user_id, from_code, to_code, tokens_used)
@@ -229,16 +259,16 @@ class FxService:
         db.add(entry)
         # Don't commit here — let the caller's transaction handle it
 
-    def _ask_ai_for_rate(self, from_code: str, to_code: str) -> Tuple[Optional[Decimal], int]:
+    def _ask_ai_for_rate(self, from_code: str, to_code: str, customer_id: Optional[int] = None) -> Tuple[Optional[Decimal], int]:
         """
-        Call Gemini (via Vertex AI) to get the latest closing rate.
+        Call Gemini (via the AI gateway) to get the latest closing rate.
+        Concurrent lookups of the same pair share one call.
         Returns (rate, tokens_used) or (None, 0).
         """
         import json
-        from app.core.ai_integration import _get_genai_client, GEMINI_MODEL_NAME
+        from app.core.ai_gateway import ai_gateway
 
-        client = _get_genai_client()
-        if not client:
+        if not ai_gateway.available():
             logger.warning("FX AI: GenAI client not available -- skipping AI tier")
             return None, 0
 
@@ -251,9 +281,7 @@ class FxService:
         )
 
         try:
-            response = client.models.generate_content(
-                model=GEMINI_MODEL_NAME, contents=prompt
-            )
+            response = ai_gateway.generate_sync(prompt, call_type="fx_rate", customer_id=customer_id)
             raw_text = response.text.strip()
 
             # Clean markdown fences if present
@@ -264,9 +292,8 @@ class FxService:
             rate_value = data.get("rate")
 
             tokens_used = 0
-            if hasattr(response, "usage_metadata"):
-                meta = response.usage_metadata
-                tokens_used = getattr(meta, "total_token_count", 0)
+            if response.usage_metadata is not None:
+                tokens_used = getattr(response.usage_metadata, "total_token_count", 0)
 
             if rate_value is not None:
                 return Decimal(str(rate_value)), tokens_used
@@ -12,15 +12,19 @@ from datetime import date, datetime
 from typing import Optional, List, Dict, Any
 from decimal import Decimal
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, object_session
 from fastapi import HTTPException
 
 from app.models.models_issuance import (
     IssuedLGRecord, IssuanceMaintenanceAction,
-    IssuanceWorkflowPolicy, IssuanceExposureEntry,
+    IssuanceExposureEntry,
     IssuanceFacility, IssuanceFacilitySubLimit
 )
 from app.crud.crud import log_action
+from app.services.workflow_policy_engine import workflow_policy_engine
+from app.services.lg_history_service import lg_history_service
+# Registers the pre-render hook for newly issued maintenance letters
+import app.services.letter_artifact_service  # noqa: F401
 
 logger = logging.getLogger(__name__)
 
@@ -171,10 +175,7 @@ class IssuanceMaintenanceService:
                 }]
             else:
                 # Distinguish: "no policies configured" vs "policies exist but none match"
-                has_any_policies = db.query(IssuanceWorkflowPolicy).filter(
-                    IssuanceWorkflowPolicy.customer_id == customer_id,
-                    IssuanceWorkflowPolicy.is_active == True,
-                ).count() > 0
+                has_any_policies = workflow_policy_engine.get_plan(db, customer_id).has_active_steps
 
                 if has_any_policies:
                     # Policies exist but _find_next_approval_step found no matching step
@@ -305,10 +306,7 @@ class IssuanceMaintenanceService:
         action.approval_history = list(history)
 
         # Check if step is complete (simplified: 1 signature per step)
-        current_policy = db.query(IssuanceWorkflowPolicy).filter(
-            IssuanceWorkflowPolicy.customer_id == customer_id,
-            IssuanceWorkflowPolicy.step_sequence == action.current_step_number
-        ).first()
+        current_policy = workflow_policy_engine.get_plan(db, customer_id).step_at(action.current_step_number)
         required_sigs = current_policy.required_signatures if current_policy else 1
 
         # Count signatures for current step
@@ -842,6 +840,7 @@ class IssuanceMaintenanceService:
             "snapshot_beneficiary_name": lg.beneficiary_name,
             "snapshot_beneficiary_address": getattr(lg, 'beneficiary_address', None),
             "snapshot_status": lg.status,
+            "letter_date": date.today().isoformat(),
         }
         updated_data = dict(data)
         updated_data.update(snapshot_for_letter)
@@ -1028,21 +1027,20 @@ class IssuanceMaintenanceService:
 
         issuance_svc = IssuanceService()
 
-        policies = db.query(IssuanceWorkflowPolicy).filter(
-            IssuanceWorkflowPolicy.customer_id == customer_id,
-            IssuanceWorkflowPolicy.step_sequence > start_sequence,
-            IssuanceWorkflowPolicy.is_active == True
-        ).order_by(IssuanceWorkflowPolicy.step_sequence).all()
+        plan = workflow_policy_engine.get_plan(db, customer_id)
+        policies = plan.steps_after(start_sequence)
 
         # Build a pseudo-request context from the LG record
         pseudo_request = None
+        ctx = None
         if lg:
             pseudo_request = self._build_pseudo_request(db, lg, action_data)
+            ctx = plan.new_context(db, pseudo_request)
 
         for policy in policies:
             # Condition evaluation (context-aware if LG is provided)
             if pseudo_request:
-                condition_met = issuance_svc._evaluate_condition(db, pseudo_request, policy)
+                condition_met = issuance_svc._evaluate_condition(db, pseudo_request, policy, ctx)
                 if not condition_met:
                     continue  # Skip this step — condition doesn't apply
             # else: no context → accept any step (legacy behavior)
@@ -1212,17 +1210,8 @@ class IssuanceMaintenanceService:
 
     def _record_history(self, lg: IssuedLGRecord, action_type: str, before: dict, 
                         after: dict, user_id: int, notes: Optional[str]):
-        """Appends to the action_history JSON array on the LG record."""
-        history = lg.action_history or []
-        history.append({
-            "action_type": action_type,
-            "before": before,
-            "after": after,
-            "user_id": user_id,
-            "timestamp": str(datetime.utcnow()),
-            "notes": notes,
-        })
-        lg.action_history = list(history)
+        """Appends an entry (changed fields only) to the LG's history table."""
+        lg_history_service.record(object_session(lg), lg.id, action_type, before, after, user_id, notes)
 
     # ──────────────────────────────────────────────────
     # 7. BANK-INITIATED CHANGES
@@ -1493,21 +1482,16 @@ class IssuanceMaintenanceService:
         maintenance-specific context.
         Returns a verification result dict.
         """
-        import asyncio
         try:
+            from app.core.ai_gateway import ai_gateway
             from app.core.ai_integration import extract_structured_data_with_gemini
             from app.core.ai_integration import perform_ocr_with_google_vision
             from app.core.ai_integration import _convert_pdf_to_images_and_upload_to_gcs
             from app.core.ai_integration import _cleanup_gcs_files, GCS_BUCKET_NAME
             import uuid
 
-            # Helper: run async function from sync context (FastAPI worker thread has no event loop)
-            def _run_async(coro):
-                loop = asyncio.new_event_loop()
-                try:
-                    return loop.run_until_complete(coro)
-                finally:
-                    loop.close()
+            # Async OCR / AI helpers run on the AI gateway's loop (FastAPI worker thread has no event loop)
+            _run_async = ai_gateway.run_sync
 
             lg = db.query(IssuedLGRecord).filter(IssuedLGRecord.id == action.issued_lg_id).first()
             if not lg:
@@ -1562,7 +1546,7 @@ class IssuanceMaintenanceService:
             }
 
             extracted_data, usage = _run_async(
-                extract_structured_data_with_gemini(raw_text, unique_file_id, context=context)
+                extract_structured_data_with_gemini(raw_text, unique_file_id, context=context, customer_id=lg.customer_id)
             )
 
             # Cleanup temp files
@@ -1830,9 +1814,24 @@ class IssuanceMaintenanceService:
     ) -> str:
         """
         Regenerates the instruction letter HTML from template + action_data.
-        Mirrors the LG custody pattern: no file storage, regenerate on demand.
         Returns rendered HTML string, or None if template not found.
         """
+        from app.core.letter_artifacts import fill_template
+
+        context = self.maintenance_letter_context(db, action, lg)
+        if context is None:
+            return None
+        template, placeholder_data = context
+        return fill_template(template.content, placeholder_data)
+
+    def maintenance_letter_context(
+        self, db: Session, action: IssuanceMaintenanceAction, lg: IssuedLGRecord
+    ):
+        """
+        Resolves the letter template and placeholder values for a maintenance
+        action. Returns (template, placeholder_data), or None if no template exists.
+        The pair determines the letter, so it also keys the rendered PDF artifact.
+        """
         from app.crud.crud import crud_template
         from sqlalchemy.orm import selectinload
 
@@ -1935,7 +1934,8 @@ class IssuanceMaintenanceService:
             "liquidation_date": data.get("liquidation_date") or "N/A",
             "action_type": action.action_type.replace("_", " ").title(),
             "action_notes": action.notes or "",
-            "current_date": date.today().strftime("%d-%b-%Y"),
+            # Letter date fixed at execution so views and reprints show the issued letter
+            "current_date": (date.fromisoformat(data["letter_date"]) if data.get("letter_date") else date.today()).strftime("%d-%b-%Y"),
             "serial_number": action.letter_serial_number or "",
             "platform_name": "Treasury Management Platform",
         }
@@ -1986,13 +1986,7 @@ class IssuanceMaintenanceService:
             else:
                 placeholder_data["payment_issuing_bank_name"] = placeholder_data.get("bank_name", "N/A")
 
-        # Fill template
-        generated_html = template.content
-        for key, value in placeholder_data.items():
-            str_value = str(value) if value is not None else ""
-            generated_html = generated_html.replace(f"{{{{{key}}}}}", str_value)
-
-        return generated_html
+        return template, placeholder_data
 
     # ──────────────────────────────────────────────────
     # F1b: Maintenance Letter PDF Generation (used during _execute_action)
@@ -2001,197 +1995,31 @@ class IssuanceMaintenanceService:
         self, db: Session, action: IssuanceMaintenanceAction, lg: IssuedLGRecord
     ):
         """
-        Generates a maintenance letter PDF using the template system.
-        Mirrors generate_issuance_letter() from issuance_service.py.
-        
-        Template lookup order:
-          1. Customer-specific template for the action type (e.g., LG_EXTEND_REQUEST)
-          2. Global template for the action type
-          3. Customer-specific generic LG_MAINTENANCE_REQUEST template
-          4. Global generic LG_MAINTENANCE_REQUEST template
-        
-        Returns: (pdf_bytes, filename) or (None, None) if template not found.
-        """
-        from app.crud.crud import crud_template
-        from app.core.document_generator import generate_pdf_from_html
-        from sqlalchemy.orm import selectinload
+        Generates the maintenance letter PDF through the rendered-letter
+        artifact store (app/core/letter_artifacts.py), so it is the same
+        document the letter endpoint serves and is only rendered once.
 
-        # Map maintenance action types to template action_types
-        TEMPLATE_MAP = {
-            "EXTEND": "LG_EXTEND_REQUEST",
-            "INCREASE_AMOUNT": "LG_INCREASE_REQUEST",
-            "CLOSE": "LG_CLOSE_REQUEST",
-            "AMENDMENT": "LG_AMENDMENT_REQUEST",
-            "ACTIVATE": "LG_ACTIVATE_REQUEST",
-        }
-
-        specific_action_type = TEMPLATE_MAP.get(action.action_type, f"LG_{action.action_type}_REQUEST")
-
-        # Template resolution: action-specific customer → action-specific global → generic customer → generic global
-        template = None
-        for action_type_key in [specific_action_type, "LG_MAINTENANCE_REQUEST"]:
-            template = crud_template.get_single_template(
-                db,
-                action_type=action_type_key,
-                is_global=False,
-                customer_id=lg.customer_id,
-                is_notification_template=False,
-            )
-            if not template:
-                template = crud_template.get_single_template(
-                    db,
-                    action_type=action_type_key,
-                    is_global=True,
-                    is_notification_template=False,
-                )
-            if template:
-                break
+        Returns: (pdf_bytes, filename) or (None, None) if no template is found
+        or rendering fails.
+        """
+        from app.core.letter_artifacts import letter_artifact_store
 
-        if not template:
-            logger.warning(
-                f"No template found for maintenance action {action.action_type} "
-                f"(tried {specific_action_type} and LG_MAINTENANCE_REQUEST)"
-            )
+        context = self.maintenance_letter_context(db, action, lg)
+        if context is None:
             return None, None
+        template, placeholder_data = context
 
-        # Load relationships for placeholder data
-        lg_with_rels = db.query(IssuedLGRecord).options(
-            selectinload(IssuedLGRecord.currency),
-            selectinload(IssuedLGRecord.bank),
-            selectinload(IssuedLGRecord.customer),
-            selectinload(IssuedLGRecord.issuing_entity),
-            selectinload(IssuedLGRecord.lg_type),
-        ).filter(IssuedLGRecord.id == lg.id).first()
-
-        data = action.action_data or {}
-
-        # Amount in words helper
-        def amount_to_words(amount) -> str:
-            try:
-                from num2words import num2words
-                amount = float(amount)
-                integer_part = int(amount)
-                decimal_part = round((amount - integer_part) * 100)
-                words = num2words(integer_part).title()
-                if decimal_part > 0:
-                    words += f" and {num2words(decimal_part).title()} Cents"
-                return words
-            except (ImportError, Exception):
-                return f"{float(amount):,.2f}"
-
-        current_amount = float(lg_with_rels.current_amount) if lg_with_rels.current_amount else 0
-        currency_code = lg_with_rels.currency.iso_code if lg_with_rels.currency else "N/A"
-        currency_name = lg_with_rels.currency.name if lg_with_rels.currency else "N/A"
-
-        # Build placeholder data — works for any action type
-        placeholder_data = {
-            # LG Core
-            "lg_ref_number": lg_with_rels.lg_ref_number or "",
-            "bank_lg_number": lg_with_rels.bank_lg_number or "N/A",
-            "internal_serial": lg_with_rels.internal_serial or "",
-            "letter_serial_number": action.letter_serial_number or "",
-            "beneficiary_name": lg_with_rels.beneficiary_name or "",
-            "beneficiary_address": lg_with_rels.beneficiary_address or "",
-            "current_amount": f"{current_amount:,.2f}",
-            "current_amount_in_words": amount_to_words(current_amount),
-            "currency_code": currency_code,
-            "currency_name": currency_name,
-            "lg_type": lg_with_rels.lg_type.name if lg_with_rels.lg_type else "N/A",
-            "issue_date": str(lg_with_rels.issue_date) if lg_with_rels.issue_date else "N/A",
-            "expiry_date": str(lg_with_rels.expiry_date) if lg_with_rels.expiry_date else "N/A",
-
-            # Bank
-            "bank_name": lg_with_rels.bank.name if lg_with_rels.bank else "N/A",
-
-            # Customer / Company
-            "customer_name": lg_with_rels.customer.name if lg_with_rels.customer else "N/A",
-            "company_name": lg_with_rels.customer.name if lg_with_rels.customer else "N/A",
-            "entity_name": lg_with_rels.issuing_entity.entity_name if lg_with_rels.issuing_entity else "",
-
-            # Action-specific
-            "action_type": action.action_type.replace("_", " ").title(),
-            "action_notes": action.notes or "",
-
-            # Date
-            "current_date": date.today().strftime("%d-%b-%Y"),
-            "serial_number": action.letter_serial_number or "",
-            "platform_name": "Treasury Management Platform",
-        }
-
-        # Action-specific extra placeholders
-        if action.action_type == "EXTEND":
-            new_date = data.get("new_expiry_date", "N/A")
-            placeholder_data["new_expiry_date"] = new_date
-            placeholder_data["old_expiry_date"] = str(lg_with_rels.expiry_date) if lg_with_rels.expiry_date else "N/A"
-
-        elif action.action_type == "INCREASE_AMOUNT":
-            new_amount = data.get("new_amount", 0)
-            new_amount_val = float(new_amount) if new_amount else 0
-            delta = new_amount_val - current_amount
-            placeholder_data["new_amount"] = f"{new_amount_val:,.2f}"
-            placeholder_data["new_amount_in_words"] = amount_to_words(new_amount_val)
-            placeholder_data["increase_delta"] = f"{delta:,.2f}"
-            placeholder_data["old_amount"] = f"{current_amount:,.2f}"
-
-        elif action.action_type == "AMENDMENT":
-            if data.get("new_beneficiary_name"):
-                placeholder_data["new_beneficiary_name"] = data["new_beneficiary_name"]
-            placeholder_data["amendment_details"] = data.get("amendment_text", action.notes or "")
-
-        elif action.action_type == "CLOSE":
-            placeholder_data["close_reason"] = data.get("close_reason", "")
-
-        elif action.action_type == "ACTIVATE":
-            # Payment details for activation letter
-            placeholder_data["payment_method"] = data.get("payment_method", "N/A")
-            amount_val = float(data.get("payment_amount", 0))
-            placeholder_data["payment_amount"] = f"{amount_val:,.2f}"
-            placeholder_data["payment_amount_formatted"] = f"{amount_val:,.2f}"
-            placeholder_data["payment_reference"] = data.get("payment_reference", "N/A")
-            placeholder_data["payment_date"] = data.get("payment_date", "N/A")
-            # Resolve payment bank name if bank_id provided
-            payment_bank_id = data.get("payment_bank_id")
-            if payment_bank_id:
-                from app.models.models import Bank
-                payment_bank = db.query(Bank).filter(Bank.id == payment_bank_id).first()
-                placeholder_data["payment_issuing_bank_name"] = payment_bank.name if payment_bank else "N/A"
-            else:
-                placeholder_data["payment_issuing_bank_name"] = placeholder_data.get("bank_name", "N/A")
-
-        # Fill template
-        generated_html = template.content
-        for key, value in placeholder_data.items():
-            str_value = str(value) if value is not None else ""
-            generated_html = generated_html.replace(f"{{{{{key}}}}}", str_value)
-
-        # Generate PDF (synchronous call via asyncio for background context)
-        import asyncio
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # We're inside an async context — create a task
-                import concurrent.futures
-                with concurrent.futures.ThreadPoolExecutor() as pool:
-                    pdf_bytes = pool.submit(
-                        asyncio.run,
-                        generate_pdf_from_html(generated_html, filename_hint=f"maint_{action.letter_serial_number}")
-                    ).result()
-            else:
-                pdf_bytes = loop.run_until_complete(
-                    generate_pdf_from_html(generated_html, filename_hint=f"maint_{action.letter_serial_number}")
-                )
-        except RuntimeError:
-            pdf_bytes = asyncio.run(
-                generate_pdf_from_html(generated_html, filename_hint=f"maint_{action.letter_serial_number}")
-            )
-
-        if not pdf_bytes:
+        artifact = letter_artifact_store.get_or_render(
+            "maintenance_letter", action.id, template, placeholder_data,
+            filename_hint=f"maint_{action.letter_serial_number}",
+        )
+        if artifact is None:
             logger.warning(f"PDF generation returned empty bytes for action {action.id}")
             return None, None
 
         filename = f"Maintenance_{action.action_type}_{action.letter_serial_number or action.id}.pdf"
-        logger.info(f"Generated maintenance letter: {filename} ({len(pdf_bytes)} bytes)")
-        return pdf_bytes, filename
+        logger.info(f"Generated maintenance letter: {filename} ({len(artifact.pdf_bytes)} bytes)")
+        return artifact.pdf_bytes, filename
 
 
 # Singleton instance
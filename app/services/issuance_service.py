@@ -14,7 +14,7 @@ from app.crud.crud_issuance import crud_issuance_request
 from app.crud.crud_facility import crud_facility
 from app.models.models_issuance import (
     IssuanceRequest, IssuanceFacility, IssuanceFacilitySubLimit, 
-    IssuedLGRecord, IssuanceWorkflowPolicy, BankIssuanceOption,
+    IssuedLGRecord, BankIssuanceOption,
     IssuanceExposureEntry
 )
 from app.models.models import CurrencyExchangeRate, Currency
@@ -22,6 +22,10 @@ from app.models.models_reconciliation import BankPositionBatch, BankPositionRow
 from app.schemas.schemas_issuance import IssuanceRequestUpdate, SuitableFacilityOut, BankIssuanceOptionOut
 from app.core.issuance_strategies import IssuanceStrategyFactory
 from app.crud.base import log_action
+from app.services.workflow_policy_engine import (
+    workflow_policy_engine, fx_adjusted_amount, compile_policy_step,
+    CompiledPolicyPlan, CompiledPolicyStep, PolicyEvaluationContext, ApproverDirectory
+)
 
 from datetime import date
 
@@ -159,161 +163,42 @@ class IssuanceService:
     # 2. WORKFLOW ACTIONS (The Advanced Matrix Engine)
     # ==========================================================================
 
-    def _evaluate_condition(self, db: Session, request: IssuanceRequest, policy: IssuanceWorkflowPolicy) -> bool:
+    def _evaluate_condition(self, db: Session, request: IssuanceRequest, policy, ctx: PolicyEvaluationContext = None) -> bool:
         """Evaluates if a specific workflow step applies to this request.
         
         For AMOUNT_OVER and AMOUNT_RANGE: if the policy has a currency_id set,
         the request amount is converted to that currency before comparison.
         If FX conversion fails, the condition is treated as True (fail-safe:
         approval is required when we can't determine the amount).
-        """
-        if policy.condition_type in ["ALWAYS", "ANY_DEPARTMENT"]:
-            return True
 
-        if policy.condition_type == "AMOUNT_OVER":
-            try:
-                threshold = Decimal(str(policy.condition_value))
-                comparison_amount = self._get_fx_adjusted_amount(db, request, policy)
-                if comparison_amount is None:
-                    return True  # Fail-safe: can't convert → require approval
-                return comparison_amount > threshold
-            except Exception:
-                return False
-
-        if policy.condition_type == "AMOUNT_RANGE":
-            try:
-                # Handle formats: "MIN-MAX", "MIN,MAX", "(MIN,MAX)", "(MIN-MAX)"
-                raw = str(policy.condition_value).strip().strip("()")
-                # Try comma first (UI format), then dash
-                if "," in raw:
-                    parts = raw.split(",")
-                else:
-                    parts = raw.split("-")
-                min_val = Decimal(parts[0].strip()) if parts[0].strip() else Decimal("0")
-                max_val = Decimal(parts[1].strip()) if len(parts) > 1 and parts[1].strip() else None
-                
-                comparison_amount = self._get_fx_adjusted_amount(db, request, policy)
-                if comparison_amount is None:
-                    return True  # Fail-safe: can't convert → require approval
-                
-                if comparison_amount < min_val:
-                    return False
-                if max_val is not None and comparison_amount > max_val:
-                    return False
-                return True
-            except Exception:
-                return False
-                
-        if policy.condition_type == "DEPT_MATCH":
-            # condition_value stores the department ID, request.department stores the name
-            # Look up the department by name to get its ID for a proper comparison
-            from app.models.models import Department
-            from sqlalchemy import func as sa_func
-            req_dept_name = request.department
-            if not req_dept_name:
-                return False
-            dept = db.query(Department).filter(
-                Department.customer_id == request.customer_id,
-                sa_func.lower(Department.name) == str(req_dept_name).lower(),
-                Department.is_deleted == False
-            ).first()
-            if dept:
-                return str(dept.id) == str(policy.condition_value)
-            return False
-            
-        if policy.condition_type == "CROSS_BORDER":
-            return bool(request.is_cross_border)
-
-        if policy.condition_type == "THIRD_PARTY":
-            return bool(request.is_third_party)
-
-        if policy.condition_type == "REFERENCE_TYPE_MATCH":
-            # condition_value stores the reference type name (e.g., "Contract", "Project")
-            if not request.reference_type or not policy.condition_value:
-                return False
-            return str(request.reference_type).lower() == str(policy.condition_value).lower()
-            
-        return False
-
-    def _get_fx_adjusted_amount(self, db: Session, request: IssuanceRequest, policy: IssuanceWorkflowPolicy) -> Optional[Decimal]:
+        Accepts either a compiled step (with the plan's evaluation context) or
+        a raw IssuanceWorkflowPolicy row, which is compiled on the fly.
+        """
+        if not isinstance(policy, CompiledPolicyStep):
+            plan = CompiledPolicyPlan.build(policy.customer_id, [policy])
+            policy = plan.steps[0]
+            ctx = plan.new_context(db, request)
+        elif ctx is None:
+            ctx = workflow_policy_engine.get_plan(db, request.customer_id).new_context(db, request)
+        return policy.applies(ctx)
+
+    def _get_fx_adjusted_amount(self, db: Session, request: IssuanceRequest, policy) -> Optional[Decimal]:
         """
         Returns the request amount converted to the policy's currency.
         If the policy has no currency_id, returns the raw request amount.
         If FX conversion fails, returns None (caller decides: usually fail-safe → True).
         """
-        if not policy.currency_id or not request.currency_id:
-            return request.amount
-
-        # Same currency → no conversion needed
-        if policy.currency_id == request.currency_id:
-            return request.amount
+        return fx_adjusted_amount(db, request, policy.currency_id)
 
-        # Convert request amount to policy currency
-        from app.services.fx_service import fx_service
-        converted, rate = fx_service.convert(
-            db,
-            Decimal(str(request.amount)),
-            request.currency_id,
-            policy.currency_id,
-            allow_ai=False,  # Approval evaluation should be fast — CBE only
-        )
-
-        if converted is not None:
-            logger.debug(
-                f"FX-adjusted amount: {request.amount} (currency_id={request.currency_id}) "
-                f"→ {converted} (policy currency_id={policy.currency_id}) at rate {rate}"
-            )
-            return converted
-
-        logger.warning(
-            f"FX conversion failed for request {request.id}: "
-            f"currency_id={request.currency_id} → policy currency_id={policy.currency_id}"
-        )
-        return None
-
-    def _resolve_approvers(self, db: Session, request: IssuanceRequest, policy: IssuanceWorkflowPolicy, requestor_user_id: int = None) -> List[int]:
+    def _resolve_approvers(self, db: Session, request: IssuanceRequest, policy, requestor_user_id: int = None) -> List[int]:
         """Resolves the policy's approver rules into a concrete list of User IDs.
         Excludes the requestor (they should never approve their own request).
-        Deduplicates across groups automatically via set."""
-        from app.models.models import User, Department, ApprovalGroup
-        from sqlalchemy import func
-        
-        approver_ids = set()
-        
-        if policy.approver_type == "USERS":
-            approver_ids.update([int(uid) for uid in policy.approver_values if str(uid).isdigit()])
-            
-        elif policy.approver_type == "ROLE":
-            roles = [str(r).lower() for r in policy.approver_values]
-            users = db.query(User.id).filter(
-                User.customer_id == request.customer_id,
-                User.role.in_(roles),
-                User.is_deleted == False
-            ).all()
-            approver_ids.update([u[0] for u in users])
-            
-        elif policy.approver_type == "DEPT_HEAD":
-            req_dept_name = request.department
-            if req_dept_name:
-                dept = db.query(Department).filter(
-                    Department.customer_id == request.customer_id,
-                    func.lower(Department.name) == str(req_dept_name).lower(),
-                    Department.is_deleted == False
-                ).first()
-                if dept and dept.manager_id:
-                    approver_ids.add(dept.manager_id)
-                    
-        elif policy.approver_type == "GROUP":
-            group_ids = [int(gid) for gid in policy.approver_values if str(gid).isdigit()]
-            groups = db.query(ApprovalGroup).filter(
-                ApprovalGroup.id.in_(group_ids),
-                ApprovalGroup.customer_id == request.customer_id,
-                ApprovalGroup.is_deleted == False
-            ).all()
-            for group in groups:
-                for u in group.users:
-                    if not u.is_deleted:
-                        approver_ids.add(u.id)
+        Deduplicates across groups automatically via set.
+        Approver pools come from the cached per-customer approver directory."""
+        if not isinstance(policy, CompiledPolicyStep):
+            policy = compile_policy_step(policy)
+        directory = workflow_policy_engine.get_directory(db, request.customer_id)
+        approver_ids = set(directory.resolve(policy, request.department))
         
         # RULE 1: Requestor cannot approve their own request
         if requestor_user_id and requestor_user_id in approver_ids:
@@ -343,11 +228,9 @@ class IssuanceService:
         
         Returns (next_policy, eligible_approver_ids) or (None, []) if fully approved.
         """
-        policies = db.query(IssuanceWorkflowPolicy).filter(
-            IssuanceWorkflowPolicy.customer_id == request.customer_id,
-            IssuanceWorkflowPolicy.is_active == True,
-            IssuanceWorkflowPolicy.step_sequence > start_sequence
-        ).order_by(IssuanceWorkflowPolicy.step_sequence.asc()).all()
+        plan = workflow_policy_engine.get_plan(db, request.customer_id)
+        ctx = plan.new_context(db, request)
+        policies = plan.steps_after(start_sequence)
         
         current_audit = request.approval_chain_audit or []
 
@@ -355,7 +238,7 @@ class IssuanceService:
         # Collect which policies apply and their raw approver pools
         applicable = []  # List of (policy, approver_ids_set)
         for policy in policies:
-            if self._evaluate_condition(db, request, policy):
+            if self._evaluate_condition(db, request, policy, ctx):
                 approver_ids = set(self._resolve_approvers(db, request, policy, request.requestor_user_id))
                 applicable.append((policy, approver_ids))
         
@@ -483,17 +366,15 @@ class IssuanceService:
         Evaluates ALL workflow policies and returns their status
         (completed, active, skipped, pending) with approver details.
         """
-        from app.models.models import User, Department, ApprovalGroup
-        
         request = crud_issuance_request.get(db, id=request_id)
         if not request:
             return {"steps": []}
 
-        # Get ALL workflow policies for this customer (ordered)
-        policies = db.query(IssuanceWorkflowPolicy).filter(
-            IssuanceWorkflowPolicy.customer_id == request.customer_id,
-            IssuanceWorkflowPolicy.is_active == True
-        ).order_by(IssuanceWorkflowPolicy.step_sequence.asc()).all()
+        # ALL active workflow policies for this customer (ordered), from the compiled plan
+        plan = workflow_policy_engine.get_plan(db, request.customer_id)
+        directory = workflow_policy_engine.get_directory(db, request.customer_id)
+        ctx = plan.new_context(db, request, directory)
+        policies = plan.active_steps
 
         audit = request.approval_chain_audit or []
         is_fully_approved = any(e.get("action") == "FULLY_APPROVED" for e in audit)
@@ -516,8 +397,7 @@ class IssuanceService:
         
         user_name_map = {}
         if all_user_ids:
-            users = db.query(User).filter(User.id.in_(all_user_ids)).all()
-            user_name_map = {u.id: u.email for u in users}
+            user_name_map = workflow_policy_engine.resolve_user_emails(db, request.customer_id, all_user_ids)
 
         # Group audit entries by step (current round only)
         step_audit = {}
@@ -532,13 +412,13 @@ class IssuanceService:
             step_entries = step_audit.get(seq, [])
             
             # Determine if this step's condition applies
-            condition_applies = self._evaluate_condition(db, request, policy)
+            condition_applies = self._evaluate_condition(db, request, policy, ctx)
             
             # Build condition label
-            condition_label = self._get_condition_label(db, policy, request)
+            condition_label = self._get_condition_label(db, policy, request, directory)
             
             # Build approver label  
-            approver_label = self._get_approver_label(db, policy, request)
+            approver_label = self._get_approver_label(db, policy, request, directory)
             
             # Determine step status
             approvals = [e for e in step_entries if e.get("action") == "APPROVED_STEP"]
@@ -581,8 +461,8 @@ class IssuanceService:
             if status in ("active", "pending") and condition_applies:
                 approver_ids = self._resolve_approvers(db, request, policy, request.requestor_user_id)
                 if approver_ids:
-                    approver_users = db.query(User).filter(User.id.in_(approver_ids)).all()
-                    expected_approvers = [{"id": u.id, "name": u.email} for u in approver_users]
+                    emails = workflow_policy_engine.resolve_user_emails(db, request.customer_id, approver_ids)
+                    expected_approvers = [{"id": uid, "name": email} for uid, email in emails.items()]
 
             step_data = {
                 "sequence": seq,
@@ -611,7 +491,7 @@ class IssuanceService:
             "steps": steps
         }
 
-    def _get_condition_label(self, db, policy, request):
+    def _get_condition_label(self, db, policy, request, directory: ApproverDirectory = None):
         """Returns a human-readable label for a policy's condition."""
         if policy.condition_type == "ALWAYS":
             return "Always"
@@ -620,43 +500,39 @@ class IssuanceService:
         if policy.condition_type == "AMOUNT_OVER":
             return f"Amount over {policy.condition_value}"
         if policy.condition_type == "DEPT_MATCH":
-            from app.models.models import Department
-            dept = db.query(Department).filter(
-                Department.customer_id == request.customer_id,
-                Department.id == int(policy.condition_value) if policy.condition_value else 0,
-                Department.is_deleted == False
-            ).first()
-            return f"Department: {dept.name}" if dept else f"Department #{policy.condition_value}"
+            directory = directory or workflow_policy_engine.get_directory(db, request.customer_id)
+            dept_id = int(policy.condition_value) if str(policy.condition_value or "").isdigit() else 0
+            dept = directory.departments_by_id.get(dept_id)
+            return f"Department: {dept[1]}" if dept else f"Department #{policy.condition_value}"
         if policy.condition_type == "CROSS_BORDER":
             return "Cross-Border Transaction"
         if policy.condition_type == "THIRD_PARTY":
             return "Third-Party Issuance"
         return policy.condition_type
 
-    def _get_approver_label(self, db, policy, request):
+    def _get_approver_label(self, db, policy, request, directory: ApproverDirectory = None):
         """Returns a human-readable label for a policy's approver type."""
-        from app.models.models import User, ApprovalGroup
-        
         if policy.approver_type == "DEPT_HEAD":
             return "Department Manager"
         if policy.approver_type == "USERS":
             user_ids = [int(uid) for uid in policy.approver_values if str(uid).isdigit()]
-            users = db.query(User).filter(User.id.in_(user_ids)).all()
-            names = [u.email for u in users]
+            emails = workflow_policy_engine.resolve_user_emails(db, request.customer_id, user_ids)
+            names = [emails[uid] for uid in user_ids if uid in emails]
             return ", ".join(names) if names else "Specific Individuals"
         if policy.approver_type == "GROUP":
+            directory = directory or workflow_policy_engine.get_directory(db, request.customer_id)
             group_ids = [int(gid) for gid in policy.approver_values if str(gid).isdigit()]
-            groups = db.query(ApprovalGroup).filter(
-                ApprovalGroup.id.in_(group_ids),
-                ApprovalGroup.customer_id == request.customer_id
-            ).all()
-            names = [g.name for g in groups]
+            names = []
+            for gid in group_ids:
+                if gid in directory.groups:
+                    names.append(directory.groups[gid][0])
+                elif gid in directory.deleted_groups:
+                    names.append(directory.deleted_groups[gid])
             return ", ".join(names) if names else "Approval Group"
         if policy.approver_type == "ROLE":
             return f"Role: {', '.join(policy.approver_values)}"
         return policy.approver_type
 
-
     def submit_for_approval(self, db: Session, request_id: int, user_id: int) -> IssuanceRequest:
         """
         Unified submit flow: DRAFT -> creates V1 snapshot -> runs approval matrix
@@ -754,10 +630,7 @@ class IssuanceService:
             request.status = "PENDING_APPROVAL"
         else:
             # Distinguish: "no policies configured" vs "policies exist but none match"
-            has_any_policies = db.query(IssuanceWorkflowPolicy).filter(
-                IssuanceWorkflowPolicy.customer_id == request.customer_id,
-                IssuanceWorkflowPolicy.is_active == True,
-            ).count() > 0
+            has_any_policies = workflow_policy_engine.get_plan(db, request.customer_id).has_active_steps
 
             # Check if at least one policy was evaluated and skipped (auto-skip with audit entry)
             audit_entries = request.approval_chain_audit or []
@@ -882,10 +755,7 @@ class IssuanceService:
         flag_modified(request, 'approval_chain_audit')
 
         # 3. Check if Step is Complete
-        current_policy = db.query(IssuanceWorkflowPolicy).filter(
-            IssuanceWorkflowPolicy.customer_id == request.customer_id,
-            IssuanceWorkflowPolicy.step_sequence == request.current_approval_step
-        ).first()
+        current_policy = workflow_policy_engine.get_plan(db, request.customer_id).step_at(request.current_approval_step)
         
         policy_sigs = current_policy.required_signatures if current_policy else 1
         
@@ -1590,6 +1460,9 @@ class IssuanceService:
         request.status = "FACILITY_RESERVED"
         request.selected_sub_limit_id = sub_limit_id
 
+        from app.core.deadline_scheduler import schedule_reservation_deadline
+        schedule_reservation_deadline(db, request)
+
         db.add(request)
         db.commit()
         db.refresh(request)
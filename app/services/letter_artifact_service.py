@@ -0,0 +1,241 @@
+# app/services/letter_artifact_service.py
+"""
+Instruction letters served from rendered artifacts (app/core/letter_artifacts.py).
+
+Custody LGInstruction letters and issuance maintenance letters used to be
+re-templated and re-rendered through WeasyPrint on every view or print.
+Here the placeholder values are resolved as before, and the PDF comes from
+the artifact store keyed by (id, template version, data hash).
+
+The letter date is the instruction's own date (instruction_date, or for
+maintenance actions the execution date stored in action_data.letter_date)
+rather than the viewing date, so a letter's artifact stays valid across days.
+
+Pre-rendering: every commit that creates an LGInstruction, or issues a
+maintenance letter (instruction_status -> "Instruction Issued"), queues a
+render on a background thread with its own session. The first view is then
+a byte read too. Commits touching more than PRERENDER_MAX_PER_COMMIT letters
+(migrations, bulk imports) are skipped; those letters render on first view.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, selectinload
+
+import app.models as models
+from app.constants import ACTION_TYPE_LG_ACTIVATE_NON_OPERATIVE
+from app.core.change_tracking import FlushChanges, change_tracker
+from app.core.letter_artifacts import LetterArtifact, letter_artifact_store
+from app.models.models_issuance import IssuanceMaintenanceAction, IssuedLGRecord
+
+logger = logging.getLogger(__name__)
+
+KIND_LG_INSTRUCTION = "lg_instruction"
+KIND_MAINTENANCE_LETTER = "maintenance_letter"
+
+PRERENDER_ENABLED = os.getenv("LETTER_PRERENDER_ENABLED", "true").lower() == "true"
+PRERENDER_MAX_PER_COMMIT = int(os.getenv("LETTER_PRERENDER_MAX_PER_COMMIT", "20"))
+
+_CHANGE_CONSUMER = "letter_prerender"
+_SUPPRESS_PRERENDER_KEY = "_letter_prerender_suppressed"
+
+
+class LetterArtifactService:
+
+    # ---------------- Custody LG instructions ----------------
+
+    @staticmethod
+    def _instruction_query(db: Session):
+        return db.query(models.LGInstruction).options(
+            selectinload(models.LGInstruction.lg_record).selectinload(models.LGRecord.lg_currency),
+            selectinload(models.LGInstruction.lg_record).selectinload(models.LGRecord.issuing_bank),
+            selectinload(models.LGInstruction.lg_record).selectinload(models.LGRecord.beneficiary_corporate),
+            selectinload(models.LGInstruction.lg_record).selectinload(models.LGRecord.internal_owner_contact),
+            selectinload(models.LGInstruction.lg_record).selectinload(models.LGRecord.customer),
+            selectinload(models.LGInstruction.lg_record).selectinload(models.LGRecord.communication_bank),
+        )
+
+    def load_instruction(self, db: Session, instruction_id: int, customer_id: Optional[int] = None) -> Optional[models.LGInstruction]:
+        """An instruction with the LG relationships its letter needs."""
+        query = self._instruction_query(db).filter(models.LGInstruction.id == instruction_id)
+        if customer_id is not None:
+            query = query.filter(models.LGInstruction.lg_record.has(models.LGRecord.customer_id == customer_id))
+        return query.first()
+
+    def load_instructions(self, db: Session, instruction_ids: Iterable[int]) -> Dict[int, models.LGInstruction]:
+        """Several instructions with their letters' LG relationships, in one round of queries."""
+        ids = list(set(instruction_ids))
+        if not ids:
+            return {}
+        return {i.id: i for i in self._instruction_query(db).filter(models.LGInstruction.id.in_(ids)).all()}
+
+    def instruction_letter_context(self, db: Session, db_instruction: models.LGInstruction) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        """(template, placeholder values) of an instruction letter, or None if its template is gone."""
+        from app.crud.crud import crud_template, crud_lg_record, crud_currency, crud_bank
+
+        template = crud_template.get(db, db_instruction.template_id)
+        if not template:
+            return None
+
+        instruction_details = dict(db_instruction.details or {})
+        lg_record_for_template = db_instruction.lg_record
+        if lg_record_for_template:
+            recipient_name, recipient_address = crud_lg_record._get_recipient_details(db, lg_record_for_template)
+            letter_date = db_instruction.instruction_date.date() if db_instruction.instruction_date else date.today()
+
+            instruction_details.update({
+                "lg_number": lg_record_for_template.lg_number,
+                "lg_amount": float(lg_record_for_template.lg_amount),
+                "lg_currency": lg_record_for_template.lg_currency.iso_code,
+                "issuing_bank_name": lg_record_for_template.issuing_bank.name,
+                "lg_beneficiary_name": lg_record_for_template.beneficiary_corporate.entity_name,
+                "customer_name": lg_record_for_template.customer.name,
+                "internal_owner_email": lg_record_for_template.internal_owner_contact.email,
+                "current_date": letter_date.strftime("%Y-%m-%d"),
+                "platform_name": "Treasury Management Platform",
+                "recipient_name": recipient_name,
+                "recipient_address": recipient_address,
+            })
+            symbol = lg_record_for_template.lg_currency.symbol
+            instruction_details["lg_amount_formatted"] = f"{symbol} {float(lg_record_for_template.lg_amount):,.2f}"
+            if "original_lg_amount" in instruction_details:
+                instruction_details["original_lg_amount_formatted"] = f"{symbol} {float(instruction_details['original_lg_amount']):,.2f}"
+            if "new_lg_amount" in instruction_details:
+                instruction_details["new_lg_amount_formatted"] = f"{symbol} {float(instruction_details['new_lg_amount']):,.2f}"
+            if "decrease_amount" in instruction_details:
+                instruction_details["decrease_amount_formatted"] = f"{symbol} {float(instruction_details['decrease_amount']):,.2f}"
+
+            if db_instruction.instruction_type == ACTION_TYPE_LG_ACTIVATE_NON_OPERATIVE and "payment_details" in instruction_details:
+                payment_details = instruction_details["payment_details"]
+                instruction_details["payment_method"] = payment_details.get("payment_method")
+                instruction_details["payment_amount"] = float(payment_details.get("amount"))
+                instruction_details["payment_currency_code"] = crud_currency.get(db, payment_details.get("currency_id")).iso_code if payment_details.get("currency_id") else ""
+                instruction_details["payment_reference"] = payment_details.get("payment_reference")
+                instruction_details["payment_issuing_bank_name"] = crud_bank.get(db, payment_details.get("issuing_bank_id")).name if payment_details.get("issuing_bank_id") else ""
+                instruction_details["payment_date"] = payment_details.get("payment_date")
+                instruction_details["payment_amount_formatted"] = f"{instruction_details['payment_currency_code']} {instruction_details['payment_amount']:,.2f}"
+
+        return template, instruction_details
+
+    async def instruction_letter(self, db: Session, db_instruction: models.LGInstruction) -> Optional[LetterArtifact]:
+        """The rendered letter of an instruction; raises LookupError if its template is gone."""
+        context = self.instruction_letter_context(db, db_instruction)
+        if context is None:
+            raise LookupError(f"Template ID {db_instruction.template_id} not found.")
+        template, data = context
+        return await letter_artifact_store.aget_or_render(
+            KIND_LG_INSTRUCTION, db_instruction.id, template, data,
+            filename_hint=f"lg_instruction_{db_instruction.serial_number}",
+        )
+
+    # ---------------- Issuance maintenance letters ----------------
+
+    async def maintenance_letter(self, db: Session, action: IssuanceMaintenanceAction, lg: IssuedLGRecord) -> Optional[LetterArtifact]:
+        """The rendered letter of a maintenance action; raises LookupError if no template exists."""
+        from app.services.issuance_maintenance_service import maintenance_service
+
+        context = maintenance_service.maintenance_letter_context(db, action, lg)
+        if context is None:
+            raise LookupError(f"No template found for maintenance letter: {action.action_type}")
+        template, data = context
+        return await letter_artifact_store.aget_or_render(
+            KIND_MAINTENANCE_LETTER, action.id, template, data,
+            filename_hint=f"maint_{action.letter_serial_number or action.id}",
+        )
+
+    # ---------------- Pre-rendering ----------------
+
+    @contextmanager
+    def prerender_suppressed(self, db: Session):
+        """No pre-render is queued for letters committed by db inside this block
+        (callers that render their letters themselves, e.g. bulk renewal)."""
+        db.info[_SUPPRESS_PRERENDER_KEY] = True
+        try:
+            yield
+        finally:
+            db.info.pop(_SUPPRESS_PRERENDER_KEY, None)
+
+    def prerender(self, instruction_ids: Set[int], maintenance_action_ids: Set[int]) -> None:
+        """Renders the given letters into the artifact store (own session; run off the request path)."""
+        from app.database import SessionLocal
+        from app.services.issuance_maintenance_service import maintenance_service
+
+        db = SessionLocal()
+        try:
+            for instruction_id in sorted(instruction_ids):
+                db_instruction = self.load_instruction(db, instruction_id)
+                context = self.instruction_letter_context(db, db_instruction) if db_instruction else None
+                if context is not None:
+                    letter_artifact_store.get_or_render(
+                        KIND_LG_INSTRUCTION, instruction_id, *context,
+                        filename_hint=f"lg_instruction_{db_instruction.serial_number}",
+                    )
+            for action_id in sorted(maintenance_action_ids):
+                action = db.query(IssuanceMaintenanceAction).filter(IssuanceMaintenanceAction.id == action_id).first()
+                lg = db.query(IssuedLGRecord).filter(IssuedLGRecord.id == action.issued_lg_id).first() if action else None
+                context = maintenance_service.maintenance_letter_context(db, action, lg) if lg else None
+                if context is not None:
+                    letter_artifact_store.get_or_render(
+                        KIND_MAINTENANCE_LETTER, action_id, *context,
+                        filename_hint=f"maint_{action.letter_serial_number or action_id}",
+                    )
+        except Exception as e:
+            logger.warning(f"Letter pre-render failed: {e}", exc_info=True)
+        finally:
+            db.close()
+
+
+letter_artifact_service = LetterArtifactService()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _prerender_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="letter-prerender")
+        return _executor
+
+
+# ==============================================================================
+# CHANGE TRACKING: queue a pre-render for letters issued by the committed transaction
+# ==============================================================================
+
+def _collect_issued_letters(session: Session, changes: FlushChanges):
+    if not PRERENDER_ENABLED or session.info.get(_SUPPRESS_PRERENDER_KEY):
+        return
+    instruction_ids = {obj.id for obj in changes.new(models.LGInstruction)}
+    action_ids = {
+        obj.id for bucket in (changes.new, changes.dirty) for obj in bucket(IssuanceMaintenanceAction)
+        if obj.instruction_status == "Instruction Issued" and inspect(obj).attrs.instruction_status.history.has_changes()
+    }
+    if instruction_ids or action_ids:
+        pending = change_tracker.pending(session, _CHANGE_CONSUMER)
+        pending[0].update(instruction_ids)
+        pending[1].update(action_ids)
+
+
+def _queue_letter_prerender(session: Session, pending: Tuple[Set[int], Set[int]]):
+    instruction_ids, action_ids = pending
+    if len(instruction_ids) + len(action_ids) > PRERENDER_MAX_PER_COMMIT:
+        logger.debug(f"Skipping letter pre-render for a bulk commit ({len(instruction_ids)} instructions, {len(action_ids)} maintenance letters).")
+        return
+    _prerender_executor().submit(letter_artifact_service.prerender, instruction_ids, action_ids)
+
+
+change_tracker.register(
+    _CHANGE_CONSUMER,
+    models=(models.LGInstruction, IssuanceMaintenanceAction),
+    collect=_collect_issued_letters,
+    apply=_queue_letter_prerender,
+    factory=lambda: (set(), set()),
+)
@@ -0,0 +1,222 @@
+# app/services/lg_history_service.py
+"""
+Append-only action history of issued LGs (IssuedLGHistoryEvent).
+
+History used to live in IssuedLGRecord.action_history, a JSON array that was
+read, copied and rewritten whole on every maintenance action, so each change
+cost more the longer the LG had lived. Now every entry is one inserted row
+holding only the fields it changed:
+
+    changes = {"expiry_date": ["2026-01-31", "2026-07-31"]}
+
+Recording an entry is a single INSERT whatever the history length; reads are
+keyset pages over (issued_lg_id, id).
+
+as_legacy_entries() rebuilds the old {action_type, before, after, user_id,
+timestamp, notes} shape for the export consumers; list views only get each
+LG's entry count and newest entry (summaries_by_lg()). backfill()
+moves the legacy JSON arrays into events once (run by app.core.schema_migrations).
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, null, update
+from sqlalchemy.orm import Session
+
+from app.models.models_issuance import IssuedLGHistoryEvent, IssuedLGRecord
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+BACKFILL_BATCH_SIZE = 200
+
+# Keys of a legacy entry that map onto event columns; anything else goes to `extra`
+_LEGACY_KEYS = {"action_type", "before", "after", "user_id", "timestamp", "notes", "diff"}
+
+
+def field_changes(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """{field: [before, after]} for the fields whose value differs between two snapshots."""
+    before = before or {}
+    after = after or {}
+    changes = {}
+    for field in list(before) + [k for k in after if k not in before]:
+        old, new = before.get(field), after.get(field)
+        if old != new:
+            changes[field] = [old, new]
+    return changes
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str) and value.strip():
+        try:
+            parsed = datetime.fromisoformat(value.strip())
+        except ValueError:
+            return None
+    else:
+        return None
+    # Legacy timestamps are naive UTC (datetime.utcnow())
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class LGHistoryService:
+
+    # ---------------- Write ----------------
+
+    def record(self, db: Session, issued_lg_id: int, action_type: str,
+               before: Optional[Dict[str, Any]] = None, after: Optional[Dict[str, Any]] = None,
+               user_id: Optional[int] = None, notes: Optional[str] = None,
+               extra: Optional[Dict[str, Any]] = None, changes: Optional[Dict[str, List[Any]]] = None,
+               occurred_at: Any = None) -> IssuedLGHistoryEvent:
+        """
+        Appends one history entry. Pass before/after snapshots (only the
+        differing fields are stored) or ready-made `changes`. Never reads the
+        LG's earlier history.
+        """
+        timestamp = _parse_timestamp(occurred_at)
+        if timestamp is None and occurred_at:
+            # Keep an unparseable source timestamp (e.g. from a migration file) verbatim
+            extra = {**(extra or {}), "timestamp": str(occurred_at)}
+        event = IssuedLGHistoryEvent(
+            issued_lg_id=issued_lg_id,
+            action_type=action_type,
+            changes=changes if changes is not None else field_changes(before, after),
+            extra=extra or None,
+            user_id=user_id,
+            notes=notes,
+            occurred_at=timestamp or datetime.now(timezone.utc),
+        )
+        db.add(event)
+        return event
+
+    # ---------------- Read ----------------
+
+    def page(self, db: Session, issued_lg_id: int, limit: int = DEFAULT_PAGE_SIZE,
+             before_id: Optional[int] = None) -> Tuple[List[IssuedLGHistoryEvent], Optional[int]]:
+        """Newest-first page of an LG's history and the before_id of the next page (None at the end)."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        query = db.query(IssuedLGHistoryEvent).filter(IssuedLGHistoryEvent.issued_lg_id == issued_lg_id)
+        if before_id is not None:
+            query = query.filter(IssuedLGHistoryEvent.id < before_id)
+        rows = query.order_by(IssuedLGHistoryEvent.id.desc()).limit(limit + 1).all()
+        if len(rows) > limit:
+            return rows[:limit], rows[limit - 1].id
+        return rows, None
+
+    def entries_by_lg(self, db: Session, issued_lg_ids: Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """Full history of several LGs in the legacy entry shape, oldest first, in one query."""
+        ids = list(set(issued_lg_ids))
+        grouped: Dict[int, List[IssuedLGHistoryEvent]] = {}
+        if ids:
+            events = db.query(IssuedLGHistoryEvent).filter(
+                IssuedLGHistoryEvent.issued_lg_id.in_(ids)
+            ).order_by(IssuedLGHistoryEvent.issued_lg_id, IssuedLGHistoryEvent.id).all()
+            for event in events:
+                grouped.setdefault(event.issued_lg_id, []).append(event)
+        return {lg_id: self.as_legacy_entries(events) for lg_id, events in grouped.items()}
+
+    def summaries_by_lg(self, db: Session, issued_lg_ids: Iterable[int]) -> Dict[int, Tuple[int, Dict[str, Any]]]:
+        """(entry count, newest entry in the legacy shape) per LG with history, in two queries."""
+        ids = list(set(issued_lg_ids))
+        if not ids:
+            return {}
+        stats = db.query(
+            IssuedLGHistoryEvent.issued_lg_id, func.count(IssuedLGHistoryEvent.id), func.max(IssuedLGHistoryEvent.id)
+        ).filter(IssuedLGHistoryEvent.issued_lg_id.in_(ids)).group_by(IssuedLGHistoryEvent.issued_lg_id).all()
+        latest = {event.id: event for event in db.query(IssuedLGHistoryEvent).filter(
+            IssuedLGHistoryEvent.id.in_([max_id for _, _, max_id in stats])
+        )}
+        return {
+            lg_id: (count, self.as_legacy_entries([latest[max_id]])[0])
+            for lg_id, count, max_id in stats
+        }
+
+    def serialize(self, event: IssuedLGHistoryEvent) -> Dict[str, Any]:
+        return {
+            "id": event.id,
+            "action_type": event.action_type,
+            "changes": event.changes or {},
+            "extra": event.extra or {},
+            "user_id": event.user_id,
+            "notes": event.notes,
+            "occurred_at": event.occurred_at.isoformat() if event.occurred_at else None,
+        }
+
+    def as_legacy_entries(self, events: Iterable[IssuedLGHistoryEvent]) -> List[Dict[str, Any]]:
+        """Events as legacy action_history entries (before / after hold the changed fields)."""
+        entries = []
+        for event in events:
+            changes = event.changes or {}
+            entry = {
+                "action_type": event.action_type,
+                "before": {field: values[0] for field, values in changes.items()},
+                "after": {field: values[1] for field, values in changes.items()},
+                "user_id": event.user_id,
+                "timestamp": str(event.occurred_at) if event.occurred_at else None,
+                "notes": event.notes,
+            }
+            entry.update(event.extra or {})
+            entries.append(entry)
+        return entries
+
+    # ---------------- Legacy backfill ----------------
+
+    def _events_from_legacy(self, issued_lg_id: int, history: List[Any]) -> List[IssuedLGHistoryEvent]:
+        events = []
+        for seq, entry in enumerate(history):
+            if not isinstance(entry, dict):
+                continue
+            if isinstance(entry.get("diff"), dict):
+                # Migration reconstruction entries: {field: {"old", "new"}}
+                changes = {
+                    field: [values.get("old"), values.get("new")]
+                    for field, values in entry["diff"].items() if isinstance(values, dict)
+                }
+            else:
+                changes = field_changes(entry.get("before"), entry.get("after"))
+            extra = {k: v for k, v in entry.items() if k not in _LEGACY_KEYS}
+            occurred_at = _parse_timestamp(entry.get("timestamp"))
+            if occurred_at is None and entry.get("timestamp"):
+                extra["timestamp"] = entry["timestamp"]
+            events.append(IssuedLGHistoryEvent(
+                issued_lg_id=issued_lg_id,
+                action_type=entry.get("action_type") or "UNKNOWN",
+                changes=changes,
+                extra=extra or None,
+                user_id=entry.get("user_id") if isinstance(entry.get("user_id"), int) else None,
+                notes=entry.get("notes"),
+                occurred_at=occurred_at or datetime.now(timezone.utc),
+                legacy_seq=seq,
+            ))
+        return events
+
+    def backfill(self, db: Session, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+        """
+        Moves every remaining legacy action_history array into events and
+        clears the column, committing per batch of LGs. Returns the number of
+        events written. Safe to re-run: cleared LGs are not selected again.
+        """
+        total = 0
+        while True:
+            rows = db.query(IssuedLGRecord.id, IssuedLGRecord.action_history).filter(
+                IssuedLGRecord.action_history.isnot(None)
+            ).order_by(IssuedLGRecord.id).limit(batch_size).all()
+            if not rows:
+                return total
+            for issued_lg_id, history in rows:
+                events = self._events_from_legacy(issued_lg_id, history if isinstance(history, list) else [])
+                db.add_all(events)
+                total += len(events)
+            db.execute(
+                update(IssuedLGRecord.__table__)
+                .where(IssuedLGRecord.__table__.c.id.in_([r[0] for r in rows]))
+                .values(action_history=null())
+            )
+            db.commit()
+
+
+lg_history_service = LGHistoryService()
@@ -0,0 +1,783 @@
+# app/services/quotation_offer_book.py
+"""
+Live RFQ Offer Book.
+
+Keeps an in-memory book per RFQ (invited banks + submitted offers) from which
+the standings are derived: ranking, winner evaluation (Execution vs
+Indicative, max tolerance), best rate, spread to best / CBE and response
+counts.
+
+- A book is built with two queries (assignments with their banks, offers).
+- Offer submissions are applied incrementally to the cached book of the
+  worker that received them; other workers notice the change through a
+  one-row version probe (offer count + max offer id) after
+  REVALIDATE_SECONDS, and rebuild.
+- Stats across many completed RFQs are probed and built in bulk, so reading
+  standings costs O(1) queries however many banks or RFQs are involved. The
+  stats keep only each RFQ's compact ranking (keyed by its offer version), in
+  a cache of their own, so a stats read over thousands of RFQs does not evict
+  the live books.
+- Both caches are sized from the environment (OFFER_BOOK_MAX_BOOKS,
+  OFFER_BOOK_MAX_RANKINGS).
+- Stream subscribers (SSE) are woken whenever the local book changes.
+
+The ranking rules are the ones previously inlined in quotations_endpoints
+(get_rfq_results / get_quotation_stats); outputs are unchanged.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.models_quotation import (
+    QuotationRequest, QuotationBankAssignment, QuotationBank, QuotationOffer, QuotationTBillOffer
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_BOOKS = int(os.getenv("OFFER_BOOK_MAX_BOOKS", "512"))
+MAX_RANKINGS = int(os.getenv("OFFER_BOOK_MAX_RANKINGS", "20000"))
+
+
+@dataclass(frozen=True)
+class RfqTerms:
+    """The RFQ fields the standings depend on (immutable once the RFQ is created)."""
+    rfq_id: str
+    type: str
+    direction: Optional[str]
+    amount: Optional[float]
+    eval_rate: Optional[float]
+    quotation_base: Optional[str]
+    max_tolerance_percent: Optional[float]
+    buy_currency: Optional[str]
+    sell_currency: Optional[str]
+
+    @classmethod
+    def from_rfq(cls, rfq: QuotationRequest) -> "RfqTerms":
+        return cls(
+            rfq_id=rfq.id, type=rfq.type, direction=rfq.direction, amount=rfq.amount,
+            eval_rate=rfq.eval_rate, quotation_base=rfq.quotation_base,
+            max_tolerance_percent=rfq.max_tolerance_percent,
+            buy_currency=rfq.buy_currency, sell_currency=rfq.sell_currency,
+        )
+
+    @property
+    def is_tbill(self) -> bool:
+        return self.type == 'TBILL'
+
+
+@dataclass(frozen=True)
+class BookAssignment:
+    id: str
+    quotation_bank_id: int
+    bank_id: int
+    bank_name: str
+    bank_emails: str
+    has_bank: bool
+    token: str
+    cost_min: float
+    cost_percent: float
+    cost_max: float
+    cost_flat: float
+    quotation_base: Optional[str]
+    is_document_visible: Optional[bool]
+
+    @classmethod
+    def from_orm(cls, a: QuotationBankAssignment) -> "BookAssignment":
+        q_bank = a.quotation_bank
+        return cls(
+            id=a.id,
+            quotation_bank_id=a.quotation_bank_id,
+            bank_id=q_bank.bank_id if q_bank else 0,
+            bank_name=q_bank.bank.name if q_bank and q_bank.bank else "Unknown Bank",
+            bank_emails=q_bank.emails if q_bank else "",
+            has_bank=bool(q_bank and q_bank.bank),
+            token=a.token,
+            cost_min=a.cost_min, cost_percent=a.cost_percent, cost_max=a.cost_max, cost_flat=a.cost_flat,
+            quotation_base=a.quotation_base,
+            is_document_visible=a.is_document_visible,
+        )
+
+
+@dataclass(frozen=True)
+class FxQuote:
+    id: int
+    price: float
+    submitted_at: Optional[datetime]
+
+
+@dataclass(frozen=True)
+class TBillLine:
+    id: int
+    settlement_date: str
+    maturity_date: str
+    discount_rate: float
+    max_amount: float
+    submitted_at: Optional[datetime]
+
+
+@dataclass
+class OfferBook:
+    terms: RfqTerms
+    assignments: List[BookAssignment]
+    fx_quotes: Dict[str, List[FxQuote]] = field(default_factory=dict)
+    tbill_lines: Dict[str, List[TBillLine]] = field(default_factory=dict)
+    offer_count: int = 0
+    max_offer_id: int = 0
+    checked_at: float = 0.0
+    revision: int = 0
+    _standings: Optional[Dict[str, Any]] = None
+    _stats_ranking: Optional[List[Dict[str, Any]]] = None
+
+    @property
+    def version(self) -> Tuple[int, int]:
+        return (self.offer_count, self.max_offer_id)
+
+    def _changed(self) -> None:
+        self._standings = None
+        self._stats_ranking = None
+        self.revision += 1
+
+    # ---------------- Incremental updates ----------------
+
+    def apply_fx_offer(self, assignment_id: str, quote: FxQuote) -> None:
+        self.fx_quotes.setdefault(assignment_id, []).append(quote)
+        self.offer_count += 1
+        self.max_offer_id = max(self.max_offer_id, quote.id)
+        self._changed()
+
+    def replace_tbill_lines(self, assignment_id: str, lines: List[TBillLine], deleted_count: int) -> None:
+        self.tbill_lines[assignment_id] = list(lines)
+        self.offer_count += len(lines) - deleted_count
+        self.max_offer_id = max([self.max_offer_id] + [l.id for l in lines])
+        self._changed()
+
+    # ---------------- Derived views ----------------
+
+    @property
+    def standings(self) -> Dict[str, Any]:
+        if self._standings is None:
+            self._standings = compute_tbill_standings(self) if self.terms.is_tbill else compute_fx_standings(self)
+        return self._standings
+
+    @property
+    def stats_ranking(self) -> List[Dict[str, Any]]:
+        if self._stats_ranking is None:
+            self._stats_ranking = compute_stats_ranking(self)
+        return self._stats_ranking
+
+    @property
+    def responded_count(self) -> int:
+        offers = self.tbill_lines if self.terms.is_tbill else self.fx_quotes
+        return sum(1 for a in self.assignments if offers.get(a.id))
+
+
+# ==============================================================================
+# 1. STANDINGS (pure functions over a book)
+# ==============================================================================
+
+def _base_of(item_base: Optional[str], terms: RfqTerms) -> str:
+    return (item_base or terms.quotation_base or 'Execution').lower()
+
+
+def compute_fx_standings(book: OfferBook) -> Dict[str, Any]:
+    terms = book.terms
+    results = []
+    for a in book.assignments:
+        quotes = book.fx_quotes.get(a.id)
+        if not quotes:
+            results.append({
+                "bank_id": a.bank_id,
+                "quotation_bank_id": a.quotation_bank_id,
+                "bank_name": a.bank_name,
+                "bank_emails": a.bank_emails,
+                "price": None,
+                "finalPrice": None,
+                "submitted_at": None,
+                "token": a.token,
+                "quotation_base": a.quotation_base or terms.quotation_base,
+                "is_document_visible": a.is_document_visible if a.is_document_visible is not None else True
+            })
+            continue
+
+        # Latest submission counts
+        latest = max(quotes, key=lambda q: (q.submitted_at is not None, q.submitted_at, q.id))
+        price = latest.price
+        deal_amount = float(terms.amount or 1.0)
+        base_deal_volume = deal_amount * price
+        raw_fee = (base_deal_volume * (float(a.cost_percent or 0) / 100.0)) + float(a.cost_flat or 0)
+        clamped_fee = raw_fee
+        if a.cost_min and a.cost_min > 0:
+            clamped_fee = max(clamped_fee, float(a.cost_min))
+        if a.cost_max and a.cost_max > 0:
+            clamped_fee = min(clamped_fee, float(a.cost_max))
+
+        fee_per_unit = clamped_fee / deal_amount if deal_amount > 0 else 0.0
+        is_sell_dir = (terms.direction and terms.direction.lower() == 'sell')
+        final_all_in_price = (price - fee_per_unit) if is_sell_dir else (price + fee_per_unit)
+
+        results.append({
+            "bank_id": a.bank_id,
+            "quotation_bank_id": a.quotation_bank_id,
+            "bank_name": a.bank_name,
+            "bank_emails": a.bank_emails,
+            "price": price,
+            "finalPrice": final_all_in_price,
+            "bank_fee_total": clamped_fee,
+            "fee_per_unit": fee_per_unit,
+            "submitted_at": latest.submitted_at,
+            "token": a.token,
+            "quotation_base": a.quotation_base or terms.quotation_base,
+            "is_document_visible": a.is_document_visible if a.is_document_visible is not None else True
+        })
+
+    # Filter nulls and sort by direction
+    is_sell = (terms.direction and terms.direction.lower() == 'sell')
+    valid_results = [r for r in results if r.get('finalPrice') is not None]
+    valid_results.sort(key=lambda x: x['finalPrice'], reverse=is_sell)
+    results = valid_results + [r for r in results if r.get('finalPrice') is None]
+
+    # --- Evaluation Logic: Execution vs Indicative & Max Tolerance Check ---
+    has_execution_banks = any(_base_of(r.get('quotation_base'), terms) == 'execution' for r in results)
+
+    winner_bank_id = None
+    is_inconclusive = False
+    inconclusive_reason = None
+    best_indicative_rate = None
+    best_execution_rate = None
+    deviation_percent = None
+
+    if not has_execution_banks:
+        # Scenario B: All banks are Indicative -> pure market sounding
+        is_inconclusive = True
+        inconclusive_reason = "All counterparties were requested on an Indicative basis. No binding winner is selected."
+    else:
+        indicative_bids = [r for r in valid_results if _base_of(r.get('quotation_base'), terms) == 'indicative']
+        execution_bids = [r for r in valid_results if _base_of(r.get('quotation_base'), terms) == 'execution']
+
+        if indicative_bids:
+            best_indicative_rate = indicative_bids[0]['finalPrice']  # Already sorted by direction
+        if execution_bids:
+            best_execution_rate = execution_bids[0]['finalPrice']
+
+        if execution_bids:
+            best_exec_item = execution_bids[0]
+            if best_indicative_rate is not None and best_execution_rate is not None:
+                # Scenario C: Mixed -> one-directional deviation vs the Indicative benchmark
+                if is_sell:
+                    deviation_percent = ((best_indicative_rate - best_execution_rate) / best_indicative_rate) * 100.0
+                else:
+                    deviation_percent = ((best_execution_rate - best_indicative_rate) / best_indicative_rate) * 100.0
+
+                if deviation_percent <= 0:
+                    winner_bank_id = best_exec_item['bank_id']
+                else:
+                    max_tol = terms.max_tolerance_percent if terms.max_tolerance_percent is not None else 0.0
+                    if deviation_percent > max_tol:
+                        is_inconclusive = True
+                        inconclusive_reason = (
+                            f"The best Execution rate ({best_execution_rate:.4f}) exceeded the Indicative benchmark "
+                            f"({best_indicative_rate:.4f}) by {deviation_percent:.2f}%, which is higher than the allowed tolerance of {max_tol:.2f}%."
+                        )
+                    else:
+                        winner_bank_id = best_exec_item['bank_id']
+            else:
+                # Scenario A: All Execution or no Indicative quotes submitted
+                winner_bank_id = best_exec_item['bank_id']
+
+    return {
+        "results": results,
+        "winner_bank_id": winner_bank_id,
+        "is_inconclusive": is_inconclusive,
+        "inconclusive_reason": inconclusive_reason,
+        "best_indicative_rate": best_indicative_rate,
+        "best_execution_rate": best_execution_rate,
+        "deviation_percent": deviation_percent,
+        "has_execution_banks": has_execution_banks
+    }
+
+
+def _score_tbill_offers(terms: RfqTerms, offers: List[Dict[str, Any]], score_key: str) -> List[Dict[str, Any]]:
+    """
+    Normalizes T-Bill lines of one RFQ to a comparable score (lower wins).
+    Buy: price normalized to the earliest settlement / latest maturity using
+    the evaluation rate. Sell: lowest discount rate wins.
+    """
+    is_buy = (terms.direction and terms.direction.lower() == 'buy')
+    eval_rate = (terms.eval_rate or 0) / 100.0
+
+    s_min = None
+    m_max = None
+    parsed_offers = []
+    for o in offers:
+        try:
+            s_dt = datetime.strptime(o['settlement_date'], "%Y-%m-%d")
+            m_dt = datetime.strptime(o['maturity_date'], "%Y-%m-%d")
+        except Exception:
+            continue
+        o['s_dt'] = s_dt
+        o['m_dt'] = m_dt
+        parsed_offers.append(o)
+        if s_min is None or s_dt < s_min: s_min = s_dt
+        if m_max is None or m_dt > m_max: m_max = m_dt
+
+    for o in parsed_offers:
+        days = (o['m_dt'] - o['s_dt']).days
+        price = 100.0 * (1.0 - (o['discount_rate'] / 100.0) * (days / 360.0))
+        if is_buy:
+            delta_s = (o['s_dt'] - s_min).days
+            delta_m = (m_max - o['m_dt']).days
+            # Accrue maturity gap to m_max, then discount back for settlement delay
+            m_accrual_factor = 1.0 + (eval_rate * (delta_m / 360.0))
+            s_discount_factor = 1.0 - (eval_rate * (delta_s / 360.0))
+            o[score_key] = (price / m_accrual_factor) * s_discount_factor
+        else:
+            o[score_key] = o['discount_rate']
+    return parsed_offers
+
+
+def compute_tbill_standings(book: OfferBook) -> Dict[str, Any]:
+    terms = book.terms
+    all_tbill_offers = []
+    for a in book.assignments:
+        for o in book.tbill_lines.get(a.id, []):
+            all_tbill_offers.append({
+                "bank_id": a.bank_id,
+                "bank_name": a.bank_name,
+                "bank_emails": a.bank_emails,
+                "settlement_date": o.settlement_date,
+                "maturity_date": o.maturity_date,
+                "discount_rate": o.discount_rate,
+                "max_amount": o.max_amount,
+                "submitted_at": o.submitted_at
+            })
+
+    if not all_tbill_offers:
+        return {
+            "results": [{
+                "bank_id": a.bank_id,
+                "bank_name": a.bank_name,
+                "bank_emails": a.bank_emails,
+                "offers": [],
+                "best_score": None,
+                "token": a.token
+            } for a in book.assignments],
+        }
+
+    parsed_offers = _score_tbill_offers(terms, all_tbill_offers, 'score')
+
+    # Group by bank and take the best offer
+    bank_best = {}
+    for o in parsed_offers:
+        bid = o['bank_id']
+        if bid not in bank_best or o['score'] < bank_best[bid]['score']:
+            bank_best[bid] = o
+
+    results = []
+    for a in book.assignments:
+        best_offer = bank_best.get(a.bank_id)
+        results.append({
+            "bank_id": a.bank_id,
+            "quotation_bank_id": a.quotation_bank_id,
+            "bank_name": a.bank_name,
+            "bank_emails": a.bank_emails,
+            "offers": [o for o in parsed_offers if o['bank_id'] == a.bank_id],
+            "best_score": best_offer['score'] if best_offer else None,
+            "token": a.token,
+            "quotation_base": a.quotation_base or terms.quotation_base,
+            "is_document_visible": a.is_document_visible if a.is_document_visible is not None else True
+        })
+
+    # Lowest score wins (Lowest price for buy, Lowest DR for sell)
+    results.sort(key=lambda x: (x['best_score'] is None, x['best_score']))
+    winner_bank_id = None
+    if results and results[0].get('best_score') is not None:
+        winner_bank_id = results[0]['bank_id']
+
+    return {
+        "results": results,
+        "winner_bank_id": winner_bank_id,
+        "is_inconclusive": False,
+        "inconclusive_reason": None,
+        "best_indicative_rate": None,
+        "best_execution_rate": None,
+        "deviation_percent": None,
+        "has_execution_banks": False
+    }
+
+
+def compute_stats_ranking(book: OfferBook) -> List[Dict[str, Any]]:
+    """
+    Per-RFQ ranking used by the Market Insights stats: best raw price per
+    bank (FX) or best normalized line (T-Bill), keyed by quotation_bank_id.
+    """
+    terms = book.terms
+    if not terms.is_tbill:
+        offers = []
+        for a in book.assignments:
+            quotes = book.fx_quotes.get(a.id)
+            if quotes:
+                best = min(quotes, key=lambda q: (q.price, q.id))
+                offers.append({'bank_id': a.quotation_bank_id, 'price': best.price, 'name': a.bank_name if a.has_bank else 'Unknown'})
+        is_sell = (terms.direction and terms.direction.lower() == 'sell')
+        return sorted(offers, key=lambda x: x['price'], reverse=is_sell)
+
+    rfq_offers = []
+    for a in book.assignments:
+        lines = book.tbill_lines.get(a.id)
+        if lines:
+            best = min(lines, key=lambda l: (l.discount_rate, l.id))
+            rfq_offers.append({
+                'bank_id': a.quotation_bank_id,
+                'name': a.bank_name if a.has_bank else 'Unknown',
+                'settlement_date': best.settlement_date,
+                'maturity_date': best.maturity_date,
+                'discount_rate': best.discount_rate
+            })
+    if not rfq_offers:
+        return []
+
+    scored = _score_tbill_offers(terms, rfq_offers, 'final_price')
+    scored.sort(key=lambda x: x['final_price'])
+    return [{'bank_id': o['bank_id'], 'price': o['final_price'], 'name': o['name']} for o in scored]
+
+
+def aggregate_bank_stats(rankings: Iterable[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Win rate, podium counts and average spread to the winner, per bank."""
+    bank_stats = {}
+    for sorted_offers in rankings:
+        for i, offer in enumerate(sorted_offers):
+            bid_id = offer['bank_id']
+            if bid_id not in bank_stats:
+                bank_stats[bid_id] = {
+                    'bank_id': bid_id,
+                    'bank_name': offer['name'],
+                    'total_participated': 0,
+                    'total_won': 0,
+                    'ranks': {1: 0, 2: 0, 3: 0},
+                    'total_spread': 0.0,
+                    'spread_count': 0
+                }
+
+            stats = bank_stats[bid_id]
+            stats['total_participated'] += 1
+            rank = i + 1
+            if rank <= 3:
+                stats['ranks'][rank] += 1
+            if rank == 1:
+                stats['total_won'] += 1
+
+            winner_price = sorted_offers[0]['price']
+            if winner_price > 0:
+                spread = abs(offer['price'] - winner_price) / winner_price * 100
+                stats['total_spread'] += spread
+                stats['spread_count'] += 1
+
+    results = []
+    for s in bank_stats.values():
+        results.append({
+            'bank_id': s['bank_id'],
+            'bank_name': s['bank_name'],
+            'win_rate': (s['total_won'] / s['total_participated'] * 100) if s['total_participated'] > 0 else 0,
+            'total_won': s['total_won'],
+            'total_participated': s['total_participated'],
+            'ranks': s['ranks'],
+            'avg_spread': (s['total_spread'] / s['spread_count']) if s['spread_count'] > 0 else 0
+        })
+    return sorted(results, key=lambda x: x['win_rate'], reverse=True)
+
+
+# ==============================================================================
+# 2. BOOK CACHE
+# ==============================================================================
+
+class QuotationOfferBookService:
+    """Process-local cache of offer books with incremental updates and version probes."""
+
+    REVALIDATE_SECONDS = 2
+    CBE_RATE_TTL_SECONDS = 3600
+
+    def __init__(self, max_books: int = MAX_BOOKS, max_rankings: int = MAX_RANKINGS):
+        self.max_books = max_books
+        self.max_rankings = max_rankings
+        self._books: "OrderedDict[str, OfferBook]" = OrderedDict()
+        # rfq_id -> (terms, offer version, stats ranking)
+        self._rankings: "OrderedDict[str, Tuple[RfqTerms, Tuple[int, int], List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self._cbe_rates: Dict[Tuple[str, str], Tuple[float, Optional[float]]] = {}
+
+    # ---------------- Loading ----------------
+
+    def _probe_versions(self, db: Session, rfqs: List[RfqTerms]) -> Dict[str, Tuple[int, int]]:
+        """(offer count, max offer id) per RFQ: at most one grouped query per product type."""
+        versions = {t.rfq_id: (0, 0) for t in rfqs}
+        for offer_model, ids in (
+            (QuotationTBillOffer, [t.rfq_id for t in rfqs if t.is_tbill]),
+            (QuotationOffer, [t.rfq_id for t in rfqs if not t.is_tbill]),
+        ):
+            if not ids:
+                continue
+            rows = db.query(
+                QuotationBankAssignment.rfq_id, func.count(offer_model.id), func.max(offer_model.id)
+            ).join(
+                offer_model, offer_model.assignment_id == QuotationBankAssignment.id
+            ).filter(
+                QuotationBankAssignment.rfq_id.in_(ids)
+            ).group_by(QuotationBankAssignment.rfq_id).all()
+            for rfq_id, count, max_id in rows:
+                versions[rfq_id] = (count or 0, max_id or 0)
+        return versions
+
+    def _build_books(self, db: Session, rfqs: List[RfqTerms]) -> Dict[str, OfferBook]:
+        """Builds books for several RFQs with one assignments query and one offers query per product type."""
+        if not rfqs:
+            return {}
+        terms_by_id = {t.rfq_id: t for t in rfqs}
+        assignments = db.query(QuotationBankAssignment).options(
+            joinedload(QuotationBankAssignment.quotation_bank).joinedload(QuotationBank.bank)
+        ).filter(
+            QuotationBankAssignment.rfq_id.in_(list(terms_by_id))
+        ).order_by(QuotationBankAssignment.created_at, QuotationBankAssignment.id).all()
+
+        books = {rfq_id: OfferBook(terms=t, assignments=[]) for rfq_id, t in terms_by_id.items()}
+        rfq_of_assignment = {}
+        for a in assignments:
+            books[a.rfq_id].assignments.append(BookAssignment.from_orm(a))
+            rfq_of_assignment[a.id] = a.rfq_id
+
+        fx_ids = [a_id for a_id, r_id in rfq_of_assignment.items() if not terms_by_id[r_id].is_tbill]
+        tb_ids = [a_id for a_id, r_id in rfq_of_assignment.items() if terms_by_id[r_id].is_tbill]
+
+        if fx_ids:
+            for o in db.query(QuotationOffer.id, QuotationOffer.assignment_id, QuotationOffer.price, QuotationOffer.submitted_at).filter(
+                QuotationOffer.assignment_id.in_(fx_ids)
+            ).all():
+                book = books[rfq_of_assignment[o.assignment_id]]
+                book.fx_quotes.setdefault(o.assignment_id, []).append(FxQuote(o.id, o.price, o.submitted_at))
+                book.offer_count += 1
+                book.max_offer_id = max(book.max_offer_id, o.id)
+
+        if tb_ids:
+            for o in db.query(QuotationTBillOffer).filter(QuotationTBillOffer.assignment_id.in_(tb_ids)).order_by(QuotationTBillOffer.id).all():
+                book = books[rfq_of_assignment[o.assignment_id]]
+                book.tbill_lines.setdefault(o.assignment_id, []).append(TBillLine(
+                    o.id, o.settlement_date, o.maturity_date, o.discount_rate, o.max_amount, o.submitted_at
+                ))
+                book.offer_count += 1
+                book.max_offer_id = max(book.max_offer_id, o.id)
+
+        now = time.monotonic()
+        for book in books.values():
+            book.checked_at = now
+        return books
+
+    def _store(self, books: Dict[str, OfferBook]) -> None:
+        with self._lock:
+            for rfq_id, book in books.items():
+                previous = self._books.get(rfq_id)
+                if previous is not None:
+                    book.revision = previous.revision + 1
+                self._books[rfq_id] = book
+                self._books.move_to_end(rfq_id)
+            while len(self._books) > self.max_books:
+                self._books.popitem(last=False)
+
+    def get_books(self, db: Session, rfqs: List[QuotationRequest]) -> Dict[str, OfferBook]:
+        """Returns fresh books for the given RFQs (cached, probed or rebuilt in bulk)."""
+        terms = [RfqTerms.from_rfq(r) for r in rfqs]
+        now = time.monotonic()
+        result: Dict[str, OfferBook] = {}
+        to_probe: List[RfqTerms] = []
+        with self._lock:
+            for t in terms:
+                book = self._books.get(t.rfq_id)
+                if book is not None and book.terms == t and now - book.checked_at < self.REVALIDATE_SECONDS:
+                    result[t.rfq_id] = book
+                else:
+                    to_probe.append(t)
+
+        if not to_probe:
+            return result
+
+        versions = self._probe_versions(db, to_probe)
+        to_build: List[RfqTerms] = []
+        with self._lock:
+            for t in to_probe:
+                book = self._books.get(t.rfq_id)
+                if book is not None and book.terms == t and book.version == versions[t.rfq_id]:
+                    book.checked_at = now
+                    result[t.rfq_id] = book
+                else:
+                    to_build.append(t)
+
+        if to_build:
+            built = self._build_books(db, to_build)
+            self._store(built)
+            result.update(built)
+            for rfq_id in built:
+                self._notify(rfq_id)
+        return result
+
+    def get_book(self, db: Session, rfq: QuotationRequest) -> OfferBook:
+        return self.get_books(db, [rfq])[rfq.id]
+
+    # ---------------- Incremental updates (after commit) ----------------
+
+    def record_fx_offer(self, rfq_id: str, offer: QuotationOffer) -> None:
+        with self._lock:
+            book = self._books.get(rfq_id)
+            if book is not None:
+                book.apply_fx_offer(offer.assignment_id, FxQuote(offer.id, offer.price, offer.submitted_at))
+        self._notify(rfq_id)
+
+    def record_tbill_offers(self, rfq_id: str, assignment_id: str, lines: List[QuotationTBillOffer], deleted_count: int) -> None:
+        with self._lock:
+            book = self._books.get(rfq_id)
+            if book is not None:
+                book.replace_tbill_lines(assignment_id, [
+                    TBillLine(o.id, o.settlement_date, o.maturity_date, o.discount_rate, o.max_amount, o.submitted_at)
+                    for o in lines
+                ], deleted_count)
+        self._notify(rfq_id)
+
+    # ---------------- Views ----------------
+
+    def get_results(self, db: Session, rfq: QuotationRequest) -> Dict[str, Any]:
+        """The get_rfq_results payload (without the "rfq" key)."""
+        standings = self.get_book(db, rfq).standings
+        payload = dict(standings)
+        payload["results"] = [dict(r) for r in standings["results"]]
+        return payload
+
+    def get_bank_stats(self, db: Session, rfqs: List[QuotationRequest]) -> List[Dict[str, Any]]:
+        """
+        Market Insights stats over (typically many, completed) RFQs. Rankings
+        are reused while the RFQ's offer version is unchanged; missing ones are
+        built in bulk and only their ranking is kept, not the book.
+        """
+        terms = [RfqTerms.from_rfq(r) for r in rfqs]
+        versions = self._probe_versions(db, terms)
+        rankings: Dict[str, List[Dict[str, Any]]] = {}
+        to_build: List[RfqTerms] = []
+        with self._lock:
+            for t in terms:
+                cached = self._rankings.get(t.rfq_id)
+                if cached is not None and cached[0] == t and cached[1] == versions[t.rfq_id]:
+                    self._rankings.move_to_end(t.rfq_id)
+                    rankings[t.rfq_id] = cached[2]
+                else:
+                    to_build.append(t)
+
+        if to_build:
+            built = self._build_books(db, to_build)
+            with self._lock:
+                for rfq_id, book in built.items():
+                    rankings[rfq_id] = book.stats_ranking
+                    self._rankings[rfq_id] = (book.terms, book.version, rankings[rfq_id])
+                    self._rankings.move_to_end(rfq_id)
+                while len(self._rankings) > self.max_rankings:
+                    self._rankings.popitem(last=False)
+        return aggregate_bank_stats(rankings[t.rfq_id] for t in terms)
+
+    def _cbe_benchmark(self, db: Session, terms: RfqTerms) -> Optional[float]:
+        """CBE reference rate for the pair (non-EGP leg vs EGP, or cross via EGP), cached for an hour."""
+        if terms.is_tbill or not terms.buy_currency or not terms.sell_currency:
+            return None
+        buy, sell = terms.buy_currency.upper(), terms.sell_currency.upper()
+        if buy == "EGP":
+            pair = (sell, "EGP")
+        elif sell == "EGP":
+            pair = (buy, "EGP")
+        else:
+            pair = (buy, sell)
+
+        cached = self._cbe_rates.get(pair)
+        now = time.monotonic()
+        if cached and now - cached[0] < self.CBE_RATE_TTL_SECONDS:
+            return cached[1]
+
+        rate = None
+        try:
+            from app.services.fx_service import fx_service
+            value = fx_service.get_cbe_rate(db, pair[0], pair[1])
+            rate = float(value) if value else None
+        except Exception as e:
+            logger.warning(f"Offer book: CBE benchmark lookup failed for {pair}: {e}")
+        self._cbe_rates[pair] = (now, rate)
+        return rate
+
+    def get_summary(self, db: Session, rfq: QuotationRequest) -> Dict[str, Any]:
+        """Compact live standings: ranking, best rate, spreads and response counts."""
+        book = self.get_book(db, rfq)
+        standings = book.standings
+        terms = book.terms
+        cbe_rate = self._cbe_benchmark(db, terms)
+        rate_key = 'best_score' if terms.is_tbill else 'finalPrice'
+
+        ranked = [r for r in standings["results"] if r.get(rate_key) is not None]
+        best_rate = ranked[0][rate_key] if ranked else None
+        ranking = []
+        for i, r in enumerate(ranked):
+            rate = r[rate_key]
+            ranking.append({
+                "rank": i + 1,
+                "bank_id": r["bank_id"],
+                "bank_name": r["bank_name"],
+                "quotation_base": r.get("quotation_base"),
+                "rate": rate,
+                "spread_to_best_percent": (abs(rate - best_rate) / best_rate * 100) if best_rate else None,
+                "spread_vs_cbe_percent": ((rate - cbe_rate) / cbe_rate * 100) if cbe_rate and not terms.is_tbill else None,
+            })
+
+        return {
+            "rfq_id": rfq.id,
+            "status": rfq.status,
+            "revision": book.revision,
+            "best_rate": best_rate,
+            "winner_bank_id": standings.get("winner_bank_id"),
+            "is_inconclusive": standings.get("is_inconclusive", False),
+            "cbe_rate": cbe_rate,
+            "invited_count": len(book.assignments),
+            "responded_count": book.responded_count,
+            "ranking": ranking,
+        }
+
+    # ---------------- Push subscriptions ----------------
+
+    def subscribe(self, rfq_id: str) -> asyncio.Event:
+        event = asyncio.Event()
+        with self._lock:
+            self._subscribers.setdefault(rfq_id, set()).add((asyncio.get_running_loop(), event))
+        return event
+
+    def unsubscribe(self, rfq_id: str, event: asyncio.Event) -> None:
+        with self._lock:
+            subs = self._subscribers.get(rfq_id)
+            if not subs:
+                return
+            for entry in [s for s in subs if s[1] is event]:
+                subs.discard(entry)
+            if not subs:
+                self._subscribers.pop(rfq_id, None)
+
+    def _notify(self, rfq_id: str) -> None:
+        with self._lock:
+            subs = list(self._subscribers.get(rfq_id, ()))
+        for loop, event in subs:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # Loop closed
+
+
+quotation_offer_book = QuotationOfferBookService()
@@ -29,6 +29,7 @@ from app.models.models_issuance import (
 )
 from app.models.models import Currency
 from app.crud.crud import log_action
+from app.services.lg_history_service import lg_history_service
 
 logger = logging.getLogger(__name__)
 
@@ -779,11 +780,11 @@ class ReconciliationService:
                                          user_id: int = None) -> List[Dict]:
         """Use Gemini AI to extract LG position rows from unstructured content."""
         try:
-            from app.core.ai_integration import _get_genai_client, log_ai_usage_sync, GEMINI_MODEL_NAME
+            from app.core.ai_integration import log_ai_usage_sync
+            from app.core.ai_gateway import ai_gateway
             import fitz  # PyMuPDF
 
-            client = _get_genai_client()
-            if not client:
+            if not ai_gateway.available():
                 raise HTTPException(status_code=503,
                     detail="AI model not available. Upload Excel/CSV instead.")
 
@@ -827,8 +828,8 @@ Rules:
 Document text:
 {text}"""
 
-            response = client.models.generate_content(
-                model=GEMINI_MODEL_NAME, contents=prompt
+            response = await ai_gateway.generate(
+                prompt, call_type="reconciliation_pdf_parsing", customer_id=customer_id
             )
             response_text = response.text.strip()
 
@@ -979,17 +980,11 @@ Document text:
             "current_amount": str(lg.current_amount) if lg.current_amount else None,
             "expiry_date": str(lg.expiry_date) if lg.expiry_date else None,
         }
-        history = lg.action_history or []
-        history.append({
-            "action_type": "RECONCILIATION_ADJUSTMENT",
-            "field": result.field_name,
-            "before": before,
-            "after": after,
-            "user_id": admin_user_id,
-            "timestamp": str(datetime.utcnow()),
-            "notes": f"Adjusted via reconciliation (result #{result.id})",
-        })
-        lg.action_history = list(history)
+        lg_history_service.record(
+            db, lg.id, "RECONCILIATION_ADJUSTMENT", before, after, admin_user_id,
+            notes=f"Adjusted via reconciliation (result #{result.id})",
+            extra={"field": result.field_name},
+        )
         db.add(lg)
 
     # ══════════════════════════════════════════════════
@@ -0,0 +1,625 @@
+# app/services/workflow_policy_engine.py
+"""
+Compiled Workflow Policy Engine.
+
+Approval policies (IssuanceWorkflowPolicy) change a few times a year but are
+evaluated on every submit, approve and roadmap render. This module compiles a
+customer's policies into an immutable plan (parsed amount bounds, per-step
+predicates, AMOUNT_OVER thresholds pre-sorted per currency) and keeps an
+in-memory approver directory (users by role, group members, department heads,
+user emails) so that step advancement and roadmap rendering do no policy or
+approver reads in the steady state.
+
+Freshness:
+- Writes made in this worker (policies, users, departments, approval groups)
+  invalidate the affected customer's entries when the session commits.
+- Writes made by other workers are picked up by a cheap version probe
+  (count / max id / max update time) after CACHE_REVALIDATE_SECONDS.
+  Approval-group membership has no timestamps, so its probe is a checksum
+  of the (group, user) association rows: swapping one member for another
+  changes it even though the row count stays the same.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+from types import MappingProxyType
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, Optional, Set, Tuple
+
+from sqlalchemy import BigInteger, cast, func, inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from app.core.change_tracking import FlushChanges, change_tracker
+from app.models.models import User, Department, ApprovalGroup, user_approval_group_association
+from app.models.models_issuance import IssuanceWorkflowPolicy
+
+logger = logging.getLogger(__name__)
+
+# How long a cached plan / directory is trusted before its version is re-probed.
+CACHE_REVALIDATE_SECONDS = 30
+
+# User attributes that affect approver resolution or labels.
+_USER_DIRECTORY_FIELDS = ("role", "customer_id", "is_deleted", "email")
+
+_POLICY_CONSUMER = "workflow_policies"
+_DIRECTORY_CONSUMER = "workflow_directory"
+_ALL_CUSTOMERS = "*"
+_UNSET = object()
+
+
+# ==============================================================================
+# 1. COMPILED POLICY STRUCTURES
+# ==============================================================================
+
+@dataclass(frozen=True)
+class CompiledPolicyStep:
+    """Immutable, pre-parsed view of one IssuanceWorkflowPolicy row.
+
+    Exposes the same attribute names as the ORM model, so callers that read
+    step_sequence, required_signatures, condition_type, etc. work unchanged.
+    """
+    id: int
+    customer_id: int
+    step_sequence: int
+    condition_type: str
+    condition_value: Optional[str]
+    currency_id: Optional[int]
+    approver_type: str
+    approver_values: Tuple[Any, ...]
+    required_signatures: int
+    is_active: bool
+    amount_threshold: Optional[Decimal] = None
+    amount_min: Optional[Decimal] = None
+    amount_max: Optional[Decimal] = None
+    predicate: Callable[["PolicyEvaluationContext"], bool] = field(default=None, compare=False, repr=False)
+
+    def applies(self, ctx: "PolicyEvaluationContext") -> bool:
+        return self.predicate(ctx)
+
+
+def _parse_amount_range(raw_value: Any) -> Tuple[Decimal, Optional[Decimal]]:
+    """Parses "MIN-MAX", "MIN,MAX", "(MIN,MAX)" or "(MIN-MAX)" into bounds."""
+    raw = str(raw_value).strip().strip("()")
+    # Try comma first (UI format), then dash
+    if "," in raw:
+        parts = raw.split(",")
+    else:
+        parts = raw.split("-")
+    min_val = Decimal(parts[0].strip()) if parts[0].strip() else Decimal("0")
+    max_val = Decimal(parts[1].strip()) if len(parts) > 1 and parts[1].strip() else None
+    return min_val, max_val
+
+
+def _never(ctx: "PolicyEvaluationContext") -> bool:
+    return False
+
+
+def _always(ctx: "PolicyEvaluationContext") -> bool:
+    return True
+
+
+def compile_policy_step(policy: IssuanceWorkflowPolicy) -> CompiledPolicyStep:
+    """Compiles a single policy row. Condition values are parsed once here;
+    a malformed amount never applies (same as the previous runtime parse)."""
+    condition_type = policy.condition_type
+    condition_value = policy.condition_value
+    currency_id = policy.currency_id
+    threshold = amount_min = amount_max = None
+    predicate: Callable[[PolicyEvaluationContext], bool] = _never
+
+    if condition_type in ("ALWAYS", "ANY_DEPARTMENT"):
+        predicate = _always
+
+    elif condition_type == "AMOUNT_OVER":
+        try:
+            threshold = Decimal(str(condition_value))
+            policy_id = policy.id
+            predicate = lambda ctx: policy_id in ctx.steps_over_threshold(currency_id)
+        except Exception:
+            predicate = _never
+
+    elif condition_type == "AMOUNT_RANGE":
+        try:
+            amount_min, amount_max = _parse_amount_range(condition_value)
+            low, high = amount_min, amount_max
+
+            def predicate(ctx, low=low, high=high):
+                try:
+                    amount = ctx.amount_in(currency_id)
+                    if amount is None:
+                        return True  # Fail-safe: can't convert → require approval
+                    if amount < low:
+                        return False
+                    if high is not None and amount > high:
+                        return False
+                    return True
+                except Exception:
+                    return False
+        except Exception:
+            predicate = _never
+
+    elif condition_type == "DEPT_MATCH":
+        # condition_value stores the department ID, request.department stores the name
+        expected_dept_id = str(condition_value)
+        predicate = lambda ctx: ctx.department_id() is not None and str(ctx.department_id()) == expected_dept_id
+
+    elif condition_type == "CROSS_BORDER":
+        predicate = lambda ctx: bool(ctx.request.is_cross_border)
+
+    elif condition_type == "THIRD_PARTY":
+        predicate = lambda ctx: bool(ctx.request.is_third_party)
+
+    elif condition_type == "REFERENCE_TYPE_MATCH":
+        # condition_value stores the reference type name (e.g., "Contract", "Project")
+        if condition_value:
+            expected_ref = str(condition_value).lower()
+            predicate = lambda ctx: bool(ctx.request.reference_type) and str(ctx.request.reference_type).lower() == expected_ref
+
+    return CompiledPolicyStep(
+        id=policy.id,
+        customer_id=policy.customer_id,
+        step_sequence=policy.step_sequence,
+        condition_type=condition_type,
+        condition_value=condition_value,
+        currency_id=currency_id,
+        approver_type=policy.approver_type,
+        approver_values=tuple(policy.approver_values or []),
+        required_signatures=policy.required_signatures,
+        is_active=bool(policy.is_active),
+        amount_threshold=threshold,
+        amount_min=amount_min,
+        amount_max=amount_max,
+        predicate=predicate,
+    )
+
+
+@dataclass(frozen=True)
+class CompiledPolicyPlan:
+    """All policies of one customer, compiled and ordered by step_sequence."""
+    customer_id: int
+    version: Tuple[Any, ...]
+    steps: Tuple[CompiledPolicyStep, ...]
+    active_steps: Tuple[CompiledPolicyStep, ...]
+    active_sequences: Tuple[int, ...]
+    # currency_id -> (sorted AMOUNT_OVER thresholds, matching step ids)
+    amount_over_index: Mapping[Optional[int], Tuple[Tuple[Decimal, ...], Tuple[int, ...]]]
+    compiled_at: float
+
+    @classmethod
+    def build(cls, customer_id: int, policies: List[IssuanceWorkflowPolicy], version: Tuple[Any, ...] = ()) -> "CompiledPolicyPlan":
+        steps = tuple(sorted(
+            (compile_policy_step(p) for p in policies),
+            key=lambda s: ((s.step_sequence if s.step_sequence is not None else 0), s.id or 0)
+        ))
+        active = tuple(s for s in steps if s.is_active)
+
+        over_by_currency: Dict[Optional[int], List[Tuple[Decimal, int]]] = {}
+        for s in active:
+            if s.condition_type == "AMOUNT_OVER" and s.amount_threshold is not None:
+                over_by_currency.setdefault(s.currency_id, []).append((s.amount_threshold, s.id))
+        index = {}
+        for currency_id, pairs in over_by_currency.items():
+            pairs.sort(key=lambda p: p[0])
+            index[currency_id] = (tuple(p[0] for p in pairs), tuple(p[1] for p in pairs))
+
+        return cls(
+            customer_id=customer_id,
+            version=version,
+            steps=steps,
+            active_steps=active,
+            active_sequences=tuple((s.step_sequence or 0) for s in active),
+            amount_over_index=MappingProxyType(index),
+            compiled_at=time.monotonic(),
+        )
+
+    @property
+    def has_active_steps(self) -> bool:
+        return bool(self.active_steps)
+
+    def steps_after(self, start_sequence: int = 0) -> Tuple[CompiledPolicyStep, ...]:
+        """Active steps with step_sequence > start_sequence, in order."""
+        return self.active_steps[bisect.bisect_right(self.active_sequences, start_sequence or 0):]
+
+    def step_at(self, step_sequence: Optional[int]) -> Optional[CompiledPolicyStep]:
+        for s in self.steps:
+            if s.step_sequence == step_sequence:
+                return s
+        return None
+
+    def new_context(self, db: Session, request: Any, directory: "ApproverDirectory" = None) -> "PolicyEvaluationContext":
+        return PolicyEvaluationContext(self, db, request, directory)
+
+
+class PolicyEvaluationContext:
+    """Per-request memo used while evaluating a plan: the FX-adjusted amount is
+    computed once per policy currency and the department id is looked up once."""
+
+    def __init__(self, plan: CompiledPolicyPlan, db: Session, request: Any, directory: "ApproverDirectory" = None):
+        self.plan = plan
+        self.db = db
+        self.request = request
+        self.directory = directory
+        self._amounts: Dict[Optional[int], Any] = {}
+        self._over_hits: Dict[Optional[int], FrozenSet[int]] = {}
+        self._dept_id: Any = _UNSET
+
+    def amount_in(self, currency_id: Optional[int]) -> Optional[Decimal]:
+        """Request amount converted to the policy currency. None when the FX
+        conversion failed (callers treat that as fail-safe → approval needed).
+        Conversion errors are memoized and re-raised."""
+        if currency_id not in self._amounts:
+            try:
+                self._amounts[currency_id] = fx_adjusted_amount(self.db, self.request, currency_id)
+            except Exception as e:
+                self._amounts[currency_id] = e
+        value = self._amounts[currency_id]
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def steps_over_threshold(self, currency_id: Optional[int]) -> FrozenSet[int]:
+        """Ids of AMOUNT_OVER steps (for this currency) whose threshold is
+        strictly below the request amount, found by bisecting the pre-sorted
+        thresholds."""
+        if currency_id not in self._over_hits:
+            thresholds, step_ids = self.plan.amount_over_index.get(currency_id, ((), ()))
+            try:
+                amount = self.amount_in(currency_id)
+                if amount is None:
+                    hits = frozenset(step_ids)  # Fail-safe: can't convert → require approval
+                else:
+                    hits = frozenset(step_ids[:bisect.bisect_left(thresholds, amount)])
+            except Exception:
+                hits = frozenset()
+            self._over_hits[currency_id] = hits
+        return self._over_hits[currency_id]
+
+    def department_id(self) -> Optional[int]:
+        if self._dept_id is _UNSET:
+            dept_name = self.request.department
+            if not dept_name:
+                self._dept_id = None
+            else:
+                directory = self.directory or workflow_policy_engine.get_directory(self.db, self.request.customer_id)
+                dept = directory.department_by_name(dept_name)
+                self._dept_id = dept[0] if dept else None
+        return self._dept_id
+
+
+
+def fx_adjusted_amount(db: Session, request: Any, currency_id: Optional[int]) -> Optional[Decimal]:
+    """
+    Returns the request amount converted to the policy's currency.
+    If the policy has no currency_id, returns the raw request amount.
+    If FX conversion fails, returns None (caller decides: usually fail-safe → True).
+    """
+    if not currency_id or not request.currency_id:
+        return request.amount
+
+    # Same currency → no conversion needed
+    if currency_id == request.currency_id:
+        return request.amount
+
+    # Convert request amount to policy currency
+    from app.services.fx_service import fx_service
+    converted, rate = fx_service.convert(
+        db,
+        Decimal(str(request.amount)),
+        request.currency_id,
+        currency_id,
+        allow_ai=False,  # Approval evaluation should be fast — CBE only
+    )
+
+    if converted is not None:
+        logger.debug(
+            f"FX-adjusted amount: {request.amount} (currency_id={request.currency_id}) "
+            f"→ {converted} (policy currency_id={currency_id}) at rate {rate}"
+        )
+        return converted
+
+    logger.warning(
+        f"FX conversion failed for request {getattr(request, 'id', None)}: "
+        f"currency_id={request.currency_id} → policy currency_id={currency_id}"
+    )
+    return None
+
+
+# ==============================================================================
+# 2. APPROVER DIRECTORY
+# ==============================================================================
+
+@dataclass(frozen=True)
+class ApproverDirectory:
+    """Snapshot of everything approver resolution and roadmap labels need for
+    one customer: active users by role, user emails, departments and groups."""
+    customer_id: int
+    version: Tuple[Any, ...]
+    user_emails: Mapping[int, str]
+    role_members: Mapping[str, FrozenSet[int]]
+    departments_by_name: Mapping[str, Tuple[int, str, Optional[int]]]  # lower(name) -> (id, name, manager_id)
+    departments_by_id: Mapping[int, Tuple[int, str, Optional[int]]]
+    groups: Mapping[int, Tuple[str, FrozenSet[int]]]  # group id -> (name, active member ids)
+    deleted_groups: Mapping[int, str]
+    loaded_at: float
+    _resolved: Dict[Tuple[Any, ...], FrozenSet[int]] = field(default_factory=dict, compare=False, repr=False)
+
+    def department_by_name(self, name: Optional[str]) -> Optional[Tuple[int, str, Optional[int]]]:
+        if not name:
+            return None
+        return self.departments_by_name.get(str(name).lower())
+
+    def email(self, user_id: int) -> Optional[str]:
+        return self.user_emails.get(user_id)
+
+    def resolve(self, step: CompiledPolicyStep, department_name: Optional[str]) -> FrozenSet[int]:
+        """Raw approver pool of a step (before requestor / double-dip rules)."""
+        dept_key = str(department_name).lower() if step.approver_type == "DEPT_HEAD" and department_name else None
+        key = (step.approver_type, step.approver_values, dept_key)
+        cached = self._resolved.get(key)
+        if cached is not None:
+            return cached
+
+        approver_ids: Set[int] = set()
+        if step.approver_type == "USERS":
+            approver_ids.update(int(uid) for uid in step.approver_values if str(uid).isdigit())
+
+        elif step.approver_type == "ROLE":
+            for role in step.approver_values:
+                approver_ids.update(self.role_members.get(str(role).lower(), ()))
+
+        elif step.approver_type == "DEPT_HEAD":
+            dept = self.department_by_name(department_name)
+            if dept and dept[2]:
+                approver_ids.add(dept[2])
+
+        elif step.approver_type == "GROUP":
+            for gid in step.approver_values:
+                if str(gid).isdigit() and int(gid) in self.groups:
+                    approver_ids.update(self.groups[int(gid)][1])
+
+        resolved = frozenset(approver_ids)
+        self._resolved[key] = resolved
+        return resolved
+
+
+def _role_value(role: Any) -> str:
+    return str(getattr(role, "value", role)).lower()
+
+
+# ==============================================================================
+# 3. ENGINE (per-worker cache)
+# ==============================================================================
+
+class WorkflowPolicyEngine:
+
+    def __init__(self, revalidate_seconds: int = CACHE_REVALIDATE_SECONDS):
+        self.revalidate_seconds = revalidate_seconds
+        self._lock = threading.Lock()
+        self._plans: Dict[int, Tuple[CompiledPolicyPlan, float]] = {}
+        self._directories: Dict[int, Tuple[ApproverDirectory, float]] = {}
+
+    # ---------------- Plans ----------------
+
+    def _probe_policy_version(self, db: Session, customer_id: int) -> Tuple[Any, ...]:
+        row = db.query(
+            func.count(IssuanceWorkflowPolicy.id),
+            func.max(IssuanceWorkflowPolicy.id),
+            func.max(func.coalesce(IssuanceWorkflowPolicy.updated_at, IssuanceWorkflowPolicy.created_at)),
+        ).filter(IssuanceWorkflowPolicy.customer_id == customer_id).one()
+        return tuple(row)
+
+    def get_plan(self, db: Session, customer_id: int) -> CompiledPolicyPlan:
+        """Returns the compiled plan for a customer, recompiling only when the
+        policy version (count, max id, max update time) has changed."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._plans.get(customer_id)
+        if entry and now - entry[1] < self.revalidate_seconds:
+            return entry[0]
+
+        version = self._probe_policy_version(db, customer_id)
+        if entry and entry[0].version == version:
+            with self._lock:
+                self._plans[customer_id] = (entry[0], now)
+            return entry[0]
+
+        policies = db.query(IssuanceWorkflowPolicy).filter(
+            IssuanceWorkflowPolicy.customer_id == customer_id
+        ).all()
+        plan = CompiledPolicyPlan.build(customer_id, policies, version)
+        with self._lock:
+            self._plans[customer_id] = (plan, now)
+        logger.debug(f"Compiled workflow plan for customer {customer_id}: {len(plan.active_steps)} active step(s), version={version}")
+        return plan
+
+    # ---------------- Directory ----------------
+
+    def _probe_directory_version(self, db: Session, customer_id: int) -> Tuple[Any, ...]:
+        users = db.query(
+            func.count(User.id), func.max(func.coalesce(User.updated_at, User.created_at))
+        ).filter(User.customer_id == customer_id).one()
+        depts = db.query(
+            func.count(Department.id), func.max(func.coalesce(Department.updated_at, Department.created_at))
+        ).filter(Department.customer_id == customer_id).one()
+        group_id = cast(user_approval_group_association.c.approval_group_id, BigInteger)
+        user_id = cast(user_approval_group_association.c.user_id, BigInteger)
+        members = db.query(
+            func.count(user_id), func.sum(user_id), func.sum(user_id * user_id), func.sum(group_id * user_id)
+        ).join(
+            ApprovalGroup, ApprovalGroup.id == user_approval_group_association.c.approval_group_id
+        ).filter(ApprovalGroup.customer_id == customer_id).one()
+        groups = db.query(
+            func.count(ApprovalGroup.id), func.max(func.coalesce(ApprovalGroup.updated_at, ApprovalGroup.created_at))
+        ).filter(ApprovalGroup.customer_id == customer_id).one()
+        return tuple(users) + tuple(depts) + tuple(groups) + tuple(members)
+
+    def _load_directory(self, db: Session, customer_id: int, version: Tuple[Any, ...]) -> ApproverDirectory:
+        user_emails: Dict[int, str] = {}
+        role_members: Dict[str, Set[int]] = {}
+        active_users: Set[int] = set()
+        for uid, email, role, is_deleted in db.query(User.id, User.email, User.role, User.is_deleted).filter(
+            User.customer_id == customer_id
+        ).all():
+            user_emails[uid] = email
+            if not is_deleted:
+                active_users.add(uid)
+                role_members.setdefault(_role_value(role), set()).add(uid)
+
+        departments_by_name = {}
+        departments_by_id = {}
+        for did, name, manager_id in db.query(Department.id, Department.name, Department.manager_id).filter(
+            Department.customer_id == customer_id,
+            Department.is_deleted == False
+        ).all():
+            entry = (did, name, manager_id)
+            departments_by_id[did] = entry
+            departments_by_name.setdefault(str(name).lower(), entry)
+
+        groups: Dict[int, Tuple[str, Set[int]]] = {}
+        deleted_groups: Dict[int, str] = {}
+        for gid, name, is_deleted in db.query(ApprovalGroup.id, ApprovalGroup.name, ApprovalGroup.is_deleted).filter(
+            ApprovalGroup.customer_id == customer_id
+        ).all():
+            if is_deleted:
+                deleted_groups[gid] = name
+            else:
+                groups[gid] = (name, set())
+        if groups:
+            member_rows = db.query(
+                user_approval_group_association.c.approval_group_id,
+                User.id,
+                User.email,
+                User.is_deleted,
+            ).join(User, User.id == user_approval_group_association.c.user_id).filter(
+                user_approval_group_association.c.approval_group_id.in_(list(groups.keys()))
+            ).all()
+            for gid, uid, email, is_deleted in member_rows:
+                user_emails.setdefault(uid, email)
+                if not is_deleted:
+                    groups[gid][1].add(uid)
+
+        return ApproverDirectory(
+            customer_id=customer_id,
+            version=version,
+            user_emails=MappingProxyType(user_emails),
+            role_members=MappingProxyType({r: frozenset(ids) for r, ids in role_members.items()}),
+            departments_by_name=MappingProxyType(departments_by_name),
+            departments_by_id=MappingProxyType(departments_by_id),
+            groups=MappingProxyType({gid: (name, frozenset(ids)) for gid, (name, ids) in groups.items()}),
+            deleted_groups=MappingProxyType(deleted_groups),
+            loaded_at=time.monotonic(),
+        )
+
+    def get_directory(self, db: Session, customer_id: int) -> ApproverDirectory:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._directories.get(customer_id)
+        if entry and now - entry[1] < self.revalidate_seconds:
+            return entry[0]
+
+        version = self._probe_directory_version(db, customer_id)
+        if entry and entry[0].version == version:
+            with self._lock:
+                self._directories[customer_id] = (entry[0], now)
+            return entry[0]
+
+        directory = self._load_directory(db, customer_id, version)
+        with self._lock:
+            self._directories[customer_id] = (directory, now)
+        return directory
+
+    def resolve_user_emails(self, db: Session, customer_id: int, user_ids) -> Dict[int, str]:
+        """Emails for the given users, from the directory; ids not belonging to
+        the customer fall back to a single query."""
+        directory = self.get_directory(db, customer_id)
+        emails = {uid: directory.email(uid) for uid in user_ids if directory.email(uid) is not None}
+        missing = [uid for uid in user_ids if uid not in emails]
+        if missing:
+            for uid, email in db.query(User.id, User.email).filter(User.id.in_(missing)).all():
+                emails[uid] = email
+        return emails
+
+    # ---------------- Invalidation ----------------
+
+    def invalidate(self, customer_id: Optional[int] = None, policies: bool = True, directory: bool = True):
+        """Drops cached entries for a customer (or every customer when None)."""
+        with self._lock:
+            for cache, enabled in ((self._plans, policies), (self._directories, directory)):
+                if not enabled:
+                    continue
+                if customer_id is None:
+                    cache.clear()
+                else:
+                    cache.pop(customer_id, None)
+
+    def mark_policies_changed(self, db: Session, customer_id: int):
+        """Schedules plan invalidation for when the session commits. Use for
+        bulk statements (query.delete()) that bypass the flush hook."""
+        change_tracker.pending(db, _POLICY_CONSUMER).add(customer_id)
+
+
+workflow_policy_engine = WorkflowPolicyEngine()
+
+
+# ==============================================================================
+# 4. CHANGE TRACKING: commit-time invalidation for writes made in this worker
+# ==============================================================================
+
+def _customer_key(obj: Any) -> Any:
+    return obj.customer_id if obj.customer_id is not None else _ALL_CUSTOMERS
+
+
+def _user_directory_changed(obj: User) -> bool:
+    state = sa_inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in _USER_DIRECTORY_FIELDS)
+
+
+def _collect_policy_changes(session: Session, changes: FlushChanges):
+    change_tracker.pending(session, _POLICY_CONSUMER).update(
+        _customer_key(obj) for obj in changes.all(IssuanceWorkflowPolicy)
+    )
+
+
+def _collect_directory_changes(session: Session, changes: FlushChanges):
+    changed = list(changes.all(Department, ApprovalGroup))
+    changed.extend(changes.new(User))
+    changed.extend(changes.deleted(User))
+    changed.extend(obj for obj in changes.dirty(User) if _user_directory_changed(obj))
+    if not changed:
+        return
+    pending = change_tracker.pending(session, _DIRECTORY_CONSUMER)
+    for obj in changed:
+        pending.add(_customer_key(obj))
+        if isinstance(obj, User):
+            # A user may move between customers; the old customer's
+            # directory must be dropped as well.
+            for old_customer_id in sa_inspect(obj).attrs.customer_id.history.deleted or ():
+                if old_customer_id is not None:
+                    pending.add(old_customer_id)
+
+
+def _invalidation(**kwargs) -> Callable[[Session, Set[Any]], None]:
+    def apply(session: Session, customers: Set[Any]):
+        if _ALL_CUSTOMERS in customers:
+            workflow_policy_engine.invalidate(None, **kwargs)
+            return
+        for customer_id in customers:
+            workflow_policy_engine.invalidate(customer_id, **kwargs)
+    return apply
+
+
+change_tracker.register(
+    _POLICY_CONSUMER,
+    models=(IssuanceWorkflowPolicy,),
+    collect=_collect_policy_changes,
+    apply=_invalidation(directory=False),
+)
+change_tracker.register(
+    _DIRECTORY_CONSUMER,
+    models=(User, Department, ApprovalGroup),
+    collect=_collect_directory_changes,
+    apply=_invalidation(policies=False),
+)
@@ -0,0 +1,22 @@
+# benchmarks/__init__.py
+"""
+Reproducible performance benchmarks for the Treasury backend.
+
+Seeds a dedicated database with synthetic, deterministic treasury data
+(customers, LG records, instructions, facilities, issuance requests, issued
+LGs, exposure entries, bank statements, reconciliation rows, audit logs) and
+times the known hot paths directly against the service / CRUD layer.
+
+Usage (from the repository root):
+
+    # SQLite (self-contained)
+    python -m benchmarks --db-url sqlite:///bench.db --scale 1k --reset --output bench-1k.json
+
+    # Local Postgres, reuse an already-seeded database, compare with a baseline
+    python -m benchmarks --db-url postgresql://postgres@localhost/treasury_bench \\
+        --scale 100k --reuse --output after.json --compare before.json
+
+The database given with --db-url (or BENCH_DATABASE_URL) is never taken from
+DATABASE_URL, and --reset drops every table in it: point it at a throwaway
+database only.
+"""
@@ -0,0 +1,100 @@
+# benchmarks/__main__.py
+"""Command line entry point: python -m benchmarks --help"""
+
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import sys
+import time
+
+from benchmarks.config import SCALES, DEFAULT_SEED
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Treasury backend performance benchmarks.")
+    parser.add_argument("--db-url", default=os.getenv("BENCH_DATABASE_URL"),
+                        help="Benchmark database (or BENCH_DATABASE_URL). Never defaults to DATABASE_URL.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="1k")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed iterations per case.")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed iterations per case.")
+    parser.add_argument("--only", action="append", default=[], metavar="PATTERN",
+                        help="Run only cases matching this glob (repeatable), e.g. 'scheduler.*'.")
+    parser.add_argument("--output", help="Write the JSON report here.")
+    parser.add_argument("--compare", metavar="BASELINE_JSON", help="Print deltas against an earlier report.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--reset", action="store_true", help="Drop and recreate every table, then seed.")
+    mode.add_argument("--reuse", action="store_true", help="Benchmark an already-seeded database as is.")
+    parser.add_argument("--list", action="store_true", help="List case names and exit.")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    logging.getLogger("benchmarks").setLevel(logging.INFO)
+
+    if args.list:
+        from benchmarks.cases import all_cases
+        for case in all_cases():
+            print(f"{case.name:<48} {case.description}")
+        return 0
+    if not args.db_url:
+        print("error: --db-url (or BENCH_DATABASE_URL) is required", file=sys.stderr)
+        return 2
+
+    # Must run before any app module is imported
+    from benchmarks.dbsetup import configure, database_is_empty, reset_schema, reset_sequences
+    engine = configure(args.db_url)
+
+    from benchmarks.cases import all_cases, build_context
+    from benchmarks.dbsetup import isolated_session
+    from benchmarks.generators import SyntheticDataGenerator
+    from benchmarks.harness import run_case, build_report, write_report, format_results
+
+    scale = SCALES[args.scale]
+    row_counts = {}
+    if args.reset:
+        reset_schema(engine)
+        started = time.perf_counter()
+        row_counts = SyntheticDataGenerator(engine, scale, args.seed).generate()
+        reset_sequences(engine)
+        print(f"Seeded scale {scale.name} (seed {args.seed}) in {time.perf_counter() - started:.1f}s")
+    elif not args.reuse:
+        if not database_is_empty(engine):
+            print("error: database is not empty; pass --reset to reseed it or --reuse to benchmark it as is", file=sys.stderr)
+            return 2
+        from app.database import Base
+        Base.metadata.create_all(bind=engine)
+        row_counts = SyntheticDataGenerator(engine, scale, args.seed).generate()
+        reset_sequences(engine)
+
+    with isolated_session(engine) as db:
+        ctx = build_context(db)
+
+    cases = all_cases()
+    if args.only:
+        cases = [c for c in cases if any(fnmatch.fnmatch(c.name, p) for p in args.only)]
+
+    results = []
+    for case in cases:
+        print(f"  {case.name} ...", flush=True)
+        results.append(run_case(engine, case, ctx, repeat=args.repeat, warmup=args.warmup))
+
+    report = build_report(engine, scale, args.seed, row_counts, results, args.repeat, args.warmup)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+    print(format_results(report, baseline))
+    if args.output:
+        write_report(report, args.output)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,339 @@
+# benchmarks/cases.py
+"""
+Benchmark cases: the known hot paths, called at the service / CRUD layer.
+
+All cases run as TARGET_CUSTOMER_ID. build_context() resolves the ids each
+case needs from the seeded data, so cases work the same against a freshly
+seeded database and one reused with --reuse.
+"""
+
+from typing import Any, Dict, List
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from benchmarks.config import TARGET_CUSTOMER_ID
+from benchmarks.harness import BenchmarkCase
+
+
+def build_context(db: Session) -> Dict[str, Any]:
+    from app.models.models import LGRecord, User
+    from app.models.models_issuance import IssuanceFacility, IssuanceRequest, ReconciliationSession
+    from app.constants import UserRole
+
+    customer_id = TARGET_CUSTOMER_ID
+    admin = db.scalars(select(User).where(
+        User.customer_id == customer_id, User.role == UserRole.CORPORATE_ADMIN
+    ).order_by(User.id)).first()
+    end_user = db.scalars(select(User).where(
+        User.customer_id == customer_id, User.role == UserRole.END_USER
+    ).order_by(User.id)).first() or admin
+    facility_id = db.scalar(select(func.min(IssuanceFacility.id)).where(IssuanceFacility.customer_id == customer_id))
+    session_id = db.scalar(select(func.min(ReconciliationSession.id)).where(ReconciliationSession.customer_id == customer_id))
+    request = db.scalars(select(IssuanceRequest).where(
+        IssuanceRequest.customer_id == customer_id, IssuanceRequest.selected_sub_limit_id.isnot(None)
+    ).order_by(IssuanceRequest.id)).first()
+    lg_record_id = db.scalar(select(func.min(LGRecord.id)).where(LGRecord.customer_id == customer_id))
+    if admin is None or facility_id is None or request is None:
+        raise RuntimeError(f"Customer {customer_id} is not seeded; run with --reset to generate data.")
+
+    return {
+        "customer_id": customer_id,
+        "admin_user_id": admin.id,
+        "end_user_id": end_user.id,
+        "end_user_email": end_user.email,
+        "facility_id": facility_id,
+        "session_id": session_id,
+        "request_id": request.id,
+        "lg_record_id": lg_record_id,
+        "beneficiary_name": request.beneficiary_name,
+        "amount": float(request.amount),
+        "currency_code": "EGP",
+        "reference_type": request.reference_type,
+        "reference_number": request.reference_number,
+    }
+
+
+# =====================================================================
+# Issuance
+# =====================================================================
+
+def facility_utilization(db: Session, ctx: Dict[str, Any]):
+    from app.services.issuance_service import issuance_service
+    return issuance_service.calculate_facility_utilization(db, ctx["facility_id"])
+
+
+def similarity_matches(db: Session, ctx: Dict[str, Any]):
+    from app.services.issuance_service import issuance_service
+    return issuance_service.get_similarity_matches(
+        db, ctx["customer_id"],
+        reference_type=ctx["reference_type"], reference_number=ctx["reference_number"],
+        beneficiary_name=ctx["beneficiary_name"], amount=ctx["amount"], currency=ctx["currency_code"],
+    )
+
+
+def list_issued_lgs(db: Session, ctx: Dict[str, Any]):
+    from app.api.v1.endpoints.issuance.post_issuance import list_issued_lgs as endpoint
+    from app.core.security import TokenData
+    from app.constants import UserRole
+
+    user = TokenData(
+        email="bench@example.com", user_id=ctx["admin_user_id"], role=UserRole.CORPORATE_ADMIN,
+        customer_id=ctx["customer_id"], has_all_entity_access=True,
+    )
+    return endpoint(db=db, current_user=user)
+
+
+async def issuance_letter(db: Session, ctx: Dict[str, Any]):
+    from app.services.issuance_service import issuance_service
+    return await issuance_service.generate_issuance_letter(db, ctx["request_id"], ctx["customer_id"])
+
+
+# =====================================================================
+# Custody / reporting
+# =====================================================================
+
+def my_lg_dashboard(db: Session, ctx: Dict[str, Any]):
+    from app.crud.crud import crud_reports
+    from app.constants import UserRole
+
+    return crud_reports.get_my_lg_dashboard_report(db, {
+        "user_id": ctx["end_user_id"], "customer_id": ctx["customer_id"], "role": UserRole.END_USER,
+        "has_all_entity_access": True, "entity_ids": [], "email": ctx["end_user_email"],
+    })
+
+
+def lg_detail_uncached(db: Session, ctx: Dict[str, Any]):
+    from app.crud.crud import crud_lg_record
+    lg = crud_lg_record._load_with_relations(db, ctx["lg_record_id"], ctx["customer_id"])
+    return {"instructions": len(lg.instructions), "documents": len(lg.documents)}
+
+
+def lg_detail_cached(db: Session, ctx: Dict[str, Any]):
+    from app.crud.crud import crud_lg_record
+    lg = crud_lg_record.get_lg_record_with_relations(db, ctx["lg_record_id"], ctx["customer_id"])
+    return {"instructions": len(lg.instructions), "documents": len(lg.documents)}
+
+# =====================================================================
+# Reconciliation
+# =====================================================================
+
+def bank_statement_matching(db: Session, ctx: Dict[str, Any]):
+    from app.services.bank_reconciliation_service import bank_reconcile_service
+    return bank_reconcile_service.run_matching_engine(db, ctx["customer_id"], ctx["admin_user_id"])
+
+
+def position_report_matching(db: Session, ctx: Dict[str, Any]):
+    from app.services.reconciliation_service import reconciliation_service
+    return reconciliation_service.run_matching(db, ctx["session_id"], ctx["customer_id"], ctx["admin_user_id"])
+
+
+# =====================================================================
+# Signed URLs (offline, FakeUrlSigner with simulated signing latency)
+# =====================================================================
+
+SIGNED_URL_BANNERS = 200
+SIGNED_URL_DISTINCT_IMAGES = 10
+SIGNED_URL_FAKE_LATENCY_MS = 2.0
+
+
+def _banner_objects():
+    from types import SimpleNamespace
+    return [SimpleNamespace(image_url=f"gs://bench-bucket/banners/{k % SIGNED_URL_DISTINCT_IMAGES}.png")
+            for k in range(SIGNED_URL_BANNERS)]
+
+
+async def signed_urls_cold(db: Session, ctx: Dict[str, Any]):
+    from app.core.signed_urls import SignedUrlService, FakeUrlSigner
+    service = SignedUrlService(signer=FakeUrlSigner(latency_ms=SIGNED_URL_FAKE_LATENCY_MS))
+    await service.sign_attribute(_banner_objects())
+    return service.stats()
+
+
+_warm_signed_url_service = None
+
+
+async def signed_urls_warm(db: Session, ctx: Dict[str, Any]):
+    from app.core.signed_urls import SignedUrlService, FakeUrlSigner
+    global _warm_signed_url_service
+    if _warm_signed_url_service is None:
+        _warm_signed_url_service = SignedUrlService(signer=FakeUrlSigner(latency_ms=SIGNED_URL_FAKE_LATENCY_MS))
+    await _warm_signed_url_service.sign_attribute(_banner_objects())
+    return _warm_signed_url_service.stats()
+
+
+# =====================================================================
+# Bank form filling (local fixture template, no GCS)
+# =====================================================================
+
+BANK_FORM_BATCH_SIZE = 50
+BANK_FORM_FIELDS = ["beneficiary_name", "amount", "currency", "issue_date", "expiry_date", "reference_number"]
+
+_bank_form_fixture = None
+
+
+def _bank_form_template():
+    """A fillable PDF generated with reportlab (written to a temp dir once) and a BankFormTemplate stand-in."""
+    import os
+    import tempfile
+    from datetime import datetime
+    from types import SimpleNamespace
+    global _bank_form_fixture
+    if _bank_form_fixture is not None:
+        return _bank_form_fixture
+
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_bank_form_"), "bank_form.pdf")
+    c = canvas.Canvas(path, pagesize=A4)
+    for page in range(2):
+        c.drawString(72, 800, f"Letter of Guarantee Application - page {page + 1}")
+        for k, name in enumerate(BANK_FORM_FIELDS):
+            y = 740 - k * 40
+            c.drawString(72, y + 6, name.replace("_", " ").title())
+            c.acroForm.textfield(name=f"p{page}_{name}", x=220, y=y, width=280, height=20)
+        c.showPage()
+    c.save()
+
+    field_mapping = [
+        {"pdf_field_name": f"p{page}_{name}", "mapped_to": name, "field_type": "text",
+         "x": 220, "y": 740 - k * 40, "page": page, "font_size": 10}
+        for page in range(2) for k, name in enumerate(BANK_FORM_FIELDS)
+    ]
+    _bank_form_fixture = SimpleNamespace(
+        id=-1, name="bench_form", version=1, file_path=path, form_type="FILLABLE_PDF",
+        form_language="BILINGUAL", field_mapping=field_mapping,
+        created_at=datetime(2024, 1, 1), updated_at=datetime(2024, 1, 1),
+    )
+    return _bank_form_fixture
+
+
+def _bank_form_request_data(n: int) -> List[Dict[str, Any]]:
+    return [{
+        "beneficiary_name": f"Beneficiary {k}", "amount": f"{100000 + k * 250:,.2f}", "currency": "EGP",
+        "issue_date": "2024-03-01", "expiry_date": "2025-03-01", "reference_number": f"TND-{k:05d}",
+    } for k in range(n)]
+
+
+def bank_form_single_uncached(db: Session, ctx: Dict[str, Any]):
+    from app.core.pdf_form_filler import fill_pdf_form, get_pdf_form_fields
+    template = _bank_form_template()
+    with open(template.file_path, "rb") as f:
+        pdf_bytes = f.read()
+    get_pdf_form_fields(pdf_bytes)          # FILLABLE_PDF → SCANNED_FILL auto-detect, as before the cache
+    return len(fill_pdf_form(pdf_bytes, template.field_mapping, _bank_form_request_data(1)[0]))
+
+
+def bank_form_single_cached(db: Session, ctx: Dict[str, Any]):
+    from app.core.bank_form_cache import bank_form_store
+    return len(bank_form_store.fill(_bank_form_template(), _bank_form_request_data(1)[0]))
+
+
+def bank_form_batch(db: Session, ctx: Dict[str, Any]):
+    from app.core.bank_form_cache import bank_form_store
+    filled = bank_form_store.fill_batch(_bank_form_template(), _bank_form_request_data(BANK_FORM_BATCH_SIZE))
+    return {"forms": len(filled), "bytes": sum(len(b) for b in filled)}
+
+
+def bank_form_batch_scanned(db: Session, ctx: Dict[str, Any]):
+    from app.core.bank_form_cache import bank_form_store
+    from app.core.pdf_form_filler import fill_forms_batch
+    template = _bank_form_template()
+    cached = bank_form_store.get(template)
+    filled = fill_forms_batch(cached.pdf_bytes, template.field_mapping, _bank_form_request_data(BANK_FORM_BATCH_SIZE),
+                              form_type="SCANNED_FILL", page_sizes=cached.page_sizes)
+    return {"forms": len(filled), "bytes": sum(len(b) for b in filled)}
+
+
+# =====================================================================
+# AI privacy tokenizer (in memory, no database)
+# =====================================================================
+
+TOKENIZER_RECORDS = 10_000
+TOKENIZER_RESPONSE_TOKENS = 2_000
+
+_tokenizer_fixture = None
+
+
+def _tokenizer_payload():
+    """10k portfolio records and an AI response citing 2k of their tokens."""
+    global _tokenizer_fixture
+    if _tokenizer_fixture is not None:
+        return _tokenizer_fixture
+    from app.services.ai_privacy_tokenizer import privacy_tokenizer
+
+    records = [{
+        "lg_number": f"LG-{k:06d}", "beneficiary": f"Beneficiary {k % 1500}", "issuing_bank": f"Bank {k % 40}",
+        "amount": 100000 + k, "currency": "EGP", "expiry_date": "2025-03-01",
+    } for k in range(TOKENIZER_RECORDS)]
+    tokenized, token_map = privacy_tokenizer.tokenize_dataset(records)
+    cited = tokenized[::TOKENIZER_RECORDS // (TOKENIZER_RESPONSE_TOKENS // 3)]     # three tokens per sentence
+    response = " ".join(
+        f"{rec['lg_number']} ({rec['beneficiary']}, {rec['issuing_bank']}) expires soon." for rec in cited
+    )
+    _tokenizer_fixture = (records, response, dict(token_map))
+    return _tokenizer_fixture
+
+
+def tokenizer_dataset(db: Session, ctx: Dict[str, Any]):
+    from app.services.ai_privacy_tokenizer import privacy_tokenizer
+    records, _, _ = _tokenizer_payload()
+    tokenized, token_map = privacy_tokenizer.tokenize_dataset(records)
+    return {"records": len(tokenized), "tokens": len(token_map)}
+
+
+def tokenizer_validate_detokenize(db: Session, ctx: Dict[str, Any]):
+    from app.services.ai_privacy_tokenizer import privacy_tokenizer
+    _, response, token_map = _tokenizer_payload()
+    valid, _ = privacy_tokenizer.validate_ai_output_tokens(response, token_map)
+    return {"valid": valid, "chars": len(privacy_tokenizer.detokenize_response(response, token_map))}
+
+
+# =====================================================================
+# Scheduler jobs (run across all customers, as in production)
+# =====================================================================
+
+def _job(name: str):
+    async def run(db: Session, ctx: Dict[str, Any]):
+        from app.core import background_tasks
+        return await getattr(background_tasks, name)(db)
+    run.__name__ = name
+    return run
+
+
+SCHEDULER_JOBS = [
+    "run_daily_lg_status_update",
+    "run_daily_renewal_reminders",
+    "run_daily_facility_utilization_alerts",
+    "run_daily_print_reminders",
+    "run_daily_undelivered_instructions_report",
+    "run_daily_sla_breach_alerts",
+]
+
+
+def all_cases() -> List[BenchmarkCase]:
+    cases = [
+        BenchmarkCase("issuance.facility_utilization", facility_utilization, "IssuanceService.calculate_facility_utilization"),
+        BenchmarkCase("issuance.similarity_matches", similarity_matches, "IssuanceService.get_similarity_matches"),
+        BenchmarkCase("issuance.list_issued_lgs", list_issued_lgs, "GET /issuance/issued-lgs handler"),
+        BenchmarkCase("issuance.letter_generation", issuance_letter, "IssuanceService.generate_issuance_letter (needs WeasyPrint)"),
+        BenchmarkCase("reports.my_lg_dashboard", my_lg_dashboard, "CRUDReports.get_my_lg_dashboard_report"),
+        BenchmarkCase("custody.lg_detail_uncached", lg_detail_uncached, "LGRecord relation graph read from the database"),
+        BenchmarkCase("custody.lg_detail_cached", lg_detail_cached, "get_lg_record_with_relations via the versioned detail cache"),
+        BenchmarkCase("reconciliation.bank_statement_matching", bank_statement_matching, "BankReconciliationService.run_matching_engine"),
+        BenchmarkCase("reconciliation.position_report_matching", position_report_matching, "ReconciliationService.run_matching"),
+        BenchmarkCase("signed_urls.notification_banners_cold", signed_urls_cold,
+                      f"{SIGNED_URL_BANNERS} banners / {SIGNED_URL_DISTINCT_IMAGES} images, empty cache, one signing batch"),
+        BenchmarkCase("signed_urls.notification_banners_warm", signed_urls_warm,
+                      f"{SIGNED_URL_BANNERS} banners / {SIGNED_URL_DISTINCT_IMAGES} images, cached signatures"),
+        BenchmarkCase("bank_forms.single_fill_uncached", bank_form_single_uncached, "read + parse + fill_pdf_form per request (pre-cache path)"),
+        BenchmarkCase("bank_forms.single_fill_cached", bank_form_single_cached, "BankFormTemplateStore.fill, template cached"),
+        BenchmarkCase("bank_forms.batch_fill", bank_form_batch, f"BankFormTemplateStore.fill_batch, {BANK_FORM_BATCH_SIZE} requests"),
+        BenchmarkCase("bank_forms.batch_fill_scanned", bank_form_batch_scanned, f"fill_forms_batch SCANNED_FILL, {BANK_FORM_BATCH_SIZE} requests"),
+        BenchmarkCase("ai_privacy.tokenize_dataset", tokenizer_dataset, f"PrivacyTokenizer.tokenize_dataset, {TOKENIZER_RECORDS} records"),
+        BenchmarkCase("ai_privacy.validate_detokenize", tokenizer_validate_detokenize,
+                      f"validate + detokenize a response citing ~{TOKENIZER_RESPONSE_TOKENS} tokens"),
+    ]
+    cases += [BenchmarkCase(f"scheduler.{name}", _job(name), f"background_tasks.{name}") for name in SCHEDULER_JOBS]
+    return cases
@@ -0,0 +1,88 @@
+# benchmarks/coldstart.py
+"""
+Worker cold start: fresh interpreter -> app.main imported -> startup events ->
+first request served.
+
+    python -m benchmarks.coldstart --db-url sqlite:///bench.db --repeat 5
+
+Each run is a separate subprocess so import caches do not carry over (the
+bytecode cache does, as it would on a redeployed worker). Schema migrations
+are not part of a worker boot; run `python -m app.core.schema_migrations`
+against the database first if it is empty.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Runs in the child process
+_CHILD = r"""
+import json, time
+t0 = time.perf_counter()
+import app.main
+from fastapi.testclient import TestClient
+from app.core.telemetry import telemetry
+t_import = time.perf_counter()
+with TestClient(app.main.app) as client:
+    t_ready = time.perf_counter()
+    response = client.get("/")
+    t_first = time.perf_counter()
+print(json.dumps({
+    "status": response.status_code,
+    "import_ms": (t_import - t0) * 1000,
+    "ready_ms": (t_ready - t0) * 1000,
+    "first_request_ms": (t_first - t0) * 1000,
+    "boot": telemetry.boot_report(),
+}))
+"""
+
+
+def run_once(db_url: str) -> dict:
+    env = dict(os.environ, DATABASE_URL=db_url, LOG_LEVEL=os.getenv("LOG_LEVEL", "WARNING"))
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", _CHILD], env=env, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - t0) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"cold start run failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["process_wall_ms"] = wall_ms
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.coldstart", description="Measure worker cold start to first request.")
+    parser.add_argument("--db-url", default=os.getenv("BENCH_DATABASE_URL"), help="Database the worker connects to (or BENCH_DATABASE_URL).")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Write the JSON report here.")
+    args = parser.parse_args(argv)
+    if not args.db_url:
+        print("error: --db-url (or BENCH_DATABASE_URL) is required", file=sys.stderr)
+        return 2
+
+    runs = [run_once(args.db_url) for _ in range(args.repeat)]
+    summary = {
+        metric: round(statistics.median(run[metric] for run in runs), 1)
+        for metric in ("import_ms", "ready_ms", "first_request_ms", "process_wall_ms")
+    }
+    summary["phases_ms"] = {
+        phase: round(statistics.median(run["boot"]["phases_ms"].get(phase, 0.0) for run in runs), 1)
+        for phase in runs[0]["boot"]["phases_ms"]
+    }
+
+    print(f"cold start (median of {len(runs)} runs)")
+    for metric in ("import_ms", "ready_ms", "first_request_ms", "process_wall_ms"):
+        print(f"  {metric:<20} {summary[metric]:>10.1f}")
+    for phase, ms in summary["phases_ms"].items():
+        print(f"    {phase:<18} {ms:>10.1f}")
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump({"summary": summary, "runs": runs}, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
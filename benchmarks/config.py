@@ -0,0 +1,57 @@
+# benchmarks/config.py
+"""Scale presets: row counts per entity for each benchmark scale."""
+
+from dataclasses import dataclass, asdict
+from typing import Dict
+
+
+@dataclass(frozen=True)
+class ScaleConfig:
+    name: str
+    customers: int
+    entities_per_customer: int
+    users_per_customer: int
+    facilities_per_customer: int
+    sub_limits_per_facility: int
+    lg_records: int
+    instructions: int
+    issuance_requests: int
+    issued_lgs: int
+    exposure_entries: int
+    bank_statements: int
+    bank_transactions: int
+    reconciliation_bank_rows: int
+    audit_logs: int
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+SCALES: Dict[str, ScaleConfig] = {
+    "1k": ScaleConfig(
+        name="1k", customers=2, entities_per_customer=5, users_per_customer=5,
+        facilities_per_customer=3, sub_limits_per_facility=3,
+        lg_records=1_000, instructions=2_000, issuance_requests=1_000, issued_lgs=1_000,
+        exposure_entries=2_000, bank_statements=10, bank_transactions=1_000,
+        reconciliation_bank_rows=500, audit_logs=5_000,
+    ),
+    "100k": ScaleConfig(
+        name="100k", customers=20, entities_per_customer=10, users_per_customer=20,
+        facilities_per_customer=5, sub_limits_per_facility=4,
+        lg_records=100_000, instructions=200_000, issuance_requests=100_000, issued_lgs=100_000,
+        exposure_entries=200_000, bank_statements=200, bank_transactions=100_000,
+        reconciliation_bank_rows=20_000, audit_logs=500_000,
+    ),
+    "1m": ScaleConfig(
+        name="1m", customers=100, entities_per_customer=10, users_per_customer=30,
+        facilities_per_customer=8, sub_limits_per_facility=4,
+        lg_records=1_000_000, instructions=2_000_000, issuance_requests=1_000_000, issued_lgs=1_000_000,
+        exposure_entries=2_000_000, bank_statements=1_000, bank_transactions=1_000_000,
+        reconciliation_bank_rows=100_000, audit_logs=5_000_000,
+    ),
+}
+
+DEFAULT_SEED = 20240501
+
+# Benchmarks run as this customer (ids are assigned sequentially from 1)
+TARGET_CUSTOMER_ID = 1
@@ -0,0 +1,111 @@
+# benchmarks/dbsetup.py
+"""
+Database wiring for benchmark runs.
+
+The application modules create their engine from DATABASE_URL at import time,
+so configure() must run before anything under app/ is imported. SQLite is
+supported by rendering the Postgres-only column types (JSONB) as JSON and by
+enabling SAVEPOINT support in pysqlite.
+"""
+
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+
+
+@compiles(JSONB, "sqlite")
+def _compile_jsonb_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+def configure(db_url: str):
+    """Points the application at the benchmark database and returns its engine."""
+    os.environ["DATABASE_URL"] = db_url
+    os.environ.setdefault("SECRET_KEY", "benchmark-only-secret")
+
+    from app.database import engine
+    # Register every model with Base.metadata (same set as app.main)
+    import app.models.models  # noqa: F401
+    import app.models.models_quotation  # noqa: F401
+    import app.models.models_reconciliation_v2  # noqa: F401
+    import app.models.models_notification  # noqa: F401
+    import app.models.models_deadline  # noqa: F401
+    import app.models.models_storage  # noqa: F401
+    import app.models.models_dashboard  # noqa: F401
+    import app.models.models_action_center  # noqa: F401
+    import app.models.models_renewal  # noqa: F401
+    import app.models.models_migration_import  # noqa: F401
+
+    if engine.dialect.name == "sqlite":
+        _enable_sqlite_savepoints(engine)
+    return engine
+
+
+def _enable_sqlite_savepoints(engine) -> None:
+    """pysqlite emits its own BEGIN/COMMIT; let SQLAlchemy own the transaction instead."""
+
+    @event.listens_for(engine, "connect")
+    def _do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _do_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+
+def database_is_empty(engine) -> bool:
+    inspector = inspect(engine)
+    if not inspector.has_table("customers"):
+        return True
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM customers")).scalar() == 0
+
+
+def reset_schema(engine) -> None:
+    from app.database import Base
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def reset_sequences(engine) -> None:
+    """Generators insert explicit ids; move Postgres sequences past them."""
+    if engine.dialect.name != "postgresql":
+        return
+    from app.database import Base
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if "id" not in table.c or not table.c.id.primary_key or not table.c.id.autoincrement:
+                continue
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table.name}), 0) + 1, false) "
+                f"WHERE pg_get_serial_sequence('{table.name}', 'id') IS NOT NULL"
+            ))
+
+
+@contextmanager
+def isolated_session(engine) -> Iterator[Session]:
+    """
+    Session whose commits only release savepoints inside an outer transaction
+    that is rolled back afterwards, so mutating hot paths (matching engines,
+    scheduler jobs) see the same data on every repetition. Commit hooks are
+    suppressed: the writes they would publish (cache invalidations, summary
+    refreshes, e-mails, scheduler wake-ups) are never committed.
+    """
+    from app.core.change_tracking import SUPPRESS_COMMIT_HOOKS
+
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint", autoflush=False)
+    session.info[SUPPRESS_COMMIT_HOOKS] = True
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
@@ -0,0 +1,442 @@
+# benchmarks/generators.py
+"""
+Seeded synthetic treasury data.
+
+Every generator draws from one random.Random(seed), assigns ids sequentially
+from 1 and streams rows into bulk Core inserts, so the same (scale, seed)
+always produces the same database and 1M-row scales never sit in memory.
+Dates are relative to the day of seeding, which keeps expiry windows,
+"nearing expiry" counts and 365-day look-backs stable between runs.
+"""
+
+import logging
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List
+
+from sqlalchemy import insert
+
+from benchmarks.config import ScaleConfig
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 5_000
+
+CURRENCIES = [("Egyptian Pound", "EGP", 1.0), ("US Dollar", "USD", 48.6), ("Euro", "EUR", 52.9),
+              ("British Pound", "GBP", 61.7), ("Saudi Riyal", "SAR", 12.95)]
+BANK_NAMES = ["National Bank", "Misr Bank", "Commercial International Bank", "QNB Alahli", "HSBC Egypt",
+              "Banque du Caire", "Alex Bank", "Emirates NBD Egypt", "Credit Agricole Egypt", "Arab African Bank",
+              "Faisal Islamic Bank", "Abu Dhabi Islamic Bank", "Attijariwafa Bank", "First Abu Dhabi Bank",
+              "Housing & Development Bank", "Suez Canal Bank", "Export Development Bank", "AAIB", "NBK Egypt", "Ahli United Bank"]
+LG_TYPES = ["Performance Guarantee", "Bid Bond", "Advance Payment Guarantee", "Financial Guarantee"]
+LG_STATUSES = ["Valid", "Released", "Liquidated", "Expired"]
+BENEFICIARY_WORDS = ["Nile", "Delta", "Cairo", "Pyramids", "Red Sea", "Sinai", "Alexandria", "Giza", "Luxor", "Aswan",
+                     "Petroleum", "Construction", "Utilities", "Logistics", "Holding", "Authority", "Ministry", "Telecom"]
+INSTRUCTION_TYPES = ["EXTENSION", "RELEASE", "LIQUIDATION", "DECREASE_AMOUNT", "AMENDMENT", "REMINDER_TO_BANKS"]
+REQUEST_STATUSES = [("DRAFT", 10), ("PENDING_APPROVAL", 15), ("APPROVED_INTERNAL", 10), ("FACILITY_RESERVED", 10),
+                    ("INTERNAL_PROCESSING", 10), ("ISSUED", 45)]
+ISSUED_STATUSES = [("ACTIVE", 70), ("LG_ISSUED", 8), ("DELIVERED_TO_BANK", 7), ("EXPIRED", 8), ("RELEASED", 7)]
+AUDIT_ACTIONS = ["LOGIN_SUCCESS", "LG_RECORDED", "LG_EXTENDED", "INSTRUCTION_DELIVERED", "REPORT_VIEWED",
+                 "ISSUANCE_REQUEST_CREATED", "APPROVAL_REQUEST_SUBMITTED", "LOGIN_FAILED"]
+# Global configuration defaults read by the custody scheduler jobs (key name -> (default, unit))
+GLOBAL_CONFIG_DEFAULTS = {
+    "AUTO_RENEWAL_DAYS_BEFORE_EXPIRY": ("30", "days"),
+    "AUTO_RENEW_REMINDER_START_DAYS_BEFORE_EXPIRY": ("60", "days"),
+    "FORCED_RENEW_DAYS_BEFORE_EXPIRY": ("15", "days"),
+    "NUMBER_OF_DAYS_FOR_NEXT_REMINDER": ("7", "days"),
+    "DAYS_FOR_FIRST_PRINT_REMINDER": ("2", "days"),
+    "DAYS_FOR_PRINT_ESCALATION": ("5", "days"),
+    "NUMBER_OF_DAYS_SINCE_ISSUANCE_TO_REPORT_UNDELIVERED": ("3", "days"),
+    "NUMBER_OF_DAYS_SINCE_ISSUANCE_TO_STOP_REPORTING_UNDELIVERED": ("60", "days"),
+    "REMINDER_TO_BANKS_DAYS_SINCE_DELIVERY": ("14", "days"),
+    "REMINDER_TO_BANKS_MAX_DAYS_SINCE_ISSUANCE": ("90", "days"),
+    "GRACE_PERIOD_DAYS": ("30", "days"),
+}
+LETTER_TEMPLATE = (
+    "<html><body><p>To: {{bank_name}}</p><p>Please issue a {{lg_type}} in favour of {{beneficiary_name}}, "
+    "{{beneficiary_address}} for {{currency_code}} {{amount}} ({{amount_in_words}}) valid until {{expiry_date}}.</p>"
+    "<p>Purpose: {{purpose}}</p><p>{{other_instructions}}</p></body></html>"
+)
+
+
+def _weighted(rng: random.Random, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights, k=1)[0]
+
+
+def _chunks(rows: Iterable[Dict[str, Any]], size: int = CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class SyntheticDataGenerator:
+    """Populates an empty schema for one scale preset."""
+
+    def __init__(self, engine, scale: ScaleConfig, seed: int):
+        self.engine = engine
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.today = date.today()
+        self.now = datetime.utcnow()
+        self.counts: Dict[str, int] = {}
+
+        self.n_banks = len(BANK_NAMES)
+        self.n_facilities = scale.customers * scale.facilities_per_customer
+        self.n_sub_limits = self.n_facilities * scale.sub_limits_per_facility
+        # Issued LG bank references per (customer, bank), used to build reconciliation rows
+        self._bank_lg_numbers: Dict[tuple, List[str]] = {}
+
+    # ---------------- Helpers ----------------
+
+    def _insert(self, conn, model, rows: Iterable[Dict[str, Any]]) -> None:
+        total = 0
+        for chunk in _chunks(rows):
+            conn.execute(insert(model.__table__), chunk)
+            total += len(chunk)
+        self.counts[model.__tablename__] = self.counts.get(model.__tablename__, 0) + total
+        logger.info(f"Seeded {total:,} rows into {model.__tablename__}")
+
+    def _customer_of(self, index: int) -> int:
+        return index % self.scale.customers + 1
+
+    def _user_id(self, customer_id: int, k: int) -> int:
+        return (customer_id - 1) * self.scale.users_per_customer + k + 1
+
+    def _entity_id(self, customer_id: int, k: int) -> int:
+        return (customer_id - 1) * self.scale.entities_per_customer + k + 1
+
+    def _facility_id(self, customer_id: int, k: int) -> int:
+        return (customer_id - 1) * self.scale.facilities_per_customer + k + 1
+
+    def _sub_limit_id(self, facility_id: int, k: int) -> int:
+        return (facility_id - 1) * self.scale.sub_limits_per_facility + k + 1
+
+    def _bank_of_facility(self, facility_id: int) -> int:
+        return (facility_id - 1) % self.n_banks + 1
+
+    def _beneficiary(self) -> str:
+        return f"{self.rng.choice(BENEFICIARY_WORDS)} {self.rng.choice(BENEFICIARY_WORDS)} Company"
+
+    def _amount(self) -> Decimal:
+        return Decimal(self.rng.randrange(50_000, 50_000_000, 1_000))
+
+    # ---------------- Entry point ----------------
+
+    def generate(self) -> Dict[str, int]:
+        with self.engine.begin() as conn:
+            self._reference_data(conn)
+            self._customers(conn)
+            self._facilities(conn)
+        # Large tables: one transaction each keeps Postgres WAL / SQLite journal bounded
+        for step in (self._lg_records, self._instructions, self._issuance_requests, self._issued_lgs,
+                     self._exposure_entries, self._bank_statements, self._reconciliation, self._audit_logs):
+            with self.engine.begin() as conn:
+                step(conn)
+        return dict(self.counts)
+
+    # ---------------- Reference & tenants ----------------
+
+    def _reference_data(self, conn) -> None:
+        from app.models.models import (
+            SubscriptionPlan, Currency, CurrencyExchangeRate, Bank, LgType, Rule, IssuingMethod,
+            LgStatus, LgOperationalStatus, LGCategory, Template, GlobalConfiguration
+        )
+        from app.constants import GlobalConfigKey
+
+        self._insert(conn, SubscriptionPlan, [dict(
+            id=1, name="Benchmark Enterprise", duration_months=12, monthly_price=0.0, annual_price=0.0,
+            can_maker_checker=True, can_multi_entity=True, can_ai_integration=False, can_image_storage=True,
+            has_custody_module=True, has_issuance_module=True, has_quotation_module=True,
+            has_reconciliation_module=True, max_issuance_records=10_000_000,
+        )])
+        self._insert(conn, Currency, [dict(id=i + 1, name=n, iso_code=c) for i, (n, c, _) in enumerate(CURRENCIES)])
+        self._insert(conn, CurrencyExchangeRate, [
+            dict(id=i + 1, currency_id=i + 1, buy_rate=r * 0.998, sell_rate=r, rate_date=self.today)
+            for i, (_, _, r) in enumerate(CURRENCIES)
+        ])
+        self._insert(conn, Bank, [dict(id=i + 1, name=n) for i, n in enumerate(BANK_NAMES)])
+        self._insert(conn, LgType, [dict(id=i + 1, name=n) for i, n in enumerate(LG_TYPES)])
+        self._insert(conn, Rule, [dict(id=1, name="URDG 758"), dict(id=2, name="Local Law")])
+        self._insert(conn, IssuingMethod, [dict(id=1, name="SWIFT"), dict(id=2, name="Manual Delivery")])
+        self._insert(conn, LgStatus, [dict(id=i + 1, name=n) for i, n in enumerate(LG_STATUSES)])
+        self._insert(conn, LgOperationalStatus, [dict(id=1, name="Operative"), dict(id=2, name="Non-Operative")])
+        self._insert(conn, LGCategory, [dict(id=1, name="General", code="GEN", is_default=True)])
+        configs = [(GlobalConfigKey[k], v) for k, v in GLOBAL_CONFIG_DEFAULTS.items() if k in GlobalConfigKey.__members__]
+        self._insert(conn, GlobalConfiguration, [
+            dict(id=i + 1, key=key, value_default=default, unit=unit, description="Benchmark default")
+            for i, (key, (default, unit)) in enumerate(configs)
+        ])
+        self._insert(conn, Template, [
+            dict(id=1, name="Issuance Request Letter", template_type="LETTER", action_type="LG_ISSUANCE_REQUEST",
+                 content=LETTER_TEMPLATE, language="EN", is_global=True, is_notification_template=False, is_default=True),
+            dict(id=2, name="Bank Instruction Letter", template_type="LETTER", action_type="LG_EXTENSION",
+                 content=LETTER_TEMPLATE, language="EN", is_global=True, is_notification_template=False, is_default=True),
+        ])
+
+    def _customers(self, conn) -> None:
+        from app.models.models import Customer, CustomerEntity, User, InternalOwnerContact
+        from app.constants import SubscriptionStatus, UserRole
+
+        s = self.scale
+        self._insert(conn, Customer, (dict(
+            id=c, name=f"Benchmark Customer {c:04d}", contact_email=f"treasury@customer{c}.example",
+            subscription_plan_id=1, start_date=self.now - timedelta(days=365),
+            end_date=self.now + timedelta(days=365), status=SubscriptionStatus.ACTIVE,
+        ) for c in range(1, s.customers + 1)))
+        self._insert(conn, CustomerEntity, (dict(
+            id=self._entity_id(c, k), customer_id=c, entity_name=f"Entity {c}-{k + 1}", code=f"E{c:03d}{k + 1:02d}",
+        ) for c in range(1, s.customers + 1) for k in range(s.entities_per_customer)))
+        self._insert(conn, User, (dict(
+            id=self._user_id(c, k), customer_id=c, email=f"user{k + 1}@customer{c}.example",
+            password_hash="!benchmark-no-login", role=UserRole.CORPORATE_ADMIN if k == 0 else UserRole.END_USER,
+        ) for c in range(1, s.customers + 1) for k in range(s.users_per_customer)))
+        # One internal owner contact per user, so "My LGs" resolves by email
+        self._insert(conn, InternalOwnerContact, (dict(
+            id=self._user_id(c, k), customer_id=c, email=f"user{k + 1}@customer{c}.example",
+            phone_number="+20100000000", manager_email=f"user1@customer{c}.example",
+        ) for c in range(1, s.customers + 1) for k in range(s.users_per_customer)))
+
+    def _facilities(self, conn) -> None:
+        from app.models.models_issuance import IssuanceFacility, IssuanceFacilitySubLimit
+
+        s = self.scale
+        self._insert(conn, IssuanceFacility, (dict(
+            id=self._facility_id(c, k), customer_id=c, facility_name=f"Facility {c}-{k + 1}",
+            bank_id=self._bank_of_facility(self._facility_id(c, k)), facility_type="DIRECT", currency_id=1,
+            total_limit_amount=Decimal(500_000_000), status="ACTIVE",
+            start_date=self.today - timedelta(days=365), expiry_date=self.today + timedelta(days=365),
+        ) for c in range(1, s.customers + 1) for k in range(s.facilities_per_customer)))
+        self._insert(conn, IssuanceFacilitySubLimit, (dict(
+            id=self._sub_limit_id(f, k), facility_id=f, lg_type_ids=[1, 2, 3, 4], limit_name=f"Sub-limit {f}-{k + 1}",
+            limit_amount=Decimal(150_000_000), initial_utilization=Decimal(0),
+        ) for f in range(1, self.n_facilities + 1) for k in range(s.sub_limits_per_facility)))
+
+    # ---------------- Custody ----------------
+
+    def _lg_records(self, conn) -> None:
+        from app.models.models import LGRecord
+
+        s, rng = self.scale, self.rng
+
+        def rows():
+            for i in range(s.lg_records):
+                c = self._customer_of(i)
+                # Custody dates are stored as midnight datetimes, as entered from the UI
+                midnight = datetime.combine(self.today, datetime.min.time())
+                issued = midnight - timedelta(days=rng.randint(30, 900))
+                expiry = midnight + timedelta(days=rng.randint(-90, 720))
+                status_id = 1 if rng.random() < 0.8 else rng.randint(2, 4)
+                yield dict(
+                    id=i + 1, customer_id=c, beneficiary_corporate_id=self._entity_id(c, rng.randrange(s.entities_per_customer)),
+                    lg_sequence_number=i // s.customers + 1, issuer_name=self._beneficiary(), lg_number=f"LG{i + 1:09d}",
+                    lg_amount=self._amount(), lg_currency_id=rng.randint(1, len(CURRENCIES)),
+                    issuance_date=issued, expiry_date=expiry, lg_period_months=12, auto_renewal=rng.random() < 0.3,
+                    lg_type_id=rng.randint(1, len(LG_TYPES)), lg_status_id=status_id, lg_operational_status_id=1,
+                    description_purpose="Synthetic benchmark guarantee", issuing_bank_id=rng.randint(1, self.n_banks),
+                    issuing_bank_address="Cairo", issuing_bank_phone="+2020000000", issuing_method_id=1,
+                    applicable_rule_id=1, internal_owner_contact_id=self._user_id(c, rng.randrange(s.users_per_customer)),
+                    lg_category_id=1,
+                )
+        self._insert(conn, LGRecord, rows())
+
+    def _instructions(self, conn) -> None:
+        from app.models.models import LGInstruction
+
+        s, rng = self.scale, self.rng
+
+        def rows():
+            for i in range(s.instructions):
+                lg_index = i % s.lg_records
+                seq = i // s.lg_records + 1
+                c = self._customer_of(lg_index)
+                instruction_date = self.now - timedelta(days=rng.randint(0, 400))
+                delivered = rng.random() < 0.7
+                yield dict(
+                    id=i + 1, lg_record_id=lg_index + 1, instruction_type=rng.choice(INSTRUCTION_TYPES),
+                    serial_number=f"INS-{i + 1:09d}", global_seq_per_lg=seq, type_seq_per_lg=seq,
+                    template_id=2, status="Instruction Issued", instruction_date=instruction_date,
+                    delivery_date=instruction_date + timedelta(days=rng.randint(0, 5)) if delivered else None,
+                    sent_to_bank=delivered, is_printed=rng.random() < 0.8,
+                    maker_user_id=self._user_id(c, rng.randrange(s.users_per_customer)),
+                )
+        self._insert(conn, LGInstruction, rows())
+
+    # ---------------- Issuance ----------------
+
+    def _random_sub_limit(self, customer_id: int) -> int:
+        facility = self._facility_id(customer_id, self.rng.randrange(self.scale.facilities_per_customer))
+        return self._sub_limit_id(facility, self.rng.randrange(self.scale.sub_limits_per_facility))
+
+    def _facility_of_sub_limit(self, sub_limit_id: int) -> int:
+        return (sub_limit_id - 1) // self.scale.sub_limits_per_facility + 1
+
+    def _issuance_requests(self, conn) -> None:
+        from app.models.models_issuance import IssuanceRequest
+
+        s, rng = self.scale, self.rng
+
+        def rows():
+            for i in range(s.issuance_requests):
+                c = self._customer_of(i)
+                status = _weighted(rng, REQUEST_STATUSES)
+                yield dict(
+                    id=i + 1, customer_id=c, serial_number=f"BR{c:03d}-{i + 1:09d}", status=status,
+                    transaction_type="NEW_ISSUANCE", issuing_entity_id=self._entity_id(c, rng.randrange(s.entities_per_customer)),
+                    requestor_user_id=self._user_id(c, rng.randrange(s.users_per_customer)),
+                    lg_type_id=rng.randint(1, len(LG_TYPES)), amount=self._amount(), currency_id=rng.randint(1, len(CURRENCIES)),
+                    requested_issue_date=self.today + timedelta(days=rng.randint(0, 30)),
+                    requested_expiry_date=self.today + timedelta(days=rng.randint(90, 720)),
+                    lg_language="EN", beneficiary_name=self._beneficiary(), beneficiary_address="Cairo, Egypt",
+                    reference_type="CONTRACT", reference_number=f"CT-{rng.randint(1, s.issuance_requests // 3 + 1):07d}",
+                    lg_purpose="Synthetic benchmark request", current_version_number=1, locked_for_issuance=False,
+                    selected_sub_limit_id=self._random_sub_limit(c) if status not in ("DRAFT", "PENDING_APPROVAL") else None,
+                )
+        self._insert(conn, IssuanceRequest, rows())
+
+    def _issued_lgs(self, conn) -> None:
+        from app.models.models_issuance import IssuedLGRecord
+
+        s, rng = self.scale, self.rng
+        wanted_per_customer = s.reconciliation_bank_rows // s.customers + 1
+
+        def rows():
+            for i in range(s.issued_lgs):
+                c = self._customer_of(i)
+                sub_limit = self._random_sub_limit(c)
+                bank_id = self._bank_of_facility(self._facility_of_sub_limit(sub_limit))
+                status = _weighted(rng, ISSUED_STATUSES)
+                bank_ref = f"{BANK_NAMES[bank_id - 1][:3].upper()}/{i + 1:09d}"
+                refs = self._bank_lg_numbers.setdefault((c, bank_id), [])
+                if len(refs) < wanted_per_customer:
+                    refs.append(bank_ref)
+                issue_date = self.today - timedelta(days=rng.randint(0, 700))
+                yield dict(
+                    id=i + 1, lg_ref_number=f"ILG-{i + 1:09d}", customer_id=c, facility_sub_limit_id=sub_limit,
+                    request_id=i + 1 if i < s.issuance_requests else None, bank_id=bank_id,
+                    beneficiary_name=self._beneficiary(), current_amount=self._amount(),
+                    currency_id=rng.randint(1, len(CURRENCIES)), issue_date=issue_date,
+                    expiry_date=issue_date + timedelta(days=rng.randint(90, 900)), status=status,
+                    bank_lg_number=bank_ref, lg_type_id=rng.randint(1, len(LG_TYPES)),
+                    reference_type="CONTRACT", reference_number=f"CT-{rng.randint(1, s.issuance_requests // 3 + 1):07d}",
+                    created_at=datetime.combine(issue_date, datetime.min.time()),
+                )
+        self._insert(conn, IssuedLGRecord, rows())
+
+    def _exposure_entries(self, conn) -> None:
+        from app.models.models_issuance import IssuanceExposureEntry
+
+        s, rng = self.scale, self.rng
+
+        def rows():
+            for i in range(s.exposure_entries):
+                request_index = rng.randrange(s.issuance_requests)
+                c = self._customer_of(request_index)
+                sub_limit = self._random_sub_limit(c)
+                entry_type = rng.choice(["ISSUANCE", "ISSUANCE", "RESERVATION", "AMEND_INCREASE", "RELEASE"])
+                amount = self._amount() * (-1 if entry_type == "RELEASE" else 1)
+                yield dict(
+                    id=i + 1, facility_id=self._facility_of_sub_limit(sub_limit), sub_limit_id=sub_limit,
+                    request_id=request_index + 1, lg_record_id=request_index + 1 if request_index < s.issued_lgs else None,
+                    entry_type=entry_type, original_amount_delta=amount, original_currency_id=1,
+                    fx_rate_used=Decimal(1), facility_equivalent_delta=amount, is_active=rng.random() < 0.9,
+                    effective_date=self.today - timedelta(days=rng.randint(0, 400)),
+                )
+        self._insert(conn, IssuanceExposureEntry, rows())
+
+    # ---------------- Bank reconciliation ----------------
+
+    def _bank_statements(self, conn) -> None:
+        from app.models.models_reconciliation_v2 import BankStatement, BankTransaction
+
+        s, rng = self.scale, self.rng
+        self._insert(conn, BankStatement, (dict(
+            id=k + 1, company_id=self._customer_of(k), bank_id=k % self.n_banks + 1, account_number=f"100{k:07d}",
+            currency_id=1, file_name=f"statement_{k + 1}.xlsx", opening_balance=Decimal(10_000_000),
+            closing_balance=Decimal(12_000_000), statement_start_date=self.now - timedelta(days=31),
+            statement_end_date=self.now - timedelta(days=1), status="PROCESSED",
+        ) for k in range(s.bank_statements)))
+
+        def rows():
+            balance = Decimal(10_000_000)
+            for i in range(s.bank_transactions):
+                statement = rng.randrange(s.bank_statements)
+                c = self._customer_of(statement)
+                amount = Decimal(rng.randrange(1_000, 5_000_000, 10))
+                balance += amount
+                # ~30% reference an LG number of the same customer
+                if rng.random() < 0.3:
+                    lg_index = rng.randrange(c - 1, s.lg_records, s.customers)
+                    description = f"LG COMMISSION REF LG{lg_index + 1:09d} {self._beneficiary().upper()}"
+                else:
+                    description = f"TRANSFER {self._beneficiary().upper()} INV {rng.randint(1, 10 ** 6)}"
+                booked = self.now - timedelta(days=rng.randint(1, 31))
+                yield dict(
+                    id=i + 1, statement_id=statement + 1, booking_date=booked, value_date=booked, currency="EGP",
+                    debit_amount=amount if rng.random() < 0.5 else None, credit_amount=amount,
+                    running_balance=balance, raw_description=description, is_reconciled=False,
+                )
+        self._insert(conn, BankTransaction, rows())
+
+    def _reconciliation(self, conn) -> None:
+        """One PARSED position-report session per customer against the bank holding most of its LGs."""
+        from app.models.models_issuance import ReconciliationSession, ReconciliationBankRow
+
+        s, rng = self.scale, self.rng
+        sessions = []
+        for c in range(1, s.customers + 1):
+            bank_refs = {b: refs for (cc, b), refs in self._bank_lg_numbers.items() if cc == c}
+            bank_id = max(bank_refs, key=lambda b: len(bank_refs[b])) if bank_refs else 1
+            sessions.append((c, bank_id, bank_refs.get(bank_id, [])))
+
+        self._insert(conn, ReconciliationSession, (dict(
+            id=c, customer_id=c, bank_id=bank_id, position_date=self.today, status="PARSED",
+            original_file_name=f"position_{c}.xlsx", total_bank_records=0,
+        ) for c, bank_id, _ in sessions))
+
+        per_session = s.reconciliation_bank_rows // s.customers
+
+        def rows():
+            row_id = 0
+            for c, bank_id, refs in sessions:
+                for k in range(per_session):
+                    row_id += 1
+                    roll = rng.random()
+                    if refs and roll < 0.7:
+                        ref = refs[k % len(refs)]
+                    elif refs and roll < 0.8:
+                        ref = refs[k % len(refs)].replace("/", "-")  # Exercises the fuzzy fallback
+                    else:
+                        ref = f"UNK/{rng.randint(1, 10 ** 8):09d}"
+                    yield dict(
+                        id=row_id, session_id=c, bank_lg_number=ref, beneficiary_name=self._beneficiary(),
+                        amount=self._amount(), currency_code=rng.choice(CURRENCIES)[1],
+                        issue_date=self.today - timedelta(days=rng.randint(0, 700)),
+                        expiry_date=self.today + timedelta(days=rng.randint(0, 700)),
+                    )
+        self._insert(conn, ReconciliationBankRow, rows())
+
+    # ---------------- Audit ----------------
+
+    def _audit_logs(self, conn) -> None:
+        from app.models.models import AuditLog
+
+        s, rng = self.scale, self.rng
+
+        def rows():
+            for i in range(s.audit_logs):
+                c = self._customer_of(i)
+                lg_index = rng.randrange(c - 1, s.lg_records, s.customers)
+                yield dict(
+                    id=i + 1, user_id=self._user_id(c, rng.randrange(s.users_per_customer)),
+                    action_type=rng.choice(AUDIT_ACTIONS), entity_type="LGRecord", entity_id=lg_index + 1,
+                    details={"source": "benchmark", "seq": i}, timestamp=self.now - timedelta(minutes=rng.randint(0, 60 * 24 * 365)),
+                    customer_id=c, lg_record_id=lg_index + 1,
+                )
+        self._insert(conn, AuditLog, rows())
@@ -0,0 +1,176 @@
+# benchmarks/harness.py
+"""
+Timing harness and JSON report.
+
+Each case runs `warmup` untimed iterations followed by `repeat` timed ones,
+every iteration in its own isolated (rolled back) session. Query counts come
+from the process-wide telemetry registry, so they include every statement
+the hot path issues, lazy loads included.
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from unittest import mock
+
+from benchmarks.dbsetup import isolated_session
+
+logger = logging.getLogger(__name__)
+
+# Outbound I/O replaced during timing: the SMTP transport is stubbed so message
+# building and recipient resolution are still measured, network round-trips are not
+_SMTP_PATCH_TARGETS = [
+    "app.core.email_service.smtplib.SMTP",
+    "app.core.email_service.smtplib.SMTP_SSL",
+]
+
+
+@dataclass
+class BenchmarkCase:
+    name: str
+    func: Callable[..., Any]   # func(db, ctx) -> Any; may be a coroutine function
+    description: str = ""
+
+
+@dataclass
+class CaseResult:
+    name: str
+    description: str
+    status: str = "ok"
+    error: Optional[str] = None
+    timings_ms: List[float] = field(default_factory=list)
+    queries: List[int] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"name": self.name, "description": self.description, "status": self.status}
+        if self.error:
+            out["error"] = self.error
+        if self.timings_ms:
+            ordered = sorted(self.timings_ms)
+            p95_index = min(len(ordered) - 1, max(0, round(0.95 * len(ordered)) - 1))
+            out.update({
+                "runs": len(ordered),
+                "min_ms": round(ordered[0], 3),
+                "median_ms": round(statistics.median(ordered), 3),
+                "p95_ms": round(ordered[p95_index], 3),
+                "mean_ms": round(statistics.fmean(ordered), 3),
+                "max_ms": round(ordered[-1], 3),
+                "queries": max(self.queries) if self.queries else 0,
+            })
+        return out
+
+
+def _outbound_io_patched() -> ExitStack:
+    stack = ExitStack()
+    for target in _SMTP_PATCH_TARGETS:
+        try:
+            stack.enter_context(mock.patch(target, new=mock.MagicMock()))
+        except (AttributeError, ModuleNotFoundError):
+            continue
+    return stack
+
+
+def _call(func: Callable[..., Any], db, ctx: Dict[str, Any]) -> Any:
+    result = func(db, ctx)
+    if inspect.isawaitable(result):
+        result = asyncio.run(result)
+    return result
+
+
+def run_case(engine, case: BenchmarkCase, ctx: Dict[str, Any], repeat: int, warmup: int) -> CaseResult:
+    from app.core.telemetry import telemetry
+
+    result = CaseResult(name=case.name, description=case.description)
+    with _outbound_io_patched():
+        for iteration in range(warmup + repeat):
+            try:
+                with isolated_session(engine) as db:
+                    queries_before = telemetry.query_total
+                    started = time.perf_counter()
+                    _call(case.func, db, ctx)
+                    elapsed_ms = (time.perf_counter() - started) * 1000.0
+                    queries = telemetry.query_total - queries_before
+            except Exception as e:
+                logger.warning(f"Benchmark {case.name} failed: {e}")
+                result.status = "error"
+                result.error = f"{type(e).__name__}: {e}"[:500]
+                result.timings_ms.clear()
+                result.queries.clear()
+                return result
+            if iteration >= warmup:
+                result.timings_ms.append(elapsed_ms)
+                result.queries.append(queries)
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def build_report(engine, scale, seed: int, row_counts: Dict[str, int], results: List[CaseResult],
+                 repeat: int, warmup: int) -> Dict[str, Any]:
+    return {
+        "metadata": {
+            "generated_at": datetime.utcnow().isoformat() + "Z",
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dialect": engine.dialect.name,
+            "server_version": ".".join(str(p) for p in (engine.dialect.server_version_info or ())) or None,
+            "scale": scale.as_dict(),
+            "seed": seed,
+            "repeat": repeat,
+            "warmup": warmup,
+            "row_counts": row_counts,
+        },
+        "results": [r.as_dict() for r in results],
+    }
+
+
+def write_report(report: Dict[str, Any], path: str) -> None:
+    with open(path, "w") as fh:
+        json.dump(report, fh, indent=2, sort_keys=False)
+        fh.write("\n")
+
+
+def format_results(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    """Plain-text table; with a baseline, adds median deltas per case."""
+    base = {r["name"]: r for r in (baseline or {}).get("results", [])}
+    header = f"{'case':<52} {'median ms':>11} {'p95 ms':>10} {'queries':>8}"
+    if baseline:
+        header += f" {'base ms':>10} {'delta':>8}"
+    lines = [header, "-" * len(header)]
+    for r in report["results"]:
+        if r["status"] != "ok":
+            lines.append(f"{r['name']:<52} {'ERROR':>11}  {r.get('error', '')[:80]}")
+            continue
+        line = f"{r['name']:<52} {r['median_ms']:>11.2f} {r['p95_ms']:>10.2f} {r['queries']:>8}"
+        if baseline:
+            prev = base.get(r["name"])
+            if prev and prev.get("status") == "ok" and prev.get("median_ms"):
+                delta = (r["median_ms"] - prev["median_ms"]) / prev["median_ms"] * 100.0
+                line += f" {prev['median_ms']:>10.2f} {delta:>+7.1f}%"
+            else:
+                line += f" {'-':>10} {'-':>8}"
+        lines.append(line)
+    if baseline:
+        prev_meta = baseline.get("metadata", {})
+        if prev_meta.get("scale", {}).get("name") != report["metadata"]["scale"]["name"]:
+            lines.append("warning: baseline was recorded at a different scale")
+        if prev_meta.get("dialect") != report["metadata"]["dialect"]:
+            lines.append("warning: baseline was recorded on a different database")
+    return "\n".join(lines)
@@ -0,0 +1,60 @@
+# tests/conftest.py
+"""
+pytest wiring for the unit tests in this directory.
+
+The application creates its engine from DATABASE_URL at import time, so the
+tests point it at a throwaway SQLite file (benchmarks/dbsetup.py) before
+anything under app/ is imported. Tests that need rows use the `engine` /
+`db` fixtures, which seed a tiny synthetic dataset once per run.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.dbsetup import configure, reset_schema  # noqa: E402
+
+_DB_DIR = tempfile.mkdtemp(prefix="lg_tests_")
+_ENGINE = configure(f"sqlite:///{os.path.join(_DB_DIR, 'tests.db')}")
+
+# Row counts of the seeded dataset (two customers, a few LGs each)
+TEST_SCALE = dict(
+    customers=2, entities_per_customer=2, users_per_customer=2, facilities_per_customer=1,
+    sub_limits_per_facility=1, lg_records=20, instructions=20, issuance_requests=5, issued_lgs=5,
+    exposure_entries=5, bank_statements=1, bank_transactions=5, reconciliation_bank_rows=5, audit_logs=5,
+)
+
+
+@pytest.fixture(scope="session")
+def engine():
+    from benchmarks.config import DEFAULT_SEED, ScaleConfig
+    from benchmarks.generators import SyntheticDataGenerator
+
+    # Caches and fixtures write on their own connections while a test session reads
+    raw = _ENGINE.raw_connection()
+    try:
+        raw.cursor().execute("PRAGMA journal_mode=WAL")
+    finally:
+        raw.close()
+    reset_schema(_ENGINE)
+    SyntheticDataGenerator(_ENGINE, ScaleConfig(name="tests", **TEST_SCALE), DEFAULT_SEED).generate()
+    yield _ENGINE
+    _ENGINE.dispose()
+    shutil.rmtree(_DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def db(engine):
+    from sqlalchemy.orm import Session
+
+    session = Session(bind=engine)
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
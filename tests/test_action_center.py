@@ -0,0 +1,74 @@
+# tests/test_action_center.py
+"""Materialized action-center work queue: flush-time refresh, rebuild and keyset pages."""
+
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+from app.models.models_action_center import IssuanceWorkItem
+from app.models.models_issuance import IssuedLGRecord
+from app.services.action_center_service import (
+    APPROACHING_EXPIRY,
+    AWAITING_REPLY,
+    PENDING_DELIVERY,
+    SOURCE_ISSUANCE,
+    action_center_service,
+)
+
+
+def _buckets(db, issued_lg_id):
+    return set(db.execute(select(IssuanceWorkItem.bucket).where(
+        IssuanceWorkItem.source == SOURCE_ISSUANCE, IssuanceWorkItem.source_id == issued_lg_id,
+    )).scalars())
+
+
+def test_flush_moves_an_lg_between_buckets(db):
+    lg = db.execute(select(IssuedLGRecord).order_by(IssuedLGRecord.id)).scalars().first()
+    lg.status, lg.delivery_date, lg.bank_reply_date = "INTERNAL_PROCESSING", None, None
+    db.flush()
+    assert _buckets(db, lg.id) == {PENDING_DELIVERY}
+
+    lg.delivery_date = date.today()
+    db.flush()
+    assert _buckets(db, lg.id) == {AWAITING_REPLY}
+
+    lg.status, lg.bank_reply_date, lg.bank_lg_expiry_date = "ACTIVE", date.today(), date.today() + timedelta(days=10)
+    db.flush()
+    assert _buckets(db, lg.id) == {APPROACHING_EXPIRY}
+
+    customer_id = lg.customer_id
+    expiring, _ = action_center_service.list_items(db, customer_id, APPROACHING_EXPIRY, days_threshold=30)
+    assert lg.id in {item.source_id for item in expiring}
+    later, _ = action_center_service.list_items(db, customer_id, APPROACHING_EXPIRY, days_threshold=5)
+    assert lg.id not in {item.source_id for item in later}
+
+
+def test_rebuild_matches_the_flush_maintained_queue(db):
+    customer_id = db.execute(select(IssuedLGRecord.customer_id).order_by(IssuedLGRecord.id)).scalars().first()
+    for lg in db.execute(select(IssuedLGRecord).where(IssuedLGRecord.customer_id == customer_id)).scalars():
+        lg.status, lg.delivery_date = "INTERNAL_PROCESSING", None
+    db.flush()
+    before = action_center_service.counts(db, customer_id)
+
+    action_center_service.rebuild(db, customer_id)
+
+    assert action_center_service.counts(db, customer_id) == before
+    assert before[PENDING_DELIVERY] > 1
+
+
+def test_bucket_pages_cover_the_bucket_once(db):
+    customer_id = db.execute(select(IssuedLGRecord.customer_id).order_by(IssuedLGRecord.id)).scalars().first()
+    for lg in db.execute(select(IssuedLGRecord).where(IssuedLGRecord.customer_id == customer_id)).scalars():
+        lg.status, lg.delivery_date = "INTERNAL_PROCESSING", None
+    db.flush()
+    everything, next_cursor = action_center_service.list_items(db, customer_id, PENDING_DELIVERY)
+    assert next_cursor is None and len(everything) > 1
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = action_center_service.list_items(db, customer_id, PENDING_DELIVERY, limit=1, cursor=cursor)
+        seen.extend(item.id for item in page)
+        if cursor is None:
+            break
+
+    assert seen == [item.id for item in everything]
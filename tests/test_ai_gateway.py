@@ -0,0 +1,244 @@
+# tests/test_ai_gateway.py
+"""AIGateway: request coalescing, per-customer slots, timeouts and retries (offline backend)."""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.core import ai_gateway
+from app.core.ai_gateway import AIBusy, AIGateway, AIResponse, AITimeout, FakeAIBackend
+
+MODEL = "test-model"
+
+
+class FlakyBackend(FakeAIBackend):
+    """Raises the given errors on the first calls, then answers like FakeAIBackend."""
+
+    def __init__(self, errors, latency_ms: float = 0):
+        super().__init__(latency_ms=latency_ms)
+        self.errors = list(errors)
+
+    async def generate(self, model, contents, config, call_type) -> AIResponse:
+        if self.errors:
+            self.calls.append((call_type, "error"))
+            raise self.errors.pop(0)
+        return await super().generate(model, contents, config, call_type)
+
+
+class BlockingBackend(FakeAIBackend):
+    """Holds every call until release() (to pin slots)."""
+
+    def __init__(self):
+        super().__init__(latency_ms=0)
+        self.started = threading.Semaphore(0)
+        self._released = None
+
+    def release(self, gateway: AIGateway) -> None:
+        gateway._gateway_loop().call_soon_threadsafe(self._gate().set)
+
+    def _gate(self) -> asyncio.Event:
+        if self._released is None:
+            self._released = asyncio.Event()
+        return self._released
+
+    async def generate(self, model, contents, config, call_type) -> AIResponse:
+        self.started.release()
+        await self._gate().wait()
+        return await super().generate(model, contents, config, call_type)
+
+
+def _gather(gateway: AIGateway, *calls):
+    async def run():
+        return await asyncio.gather(*calls, return_exceptions=True)
+    return gateway.run_sync(run())
+
+
+@pytest.fixture
+def no_retry_delay(monkeypatch):
+    delays = []
+
+    def uniform(low, high):
+        delays.append((low, high))
+        return 0.0
+
+    monkeypatch.setattr(ai_gateway.random, "uniform", uniform)
+    return delays
+
+
+# ---------------- Coalescing ----------------
+
+def test_identical_concurrent_calls_share_one_backend_call():
+    backend = FakeAIBackend(latency_ms=50)
+    gateway = AIGateway(backend=backend)
+
+    results = _gather(gateway, *(gateway.generate("same prompt", call_type="summary", model=MODEL) for _ in range(5)))
+
+    assert len(backend.calls) == 1
+    assert len({r.text for r in results}) == 1
+    leaders = [r for r in results if not r.coalesced]
+    assert len(leaders) == 1 and leaders[0].usage_metadata is not None
+    assert all(r.usage_metadata is None for r in results if r.coalesced)
+    assert gateway.stats()["coalescing_keys"] == 0
+
+
+def test_different_prompts_or_config_are_not_coalesced():
+    backend = FakeAIBackend(latency_ms=20)
+    gateway = AIGateway(backend=backend)
+
+    results = _gather(
+        gateway,
+        gateway.generate("prompt a", call_type="summary", model=MODEL),
+        gateway.generate("prompt b", call_type="summary", model=MODEL),
+        gateway.generate("prompt a", call_type="summary", model=MODEL, config={"temperature": 0.5}),
+    )
+
+    assert len(backend.calls) == 3
+    assert not any(r.coalesced for r in results)
+
+
+def test_sequential_calls_are_not_coalesced():
+    backend = FakeAIBackend(latency_ms=0)
+    gateway = AIGateway(backend=backend)
+
+    first = gateway.generate_sync("prompt", call_type="summary", model=MODEL)
+    second = gateway.generate_sync("prompt", call_type="summary", model=MODEL)
+
+    assert len(backend.calls) == 2
+    assert not first.coalesced and not second.coalesced
+
+
+# ---------------- Slots ----------------
+
+def test_customer_at_its_cap_gets_busy_while_others_proceed():
+    backend = BlockingBackend()
+    gateway = AIGateway(backend=backend, max_concurrency=4, max_concurrency_per_customer=1, slot_timeout=0.1)
+
+    held = asyncio.run_coroutine_threadsafe(
+        gateway._generate("first", "summary", None, MODEL, 1, None), gateway._gateway_loop()
+    )
+    assert backend.started.acquire(timeout=5)
+
+    with pytest.raises(AIBusy):
+        gateway.generate_sync("second", call_type="summary", model=MODEL, customer_id=1)
+
+    other = asyncio.run_coroutine_threadsafe(
+        gateway._generate("third", "summary", None, MODEL, 2, None), gateway._gateway_loop()
+    )
+    assert backend.started.acquire(timeout=5)
+
+    backend.release(gateway)
+    assert held.result(timeout=5).text
+    assert other.result(timeout=5).text
+    # The customer's slot is free again
+    assert gateway.generate_sync("fourth", call_type="summary", model=MODEL, customer_id=1).text
+
+
+def test_global_cap_applies_to_calls_without_customer():
+    backend = BlockingBackend()
+    gateway = AIGateway(backend=backend, max_concurrency=1, slot_timeout=0.1)
+
+    held = asyncio.run_coroutine_threadsafe(
+        gateway._generate("first", "summary", None, MODEL, None, None), gateway._gateway_loop()
+    )
+    assert backend.started.acquire(timeout=5)
+
+    with pytest.raises(AIBusy):
+        gateway.generate_sync("second", call_type="summary", model=MODEL)
+
+    backend.release(gateway)
+    assert held.result(timeout=5).text
+
+
+# ---------------- Timeouts and retries ----------------
+
+def test_timeout_is_retried_then_raised(no_retry_delay):
+    backend = FakeAIBackend(latency_ms=200)
+    gateway = AIGateway(backend=backend, request_timeout=0.02, max_attempts=3)
+
+    with pytest.raises(AITimeout, match="3 attempt"):
+        gateway.generate_sync("slow", call_type="summary", model=MODEL)
+
+    assert len(backend.calls) == 3
+    assert len(no_retry_delay) == 2
+
+
+def test_per_call_timeout_overrides_default(no_retry_delay):
+    backend = FakeAIBackend(latency_ms=50)
+    gateway = AIGateway(backend=backend, request_timeout=0.01, max_attempts=1)
+
+    result = gateway.generate_sync("slow", call_type="summary", model=MODEL, timeout=2)
+
+    assert result.attempts == 1
+
+
+def test_transient_error_is_retried_with_jitter(no_retry_delay, monkeypatch):
+    monkeypatch.setattr(ai_gateway, "RETRY_BASE_SECONDS", 0.5)
+    monkeypatch.setattr(ai_gateway, "RETRY_MAX_SECONDS", 1.5)
+    backend = FlakyBackend([ConnectionError("reset"), ConnectionError("reset"), ConnectionError("reset")])
+    gateway = AIGateway(backend=backend, max_attempts=4)
+
+    result = gateway.generate_sync("prompt", call_type="summary", model=MODEL)
+
+    assert result.attempts == 4
+    assert len(backend.calls) == 4
+    # Full jitter over an exponential window capped at RETRY_MAX_SECONDS
+    assert no_retry_delay == [(0, 0.5), (0, 1.0), (0, 1.5)]
+
+
+def test_http_status_errors_are_retried_only_when_transient(no_retry_delay):
+    class StatusError(Exception):
+        def __init__(self, code):
+            super().__init__(f"status {code}")
+            self.code = code
+
+    backend = FlakyBackend([StatusError(503)])
+    gateway = AIGateway(backend=backend, max_attempts=2)
+    assert gateway.generate_sync("prompt", call_type="summary", model=MODEL).attempts == 2
+
+    backend = FlakyBackend([StatusError(400)])
+    gateway = AIGateway(backend=backend, max_attempts=2)
+    with pytest.raises(StatusError):
+        gateway.generate_sync("prompt", call_type="summary", model=MODEL)
+    assert len(backend.calls) == 1
+    assert no_retry_delay == [(0, ai_gateway.RETRY_BASE_SECONDS)]
+
+
+def test_non_retryable_error_is_not_retried(no_retry_delay):
+    backend = FlakyBackend([ValueError("bad request")])
+    gateway = AIGateway(backend=backend, max_attempts=3)
+
+    with pytest.raises(ValueError):
+        gateway.generate_sync("prompt", call_type="summary", model=MODEL)
+
+    assert len(backend.calls) == 1
+    assert no_retry_delay == []
+
+
+def test_coalesced_callers_share_the_failure(no_retry_delay):
+    backend = FlakyBackend([ValueError("bad request")], latency_ms=0)
+    gateway = AIGateway(backend=backend, max_attempts=1)
+
+    async def slow_generate(model, contents, config, call_type):
+        await asyncio.sleep(0.05)
+        return await FlakyBackend.generate(backend, model, contents, config, call_type)
+
+    backend.generate = slow_generate
+    results = _gather(gateway, *(gateway.generate("prompt", call_type="summary", model=MODEL) for _ in range(3)))
+
+    assert len(backend.calls) == 1
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+# ---------------- Fake backend ----------------
+
+def test_fake_backend_responses():
+    backend = FakeAIBackend(latency_ms=0)
+    backend.respond("echo", lambda prompt: prompt.upper())
+    gateway = AIGateway(backend=backend)
+
+    assert gateway.generate_sync("hello", call_type="echo", model=MODEL).text == "HELLO"
+    assert gateway.generate_sync("x", call_type="unknown_json", model=MODEL,
+                                 config={"response_mime_type": "application/json"}).text == "{}"
+    text = gateway.generate_sync("x", call_type="unknown_text", model=MODEL).text
+    assert text.startswith("[offline model] unknown_text ")
@@ -0,0 +1,149 @@
+# tests/test_ai_privacy_tokenizer.py
+"""Privacy tokenizer: stable vocabularies, tokenize / validate / detokenize round-trips."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.ai_privacy_tokenizer import (
+    TOKEN_KIND_BANK,
+    TOKEN_KIND_BENEFICIARY,
+    TOKEN_KIND_LG,
+    PrivacyTokenizer,
+    TokenVocabulary,
+    TokenVocabularyStore,
+)
+
+
+@pytest.fixture
+def tokenizer():
+    return PrivacyTokenizer()
+
+
+RECORDS = [
+    {"lg_number": "LG-1001", "beneficiary": "Nile Works", "issuing_bank": "NBE", "amount": 100},
+    {"lg_number": "LG-1002", "beneficiary": "Delta Build", "issuing_bank": "CIB", "amount": 200},
+    {"lg_number": "LG-1003", "beneficiary": "Nile Works", "issuing_bank": "NBE", "amount": 300},
+]
+
+
+def test_vocabulary_tokens_are_stable_and_numbered_per_kind():
+    vocabulary = TokenVocabulary()
+
+    assert vocabulary.tokens_for(TOKEN_KIND_LG, ["A", "B", "A"]) == ["LG_TOKEN_001", "LG_TOKEN_002", "LG_TOKEN_001"]
+    assert vocabulary.token_for(TOKEN_KIND_LG, "B") == "LG_TOKEN_002"
+    assert vocabulary.token_for(TOKEN_KIND_BANK, "A") == "BANK_TOKEN_001"
+    assert vocabulary.find_token(TOKEN_KIND_BENEFICIARY, "A") is None
+    assert len(vocabulary) == 3
+
+
+def test_dataset_round_trip(tokenizer):
+    tokenized, mapping = tokenizer.tokenize_dataset(RECORDS)
+
+    assert [r["lg_number"] for r in tokenized] == ["LG_TOKEN_001", "LG_TOKEN_002", "LG_TOKEN_003"]
+    assert tokenized[0]["beneficiary"] == tokenized[2]["beneficiary"] == "BENEFICIARY_TOKEN_001"
+    assert [r["amount"] for r in tokenized] == [100, 200, 300]
+    assert RECORDS[0]["lg_number"] == "LG-1001"  # input not modified
+    assert not any(value in str(tokenized) for value in ("LG-1001", "Nile Works", "NBE"))
+
+    answer = "LG_TOKEN_003 for BENEFICIARY_TOKEN_001 is with BANK_TOKEN_001; LG_TOKEN_002 is with BANK_TOKEN_002."
+    assert tokenizer.validate_ai_output_tokens(answer, mapping) == (True, "Output Validation Passed")
+    assert tokenizer.detokenize_response(answer, mapping) == "LG-1003 for Nile Works is with NBE; LG-1002 is with CIB."
+
+
+def test_missing_columns_use_placeholders(tokenizer):
+    tokenized, mapping = tokenizer.tokenize_dataset([{"amount": 1}])
+
+    assert mapping[tokenized[0]["lg_number"]] == "LG-000"
+    assert mapping[tokenized[0]["beneficiary"]] == "Corporate"
+    assert mapping[tokenized[0]["issuing_bank"]] == "Bank"
+
+
+def test_unknown_token_is_rejected(tokenizer):
+    _, mapping = tokenizer.tokenize_dataset(RECORDS)
+
+    valid, message = tokenizer.validate_ai_output_tokens("See LG_TOKEN_009.", mapping)
+
+    assert not valid
+    assert "LG_TOKEN_009" in message
+
+
+def test_long_token_numbers_are_not_confused_with_prefixes(tokenizer):
+    vocabulary = TokenVocabulary()
+    values = [f"LG-{n:05d}" for n in range(1, 1001)]
+    _, mapping = tokenizer.tokenize_columns({"lg_number": values}, vocabulary)
+
+    text = "LG_TOKEN_100 and LG_TOKEN_1000"
+    assert tokenizer.detokenize_response(text, mapping) == "LG-00100 and LG-01000"
+
+    # LG_TOKEN_1000 is not valid in a 100-token mapping, even though LG_TOKEN_100 is
+    small = {token: value for token, value in mapping.items() if int(token.rsplit("_", 1)[1]) <= 100}
+    assert not tokenizer.validate_ai_output_tokens(text, small)[0]
+
+
+def test_detokenize_leaves_unknown_tokens(tokenizer):
+    assert tokenizer.detokenize_response("LG_TOKEN_001 / LG_TOKEN_002", {"LG_TOKEN_001": "LG-1"}) == "LG-1 / LG_TOKEN_002"
+
+
+def test_question_round_trip_shares_the_session_vocabulary(tokenizer):
+    vocabulary = tokenizer.vocabulary(customer_id=7)
+    tokenizer.tokenize_dataset(RECORDS, vocabulary)
+
+    sanitized, mapping = tokenizer.sanitize_user_question("When does LG-1002 expire?", vocabulary)
+
+    assert sanitized == "When does LG_TOKEN_002 expire?"
+    assert mapping == {"LG_TOKEN_002": "LG-1002"}
+    assert tokenizer.detokenize_response(sanitized, mapping) == "When does LG-1002 expire?"
+    assert tokenizer.vocabulary(customer_id=7) is vocabulary
+    assert tokenizer.vocabulary(customer_id=8) is not vocabulary
+
+
+def test_complex_payload_round_trip(tokenizer):
+    beneficiaries = {
+        "Nile Works": {"total": 400, "expiring_in_90_days": [{"lg_number": "LG-1003"}, {"lg_number": "LG-9999"}]},
+        "Acme Traders": {"total": 0},
+    }
+    facilities = [{"bank": "NBE", "headroom": 10}, {"bank": "QNB", "headroom": 5}, {"bank": None, "headroom": 0}]
+
+    records, bens, facs, mapping = tokenizer.tokenize_complex_payload(RECORDS, beneficiaries, facilities)
+
+    assert list(bens) == ["BENEFICIARY_TOKEN_001", "BENEFICIARY_TOKEN_003"]
+    expiring = bens["BENEFICIARY_TOKEN_001"]["expiring_in_90_days"]
+    assert expiring == [{"lg_number": "LG_TOKEN_003"}, {"lg_number": "LG-9999"}]
+    assert [f["bank"] for f in facs] == ["BANK_TOKEN_001", "BANK_TOKEN_003", None]
+    assert records[0]["issuing_bank"] == "BANK_TOKEN_001"
+    assert tokenizer.detokenize_response("BENEFICIARY_TOKEN_003 / BANK_TOKEN_003", mapping) == "Acme Traders / QNB"
+
+
+def test_vocabulary_store_expires_and_bounds_entries():
+    store = TokenVocabularyStore(ttl_seconds=-1, max_entries=2, max_tokens=2)
+    first = store.get(1)
+    assert store.get(1) is not first  # expired
+
+    store = TokenVocabularyStore(ttl_seconds=60, max_entries=2, max_tokens=2)
+    vocabulary = store.get(1)
+    vocabulary.tokens_for(TOKEN_KIND_LG, ["a", "b", "c"])
+    assert store.get(1) is not vocabulary  # over max_tokens
+
+    a, b = store.get(1), store.get(2)
+    store.get(3)
+    assert store.get(2) is b
+    assert store.get(1) is not a  # least recently used dropped
+
+
+def test_shared_vocabulary_issues_one_token_per_value_across_threads(tokenizer):
+    vocabulary = tokenizer.vocabulary(customer_id=11)
+    batches = [[f"LG-{(start + n) % 300:04d}" for n in range(200)] for start in range(0, 800, 100)]
+
+    def tokenize(values):
+        return tokenizer.tokenize_columns({"lg_number": values}, vocabulary)[0]["lg_number"]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(tokenize, batches))
+
+    assert len(vocabulary) == 300
+    issued = {}
+    for values, tokens in zip(batches, results):
+        for value, token in zip(values, tokens):
+            assert issued.setdefault(value, token) == token
+            assert vocabulary.token_to_value[token] == value
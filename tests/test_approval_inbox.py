@@ -0,0 +1,84 @@
+# tests/test_approval_inbox.py
+"""Approval inbox keyset cursors: wire encoding and pages over created_at ties."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, select
+
+import app.models as models
+from app.api.v1.endpoints.corporate_admin import _decode_inbox_cursor, _encode_inbox_cursor
+from app.crud.crud import crud_approval_request
+
+CUSTOMER_ID = 1
+
+
+def _pages(fetch, encode, decode, limit):
+    """Every row of a keyset-paginated listing, following next cursors through their wire encoding."""
+    rows, cursor, pages = [], None, 0
+    while True:
+        page, next_cursor = fetch(cursor, limit)
+        rows.extend(page)
+        pages += 1
+        assert len(page) <= limit
+        if next_cursor is None:
+            return rows, pages
+        cursor = decode(encode(next_cursor))
+
+
+def test_inbox_cursor_round_trip():
+    cursor = (datetime(2024, 5, 1, 9, 30, 15, 123456, tzinfo=timezone.utc), 42)
+
+    assert _decode_inbox_cursor(_encode_inbox_cursor(cursor)) == cursor
+    assert _encode_inbox_cursor(None) is None
+    assert _decode_inbox_cursor(None) is None
+    assert _decode_inbox_cursor("") is None
+
+
+@pytest.mark.parametrize("value", ["not-base64!", "bm8tc2VwYXJhdG9y", "MjAyNC0wMS0wMXxhYmM="])
+def test_inbox_cursor_rejects_garbage(value):
+    with pytest.raises(HTTPException) as exc:
+        _decode_inbox_cursor(value)
+    assert exc.value.status_code == 400
+
+
+@pytest.fixture
+def inbox_requests(engine):
+    """Approval requests of customer 1, several sharing a created_at (ties are broken by id)."""
+    with engine.connect() as conn:
+        maker_id, checker_id = conn.execute(
+            select(models.User.id).where(models.User.customer_id == CUSTOMER_ID).order_by(models.User.id).limit(2)
+        ).scalars().all()
+    base = datetime(2024, 3, 1, 8, 0, 0)
+    rows = []
+    for n in range(11):
+        status = models.ApprovalRequestStatusEnum.PENDING if n % 3 else models.ApprovalRequestStatusEnum.APPROVED
+        rows.append(dict(
+            entity_type="LGRecord", entity_id=None, action_type="LG_EXTEND", status=status,
+            maker_user_id=maker_id, checker_user_id=checker_id if n % 3 == 0 else None,
+            customer_id=CUSTOMER_ID, created_at=base + timedelta(minutes=n // 4),
+        ))
+    table = models.ApprovalRequest.__table__
+    with engine.begin() as conn:
+        ids = [conn.execute(insert(table).values(**row)).inserted_primary_key[0] for row in rows]
+    yield checker_id
+    with engine.begin() as conn:
+        conn.execute(delete(table).where(table.c.id.in_(ids)))
+
+
+@pytest.mark.parametrize("as_approver", [False, True])
+def test_inbox_pages_cover_the_inbox_once_newest_first(db, inbox_requests, as_approver):
+    approver_id = inbox_requests if as_approver else None
+
+    def fetch(cursor, limit):
+        return crud_approval_request.get_inbox_page(db, CUSTOMER_ID, approver_id=approver_id, limit=limit, cursor=cursor)
+
+    rows, pages = _pages(fetch, _encode_inbox_cursor, _decode_inbox_cursor, limit=2)
+    everything, _ = fetch(None, 1000)
+
+    assert len(everything) == 11 and pages == 6
+    assert [r.id for r in rows] == [r.id for r in everything]
+    assert len({r.id for r in rows}) == len(rows)
+    keys = [(r.created_at, r.id) for r in rows]
+    assert keys == sorted(keys, reverse=True)
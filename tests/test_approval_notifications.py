@@ -0,0 +1,156 @@
+# tests/test_approval_notifications.py
+"""Approval e-mail outbox: rows commit with the request, coalesced dispatch, retries and stale claims."""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+import app.models as models
+import app.services.approval_notifications as approval_notifications
+from app.constants import ACTION_TYPE_APPROVAL_REQUEST_PENDING
+from app.models.models_notification import ApprovalNotificationOutbox
+from app.services.approval_notifications import (
+    DIGEST_TITLES,
+    KIND_PENDING_APPROVAL,
+    MAX_ATTEMPTS,
+    ApprovalNotificationDispatcher,
+    approval_notification_dispatcher,
+    queue_approval_notification,
+)
+
+CUSTOMER_ID = 1
+
+
+@pytest.fixture
+def wakes(monkeypatch):
+    calls = []
+
+    def wake():
+        calls.append(True)
+
+    monkeypatch.setattr(approval_notification_dispatcher, "wake", wake)
+    return calls
+
+
+@pytest.fixture
+def approval_requests(engine, wakes):
+    """Three pending requests by the customer's end user; the corporate admin is the only checker."""
+    with engine.connect() as conn:
+        admin, maker = conn.execute(
+            select(models.User.id, models.User.email).where(models.User.customer_id == CUSTOMER_ID).order_by(models.User.id)
+        ).all()
+    with engine.begin() as conn:
+        template_id = conn.execute(insert(models.Template.__table__).values(
+            name="Pending Approval Alert", template_type="EMAIL", action_type=ACTION_TYPE_APPROVAL_REQUEST_PENDING,
+            content="<p>{{action_type}} by {{maker_email}}</p>", subject="Pending: {{action_type}}", language="EN",
+            is_global=True, is_notification_template=True, is_default=True,
+        )).inserted_primary_key[0]
+        request_ids = [conn.execute(insert(models.ApprovalRequest.__table__).values(
+            entity_type="LGRecord", entity_id=None, action_type=f"LG_TEST_{n}", customer_id=CUSTOMER_ID,
+            status=models.ApprovalRequestStatusEnum.PENDING, maker_user_id=maker.id,
+        )).inserted_primary_key[0] for n in range(3)]
+    yield admin, maker, request_ids
+    with engine.begin() as conn:
+        conn.execute(delete(ApprovalNotificationOutbox.__table__).where(ApprovalNotificationOutbox.approval_request_id.in_(request_ids)))
+        conn.execute(delete(models.AuditLog.__table__).where(
+            models.AuditLog.entity_type == "ApprovalRequest", models.AuditLog.entity_id.in_(request_ids)
+        ))
+        conn.execute(delete(models.ApprovalRequest.__table__).where(models.ApprovalRequest.id.in_(request_ids)))
+        conn.execute(delete(models.Template.__table__).where(models.Template.id == template_id))
+
+
+@pytest.fixture
+def sent_emails(monkeypatch):
+    sent = []
+
+    async def send_email(db, to_emails, cc_emails, subject_template, body_template, template_data, email_settings):
+        sent.append((to_emails, subject_template))
+        return True, None
+
+    monkeypatch.setattr(approval_notifications, "send_email", send_email)
+    return sent
+
+
+def _outbox(engine, request_ids):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(ApprovalNotificationOutbox.status, ApprovalNotificationOutbox.attempts)
+            .where(ApprovalNotificationOutbox.approval_request_id.in_(request_ids)).order_by(ApprovalNotificationOutbox.id)
+        ).all()
+
+
+def _queue(engine, request_ids):
+    with Session(engine) as db:
+        for request_id in request_ids:
+            queue_approval_notification(db, KIND_PENDING_APPROVAL, request_id)
+        db.commit()
+
+
+def test_outbox_rows_commit_with_the_caller_and_wake_the_dispatcher(engine, approval_requests, wakes):
+    _, _, request_ids = approval_requests
+    with Session(engine) as db:
+        queue_approval_notification(db, KIND_PENDING_APPROVAL, request_ids[0])
+        db.flush()
+        db.rollback()
+    assert _outbox(engine, request_ids) == [] and wakes == []
+
+    _queue(engine, request_ids[:2])
+    assert _outbox(engine, request_ids) == [("PENDING", 0), ("PENDING", 0)]
+    assert wakes == [True]
+
+
+def test_flush_sends_one_digest_per_recipient(engine, approval_requests, sent_emails):
+    admin, _, request_ids = approval_requests
+    _queue(engine, request_ids)
+    dispatcher = ApprovalNotificationDispatcher(session_factory=sessionmaker(bind=engine), window_seconds=0)
+
+    assert asyncio.run(dispatcher.flush()) == 1
+
+    assert sent_emails == [([admin.email], DIGEST_TITLES[KIND_PENDING_APPROVAL].format(count=3))]
+    assert _outbox(engine, request_ids) == [("SENT", 1)] * 3
+    with engine.connect() as conn:
+        logged = conn.execute(select(models.AuditLog.entity_id).where(
+            models.AuditLog.action_type == "NOTIFICATION_SENT", models.AuditLog.entity_id.in_(request_ids),
+        )).scalars().all()
+    assert sorted(logged) == request_ids
+    assert asyncio.run(dispatcher.flush()) == 0
+
+
+def test_failed_dispatch_releases_rows_until_out_of_attempts(engine, approval_requests, sent_emails, monkeypatch):
+    _, _, request_ids = approval_requests
+    _queue(engine, request_ids[:1])
+    dispatcher = ApprovalNotificationDispatcher(session_factory=sessionmaker(bind=engine), window_seconds=0)
+
+    def failing_assemble(db, notifications):
+        raise RuntimeError("SMTP settings unavailable")
+
+    monkeypatch.setattr(dispatcher, "_assemble", failing_assemble)
+    with pytest.raises(RuntimeError):
+        asyncio.run(dispatcher.flush())
+    assert _outbox(engine, request_ids) == [("PENDING", 1)]
+
+    for _ in range(MAX_ATTEMPTS - 1):
+        with pytest.raises(RuntimeError):
+            asyncio.run(dispatcher.flush())
+    assert _outbox(engine, request_ids) == [("FAILED", MAX_ATTEMPTS)]
+    assert asyncio.run(dispatcher.flush()) == 0
+    assert sent_emails == []
+
+
+def test_only_stale_processing_rows_are_claimed_again(engine, approval_requests):
+    _, _, request_ids = approval_requests
+    _queue(engine, request_ids[:2])
+    now = datetime.now(timezone.utc)
+    table = ApprovalNotificationOutbox.__table__
+    with engine.begin() as conn:
+        for request_id, claimed_at in zip(request_ids, (now - timedelta(hours=1), now)):
+            conn.execute(update(table).where(table.c.approval_request_id == request_id)
+                         .values(status="PROCESSING", claimed_at=claimed_at, attempts=1))
+
+    outbox_ids, notifications = ApprovalNotificationDispatcher(session_factory=sessionmaker(bind=engine))._claim()
+
+    assert notifications == [(KIND_PENDING_APPROVAL, request_ids[0])]
+    assert _outbox(engine, request_ids) == [("PROCESSING", 2), ("PROCESSING", 1)]
@@ -0,0 +1,43 @@
+# tests/test_benchmark_dbsetup.py
+"""Benchmark isolation: repeatable mutating runs without commit side effects."""
+
+import pytest
+from sqlalchemy.orm import Session
+
+import app.models as models
+from app.core.change_tracking import SUPPRESS_COMMIT_HOOKS, change_tracker
+from benchmarks.dbsetup import isolated_session
+
+
+@pytest.fixture
+def applied(monkeypatch):
+    calls = []
+    monkeypatch.setattr(change_tracker, "_consumers", dict(change_tracker._consumers))
+    change_tracker.register(
+        "test_probe", models=(models.Currency,),
+        collect=lambda session, changes: change_tracker.pending(session, "test_probe").update(
+            c.id for c in changes.dirty(models.Currency)
+        ),
+        apply=lambda session, ids: calls.append(set(ids)),
+    )
+    return calls
+
+
+def test_isolated_session_commits_neither_data_nor_hooks(engine, applied):
+    with Session(engine) as db:
+        name = db.get(models.Currency, 1).name
+
+    with isolated_session(engine) as db:
+        db.get(models.Currency, 1).name = "Benchmark Rename"
+        db.commit()
+        assert db.get(models.Currency, 1).name == "Benchmark Rename"
+        assert applied == []
+
+        # The session's own commits are top-level from its point of view: only the flag holds the hooks back
+        db.info.pop(SUPPRESS_COMMIT_HOOKS)
+        db.get(models.Currency, 1).name = "Second Rename"
+        db.commit()
+        assert applied == [{1}]
+
+    with Session(engine) as db:
+        assert db.get(models.Currency, 1).name == name
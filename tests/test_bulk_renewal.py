@@ -0,0 +1,164 @@
+# tests/test_bulk_renewal.py
+"""Bulk renewal: one transaction per chunk with per-LG savepoints, and the streamed letters ZIP."""
+
+import asyncio
+import io
+import zipfile
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+import app.models as models
+import app.services.bulk_renewal_service as bulk_renewal_module
+from app.core.letter_artifacts import LetterArtifact
+from app.crud.crud import crud_lg_record
+from app.models.models_renewal import BulkRenewalBatch, BulkRenewalBatchItem
+from app.services.bulk_renewal_service import ITEM_FAILED, ITEM_PENDING, ITEM_RENEWED, bulk_renewal_service
+
+CUSTOMER_ID = 1
+
+
+@pytest.fixture
+def batch(engine):
+    """A batch of four of the customer's LGs, each with an instruction id to hand out."""
+    with engine.connect() as conn:
+        user_id = conn.execute(select(models.User.id).where(models.User.customer_id == CUSTOMER_ID)).scalars().first()
+        lgs = conn.execute(
+            select(models.LGRecord.id, models.LGRecord.lg_number, models.LGRecord.expiry_date)
+            .where(models.LGRecord.customer_id == CUSTOMER_ID).order_by(models.LGRecord.id).limit(4)
+        ).all()
+        instruction_ids = conn.execute(select(models.LGInstruction.id).order_by(models.LGInstruction.id).limit(4)).scalars().all()
+    with engine.begin() as conn:
+        batch_id = conn.execute(insert(BulkRenewalBatch.__table__).values(
+            customer_id=CUSTOMER_ID, user_id=user_id, status="PENDING", auto_renewal_days=30,
+            force_renewal_days=60, total_count=len(lgs), renewed_count=0, failed_count=0,
+        )).inserted_primary_key[0]
+        conn.execute(insert(BulkRenewalBatchItem.__table__), [
+            dict(batch_id=batch_id, lg_record_id=lg_id, lg_number=lg_number, renewal_type="AUTO",
+                 old_expiry_date=expiry.date(), new_expiry_date=expiry.date() + timedelta(days=365),
+                 status=ITEM_PENDING, attempts=0)
+            for lg_id, lg_number, expiry in lgs
+        ])
+    yield SimpleNamespace(id=batch_id, user_id=user_id, lgs=lgs,
+                          instruction_ids=dict(zip([lg_id for lg_id, _, _ in lgs], instruction_ids)))
+    table = models.LGRecord.__table__
+    with engine.begin() as conn:
+        for lg_id, _, expiry in lgs:
+            conn.execute(update(table).where(table.c.id == lg_id).values(expiry_date=expiry))
+        conn.execute(delete(BulkRenewalBatchItem.__table__).where(BulkRenewalBatchItem.batch_id == batch_id))
+        conn.execute(delete(BulkRenewalBatch.__table__).where(BulkRenewalBatch.id == batch_id))
+
+
+def _items(engine, batch_id):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(BulkRenewalBatchItem.lg_record_id, BulkRenewalBatchItem.status, BulkRenewalBatchItem.instruction_id,
+                   BulkRenewalBatchItem.attempts)
+            .where(BulkRenewalBatchItem.batch_id == batch_id).order_by(BulkRenewalBatchItem.id)
+        ).all()
+
+
+def _expiry_dates(engine, lg_ids):
+    with engine.connect() as conn:
+        return dict(conn.execute(
+            select(models.LGRecord.id, models.LGRecord.expiry_date).where(models.LGRecord.id.in_(lg_ids))
+        ).all())
+
+
+def test_chunk_commits_once_and_isolates_failed_lgs(engine, batch, monkeypatch):
+    (ok_first, _, _), (rejected, _, _), (rolls_back, _, _), (ok_last, _, _) = batch.lgs
+    calls = []
+
+    async def extend_lg(db, lg_record_id, new_expiry_date, user_id, background_tasks=None, render_letter=True):
+        calls.append(lg_record_id)
+        lg = db.get(models.LGRecord, lg_record_id)
+        lg.expiry_date = lg.expiry_date + timedelta(days=365)
+        db.flush()
+        if lg_record_id == rejected:
+            raise HTTPException(status_code=400, detail="Only LGs with status 'Valid' can be extended.")
+        if lg_record_id == rolls_back:
+            db.rollback()
+            raise HTTPException(status_code=500, detail="Failed to generate a unique instruction serial number.")
+        background_tasks.add_task(asyncio.sleep, 0)
+        return lg, batch.instruction_ids[lg_record_id], ""
+
+    monkeypatch.setattr(crud_lg_record, "extend_lg", extend_lg)
+    before = _expiry_dates(engine, batch.instruction_ids)
+
+    with Session(engine) as db:
+        commits = []
+        commit = db.commit
+
+        def counting_commit():
+            commits.append(db.in_nested_transaction())
+            commit()
+
+        db.commit = counting_commit
+        item_ids = db.execute(select(BulkRenewalBatchItem.id).where(BulkRenewalBatchItem.batch_id == batch.id)
+                              .order_by(BulkRenewalBatchItem.id)).scalars().all()
+        instruction_ids, notifications = asyncio.run(bulk_renewal_service._renew_chunk(db, item_ids, batch.user_id))
+
+    # The transaction-wide rollback re-ran the chunk without the LG that caused it
+    assert calls == [ok_first, rejected, rolls_back, ok_first, rejected, ok_last]
+    assert commits == [False, False]
+    assert instruction_ids == [batch.instruction_ids[ok_first], batch.instruction_ids[ok_last]]
+    assert len(notifications) == 2
+    assert _items(engine, batch.id) == [
+        (ok_first, ITEM_RENEWED, batch.instruction_ids[ok_first], 1),
+        (rejected, ITEM_FAILED, None, 1),
+        (rolls_back, ITEM_FAILED, None, 1),
+        (ok_last, ITEM_RENEWED, batch.instruction_ids[ok_last], 1),
+    ]
+    after = _expiry_dates(engine, batch.instruction_ids)
+    assert {lg_id for lg_id in before if after[lg_id] != before[lg_id]} == {ok_first, ok_last}
+    assert after[ok_first] == before[ok_first] + timedelta(days=365)
+
+
+@pytest.fixture
+def renewed_batch(engine, batch):
+    with engine.begin() as conn:
+        for lg_id, instruction_id in batch.instruction_ids.items():
+            conn.execute(update(BulkRenewalBatchItem.__table__).where(
+                BulkRenewalBatchItem.batch_id == batch.id, BulkRenewalBatchItem.lg_record_id == lg_id,
+            ).values(status=ITEM_RENEWED, instruction_id=instruction_id))
+    return batch
+
+
+def test_letters_stream_as_a_zip_one_chunk_at_a_time(engine, renewed_batch, monkeypatch):
+    missing = renewed_batch.instruction_ids[renewed_batch.lgs[1][0]]
+
+    async def letter(instruction_id):
+        if instruction_id == missing:
+            return None
+        return LetterArtifact("lg_instruction", instruction_id, "t", "h", f"%PDF letter {instruction_id}".encode(), "e")
+
+    def start_renders(db, instruction_ids):
+        return [letter(instruction_id) for instruction_id in instruction_ids]
+
+    monkeypatch.setattr(bulk_renewal_service, "_start_renders", start_renders)
+    monkeypatch.setattr(bulk_renewal_module, "CHUNK_SIZE", 1)
+    monkeypatch.setattr("app.database.SessionLocal", sessionmaker(bind=engine))
+
+    async def download():
+        return [chunk async for chunk in bulk_renewal_service.iter_letters_zip(renewed_batch.id)]
+
+    chunks = asyncio.run(download())
+
+    assert len(chunks) == len(renewed_batch.lgs) + 1  # one per chunk, then the central directory
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    expected = [(lg_id, lg_number) for lg_id, lg_number, _ in renewed_batch.lgs if renewed_batch.instruction_ids[lg_id] != missing]
+    assert archive.namelist() == [
+        bulk_renewal_module._letter_filename(position, lg_number) for position, (_, lg_number) in enumerate(expected, 1)
+    ]
+    assert archive.read(archive.namelist()[0]) == f"%PDF letter {renewed_batch.instruction_ids[expected[0][0]]}".encode()
+
+
+def test_only_small_batches_get_a_merged_pdf(db, renewed_batch, monkeypatch):
+    monkeypatch.setattr(bulk_renewal_module, "INLINE_PDF_MAX_LETTERS", len(renewed_batch.lgs) - 1)
+    batch = db.get(BulkRenewalBatch, renewed_batch.id)
+    assert bulk_renewal_service.letter_count(db, batch) == len(renewed_batch.lgs)
+    assert asyncio.run(bulk_renewal_service.merged_letters_bytes(db, batch)) is None
@@ -0,0 +1,87 @@
+# tests/test_dashboard_summary.py
+"""Dashboard summary rows: change_seq bumps in the writer's transaction, recompute on the reader's session."""
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import app.models as models
+from app.models.models_dashboard import CustomerDashboardSummary
+from app.services.dashboard_summary_service import dashboard_summary_service
+
+CUSTOMER_ID = 2
+
+
+@pytest.fixture
+def computes(monkeypatch):
+    calls = []
+    compute = dashboard_summary_service.compute
+
+    def counting_compute(db, customer_id):
+        calls.append(customer_id)
+        return compute(db, customer_id)
+
+    monkeypatch.setattr(dashboard_summary_service, "compute", counting_compute)
+    return calls
+
+
+def _seqs(engine):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(CustomerDashboardSummary.change_seq, CustomerDashboardSummary.computed_seq)
+            .where(CustomerDashboardSummary.customer_id == CUSTOMER_ID)
+        ).one()
+
+
+def _lg_id(db):
+    return db.execute(
+        select(models.LGRecord.id).where(models.LGRecord.customer_id == CUSTOMER_ID, models.LGRecord.is_deleted == False)
+        .order_by(models.LGRecord.id)
+    ).scalars().first()
+
+
+def test_summary_is_served_until_a_committed_write_bumps_it(engine, computes):
+    with Session(engine) as db:
+        dashboard_summary_service.get(db, CUSTOMER_ID)
+        db.commit()
+    with Session(engine) as db:
+        summary = dashboard_summary_service.get(db, CUSTOMER_ID)
+        counts = dict(summary.lg_status_counts)
+        db.commit()
+    change_seq, computed_seq = _seqs(engine)
+    assert change_seq == computed_seq
+    assert sum(counts.values()) > 0
+    assert computes == [CUSTOMER_ID]
+
+    with Session(engine) as db:
+        db.get(models.LGRecord, _lg_id(db)).description_purpose = "Rolled back"
+        db.flush()
+        db.rollback()
+    assert _seqs(engine) == (change_seq, computed_seq)
+
+    with Session(engine) as db:
+        db.get(models.LGRecord, _lg_id(db)).description_purpose = "Committed"
+        db.commit()
+    assert _seqs(engine) == (change_seq + 1, computed_seq)
+
+    with Session(engine) as db:
+        dashboard_summary_service.get(db, CUSTOMER_ID)
+        db.commit()
+    assert _seqs(engine) == (change_seq + 1, change_seq + 1)
+    assert computes == [CUSTOMER_ID, CUSTOMER_ID]
+
+
+def test_a_writer_can_read_the_dashboard_in_its_own_transaction(engine, computes):
+    """The bump and the refresh share the writer's connection (a second one would wait on its lock)."""
+    with Session(engine) as db:
+        dashboard_summary_service.get(db, CUSTOMER_ID)
+        db.commit()
+        change_seq, _ = _seqs(engine)
+
+        db.get(models.LGRecord, _lg_id(db)).description_purpose = "Written before reading"
+        db.flush()
+        summary = dashboard_summary_service.get(db, CUSTOMER_ID)
+        assert summary.computed_seq == summary.change_seq == change_seq + 1
+        db.commit()
+
+    assert _seqs(engine) == (change_seq + 1, change_seq + 1)
@@ -0,0 +1,114 @@
+# tests/test_deadline_scheduler.py
+"""Deadline queue: upserts, cancellation on resolution, and off-loop processing."""
+
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+
+import app.models as models
+from app.core.deadline_scheduler import (
+    DEADLINE_APPROVAL_REQUEST_TIMEOUT,
+    DeadlineScheduler,
+    schedule_deadline,
+)
+from app.models.models_deadline import ScheduledDeadline
+
+CUSTOMER_ID = 1
+
+
+def _deadlines(engine, deadline_type, entity_id):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(ScheduledDeadline.status, ScheduledDeadline.due_at, ScheduledDeadline.attempts)
+            .where(ScheduledDeadline.deadline_type == deadline_type, ScheduledDeadline.entity_id == str(entity_id))
+        ).all()
+
+
+def _drop_deadlines(engine, deadline_type):
+    with engine.begin() as conn:
+        conn.execute(delete(ScheduledDeadline.__table__).where(ScheduledDeadline.deadline_type == deadline_type))
+
+
+def test_rescheduling_upserts_one_row_and_rearms_it(engine):
+    first_due = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    with Session(engine) as db:
+        schedule_deadline(db, "TEST_UPSERT", "Thing", 1, first_due, CUSTOMER_ID)
+        schedule_deadline(db, "TEST_UPSERT", "Thing", 1, first_due + timedelta(days=1), CUSTOMER_ID)
+        db.commit()
+    (status, due_at, _), = _deadlines(engine, "TEST_UPSERT", 1)
+    assert status == "PENDING"
+    assert due_at.replace(tzinfo=timezone.utc) == first_due + timedelta(days=1)
+
+    with Session(engine) as db:
+        db.query(ScheduledDeadline).filter(ScheduledDeadline.deadline_type == "TEST_UPSERT").update(
+            {"status": "DONE", "attempts": 3}
+        )
+        db.commit()
+        schedule_deadline(db, "TEST_UPSERT", "Thing", 1, first_due, CUSTOMER_ID)
+        db.commit()
+    assert _deadlines(engine, "TEST_UPSERT", 1)[0][0::2] == ("PENDING", 0)
+    _drop_deadlines(engine, "TEST_UPSERT")
+
+
+def test_deciding_an_approval_request_cancels_its_deadline(engine):
+    with engine.connect() as conn:
+        maker_id = conn.execute(select(models.User.id).where(models.User.customer_id == CUSTOMER_ID)).scalars().first()
+    table = models.ApprovalRequest.__table__
+    with engine.begin() as conn:
+        request_id = conn.execute(insert(table).values(
+            entity_type="LGRecord", action_type="LG_EXTEND", status=models.ApprovalRequestStatusEnum.PENDING,
+            maker_user_id=maker_id, customer_id=CUSTOMER_ID,
+        )).inserted_primary_key[0]
+
+    with Session(engine) as db:
+        schedule_deadline(db, DEADLINE_APPROVAL_REQUEST_TIMEOUT, "ApprovalRequest", request_id,
+                          datetime(2030, 1, 1, tzinfo=timezone.utc), CUSTOMER_ID)
+        db.commit()
+        # Unrelated writes leave the deadline alone
+        db.get(models.ApprovalRequest, request_id).request_details = {"note": "edited"}
+        db.commit()
+        assert _deadlines(engine, DEADLINE_APPROVAL_REQUEST_TIMEOUT, request_id)[0][0] == "PENDING"
+
+        db.get(models.ApprovalRequest, request_id).status = models.ApprovalRequestStatusEnum.APPROVED
+        db.commit()
+
+    assert _deadlines(engine, DEADLINE_APPROVAL_REQUEST_TIMEOUT, request_id)[0][0] == "CANCELLED"
+    with engine.begin() as conn:
+        conn.execute(delete(table).where(table.c.id == request_id))
+    _drop_deadlines(engine, DEADLINE_APPROVAL_REQUEST_TIMEOUT)
+
+
+def test_due_deadlines_are_processed_off_the_event_loop(engine):
+    scheduler = DeadlineScheduler(session_factory=sessionmaker(bind=engine))
+    threads = []
+
+    @scheduler.register("TEST_SYNC")
+    def sync_handler(db, deadline):
+        threads.append(threading.get_ident())
+
+    @scheduler.register("TEST_ASYNC")
+    async def async_handler(db, deadline):
+        threads.append(threading.get_ident())
+        await asyncio.sleep(0)
+        return datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+    past = datetime.now(timezone.utc) - timedelta(minutes=1)
+    with Session(engine) as db:
+        schedule_deadline(db, "TEST_SYNC", "Thing", 1, past)
+        schedule_deadline(db, "TEST_ASYNC", "Thing", 1, past)
+        db.commit()
+
+    async def tick():
+        return threading.get_ident(), await scheduler.process_due()
+
+    loop_thread, processed = asyncio.run(tick())
+
+    assert processed == 2
+    assert len(threads) == 2 and loop_thread not in threads
+    assert _deadlines(engine, "TEST_SYNC", 1)[0][0] == "DONE"
+    assert _deadlines(engine, "TEST_ASYNC", 1)[0][0] == "PENDING"  # rescheduled by the handler
+    _drop_deadlines(engine, "TEST_SYNC")
+    _drop_deadlines(engine, "TEST_ASYNC")
@@ -0,0 +1,65 @@
+# tests/test_letter_artifacts.py
+"""Letter artifact store: one render per template and data, shared through disk."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import document_generator
+from app.core.letter_artifacts import LetterArtifactStore
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    calls = []
+
+    def render_pdf_from_html(html, filename_hint):
+        calls.append(html)
+        return f"%PDF {html}".encode()
+
+    monkeypatch.setattr(document_generator, "render_pdf_from_html", render_pdf_from_html)
+    return calls
+
+
+def _template(content="Dear {{bank}}, amount {{amount}}", updated_at=None):
+    return SimpleNamespace(id=1, content=content, updated_at=updated_at, created_at=None)
+
+
+def test_letter_artifact_is_rendered_once_per_template_and_data(tmp_path, renders):
+    store = LetterArtifactStore(artifact_dir=str(tmp_path))
+    data = {"bank": "NBE", "amount": 100}
+
+    first = store.get_or_render("lg_instruction", 5, _template(), data)
+    again = store.get_or_render("lg_instruction", 5, _template(), dict(data))
+
+    assert again is first
+    assert renders == ["Dear NBE, amount 100"]
+    assert first.pdf_bytes == b"%PDF Dear NBE, amount 100"
+
+
+def test_letter_artifact_changes_with_data_or_template(tmp_path, renders):
+    store = LetterArtifactStore(artifact_dir=str(tmp_path))
+    first = store.get_or_render("lg_instruction", 5, _template(), {"bank": "NBE", "amount": 100})
+
+    changed_data = store.get_or_render("lg_instruction", 5, _template(), {"bank": "NBE", "amount": 200})
+    changed_template = store.get_or_render("lg_instruction", 5, _template("To {{bank}}: {{amount}}"), {"bank": "NBE", "amount": 200})
+
+    assert len({first.key, changed_data.key, changed_template.key}) == 3
+    assert len({first.etag, changed_data.etag, changed_template.etag}) == 3
+    assert renders == ["Dear NBE, amount 100", "Dear NBE, amount 200", "To NBE: 200"]
+    # Only the latest render of a letter is kept on disk
+    assert [p.name for p in (tmp_path / "lg_instruction" / "5").iterdir()] == [
+        f"{changed_template.template_key}-{changed_template.data_hash}.pdf"
+    ]
+
+
+def test_letter_artifact_is_shared_through_disk(tmp_path, renders):
+    data = {"bank": "CIB", "amount": 1}
+    first = LetterArtifactStore(artifact_dir=str(tmp_path)).get_or_render("maintenance_letter", 9, _template(), data)
+
+    other_worker = LetterArtifactStore(artifact_dir=str(tmp_path))
+    second = other_worker.get_or_render("maintenance_letter", 9, _template(), data)
+
+    assert second.etag == first.etag
+    assert other_worker.stats()["disk_hits"] == 1
+    assert len(renders) == 1
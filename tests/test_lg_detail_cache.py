@@ -0,0 +1,124 @@
+# tests/test_lg_detail_cache.py
+"""LG detail cache: shared between sessions, version bumps on commit, the session's own writes."""
+
+from types import SimpleNamespace
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import app.models as models
+from app.core.lg_detail_cache import lg_detail_cache
+from app.crud.crud import crud_lg_record
+
+CUSTOMER_ID = 1
+
+
+def _lg_ids(engine, count):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(models.LGRecord.id)
+            .where(models.LGRecord.customer_id == CUSTOMER_ID, models.LGRecord.is_deleted == False)
+            .order_by(models.LGRecord.id)
+        ).scalars().all()[:count]
+
+
+def _detail(engine, lg_id):
+    with Session(engine) as db:
+        lg = crud_lg_record.get_lg_record_with_relations(db, lg_id, CUSTOMER_ID)
+        return SimpleNamespace(
+            version=lg.version,
+            purpose=lg.description_purpose,
+            owner_email=lg.internal_owner_contact.email,
+            entity_name=lg.beneficiary_corporate.entity_name,
+            instruction_printed={i.id: i.is_printed for i in lg.instructions},
+        )
+
+
+def test_lg_detail_is_shared_between_sessions(engine):
+    lg_id, = _lg_ids(engine, 1)
+    lg_detail_cache.invalidate()
+    loads, hits = lg_detail_cache.loads, lg_detail_cache.hits
+
+    first, second = _detail(engine, lg_id), _detail(engine, lg_id)
+
+    assert first == second
+    assert lg_detail_cache.loads == loads + 1
+    assert lg_detail_cache.hits == hits + 1
+
+
+def test_lg_write_bumps_version_and_misses(engine):
+    lg_id = _lg_ids(engine, 2)[1]
+    before = _detail(engine, lg_id)
+
+    with Session(engine) as db:
+        db.get(models.LGRecord, lg_id).description_purpose = "Updated purpose"
+        db.commit()
+
+    after = _detail(engine, lg_id)
+    assert after.version == before.version + 1
+    assert after.purpose == "Updated purpose"
+
+
+def test_instruction_write_bumps_the_lg_version(engine):
+    with Session(engine) as db:
+        instruction = db.execute(
+            select(models.LGInstruction).join(models.LGRecord)
+            .where(models.LGRecord.customer_id == CUSTOMER_ID, models.LGRecord.is_deleted == False)
+            .order_by(models.LGInstruction.id)
+        ).scalars().first()
+        lg_id, instruction_id, printed = instruction.lg_record_id, instruction.id, instruction.is_printed
+    before = _detail(engine, lg_id)
+
+    with Session(engine) as db:
+        db.get(models.LGInstruction, instruction_id).is_printed = not printed
+        db.commit()
+
+    after = _detail(engine, lg_id)
+    assert after.version == before.version + 1
+    assert after.instruction_printed[instruction_id] is (not printed)
+
+
+def test_owner_and_entity_writes_miss_without_bumping_the_lg(engine):
+    lg_id = _lg_ids(engine, 3)[2]
+    before = _detail(engine, lg_id)
+
+    with Session(engine) as db:
+        lg = db.get(models.LGRecord, lg_id)
+        lg.internal_owner_contact.email = f"owner{lg_id}@changed.example"
+        lg.beneficiary_corporate.entity_name = f"Entity {lg_id} Renamed"
+        db.commit()
+
+    after = _detail(engine, lg_id)
+    assert after.version == before.version
+    assert after.owner_email == f"owner{lg_id}@changed.example"
+    assert after.entity_name == f"Entity {lg_id} Renamed"
+
+
+def test_lg_rollback_keeps_version_and_entry(engine):
+    lg_id = _lg_ids(engine, 4)[3]
+    before = _detail(engine, lg_id)
+
+    with Session(engine) as db:
+        db.get(models.LGRecord, lg_id).description_purpose = "Rolled back"
+        db.flush()
+        db.rollback()
+
+    hits = lg_detail_cache.hits
+    assert _detail(engine, lg_id) == before
+    assert lg_detail_cache.hits == hits + 1
+
+
+def test_lg_reads_see_the_session_own_writes(engine):
+    lg_id = _lg_ids(engine, 5)[4]
+    _detail(engine, lg_id)
+
+    with Session(engine) as db:
+        lg = db.get(models.LGRecord, lg_id)
+        lg.description_purpose = "Mine, uncommitted"
+        db.flush()
+        db.expunge(lg)
+        seen = crud_lg_record.get_lg_record_with_relations(db, lg_id, CUSTOMER_ID)
+        assert seen.description_purpose == "Mine, uncommitted"
+        db.rollback()
+
+    assert _detail(engine, lg_id).purpose != "Mine, uncommitted"
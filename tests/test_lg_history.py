@@ -0,0 +1,50 @@
+# tests/test_lg_history.py
+"""Issued-LG history events: keyset pages and list summaries (count + newest entry)."""
+
+from sqlalchemy import func, select
+
+from app.models.models_issuance import IssuedLGHistoryEvent, IssuedLGRecord
+from app.services.lg_history_service import lg_history_service
+
+
+def test_summaries_carry_the_count_and_newest_entry_only(db):
+    first, second = db.execute(select(IssuedLGRecord.id).order_by(IssuedLGRecord.id).limit(2)).scalars().all()
+    for n in range(3):
+        lg_history_service.record(db, first, "AMENDMENT", before={"amount": n}, after={"amount": n + 1}, notes=f"#{n}")
+    db.flush()
+    counts = dict(db.execute(
+        select(IssuedLGHistoryEvent.issued_lg_id, func.count(IssuedLGHistoryEvent.id))
+        .where(IssuedLGHistoryEvent.issued_lg_id.in_([first, second]))
+        .group_by(IssuedLGHistoryEvent.issued_lg_id)
+    ).all())
+
+    summaries = lg_history_service.summaries_by_lg(db, [first, second, first])
+
+    count, newest = summaries[first]
+    assert count == counts[first]
+    assert newest == lg_history_service.entries_by_lg(db, [first])[first][-1]
+    assert (newest["action_type"], newest["notes"], newest["after"]) == ("AMENDMENT", "#2", {"amount": 3})
+    assert (second in summaries) == (second in counts)
+    assert lg_history_service.summaries_by_lg(db, []) == {}
+
+
+def test_history_pages_follow_before_id(db):
+    issued_lg_id = db.execute(select(IssuedLGRecord.id).order_by(IssuedLGRecord.id)).scalars().first()
+    for n in range(7):
+        lg_history_service.record(db, issued_lg_id, "AMENDMENT", before={"amount": n}, after={"amount": n + 1})
+    db.flush()
+    recorded = db.execute(
+        select(IssuedLGHistoryEvent.id).where(IssuedLGHistoryEvent.issued_lg_id == issued_lg_id)
+        .order_by(IssuedLGHistoryEvent.id.desc())
+    ).scalars().all()
+
+    seen, before_id = [], None
+    while True:
+        events, before_id = lg_history_service.page(db, issued_lg_id, limit=3, before_id=before_id)
+        seen.extend(event.id for event in events)
+        if before_id is None:
+            break
+
+    assert seen == recorded
+    newest = lg_history_service.page(db, issued_lg_id, limit=1)[0][0]
+    assert newest.changes == {"amount": [6, 7]}
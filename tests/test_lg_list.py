@@ -0,0 +1,73 @@
+# tests/test_lg_list.py
+"""LG list keyset cursors: wire encoding and pages per sort order."""
+
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.endpoints.end_user import _decode_lg_list_cursor, _encode_lg_list_cursor
+from app.crud.crud import crud_lg_record
+
+CUSTOMER_ID = 1
+
+
+def _pages(fetch, encode, decode, limit):
+    """Every row of a keyset-paginated listing, following next cursors through their wire encoding."""
+    rows, cursor, pages = [], None, 0
+    while True:
+        page, next_cursor = fetch(cursor, limit)
+        rows.extend(page)
+        pages += 1
+        assert len(page) <= limit
+        if next_cursor is None:
+            return rows, pages
+        cursor = decode(encode(next_cursor))
+
+
+@pytest.mark.parametrize("sort, value", [
+    ("expiry_date", datetime(2025, 1, 31, tzinfo=timezone.utc)),
+    ("-expiry_date", datetime(2025, 1, 31, 12, 0, tzinfo=timezone.utc)),
+    ("lg_number", "LG|with|pipes"),
+    ("id", 17),
+])
+def test_lg_list_cursor_round_trip(sort, value):
+    assert _decode_lg_list_cursor(sort, _encode_lg_list_cursor(sort, (value, 9))) == (value, 9)
+
+
+def test_lg_list_cursor_is_bound_to_its_sort_order():
+    encoded = _encode_lg_list_cursor("lg_number", ("LG-1", 3))
+
+    with pytest.raises(HTTPException) as exc:
+        _decode_lg_list_cursor("expiry_date", encoded)
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException):
+        _decode_lg_list_cursor("lg_number", "bm90IGpzb24=")
+
+
+@pytest.mark.parametrize("sort", ["expiry_date", "lg_number", "id"])
+@pytest.mark.parametrize("descending", [False, True])
+def test_lg_list_pages_cover_the_list_once_in_order(db, sort, descending):
+    wire_sort = f"-{sort}" if descending else sort
+
+    def fetch(cursor, limit):
+        return crud_lg_record.get_lg_list_page(db, CUSTOMER_ID, sort=sort, descending=descending, limit=limit, cursor=cursor)
+
+    rows, pages = _pages(
+        fetch, lambda c: _encode_lg_list_cursor(wire_sort, c), lambda c: _decode_lg_list_cursor(wire_sort, c), limit=3,
+    )
+    everything, next_cursor = fetch(None, 1000)
+
+    assert next_cursor is None
+    assert len(everything) > 3 and pages > 1
+    assert [r.id for r in rows] == [r.id for r in everything]
+    keys = [(getattr(r, sort), r.id) for r in rows]
+    assert keys == sorted(keys, reverse=descending)
+
+
+def test_lg_list_rejects_unknown_sort(db):
+    with pytest.raises(ValueError):
+        crud_lg_record.get_lg_list_page(db, CUSTOMER_ID, sort="lg_amount")
+
+
+# ---------------- Approval inbox ----------------
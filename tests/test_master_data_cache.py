@@ -0,0 +1,49 @@
+# tests/test_master_data_cache.py
+"""Master data snapshots: reuse until a committed write, rollback and the session's own writes."""
+
+from sqlalchemy.orm import Session
+
+import app.models as models
+from app.core.master_data_cache import master_data_cache
+
+
+def test_master_data_snapshot_is_reused_until_a_commit_writes_the_table(engine):
+    with Session(engine) as db:
+        first = master_data_cache.snapshot(db, "currencies")
+        assert master_data_cache.snapshot(db, "currencies") is first
+        banks = master_data_cache.snapshot(db, "banks")
+
+    with Session(engine) as db:
+        currency = db.get(models.Currency, first.rows[0].id)
+        currency_id, iso_code = currency.id, currency.iso_code
+        currency.name = "Renamed Currency"
+        db.commit()
+
+    with Session(engine) as db:
+        second = master_data_cache.snapshot(db, "currencies")
+        assert second is not first and second.version > first.version
+        assert second.by_id[currency_id].name == "Renamed Currency"
+        assert second.find("iso_code", iso_code).name == "Renamed Currency"
+        # Other tables keep their snapshot
+        assert master_data_cache.snapshot(db, "banks") is banks
+
+
+def test_master_data_rollback_does_not_invalidate(engine):
+    with Session(engine) as db:
+        first = master_data_cache.snapshot(db, "lg_types")
+        lg_type = db.get(models.LgType, first.rows[0].id)
+        lg_type.description = "Uncommitted"
+        db.flush()
+        db.rollback()
+        assert master_data_cache.snapshot(db, "lg_types") is first
+
+
+def test_master_data_uncommitted_writes_bypass_the_snapshot(engine):
+    with Session(engine) as db:
+        first = master_data_cache.snapshot(db, "rules")
+        rule = db.get(models.Rule, first.rows[0].id)
+        rule.name = "Uncommitted Rule"
+        db.flush()
+        assert master_data_cache.snapshot(db, "rules") is None
+        db.rollback()
+        assert master_data_cache.snapshot(db, "rules") is first
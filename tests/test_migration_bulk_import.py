@@ -0,0 +1,105 @@
+# tests/test_migration_bulk_import.py
+"""Bulk migration import: jobs run synchronously in a worker thread, off the event loop."""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+import app.models as models
+from app.core.migration_bulk_import import ITEM_FAILED, JOB_COMPLETED, NOT_READY_ERROR, bulk_migration_importer
+from app.core.migration_service import migration_service
+from app.models.models_migration_import import MigrationImportJob, MigrationImportJobItem
+from app.schemas.migration_schemas import MigrationRecordStatusEnum, MigrationTypeEnum
+
+CUSTOMER_ID = 2
+
+
+@pytest.fixture
+def staged_rows(engine):
+    """Four READY_FOR_IMPORT records: three missing mandatory fields, one withdrawn before the run."""
+    with engine.connect() as conn:
+        user_id = conn.execute(select(models.User.id).where(models.User.customer_id == CUSTOMER_ID)).scalars().first()
+    table = models.LGMigrationStaging.__table__
+    with engine.begin() as conn:
+        ids = [conn.execute(insert(table).values(
+            customer_id=CUSTOMER_ID, record_status=MigrationRecordStatusEnum.READY_FOR_IMPORT,
+            migration_type=MigrationTypeEnum.RECORD, source_data_json={"lg_number": f"BULK-{n}"},
+        )).inserted_primary_key[0] for n in range(4)]
+    yield user_id, ids
+    with engine.begin() as conn:
+        job_ids = select(MigrationImportJob.id).where(MigrationImportJob.customer_id == CUSTOMER_ID)
+        conn.execute(delete(MigrationImportJobItem.__table__).where(MigrationImportJobItem.job_id.in_(job_ids)))
+        conn.execute(delete(MigrationImportJob.__table__).where(MigrationImportJob.customer_id == CUSTOMER_ID))
+        conn.execute(delete(table).where(table.c.id.in_(ids)))
+
+
+def test_background_run_leaves_the_event_loop_free(engine, staged_rows, monkeypatch):
+    user_id, staging_ids = staged_rows
+    monkeypatch.setattr("app.database.SessionLocal", sessionmaker(bind=engine))
+    with Session(engine) as db:
+        job = bulk_migration_importer.create_job(db, CUSTOMER_ID, user_id, chunk_size=50)
+        bulk_migration_importer.claim(db, job)
+        job_id = job.id
+    with engine.begin() as conn:
+        table = models.LGMigrationStaging.__table__
+        conn.execute(update(table).where(table.c.id == staging_ids[0]).values(record_status=MigrationRecordStatusEnum.ERROR))
+
+    run_threads = []
+    run = bulk_migration_importer.run
+
+    def recording_run(db, job):
+        run_threads.append(threading.get_ident())
+        return run(db, job)
+
+    monkeypatch.setattr(bulk_migration_importer, "run", recording_run)
+
+    async def background_task():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        ticking = asyncio.ensure_future(ticker())
+        await bulk_migration_importer.run_in_new_session(job_id)
+        ticking.cancel()
+        return threading.get_ident(), ticks
+
+    loop_thread, ticks = asyncio.run(background_task())
+
+    assert run_threads and run_threads[0] != loop_thread
+    assert ticks > 1
+    with Session(engine) as db:
+        report = bulk_migration_importer.progress(db, bulk_migration_importer.get_job(db, job_id, CUSTOMER_ID))
+        statuses = db.execute(select(MigrationImportJobItem.status).where(MigrationImportJobItem.job_id == job_id)).scalars().all()
+    assert report["status"] == JOB_COMPLETED
+    assert (report["processed"], report["imported"], report["failed"]) == (4, 0, 4)
+    assert statuses == [ITEM_FAILED] * 4
+    assert {r["record_id"]: r["error"] for r in report["failed_records"]}[staging_ids[0]] == NOT_READY_ERROR
+
+
+def test_attachments_run_on_a_private_loop_of_the_worker_thread(monkeypatch):
+    fetched = []
+
+    async def create_document_from_url(db, lg_record_id, url, **kwargs):
+        fetched.append((lg_record_id, url, threading.get_ident()))
+
+    monkeypatch.setattr(migration_service, "_create_document_from_url", create_document_from_url)
+    created = [
+        (SimpleNamespace(source_data_json={"attachment_url": " 'scan-1.pdf' "}), SimpleNamespace(id=11)),
+        (SimpleNamespace(source_data_json={}), SimpleNamespace(id=12)),
+    ]
+
+    async def import_chunk():
+        await asyncio.to_thread(bulk_migration_importer._attach, None, created, 1, True)
+
+    asyncio.run(import_chunk())
+
+    assert [(lg_id, url) for lg_id, url, _ in fetched] == [(11, "scan-1.pdf")]
+    assert fetched[0][2] != threading.get_ident()
@@ -0,0 +1,105 @@
+# tests/test_object_storage.py
+"""Content-addressed storage: deduplicated uploads, reference counts, deletion after commit."""
+
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from app.core.object_storage import LocalStorageBackend, object_storage
+from app.models.models_storage import StoredObject
+
+CUSTOMER_ID = 1
+BUCKET = "test-bucket"
+
+
+@pytest.fixture
+def local_backend(tmp_path, monkeypatch, engine):
+    backend = LocalStorageBackend(root=str(tmp_path))
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    monkeypatch.setitem(object_storage._backends, "local", backend)
+    yield backend
+    with engine.begin() as conn:
+        conn.execute(delete(StoredObject.__table__).where(StoredObject.bucket_name == BUCKET))
+
+
+def _path(backend, uri):
+    return os.path.join(backend.root, *uri[len(backend.uri_prefix):].split("/"))
+
+
+def _store(db, key, data):
+    return asyncio.run(object_storage.store(db, CUSTOMER_ID, BUCKET, key, data, "application/pdf"))
+
+
+def _refs(db, uri):
+    db.expire_all()
+    row = db.query(StoredObject).filter(StoredObject.uri == uri).first()
+    return row.reference_count if row else None
+
+
+def test_identical_content_is_stored_once(engine, local_backend):
+    with Session(engine) as db:
+        first = _store(db, "a/first.pdf", b"same scan")
+        second = _store(db, "a/second.pdf", b"same scan")
+        other = _store(db, "a/other.pdf", b"other scan")
+        db.commit()
+
+        assert not first.deduplicated and second.deduplicated
+        assert second.uri == first.uri != other.uri
+        assert _refs(db, first.uri) == 2
+    assert sorted(os.listdir(os.path.join(local_backend.root, BUCKET, "a"))) == ["first.pdf", "other.pdf"]
+
+
+def test_losing_a_concurrent_upload_reuses_the_winner(engine, local_backend, monkeypatch):
+    with Session(engine) as db:
+        winner = _store(db, "r/winner.pdf", b"raced")
+        db.commit()
+
+        # Our lookup ran before the winner committed: we upload, then hit the unique constraint
+        add_reference = object_storage._add_reference
+        lookups = []
+
+        def first_lookup_misses(*args):
+            lookups.append(args)
+            return add_reference(*args) if len(lookups) > 1 else None
+
+        monkeypatch.setattr(object_storage, "_add_reference", first_lookup_misses)
+        loser = _store(db, "r/loser.pdf", b"raced")
+        db.commit()
+
+        assert loser.deduplicated and loser.uri == winner.uri
+        assert _refs(db, winner.uri) == 2
+    assert os.listdir(os.path.join(local_backend.root, BUCKET, "r")) == ["winner.pdf"]
+
+
+def test_object_is_deleted_after_the_last_release_commits(engine, local_backend):
+    with Session(engine) as db:
+        uri = _store(db, "b/doc.pdf", b"shared").uri
+        _store(db, "b/copy.pdf", b"shared")
+        db.commit()
+        path = _path(local_backend, uri)
+
+        assert object_storage.release(db, uri) is False
+        assert _refs(db, uri) == 1
+
+        assert object_storage.release(db, uri) is True
+        assert _refs(db, uri) is None
+        assert os.path.exists(path)  # Still referenced until the transaction commits
+        db.commit()
+
+    assert not os.path.exists(path)
+
+
+def test_rolled_back_release_keeps_object_and_references(engine, local_backend):
+    with Session(engine) as db:
+        uri = _store(db, "c/doc.pdf", b"kept").uri
+        db.commit()
+
+        assert object_storage.release(db, uri) is True
+        db.rollback()
+        db.commit()
+
+        assert _refs(db, uri) == 1
+        assert os.path.exists(_path(local_backend, uri))
@@ -0,0 +1,89 @@
+# tests/test_quotation_offer_book.py
+"""Offer book cache: stats rankings vs live books, and the CBE benchmark."""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+import app.models as models
+from app.models.models_quotation import QuotationBank, QuotationBankAssignment, QuotationOffer, QuotationRequest
+from app.services.fx_service import fx_service
+from app.services.quotation_offer_book import QuotationOfferBookService
+
+CUSTOMER_ID = 1
+
+
+@pytest.fixture
+def completed_rfqs(engine):
+    """Three completed FX RFQs, each quoted by two banks (bank 1 always cheaper)."""
+    with engine.connect() as conn:
+        user_id = conn.execute(select(models.User.id).where(models.User.customer_id == CUSTOMER_ID)).scalars().first()
+    window_end = datetime.now(timezone.utc) - timedelta(days=1)
+    rfq_ids, assignment_ids = [], []
+    with engine.begin() as conn:
+        bank_ids = [conn.execute(insert(QuotationBank.__table__).values(
+            customer_id=CUSTOMER_ID, bank_id=bank_id, emails="fx@bank.example",
+        )).inserted_primary_key[0] for bank_id in (1, 2)]
+        for n in range(3):
+            rfq_id = str(uuid.uuid4())
+            conn.execute(insert(QuotationRequest.__table__).values(
+                id=rfq_id, ref_no=f"RFQ-TEST-{rfq_id[:8]}", customer_id=CUSTOMER_ID, created_by_user_id=user_id,
+                type="FX_SPOT", direction="Buy", amount=1000, buy_currency="USD", sell_currency="EGP",
+                window_start=window_end - timedelta(hours=1), window_end=window_end, status="COMPLETED",
+            ))
+            for quotation_bank_id, price in zip(bank_ids, (48.0 + n, 49.0 + n)):
+                assignment_id = str(uuid.uuid4())
+                conn.execute(insert(QuotationBankAssignment.__table__).values(
+                    id=assignment_id, rfq_id=rfq_id, quotation_bank_id=quotation_bank_id, token=assignment_id,
+                ))
+                conn.execute(insert(QuotationOffer.__table__).values(assignment_id=assignment_id, price=price))
+                assignment_ids.append(assignment_id)
+            rfq_ids.append(rfq_id)
+    yield rfq_ids, bank_ids, assignment_ids
+    with engine.begin() as conn:
+        conn.execute(delete(QuotationOffer.__table__).where(QuotationOffer.assignment_id.in_(assignment_ids)))
+        conn.execute(delete(QuotationBankAssignment.__table__).where(QuotationBankAssignment.rfq_id.in_(rfq_ids)))
+        conn.execute(delete(QuotationRequest.__table__).where(QuotationRequest.id.in_(rfq_ids)))
+        conn.execute(delete(QuotationBank.__table__).where(QuotationBank.id.in_(bank_ids)))
+
+
+def _rfqs(db, rfq_ids):
+    return db.query(QuotationRequest).filter(QuotationRequest.id.in_(rfq_ids)).order_by(QuotationRequest.id).all()
+
+
+def test_stats_keep_rankings_without_evicting_live_books(engine, completed_rfqs, monkeypatch):
+    rfq_ids, bank_ids, assignment_ids = completed_rfqs
+    service = QuotationOfferBookService(max_books=1, max_rankings=10)
+    built = []
+    build_books = service._build_books
+    monkeypatch.setattr(service, "_build_books", lambda db, rfqs: built.append(len(rfqs)) or build_books(db, rfqs))
+
+    with Session(engine) as db:
+        rfqs = _rfqs(db, rfq_ids)
+        live = service.get_book(db, rfqs[0])
+        stats = service.get_bank_stats(db, rfqs)
+        assert service._books[rfqs[0].id] is live
+
+        winner = next(s for s in stats if s["bank_id"] == bank_ids[0])
+        assert winner["total_won"] == 3 and winner["win_rate"] == 100
+
+        assert service.get_bank_stats(db, rfqs) == stats
+        assert built == [1, 3]  # the second stats read only probed
+
+    # A new offer on one RFQ rebuilds that RFQ's ranking only
+    with engine.begin() as conn:
+        conn.execute(insert(QuotationOffer.__table__).values(assignment_id=assignment_ids[1], price=1.0))
+    with Session(engine) as db:
+        stats = service.get_bank_stats(db, _rfqs(db, rfq_ids))
+    assert built == [1, 3, 1]
+    assert next(s for s in stats if s["bank_id"] == bank_ids[1])["total_won"] == 1
+
+
+def test_cbe_rate_by_iso_code(db):
+    assert fx_service.get_cbe_rate(db, "usd", "EGP") == Decimal("48.6")
+    assert fx_service.get_cbe_rate(db, "USD", "EUR") == Decimal("48.6") / Decimal("52.9")
+    assert fx_service.get_cbe_rate(db, "USD", "XXX") is None
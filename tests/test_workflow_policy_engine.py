@@ -0,0 +1,39 @@
+# tests/test_workflow_policy_engine.py
+"""Approver directory freshness across workers (version probe)."""
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+import app.models as models
+from app.models.models import user_approval_group_association
+from app.services.workflow_policy_engine import WorkflowPolicyEngine
+
+CUSTOMER_ID = 2
+
+
+def test_swapping_a_group_member_is_seen_by_other_workers(engine):
+    with engine.connect() as conn:
+        first_user, second_user = conn.execute(
+            select(models.User.id).where(models.User.customer_id == CUSTOMER_ID).order_by(models.User.id).limit(2)
+        ).scalars().all()
+    members = user_approval_group_association
+    # Core statements: no commit hooks, as if another worker made the change
+    with engine.begin() as conn:
+        group_id = conn.execute(
+            insert(models.ApprovalGroup.__table__).values(name="Swap Committee", customer_id=CUSTOMER_ID)
+        ).inserted_primary_key[0]
+        conn.execute(insert(members).values(approval_group_id=group_id, user_id=first_user))
+
+    other_worker = WorkflowPolicyEngine(revalidate_seconds=0)
+    with Session(engine) as db:
+        before = other_worker.get_directory(db, CUSTOMER_ID)
+    assert before.groups[group_id][1] == {first_user}
+
+    with engine.begin() as conn:
+        conn.execute(delete(members).where(members.c.approval_group_id == group_id))
+        conn.execute(insert(members).values(approval_group_id=group_id, user_id=second_user))
+
+    with Session(engine) as db:
+        after = other_worker.get_directory(db, CUSTOMER_ID)
+    assert after.version != before.version
+    assert after.groups[group_id][1] == {second_user}